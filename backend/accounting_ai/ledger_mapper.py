@@ -49,16 +49,15 @@ class LedgerMapper:
                 return acct["code"], acct["name"], learned.get("confidence_score", 0.80)
 
         # 3. Check regular expression keyword match defaults (ZTE style rules)
-        # We can dynamically retrieve ZTE rules if present
-        from backend.dependencies import db
-        rows = await db.zte_category_rules.find({"company_id": company_id}, {"_id": 0}).to_list(500)
+        # We can dynamically retrieve ZTE rules if present (compiled and
+        # cached per company by the party index)
+        from backend.search import party_index
         from backend.zero_touch_entry import DEFAULT_CATEGORY_RULES
-        rules = rows if rows else DEFAULT_CATEGORY_RULES
+        rules = (await party_index.category_rules(company_id, DEFAULT_CATEGORY_RULES))[0]
         
         vn = vendor_name.lower()
-        import re
-        for rule in rules:
-            if re.search(rule["match"], vn, flags=re.IGNORECASE):
+        for pattern, rule in rules:
+            if pattern.search(vn):
                 code = rule["account_code"]
                 acct = await ChartOfAccountsManager.lookup_by_code(company_id, code)
                 if acct:
@@ -67,8 +66,8 @@ class LedgerMapper:
         # 4. Deep content scan of description lines
         lines = extracted_data.get("line_items") or []
         combined_text = " ".join(str(item.get("description") or "").lower() for item in lines)
-        for rule in rules:
-            if re.search(rule["match"], combined_text, flags=re.IGNORECASE):
+        for pattern, rule in rules:
+            if pattern.search(combined_text):
                 code = rule["account_code"]
                 acct = await ChartOfAccountsManager.lookup_by_code(company_id, code)
                 if acct:
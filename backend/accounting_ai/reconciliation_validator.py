@@ -26,6 +26,12 @@ Sales/Receivable/Outstanding — it reuses:
     (invoice → journal sync, already the single write path into the GL)
   • accounting_core.trial_balance / _compute_party_ledger
   • invoicing.invoice_stats-style totals (Revenue/Collections/Outstanding)
+
+The figures are read from backend/validation_totals.py: running sums of
+those same invoice fields and journal lines, kept up to date by the
+invoice / journal write sites, so a run only re-examines what changed
+since the book's last sync. The daily audit (run_validation_audit) makes
+the old full pass and rebuilds the sums.
 """
 
 from datetime import datetime, timezone
@@ -33,6 +39,7 @@ from typing import Optional, List, Dict, Any
 import logging
 import math
 
+from backend import validation_totals
 from backend.dependencies import db
 
 logger = logging.getLogger("reconciliation_validator")
@@ -44,127 +51,11 @@ def _round2(v: float) -> float:
     return round(float(v or 0), 2)
 
 
-async def _invoice_totals(company_id: str) -> Dict[str, float]:
-    """Revenue / Collections / Outstanding straight from the invoice
-    module's own fields (grand_total / amount_paid / amount_due) —
-    never re-derived from workflow status. Cancelled invoices are
-    excluded, matching invoicing.invoice_stats()."""
-    q: dict = {"invoice_type": "tax_invoice", "status": {"$ne": "cancelled"}}
-    if company_id:
-        q["company_id"] = company_id
-    invs = await db.invoices.find(
-        q, {"_id": 0, "grand_total": 1, "amount_paid": 1, "amount_due": 1,
-            "total_gst": 1, "is_gst_invoice": 1, "invoice_category": 1, "gst_type": 1}
-    ).to_list(200000)
-
-    revenue = sum(_round2(i.get("grand_total")) for i in invs)
-    collections = sum(_round2(i.get("amount_paid")) for i in invs)
-    outstanding = sum(max(0.0, _round2(i.get("amount_due"))) for i in invs)
-
-    def _bucket(i: dict) -> str:
-        # An invoice is a GST invoice if it actually carries GST value or is
-        # explicitly flagged as one; export/exempt are called out separately
-        # where the data marks them, everything else is "domestic non-GST".
-        gst_type = (i.get("gst_type") or i.get("invoice_category") or "").lower()
-        if "export" in gst_type:
-            return "export"
-        if "exempt" in gst_type:
-            return "exempt"
-        if i.get("is_gst_invoice") or _round2(i.get("total_gst")) > 0:
-            return "gst"
-        return "non_gst"
-
-    gst_sales = sum(_round2(i.get("grand_total")) for i in invs if _bucket(i) == "gst")
-    non_gst_sales = sum(_round2(i.get("grand_total")) for i in invs if _bucket(i) == "non_gst")
-    export_sales = sum(_round2(i.get("grand_total")) for i in invs if _bucket(i) == "export")
-    exempt_sales = sum(_round2(i.get("grand_total")) for i in invs if _bucket(i) == "exempt")
-
-    return {
-        "revenue": _round2(revenue),
-        "collections": _round2(collections),
-        "outstanding": _round2(outstanding),
-        "gst_sales": _round2(gst_sales),
-        "non_gst_sales": _round2(non_gst_sales),
-        "export_sales": _round2(export_sales),
-        "exempt_sales": _round2(exempt_sales),
-    }
-
-
-async def _revenue_culprits(company_id: str, limit: int = 20) -> List[Dict[str, Any]]:
-    """Pinpoint which invoice(s) are breaking Revenue = Collections + Outstanding.
-
-    The aggregate check in `_check()` only tells you the totals disagree by
-    some rupee amount — it can't tell you *which* invoice caused it. Since
-    Revenue/Collections/Outstanding are summed straight from each invoice's
-    own grand_total / amount_paid / amount_due, any single invoice where
-    those three don't add up is, by construction, the source of some (or
-    all) of the aggregate drift. This walks every invoice and reports the
-    ones that don't reconcile individually, worst offenders first, so the
-    drift can be fixed at its source instead of just re-observed."""
-    q: dict = {"invoice_type": "tax_invoice", "status": {"$ne": "cancelled"}}
-    if company_id:
-        q["company_id"] = company_id
-    invs = await db.invoices.find(
-        q, {"_id": 0, "id": 1, "invoice_number": 1, "client_name": 1,
-            "grand_total": 1, "amount_paid": 1, "amount_due": 1}
-    ).to_list(200000)
-
-    culprits = []
-    for i in invs:
-        grand = _round2(i.get("grand_total"))
-        paid = _round2(i.get("amount_paid"))
-        due = _round2(i.get("amount_due"))
-        diff = _round2(grand - (paid + due))
-        if abs(diff) > TOLERANCE:
-            culprits.append({
-                "id": i.get("id"),
-                "invoice_number": i.get("invoice_number") or "(no number)",
-                "client_name": i.get("client_name") or "",
-                "grand_total": grand, "amount_paid": paid, "amount_due": due,
-                "diff": diff,
-            })
-
-    culprits.sort(key=lambda c: abs(c["diff"]), reverse=True)
-    return culprits[:limit]
-
-
-async def _trial_balance_snapshot(company_id: str) -> Dict[str, Any]:
-    """Pull the account-level totals the validator needs directly from
-    journal_lines / chart_of_accounts — the same data trial_balance()
-    in accounting_core.py reports, without going through the HTTP layer."""
-    acct_q = {"company_id": company_id} if company_id else {}
-    accounts = await db.chart_of_accounts.find(acct_q, {"_id": 0}).to_list(20000)
-    line_q = {"company_id": company_id} if company_id else {}
-    lines = await db.journal_lines.find(line_q, {"_id": 0}).to_list(200000)
-
-    totals: Dict[str, Dict[str, float]] = {}
-    for l in lines:
-        t = totals.setdefault(l["account_id"], {"debit": 0.0, "credit": 0.0})
-        t["debit"] += l["debit"]
-        t["credit"] += l["credit"]
-
-    sum_debit = sum(t["debit"] for t in totals.values())
-    sum_credit = sum(t["credit"] for t in totals.values())
-
-    def _net_for_code(code: str) -> float:
-        ids = {a["id"] for a in accounts if a["code"] == code}
-        debit = sum(totals.get(i, {}).get("debit", 0.0) for i in ids)
-        credit = sum(totals.get(i, {}).get("credit", 0.0) for i in ids)
-        return debit - credit
-
-    return {
-        "total_debit": _round2(sum_debit),
-        "total_credit": _round2(sum_credit),
-        "accounts_receivable": _round2(_net_for_code("1100")),
-        "sales_ledger": _round2(-_net_for_code("4000")),  # income is credit-normal
-    }
-
-
-async def _bank_reality_check(company_id: str) -> Dict[str, float]:
-    """Compares the GL's Bank Accounts (1010) balance against the real,
-    ground-truth balance of every connected bank account (opening_balance +
+async def _bank_real_balance(company_id: str) -> float:
+    """The real, ground-truth balance of every connected bank account (opening_balance +
     imported statement transactions, or the statement's own running
-    balance_after where available — see bank_accounts.list_bank_accounts).
+    balance_after where available — see bank_accounts.list_bank_accounts),
+    compared against the GL's Bank Accounts (1010) balance.
 
     Unlike the other six checks, this one is NOT self-healing: a mismatch
     here almost always means a real-world receipt/payment got posted to the
@@ -173,17 +64,6 @@ async def _bank_reality_check(company_id: str) -> Dict[str, float]:
     re-running the invoice→journal sync pipeline does not fix either case.
     It only widens the two figures being compared, so it is reported as a
     hard mismatch every time rather than attempted-and-cleared."""
-    acct_q = {"code": "1010"}
-    if company_id:
-        acct_q["company_id"] = company_id
-    bank_gl_ids = {a["id"] for a in await db.chart_of_accounts.find(acct_q, {"_id": 0, "id": 1}).to_list(2000)}
-    gl_balance = 0.0
-    if bank_gl_ids:
-        lines = await db.journal_lines.find(
-            {"account_id": {"$in": list(bank_gl_ids)}}, {"_id": 0, "debit": 1, "credit": 1}
-        ).to_list(200000)
-        gl_balance = sum((l.get("debit") or 0) - (l.get("credit") or 0) for l in lines)
-
     ba_q = {"company_id": company_id} if company_id else {}
     bank_accounts = await db.bank_accounts.find(ba_q, {"_id": 0, "id": 1, "opening_balance": 1}).to_list(500)
     real_balance = 0.0
@@ -214,125 +94,42 @@ async def _bank_reality_check(company_id: str) -> Dict[str, float]:
                 float(t.get("credit") or 0) - float(t.get("debit") or 0) for t in txns
             )
 
-    return {"gl_balance": _round2(gl_balance), "real_balance": _round2(real_balance)}
-
-
-async def _customer_ledger_total(company_id: str) -> float:
-    """Sum of the Accounts Receivable movements that resolve to a named
-    customer. invoicing.py posts every sale/payment onto the single
-    control account (code 1100, resolved via get_default_account_id) —
-    it does not use party_ledgers.py's per-party sub-accounts — so
-    'Customer Ledger Total' here means: of everything sitting on 1100,
-    how much of it is attributable to an actual invoice/payment with a
-    client_name. Any gap versus the full Accounts Receivable balance is
-    an orphaned posting that isn't showing up in any customer's
-    statement — the real-world case this check exists to catch, matching
-    the pattern already used by /control-accounts/verify in
-    party_ledgers.py for the same purpose on the party-sub-account path."""
-    acct_q = {"code": "1100"}
-    if company_id:
-        acct_q["company_id"] = company_id
-    ar_ids = {a["id"] for a in await db.chart_of_accounts.find(acct_q, {"_id": 0, "id": 1}).to_list(2000)}
-    if not ar_ids:
-        return 0.0
-
-    lines = await db.journal_lines.find(
-        {"account_id": {"$in": list(ar_ids)}}, {"_id": 0, "entry_id": 1, "debit": 1, "credit": 1}
-    ).to_list(200000)
-    if not lines:
-        return 0.0
-
-    entry_ids = list({l["entry_id"] for l in lines})
-    entries = await db.journal_entries.find(
-        {"id": {"$in": entry_ids}, "source": {"$in": ["sale", "payment"]}},
-        {"_id": 0, "id": 1, "source_id": 1},
-    ).to_list(200000)
-    source_id_by_entry = {e["id"]: e.get("source_id") for e in entries}
-
-    base_q: dict = {"company_id": company_id} if company_id else {}
-    inv_ids = {i["id"] for i in await db.invoices.find(
-        {**base_q, "client_name": {"$exists": True, "$ne": ""}}, {"_id": 0, "id": 1}
-    ).to_list(200000)}
-    pay_ids = {p["id"] for p in await db.payments.find(
-        {**base_q, "client_name": {"$exists": True, "$ne": ""}}, {"_id": 0, "id": 1}
-    ).to_list(200000)}
-    valid_source_ids = inv_ids | pay_ids
-
-    total = 0.0
-    for l in lines:
-        src = source_id_by_entry.get(l["entry_id"])
-        if src in valid_source_ids:
-            total += (l.get("debit") or 0) - (l.get("credit") or 0)
-    return _round2(total)
-
-
-async def _manual_entries_on_account(company_id: str, code: str, auto_sources: set, limit: int = 20) -> List[Dict[str, Any]]:
-    """Find journal entries touching account `code` whose source is NOT
-    one of the invoice-sync pipeline's own sources (e.g. not 'sale' /
-    'payment'). Re-running the invoice→journal sync can only rebuild
-    entries IT created — it has no authority to touch or undo an entry
-    someone posted by hand (source='manual'), via an opening balance, or
-    via another subsystem (e.g. GST intelligence). When a rule still
-    fails after resync, one of these is almost always why, so we name it
-    instead of only re-reporting the aggregate diff."""
-    acct_q: dict = {"code": code}
-    if company_id:
-        acct_q["company_id"] = company_id
-    acct_ids = {a["id"] for a in await db.chart_of_accounts.find(acct_q, {"_id": 0, "id": 1}).to_list(2000)}
-    if not acct_ids:
-        return []
-
-    lines = await db.journal_lines.find(
-        {"account_id": {"$in": list(acct_ids)}}, {"_id": 0, "entry_id": 1, "debit": 1, "credit": 1}
-    ).to_list(200000)
-    if not lines:
-        return []
-
-    net_by_entry: Dict[str, float] = {}
-    for l in lines:
-        net_by_entry[l["entry_id"]] = net_by_entry.get(l["entry_id"], 0.0) + (l.get("debit") or 0) - (l.get("credit") or 0)
-
-    entries = await db.journal_entries.find(
-        {"id": {"$in": list(net_by_entry.keys())}, "source": {"$nin": list(auto_sources)}},
-        {"_id": 0, "id": 1, "entry_date": 1, "narration": 1, "source": 1, "source_id": 1},
-    ).to_list(200000)
-
-    culprits = []
-    for e in entries:
-        net = _round2(net_by_entry.get(e["id"], 0.0))
-        if abs(net) <= TOLERANCE:
-            continue
-        culprits.append({
-            "entry_id": e["id"],
-            "date": e.get("entry_date"),
-            "narration": e.get("narration") or "(no narration)",
-            "source": e.get("source") or "manual",
-            "net_amount": net,
-        })
-
-    culprits.sort(key=lambda c: abs(c["net_amount"]), reverse=True)
-    return culprits[:limit]
-
-
-async def run_validation_engine(company_id: str = "", auto_fix: bool = True) -> Dict[str, Any]:
+    return _round2(real_balance)
+
+
+async def _snapshot(company_id: str, audit: bool):
+    """The figures the checks compare, from the book's running totals
+    (re-examining only what changed since its last sync) or, in audit
+    mode, from a full rescan that rebuilds them."""
+    t = await validation_totals.book_totals(company_id, audit=audit)
+    inv = {f: _round2(t[f]) for f in validation_totals.INVOICE_FIELDS}
+    tb = {
+        "total_debit": _round2(t["debit"]),
+        "total_credit": _round2(t["credit"]),
+        "accounts_receivable": _round2(t["ar"]),
+        "sales_ledger": _round2(-t["sales"]),  # income is credit-normal
+    }
+    bank = {"gl_balance": _round2(t["bank"]), "real_balance": await _bank_real_balance(company_id)}
+    return inv, tb, _round2(t["customer_ledger"]), bank, t["examined"]
+
+
+async def run_validation_engine(company_id: str = "", auto_fix: bool = True, audit: bool = False) -> Dict[str, Any]:
     """Run every consistency check for one book (company_id="" = the
-    default/manual book). Rebuilds the GL from invoices first via the
-    existing reconcile pipeline, checks the six equations, and — on any
-    mismatch — reruns the reconcile pipeline once more (the only 'fix'
-    this engine performs; it never patches figures directly) before
-    logging a reconciliation event."""
+    default/manual book). Checks the six equations against the book's
+    running totals and — on any mismatch — reruns the reconcile pipeline
+    once (the only 'fix' this engine performs; it never patches figures
+    directly) before logging a reconciliation event.
+
+    audit=True is the full pass the engine used to make on every call:
+    rebuild the GL from invoices via the reconcile pipeline first, then
+    rescan every invoice and journal line instead of trusting the running
+    totals."""
     from backend.accounting_core import _reconcile_one_book  # local import: avoid circular import at module load
 
-    await _reconcile_one_book(company_id)
-
-    async def _snapshot():
-        inv = await _invoice_totals(company_id)
-        tb = await _trial_balance_snapshot(company_id)
-        cust_total = await _customer_ledger_total(company_id)
-        bank = await _bank_reality_check(company_id)
-        return inv, tb, cust_total, bank
+    if audit:
+        await _reconcile_one_book(company_id)
 
-    inv, tb, cust_total, bank = await _snapshot()
+    inv, tb, cust_total, bank, examined = await _snapshot(company_id, audit)
 
     def _check(inv, tb, cust_total, bank) -> List[Dict[str, Any]]:
         mismatches = []
@@ -404,7 +201,8 @@ async def run_validation_engine(company_id: str = "", auto_fix: bool = True) ->
         # disagrees after that, the drift is real and gets logged for
         # investigation rather than silently patched.
         await _reconcile_one_book(company_id)
-        inv, tb, cust_total, bank = await _snapshot()
+        inv, tb, cust_total, bank, more = await _snapshot(company_id, False)
+        examined += more
         remaining = _check(inv, tb, cust_total, bank)
         healed = len(remaining) < len(mismatches)
         mismatches = remaining
@@ -414,7 +212,7 @@ async def run_validation_engine(company_id: str = "", auto_fix: bool = True) ->
     # fields don't add up) — name the specific invoice(s) so the mismatch
     # can be resolved at the source instead of only being re-reported.
     if any(m["rule"] == "Revenue = Collections + Outstanding" for m in mismatches):
-        culprits = await _revenue_culprits(company_id)
+        culprits = await validation_totals.revenue_culprits(company_id)
         for m in mismatches:
             if m["rule"] == "Revenue = Collections + Outstanding":
                 m["culprits"] = culprits
@@ -437,7 +235,7 @@ async def run_validation_engine(company_id: str = "", auto_fix: bool = True) ->
     # of only re-reporting the diff.
     if any(m["rule"] in ("Accounts Receivable = Outstanding", "Customer Ledger Total = Accounts Receivable")
            for m in mismatches):
-        ar_culprits = await _manual_entries_on_account(company_id, "1100", {"sale", "payment"})
+        ar_culprits = await validation_totals.manual_entries(company_id, "ar", {"sale", "payment"})
         for m in mismatches:
             if m["rule"] in ("Accounts Receivable = Outstanding", "Customer Ledger Total = Accounts Receivable"):
                 m["culprits"] = ar_culprits
@@ -458,7 +256,7 @@ async def run_validation_engine(company_id: str = "", auto_fix: bool = True) ->
     # a manual entry posted straight to Sales outside the invoice sync is
     # the usual reason it survives a resync.
     if any(m["rule"] == "Sales Ledger = Invoice Revenue" for m in mismatches):
-        sales_culprits = await _manual_entries_on_account(company_id, "4000", {"sale"})
+        sales_culprits = await validation_totals.manual_entries(company_id, "sales", {"sale"})
         for m in mismatches:
             if m["rule"] == "Sales Ledger = Invoice Revenue":
                 m["culprits"] = sales_culprits
@@ -480,6 +278,8 @@ async def run_validation_engine(company_id: str = "", auto_fix: bool = True) ->
         "passed": len(mismatches) == 0,
         "mismatches": mismatches,
         "healed_by_rebuild": healed,
+        "mode": "audit" if audit else "incremental",
+        "documents_examined": examined,
         "figures": {
             "revenue": inv["revenue"], "collections": inv["collections"], "outstanding": inv["outstanding"],
             "trial_balance_debit": tb["total_debit"], "trial_balance_credit": tb["total_credit"],
@@ -496,13 +296,15 @@ async def run_validation_engine(company_id: str = "", auto_fix: bool = True) ->
                         f"mismatches={[m['rule'] for m in mismatches]}")
         await db.reconciliation_events.insert_one({**report})
         report.pop("_id", None)
+    else:
+        await validation_totals.mark_clean(company_id)
 
     return report
 
 
-async def run_validation_engine_all_books() -> List[Dict[str, Any]]:
+async def run_validation_engine_all_books(audit: bool = False) -> List[Dict[str, Any]]:
     """Run the engine across every book — used by the 'All Companies'
-    view and by the scheduled/health-check entry point.
+    view and by the scheduled audit.
 
     Each book is isolated: if one book's reconcile/check pipeline throws
     (bad data, a missing account, etc.), that book gets an error entry
@@ -512,7 +314,7 @@ async def run_validation_engine_all_books() -> List[Dict[str, Any]]:
     reports = []
     for book_id in await _all_book_ids():
         try:
-            reports.append(await run_validation_engine(book_id))
+            reports.append(await run_validation_engine(book_id, audit=audit))
         except Exception as exc:
             logger.exception(f"[reconciliation-event] book={book_id or '(default book)'} crashed")
             reports.append({
@@ -524,3 +326,10 @@ async def run_validation_engine_all_books() -> List[Dict[str, Any]]:
                 "healed_by_rebuild": False,
             })
     return reports
+
+
+async def run_validation_audit():
+    """Job-runner entry point: the daily full-rescan audit of every book."""
+    reports = await run_validation_engine_all_books(audit=True)
+    failed = [r["company_id"] or "(default book)" for r in reports if not r.get("passed")]
+    logger.info(f"[reconciliation-audit] {len(reports)} book(s) audited, {len(failed)} with mismatches {failed}")
@@ -23,6 +23,8 @@ from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 
+from backend import journal_rollup
+from backend import validation_totals
 from backend.dependencies import db, get_current_user
 from backend.models import User
 
@@ -297,6 +299,8 @@ async def post_journal_entry(
             "credit": float(l.get("credit") or 0), "memo": l.get("memo", ""), "created_at": now,
         })
     await db.journal_lines.insert_many(line_docs)
+    await journal_rollup.mark_changed([entry_doc])
+    await validation_totals.note_changed("entry", [entry_id], company_id)
     entry_doc.pop("_id", None)
     return entry_doc
 
@@ -362,18 +366,21 @@ async def _validate_best_effort(company_id: str):
 
 
 @router.get("/reports/validation-engine")
-async def validation_engine_report(company_id: str = Query(""), current_user: User = Depends(get_current_user)):
+async def validation_engine_report(company_id: str = Query(""), audit: bool = Query(False),
+                                   current_user: User = Depends(get_current_user)):
     """On-demand reconciliation health check across Trial Balance, Party/
     Customer Ledger, and GST report totals vs. the Invoice module's own
     Revenue/Collections/Outstanding figures. Auto-heals by rerunning the
-    invoice->journal sync once before reporting a real mismatch."""
+    invoice->journal sync once before reporting a real mismatch.
+    audit=true re-syncs first and rescans every invoice and journal line
+    instead of reading the running totals."""
     if not _perm_reports(current_user):
         raise HTTPException(403, "Access denied. Request access from your admin in Permission Governance.")
     from backend.accounting_ai.reconciliation_validator import run_validation_engine, run_validation_engine_all_books
     try:
         if company_id:
-            return await run_validation_engine(company_id, auto_fix=True)
-        return {"books": await run_validation_engine_all_books()}
+            return await run_validation_engine(company_id, auto_fix=True, audit=audit)
+        return {"books": await run_validation_engine_all_books(audit=audit)}
     except Exception as exc:
         # Previously this endpoint had no guard, so any exception deep in the
         # reconcile/rebuild pipeline (bad invoice data, a missing account,
@@ -553,6 +560,7 @@ async def bulk_delete_journal_entries(payload: dict, current_user: User = Depend
     if deleted_ids:
         await db.journal_lines.delete_many({"entry_id": {"$in": deleted_ids}})
         await db.journal_entries.delete_many({"id": {"$in": deleted_ids}})
+        await validation_totals.note_changed("entry", deleted_ids)
 
     return {"deleted_count": len(deleted_ids), "failed": failed}
 
@@ -589,6 +597,7 @@ async def delete_all_journal_entries(payload: dict, current_user: User = Depends
     if deleted_ids:
         await db.journal_lines.delete_many({"entry_id": {"$in": deleted_ids}})
         await db.journal_entries.delete_many({"id": {"$in": deleted_ids}})
+        await validation_totals.note_changed("entry", deleted_ids)
 
     return {"deleted_count": len(deleted_ids), "failed_count": failed_count}
 
@@ -705,6 +714,7 @@ async def delete_journal_entry(entry_id: str, current_user: User = Depends(get_c
     await guard_deletion(entry_id, current_user)
     await db.journal_lines.delete_many({"entry_id": entry_id})
     await db.journal_entries.delete_one({"id": entry_id})
+    await validation_totals.note_changed("entry", [entry_id])
     return {"success": True}
 
 
@@ -752,6 +762,9 @@ async def update_journal_entry(entry_id: str, payload: JournalEntryCreate, curre
     } for l in lines]
     if line_docs:
         await db.journal_lines.insert_many(line_docs)
+    await journal_rollup.mark_changed([entry, *line_docs])
+    for book in {entry.get("company_id") or "", payload.company_id or ""}:
+        await validation_totals.note_changed("entry", [entry_id], book)
     updated = await db.journal_entries.find_one({"id": entry_id}, {"_id": 0})
     return updated
 
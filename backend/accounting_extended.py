@@ -63,7 +63,10 @@ import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, UploadFile, File, Form
 from pydantic import BaseModel, Field
 
+from backend import journal_rollup
+from backend import validation_totals
 from backend.dependencies import db, get_current_user
+from backend.index_manifest import ensure_indexes, index
 from backend.models import User
 from backend.accounting_core import get_default_account_id
 
@@ -146,50 +149,54 @@ def _date_bucket(entry_date: str, bucket: str) -> str:
 # DB index creation
 # ─────────────────────────────────────────────────────────────────────────────
 
+INDEXES = [
+    index("journal_lines", [("company_id", 1), ("entry_date", 1), ("account_id", 1)]),
+    index("journal_lines", [("company_id", 1), ("source", 1), ("entry_date", 1)]),
+    index("journal_entries", [("company_id", 1), ("entry_date", 1)]),
+    index("journal_entries", [("idempotency_key", 1)], unique=True, sparse=True),
+    index("opening_balances", [("company_id", 1), ("fy", 1), ("account_id", 1)], unique=True),
+    index("fixed_assets", [("company_id", 1), ("asset_date", 1)]),
+    index("depreciation_runs", [("company_id", 1), ("fy", 1), ("period_end", 1)]),
+    index("bank_reconciliation", [("bank_account_id", 1), ("statement_date", 1)]),
+    index("tds_tcs_entries", [("company_id", 1), ("entry_date", 1)]),
+    index("accounting_audit_trail", [("company_id", 1), ("created_at", -1)]),
+    index("bulk_import_jobs", [("job_id", 1)], unique=True),
+    # Speeds up the report-time reconciliation scan (sync_*_journal_entry
+    # look-ups by source/source_id, and the invoices/payments collections
+    # that get pulled per company on every Trial Balance / P&L / Balance
+    # Sheet / Ledger view).
+    index("journal_entries", [("source", 1), ("source_id", 1)]),
+    index("invoices", "company_id"),
+    index("purchase_invoices", "company_id"),
+    index("payments", "company_id"),
+    index("purchase_payments", "company_id"),
+    index("purchase_payments", "purchase_invoice_id"),
+    # journal_lines was only indexed by (company_id, entry_date, account_id)
+    # / (company_id, source, entry_date). Every lookup of "all lines for
+    # this journal entry" — Party Ledger, the individual party-ledger
+    # sub-account view, and the Journal Entries list — filters by
+    # entry_id alone (often via a large $in list), which had no
+    # supporting index and fell back to a full collection scan. This was
+    # one of the biggest contributors to slow Accounting Reports loads.
+    index("journal_lines", "entry_id"),
+    # Cash / Bank Book pages: the few cash and bank accounts of a company by
+    # date, without walking every line of the period.
+    index("journal_lines", [("company_id", 1), ("account_id", 1), ("entry_date", 1)]),
+    # payments.find({"invoice_id": ...}) runs on every invoice save,
+    # every status change, and every Party Ledger lookup — also had no
+    # index of its own (only company_id).
+    index("payments", "invoice_id"),
+    # Party Ledger resolves a party's invoices/bills by name — index the
+    # lookup pattern actually used (company_id + name) instead of
+    # scanning every invoice/bill in the book.
+    index("invoices", [("company_id", 1), ("client_name", 1)]),
+    index("purchase_invoices", [("company_id", 1), ("supplier_name", 1)]),
+]
+
+
 async def create_accounting_extended_indexes():
     """Create indexes for all collections used by this module. Safe to re-run."""
-    try:
-        await db.journal_lines.create_index([("company_id", 1), ("entry_date", 1), ("account_id", 1)])
-        await db.journal_lines.create_index([("company_id", 1), ("source", 1), ("entry_date", 1)])
-        await db.journal_entries.create_index([("company_id", 1), ("entry_date", 1)])
-        await db.journal_entries.create_index([("idempotency_key", 1)], unique=True, sparse=True)
-        await db.opening_balances.create_index([("company_id", 1), ("fy", 1), ("account_id", 1)], unique=True)
-        await db.fixed_assets.create_index([("company_id", 1), ("asset_date", 1)])
-        await db.depreciation_runs.create_index([("company_id", 1), ("fy", 1), ("period_end", 1)])
-        await db.bank_reconciliation.create_index([("bank_account_id", 1), ("statement_date", 1)])
-        await db.tds_tcs_entries.create_index([("company_id", 1), ("entry_date", 1)])
-        await db.accounting_audit_trail.create_index([("company_id", 1), ("created_at", -1)])
-        await db.bulk_import_jobs.create_index([("job_id", 1)], unique=True)
-        # Speeds up the report-time reconciliation scan (sync_*_journal_entry
-        # look-ups by source/source_id, and the invoices/payments collections
-        # that get pulled per company on every Trial Balance / P&L / Balance
-        # Sheet / Ledger view).
-        await db.journal_entries.create_index([("source", 1), ("source_id", 1)])
-        await db.invoices.create_index("company_id")
-        await db.purchase_invoices.create_index("company_id")
-        await db.payments.create_index("company_id")
-        await db.purchase_payments.create_index("company_id")
-        await db.purchase_payments.create_index("purchase_invoice_id")
-        # journal_lines was only indexed by (company_id, entry_date, account_id)
-        # / (company_id, source, entry_date). Every lookup of "all lines for
-        # this journal entry" — Party Ledger, the individual party-ledger
-        # sub-account view, and the Journal Entries list — filters by
-        # entry_id alone (often via a large $in list), which had no
-        # supporting index and fell back to a full collection scan. This was
-        # one of the biggest contributors to slow Accounting Reports loads.
-        await db.journal_lines.create_index("entry_id")
-        # payments.find({"invoice_id": ...}) runs on every invoice save,
-        # every status change, and every Party Ledger lookup — also had no
-        # index of its own (only company_id).
-        await db.payments.create_index("invoice_id")
-        # Party Ledger resolves a party's invoices/bills by name — index the
-        # lookup pattern actually used (company_id + name) instead of
-        # scanning every invoice/bill in the book.
-        await db.invoices.create_index([("company_id", 1), ("client_name", 1)])
-        await db.purchase_invoices.create_index([("company_id", 1), ("supplier_name", 1)])
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning(f"[accounting_extended] index creation warning: {e}")
+    await ensure_indexes(INDEXES)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -213,6 +220,38 @@ async def _audit(company_id: str, user_id: str, action: str, entity: str, entity
 # Day Book
 # ─────────────────────────────────────────────────────────────────────────────
 
+DAY_BOOK_PAGE_DAYS = 31   # days with postings per Day Book / Cash-Bank Book page
+
+
+def _day_before(d: str) -> str:
+    try:
+        return (date.fromisoformat(d[:10]) - timedelta(days=1)).isoformat()
+    except (TypeError, ValueError):
+        raise HTTPException(400, f"Invalid date: {d}")
+
+
+async def _day_page(collection, match: dict, page_days: int):
+    """
+    The next page of a day-paginated book: (first date, last date, next
+    cursor) over the distinct entry dates matching `match`, with at most
+    `page_days` dates per page (0 = the whole range). The cursor is the first
+    date of the following page, or None on the last page.
+    """
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$entry_date"}},
+        {"$sort": {"_id": 1}},
+    ]
+    if page_days:
+        pipeline.append({"$limit": page_days + 1})
+    days = [row["_id"] async for row in collection.aggregate(pipeline)]
+    if not days:
+        return None, None, None
+    if page_days and len(days) > page_days:
+        return days[0], days[page_days - 1], days[page_days]
+    return days[0], days[-1], None
+
+
 @router.get("/reports/day-book")
 async def day_book(
     company_id: str = Query(""),
@@ -220,55 +259,80 @@ async def day_book(
     to_date: str = Query(None),
     fy: str = Query(None),
     source: str = Query(None),   # sale / purchase / bank / manual / ai_zero_touch
+    cursor: str = Query(None),   # next_cursor of the previous page
+    page_days: int = Query(DAY_BOOK_PAGE_DAYS, ge=0, le=366),
     current_user: User = Depends(get_current_user),
 ):
+    """
+    Entries grouped by day, one page of `page_days` posting days at a time.
+    Entries, their lines and the day totals are assembled by one
+    `$lookup`/`$group` pipeline on (company_id, entry_date). The period
+    totals are only computed for the first page (cursor unset).
+    """
     if not _can_reports(current_user):
         raise HTTPException(403, "Access denied.")
     fd, td = from_date, to_date
     if not fd or not td:
         fd, td = _fy_dates(fy)
 
-    q: dict = {"company_id": company_id, "entry_date": {"$gte": fd, "$lte": td}}
+    q: dict = {"company_id": company_id, "entry_date": {"$gte": max(fd, cursor or fd), "$lte": td}}
     if source:
         q["source"] = source
 
-    entries = await db.journal_entries.find(q, {"_id": 0}).sort("entry_date", 1).to_list(50000)
-    if not entries:
-        return {"from_date": fd, "to_date": td, "days": [], "total_debit": 0, "total_credit": 0}
-
-    entry_ids = [e["id"] for e in entries]
-    lines = await db.journal_lines.find(
-        {"entry_id": {"$in": entry_ids}}, {"_id": 0}
-    ).to_list(200000)
-
-    lines_by_entry: dict = defaultdict(list)
-    for l in lines:
-        lines_by_entry[l["entry_id"]].append(l)
-
-    days: dict = {}
-    for e in entries:
-        day_key = e["entry_date"]
-        if day_key not in days:
-            days[day_key] = {"date": day_key, "entries": [], "day_debit": 0, "day_credit": 0}
-        entry_lines = lines_by_entry.get(e["id"], [])
-        total_dr = sum(l.get("debit", 0) for l in entry_lines)
-        total_cr = sum(l.get("credit", 0) for l in entry_lines)
-        days[day_key]["entries"].append({
-            "id": e["id"],
-            "narration": e.get("narration", ""),
-            "source": e.get("source", "manual"),
-            "ref_no": e.get("ref_no", ""),
-            "total_debit": _round2(total_dr),
-            "total_credit": _round2(total_cr),
-            "lines": entry_lines,
-        })
-        days[day_key]["day_debit"] = _round2(days[day_key]["day_debit"] + total_dr)
-        days[day_key]["day_credit"] = _round2(days[day_key]["day_credit"] + total_cr)
-
-    sorted_days = sorted(days.values(), key=lambda d: d["date"])
-    total_dr = _round2(sum(d["day_debit"] for d in sorted_days))
-    total_cr = _round2(sum(d["day_credit"] for d in sorted_days))
-    return {"from_date": fd, "to_date": td, "days": sorted_days, "total_debit": total_dr, "total_credit": total_cr}
+    first, last, next_cursor = await _day_page(db.journal_entries, q, page_days)
+    if not first:
+        return {"from_date": fd, "to_date": td, "days": [], "total_debit": 0, "total_credit": 0,
+                "next_cursor": None}
+
+    pipeline = [
+        {"$match": {**q, "entry_date": {"$gte": first, "$lte": last}}},
+        {"$sort": {"entry_date": 1}},
+        {"$lookup": {"from": "journal_lines", "localField": "id", "foreignField": "entry_id", "as": "lines"}},
+        {"$project": {"_id": 0, "lines._id": 0}},
+        {"$group": {
+            "_id": "$entry_date",
+            "entries": {"$push": {
+                "id": "$id",
+                "narration": {"$ifNull": ["$narration", ""]},
+                "source": {"$ifNull": ["$source", "manual"]},
+                "ref_no": {"$ifNull": ["$ref_no", ""]},
+                "total_debit": {"$sum": "$lines.debit"},
+                "total_credit": {"$sum": "$lines.credit"},
+                "lines": "$lines",
+            }},
+            "day_debit": {"$sum": {"$sum": "$lines.debit"}},
+            "day_credit": {"$sum": {"$sum": "$lines.credit"}},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    days = []
+    async for row in db.journal_entries.aggregate(pipeline, allowDiskUse=True):
+        for e in row["entries"]:
+            e["total_debit"] = _round2(e["total_debit"])
+            e["total_credit"] = _round2(e["total_credit"])
+        days.append({"date": row["_id"], "entries": row["entries"],
+                     "day_debit": _round2(row["day_debit"]), "day_credit": _round2(row["day_credit"])})
+
+    total_dr = total_cr = None
+    if not cursor:
+        if source:
+            totals = [
+                {"$match": {"company_id": company_id, "entry_date": {"$gte": fd, "$lte": td}, "source": source}},
+                {"$lookup": {"from": "journal_lines", "localField": "id", "foreignField": "entry_id", "as": "lines"}},
+                {"$group": {"_id": None, "debit": {"$sum": {"$sum": "$lines.debit"}},
+                            "credit": {"$sum": {"$sum": "$lines.credit"}}}},
+            ]
+            coll = db.journal_entries
+        else:
+            totals = [
+                {"$match": {"company_id": company_id, "entry_date": {"$gte": fd, "$lte": td}}},
+                {"$group": {"_id": None, "debit": {"$sum": "$debit"}, "credit": {"$sum": "$credit"}}},
+            ]
+            coll = db.journal_lines
+        row = (await coll.aggregate(totals).to_list(1) or [{"debit": 0, "credit": 0}])[0]
+        total_dr, total_cr = _round2(row["debit"]), _round2(row["credit"])
+    return {"from_date": fd, "to_date": td, "days": days, "total_debit": total_dr, "total_credit": total_cr,
+            "next_cursor": next_cursor}
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -338,8 +402,16 @@ async def cash_bank_book(
     from_date: str = Query(None),
     to_date: str = Query(None),
     fy: str = Query(None),
+    cursor: str = Query(None),   # next_cursor of the previous page
+    page_days: int = Query(DAY_BOOK_PAGE_DAYS, ge=0, le=366),
     current_user: User = Depends(get_current_user),
 ):
+    """
+    Running ledger of each cash / bank account, one page of `page_days`
+    posting days at a time. Opening, closing and period totals come from the
+    monthly rollup (backend/journal_rollup.py); `page_opening_balance` is the
+    balance the page's running balance starts from.
+    """
     if not _can_reports(current_user):
         raise HTTPException(403, "Access denied.")
     fd, td = from_date, to_date
@@ -360,69 +432,73 @@ async def cash_bank_book(
         )]
 
     if not all_accounts:
-        return {"from_date": fd, "to_date": td, "accounts": []}
+        return {"from_date": fd, "to_date": td, "accounts": [], "next_cursor": None}
 
     acct_ids = [a["id"] for a in all_accounts]
-    acct_map = {a["id"]: a for a in all_accounts}
-
-    # Opening balance (lines before from_date)
-    ob_lines = await db.journal_lines.find(
-        {"company_id": company_id, "account_id": {"$in": acct_ids}, "entry_date": {"$lt": fd}},
-        {"_id": 0}
-    ).to_list(100000)
-    ob_by_acct: dict = defaultdict(float)
-    for l in ob_lines:
-        ob_by_acct[l["account_id"]] += l.get("debit", 0) - l.get("credit", 0)
-
-    # Period lines
-    period_lines = await db.journal_lines.find(
-        {"company_id": company_id, "account_id": {"$in": acct_ids},
-         "entry_date": {"$gte": fd, "$lte": td}},
-        {"_id": 0}
-    ).sort("entry_date", 1).to_list(100000)
-
-    # Fetch entry narrations
-    entry_ids = list({l.get("entry_id") for l in period_lines if l.get("entry_id")})
-    entries_map: dict = {}
-    if entry_ids:
-        ents = await db.journal_entries.find({"id": {"$in": entry_ids}}, {"_id": 0}).to_list(len(entry_ids))
-        entries_map = {e["id"]: e for e in ents}
+    start = max(fd, cursor or fd)
+
+    # Balances from the monthly rollup: before the period, over the whole
+    # period and before this page, in one read of the rollup.
+    ranges = [(None, _day_before(fd)), (fd, td)]
+    if start != fd:
+        ranges.append((None, _day_before(start)))
+    opening, period, *page = await journal_rollup.account_movements_many(company_id, ranges)
+    page_opening = page[0] if page else opening
+
+    q = {"company_id": company_id, "account_id": {"$in": acct_ids}, "entry_date": {"$gte": start, "$lte": td}}
+    first, last, next_cursor = await _day_page(db.journal_lines, q, page_days)
+
+    lines_by_acct: dict = defaultdict(list)
+    if first:
+        pipeline = [
+            {"$match": {**q, "entry_date": {"$gte": first, "$lte": last}}},
+            {"$sort": {"entry_date": 1}},
+            {"$lookup": {"from": "journal_entries", "localField": "entry_id", "foreignField": "id", "as": "entry"}},
+            {"$project": {
+                "_id": 0, "account_id": 1, "entry_date": 1, "debit": 1, "credit": 1,
+                "narration": {"$ifNull": [{"$arrayElemAt": ["$entry.narration", 0]}, {"$ifNull": ["$memo", ""]}]},
+                "source": {"$ifNull": [{"$arrayElemAt": ["$entry.source", 0]}, ""]},
+                "ref_no": {"$ifNull": [{"$arrayElemAt": ["$entry.ref_no", 0]}, ""]},
+            }},
+        ]
+        async for l in db.journal_lines.aggregate(pipeline, allowDiskUse=True):
+            lines_by_acct[l["account_id"]].append(l)
 
     # Build per-account ledger
     results = []
     for a in all_accounts:
         aid = a["id"]
-        opening = _round2(ob_by_acct.get(aid, 0))
-        running = opening
+        ob_dr, ob_cr = opening.get(aid, (0.0, 0.0))
+        pg_dr, pg_cr = page_opening.get(aid, (0.0, 0.0))
+        p_dr, p_cr = period.get(aid, (0.0, 0.0))
+        running = _round2(pg_dr - pg_cr)
         rows = []
-        acct_lines = [l for l in period_lines if l.get("account_id") == aid]
-        for l in acct_lines:
-            ent = entries_map.get(l.get("entry_id"), {})
+        for l in lines_by_acct.get(aid, []):
             dr = l.get("debit", 0)
             cr = l.get("credit", 0)
             running = _round2(running + dr - cr)
             rows.append({
                 "date": l["entry_date"],
-                "narration": ent.get("narration", l.get("memo", "")),
-                "source": ent.get("source", ""),
-                "ref_no": ent.get("ref_no", ""),
+                "narration": l["narration"],
+                "source": l["source"],
+                "ref_no": l["ref_no"],
                 "debit": _round2(dr),
                 "credit": _round2(cr),
                 "balance": running,
             })
-        closing = running
         results.append({
             "account_id": aid,
             "account_code": a.get("code", ""),
             "account_name": a.get("name", ""),
-            "opening_balance": opening,
-            "closing_balance": closing,
-            "total_debit": _round2(sum(r["debit"] for r in rows)),
-            "total_credit": _round2(sum(r["credit"] for r in rows)),
+            "opening_balance": _round2(ob_dr - ob_cr),
+            "closing_balance": _round2(ob_dr - ob_cr + p_dr - p_cr),
+            "total_debit": _round2(p_dr),
+            "total_credit": _round2(p_cr),
+            "page_opening_balance": _round2(pg_dr - pg_cr),
             "rows": rows,
         })
 
-    return {"from_date": fd, "to_date": td, "accounts": results}
+    return {"from_date": fd, "to_date": td, "accounts": results, "next_cursor": next_cursor}
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -446,14 +522,8 @@ async def cash_flow(
     accounts = await db.chart_of_accounts.find({"company_id": company_id}, {"_id": 0}).to_list(2000)
     acct_map = {a["id"]: a for a in accounts}
 
-    all_lines = await db.journal_lines.find(
-        {"company_id": company_id, "entry_date": {"$gte": fd, "$lte": td}}, {"_id": 0}
-    ).to_list(200000)
-
-    # Balances by account
-    balances: dict = defaultdict(float)
-    for l in all_lines:
-        balances[l["account_id"]] += l.get("debit", 0) - l.get("credit", 0)
+    # Balances by account, from the monthly rollup
+    balances = await journal_rollup.account_balances(company_id, fd, td)
 
     def net(acct_type: str, sub: str = None) -> float:
         total = 0.0
@@ -657,21 +727,9 @@ async def financial_ratios(
     accounts = await db.chart_of_accounts.find({"company_id": company_id}, {"_id": 0}).to_list(2000)
     acct_map = {a["id"]: a for a in accounts}
 
-    # All-time balances (balance sheet)
-    bs_lines = await db.journal_lines.find(
-        {"company_id": company_id, "entry_date": {"$lte": as_of}}, {"_id": 0}
-    ).to_list(200000)
-    bs_bal: dict = defaultdict(float)
-    for l in bs_lines:
-        bs_bal[l["account_id"]] += l.get("debit", 0) - l.get("credit", 0)
-
-    # Period lines (P&L)
-    pl_lines = await db.journal_lines.find(
-        {"company_id": company_id, "entry_date": {"$gte": fd, "$lte": as_of}}, {"_id": 0}
-    ).to_list(200000)
-    pl_bal: dict = defaultdict(float)
-    for l in pl_lines:
-        pl_bal[l["account_id"]] += l.get("debit", 0) - l.get("credit", 0)
+    # All-time balances (balance sheet) and period movements (P&L), from the
+    # monthly rollup
+    bs_bal, pl_bal = await journal_rollup.account_balances_many(company_id, [(None, as_of), (fd, as_of)])
 
     def bal(aid: str, lines_map: dict = bs_bal) -> float:
         return lines_map.get(aid, 0.0)
@@ -763,20 +821,16 @@ async def comparative(
     acct_map = {a["id"]: a for a in accounts}
 
     async def period_pnl(fd, td):
-        lines = await db.journal_lines.find(
-            {"company_id": company_id, "entry_date": {"$gte": fd, "$lte": td}}, {"_id": 0}
-        ).to_list(200000)
+        balances = await journal_rollup.account_balances(company_id, fd, td)
         income_rows, expense_rows = {}, {}
-        for l in lines:
-            a = acct_map.get(l["account_id"])
+        for aid, amt in balances.items():
+            a = acct_map.get(aid)
             if not a:
                 continue
             if a["type"] == "income":
-                r = income_rows.setdefault(a["id"], {"code": a["code"], "name": a["name"], "amount": 0.0})
-                r["amount"] += l.get("credit", 0) - l.get("debit", 0)
+                income_rows[aid] = {"code": a["code"], "name": a["name"], "amount": -amt}
             elif a["type"] == "expense":
-                r = expense_rows.setdefault(a["id"], {"code": a["code"], "name": a["name"], "amount": 0.0})
-                r["amount"] += l.get("debit", 0) - l.get("credit", 0)
+                expense_rows[aid] = {"code": a["code"], "name": a["name"], "amount": amt}
         ti = _round2(sum(r["amount"] for r in income_rows.values()))
         te = _round2(sum(r["amount"] for r in expense_rows.values()))
         return {"income": list(income_rows.values()), "expenses": list(expense_rows.values()),
@@ -839,20 +893,22 @@ async def yearly_summary(
     accounts = await db.chart_of_accounts.find({"company_id": company_id}, {"_id": 0}).to_list(2000)
     acct_map = {a["id"]: a for a in accounts}
 
+    # One rollup read per year; the years share no months, so run them together.
+    year_balances = await asyncio.gather(*(
+        journal_rollup.account_balances(company_id, fd, td) for _, fd, td in periods
+    ))
+
     results = []
-    for fy_str, fd, td in periods:
-        lines = await db.journal_lines.find(
-            {"company_id": company_id, "entry_date": {"$gte": fd, "$lte": td}}, {"_id": 0}
-        ).to_list(200000)
+    for (fy_str, fd, td), balances in zip(periods, year_balances):
         income = expense = 0.0
-        for l in lines:
-            a = acct_map.get(l["account_id"])
+        for aid, amt in balances.items():
+            a = acct_map.get(aid)
             if not a:
                 continue
             if a["type"] == "income":
-                income += l.get("credit", 0) - l.get("debit", 0)
+                income -= amt
             elif a["type"] == "expense":
-                expense += l.get("debit", 0) - l.get("credit", 0)
+                expense += amt
         results.append({
             "fy": fy_str,
             "total_income": _round2(income),
@@ -962,6 +1018,8 @@ async def set_opening_balances(
                 "entry_date": req.date, "memo": f"OB {req.fy}",
                 "created_at": now_iso,
             })
+        await journal_rollup.mark_changed([{"company_id": req.company_id, "entry_date": req.date}])
+        await validation_totals.note_changed("entry", [entry_id], req.company_id)
 
     await _audit(req.company_id, str(current_user.id), "set_opening_balances", "opening_balances", req.fy, {"fy": req.fy, "lines": len(saved)})
     return {"saved": len(saved), "fy": req.fy}
@@ -1393,6 +1451,8 @@ async def run_depreciation(
                 "entry_date": period_end, "memo": f"Dep {asset['name']}",
                 "created_at": now_iso,
             })
+        await journal_rollup.mark_changed([{"company_id": company_id, "entry_date": period_end}])
+        await validation_totals.note_changed("entry", [entry_id], company_id)
 
         # Update asset book value
         new_bv = _round2(float(asset.get("book_value", asset["cost"])) - monthly_dep)
@@ -1468,6 +1528,8 @@ async def record_tds_tcs(
             "entry_date": req.entry_date, "memo": f"{req.section} {req.party_name}",
             "created_at": now_iso,
         })
+    await journal_rollup.mark_changed([{"company_id": req.company_id, "entry_date": req.entry_date}])
+    await validation_totals.note_changed("entry", [entry_id], req.company_id)
 
     return {"id": doc["id"], "entry_id": entry_id}
 
@@ -1564,6 +1626,7 @@ async def _run_bulk_import(job_id: str, company_id: str, fy: str, entries: list,
     total = len(entries)
     done = skipped = errors = 0
     now_iso = datetime.now(timezone.utc).isoformat()
+    posted = []
 
     for e in entries:
         try:
@@ -1600,11 +1663,14 @@ async def _run_bulk_import(job_id: str, company_id: str, fy: str, entries: list,
                     "entry_date": e["entry_date"], "memo": line.get("memo", ""),
                     "created_at": now_iso,
                 })
+            posted.append({"id": entry_id, "company_id": company_id, "entry_date": e["entry_date"]})
             done += 1
         except Exception as ex:
             errors += 1
             import logging
             logging.getLogger(__name__).warning(f"[bulk_import] {job_id} error: {ex}")
+    await journal_rollup.mark_changed(posted)
+    await validation_totals.note_changed("entry", [p["id"] for p in posted], company_id)
 
     await db.bulk_import_jobs.update_one(
         {"job_id": job_id},
@@ -25,7 +25,10 @@ from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 
+from backend import journal_rollup
+from backend import validation_totals
 from backend.dependencies import db, get_current_user
+from backend.index_manifest import ensure_indexes, index
 from backend.models import User
 from backend import accounting_core as ac
 
@@ -98,6 +101,7 @@ async def raise_adjustment_note(body: AdjustmentNoteOverride, current_user: User
         for l in new_lines
     ]
     await db.journal_lines.insert_many(line_docs)
+    await journal_rollup.mark_changed(line_docs)
 
     await db.journal_entries.update_one(
         {"id": body.original_entry_id},
@@ -106,6 +110,7 @@ async def raise_adjustment_note(body: AdjustmentNoteOverride, current_user: User
             "has_adjustment_history": True, "last_corrected_at": now, "last_corrected_by": current_user.id,
         }},
     )
+    await validation_totals.note_changed("entry", [body.original_entry_id], original.get("company_id") or "")
     updated_entry = await db.journal_entries.find_one({"id": body.original_entry_id}, {"_id": 0})
 
     note_doc = {
@@ -172,6 +177,12 @@ async def guard_deletion(entry_id: str, user: Optional[User] = None) -> None:
         )
 
 
+INDEXES = [
+    index("adjustment_note_overrides", "original_entry_id"),
+    index("adjustment_note_overrides", "company_id"),
+]
+
+
 async def create_accounting_integrity_indexes():
-    await db.adjustment_note_overrides.create_index("original_entry_id")
-    await db.adjustment_note_overrides.create_index("company_id")
+    """Ensure the adjustment-note override indexes."""
+    await ensure_indexes(INDEXES)
@@ -4,7 +4,8 @@ AI Provider Router
 
 Single point of truth that routes every OCR / vision call to the right
 provider (Gemini or Groq). Callers should NEVER call Gemini/Groq HTTP
-helpers directly — go through this module.
+helpers directly — go through this module. The HTTP calls themselves go
+through backend.ai.llm_gateway (cache, budgets, metrics under "ocr").
 
 Selection:
     AI_PROVIDER=gemini  -> Gemini vision (single + multipage)
@@ -35,107 +36,35 @@ from typing import Callable, List, Optional, Tuple
 from fastapi import HTTPException
 
 from backend.ai import groq_batch_processor as _groq
+from backend.ai import llm_gateway
 
 logger = logging.getLogger("ai_provider")
 
 
 # ─── Provider resolution ──────────────────────────────────────────────────────
 def get_provider() -> str:
-    p = (os.environ.get("AI_PROVIDER") or "").strip().lower()
-    if p in ("gemini", "google", "google-ai"):
-        return "gemini"
-    if p == "groq":
-        return "groq"
-    if os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY"):
-        return "gemini"
-    return "groq"
+    return llm_gateway.default_provider()
 
 
-def _gemini_key() -> str:
-    return (os.environ.get("GEMINI_API_KEY")
-            or os.environ.get("GOOGLE_API_KEY")
-            or os.environ.get("GOOGLE_AI_STUDIO_API_KEY")
-            or "").strip()
-
-
-def _gemini_model() -> str:
-    return (os.environ.get("GEMINI_VISION_MODEL") or "gemini-2.5-flash").strip()
-
-
-# ─── Gemini vision (lazy import of httpx) ─────────────────────────────────────
+# ─── Gemini vision (through the LLM gateway) ──────────────────────────────────
 async def _gemini_vision_single(image_b64: str, mime_type: str, prompt: str) -> str:
-    import httpx
-    key = _gemini_key()
-    if not key:
-        raise HTTPException(status_code=500,
-                            detail="GEMINI_API_KEY is not configured on the server.")
-    url = (f"https://generativelanguage.googleapis.com/v1beta/"
-           f"models/{_gemini_model()}:generateContent")
-    body = {
-        "contents": [{
-            "role": "user",
-            "parts": [
-                {"text": prompt},
-                {"inline_data": {"mime_type": mime_type, "data": image_b64}},
-            ],
-        }],
-        "generationConfig": {"temperature": 0.2, "maxOutputTokens": 2048},
-    }
-    async with httpx.AsyncClient(timeout=90) as client:
-        resp = await client.post(url, params={"key": key},
-                                 headers={"Content-Type": "application/json"},
-                                 json=body)
-    if resp.status_code == 429:
-        raise HTTPException(status_code=429,
-                            detail="Gemini quota exceeded. Please wait a moment and try again.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=422,
-                            detail=f"Gemini API error {resp.status_code}: {resp.text[:300]}")
-    data = resp.json()
-    try:
-        parts = data["candidates"][0]["content"]["parts"]
-        return "".join(p.get("text", "") for p in parts if isinstance(p, dict))
-    except (KeyError, IndexError, TypeError):
-        raise HTTPException(status_code=422, detail="Gemini returned an empty response.")
+    return await llm_gateway.generate(
+        "ocr", prompt, images=[(image_b64, mime_type)], temperature=0.2,
+        provider="gemini", fallback=False, timeout=90,
+    )
 
 
 async def _gemini_vision_multipage(page_images_b64: List[Tuple[str, str]],
                                    prompt: str) -> str:
-    import httpx
-    key = _gemini_key()
-    if not key:
-        raise HTTPException(status_code=500,
-                            detail="GEMINI_API_KEY is not configured on the server.")
-    url = (f"https://generativelanguage.googleapis.com/v1beta/"
-           f"models/{_gemini_model()}:generateContent")
-    parts: list = [{"text": prompt}]
-    for img_b64, mime in page_images_b64:
-        parts.append({"inline_data": {"mime_type": mime, "data": img_b64}})
-    body = {
-        "contents": [{"role": "user", "parts": parts}],
-        "generationConfig": {"temperature": 0.2, "maxOutputTokens": 2048},
-    }
-    async with httpx.AsyncClient(timeout=120) as client:
-        resp = await client.post(url, params={"key": key},
-                                 headers={"Content-Type": "application/json"},
-                                 json=body)
-    if resp.status_code == 429:
-        raise HTTPException(status_code=429,
-                            detail="Gemini quota exceeded. Please wait a moment and try again.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=422,
-                            detail=f"Gemini API error {resp.status_code}: {resp.text[:300]}")
-    data = resp.json()
-    try:
-        rparts = data["candidates"][0]["content"]["parts"]
-        return "".join(p.get("text", "") for p in rparts if isinstance(p, dict))
-    except (KeyError, IndexError, TypeError):
-        raise HTTPException(status_code=422, detail="Gemini returned an empty response.")
+    return await llm_gateway.generate(
+        "ocr", prompt, images=page_images_b64, temperature=0.2,
+        provider="gemini", fallback=False, timeout=120,
+    )
 
 
 # ─── Public provider-agnostic API ─────────────────────────────────────────────
 # Status codes on which we fall back from Gemini to Groq (transient / provider-side failures).
-_FALLBACK_STATUS = {400, 402, 408, 413, 422, 429, 500, 502, 503, 504}
+_FALLBACK_STATUS = llm_gateway.FALLBACK_STATUS
 
 
 def _should_fallback(err: Exception) -> bool:
@@ -8,7 +8,9 @@ from typing import Callable, Any, Optional, List, Dict
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from backend.dependencies import db
+from backend.dependencies import db, require_admin
+from backend.models import User
+from backend import doc_extraction
 from backend.ai.fingerprint import generate_document_fingerprint
 from backend.ai.ai_memory import save_ai_memory, find_memory_by_fingerprint, update_ai_memory
 
@@ -119,7 +121,7 @@ async def process_ocr(contents: bytes, filename: str, document_id: str = None) -
     except Exception as exc:
         logger.error(f"process_ocr pipeline failed: {exc}", exc_info=True)
         # Fallback to basic text content extraction if everything fails
-        return get_document_text_content(contents, filename)
+        return await get_document_text_content(contents, filename)
 
 
 async def _orchestrate_gst(result: dict, current_user: Any, document_id: str) -> dict:
@@ -510,38 +512,27 @@ async def process_document(
     result = await _orchestrate_learning_and_recommendations(result, current_user, document_id)
     return result
 
-def get_document_text_content(contents: bytes, filename: str) -> str:
-    import io
+async def get_document_text_content(contents: bytes, filename: str) -> str:
     ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
     text_content = ""
     try:
         if ext in ("xlsx", "xlsm"):
-            import openpyxl
-            wb = openpyxl.load_workbook(io.BytesIO(contents), read_only=True, data_only=True)
             lines = []
-            for sheet_name in wb.sheetnames:
-                ws = wb[sheet_name]
+            for sheet_name, rows in (await doc_extraction.extract("workbook_rows", contents)).items():
                 lines.append(f"\n--- Sheet: {sheet_name} ---")
-                for row in ws.iter_rows(values_only=True):
+                for row in rows:
                     row_text = "\t".join("" if v is None else str(v) for v in row)
                     if row_text.strip():
                         lines.append(row_text)
             text_content = "\n".join(lines)
         elif ext == "xls":
-            import pandas as pd
-            df = pd.read_excel(io.BytesIO(contents), engine="xlrd")
-            text_content = df.to_string(index=False)
+            text_content = await doc_extraction.extract("sheet_text", contents, engine="xlrd")
         elif ext == "csv":
             text_content = contents.decode("utf-8", errors="replace")
         elif ext == "pdf":
-            import pdfplumber
-            extracted_pages = []
-            with pdfplumber.open(io.BytesIO(contents)) as pdf:
-                for i, page in enumerate(pdf.pages[:30]):
-                    text = page.extract_text()
-                    if text and text.strip():
-                        extracted_pages.append(f"--- Page {i+1} ---\n{text.strip()}")
-            text_content = "\n\n".join(extracted_pages)
+            pages = await doc_extraction.extract("pdf_text", contents, max_pages=30)
+            text_content = "\n\n".join(f"--- Page {i+1} ---\n{text.strip()}"
+                                         for i, text in enumerate(pages) if text.strip())
     except Exception:
         pass
     return text_content
@@ -700,6 +691,28 @@ async def ai_get_workflow_kpis(company_id: str):
     return await KPIEngine.list_kpi_trend(company_id=company_id)
 
 
+@router.get("/workflow/events/metrics")
+async def ai_get_event_bus_metrics(current_user: User = Depends(require_admin())):
+    """Business event outbox depth, publish rate, dispatch lag and listener latency."""
+    from backend.workflow.event_bus import EventBus
+    return await EventBus.get_metrics()
+
+
+@router.get("/llm/metrics")
+async def ai_get_llm_gateway_metrics(current_user: User = Depends(require_admin())):
+    """LLM gateway per-feature requests, cache hits, coalescing, latency, tokens and estimated cost."""
+    from backend.ai import llm_gateway
+    return llm_gateway.get_metrics()
+
+
+@router.post("/workflow/events/redrive")
+async def ai_redrive_dead_events(company_id: Optional[str] = None, current_user: User = Depends(require_admin())):
+    """Re-queues dead-lettered business events for another round of delivery."""
+    from backend.workflow.event_bus import EventBus
+    count = await EventBus.redrive_dead_letters(company_id=company_id)
+    return {"requeued": count}
+
+
 # ── Phase 12 AI-Driven Copilot Bridge Endpoint ─────────────────────────────────
 
 class CopilotQueryRequest(BaseModel):
@@ -1,16 +1,18 @@
+import base64
 import hashlib
+import os
 import time
 import logging
 import uuid
 import re
-import io
 import json
 from datetime import datetime, timezone
 from typing import Any
 
 from backend.dependencies import db
 from backend.ai.fingerprint import generate_document_fingerprint
-from backend.services.gemini_client import get_gemini_client
+from backend.ai import llm_gateway
+from backend import doc_extraction
 
 logger = logging.getLogger("document_classifier")
 
@@ -96,9 +98,7 @@ async def classify_document(
     page_count = 1
     if ext == "pdf":
         try:
-            import pdfplumber
-            with pdfplumber.open(io.BytesIO(contents)) as pdf:
-                page_count = len(pdf.pages)
+            page_count = await doc_extraction.extract("pdf_page_count", contents)
         except Exception:
             pass
 
@@ -319,7 +319,6 @@ async def classify_document(
         # ── LAYER 4: Gemini Classification ──
         if layer_used == 5:
             logger.info("Gemini Classification")
-            client = get_gemini_client()
             model_name = os.environ.get("GEMINI_CLASSIFIER_MODEL", "gemini-3.5-flash")
 
             prompt = f"""
@@ -348,30 +347,22 @@ Your output must be strict JSON in the following format:
   "reason": "explanation of your choice"
 }}
 """
-            from google.genai import types as genai_types
-            
-            def _call_gemini():
-                contents = [prompt]
-                # If there's no OCR text and this is an image, we can try sending it as image part
-                if not raw_ocr_text.strip() and ext in ("jpg", "jpeg", "png", "webp"):
-                    contents = [
-                        genai_types.Part.from_bytes(data=contents, mime_type=f"image/{ext if ext != 'jpg' else 'jpeg'}"),
-                        prompt
-                    ]
-                cfg = genai_types.GenerateContentConfig(
-                    temperature=0,
-                    max_output_tokens=500,
-                    response_mime_type="application/json",
-                )
-                return client.models.generate_content(
-                    model=model_name,
-                    contents=contents,
-                    config=cfg,
-                )
-
-            import asyncio
-            response = await asyncio.to_thread(_call_gemini)
-            raw_text = getattr(response, "text", "")
+
+            # With no OCR text, let the model look at the image itself
+            images = []
+            if not raw_ocr_text.strip() and ext in ("jpg", "jpeg", "png", "webp"):
+                mime = f"image/{ext if ext != 'jpg' else 'jpeg'}"
+                images = [(base64.b64encode(contents).decode(), mime)]
+
+            raw_text = await llm_gateway.generate(
+                "document_classifier",
+                prompt,
+                images=images,
+                json_mode=True,
+                max_tokens=500,
+                provider="gemini",
+                models={"gemini": model_name},
+            )
             
             if raw_text:
                 res = json.loads(_strip_json_fence(raw_text))
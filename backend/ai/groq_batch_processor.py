@@ -26,8 +26,7 @@ import logging
 import time
 from typing import Callable, List, Optional, Tuple
 
-import httpx
-from fastapi import HTTPException
+from backend.ai import llm_gateway
 
 logger = logging.getLogger("groq_batch_processor")
 
@@ -59,46 +58,13 @@ def _groq_model() -> str:
     )
 
 
-def _groq_key() -> str:
-    key = os.environ.get("GROQ_API_KEY", "")
-    if not key:
-        raise HTTPException(
-            status_code=500,
-            detail="GROQ_API_KEY is not configured on the server.",
-        )
-    return key
-
-
-# ─── Low-level Groq HTTP calls ────────────────────────────────────────────────
+# ─── Low-level Groq calls (through the LLM gateway) ──────────────────────────
 async def groq_vision_single(image_b64: str, mime_type: str, prompt: str) -> str:
     """OCR one image via Groq (no retry, no batching)."""
-    key = _groq_key()
-    payload = {
-        "model": _groq_model(),
-        "messages": [{
-            "role": "user",
-            "content": [
-                {"type": "image_url",
-                 "image_url": {"url": f"data:{mime_type};base64,{image_b64}"}},
-                {"type": "text", "text": prompt},
-            ],
-        }],
-        "max_tokens": 2048,
-    }
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {key}",
-                     "Content-Type": "application/json"},
-            json=payload,
-        )
-    if resp.status_code == 429:
-        raise HTTPException(status_code=429,
-                            detail="Groq quota exceeded. Please wait a moment and try again.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=422,
-                            detail=f"Groq API error {resp.status_code}: {resp.text[:300]}")
-    return resp.json()["choices"][0]["message"]["content"]
+    return await llm_gateway.generate(
+        "ocr", prompt, images=[(image_b64, mime_type)], temperature=0.2,
+        provider="groq", models={"groq": _groq_model()}, fallback=False, timeout=60,
+    )
 
 
 async def groq_vision_multipage(page_images_b64: List[Tuple[str, str]], prompt: str) -> str:
@@ -110,32 +76,10 @@ async def groq_vision_multipage(page_images_b64: List[Tuple[str, str]], prompt:
             f"groq_vision_multipage received {len(page_images_b64)} images; "
             f"Groq accepts at most {_GROQ_HARD_CAP}. Use groq_batched_ocr()."
         )
-    key = _groq_key()
-    content: list = []
-    for img_b64, mime in page_images_b64:
-        content.append({"type": "image_url",
-                        "image_url": {"url": f"data:{mime};base64,{img_b64}"}})
-    content.append({"type": "text", "text": prompt})
-
-    payload = {
-        "model": _groq_model(),
-        "messages": [{"role": "user", "content": content}],
-        "max_tokens": 2048,
-    }
-    async with httpx.AsyncClient(timeout=90) as client:
-        resp = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {key}",
-                     "Content-Type": "application/json"},
-            json=payload,
-        )
-    if resp.status_code == 429:
-        raise HTTPException(status_code=429,
-                            detail="Groq quota exceeded. Please wait a moment and try again.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=422,
-                            detail=f"Groq API error {resp.status_code}: {resp.text[:300]}")
-    return resp.json()["choices"][0]["message"]["content"]
+    return await llm_gateway.generate(
+        "ocr", prompt, images=list(page_images_b64), temperature=0.2,
+        provider="groq", models={"groq": _groq_model()}, fallback=False, timeout=90,
+    )
 
 
 # ─── Batch orchestration ──────────────────────────────────────────────────────
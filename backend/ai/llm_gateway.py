@@ -0,0 +1,746 @@
+"""
+LLM Gateway
+===========
+
+Every Gemini / Groq generation call in the backend goes through `generate()`.
+Before this module each call site (OCR, document classification, lead and
+intent detection, zero-touch entry, duplicate-task detection, the Telegram
+parser) built its own client, its own error mapping and its own fallback,
+and nothing was shared: the same receipt OCR'd twice paid twice, ten
+identical Telegram commands made ten calls, and there was no view of what
+any of it cost.
+
+What the gateway adds on top of the raw REST call:
+
+  cache        Responses keyed on the normalised prompt (line endings,
+               trailing / repeated whitespace), system text, image hashes,
+               model and generation parameters. In-process LRU with TTL
+               (LLM_CACHE_TTL seconds, default 3600; LLM_CACHE_MAX_ENTRIES,
+               default 2000). Pass cache_ttl=0 to bypass for one call.
+  coalescing   A request identical to one already in flight awaits that
+               call's result instead of issuing its own.
+  budgets      Per-provider concurrency (LLM_<PROVIDER>_CONCURRENCY) and a
+               requests-per-minute token bucket (LLM_<PROVIDER>_RPM, 0 =
+               unlimited). A call that would wait longer than
+               LLM_BUDGET_MAX_WAIT seconds fails fast with 429, which in
+               turn triggers fallback.
+  fallback     On a provider-side failure (FALLBACK_STATUS, timeouts,
+               transport errors) the request is retried once on the other
+               provider if it is configured and can accept the request
+               (Groq takes at most 3 images).
+  metrics      Per-feature calls, cache hits, coalesced waits, fallbacks,
+               errors, latency percentiles, tokens and estimated cost
+               (`get_metrics()`, GET /api/ai/llm/metrics). Counters are per
+               worker process.
+
+Errors are raised as `LLMError` (an HTTPException) with the same status
+conventions the call sites already used: 500 missing key, 429 quota or
+budget, 422 upstream error / empty response, 502 transport, 504 timeout.
+`upstream_status` carries the provider's own HTTP status when there is one.
+
+`stream()` is the token-streaming variant for text prompts. It shares the
+budgets, fallback and metrics but not the cache: a stream falls back only
+if the first provider fails before producing any text.
+
+Public API:
+    await generate(feature, prompt, *, images=None, system=None, json_mode=False,
+                   temperature=0.0, max_tokens=2048, provider=None, models=None,
+                   fallback=True, timeout=60, cache_ttl=None) -> str
+    stream(feature, prompt, *, system=None, temperature=0.0, max_tokens=2048,
+           provider=None, models=None, fallback=True, timeout=60) -> LLMStream
+    default_provider() -> "gemini" | "groq"
+    configured(provider) -> bool
+    get_metrics() -> dict
+    clear_cache()
+    await aclose()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+logger = logging.getLogger("llm_gateway")
+
+PROVIDERS = ("gemini", "groq")
+
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent"
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+GROQ_MAX_IMAGES = 3
+
+# Status codes treated as provider-side failures worth retrying elsewhere.
+FALLBACK_STATUS = {400, 402, 408, 413, 422, 429, 500, 502, 503, 504}
+
+_LATENCY_SAMPLES = 500
+
+# USD per 1M tokens (input, output), matched on the longest model-name prefix.
+# LLM_PRICES_JSON='{"model-prefix": [in, out]}' overrides or extends it.
+_DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini": (0.30, 2.50),
+    "llama-3.3-70b": (0.59, 0.79),
+    "llama-3.1-8b": (0.05, 0.08),
+    "meta-llama/llama-4-maverick": (0.20, 0.60),
+    "meta-llama/llama-4-scout": (0.11, 0.34),
+}
+
+
+class LLMError(HTTPException):
+    def __init__(self, status_code: int, detail: str,
+                 provider: Optional[str] = None,
+                 upstream_status: Optional[int] = None):
+        super().__init__(status_code=status_code, detail=detail)
+        self.provider = provider
+        self.upstream_status = upstream_status
+
+
+# ─── Configuration ────────────────────────────────────────────────────────────
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _key(provider: str) -> str:
+    if provider == "gemini":
+        return (os.environ.get("GEMINI_API_KEY")
+                or os.environ.get("GOOGLE_API_KEY")
+                or os.environ.get("GOOGLE_AI_STUDIO_API_KEY")
+                or "").strip()
+    return (os.environ.get("GROQ_API_KEY") or "").strip()
+
+
+def configured(provider: str) -> bool:
+    return bool(_key(provider))
+
+
+def default_provider() -> str:
+    """AI_PROVIDER if set, else Gemini when a Gemini key exists, else Groq."""
+    p = (os.environ.get("AI_PROVIDER") or "").strip().lower()
+    if p in ("gemini", "google", "google-ai"):
+        return "gemini"
+    if p == "groq":
+        return "groq"
+    if os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY"):
+        return "gemini"
+    return "groq"
+
+
+def _default_model(provider: str, vision: bool) -> str:
+    if provider == "gemini":
+        if vision:
+            return (os.environ.get("GEMINI_VISION_MODEL") or "gemini-2.5-flash").strip()
+        return (os.environ.get("GEMINI_TEXT_MODEL") or os.environ.get("GEMINI_MODEL")
+                or "gemini-2.5-flash").strip()
+    if vision:
+        return (os.environ.get("GROQ_VISION_MODEL")
+                or "meta-llama/llama-4-maverick-17b-128e-instruct").strip()
+    return (os.environ.get("GROQ_TEXT_MODEL") or os.environ.get("GROQ_MODEL")
+            or "llama-3.3-70b-versatile").strip()
+
+
+def _prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(_DEFAULT_PRICES)
+    raw = os.environ.get("LLM_PRICES_JSON")
+    if raw:
+        try:
+            prices.update({k: (float(v[0]), float(v[1])) for k, v in json.loads(raw).items()})
+        except (ValueError, TypeError, IndexError, AttributeError):
+            logger.warning("LLM_PRICES_JSON is not valid; using built-in prices")
+    return prices
+
+
+def _cost(model: str, tokens_in: int, tokens_out: int) -> float:
+    prices = _prices()
+    best = ""
+    for prefix in prices:
+        if model.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    if not best:
+        return 0.0
+    p_in, p_out = prices[best]
+    return (tokens_in * p_in + tokens_out * p_out) / 1_000_000
+
+
+# ─── Shared HTTP client ───────────────────────────────────────────────────────
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http() -> httpx.AsyncClient:
+    """One pooled client per event loop (scripts may run several loops)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+# ─── Budgets ──────────────────────────────────────────────────────────────────
+class _Budget:
+    """Concurrency cap plus requests-per-minute token bucket for one provider."""
+
+    def __init__(self, provider: str):
+        name = provider.upper()
+        self.provider = provider
+        self.concurrency = max(1, _env_int(f"LLM_{name}_CONCURRENCY", 8 if provider == "gemini" else 4))
+        self.rpm = max(0, _env_int(f"LLM_{name}_RPM", 0))
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.tokens = float(self.rpm)
+        self.updated = time.monotonic()
+        self.waiting = 0
+
+    async def take(self, max_wait: float):
+        if not self.rpm:
+            return
+        deadline = time.monotonic() + max_wait
+        while True:
+            now = time.monotonic()
+            self.tokens = min(float(self.rpm), self.tokens + (now - self.updated) * self.rpm / 60.0)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) * 60.0 / self.rpm
+            if now + wait > deadline:
+                raise LLMError(429, f"{self.provider.title()} request budget exhausted "
+                                    f"({self.rpm}/min). Please try again shortly.",
+                               provider=self.provider)
+            await asyncio.sleep(wait)
+
+
+_budgets: Dict[Tuple[str, int], _Budget] = {}
+
+
+def _budget(provider: str) -> _Budget:
+    key = (provider, id(asyncio.get_running_loop()))
+    budget = _budgets.get(key)
+    if budget is None:
+        budget = _budgets[key] = _Budget(provider)
+    return budget
+
+
+# ─── Cache and coalescing ─────────────────────────────────────────────────────
+_cache: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()  # key -> (expires, text, cost)
+_inflight: Dict[str, "asyncio.Task"] = {}
+
+_WS_RE = re.compile(r"[ \t]+")
+
+
+def _normalize(text: Optional[str]) -> str:
+    lines = (text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(_WS_RE.sub(" ", line).strip() for line in lines).strip()
+
+
+def _cache_key(prompt, system, images, json_mode, temperature, max_tokens, provider, model) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps([provider, model, bool(json_mode), round(float(temperature), 3),
+                         int(max_tokens), _normalize(system), _normalize(prompt)]).encode())
+    for data, mime in images:
+        h.update(mime.encode())
+        h.update(hashlib.sha256(data.encode()).digest())
+    return h.hexdigest()
+
+
+def _cache_get(key: str) -> Optional[Tuple[str, float]]:
+    hit = _cache.get(key)
+    if hit is None:
+        return None
+    expires, text, cost = hit
+    if expires < time.monotonic():
+        _cache.pop(key, None)
+        return None
+    _cache.move_to_end(key)
+    return text, cost
+
+
+def _cache_put(key: str, text: str, cost: float, ttl: float):
+    _cache[key] = (time.monotonic() + ttl, text, cost)
+    _cache.move_to_end(key)
+    limit = max(1, _env_int("LLM_CACHE_MAX_ENTRIES", 2000))
+    while len(_cache) > limit:
+        _cache.popitem(last=False)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+_metrics: Dict[str, Dict[str, Any]] = {}
+
+
+def _feature(feature: str) -> Dict[str, Any]:
+    m = _metrics.get(feature)
+    if m is None:
+        m = _metrics[feature] = {
+            "requests": 0, "cache_hits": 0, "coalesced": 0, "fallbacks": 0, "errors": 0,
+            "provider_calls": {}, "provider_errors": {},
+            "tokens_in": 0, "tokens_out": 0, "cost_usd": 0.0, "saved_cost_usd": 0.0,
+            "latency_ms": deque(maxlen=_LATENCY_SAMPLES),
+        }
+    return m
+
+
+def _bump(d: Dict[str, int], key: str):
+    d[key] = d.get(key, 0) + 1
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+def get_metrics() -> Dict[str, Any]:
+    features = {}
+    totals = {"requests": 0, "cache_hits": 0, "coalesced": 0, "errors": 0,
+              "tokens_in": 0, "tokens_out": 0, "cost_usd": 0.0, "saved_cost_usd": 0.0}
+    for name, m in sorted(_metrics.items()):
+        latencies = list(m["latency_ms"])
+        row = {k: v for k, v in m.items() if k != "latency_ms"}
+        row["cost_usd"] = round(m["cost_usd"], 6)
+        row["saved_cost_usd"] = round(m["saved_cost_usd"], 6)
+        row["cache_hit_rate"] = round(m["cache_hits"] / m["requests"], 4) if m["requests"] else 0.0
+        row["latency_ms"] = {"p50": _percentile(latencies, 0.5),
+                             "p95": _percentile(latencies, 0.95),
+                             "max": round(max(latencies), 1) if latencies else None}
+        features[name] = row
+        for k in totals:
+            totals[k] += m[k]
+    totals["cost_usd"] = round(totals["cost_usd"], 6)
+    totals["saved_cost_usd"] = round(totals["saved_cost_usd"], 6)
+    budgets = {}
+    for (provider, _), b in _budgets.items():
+        budgets[provider] = {"concurrency": b.concurrency,
+                             "in_flight": b.concurrency - b.semaphore._value,
+                             "rpm": b.rpm or None}
+    return {"features": features, "totals": totals, "budgets": budgets,
+            "cache_entries": len(_cache), "in_flight_keys": len(_inflight)}
+
+
+# ─── Provider transports ──────────────────────────────────────────────────────
+def _raise_for_response(provider: str, resp: httpx.Response):
+    name = provider.title()
+    if resp.status_code == 429:
+        raise LLMError(429, f"{name} quota exceeded. Please wait a moment and try again.",
+                       provider=provider, upstream_status=429)
+    if resp.status_code != 200:
+        raise LLMError(422, f"{name} API error {resp.status_code}: {resp.text[:300]}",
+                       provider=provider, upstream_status=resp.status_code)
+
+
+async def _post(provider: str, url: str, timeout: float, **kwargs) -> httpx.Response:
+    try:
+        return await _http().post(url, timeout=timeout, **kwargs)
+    except httpx.TimeoutException as e:
+        raise LLMError(504, f"{provider.title()} API timed out: {e!r}", provider=provider) from e
+    except httpx.HTTPError as e:
+        raise LLMError(502, f"{provider.title()} connection error: {e!r}", provider=provider) from e
+
+
+async def _call_gemini(model, prompt, system, images, json_mode, temperature, max_tokens,
+                       timeout) -> Tuple[str, int, int]:
+    parts: List[dict] = [{"text": prompt}]
+    for data, mime in images:
+        parts.append({"inline_data": {"mime_type": mime, "data": data}})
+    config: Dict[str, Any] = {"temperature": temperature, "maxOutputTokens": max_tokens}
+    if json_mode:
+        config["responseMimeType"] = "application/json"
+    body: Dict[str, Any] = {"contents": [{"role": "user", "parts": parts}], "generationConfig": config}
+    if system:
+        body["systemInstruction"] = {"parts": [{"text": system}]}
+
+    resp = await _post("gemini", GEMINI_URL.format(model=model), timeout,
+                       params={"key": _key("gemini")},
+                       headers={"Content-Type": "application/json"}, json=body)
+    _raise_for_response("gemini", resp)
+    try:
+        data = resp.json()
+        rparts = data["candidates"][0]["content"]["parts"]
+        text = "".join(p.get("text", "") for p in rparts if isinstance(p, dict))
+    except (ValueError, KeyError, IndexError, TypeError):
+        text = ""
+    if not text:
+        raise LLMError(422, "Gemini returned an empty response.", provider="gemini")
+    usage = data.get("usageMetadata") or {}
+    tokens_out = int(usage.get("candidatesTokenCount") or 0) + int(usage.get("thoughtsTokenCount") or 0)
+    return text, int(usage.get("promptTokenCount") or 0), tokens_out
+
+
+async def _call_groq(model, prompt, system, images, json_mode, temperature, max_tokens,
+                     timeout) -> Tuple[str, int, int]:
+    if images:
+        content: Any = [{"type": "image_url", "image_url": {"url": f"data:{mime};base64,{data}"}}
+                        for data, mime in images]
+        content.append({"type": "text", "text": prompt})
+    else:
+        content = prompt
+    messages = [{"role": "user", "content": content}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    payload: Dict[str, Any] = {"model": model, "messages": messages,
+                               "temperature": temperature, "max_tokens": max_tokens}
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+
+    resp = await _post("groq", GROQ_URL, timeout,
+                       headers={"Authorization": f"Bearer {_key('groq')}",
+                                "Content-Type": "application/json"},
+                       json=payload)
+    _raise_for_response("groq", resp)
+    try:
+        data = resp.json()
+        text = data["choices"][0]["message"]["content"] or ""
+    except (ValueError, KeyError, IndexError, TypeError):
+        text = ""
+    if not text:
+        raise LLMError(422, "Groq returned an empty response.", provider="groq")
+    usage = data.get("usage") or {}
+    return text, int(usage.get("prompt_tokens") or 0), int(usage.get("completion_tokens") or 0)
+
+
+_TRANSPORTS = {"gemini": _call_gemini, "groq": _call_groq}
+
+
+async def _call_provider(feature: str, provider: str, model: str, request: dict) -> Tuple[str, float]:
+    m = _feature(feature)
+    if not configured(provider):
+        _bump(m["provider_errors"], provider)
+        raise LLMError(500, f"{provider.title()} API key is not configured on the server.",
+                       provider=provider)
+    budget = _budget(provider)
+    _bump(m["provider_calls"], provider)
+    t0 = time.perf_counter()
+    try:
+        async with budget.semaphore:
+            await budget.take(_env_float("LLM_BUDGET_MAX_WAIT", 30.0))
+            text, tokens_in, tokens_out = await _TRANSPORTS[provider](model, **request)
+    except Exception:
+        _bump(m["provider_errors"], provider)
+        raise
+    cost = _cost(model, tokens_in, tokens_out)
+    m["latency_ms"].append((time.perf_counter() - t0) * 1000)
+    m["tokens_in"] += tokens_in
+    m["tokens_out"] += tokens_out
+    m["cost_usd"] += cost
+    return text, cost
+
+
+def _should_fallback(err: Exception) -> bool:
+    if isinstance(err, HTTPException):
+        return err.status_code in FALLBACK_STATUS
+    return not isinstance(err, asyncio.CancelledError)
+
+
+async def _run(feature, order, models, request, cache_key, cache_ttl) -> str:
+    first_error: Optional[Exception] = None
+    for i, provider in enumerate(order):
+        model = models.get(provider) or _default_model(provider, bool(request["images"]))
+        try:
+            text, cost = await _call_provider(feature, provider, model, request)
+        except Exception as e:
+            if first_error is None:
+                first_error = e
+            if i + 1 < len(order) and _should_fallback(e):
+                logger.warning(f"[llm_gateway] {feature}: {provider} failed ({e!r}), "
+                               f"falling back to {order[i + 1]}.")
+                _feature(feature)["fallbacks"] += 1
+                continue
+            if i:
+                logger.warning(f"[llm_gateway] {feature}: fallback {provider} failed too ({e!r}).")
+            raise first_error
+        if cache_key and cache_ttl > 0:
+            _cache_put(cache_key, text, cost, cache_ttl)
+        return text
+    raise first_error or LLMError(500, "No LLM provider available.")
+
+
+async def generate(
+    feature: str,
+    prompt: str,
+    *,
+    images: Optional[Sequence[Tuple[str, str]]] = None,
+    system: Optional[str] = None,
+    json_mode: bool = False,
+    temperature: float = 0.0,
+    max_tokens: int = 2048,
+    provider: Optional[str] = None,
+    models: Optional[Dict[str, str]] = None,
+    fallback: bool = True,
+    timeout: float = 60,
+    cache_ttl: Optional[float] = None,
+) -> str:
+    """
+    Generate text for `feature` (the metrics bucket, e.g. "ocr").
+
+    images    [(base64, mime_type), ...] for vision calls
+    provider  primary provider; defaults to `default_provider()`
+    models    {"gemini": ..., "groq": ...} overrides per provider; missing
+              entries use the provider's text or vision default model
+    cache_ttl seconds; None = LLM_CACHE_TTL, 0 = neither read nor write
+              the cache and do not coalesce
+    """
+    images = list(images or [])
+    primary = provider or default_provider()
+    order = [primary]
+    other = "groq" if primary == "gemini" else "gemini"
+    if fallback and configured(other) and not (other == "groq" and len(images) > GROQ_MAX_IMAGES):
+        order.append(other)
+    models = models or {}
+
+    m = _feature(feature)
+    m["requests"] += 1
+
+    ttl = _env_float("LLM_CACHE_TTL", 3600.0) if cache_ttl is None else float(cache_ttl)
+    request = {"prompt": prompt, "system": system, "images": images, "json_mode": json_mode,
+               "temperature": temperature, "max_tokens": max_tokens, "timeout": timeout}
+    key = None
+    if ttl > 0:
+        model = models.get(primary) or _default_model(primary, bool(images))
+        key = _cache_key(prompt, system, images, json_mode, temperature, max_tokens, primary, model)
+        hit = _cache_get(key)
+        if hit is not None:
+            m["cache_hits"] += 1
+            m["saved_cost_usd"] += hit[1]
+            return hit[0]
+
+    try:
+        if key is None:
+            return await _run(feature, order, models, request, None, 0)
+        task = _inflight.get(key)
+        if task is not None:
+            m["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(_run(feature, order, models, request, key, ttl))
+            _inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: _inflight.pop(k, None))
+        # Shielded so one caller going away does not cancel the shared call.
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        m["errors"] += 1
+        raise
+
+
+# ─── Streaming ────────────────────────────────────────────────────────────────
+async def _sse_data(resp: httpx.Response):
+    """Yield the decoded JSON payload of each `data:` line of an SSE body."""
+    async for line in resp.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        raw = line[5:].strip()
+        if not raw or raw == "[DONE]":
+            continue
+        try:
+            yield json.loads(raw)
+        except ValueError:
+            continue
+
+
+async def _stream_gemini(model, prompt, system, temperature, max_tokens, timeout, usage):
+    body: Dict[str, Any] = {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {"temperature": temperature, "maxOutputTokens": max_tokens},
+    }
+    if system:
+        body["systemInstruction"] = {"parts": [{"text": system}]}
+    async with _http().stream("POST", GEMINI_STREAM_URL.format(model=model), timeout=timeout,
+                              params={"key": _key("gemini"), "alt": "sse"},
+                              headers={"Content-Type": "application/json"}, json=body) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            _raise_for_response("gemini", resp)
+        async for data in _sse_data(resp):
+            meta = data.get("usageMetadata") or {}
+            if meta:
+                usage[0] = int(meta.get("promptTokenCount") or 0)
+                usage[1] = (int(meta.get("candidatesTokenCount") or 0)
+                            + int(meta.get("thoughtsTokenCount") or 0))
+            try:
+                parts = data["candidates"][0]["content"]["parts"]
+            except (KeyError, IndexError, TypeError):
+                continue
+            text = "".join(p.get("text", "") for p in parts if isinstance(p, dict))
+            if text:
+                yield text
+
+
+async def _stream_groq(model, prompt, system, temperature, max_tokens, timeout, usage):
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    payload = {"model": model, "messages": messages, "temperature": temperature,
+               "max_tokens": max_tokens, "stream": True}
+    async with _http().stream("POST", GROQ_URL, timeout=timeout,
+                              headers={"Authorization": f"Bearer {_key('groq')}",
+                                       "Content-Type": "application/json"},
+                              json=payload) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            _raise_for_response("groq", resp)
+        async for data in _sse_data(resp):
+            # Groq reports usage on the last chunk, under x_groq.
+            meta = data.get("usage") or (data.get("x_groq") or {}).get("usage") or {}
+            if meta:
+                usage[0] = int(meta.get("prompt_tokens") or 0)
+                usage[1] = int(meta.get("completion_tokens") or 0)
+            try:
+                text = data["choices"][0]["delta"].get("content") or ""
+            except (KeyError, IndexError, TypeError, AttributeError):
+                continue
+            if text:
+                yield text
+
+
+_STREAM_TRANSPORTS = {"gemini": _stream_gemini, "groq": _stream_groq}
+
+
+class LLMStream:
+    """
+    Async iterator over the text chunks of one streamed generation.
+
+    `provider` and `model` name whoever is answering once the first chunk
+    has arrived; `text` accumulates everything yielded so far.
+    """
+
+    def __init__(self, feature: str, order: List[str], models: Dict[str, str], request: dict):
+        self.feature = feature
+        self.provider: Optional[str] = None
+        self.model: Optional[str] = None
+        self.text = ""
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self._order = order
+        self._models = models
+        self._request = request
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        m = _feature(self.feature)
+        first_error: Optional[Exception] = None
+        for i, provider in enumerate(self._order):
+            model = self._models.get(provider) or _default_model(provider, False)
+            try:
+                async for chunk in self._attempt(m, provider, model):
+                    yield chunk
+            except Exception as e:
+                if first_error is None:
+                    first_error = e
+                if not self.text and i + 1 < len(self._order) and _should_fallback(e):
+                    logger.warning(f"[llm_gateway] {self.feature}: {provider} stream failed ({e!r}), "
+                                   f"falling back to {self._order[i + 1]}.")
+                    m["fallbacks"] += 1
+                    continue
+                m["errors"] += 1
+                raise e if self.text else first_error
+            if not self.text:
+                m["errors"] += 1
+                raise LLMError(422, f"{provider.title()} returned an empty response.", provider=provider)
+            return
+
+    async def _attempt(self, m, provider: str, model: str):
+        if not configured(provider):
+            _bump(m["provider_errors"], provider)
+            raise LLMError(500, f"{provider.title()} API key is not configured on the server.",
+                           provider=provider)
+        budget = _budget(provider)
+        _bump(m["provider_calls"], provider)
+        usage = [0, 0]
+        t0 = time.perf_counter()
+        try:
+            async with budget.semaphore:
+                await budget.take(_env_float("LLM_BUDGET_MAX_WAIT", 30.0))
+                async for chunk in _STREAM_TRANSPORTS[provider](model, usage=usage, **self._request):
+                    self.provider, self.model = provider, model
+                    self.text += chunk
+                    yield chunk
+        except httpx.TimeoutException as e:
+            _bump(m["provider_errors"], provider)
+            raise LLMError(504, f"{provider.title()} API timed out: {e!r}", provider=provider) from e
+        except httpx.HTTPError as e:
+            _bump(m["provider_errors"], provider)
+            raise LLMError(502, f"{provider.title()} connection error: {e!r}", provider=provider) from e
+        except Exception:
+            _bump(m["provider_errors"], provider)
+            raise
+        finally:
+            # Partial streams (client gone, upstream cut off) are billed too.
+            tokens_in, tokens_out = usage
+            if not tokens_out and self.text and self.provider == provider:
+                tokens_out = len(self.text) // 4
+            self.tokens_in, self.tokens_out = tokens_in, tokens_out
+            m["latency_ms"].append((time.perf_counter() - t0) * 1000)
+            m["tokens_in"] += tokens_in
+            m["tokens_out"] += tokens_out
+            m["cost_usd"] += _cost(model, tokens_in, tokens_out)
+
+
+def stream(
+    feature: str,
+    prompt: str,
+    *,
+    system: Optional[str] = None,
+    temperature: float = 0.0,
+    max_tokens: int = 2048,
+    provider: Optional[str] = None,
+    models: Optional[Dict[str, str]] = None,
+    fallback: bool = True,
+    timeout: float = 60,
+) -> LLMStream:
+    """
+    Stream a text generation for `feature`:
+
+        s = stream("copilot", prompt, system=...)
+        async for chunk in s:
+            ...
+        s.text, s.provider, s.model
+
+    Errors are raised from the iteration as `LLMError`, same as `generate()`.
+    """
+    primary = provider or default_provider()
+    order = [primary]
+    other = "groq" if primary == "gemini" else "gemini"
+    if fallback and configured(other):
+        order.append(other)
+    _feature(feature)["requests"] += 1
+    request = {"prompt": prompt, "system": system, "temperature": temperature,
+               "max_tokens": max_tokens, "timeout": timeout}
+    return LLMStream(feature, order, dict(models or {}), request)
@@ -165,7 +165,7 @@ async def process_ocr_pipeline(
     if doc_format in ("Excel", "CSV", "Text"):
         logger.info(f"OCR Pipeline: Bypassing OCR for direct data format: {doc_format}")
         from backend.ai.ai_router import get_document_text_content
-        text_content = get_document_text_content(contents, filename)
+        text_content = await get_document_text_content(contents, filename)
         duration = time.time() - start_time
         meta = {
             "engine_used": "native_text_reader",
@@ -179,7 +179,7 @@ async def process_ocr_pipeline(
 
     # ── STEP 2: Detect Searchable PDF ──
     if doc_format == "PDF":
-        is_searchable, embedded_text = is_searchable_pdf(contents)
+        is_searchable, embedded_text = await is_searchable_pdf(contents)
         if is_searchable:
             logger.info("OCR Pipeline: Searchable PDF detected. Skipping heavy OCR and returning native text layer.")
             duration = time.time() - start_time
@@ -215,7 +215,7 @@ async def process_ocr_pipeline(
             _max_pages = int(_os.environ.get("OCR_MAX_PAGES", "0"))
         except ValueError:
             _max_pages = 0
-        pages = split_pdf_pages(contents, max_pages=_max_pages or 10_000)
+        pages = await split_pdf_pages(contents, max_pages=_max_pages or 10_000)
     else:
         pages = split_image_or_other(contents, filename)
     logger.info(f"OCR Pipeline: split into {len(pages)} page(s) for '{filename}'")
@@ -3,29 +3,24 @@ import logging
 from typing import List, Tuple, Union
 from PIL import Image
 
+from backend import doc_extraction
+
 logger = logging.getLogger("page_splitter")
 
-def split_pdf_pages(contents: bytes, max_pages: int = 10) -> List[Tuple[Image.Image, int]]:
+async def split_pdf_pages(contents: bytes, max_pages: int = 10) -> List[Tuple[Image.Image, int]]:
     """
     Splits PDF bytes into PIL Images for each page.
     Returns a list of tuples: (PIL Image, page_number)
     """
     pages_list = []
     try:
-        import pdfplumber
-        with pdfplumber.open(io.BytesIO(contents)) as pdf:
-            page_count = len(pdf.pages)
-            logger.info(f"Page splitter: PDF has {page_count} pages.")
-            
-            # Limit pages processed to avoid excessive consumption
-            for i in range(min(page_count, max_pages)):
-                page = pdf.pages[i]
-                # Render to high quality PIL Image (DPI ~150-200)
-                pil_img = page.to_image(resolution=150).original
-                if pil_img.mode not in ("RGB", "L"):
-                    pil_img = pil_img.convert("RGB")
-                pages_list.append((pil_img, i + 1))
-                
+        # Limit pages processed to avoid excessive consumption. Rendered
+        # (DPI 150) in the extraction pool and handed back as lossless PNG.
+        rendered = await doc_extraction.extract("pdf_images", contents, max_pages=max_pages,
+                                                image_format="PNG", timeout=300)
+        for i, png in enumerate(rendered):
+            pages_list.append((Image.open(io.BytesIO(png)), i + 1))
+
         logger.info(f"Successfully split PDF into {len(pages_list)} page images.")
     except Exception as e:
         logger.error(f"Failed to split PDF into pages: {e}", exc_info=True)
@@ -1,6 +1,7 @@
-import os, io, base64, asyncio, time, logging
+import os, base64, asyncio, time, logging
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from backend.dependencies import get_current_user
+from backend import doc_extraction
 
 router = APIRouter(prefix="/api/ai", tags=["AI Document Reader"])
 
@@ -13,6 +14,7 @@ _batch_logger = logging.getLogger("ai_document_reader.batching")
 # ═══════════════════════════════════════════════════════════════════════════
 
 from backend.ai.ai_provider import ocr_pages as _ai_ocr_pages  # noqa: E402
+from backend.ai import llm_gateway  # noqa: E402
 
 
 async def _groq_vision_batched_pages(
@@ -62,133 +64,33 @@ def _provider() -> str:
     return "groq"
 
 
-def _gemini_key() -> str:
-    return (os.environ.get("GEMINI_API_KEY")
-            or os.environ.get("GOOGLE_API_KEY")
-            or os.environ.get("GOOGLE_AI_STUDIO_API_KEY")
-            or "").strip()
-
-
-# ── Gemini vision — single image ─────────────────────────────────────────────
+# ── Raw provider vision calls (through the LLM gateway) ─────────────────────
 async def _gemini_vision(image_b64: str, mime_type: str, prompt: str) -> str:
-    import httpx
-    key = _gemini_key()
-    if not key:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured on the server.")
-    model = (os.environ.get("GEMINI_VISION_MODEL") or "gemini-2.5-flash").strip()
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    body = {
-        "contents": [{
-            "role": "user",
-            "parts": [
-                {"text": prompt},
-                {"inline_data": {"mime_type": mime_type, "data": image_b64}},
-            ],
-        }],
-        "generationConfig": {"temperature": 0.2, "maxOutputTokens": 2048},
-    }
-    async with httpx.AsyncClient(timeout=90) as client:
-        resp = await client.post(url, params={"key": key},
-                                 headers={"Content-Type": "application/json"}, json=body)
-    if resp.status_code == 429:
-        raise HTTPException(status_code=429, detail="Gemini quota exceeded. Please wait a moment and try again.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=422, detail=f"Gemini API error {resp.status_code}: {resp.text[:300]}")
-    data = resp.json()
-    try:
-        parts = data["candidates"][0]["content"]["parts"]
-        return "".join(p.get("text", "") for p in parts if isinstance(p, dict))
-    except (KeyError, IndexError, TypeError):
-        raise HTTPException(status_code=422, detail="Gemini returned an empty response.")
+    return await llm_gateway.generate(
+        "document_reader", prompt, images=[(image_b64, mime_type)], temperature=0.2,
+        provider="gemini", fallback=False, timeout=90,
+    )
 
 
 async def _gemini_vision_multipage(page_images_b64: list, prompt: str) -> str:
-    import httpx
-    key = _gemini_key()
-    if not key:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured on the server.")
-    model = (os.environ.get("GEMINI_VISION_MODEL") or "gemini-2.5-flash").strip()
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-    parts = [{"text": prompt}]
-    for img_b64, mime in page_images_b64:
-        parts.append({"inline_data": {"mime_type": mime, "data": img_b64}})
-    body = {
-        "contents": [{"role": "user", "parts": parts}],
-        "generationConfig": {"temperature": 0.2, "maxOutputTokens": 2048},
-    }
-    async with httpx.AsyncClient(timeout=120) as client:
-        resp = await client.post(url, params={"key": key},
-                                 headers={"Content-Type": "application/json"}, json=body)
-    if resp.status_code == 429:
-        raise HTTPException(status_code=429, detail="Gemini quota exceeded. Please wait a moment and try again.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=422, detail=f"Gemini API error {resp.status_code}: {resp.text[:300]}")
-    data = resp.json()
-    try:
-        rparts = data["candidates"][0]["content"]["parts"]
-        return "".join(p.get("text", "") for p in rparts if isinstance(p, dict))
-    except (KeyError, IndexError, TypeError):
-        raise HTTPException(status_code=422, detail="Gemini returned an empty response.")
+    return await llm_gateway.generate(
+        "document_reader", prompt, images=page_images_b64, temperature=0.2,
+        provider="gemini", fallback=False, timeout=120,
+    )
 
 
-# ── Groq vision — single image ────────────────────────────────────────────────
 async def _groq_vision_raw(image_b64: str, mime_type: str, prompt: str) -> str:
-    import httpx
-    groq_key = os.environ.get("GROQ_API_KEY", "")
-    if not groq_key:
-        raise HTTPException(status_code=500, detail="GROQ_API_KEY is not configured on the server.")
-
-    payload = {
-        "model": os.environ.get("GROQ_VISION_MODEL", "meta-llama/llama-4-maverick-17b-128e-instruct"),
-        "messages": [{
-            "role": "user",
-            "content": [
-                {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{image_b64}"}},
-                {"type": "text", "text": prompt},
-            ],
-        }],
-        "max_tokens": 2048,
-    }
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {groq_key}", "Content-Type": "application/json"},
-            json=payload,
-        )
-    if resp.status_code == 429:
-        raise HTTPException(status_code=429, detail="Groq quota exceeded. Please wait a moment and try again.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=422, detail=f"Groq API error {resp.status_code}: {resp.text[:300]}")
-    return resp.json()["choices"][0]["message"]["content"]
+    return await llm_gateway.generate(
+        "document_reader", prompt, images=[(image_b64, mime_type)], temperature=0.2,
+        provider="groq", fallback=False, timeout=60,
+    )
 
 
 async def _groq_vision_multipage_raw(page_images_b64: list, prompt: str) -> str:
-    import httpx
-    groq_key = os.environ.get("GROQ_API_KEY", "")
-    if not groq_key:
-        raise HTTPException(status_code=500, detail="GROQ_API_KEY is not configured on the server.")
-
-    content = []
-    for img_b64, mime in page_images_b64:
-        content.append({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{img_b64}"}})
-    content.append({"type": "text", "text": prompt})
-
-    payload = {
-        "model": os.environ.get("GROQ_VISION_MODEL", "meta-llama/llama-4-maverick-17b-128e-instruct"),
-        "messages": [{"role": "user", "content": content}],
-        "max_tokens": 2048,
-    }
-    async with httpx.AsyncClient(timeout=90) as client:
-        resp = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {groq_key}", "Content-Type": "application/json"},
-            json=payload,
-        )
-    if resp.status_code == 429:
-        raise HTTPException(status_code=429, detail="Groq quota exceeded. Please wait a moment and try again.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=422, detail=f"Groq API error {resp.status_code}: {resp.text[:300]}")
-    return resp.json()["choices"][0]["message"]["content"]
+    return await llm_gateway.generate(
+        "document_reader", prompt, images=page_images_b64, temperature=0.2,
+        provider="groq", fallback=False, timeout=90,
+    )
 
 
 # ── Provider-agnostic vision wrappers ────────────────────────────────────────
@@ -231,13 +133,10 @@ async def analyze_document(
         # ── Excel (.xlsx / .xlsm) → Gemini ───────────────────────────────────────
         if ext in ("xlsx", "xlsm"):
             try:
-                import openpyxl
-                wb = openpyxl.load_workbook(io.BytesIO(contents), read_only=True, data_only=True)
                 lines = []
-                for sheet_name in wb.sheetnames:
-                    ws = wb[sheet_name]
+                for sheet_name, rows in (await doc_extraction.extract("workbook_rows", contents)).items():
                     lines.append(f"\n--- Sheet: {sheet_name} ---")
-                    for row in ws.iter_rows(values_only=True):
+                    for row in rows:
                         row_text = "\t".join("" if v is None else str(v) for v in row)
                         if row_text.strip():
                             lines.append(row_text)
@@ -261,9 +160,7 @@ async def analyze_document(
         # ── Excel (.xls) → Gemini ─────────────────────────────────────────────────
         if ext == "xls":
             try:
-                import pandas as pd
-                df = pd.read_excel(io.BytesIO(contents), engine="xlrd")
-                text_content = df.to_string(index=False)
+                text_content = await doc_extraction.extract("sheet_text", contents, engine="xlrd")
             except Exception as e:
                 raise HTTPException(status_code=422, detail=f"Could not parse .xls file: {e}")
 
@@ -295,14 +192,9 @@ async def analyze_document(
         # ── PDF → Gemini (text PDF) or Groq (scanned PDF) ────────────────────────
         if ext == "pdf":
             try:
-                import pdfplumber
-                extracted_pages = []
-                with pdfplumber.open(io.BytesIO(contents)) as pdf:
-                    for i, page in enumerate(pdf.pages[:30]):
-                        text = page.extract_text()
-                        if text and text.strip():
-                            extracted_pages.append(f"--- Page {i+1} ---\n{text.strip()}")
-                text_content = "\n\n".join(extracted_pages)
+                pages = await doc_extraction.extract("pdf_text", contents, max_pages=30)
+                text_content = "\n\n".join(f"--- Page {i+1} ---\n{text.strip()}"
+                                             for i, text in enumerate(pages) if text.strip())
             except Exception as e:
                 raise HTTPException(status_code=422, detail=f"Could not read PDF: {e}")
 
@@ -325,19 +217,9 @@ async def analyze_document(
                 # Uses auto-batching (Groq max 3 images/request), parallel batches,
                 # retry+split fallback, ordered merge, streaming memory release.
                 try:
-                    from PIL import Image as PILImage
-                    page_images_b64 = []
-                    with pdfplumber.open(io.BytesIO(contents)) as pdf:
-                        for page in pdf.pages:  # unlimited — batching handles it
-                            pil_img = page.to_image(resolution=150).original
-                            if pil_img.mode not in ("RGB", "L"):
-                                pil_img = pil_img.convert("RGB")
-                            buf = io.BytesIO()
-                            pil_img.save(buf, format="JPEG", quality=85)
-                            img_b64 = base64.b64encode(buf.getvalue()).decode()
-                            page_images_b64.append((img_b64, "image/jpeg"))
-                            # Release PIL/buffer refs promptly
-                            del pil_img, buf
+                    # unlimited pages — batching handles it (and a longer extraction timeout)
+                    page_images_b64 = [(base64.b64encode(img).decode(), "image/jpeg")
+                                       for img in await doc_extraction.extract("pdf_images", contents, timeout=300)]
 
                     if not page_images_b64:
                         raise HTTPException(status_code=422, detail="No pages could be rendered from this PDF.")
@@ -363,13 +245,7 @@ async def analyze_document(
         # ── Images (JPG, PNG, WEBP) → Groq vision ────────────────────────────────
         if ext in ("jpg", "jpeg", "png", "webp", "gif"):
             try:
-                from PIL import Image as PILImage
-                img = PILImage.open(io.BytesIO(contents))
-                if img.mode not in ("RGB", "L"):
-                    img = img.convert("RGB")
-                buf = io.BytesIO()
-                img.save(buf, format="JPEG", quality=85)
-                img_b64 = base64.b64encode(buf.getvalue()).decode()
+                img_b64 = base64.b64encode(await doc_extraction.extract("image_jpeg", contents)).decode()
             except Exception as e:
                 raise HTTPException(status_code=422, detail=f"Could not open image: {e}")
 
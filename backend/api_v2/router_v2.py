@@ -1,6 +1,8 @@
+import json
 import logging
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from backend.dependencies import get_current_user
 
@@ -68,6 +70,41 @@ async def api_copilot_chat(body: CopilotChatRequest, user=Depends(get_current_us
         logger.error(f"Copilot API error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/copilot/stream")
+async def api_copilot_stream(body: CopilotChatRequest, user=Depends(get_current_user)):
+    """Same as /copilot/chat, streamed as server-sent events: `meta` (session id,
+    tool results), one `token` event per text chunk as the model produces it,
+    then `done` (or `error`)."""
+    try:
+        state = await CopilotEngine.prepare_request(
+            user=user,
+            session_id=body.session_id,
+            query=body.query,
+            role_preset=body.role_preset
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Copilot stream setup error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        try:
+            async for event, data in CopilotEngine.stream_copilot_request(state):
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        except Exception as e:
+            logger.error(f"Copilot stream error: {e}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
 @router.post("/copilot/action")
 async def api_copilot_action(body: CopilotActionRequest, user=Depends(get_current_user)):
     """User approval confirmation to run ledger/invoice changes."""
@@ -34,6 +34,7 @@ HOW TO INTEGRATE:
 """
 
 import asyncio
+import time
 import uuid
 import socket
 import logging
@@ -47,6 +48,7 @@ from pydantic import BaseModel
 logger = logging.getLogger("identix")
 
 from backend.dependencies import db, get_current_user, require_admin
+from backend.index_manifest import ensure_indexes, index
 from backend.models import User
 
 identix_router = APIRouter()
@@ -1166,6 +1168,274 @@ async def iclock_getrequest(request: Request):
 
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# ADMS PUSH — BATCH INGESTION
+# A device that reconnects after being offline pushes its whole buffer (often
+# thousands of lines) in one request. Everything below works on the complete
+# batch: one $in dedupe query, one user lookup, one insert_many and one
+# bulk_write of attendance upserts — instead of 4-6 round-trips per line.
+# ─────────────────────────────────────────────────────────────────────────────
+
+_PUSH_USER_FIELDS = {
+    "_id": 0, "id": 1, "full_name": 1, "departments": 1, "identix_uid": 1,
+    "punch_in_time": 1, "grace_time": 1, "punch_out_time": 1,
+}
+
+# device UID string → (cached_at_monotonic, user doc). Misses are never cached
+# so a freshly assigned identix_uid is picked up on the very next push.
+_UID_USER_CACHE: Dict[str, tuple] = {}
+_UID_USER_CACHE_TTL_SEC = 300
+
+
+INDEXES = [
+    index("identix_attendance", [("device_user_id", 1), ("punch_time", 1)]),
+    # Only rows written by the batch path carry dedupe_key, so older
+    # (possibly duplicated) rows never block the unique index build.
+    index("identix_attendance", "dedupe_key", unique=True,
+          partialFilterExpression={"dedupe_key": {"$type": "string"}}),
+    index("users", "identix_uid", sparse=True),
+]
+
+
+async def create_identix_indexes():
+    """Create MongoDB indexes used by the ADMS push path."""
+    await ensure_indexes(INDEXES)
+
+
+def _parse_push_lines(raw: str) -> list:
+    """
+    Parse an ADMS ATTLOG body into punch dicts, dropping malformed lines and
+    repeats of the same (device_user_id, punch_time) inside the payload.
+    """
+    punches = []
+    seen = set()
+    for line in raw.splitlines():
+        parts = line.strip().split("\t")
+        if len(parts) < 4:
+            continue
+
+        device_user_id = parts[0].strip()
+        punch_time_raw = parts[1].strip()          # "2026-05-22 09:15:00"
+        punch_code     = parts[2].strip()          # "0"=in, "1"=out, "4"=OT-in, "5"=OT-out
+        key = f"{device_user_id}|{punch_time_raw}"
+        if not device_user_id or key in seen:
+            continue
+        seen.add(key)
+        punches.append({
+            "device_user_id": device_user_id,
+            "punch_time":     punch_time_raw,
+            "punch_type":     "in" if punch_code in ("0", "4") else "out",
+            "dedupe_key":     key,
+        })
+    return punches
+
+
+async def _existing_push_keys(punches: list) -> set:
+    """One $in query returning the dedupe keys already stored for this batch."""
+    if not punches:
+        return set()
+    uids  = list({p["device_user_id"] for p in punches})
+    times = list({p["punch_time"] for p in punches})
+    cursor = db.identix_attendance.find(
+        {"device_user_id": {"$in": uids}, "punch_time": {"$in": times}},
+        {"_id": 0, "device_user_id": 1, "punch_time": 1},
+    )
+    return {
+        f"{r.get('device_user_id')}|{r.get('punch_time')}"
+        async for r in cursor
+    }
+
+
+async def _resolve_identix_users(device_uids: set) -> Dict[str, dict]:
+    """
+    Map device user IDs to user docs with at most one users query per batch.
+    identix_uid is stored as int by the counter but older records hold strings,
+    so both forms are matched.
+    """
+    now = time.monotonic()
+    resolved: Dict[str, dict] = {}
+    missing = []
+    for uid in device_uids:
+        hit = _UID_USER_CACHE.get(uid)
+        if hit and now - hit[0] < _UID_USER_CACHE_TTL_SEC:
+            resolved[uid] = hit[1]
+        else:
+            missing.append(uid)
+
+    if missing:
+        lookup_values = list(missing) + [int(u) for u in missing if u.isdigit()]
+        users = await db.users.find(
+            {"identix_uid": {"$in": lookup_values}}, _PUSH_USER_FIELDS
+        ).to_list(None)
+        for u in users:
+            uid = str(u.get("identix_uid"))
+            # An int match wins over a legacy string match for the same UID
+            if uid in resolved and not isinstance(u.get("identix_uid"), int):
+                continue
+            resolved[uid] = u
+            _UID_USER_CACHE[uid] = (now, u)
+    return resolved
+
+
+def _is_late_punch(user: dict, punch_dt: datetime) -> bool:
+    try:
+        pit = datetime.strptime(user.get("punch_in_time") or "10:30", "%H:%M")
+        gt  = datetime.strptime(user.get("grace_time") or "00:10", "%H:%M")
+        deadline = punch_dt.replace(
+            hour=pit.hour, minute=pit.minute, second=0, microsecond=0,
+        ) + timedelta(minutes=gt.hour * 60 + gt.minute)
+        return punch_dt > deadline
+    except Exception:
+        return False
+
+
+def _is_early_punch_out(user: dict, punch_dt: datetime) -> bool:
+    try:
+        pot = datetime.strptime(user.get("punch_out_time") or "19:00", "%H:%M")
+        expected = punch_dt.replace(
+            hour=pot.hour, minute=pot.minute, second=0, microsecond=0,
+        )
+        return punch_dt < expected
+    except Exception:
+        return False
+
+
+def _as_aware(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+async def _fold_punches_into_attendance(punches: list, uid_to_user: Dict[str, dict]) -> int:
+    """
+    Collapse new punches to one attendance upsert per (user, IST day): the
+    earliest "in" becomes punch_in (unless the day already has one) and the
+    latest "out" becomes punch_out. Returns the number of day records written.
+    """
+    from zoneinfo import ZoneInfo
+    from pymongo import UpdateOne
+    IST = ZoneInfo("Asia/Kolkata")
+
+    days: Dict[tuple, dict] = {}
+    for p in punches:
+        user = uid_to_user.get(p["device_user_id"])
+        if not user:
+            continue
+        try:
+            punch_dt = datetime.strptime(p["punch_time"], "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            logger.warning(f"Unparseable punch time {p['punch_time']!r} for uid={p['device_user_id']}")
+            continue
+        punch_dt = punch_dt.replace(tzinfo=timezone.utc).astimezone(IST)
+        slot = days.setdefault((user["id"], punch_dt.date().isoformat()), {
+            "user": user, "first_in": None, "last_out": None,
+        })
+        if p["punch_type"] == "in":
+            if slot["first_in"] is None or punch_dt < slot["first_in"]:
+                slot["first_in"] = punch_dt
+        elif slot["last_out"] is None or punch_dt > slot["last_out"]:
+            slot["last_out"] = punch_dt
+
+    if not days:
+        return 0
+
+    existing = await db.attendance.find(
+        {
+            "user_id": {"$in": list({k[0] for k in days})},
+            "date":    {"$in": list({k[1] for k in days})},
+        },
+        {"_id": 0, "user_id": 1, "date": 1, "punch_in": 1},
+    ).to_list(None)
+    existing_in = {(a["user_id"], a["date"]): a.get("punch_in") for a in existing}
+
+    ops = []
+    for (user_id, date_str), slot in days.items():
+        user     = slot["user"]
+        fields   = {}
+        punch_in = _as_aware(existing_in.get((user_id, date_str)))
+
+        if slot["first_in"] is not None and not punch_in:
+            punch_in = slot["first_in"]
+            fields.update({
+                "status":      "present",
+                "punch_in":    punch_in.isoformat(),
+                "is_late":     _is_late_punch(user, punch_in),
+                "auto_marked": False,
+                "source":      "machine_push",
+            })
+
+        out_dt = slot["last_out"]
+        if out_dt is not None:
+            fields["punch_out"] = out_dt.isoformat()
+            if punch_in:
+                fields["duration_minutes"] = max(0, int(
+                    (out_dt.astimezone(timezone.utc) - punch_in.astimezone(timezone.utc))
+                    .total_seconds() / 60
+                ))
+                fields["punched_out_early"] = _is_early_punch_out(user, out_dt)
+            else:
+                fields["source"] = "machine_push"
+
+        if fields:
+            ops.append(UpdateOne(
+                {"user_id": user_id, "date": date_str}, {"$set": fields}, upsert=True,
+            ))
+
+    if ops:
+        await db.attendance.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+async def _ingest_push_lines(raw: str) -> int:
+    """Batch path for /iclock/cdata. Returns the number of new raw logs stored."""
+    from pymongo.errors import BulkWriteError
+
+    punches = _parse_push_lines(raw)
+    known   = await _existing_push_keys(punches)
+    fresh   = [p for p in punches if p["dedupe_key"] not in known]
+    if not fresh:
+        return 0
+
+    uid_to_user = await _resolve_identix_users({p["device_user_id"] for p in fresh})
+    now_iso = datetime.now(timezone.utc).isoformat()
+    records = [{
+        "id":             str(uuid.uuid4()),
+        "device_user_id": p["device_user_id"],
+        "punch_time":     p["punch_time"],
+        "punch_type":     p["punch_type"],
+        "dedupe_key":     p["dedupe_key"],
+        "user_id":        (uid_to_user.get(p["device_user_id"]) or {}).get("id"),
+        "source":         "machine_push",
+        "created_at":     now_iso,
+    } for p in fresh]
+
+    inserted = len(records)
+    try:
+        await db.identix_attendance.insert_many(records, ordered=False)
+    except BulkWriteError as bwe:
+        # A concurrent push of the same buffer won the race for some rows —
+        # the unique dedupe_key index rejected them; drop those from the fold.
+        write_errors = bwe.details.get("writeErrors", [])
+        if any(e.get("code") != 11000 for e in write_errors):
+            raise
+        dup_idx = {e["index"] for e in write_errors}
+        inserted -= len(dup_idx)
+        fresh = [p for i, p in enumerate(fresh) if i not in dup_idx]
+
+    unknown = {p["device_user_id"] for p in fresh} - set(uid_to_user)
+    if unknown:
+        logger.warning(f"No user found for identix_uid(s): {sorted(unknown)[:20]}")
+
+    try:
+        days = await _fold_punches_into_attendance(fresh, uid_to_user)
+        logger.info(f"Identix push: {days} attendance day record(s) updated")
+    except Exception as mirror_err:
+        logger.warning(f"Mirror to attendance failed: {mirror_err}\n{traceback.format_exc()}")
+    return inserted
+
+
 # 🔹 Main attendance data endpoint — ADMS cloud push (machine → Render)
 @identix_router.api_route("/iclock/cdata", methods=["GET", "POST"])
 async def iclock_cdata(request: Request):
@@ -1176,9 +1446,6 @@ async def iclock_cdata(request: Request):
     punch_type: 0 = check-in, 1 = check-out
     """
     try:
-        from zoneinfo import ZoneInfo
-        IST = ZoneInfo("Asia/Kolkata")
-
         params = dict(request.query_params)
         body   = await request.body()
         raw    = body.decode("utf-8", errors="replace").strip()
@@ -1196,151 +1463,7 @@ async def iclock_cdata(request: Request):
 
         logger.info(f"✅ Identix push received | params={params} | lines={len(raw.splitlines())}")
 
-        inserted = 0
-
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-
-            parts = line.split("\t")
-            if len(parts) < 4:
-                continue
-
-            device_user_id = parts[0].strip()
-            punch_time_raw = parts[1].strip()          # "2026-05-22 09:15:00"
-            punch_code     = parts[2].strip()          # "0"=in, "1"=out, "4"=OT-in, "5"=OT-out
-            punch_type     = "in" if punch_code in ("0", "4") else "out"
-
-            # ── Deduplicate ───────────────────────────────────────────────
-            existing = await db.identix_attendance.find_one({
-                "device_user_id": device_user_id,
-                "punch_time":     punch_time_raw,
-            })
-            if existing:
-                continue
-
-            # ── Save raw log ──────────────────────────────────────────────
-            record = {
-                "id":             str(uuid.uuid4()),
-                "device_user_id": device_user_id,
-                "punch_time":     punch_time_raw,
-                "punch_type":     punch_type,
-                "source":         "machine_push",
-                "created_at":     datetime.now(timezone.utc).isoformat(),
-            }
-            await db.identix_attendance.insert_one(record)
-            inserted += 1
-
-            # ── Mirror to main attendance collection ──────────────────────
-            try:
-                # Look up user by identix_uid
-                user = await db.users.find_one(
-                    {"identix_uid": int(device_user_id)},
-                    {"_id": 0, "id": 1, "full_name": 1, "departments": 1,
-                     "punch_in_time": 1, "grace_time": 1, "punch_out_time": 1},
-                ) if device_user_id.isdigit() else None
-
-                if not user:
-                    # fallback: match by string user_id field
-                    user = await db.users.find_one(
-                        {"identix_uid": device_user_id},
-                        {"_id": 0, "id": 1, "full_name": 1, "departments": 1,
-                         "punch_in_time": 1, "grace_time": 1, "punch_out_time": 1},
-                    )
-
-                if not user:
-                    logger.warning(f"No user found for identix_uid={device_user_id}")
-                    continue
-
-                # Parse punch datetime → IST
-                punch_dt = datetime.strptime(punch_time_raw, "%Y-%m-%d %H:%M:%S")
-                punch_dt = punch_dt.replace(tzinfo=timezone.utc).astimezone(IST)
-                date_str = punch_dt.date().isoformat()
-                user_id  = user["id"]
-
-                if punch_type == "in":
-                    # Late calculation
-                    is_late = False
-                    try:
-                        pit_str       = user.get("punch_in_time", "10:30")
-                        gt_str        = user.get("grace_time",    "00:10")
-                        pit           = datetime.strptime(pit_str, "%H:%M")
-                        gt            = datetime.strptime(gt_str,  "%H:%M")
-                        grace_minutes = gt.hour * 60 + gt.minute
-                        deadline      = punch_dt.replace(
-                            hour=pit.hour, minute=pit.minute,
-                            second=0, microsecond=0,
-                        ) + timedelta(minutes=grace_minutes)
-                        is_late = punch_dt > deadline
-                    except Exception:
-                        pass
-
-                    existing_att = await db.attendance.find_one(
-                        {"user_id": user_id, "date": date_str}, {"_id": 0}
-                    )
-                    if not (existing_att and existing_att.get("punch_in")):
-                        await db.attendance.update_one(
-                            {"user_id": user_id, "date": date_str},
-                            {"$set": {
-                                "status":      "present",
-                                "punch_in":    punch_dt.isoformat(),
-                                "is_late":     is_late,
-                                "auto_marked": False,
-                                "source":      "machine_push",
-                            }},
-                            upsert=True,
-                        )
-
-                elif punch_type == "out":
-                    existing_att = await db.attendance.find_one(
-                        {"user_id": user_id, "date": date_str}, {"_id": 0}
-                    )
-                    if existing_att and existing_att.get("punch_in"):
-                        punch_in_raw = existing_att["punch_in"]
-                        punch_in_dt  = datetime.fromisoformat(punch_in_raw) \
-                            if isinstance(punch_in_raw, str) else punch_in_raw
-                        if punch_in_dt.tzinfo is None:
-                            punch_in_dt = punch_in_dt.replace(tzinfo=timezone.utc)
-
-                        duration_minutes = max(0, int(
-                            (punch_dt.astimezone(timezone.utc) - punch_in_dt.astimezone(timezone.utc))
-                            .total_seconds() / 60
-                        ))
-
-                        early = False
-                        try:
-                            pot_str  = user.get("punch_out_time", "19:00")
-                            pot      = datetime.strptime(pot_str, "%H:%M")
-                            expected = punch_dt.replace(
-                                hour=pot.hour, minute=pot.minute,
-                                second=0, microsecond=0,
-                            )
-                            early = punch_dt < expected
-                        except Exception:
-                            pass
-
-                        await db.attendance.update_one(
-                            {"user_id": user_id, "date": date_str},
-                            {"$set": {
-                                "punch_out":         punch_dt.isoformat(),
-                                "duration_minutes":  duration_minutes,
-                                "punched_out_early": early,
-                            }},
-                        )
-                    else:
-                        await db.attendance.update_one(
-                            {"user_id": user_id, "date": date_str},
-                            {"$set": {
-                                "punch_out": punch_dt.isoformat(),
-                                "source":    "machine_push",
-                            }},
-                            upsert=True,
-                        )
-
-            except Exception as mirror_err:
-                logger.warning(f"Mirror failed for uid={device_user_id}: {mirror_err}")
-
+        inserted = await _ingest_push_lines(raw)
         logger.info(f"Identix push: inserted {inserted} new record(s)")
         return "OK\n"
 
@@ -12,18 +12,17 @@ import logging
 import httpx
 
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException, Request
 from dateutil import parser as dateutil_parser
 
 from backend.dependencies import db
+from backend.password_hashing import hash_password
 from backend.security.rate_limiter import RateLimiter
 from backend.security.audit_security import AuditSecurity
 
 logger      = logging.getLogger(__name__)
 router      = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 # ── Pydantic models ───────────────────────────────────────────────────────────
@@ -176,7 +175,7 @@ async def reset_password(data: ResetPasswordRequest, request: Request):
             detail="Password must be at least 6 characters."
         )
 
-    hashed = pwd_context.hash(data.new_password)
+    hashed = await hash_password(data.new_password)
     result = await db.users.update_one(
         {"email": email}, {"$set": {"password": hashed}}
     )
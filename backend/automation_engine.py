@@ -17,7 +17,7 @@ Covers, per your scoping:
 Design notes:
   - WhatsApp birthday sending already exists via whatsapp_scheduler.py /
     wa_birthday_job. This module supersedes it: disable the old cron job
-    (see INTEGRATION_GUIDE) and use `birthday_automation_job` from here
+    (see INTEGRATION_GUIDE) and use `run_birthday_automation` from here
     instead, since only one of the two should own the daily 9 AM send.
   - "Approval required" turns a would-be send into a queued
     `pending_client_messages` row + an admin notification. Approving it
@@ -33,13 +33,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime, date, timedelta, timezone
-import asyncio
 import logging
 import uuid
 
 from backend.dependencies import db, get_current_user, personal_birthday_candidates, get_user_permissions
 from backend.notifications import create_notification
 from backend.client_activity import log_client_activity
+from backend import client_calendar
+from backend.whatsapp_scheduler import SendDispatcher
 
 router = APIRouter(prefix="/automation", tags=["Automation Engine"])
 expiry_router = APIRouter(prefix="/clients/{client_id}/service-expiries", tags=["Service Expiry Alerts"])
@@ -392,40 +393,65 @@ async def delete_service_expiry(client_id: str, expiry_id: str, current_user=Dep
 
 # ====================== SCHEDULED JOBS (async) ======================
 
+async def _todays_birthdays(today: date) -> List[tuple]:
+    """(client, person) pairs whose birthday is today, from the client_calendar projection."""
+    entries = await client_calendar.birthdays_on(today)
+    if entries is None:
+        # Projection not built yet: scan clients as before
+        pairs = []
+        clients = await db.clients.find({"status": {"$ne": "archived"}}, {"_id": 0}).to_list(5000)
+        for client in clients:
+            for person in personal_birthday_candidates(client):
+                try:
+                    bday = date.fromisoformat(str(person["birthday"])[:10])
+                except (ValueError, TypeError):
+                    continue
+                if bday.month == today.month and bday.day == today.day:
+                    pairs.append((client, person))
+        return pairs
+
+    ids = list({e["client_id"] for e in entries})
+    clients = {
+        c["id"]: c for c in await db.clients.find(
+            {"id": {"$in": ids}, "status": {"$ne": "archived"}}, {"_id": 0}
+        ).to_list(None)
+    }
+    return [(clients[e["client_id"]], e) for e in entries if e["client_id"] in clients]
+
+
 async def run_birthday_automation():
     """Supersedes whatsapp_scheduler.wa_birthday_job — handles WA + email + approval gate."""
     settings = await _get_settings()
     today = date.today()
-    clients = await db.clients.find({"status": {"$ne": "archived"}}, {"_id": 0}).to_list(5000)
+    wa_sends = []
 
-    for client in clients:
+    for client, person in await _todays_birthdays(today):
         if client.get("wa_auto_birthday") is False:
             continue
-        for person in personal_birthday_candidates(client):
-            try:
-                raw = person["birthday"]
-                bday = date.fromisoformat(str(raw)[:10])
-            except (ValueError, TypeError):
-                continue
-            if not (bday.month == today.month and bday.day == today.day):
-                continue
 
-            name = person["name"]
-            if settings.get("birthday_wa_enabled") and person.get("phone"):
-                phone = "".join(c for c in person["phone"] if c.isdigit())
-                if len(phone) == 10:
-                    phone = "91" + phone
-                msg = (client.get("wa_birthday_message") or settings["birthday_wa_template"]).format(name=name)
-                await _queue_or_send("birthday", "whatsapp", client, name, phone, msg, None,
-                                      settings.get("birthday_requires_approval", True),
-                                      media_url=settings.get("birthday_wa_image_url"))
-                await asyncio.sleep(0.5)
-
-            if settings.get("birthday_email_enabled") and person.get("email"):
-                msg = settings["birthday_email_template"].format(name=name)
-                await _queue_or_send("birthday", "email", client, name, person["email"], msg,
-                                      f"Happy Birthday, {name}!",
-                                      settings.get("birthday_requires_approval", True))
+        name = person["name"]
+        if settings.get("birthday_wa_enabled") and person.get("phone"):
+            phone = "".join(c for c in person["phone"] if c.isdigit())
+            if len(phone) == 10:
+                phone = "91" + phone
+            msg = (client.get("wa_birthday_message") or settings["birthday_wa_template"]).format(name=name)
+            send = (lambda client=client, name=name, phone=phone, msg=msg: _queue_or_send(
+                "birthday", "whatsapp", client, name, phone, msg, None,
+                settings.get("birthday_requires_approval", True),
+                media_url=settings.get("birthday_wa_image_url")))
+            # Only real sends are rate limited; queuing for approval is a DB insert
+            if settings.get("birthday_requires_approval", True):
+                await send()
+            else:
+                wa_sends.append(send)
+
+        if settings.get("birthday_email_enabled") and person.get("email"):
+            msg = settings["birthday_email_template"].format(name=name)
+            await _queue_or_send("birthday", "email", client, name, person["email"], msg,
+                                  f"Happy Birthday, {name}!",
+                                  settings.get("birthday_requires_approval", True))
+
+    await SendDispatcher().run(wa_sends)
 
 
 async def run_festival_greetings():
@@ -436,6 +462,7 @@ async def run_festival_greetings():
         return
 
     clients = await db.clients.find({"status": "active"}, {"_id": 0}).to_list(5000)
+    wa_sends = []
     for festival in festivals:
         for client in clients:
             if client.get("wa_auto_birthday") is False:  # reuse same opt-out flag for all auto-greetings
@@ -446,15 +473,20 @@ async def run_festival_greetings():
                 if len(phone) == 10:
                     phone = "91" + phone
                 msg = festival["wa_template"].format(name=name, festival=festival["name"])
-                await _queue_or_send("festival", "whatsapp", client, name, phone, msg, None,
-                                      settings.get("festival_requires_approval", True),
-                                      media_url=festival.get("wa_image_url"))
-                await asyncio.sleep(0.5)
+                send = (lambda client=client, name=name, phone=phone, msg=msg, festival=festival: _queue_or_send(
+                    "festival", "whatsapp", client, name, phone, msg, None,
+                    settings.get("festival_requires_approval", True),
+                    media_url=festival.get("wa_image_url")))
+                if settings.get("festival_requires_approval", True):
+                    await send()
+                else:
+                    wa_sends.append(send)
             if client.get("email"):
                 msg = festival["email_template"].format(name=name, festival=festival["name"])
                 await _queue_or_send("festival", "email", client, name, client["email"], msg,
                                       f"Happy {festival['name']}!",
                                       settings.get("festival_requires_approval", True))
+    await SendDispatcher().run(wa_sends)
 
 
 async def run_service_expiry_alerts():
@@ -544,43 +576,3 @@ async def run_follow_up_reminders():
                 type="follow_up_reminder",
                 popup=False,
             )
-
-
-# ─── Sync wrappers for APScheduler (matches whatsapp_scheduler.py pattern) ───
-
-def _run_on_main_loop(coro, timeout=55):
-    from backend.server import app_event_loop
-    if app_event_loop is None or app_event_loop.is_closed():
-        logger.warning("_run_on_main_loop: main event loop not ready, skipping automation job.")
-        return
-    import asyncio as _asyncio
-    future = _asyncio.run_coroutine_threadsafe(coro, app_event_loop)
-    future.result(timeout=timeout)
-
-
-def birthday_automation_job():
-    try:
-        _run_on_main_loop(run_birthday_automation())
-    except Exception as exc:
-        logger.error("birthday_automation_job failed: %s", exc)
-
-
-def festival_greeting_job():
-    try:
-        _run_on_main_loop(run_festival_greetings())
-    except Exception as exc:
-        logger.error("festival_greeting_job failed: %s", exc)
-
-
-def service_expiry_alert_job():
-    try:
-        _run_on_main_loop(run_service_expiry_alerts())
-    except Exception as exc:
-        logger.error("service_expiry_alert_job failed: %s", exc)
-
-
-def follow_up_reminder_job():
-    try:
-        _run_on_main_loop(run_follow_up_reminders())
-    except Exception as exc:
-        logger.error("follow_up_reminder_job failed: %s", exc)
@@ -34,6 +34,9 @@ import re
 import math
 import uuid
 import base64
+import bisect
+import hashlib
+import logging
 from io import BytesIO
 from datetime import datetime, date, timezone, timedelta
 from typing import Optional, List
@@ -41,11 +44,17 @@ from typing import Optional, List
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
 from pydantic import BaseModel
 
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
 from backend.dependencies import db, get_current_user
+from backend.index_manifest import ensure_indexes, index
+from backend import validation_totals
 from backend.models import User
 from backend.accounting_core import get_default_account_id, try_auto_post
 
 router = APIRouter(tags=["Bank Accounts"])
+logger = logging.getLogger("bank_accounts")
 
 MAX_FILE_BYTES = 15 * 1024 * 1024  # 15 MB — statements can run to many pages
 
@@ -677,7 +686,115 @@ async def learn_transaction_match(description: str, matched_type: str, matched_i
 
 
 # ── Matching + auto journal posting ───────────────────────────────────────
-async def _match_transaction(company_id: str, txn: dict) -> Optional[dict]:
+MATCH_WINDOW_DAYS = 30
+
+
+def _cand_amount(kind: str, c: dict) -> float:
+    if kind in ("zte_purchase", "zte_sale"):
+        return c.get("amount_inr") or float((c.get("extracted") or {}).get("total_invoice_value") or 0)
+    if kind == "purchase":
+        return float(c.get("grand_total") or 0)
+    total = float(c.get("grand_total") or c.get("total_amount") or c.get("total") or 0)
+    due = c.get("amount_due")
+    return float(due) if due is not None else total
+
+
+def _cand_match(kind: str, c: dict, amount: float) -> dict:
+    if kind == "zte_purchase":
+        vendor = (c.get("extracted") or {}).get("vendor_or_customer_name") or "Zero-Touch purchase"
+        return {"type": "zte_purchase", "id": c["id"], "label": vendor, "ap_amount": amount}
+    if kind == "zte_sale":
+        customer = (c.get("extracted") or {}).get("vendor_or_customer_name") or "Zero-Touch sale"
+        return {"type": "zte_sale", "id": c["id"], "label": customer, "ar_amount": amount}
+    if kind == "purchase":
+        return {"type": "purchase", "id": c["id"], "label": c.get("supplier_name") or c.get("invoice_no") or "Purchase invoice", "grand_total": amount}
+    total = float(c.get("grand_total") or c.get("total_amount") or c.get("total") or 0)
+    return {"type": "sale", "id": c.get("id"), "label": c.get("client_name") or c.get("invoice_no") or "Sale invoice", "grand_total": total}
+
+
+class _CandidatePool:
+    """Open invoices a set of bank lines can settle, loaded once.
+
+    Matching used to query up to 2000 candidates from four collections for
+    every statement line. An upload now loads every open candidate dated
+    within MATCH_WINDOW_DAYS of any of its lines in one query per
+    collection, plus the learned mappings for its descriptions, and each
+    line is matched in memory: candidates are kept sorted by amount so a
+    line only looks at the ones inside its amount tolerance.
+
+    Candidates settled by a line of this upload are taken out of the pool,
+    as the per-line queries used to stop seeing them once marked paid.
+    """
+
+    def __init__(self):
+        self.kinds = {}   # kind -> (amounts, [(amount, date, order, doc)]) sorted by amount
+        self.taken = set()
+        self.learned = {}
+
+    @classmethod
+    async def load(cls, company_id: str, dates: List[str], descriptions: List[str]):
+        pool = cls()
+        parsed = []
+        for d in dates:
+            try:
+                parsed.append(datetime.strptime(d, "%Y-%m-%d"))
+            except Exception:
+                pass
+        if parsed:
+            window_from = (min(parsed) - timedelta(days=MATCH_WINDOW_DAYS)).date().isoformat()
+            window_to = (max(parsed) + timedelta(days=MATCH_WINDOW_DAYS)).date().isoformat()
+            queries = {
+                "zte_purchase": (db.zte_processed_documents, "extracted.invoice_date", {
+                    "company_id": company_id, "status": "posted", "settled": {"$ne": True},
+                    "extracted.document_type": "PURCHASE",
+                }),
+                "purchase": (db.purchase_invoices, "invoice_date", {
+                    "company_id": company_id, "payment_status": {"$ne": "paid"},
+                }),
+                "zte_sale": (db.zte_processed_documents, "extracted.invoice_date", {
+                    "company_id": company_id, "status": "posted", "settled": {"$ne": True},
+                    "extracted.document_type": "SALE",
+                }),
+                "sale": (db.invoices, "invoice_date", {
+                    "company_id": company_id, "status": {"$nin": ["paid", "cancelled"]},
+                }),
+            }
+            for kind, (collection, date_field, query) in queries.items():
+                query[date_field] = {"$gte": window_from, "$lte": window_to}
+                rows = []
+                order = 0
+                async for c in collection.find(query, {"_id": 0}):
+                    amount = _cand_amount(kind, c)
+                    cdate = (c.get("extracted") or {}).get("invoice_date") if kind.startswith("zte") else c.get("invoice_date")
+                    if amount and isinstance(cdate, str):
+                        rows.append((amount, cdate, order, c))
+                    order += 1
+                rows.sort(key=lambda r: (r[0], r[2]))
+                pool.kinds[kind] = ([r[0] for r in rows], rows)
+
+        patterns = sorted({p for p in (normalize_description(d) for d in descriptions) if p})
+        for i in range(0, len(patterns), 1000):
+            async for m in db.bank_learned_mappings.find({"pattern": {"$in": patterns[i:i + 1000]}}):
+                pool.learned[m["pattern"]] = m
+        return pool
+
+    def find(self, kind: str, amount: float, window_from: str, window_to: str) -> Optional[dict]:
+        amounts, rows = self.kinds.get(kind, ([], []))
+        tol = max(1.0, amount * 0.01)
+        best = None
+        for i in range(bisect.bisect_left(amounts, amount - tol), bisect.bisect_right(amounts, amount + tol)):
+            cand_amount, cdate, order, c = rows[i]
+            if not (window_from <= cdate <= window_to) or (kind, c.get("id")) in self.taken:
+                continue
+            if best is None or order < best[2]:
+                best = rows[i]
+        return _cand_match(kind, best[3], best[0]) if best else None
+
+    def take(self, match: dict):
+        self.taken.add((match["type"], match["id"]))
+
+
+async def _match_transaction(company_id: str, txn: dict, pool: Optional[_CandidatePool] = None) -> Optional[dict]:
     """Try to match one bank line against:
       1) a Purchase invoice / Sale invoice (the standalone Purchases/Invoicing
          modules), or
@@ -692,79 +809,36 @@ async def _match_transaction(company_id: str, txn: dict) -> Optional[dict]:
     AI-extracted vendor name, which gives a better match than the generic
     purchase_invoices collection when both exist.
       3) FALLBACK: A learned mapping from machine learning (Module 8) built from
-         prior manual matches on the same description pattern."""
+         prior manual matches on the same description pattern.
+
+    Statement uploads pass one shared `pool` for all their lines; without
+    one, a pool is loaded for just this line."""
     txn_date = txn["date"]
     try:
         dt = datetime.strptime(txn_date, "%Y-%m-%d")
     except Exception:
         return None
-    window_from = (dt - timedelta(days=30)).date().isoformat()
-    window_to = (dt + timedelta(days=30)).date().isoformat()
+    window_from = (dt - timedelta(days=MATCH_WINDOW_DAYS)).date().isoformat()
+    window_to = (dt + timedelta(days=MATCH_WINDOW_DAYS)).date().isoformat()
+    if pool is None:
+        pool = await _CandidatePool.load(company_id, [txn_date], [txn.get("description", "")])
 
     if txn["debit"] > 0:
-        amount = txn["debit"]
-
-        zte_candidates = await db.zte_processed_documents.find(
-            {
-                "company_id": company_id, "status": "posted", "settled": {"$ne": True},
-                "extracted.document_type": "PURCHASE",
-                "extracted.invoice_date": {"$gte": window_from, "$lte": window_to},
-            },
-            {"_id": 0},
-        ).to_list(2000)
-        for c in zte_candidates:
-            inr_total = c.get("amount_inr") or float((c.get("extracted") or {}).get("total_invoice_value") or 0)
-            if inr_total and abs(inr_total - amount) <= max(1.0, amount * 0.01):
-                vendor = (c.get("extracted") or {}).get("vendor_or_customer_name") or "Zero-Touch purchase"
-                return {"type": "zte_purchase", "id": c["id"], "label": vendor, "ap_amount": inr_total}
-
-        candidates = await db.purchase_invoices.find(
-            {
-                "company_id": company_id, "payment_status": {"$ne": "paid"},
-                "invoice_date": {"$gte": window_from, "$lte": window_to},
-            },
-            {"_id": 0},
-        ).to_list(2000)
-        for c in candidates:
-            gt = float(c.get("grand_total") or 0)
-            if gt and abs(gt - amount) <= max(1.0, amount * 0.01):
-                return {"type": "purchase", "id": c["id"], "label": c.get("supplier_name") or c.get("invoice_no") or "Purchase invoice", "grand_total": gt}
+        for kind in ("zte_purchase", "purchase"):
+            match = pool.find(kind, txn["debit"], window_from, window_to)
+            if match:
+                return match
 
     elif txn["credit"] > 0:
-        amount = txn["credit"]
-
-        zte_candidates = await db.zte_processed_documents.find(
-            {
-                "company_id": company_id, "status": "posted", "settled": {"$ne": True},
-                "extracted.document_type": "SALE",
-                "extracted.invoice_date": {"$gte": window_from, "$lte": window_to},
-            },
-            {"_id": 0},
-        ).to_list(2000)
-        for c in zte_candidates:
-            inr_total = c.get("amount_inr") or float((c.get("extracted") or {}).get("total_invoice_value") or 0)
-            if inr_total and abs(inr_total - amount) <= max(1.0, amount * 0.01):
-                customer = (c.get("extracted") or {}).get("vendor_or_customer_name") or "Zero-Touch sale"
-                return {"type": "zte_sale", "id": c["id"], "label": customer, "ar_amount": inr_total}
-
-        candidates = await db.invoices.find(
-            {
-                "company_id": company_id, "status": {"$nin": ["paid", "cancelled"]},
-                "invoice_date": {"$gte": window_from, "$lte": window_to},
-            },
-            {"_id": 0},
-        ).to_list(2000)
-        for c in candidates:
-            total = float(c.get("grand_total") or c.get("total_amount") or c.get("total") or 0)
-            due = c.get("amount_due")
-            match_amount = float(due) if due is not None else total
-            if match_amount and abs(match_amount - amount) <= max(1.0, amount * 0.01):
-                return {"type": "sale", "id": c.get("id"), "label": c.get("client_name") or c.get("invoice_no") or "Sale invoice", "grand_total": total}
+        for kind in ("zte_sale", "sale"):
+            match = pool.find(kind, txn["credit"], window_from, window_to)
+            if match:
+                return match
 
     # ── FALLBACK: Check Machine Learning Learned Mappings ──
     normalized = normalize_description(txn.get("description", ""))
     if normalized:
-        learned = await db.bank_learned_mappings.find_one({"pattern": normalized})
+        learned = pool.learned.get(normalized)
         if learned:
             mtype = learned.get("matched_type")
             mid = learned.get("matched_id")
@@ -844,6 +918,7 @@ async def _revert_match_effects(txn: dict):
     if txn.get("journal_entry_id"):
         await db.journal_lines.delete_many({"entry_id": txn["journal_entry_id"]})
         await db.journal_entries.delete_one({"id": txn["journal_entry_id"]})
+        await validation_totals.note_changed("entry", [txn["journal_entry_id"]])
 
     mtype, mid = txn.get("matched_type"), txn.get("matched_id")
     prev_status = txn.get("prev_match_status")
@@ -870,6 +945,7 @@ async def _revert_match_effects(txn: dict):
                 "$push": {"status_history": history_entry},
             },
         )
+        await validation_totals.note_changed("invoice", [mid])
     elif mtype in ("zte_purchase", "zte_sale") and mid:
         await db.zte_processed_documents.update_one(
             {"id": mid},
@@ -1043,6 +1119,7 @@ async def _auto_post_for_match(company_id: str, txn: dict, match: dict, created_
                 old_je_ids = [e["id"] for e in old_pmt_jes]
                 await db.journal_lines.delete_many({"entry_id": {"$in": old_je_ids}})
                 await db.journal_entries.delete_many({"id": {"$in": old_je_ids}})
+                await validation_totals.note_changed("entry", old_je_ids, company_id)
 
         entry = await try_auto_post(
             company_id, txn["date"], f"Receipt from {match['label']} — settles Invoice {match.get('label')} (bank statement)",
@@ -1072,6 +1149,7 @@ async def _auto_post_for_match(company_id: str, txn: dict, match: dict, created_
                     "$push": {"status_history": history_entry},
                 },
             )
+            await validation_totals.note_changed("invoice", [match["id"]], company_id)
     return entry["id"] if entry else None
 
 
@@ -1102,6 +1180,265 @@ async def _already_settled_by_other_txn(matched_type: str, matched_id: str, txn_
 
 
 
+# ── Statement line fingerprints ───────────────────────────────────────────
+# Every bank_transactions row carries `fingerprint` — a hash of (account,
+# date, debit, credit, lower-cased description) — and `fingerprint_seq`, its
+# occurrence number among identical lines on the account (a statement can
+# legitimately hold the same line twice). (fingerprint, fingerprint_seq) is
+# uniquely indexed, so re-importing an overlapping statement is one `$in`
+# lookup instead of loading the account's whole history, and two concurrent
+# uploads of the same file cannot both insert a line. `reference_key` is the
+# normalised bank reference used for the reference-number dedupe.
+_EMPTY_REFS = ("", "-", ".", "0", "nan", "none", "n/a", "null")
+DEDUPE_BATCH = 1000
+
+
+def _reference_key(ref) -> Optional[str]:
+    ref = str(ref or "").strip().lower()
+    return None if ref in _EMPTY_REFS else ref
+
+
+def _line_fingerprint(bank_account_id: str, row: dict) -> str:
+    raw = "|".join((
+        bank_account_id,
+        str(row.get("date") or ""),
+        "%.2f" % (round(float(row.get("debit") or 0.0), 2) + 0.0),
+        "%.2f" % (round(float(row.get("credit") or 0.0), 2) + 0.0),
+        str(row.get("description") or "").strip().lower(),
+    ))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+INDEXES = [
+    index("bank_transactions", [("fingerprint", 1), ("fingerprint_seq", 1)], unique=True,
+          partialFilterExpression={"fingerprint": {"$exists": True}}),
+    index("bank_transactions", [("bank_account_id", 1), ("fingerprint", 1), ("fingerprint_seq", 1)]),
+    index("bank_transactions", [("bank_account_id", 1), ("reference_key", 1)]),
+]
+
+
+async def create_bank_statement_indexes():
+    """Indexes behind statement dedupe and the fingerprint backfill."""
+    await ensure_indexes(INDEXES)
+
+
+async def _used_fingerprint_seqs(bank_account_id: str, fingerprints: List[str]) -> dict:
+    used: dict = {}
+    for i in range(0, len(fingerprints), DEDUPE_BATCH):
+        async for t in db.bank_transactions.find(
+            {"bank_account_id": bank_account_id, "fingerprint": {"$in": fingerprints[i:i + DEDUPE_BATCH]}},
+            {"_id": 0, "fingerprint": 1, "fingerprint_seq": 1},
+        ):
+            used.setdefault(t["fingerprint"], set()).add(t.get("fingerprint_seq"))
+    return used
+
+
+def _next_seqs(used: set, n: int) -> List[int]:
+    seqs, seq = [], 1
+    while len(seqs) < n:
+        if seq not in used:
+            seqs.append(seq)
+        seq += 1
+    return seqs
+
+
+async def ensure_bank_fingerprints(bank_account_id: str) -> int:
+    """Fingerprints the account's rows that predate fingerprinting (or were
+    written by some other path). Cheap once done: the lookup is indexed and
+    normally finds nothing. Returns the number of rows updated."""
+    pending: dict = {}
+    async for t in db.bank_transactions.find(
+        {"bank_account_id": bank_account_id, "fingerprint": None},
+        {"_id": 0, "id": 1, "date": 1, "debit": 1, "credit": 1, "description": 1, "reference": 1},
+    ).sort([("created_at", 1), ("id", 1)]):
+        pending.setdefault(_line_fingerprint(bank_account_id, t), []).append(t)
+    if not pending:
+        return 0
+
+    used = await _used_fingerprint_seqs(bank_account_id, list(pending))
+    ops = []
+    for fp, rows in pending.items():
+        for t, seq in zip(rows, _next_seqs(used.get(fp, set()), len(rows))):
+            ops.append(UpdateOne(
+                {"id": t["id"], "fingerprint": None},
+                {"$set": {"fingerprint": fp, "fingerprint_seq": seq,
+                          "reference_key": _reference_key(t.get("reference"))}},
+            ))
+    for i in range(0, len(ops), DEDUPE_BATCH):
+        try:
+            await db.bank_transactions.bulk_write(ops[i:i + DEDUPE_BATCH], ordered=False)
+        except BulkWriteError as bwe:
+            # A concurrent backfill got there first — those rows are done.
+            if any(e.get("code") != 11000 for e in bwe.details.get("writeErrors", [])):
+                raise
+    logger.info(f"[bank] fingerprinted {len(ops)} transactions on account {bank_account_id}")
+    return len(ops)
+
+
+async def _dedupe_statement_lines(bank_account_id: str, docs: List[dict]) -> List[dict]:
+    """Drops lines already on the account and assigns fingerprints to the rest.
+
+    Same rules as before: a line whose reference number is already on the
+    account is skipped; otherwise identical lines count as a multiset — if
+    the account has k copies and the file n, the first k are skipped and the
+    remaining n - k are new."""
+    refs = sorted({d["reference_key"] for d in docs if d["reference_key"]})
+    known_refs = set()
+    for i in range(0, len(refs), DEDUPE_BATCH):
+        async for t in db.bank_transactions.find(
+            {"bank_account_id": bank_account_id, "reference_key": {"$in": refs[i:i + DEDUPE_BATCH]}},
+            {"_id": 0, "reference_key": 1},
+        ):
+            known_refs.add(t["reference_key"])
+    docs = [d for d in docs if not d["reference_key"] or d["reference_key"] not in known_refs]
+
+    by_fp: dict = {}
+    for d in docs:
+        by_fp.setdefault(d["fingerprint"], []).append(d)
+    used = await _used_fingerprint_seqs(bank_account_id, list(by_fp))
+
+    fresh = set()
+    for fp, lines in by_fp.items():
+        taken = used.get(fp, set())
+        new_lines = lines[len(taken):]
+        for d, seq in zip(new_lines, _next_seqs(taken, len(new_lines))):
+            d["fingerprint_seq"] = seq
+            fresh.add(id(d))
+    return [d for d in docs if id(d) in fresh]
+
+
+async def _insert_statement_lines(docs: List[dict]) -> List[dict]:
+    """insert_many in batches; a line a concurrent upload already inserted
+    (duplicate fingerprint) is dropped rather than failing the upload."""
+    inserted = []
+    for i in range(0, len(docs), DEDUPE_BATCH):
+        batch = docs[i:i + DEDUPE_BATCH]
+        dup = set()
+        try:
+            await db.bank_transactions.insert_many(batch, ordered=False)
+        except BulkWriteError as bwe:
+            for err in bwe.details.get("writeErrors", []):
+                if err.get("code") != 11000:
+                    raise
+                dup.add(err["index"])
+        for j, d in enumerate(batch):
+            d.pop("_id", None)
+            if j not in dup:
+                inserted.append(d)
+    return inserted
+
+
+_MATCH_FIELDS = ("matched_type", "matched_id", "matched_label", "journal_entry_id",
+                 "suggested_match", "auto_suspensed", "prev_match_status")
+
+
+async def import_statement_rows(bank_acct: dict, parsed_rows: List[dict], filename: str,
+                                auto_match: bool, created_by: str) -> dict:
+    """Dedupes, stores and (optionally) matches + posts parsed statement rows.
+
+    Lines are inserted before they are matched, so a line that turns out to
+    be a duplicate of a concurrent upload is never posted to the ledger."""
+    bank_account_id = bank_acct["id"]
+    company_id = bank_acct.get("company_id", "")
+    now = datetime.now(timezone.utc).isoformat()
+    matched_count, posted_count, auto_suspensed_count = 0, 0, 0
+
+    await ensure_bank_fingerprints(bank_account_id)
+
+    docs = []
+    for row in parsed_rows:
+        doc = {
+            "id": str(uuid.uuid4()), "bank_account_id": bank_account_id, "company_id": company_id,
+            "date": row["date"], "description": row.get("description", ""), "reference": row.get("reference", ""),
+            "debit": row.get("debit", 0.0), "credit": row.get("credit", 0.0), "balance_after": row.get("balance_after"),
+            "matched_type": None, "matched_id": None, "matched_label": None, "journal_entry_id": None,
+            "source_file": filename, "created_by": created_by, "created_at": now,
+        }
+        doc["fingerprint"] = _line_fingerprint(bank_account_id, doc)
+        doc["reference_key"] = _reference_key(doc["reference"])
+        docs.append(doc)
+
+    docs = await _dedupe_statement_lines(bank_account_id, docs)
+    saved = await _insert_statement_lines(docs)
+
+    if auto_match and saved:
+        pool = await _CandidatePool.load(
+            company_id, [d["date"] for d in saved], [d.get("description", "") for d in saved],
+        )
+        # Match fields are buffered for bulk writes; the finally flushes them even
+        # if a later line fails, so entries already posted stay linked to their line.
+        updates = []
+        try:
+            for doc in saved:
+                match = await _match_transaction(company_id, doc, pool)
+                if match:
+                    if match.get("source") in ("ml_learned", "ml_learned_bill", "ml_learned_invoice") or "source" in match:
+                        doc["suggested_match"] = {
+                            "matched_type": match["type"],
+                            "matched_id": match["id"],
+                            "matched_label": match["label"],
+                            "pending_approval": True
+                        }
+                    else:
+                        doc["matched_type"] = match["type"]
+                        doc["matched_id"] = match["id"]
+                        doc["matched_label"] = match["label"]
+                        matched_count += 1
+                        entry_id = await _auto_post_for_match(company_id, doc, match, created_by)
+                        if entry_id:
+                            doc["journal_entry_id"] = entry_id
+                            posted_count += 1
+                            pool.take(match)
+                else:
+                    # ── No confident match: park to Suspense instead of dropping the line ──
+                    # A statement line that matches nothing used to stay completely
+                    # unposted — matched_type/journal_entry_id both None, zero impact
+                    # on the ledger. That's silent and cumulative: the real cash
+                    # movement happened in the bank, but the GL "1010 Bank Accounts"
+                    # balance never moved with it, so it drifts further from the
+                    # actual bank balance with every unmatched line. For an
+                    # unmatched credit specifically, it also leaves Accounts
+                    # Receivable overstated — the invoice still shows "due" even
+                    # though the money already arrived, because nothing ever told
+                    # the ledger this receipt happened.
+                    #
+                    # Fix: auto-park every unmatched line to the Suspense Account
+                    # (9998) the moment it's imported — the exact same posting the
+                    # "Park to Suspense" button already does for a manual match
+                    # (see _auto_post_for_match's "suspense" branch). This keeps
+                    # Bank Accounts always equal to the real statement; the
+                    # unclassified side sits in Suspense, visible in the Suspense
+                    # Review workflow, until someone reclassifies it to its real
+                    # expense/income head.
+                    suspense_id = await get_default_account_id(company_id, "9998")
+                    if suspense_id:
+                        suspense_match = {"type": "suspense", "id": suspense_id, "label": "Unclassified (auto-parked)"}
+                        doc["matched_type"] = "suspense"
+                        doc["matched_id"] = suspense_id
+                        doc["matched_label"] = "Unclassified (auto-parked)"
+                        doc["auto_suspensed"] = True
+                        entry_id = await _auto_post_for_match(company_id, doc, suspense_match, created_by)
+                        if entry_id:
+                            doc["journal_entry_id"] = entry_id
+                            posted_count += 1
+                            auto_suspensed_count += 1
+
+                changed = {k: doc[k] for k in _MATCH_FIELDS if doc.get(k) is not None}
+                if changed:
+                    updates.append(UpdateOne({"id": doc["id"]}, {"$set": changed}))
+                if len(updates) >= DEDUPE_BATCH:
+                    await db.bank_transactions.bulk_write(updates, ordered=False)
+                    updates = []
+        finally:
+            if updates:
+                await db.bank_transactions.bulk_write(updates, ordered=False)
+
+    return {
+        "saved": saved, "auto_matched": matched_count,
+        "auto_posted": posted_count, "auto_suspensed": auto_suspensed_count,
+    }
+
+
 @router.post("/bank-accounts/{bank_account_id}/upload-statement")
 async def upload_statement(
     bank_account_id: str, file: UploadFile = File(...), auto_match: bool = Form(default=True),
@@ -1153,123 +1490,14 @@ async def upload_statement(
             ],
         }
 
-    now = datetime.now(timezone.utc).isoformat()
-    saved, matched_count, posted_count, auto_suspensed_count = [], 0, 0, 0
-
-    # ── COMPREHENSIVE MULTI-SET DEDUPLICATION ENGINE ──
-    db_txns = await db.bank_transactions.find({"bank_account_id": bank_account_id}).to_list(100000)
-    db_counts = {}
-    db_refs = set()
-    for t in db_txns:
-        ref_val = str(t.get("reference") or "").strip().lower()
-        if ref_val and ref_val not in ("", "-", ".", "0", "nan", "none", "n/a", "null"):
-            db_refs.add(ref_val)
-        
-        key = (
-            t["date"],
-            round(float(t.get("debit") or 0.0), 2),
-            round(float(t.get("credit") or 0.0), 2),
-            str(t.get("description") or "").strip().lower()
-        )
-        db_counts[key] = db_counts.get(key, 0) + 1
-
-    uploaded_counts = {}
-
-    for row in parsed_rows:
-        doc = {
-            "id": str(uuid.uuid4()), "bank_account_id": bank_account_id, "company_id": bank_acct.get("company_id", ""),
-            "date": row["date"], "description": row.get("description", ""), "reference": row.get("reference", ""),
-            "debit": row.get("debit", 0.0), "credit": row.get("credit", 0.0), "balance_after": row.get("balance_after"),
-            "matched_type": None, "matched_id": None, "matched_label": None, "journal_entry_id": None,
-            "source_file": filename, "created_by": current_user.id, "created_at": now,
-        }
-
-        # 1. Reference number global check
-        ref = str(doc.get("reference") or "").strip().lower()
-        if ref and ref not in ("", "-", ".", "0", "nan", "none", "n/a", "null"):
-            if ref in db_refs:
-                continue
-
-        # 2. Multi-set exact match check
-        desc_key = str(doc.get("description") or "").strip().lower()
-        key = (
-            doc["date"],
-            round(float(doc.get("debit") or 0.0), 2),
-            round(float(doc.get("credit") or 0.0), 2),
-            desc_key
-        )
-        
-        already_in_db = db_counts.get(key, 0)
-        already_processed = uploaded_counts.get(key, 0)
-        
-        if already_processed < already_in_db:
-            uploaded_counts[key] = already_processed + 1
-            continue
-            
-        uploaded_counts[key] = already_processed + 1
-
-        if auto_match:
-            match = await _match_transaction(bank_acct.get("company_id", ""), doc)
-            if match:
-                if match.get("source") in ("ml_learned", "ml_learned_bill", "ml_learned_invoice") or "source" in match:
-                    doc["suggested_match"] = {
-                        "matched_type": match["type"],
-                        "matched_id": match["id"],
-                        "matched_label": match["label"],
-                        "pending_approval": True
-                    }
-                else:
-                    doc["matched_type"] = match["type"]
-                    doc["matched_id"] = match["id"]
-                    doc["matched_label"] = match["label"]
-                    matched_count += 1
-                    entry_id = await _auto_post_for_match(bank_acct.get("company_id", ""), doc, match, current_user.id)
-                    if entry_id:
-                        doc["journal_entry_id"] = entry_id
-                        posted_count += 1
-            else:
-                # ── No confident match: park to Suspense instead of dropping the line ──
-                # A statement line that matches nothing used to stay completely
-                # unposted — matched_type/journal_entry_id both None, zero impact
-                # on the ledger. That's silent and cumulative: the real cash
-                # movement happened in the bank, but the GL "1010 Bank Accounts"
-                # balance never moved with it, so it drifts further from the
-                # actual bank balance with every unmatched line. For an
-                # unmatched credit specifically, it also leaves Accounts
-                # Receivable overstated — the invoice still shows "due" even
-                # though the money already arrived, because nothing ever told
-                # the ledger this receipt happened.
-                #
-                # Fix: auto-park every unmatched line to the Suspense Account
-                # (9998) the moment it's imported — the exact same posting the
-                # "Park to Suspense" button already does for a manual match
-                # (see _auto_post_for_match's "suspense" branch). This keeps
-                # Bank Accounts always equal to the real statement; the
-                # unclassified side sits in Suspense, visible in the Suspense
-                # Review workflow, until someone reclassifies it to its real
-                # expense/income head.
-                suspense_id = await get_default_account_id(bank_acct.get("company_id", ""), "9998")
-                if suspense_id:
-                    suspense_match = {"type": "suspense", "id": suspense_id, "label": "Unclassified (auto-parked)"}
-                    doc["matched_type"] = "suspense"
-                    doc["matched_id"] = suspense_id
-                    doc["matched_label"] = "Unclassified (auto-parked)"
-                    doc["auto_suspensed"] = True
-                    entry_id = await _auto_post_for_match(bank_acct.get("company_id", ""), doc, suspense_match, current_user.id)
-                    if entry_id:
-                        doc["journal_entry_id"] = entry_id
-                        posted_count += 1
-                        auto_suspensed_count += 1
-
-        await db.bank_transactions.insert_one(doc)
-        doc.pop("_id", None)
-        saved.append(doc)
+    result = await import_statement_rows(bank_acct, parsed_rows, filename, auto_match, current_user.id)
+    saved = result["saved"]
 
     return {
         "success": True,
         "bank_account_id": bank_account_id, "transactions_saved": len(saved),
-        "auto_matched": matched_count, "auto_posted": posted_count,
-        "auto_suspensed": auto_suspensed_count, "transactions": saved,
+        "auto_matched": result["auto_matched"], "auto_posted": result["auto_posted"],
+        "auto_suspensed": result["auto_suspensed"], "transactions": saved,
         "warnings": warnings,
     }
 
@@ -1788,6 +2016,7 @@ async def delete_transaction(txn_id: str, current_user: User = Depends(get_curre
     if txn and txn.get("journal_entry_id"):
         await db.journal_lines.delete_many({"entry_id": txn["journal_entry_id"]})
         await db.journal_entries.delete_one({"id": txn["journal_entry_id"]})
+        await validation_totals.note_changed("entry", [txn["journal_entry_id"]])
     result = await db.bank_transactions.delete_one({"id": txn_id})
     if result.deleted_count == 0:
         raise HTTPException(404, "Bank transaction not found.")
@@ -0,0 +1,737 @@
+"""
+bulk_mail.py
+────────────────────────────────────────────────────────────────────────────────
+Pooled SMTP sending for bulk client mail and one-off company mails
+(quotations).
+
+Before this every message opened its own connection: TCP + EHLO + STARTTLS
++ AUTH, then one message, then QUIT. Now:
+
+  * SMTPPool — up to BULK_MAIL_POOL_SIZE (default 4) authenticated
+    connections per (host, port, user), reused across messages. smtplib is
+    blocking, so each send runs in a worker thread; the pool size bounds
+    the threads as well. A connection is retired after
+    MAX_MESSAGES_PER_CONNECTION messages or IDLE_TIMEOUT_SEC idle, and a
+    send that finds its pooled connection dropped by the server is retried
+    once on a fresh one.
+  * DomainThrottle — per recipient domain, at most N concurrent sends and a
+    minimum spacing between them (BULK_MAIL_DOMAIN_CONCURRENCY,
+    BULK_MAIL_DOMAIN_PER_MIN, per-domain overrides in BULK_MAIL_DOMAIN_LIMITS
+    as "gmail.com=2:60,yahoo.com=1:20").
+  * Retry — 4xx replies, refused recipients with 4xx codes and dropped
+    connections are retried with exponential backoff (MAX_ATTEMPTS tries).
+    5xx is a permanent failure for that recipient. Authentication failures
+    and a refused sender abort the whole job, since every recipient would
+    fail the same way.
+
+Bulk sends are persisted jobs. `bulk_mail_jobs` holds the job (templates,
+attachments, counters, lease) and `bulk_mail_recipients` one row per
+recipient with its status. SMTP credentials are not copied into the job;
+they are read from the company at run time. A run takes a lease on the
+job and renews it with every progress flush; results are written in
+batches (PROGRESS_BATCH rows or PROGRESS_INTERVAL_SEC, whichever first).
+If the worker dies, `resume_bulk_mail_jobs` (job runner, every minute)
+restarts the job in the background once the lease expires, sending only
+the recipients still pending. A run that stops on an error is marked
+failed with its pending rows intact, for POST .../resume. Messages accepted by the server but not yet recorded when
+the worker died are sent again on resume: up to PROGRESS_BATCH (25)
+recipients, or whatever went out in the last PROGRESS_INTERVAL_SEC.
+
+A run is a fixed set of WORKERS tasks draining a queue of pending
+recipients, and each message is built only once its send slot is held, so
+memory stays flat however long the recipient list (an attachment is
+copied into every built message). `start_job` runs a job in the
+background; the caller follows it under /email/bulk-jobs/{job_id}.
+"""
+
+import asyncio
+import base64
+import ipaddress
+import logging
+import mimetypes
+import os
+import random
+import smtplib
+import socket
+import ssl
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from email import encoders
+from email.message import Message
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from fastapi import APIRouter, Depends, HTTPException
+from pymongo import ReturnDocument, UpdateOne
+
+from backend.dependencies import db, get_current_user
+from backend.index_manifest import ensure_indexes, index
+from backend.models import User
+
+logger = logging.getLogger("bulk_mail")
+
+POOL_SIZE = int(os.environ.get("BULK_MAIL_POOL_SIZE", "4"))
+MAX_MESSAGES_PER_CONNECTION = 100
+IDLE_TIMEOUT_SEC = 60
+SMTP_TIMEOUT_SEC = 20
+
+DOMAIN_CONCURRENCY = int(os.environ.get("BULK_MAIL_DOMAIN_CONCURRENCY", "2"))
+DOMAIN_PER_MIN = float(os.environ.get("BULK_MAIL_DOMAIN_PER_MIN", "120"))
+
+MAX_ATTEMPTS = 4
+RETRY_BASE_SEC = 2.0
+RETRY_MAX_SEC = 60.0
+
+LEASE_SEC = 120
+PROGRESS_BATCH = 25
+PROGRESS_INTERVAL_SEC = 5.0
+WORKERS = int(os.environ.get("BULK_MAIL_WORKERS", str(POOL_SIZE * 4)))
+MAX_RUNNING_JOBS = int(os.environ.get("BULK_MAIL_MAX_JOBS", "10"))
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+INDEXES = [
+    index("bulk_mail_jobs", "id", unique=True),
+    index("bulk_mail_jobs", [("status", 1), ("lease_until", 1)]),
+    index("bulk_mail_jobs", [("created_by", 1), ("created_at", -1)]),
+    index("bulk_mail_recipients", [("job_id", 1), ("status", 1), ("idx", 1)]),
+]
+
+
+async def create_bulk_mail_indexes():
+    """Create MongoDB indexes for bulk mail jobs and their recipients."""
+    await ensure_indexes(INDEXES)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MESSAGES
+# ─────────────────────────────────────────────────────────────────────────────
+
+def render_template(template: str, variables: dict) -> str:
+    """Substitute {key} placeholders; unknown keys are left as-is."""
+    result = template
+    for k, v in variables.items():
+        result = result.replace("{" + k + "}", str(v or ""))
+    return result
+
+
+def html_to_plain(html: str) -> str:
+    return html.replace("<br>", "\n").replace("<br/>", "\n").replace("<p>", "\n").replace("</p>", "")
+
+
+def decode_attachments(attachments: Optional[Sequence[Dict[str, Any]]]) -> List[Tuple[str, bytes]]:
+    """[{"name", "content": base64}] -> [(name, bytes)], skipping empty or undecodable entries."""
+    decoded = []
+    for a in attachments or []:
+        if not a or not a.get("content"):
+            continue
+        try:
+            decoded.append((a.get("name") or "attachment", base64.b64decode(a["content"])))
+        except Exception:
+            continue
+    return decoded
+
+
+def build_message(
+    sender: str,
+    from_name: Optional[str],
+    to_email: str,
+    subject: str,
+    body_plain: str,
+    body_html: Optional[str] = None,
+    attachments: Sequence[Tuple[str, bytes]] = (),
+) -> Message:
+    if body_html:
+        body_part = MIMEMultipart("alternative")
+        body_part.attach(MIMEText(body_plain, "plain", "utf-8"))
+        body_part.attach(MIMEText(body_html, "html", "utf-8"))
+    else:
+        body_part = MIMEText(body_plain, "plain", "utf-8")
+
+    if attachments:
+        msg = MIMEMultipart("mixed")
+        msg.attach(body_part)
+        for fname, raw in attachments:
+            ctype, _ = mimetypes.guess_type(fname)
+            maintype, subtype = ctype.split("/", 1) if ctype else ("application", "octet-stream")
+            part = MIMEBase(maintype, subtype)
+            part.set_payload(raw)
+            encoders.encode_base64(part)
+            part.add_header("Content-Disposition", "attachment", filename=fname)
+            msg.attach(part)
+    else:
+        msg = body_part
+
+    msg["Subject"] = subject
+    msg["From"] = f"{from_name} <{sender}>" if from_name else sender
+    msg["To"] = to_email
+    return msg
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CONNECTION POOL
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _quit(smtp: smtplib.SMTP):
+    try:
+        smtp.quit()
+    except Exception:
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+
+class _Conn:
+    __slots__ = ("smtp", "sent", "last_used")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """Bounded set of authenticated connections to one SMTP account."""
+
+    def __init__(self, host: str, port: int, user: str = "", password: str = "", *, size: int = POOL_SIZE):
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.size = max(1, size)
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle: List[_Conn] = []
+        self._closed = False
+        self.connects = 0
+        self.messages = 0
+
+    def _open(self) -> smtplib.SMTP:
+        """Blocking connect + STARTTLS + login (runs in a worker thread)."""
+        ctx = ssl.create_default_context()
+        if self.port == 465:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT_SEC, context=ctx)
+            smtp.ehlo()
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SEC)
+            smtp.ehlo()
+            if smtp.has_extn("starttls"):
+                smtp.starttls(context=ctx)
+                smtp.ehlo()
+            elif self.user and not _is_loopback(self.host):
+                _quit(smtp)
+                raise smtplib.SMTPNotSupportedError(
+                    f"{self.host} does not offer STARTTLS; refusing to send credentials in clear"
+                )
+        try:
+            if self.user and self.password:
+                smtp.login(self.user, self.password)
+        except Exception:
+            _quit(smtp)
+            raise
+        return smtp
+
+    def _discard(self, conn: _Conn):
+        asyncio.get_running_loop().run_in_executor(None, _quit, conn.smtp)
+
+    async def _acquire(self) -> Tuple[_Conn, bool]:
+        """Returns (connection, reused). Holds one pool slot until _release."""
+        await self._slots.acquire()
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if now - conn.last_used < IDLE_TIMEOUT_SEC:
+                return conn, True
+            self._discard(conn)
+        try:
+            smtp = await asyncio.to_thread(self._open)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.connects += 1
+        return _Conn(smtp), False
+
+    def _release(self, conn: _Conn, reusable: bool):
+        if reusable and not self._closed and conn.sent < MAX_MESSAGES_PER_CONNECTION:
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+        else:
+            self._discard(conn)
+        self._slots.release()
+
+    async def send(self, msg: Message, from_addr: str, to_addrs: List[str]):
+        """Send one message; raises the smtplib exception on failure."""
+        while True:
+            conn, reused = await self._acquire()
+            try:
+                await asyncio.to_thread(conn.smtp.send_message, msg, from_addr, to_addrs)
+            except smtplib.SMTPServerDisconnected:
+                self._release(conn, False)
+                if reused:
+                    continue  # server closed an idle pooled connection; try a fresh one
+                raise
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                # smtplib has already RSET the session; the connection stays
+                # usable unless the server said it is closing (421).
+                self._release(conn, getattr(e, "smtp_code", 0) != 421)
+                raise
+            except BaseException:
+                self._release(conn, False)
+                raise
+            conn.sent += 1
+            self.messages += 1
+            self._release(conn, True)
+            return
+
+    async def close(self):
+        self._closed = True
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(asyncio.to_thread(_quit, c.smtp) for c in idle), return_exceptions=True)
+
+
+_pools: Dict[Tuple[str, int, str, str], SMTPPool] = {}
+
+
+def get_pool(host: str, port: int, user: str = "", password: str = "") -> SMTPPool:
+    """Shared pool for an SMTP account (a changed password gets a new pool)."""
+    key = (host, int(port), user, password)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = SMTPPool(host, port, user, password)
+    return pool
+
+
+async def close_pools():
+    """QUIT every idle pooled connection (call on shutdown)."""
+    pools = list(_pools.values())
+    _pools.clear()
+    await asyncio.gather(*(p.close() for p in pools), return_exceptions=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# THROTTLING AND RETRY
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _parse_domain_limits(raw: str) -> Dict[str, Tuple[int, float]]:
+    limits = {}
+    for item in (raw or "").split(","):
+        domain, _, spec = item.strip().partition("=")
+        concurrency, _, per_min = spec.partition(":")
+        try:
+            limits[domain.lower()] = (int(concurrency), float(per_min or DOMAIN_PER_MIN))
+        except ValueError:
+            continue
+    return limits
+
+
+class DomainThrottle:
+    """Per recipient domain: a concurrency cap and a minimum spacing between sends."""
+
+    def __init__(self, concurrency: int = DOMAIN_CONCURRENCY, per_minute: float = DOMAIN_PER_MIN,
+                 overrides: Optional[Dict[str, Tuple[int, float]]] = None):
+        self.concurrency = concurrency
+        self.per_minute = per_minute
+        self.overrides = overrides or {}
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+        self._next_at: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, domain: str):
+        concurrency, per_minute = self.overrides.get(domain, (self.concurrency, self.per_minute))
+        sem = self._sems.get(domain)
+        if sem is None:
+            sem = self._sems[domain] = asyncio.Semaphore(max(1, concurrency))
+        async with sem:
+            if per_minute > 0:
+                now = time.monotonic()
+                at = max(now, self._next_at.get(domain, 0.0))
+                self._next_at[domain] = at + 60.0 / per_minute
+                if at > now:
+                    await asyncio.sleep(at - now)
+            yield
+
+
+_throttle = DomainThrottle(overrides=_parse_domain_limits(os.environ.get("BULK_MAIL_DOMAIN_LIMITS", "")))
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, socket.timeout))
+
+
+def _is_fatal(exc: BaseException) -> bool:
+    """Errors that would fail every recipient of the job the same way."""
+    if isinstance(exc, (smtplib.SMTPAuthenticationError, smtplib.SMTPNotSupportedError, ssl.SSLError)):
+        return True
+    return isinstance(exc, smtplib.SMTPSenderRefused) and exc.smtp_code >= 500
+
+
+async def send_with_retry(pool: SMTPPool, msg: Union[Message, Callable[[], Message]], from_addr: str,
+                          to_email: str, throttle: Optional[DomainThrottle] = None) -> int:
+    """
+    Send through the pool under the domain throttle. Returns the attempts used.
+    `msg` may be a builder, called once the first domain slot is held.
+    """
+    throttle = throttle or _throttle
+    domain = to_email.rsplit("@", 1)[-1].lower()
+    attempt = 1
+    while True:
+        try:
+            async with throttle.slot(domain):
+                if not isinstance(msg, Message):
+                    msg = msg()
+                await pool.send(msg, from_addr, [to_email])
+            return attempt
+        except Exception as e:
+            if attempt >= MAX_ATTEMPTS or not _is_transient(e):
+                raise
+            delay = min(RETRY_MAX_SEC, RETRY_BASE_SEC * 2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+            logger.info(f"[BulkMail] {to_email}: transient failure ({e}); retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# JOBS
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def company_smtp_settings(company_id: Optional[str], default_from_name: str = "") -> Optional[Dict[str, Any]]:
+    """The company's SMTP account, or None if it has no complete SMTP setup."""
+    if not company_id:
+        return None
+    comp = await db.companies.find_one({"id": company_id}, {"_id": 0})
+    if not comp:
+        return None
+    host = (comp.get("smtp_host") or "").strip()
+    user = (comp.get("smtp_user") or "").strip()
+    password = (comp.get("smtp_password") or "").strip()
+    if not (host and user and password):
+        return None
+    return {
+        "host": host,
+        "port": int(comp.get("smtp_port", 587)),
+        "user": user,
+        "password": password,
+        "from_name": comp.get("smtp_from_name") or comp.get("name") or default_from_name,
+    }
+
+
+async def create_job(
+    *,
+    created_by: str,
+    company_id: str,
+    subject: str,
+    body_template: str,
+    is_html: bool,
+    from_name: str,
+    recipients: List[Dict[str, Any]],
+    attachments: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Persist a bulk send. The job starts out leased to this worker so run_job can go straight on."""
+    job_id = str(uuid.uuid4())
+    now = _now_iso()
+    rows = []
+    invalid = 0
+    for idx, rec in enumerate(recipients):
+        email = (rec.get("email") or "").strip()
+        valid = "@" in email
+        invalid += not valid
+        rows.append({
+            "_id": f"{job_id}:{idx}",
+            "job_id": job_id,
+            "idx": idx,
+            "email": email,
+            "name": rec.get("name") or "",
+            "variables": rec.get("variables") or {},
+            "status": "pending" if valid else "failed",
+            "error": None if valid else "invalid address",
+            "attempts": 0,
+        })
+    job = {
+        "id": job_id,
+        "created_by": created_by,
+        "company_id": company_id,
+        "subject": subject,
+        "body_template": body_template,
+        "is_html": is_html,
+        "from_name": from_name,
+        "attachments": attachments or [],
+        "total": len(rows),
+        "sent": 0,
+        "failed": invalid,
+        "status": "running",
+        "owner": _OWNER,
+        "lease_until": (datetime.now(timezone.utc) + timedelta(seconds=LEASE_SEC)).isoformat(),
+        "runs": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    await db.bulk_mail_jobs.insert_one(dict(job))
+    for i in range(0, len(rows), 1000):
+        await db.bulk_mail_recipients.insert_many(rows[i:i + 1000], ordered=False)
+    return job
+
+
+class _Progress:
+    """Buffers per-recipient results and writes them (and the lease) in batches."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.rows: List[Tuple[str, Dict[str, Any]]] = []
+        self.lost_lease = False
+        self._lock = asyncio.Lock()
+
+    def add(self, rec_id: str, status: str, attempts: int, error: Optional[str] = None):
+        self.rows.append((rec_id, {"status": status, "attempts": attempts, "error": error, "done_at": _now_iso()}))
+
+    async def flush(self, final: Optional[Dict[str, Any]] = None):
+        async with self._lock:
+            rows, self.rows = self.rows, []
+            if rows:
+                try:
+                    await db.bulk_mail_recipients.bulk_write(
+                        [UpdateOne({"_id": rec_id}, {"$set": fields}) for rec_id, fields in rows], ordered=False
+                    )
+                except Exception:
+                    self.rows[:0] = rows  # retried by the next flush
+                    raise
+            update: Dict[str, Any] = {"$set": {"updated_at": _now_iso()}}
+            if final:
+                update["$set"].update(final)
+            else:
+                update["$set"]["lease_until"] = (datetime.now(timezone.utc) + timedelta(seconds=LEASE_SEC)).isoformat()
+            sent = sum(1 for _, f in rows if f["status"] == "sent")
+            if rows:
+                update["$inc"] = {"sent": sent, "failed": len(rows) - sent}
+            res = await db.bulk_mail_jobs.update_one({"id": self.job_id, "owner": _OWNER}, update)
+            if res.matched_count == 0:
+                self.lost_lease = True
+
+
+_running: set = set()
+_background: set = set()
+
+
+async def _claim(job_id: str) -> Optional[Dict[str, Any]]:
+    now = _now_iso()
+    return await db.bulk_mail_jobs.find_one_and_update(
+        {
+            "id": job_id,
+            "status": "running",
+            "$or": [{"owner": _OWNER}, {"lease_until": None}, {"lease_until": {"$lt": now}}],
+        },
+        {
+            "$set": {
+                "owner": _OWNER,
+                "lease_until": (datetime.now(timezone.utc) + timedelta(seconds=LEASE_SEC)).isoformat(),
+                "updated_at": now,
+            },
+            "$inc": {"runs": 1},
+        },
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def job_summary(job_id: str) -> Optional[Dict[str, Any]]:
+    job = await db.bulk_mail_jobs.find_one({"id": job_id}, {"_id": 0, "attachments": 0, "body_template": 0})
+    if not job:
+        return None
+    failed = await db.bulk_mail_recipients.find(
+        {"job_id": job_id, "status": "failed"}, {"_id": 0, "email": 1, "error": 1}
+    ).sort("idx", 1).limit(20).to_list(20)
+    pending = await db.bulk_mail_recipients.count_documents({"job_id": job_id, "status": "pending"})
+    return {**job, "pending": pending, "failed_list": failed}
+
+
+async def run_job(job_id: str, *, throttle: Optional[DomainThrottle] = None) -> Optional[Dict[str, Any]]:
+    """Send every still-pending recipient of a job. Returns the job summary,
+    or None if the job is finished or leased by another worker."""
+    if job_id in _running:
+        return None
+    job = await _claim(job_id)
+    if not job:
+        return None
+    _running.add(job_id)
+    try:
+        await _run_claimed(job, throttle)
+    finally:
+        _running.discard(job_id)
+    return await job_summary(job_id)
+
+
+def start_job(job_id: str) -> asyncio.Task:
+    """Run a job in the background (the task is kept referenced until it ends)."""
+    task = asyncio.ensure_future(run_job(job_id))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+async def _run_claimed(job: Dict[str, Any], throttle: Optional[DomainThrottle]):
+    job_id = job["id"]
+    progress = _Progress(job_id)
+    smtp = await company_smtp_settings(job.get("company_id"), job.get("from_name") or "")
+    if not smtp:
+        await progress.flush({"status": "failed", "error": "Company SMTP is not configured", "lease_until": None})
+        return
+
+    pool = get_pool(smtp["host"], smtp["port"], smtp["user"], smtp["password"])
+    from_name = job.get("from_name") or smtp["from_name"]
+    attachments = decode_attachments(job.get("attachments"))
+    pending = await db.bulk_mail_recipients.find(
+        {"job_id": job_id, "status": "pending"}
+    ).sort("idx", 1).to_list(None)
+    abort: Dict[str, BaseException] = {}
+
+    async def deliver(rec: Dict[str, Any]):
+        if abort or progress.lost_lease:
+            return
+        def build() -> Message:
+            vars_ = {"name": rec.get("name", ""), "email": rec["email"], **(rec.get("variables") or {})}
+            body = render_template(job["body_template"], vars_)
+            return build_message(
+                smtp["user"], from_name, rec["email"], render_template(job["subject"], vars_),
+                html_to_plain(body) if job.get("is_html") else body,
+                body if job.get("is_html") else None,
+                attachments,
+            )
+
+        try:
+            attempts = await send_with_retry(pool, build, smtp["user"], rec["email"], throttle)
+        except Exception as e:
+            # A connection-level error that outlived every retry means the
+            # server is unreachable, not that this address is bad: stop and
+            # leave the rest pending for a resume.
+            unreachable = _is_transient(e) and not isinstance(
+                e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused))
+            if _is_fatal(e) or unreachable:
+                abort.setdefault("error", e)
+                return
+            progress.add(rec["_id"], "failed", MAX_ATTEMPTS if _is_transient(e) else 1, str(e))
+            logger.error(f"[BulkMail] job {job_id}: {rec['email']} failed: {e}")
+        else:
+            progress.add(rec["_id"], "sent", attempts)
+        if len(progress.rows) >= PROGRESS_BATCH:
+            await progress.flush()
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for rec in pending:
+        queue.put_nowait(rec)
+
+    async def worker():
+        while not queue.empty():
+            await deliver(queue.get_nowait())
+
+    async def heartbeat():
+        # A failed flush must not end the loop: once the lease lapses a
+        # resume re-claims the job and sends to the same recipients again.
+        while not progress.lost_lease:
+            await asyncio.sleep(PROGRESS_INTERVAL_SEC)
+            try:
+                await progress.flush()
+            except Exception as e:
+                logger.error(f"[BulkMail] job {job_id}: progress flush failed: {e}")
+
+    beat = asyncio.ensure_future(heartbeat())
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(WORKERS, len(pending)))]
+    try:
+        await asyncio.gather(*workers)
+    except Exception as e:
+        # Anything deliver() does not handle (a progress write failing, say)
+        # stops the run rather than leaving the other workers sending.
+        logger.exception(f"[BulkMail] job {job_id}: worker crashed")
+        abort.setdefault("error", e)
+    finally:
+        beat.cancel()
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    # Reached only if the run was not cancelled; a cancelled run stays
+    # "running" and is picked up again once its lease expires.
+    if abort:
+        err = abort["error"]
+        logger.error(f"[BulkMail] job {job_id} aborted: {err}")
+        await progress.flush({"status": "failed", "error": str(err), "lease_until": None})
+    elif progress.lost_lease:
+        logger.warning(f"[BulkMail] job {job_id}: lease lost, another worker took over")
+        await progress.flush()
+    else:
+        await progress.flush()
+        left = await db.bulk_mail_recipients.count_documents({"job_id": job_id, "status": "pending"})
+        if left:
+            await progress.flush({"status": "failed", "error": f"{left} recipients left pending", "lease_until": None})
+        else:
+            await progress.flush({"status": "completed", "finished_at": _now_iso(), "lease_until": None})
+
+
+async def resume_bulk_mail_jobs():
+    """Job runner entry point: pick up jobs whose worker died mid-send.
+
+    Each job is handed to `start_job`, at most MAX_RUNNING_JOBS at a time on
+    this worker; the rest wait for a later run."""
+    slots = MAX_RUNNING_JOBS - len(_background)
+    if slots <= 0:
+        return
+    stale = await db.bulk_mail_jobs.find(
+        {"status": "running", "lease_until": {"$lt": _now_iso()}}, {"_id": 0, "id": 1}
+    ).to_list(slots)
+    for job in stale:
+        if job["id"] not in _running:
+            logger.info(f"[BulkMail] resuming job {job['id']}")
+            start_job(job["id"])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ROUTES
+# ─────────────────────────────────────────────────────────────────────────────
+
+router = APIRouter(prefix="/email/bulk-jobs", tags=["Bulk Mail"])
+
+
+async def _own_job(job_id: str, user: User) -> Dict[str, Any]:
+    summary = await job_summary(job_id)
+    if not summary or (user.role != "admin" and summary.get("created_by") != user.id):
+        raise HTTPException(404, "Bulk mail job not found")
+    return summary
+
+
+@router.get("/{job_id}")
+async def get_bulk_mail_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Progress of a bulk send: counters, pending count and the first failures."""
+    return await _own_job(job_id, current_user)
+
+
+@router.post("/{job_id}/resume")
+async def resume_bulk_mail_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """Continue a failed or interrupted job with its still-pending recipients."""
+    summary = await _own_job(job_id, current_user)
+    if summary["status"] == "completed" or not summary["pending"]:
+        return {"resumed": False, "job": summary}
+    await db.bulk_mail_jobs.update_one(
+        {"id": job_id, "status": "failed"},
+        {"$set": {"status": "running", "lease_until": None, "error": None, "updated_at": _now_iso()}},
+    )
+    start_job(job_id)
+    return {"resumed": True, "job_id": job_id}
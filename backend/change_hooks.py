@@ -0,0 +1,38 @@
+"""
+change_hooks.py
+────────────────────────────────────────────────────────────────────────────────
+One write-site hook for the derived views of `clients`, `dsc_register` and
+`tasks`, so a write site cannot update some of them and forget the rest:
+
+  clients  dashboard counters, search index, party index, client calendar,
+           sync tombstones
+  dsc      dashboard counters, client calendar
+  tasks    dashboard counters, search index, sync tombstones
+
+A single-record write calls `record_change(kind, before, after)` (before None
+for an insert, after None for a delete); a bulk write (update_many,
+insert_many, merges) calls `mark_dirty(kind)` and each view's reconciler
+rebuilds the kind. Neither raises: every view falls back to marking itself
+dirty.
+"""
+
+from typing import Any, Dict, Optional
+
+from backend import client_calendar, dashboard_counters, list_sync
+from backend.search import party_index, search_index
+
+VIEWS = {
+    "clients": (dashboard_counters, search_index, party_index, client_calendar, list_sync),
+    "dsc": (dashboard_counters, client_calendar),
+    "tasks": (dashboard_counters, search_index, list_sync),
+}
+
+
+async def record_change(kind: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    for view in VIEWS[kind]:
+        await view.record_change(kind, before, after)
+
+
+async def mark_dirty(kind: str):
+    for view in VIEWS[kind]:
+        await view.mark_dirty(kind)
@@ -0,0 +1,250 @@
+"""
+client_calendar.py
+────────────────────────────────────────────────────────────────────────────────
+Maintained, indexed (month, day) projection of the dates the daily greeting
+and alert jobs fire on.
+
+The birthday jobs used to load up to 5000 full client documents every
+morning and parse every contact person's birthday in Python; the DSC alert
+job looked up each certificate's client one by one. Instead each dated item
+gets one small entry in `client_calendar`:
+
+  _id        "bday:<client id>:<n>" | "dsc:<dsc id>"
+  kind       birthday | dsc_expiry
+  source     "<source kind>:<record id>" — every entry derived from one record
+  month, day calendar day (birthdays repeat yearly)
+  date       the full "YYYY-MM-DD" (expiries are matched on it)
+  client_id  owning client
+  name, phone, email       for birthdays: the person to greet
+  ref_id, holder, serial   for DSC expiries
+
+Birthdays come from `personal_birthday_candidates()` (the client itself only
+for proprietors, plus every contact person), the same rule the dashboard
+counters use. The jobs query `{kind, month, day}` or `{kind, date: {$in}}`
+and then load only the few clients involved.
+
+Write sites call `record_change(kind, before, after)` next to the matching
+dashboard counter / search index hook ("clients" or "dsc"); bulk writes call
+`mark_dirty(kind)` and the reconciler (job runner, every 5 min) rebuilds the
+kind; every kind is also rebuilt every 6 h to repair drift from writes
+without a hook. Until a kind has been built, the lookups return None and
+callers fall back to scanning the source collection. A rebuild upserts
+what it read, possibly before a write that moved or removed an entry, so a
+record_change made while one runs (`rebuilding_<kind>` in the meta doc)
+marks the kind dirty again.
+"""
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from backend.dependencies import db, personal_birthday_candidates
+from backend.index_manifest import ensure_indexes, index
+
+logger = logging.getLogger("client_calendar")
+
+KINDS = ("clients", "dsc")
+META_ID = "meta"
+FULL_REBUILD_EVERY = timedelta(hours=6)
+REBUILD_LEASE = timedelta(minutes=30)    # a crashed rebuild stops flagging writes after this
+
+_CLIENT_FIELDS = {"_id": 0, "id": 1, "birthday": 1, "client_type": 1, "contact_persons": 1,
+                  "company_name": 1, "email": 1, "phone": 1}
+_DSC_FIELDS = {"_id": 0, "id": 1, "client_id": 1, "expiry_date": 1, "holder_name": 1,
+               "serial_number": 1, "certificate_number": 1}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ENTRIES — what one source document contributes
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _as_date(raw: Any) -> Optional[date]:
+    try:
+        if isinstance(raw, datetime):
+            return raw.date()
+        if isinstance(raw, date):
+            return raw
+        return date.fromisoformat(str(raw)[:10])
+    except (ValueError, TypeError):
+        return None
+
+
+def _dated(d: date) -> Dict[str, Any]:
+    return {"month": d.month, "day": d.day, "date": d.isoformat()}
+
+
+def _client_entries(client: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    entries = {}
+    client_id = client.get("id")
+    for n, person in enumerate(personal_birthday_candidates(client)):
+        bday = _as_date(person["birthday"])
+        if not bday or not client_id:
+            continue
+        entries[f"bday:{client_id}:{n}"] = {
+            "kind": "birthday",
+            "source": f"clients:{client_id}",
+            "client_id": client_id,
+            "name": person.get("name"),
+            "phone": person.get("phone"),
+            "email": person.get("email"),
+            **_dated(bday),
+        }
+    return entries
+
+
+def _dsc_entries(dsc: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    expiry = _as_date(dsc.get("expiry_date"))
+    if not expiry or not dsc.get("id"):
+        return {}
+    return {f"dsc:{dsc['id']}": {
+        "kind": "dsc_expiry",
+        "source": f"dsc:{dsc['id']}",
+        "ref_id": dsc["id"],
+        "client_id": dsc.get("client_id"),
+        "holder": dsc.get("holder_name"),
+        "serial": dsc.get("serial_number") or dsc.get("certificate_number"),
+        **_dated(expiry),
+    }}
+
+
+_ENTRIES = {"clients": _client_entries, "dsc": _dsc_entries}
+_SOURCE = {"clients": ("clients", _CLIENT_FIELDS), "dsc": ("dsc_register", _DSC_FIELDS)}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WRITE PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def record_change(kind: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """
+    Re-derive the entries of one written record. Never raises: on failure the
+    kind is marked dirty and the reconciler rebuilds it.
+    """
+    try:
+        entries = _ENTRIES[kind]
+        old = entries(before) if before else {}
+        new = entries(after) if after else {}
+        if old == new:
+            return
+        gone = [eid for eid in old if eid not in new]
+        if gone:
+            await db.client_calendar.delete_many({"_id": {"$in": gone}})
+        changed = [UpdateOne({"_id": eid}, {"$set": e}, upsert=True)
+                   for eid, e in new.items() if old.get(eid) != e]
+        if changed:
+            await db.client_calendar.bulk_write(changed, ordered=False)
+        if await db.client_calendar.find_one(
+                {"_id": META_ID, f"rebuilding_{kind}": {"$gt": datetime.now(timezone.utc)}}, {"_id": 1}):
+            await mark_dirty(kind)
+    except Exception as e:
+        logger.warning(f"Client calendar update for {kind} failed, marking dirty: {e}")
+        await mark_dirty(kind)
+
+
+async def mark_dirty(kind: str):
+    try:
+        await db.client_calendar.update_one(
+            {"_id": META_ID}, {"$set": {f"dirty_{kind}": True}}, upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Could not mark client calendar dirty for {kind}: {e}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# REBUILD / RECONCILE
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def rebuild(kind: str) -> int:
+    """Recompute every entry of one source kind from its collection."""
+    collection, projection = _SOURCE[kind]
+    entries = _ENTRIES[kind]
+    # The scan may read a record just before a write moves or deletes one of
+    # its entries; its upsert below would then put the old entry back. Flag
+    # the rebuild so such a write marks the kind dirty for another pass.
+    await db.client_calendar.update_one(
+        {"_id": META_ID},
+        {"$set": {f"dirty_{kind}": False, f"rebuilding_{kind}": datetime.now(timezone.utc) + REBUILD_LEASE}},
+        upsert=True,
+    )
+
+    prefix = "clients:" if kind == "clients" else "dsc:"
+    existing = {d["_id"] for d in await db.client_calendar.find(
+        {"source": {"$regex": f"^{prefix}"}}, {"_id": 1}).to_list(None)}
+    seen = set()
+    ops = []
+    async for doc in db[collection].find({}, projection):
+        for eid, e in entries(doc).items():
+            seen.add(eid)
+            ops.append(UpdateOne({"_id": eid}, {"$set": e}, upsert=True))
+            if len(ops) >= 1000:
+                await db.client_calendar.bulk_write(ops, ordered=False)
+                ops = []
+    if ops:
+        await db.client_calendar.bulk_write(ops, ordered=False)
+    gone = list(existing - seen)
+    if gone:
+        await db.client_calendar.delete_many({"_id": {"$in": gone}})
+
+    await db.client_calendar.update_one(
+        {"_id": META_ID},
+        {"$set": {f"built_{kind}": datetime.now(timezone.utc), f"rebuilding_{kind}": None}},
+        upsert=True,
+    )
+    logger.info(f"Client calendar rebuilt for {kind}: {len(seen)} entries")
+    return len(seen)
+
+
+async def reconcile_client_calendar():
+    """Job-runner entry point: rebuild kinds that are dirty, missing or due for a full pass."""
+    meta = await db.client_calendar.find_one({"_id": META_ID}) or {}
+    now = datetime.now(timezone.utc)
+    for kind in KINDS:
+        built = meta.get(f"built_{kind}")
+        if isinstance(built, datetime) and built.tzinfo is None:
+            built = built.replace(tzinfo=timezone.utc)
+        if meta.get(f"dirty_{kind}") or not built or now - built > FULL_REBUILD_EVERY:
+            try:
+                await rebuild(kind)
+            except Exception as e:
+                logger.error(f"Client calendar rebuild for {kind} failed: {e}", exc_info=True)
+
+
+INDEXES = [
+    index("client_calendar", [("kind", 1), ("month", 1), ("day", 1)]),
+    index("client_calendar", [("kind", 1), ("date", 1)]),
+    index("client_calendar", "source"),
+]
+
+
+async def create_client_calendar_indexes():
+    """Create MongoDB indexes for the client calendar projection."""
+    await ensure_indexes(INDEXES)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# READ PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _built(kind: str) -> bool:
+    meta = await db.client_calendar.find_one({"_id": META_ID}, {f"built_{kind}": 1})
+    return bool((meta or {}).get(f"built_{kind}"))
+
+
+async def birthdays_on(day: date) -> Optional[List[Dict[str, Any]]]:
+    """Birthday entries falling on `day`'s calendar day, or None if not built yet."""
+    if not await _built("clients"):
+        return None
+    return await db.client_calendar.find(
+        {"kind": "birthday", "month": day.month, "day": day.day}, {"_id": 0}
+    ).to_list(None)
+
+
+async def dsc_expiring_on(days: Iterable[date]) -> Optional[List[Dict[str, Any]]]:
+    """DSC expiry entries on any of `days`, or None if not built yet."""
+    if not await _built("dsc"):
+        return None
+    return await db.client_calendar.find(
+        {"kind": "dsc_expiry", "date": {"$in": [d.isoformat() for d in days]}}, {"_id": 0}
+    ).to_list(None)
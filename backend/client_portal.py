@@ -23,7 +23,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile
 from fastapi.responses import StreamingResponse, JSONResponse
 import io
 from pydantic import BaseModel, EmailStr, Field
-from passlib.context import CryptContext
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from jose import jwt, JWTError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
@@ -35,6 +36,7 @@ from backend.dependencies import (
     get_user_permissions,
 )
 from backend.models import User
+from backend import drive_mirror, password_hashing
 # Reuse the same Brevo-backed OTP emailer the main-app forgot-password flow
 # uses, so client portal password resets need no separate email infra.
 from backend.auth_password_reset import _send_otp_email
@@ -71,9 +73,6 @@ router = APIRouter(prefix="/client-portal", tags=["client-portal"])
 DRIVE_LIST_SEMAPHORE = asyncio.Semaphore(3)
 DRIVE_UPLOAD_SEMAPHORE = asyncio.Semaphore(1)
 
-# ── password hashing ──────────────────────────────────────────────────────
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # ── JWT helper (shared secret with main app) ──────────────────────────────
 def create_client_token(data: dict, expires_minutes: int = 60 * 24 * 7) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
@@ -139,48 +138,70 @@ async def _sync_portal_password(
         {"client_id": client_id},
         {"$set": {"password_encrypted": encrypted}},
     )
+    await _upsert_vault_entries(
+        [{"client_id": client_id, "client_name": client_name,
+          "portal_username": portal_username, "encrypted": encrypted}],
+        current_user,
+    )
+
 
+async def _upsert_vault_entries(rows: List[dict], current_user: Optional[User] = None):
+    """
+    Batched Password Vault side of `_sync_portal_password`: one lookup and
+    one bulk write for any number of rows of
+    {client_id, client_name, portal_username, encrypted}.
+    """
+    by_client = {r["client_id"]: r for r in rows if r.get("client_id")}
+    if not by_client:
+        return
     now = datetime.now(timezone.utc).isoformat()
-    existing = await db.passwords.find_one(
-        {"client_id": client_id, "_auto_client_portal": True}, {"_id": 0, "id": 1}
-    )
-    if existing:
-        await db.passwords.update_one(
-            {"id": existing["id"]},
-            {"$set": {
-                "username": portal_username,
-                "password_encrypted": encrypted,
+    existing = {
+        d["client_id"]: d["id"]
+        for d in await db.passwords.find(
+            {"client_id": {"$in": list(by_client)}, "_auto_client_portal": True},
+            {"_id": 0, "id": 1, "client_id": 1},
+        ).to_list(len(by_client))
+    }
+    ops = []
+    for client_id, r in by_client.items():
+        if client_id in existing:
+            ops.append(UpdateOne(
+                {"id": existing[client_id]},
+                {"$set": {
+                    "username": r["portal_username"],
+                    "password_encrypted": r["encrypted"],
+                    "_password_set": True,
+                    "client_name": r["client_name"],
+                    "updated_at": now,
+                }},
+            ))
+        else:
+            ops.append(InsertOne({
+                "id": str(uuid.uuid4()),
+                "portal_name": "Client Portal",
+                "portal_type": "OTHER",
+                "url": None,
+                "username": r["portal_username"],
+                "password_encrypted": r["encrypted"],
                 "_password_set": True,
-                "client_name": client_name,
+                "department": "OTHER",
+                "holder_type": "COMPANY",
+                "holder_name": None,
+                "holder_pan": None,
+                "holder_din": None,
+                "mobile": None,
+                "trade_name": None,
+                "client_name": r["client_name"],
+                "client_id": client_id,
+                "notes": "Auto-synced from Client Portal login setup.",
+                "tags": ["client-portal"],
+                "_auto_client_portal": True,
+                "created_by": current_user.id if current_user else "system",
+                "created_at": now,
                 "updated_at": now,
-            }},
-        )
-    else:
-        await db.passwords.insert_one({
-            "id": str(uuid.uuid4()),
-            "portal_name": "Client Portal",
-            "portal_type": "OTHER",
-            "url": None,
-            "username": portal_username,
-            "password_encrypted": encrypted,
-            "_password_set": True,
-            "department": "OTHER",
-            "holder_type": "COMPANY",
-            "holder_name": None,
-            "holder_pan": None,
-            "holder_din": None,
-            "mobile": None,
-            "trade_name": None,
-            "client_name": client_name,
-            "client_id": client_id,
-            "notes": "Auto-synced from Client Portal login setup.",
-            "tags": ["client-portal"],
-            "_auto_client_portal": True,
-            "created_by": current_user.id if current_user else "system",
-            "created_at": now,
-            "updated_at": now,
-            "last_accessed_at": now,
-        })
+                "last_accessed_at": now,
+            }))
+    await db.passwords.bulk_write(ops, ordered=False)
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -276,7 +297,7 @@ async def create_portal_user(
         "id": str(uuid.uuid4()),
         "client_id": body.client_id,
         "portal_username": body.portal_username.lower(),
-        "hashed_password": pwd_context.hash(body.portal_password),
+        "hashed_password": await password_hashing.hash_password(body.portal_password),
         "email": body.email,
         "display_name": body.display_name or client_doc.get("company_name", ""),
         "is_active": True,
@@ -330,7 +351,7 @@ async def update_portal_user(
 
     update: dict = {}
     if body.portal_password:
-        update["hashed_password"] = pwd_context.hash(body.portal_password)
+        update["hashed_password"] = await password_hashing.hash_password(body.portal_password)
     if body.display_name is not None:
         update["display_name"] = body.display_name
     if body.is_active is not None:
@@ -407,22 +428,12 @@ class BulkPasswordResetRequest(BaseModel):
     password_length: int = 12
 
 
-async def _reset_one_portal_user(pu: dict, new_password: str, current_user: User) -> dict:
-    await db.client_portal_users.update_one(
-        {"id": pu["id"]},
-        {"$set": {
-            "hashed_password": pwd_context.hash(new_password),
-            "password_reset_at": datetime.now(timezone.utc).isoformat(),
-            "password_reset_by": current_user.id,
-        }},
-    )
-    await _sync_portal_password(
-        client_id=pu.get("client_id"),
-        client_name=pu.get("display_name") or pu.get("client_name") or "",
-        portal_username=pu.get("portal_username"),
-        plain_password=new_password,
-        current_user=current_user,
-    )
+# Accounts per pipeline step: hashed concurrently on the bulk pool, then
+# written with one bulk_write per collection.
+BULK_RESET_CHUNK = 200
+
+
+def _reset_row(pu: dict, new_password: str) -> dict:
     return {
         "portal_user_id": pu["id"],
         "client_id": pu.get("client_id"),
@@ -433,6 +444,84 @@ async def _reset_one_portal_user(pu: dict, new_password: str, current_user: User
     }
 
 
+def _reset_failure(pu: dict, error: str) -> dict:
+    return {
+        "portal_user_id": pu.get("id"),
+        "portal_username": pu.get("portal_username"),
+        "error": error,
+    }
+
+
+async def _reset_portal_users(docs: List[dict], body: "BulkPasswordResetRequest", current_user: User):
+    """
+    Reset many portal logins. Per chunk: hash every new password in
+    parallel off the event loop, write hashes + encrypted copies in one
+    bulk_write, then mirror the chunk into the Password Vault in one more.
+    Returns (results, failures).
+    """
+    results: List[dict] = []
+    failures: List[dict] = []
+    for start in range(0, len(docs), BULK_RESET_CHUNK):
+        chunk = docs[start:start + BULK_RESET_CHUNK]
+        passwords = [body.new_password or _generate_portal_password(body.password_length) for _ in chunk]
+        hashes = await password_hashing.hash_many(passwords)
+
+        now = datetime.now(timezone.utc).isoformat()
+        staged = []
+        for pu, plain, hashed in zip(chunk, passwords, hashes):
+            if isinstance(hashed, Exception):
+                logger.error("Bulk portal password reset: hashing failed for %s: %s", pu.get("id"), hashed)
+                failures.append(_reset_failure(pu, str(hashed)))
+                continue
+            staged.append((pu, plain, hashed, _vault_encrypt(plain)))
+        if not staged:
+            continue
+
+        ops = [
+            UpdateOne({"id": pu["id"]}, {"$set": {
+                "hashed_password": hashed,
+                "password_encrypted": encrypted,
+                "password_reset_at": now,
+                "password_reset_by": current_user.id,
+            }})
+            for pu, _, hashed, encrypted in staged
+        ]
+        failed_idx: dict = {}
+        try:
+            await db.client_portal_users.bulk_write(ops, ordered=False)
+        except BulkWriteError as bwe:
+            failed_idx = {e["index"]: e.get("errmsg", "write failed")
+                          for e in bwe.details.get("writeErrors", [])}
+        except Exception as exc:
+            logger.exception("Bulk portal password reset: write failed for %d accounts", len(staged))
+            failures.extend(_reset_failure(pu, str(exc)) for pu, *_ in staged)
+            continue
+
+        written = []
+        for i, (pu, plain, _, encrypted) in enumerate(staged):
+            if i in failed_idx:
+                failures.append(_reset_failure(pu, failed_idx[i]))
+            else:
+                written.append((pu, plain, encrypted))
+
+        try:
+            await _upsert_vault_entries([
+                {"client_id": pu.get("client_id"),
+                 "client_name": pu.get("display_name") or pu.get("client_name") or "",
+                 "portal_username": pu.get("portal_username"),
+                 "encrypted": encrypted}
+                for pu, _, encrypted in written
+            ], current_user)
+        except Exception as exc:
+            # Logins were reset; only the vault mirror is behind. Report it
+            # like a single reset would, so the admin can re-run these.
+            logger.exception("Bulk portal password reset: vault sync failed")
+            failures.extend(_reset_failure(pu, f"vault sync failed: {exc}") for pu, *_ in written)
+            continue
+        results.extend(_reset_row(pu, plain) for pu, plain, _ in written)
+    return results, failures
+
+
 async def _select_portal_users(body: BulkPasswordResetRequest) -> List[dict]:
     query: dict = {}
     if not body.all_users:
@@ -465,19 +554,7 @@ async def bulk_reset_portal_passwords(
         raise HTTPException(403, "You do not have the 'Password Reset' permission")
 
     docs = await _select_portal_users(body)
-    results: List[dict] = []
-    failures: List[dict] = []
-    for pu in docs:
-        try:
-            new_password = body.new_password or _generate_portal_password(body.password_length)
-            results.append(await _reset_one_portal_user(pu, new_password, current_user))
-        except Exception as exc:  # keep going; report per-row
-            logger.exception("Bulk portal password reset failed for %s", pu.get("id"))
-            failures.append({
-                "portal_user_id": pu.get("id"),
-                "portal_username": pu.get("portal_username"),
-                "error": str(exc),
-            })
+    results, failures = await _reset_portal_users(docs, body, current_user)
 
     await db.password_access_logs.insert_one({
         "id": str(uuid.uuid4()),
@@ -624,7 +701,7 @@ async def client_portal_login(body: PortalLoginRequest):
     doc = await db.client_portal_users.find_one(
         {"portal_username": body.username.lower()}, {"_id": 0}
     )
-    if not doc or not pwd_context.verify(body.password, doc["hashed_password"]):
+    if not doc or not await password_hashing.verify_password(body.password, doc.get("hashed_password")):
         raise HTTPException(401, "Invalid username or password")
     if not doc.get("is_active", True):
         raise HTTPException(403, "Account is disabled. Contact your account manager.")
@@ -744,7 +821,7 @@ async def portal_reset_password(body: PortalResetPasswordRequest):
         await db.client_portal_reset_tokens.delete_many({"portal_user_id": portal_user["id"]})
         raise HTTPException(400, "Code has expired. Please request a new one.")
 
-    hashed = pwd_context.hash(body.new_password)
+    hashed = await password_hashing.hash_password(body.new_password)
     await db.client_portal_users.update_one(
         {"id": portal_user["id"]}, {"$set": {"hashed_password": hashed}}
     )
@@ -802,9 +879,9 @@ async def update_portal_self(
         if not body.current_password:
             raise HTTPException(400, "Current password is required to set a new password.")
         doc = await db.client_portal_users.find_one({"id": portal_user["id"]}, {"_id": 0})
-        if not doc or not pwd_context.verify(body.current_password, doc["hashed_password"]):
+        if not doc or not await password_hashing.verify_password(body.current_password, doc.get("hashed_password")):
             raise HTTPException(400, "Current password is incorrect.")
-        update["hashed_password"] = pwd_context.hash(body.new_password)
+        update["hashed_password"] = await password_hashing.hash_password(body.new_password)
 
     if not update:
         raise HTTPException(400, "Nothing to update.")
@@ -892,41 +969,44 @@ def _extract_folder_id(value):
     return value
 
 
-def _fetch_drive_files_raw(folder_id: str, include_subfolders: bool = True) -> list:
+async def _fetch_drive_files(folder_id: str) -> list:
     """
-    Lists files and folders inside a given Drive folder.
-    Returns both regular files and subfolders so the client can navigate.
+    Lists files and folders inside a given Drive folder, live from Drive
+    (every page). Returns both regular files and subfolders so the client
+    can navigate.
     """
-    from backend.invoicing import _get_drive_service, _drive_configured
-
-    if not _drive_configured():
+    if not await asyncio.get_running_loop().run_in_executor(None, drive_mirror.get_backend().configured):
         raise HTTPException(
             503,
             "Google Drive not configured. Set GOOGLE_REFRESH_TOKEN, "
             "GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET in your environment."
         )
+    return await drive_mirror.live_list(folder_id)
 
-    service = _get_drive_service()
-    result = service.files().list(
-        q=f"'{folder_id}' in parents and trashed = false",
-        fields="files(id,name,mimeType,size,modifiedTime,webViewLink,iconLink)",
-        orderBy="folder,name",
-        pageSize=500
-    ).execute()
-    return result.get("files", [])
+
+async def _list_drive_folder(
+    folder_id: str,
+    root_folder_id: str,
+    hidden_ids=(),
+    cursor: Optional[str] = None,
+    limit: int = 500,
+):
+    """
+    One page of a folder inside a linked root from the Drive mirror when
+    that root has been synced. Otherwise every item, live from Drive, with
+    no next page. Returns (files, next_cursor).
+    """
+    page = await drive_mirror.list_folder(folder_id, root_folder_id, hidden_ids, cursor, limit)
+    if page is not None:
+        return page
+    hidden = set(hidden_ids)
+    files = await _fetch_drive_files(folder_id)
+    return [f for f in files if f["id"] not in hidden], None
 
 
-def _get_folder_name(folder_id: str) -> str:
+async def _get_folder_name(folder_id: str) -> str:
     """Get the display name of a Drive folder by its ID."""
-    try:
-        from backend.invoicing import _get_drive_service, _drive_configured
-        if not _drive_configured():
-            return folder_id
-        service = _get_drive_service()
-        result = service.files().get(fileId=folder_id, fields="id,name").execute()
-        return result.get("name", folder_id)
-    except Exception:
-        return folder_id
+    return await drive_mirror.folder_name(folder_id) or folder_id
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -937,11 +1017,14 @@ def _get_folder_name(folder_id: str) -> str:
 async def admin_list_drive_files(
     portal_user_id: str,
     folder_id: Optional[str] = Query(None, description="Subfolder ID to browse (defaults to client's root folder)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(500, ge=1, le=1000),
     current_user: User = Depends(get_current_user),
 ):
     """
     Admin endpoint – list ALL files in the portal user's linked Drive folder
     (or a subfolder), annotated with their current visibility setting.
+    Paged: follow `next_cursor` until it is null.
     """
     if not _can_manage_portal(current_user):
         raise HTTPException(403, "Insufficient permissions")
@@ -957,9 +1040,8 @@ async def admin_list_drive_files(
     # Browse the requested subfolder or fall back to root
     browse_id = folder_id if folder_id else root_folder_id
 
-    loop = asyncio.get_running_loop()
     async with DRIVE_LIST_SEMAPHORE:
-        files = await loop.run_in_executor(None, _fetch_drive_files_raw, browse_id)
+        files, next_cursor = await _list_drive_folder(browse_id, root_folder_id, cursor=cursor, limit=limit)
 
     # Load existing visibility config
     vis_doc = await db.client_drive_visibility.find_one(
@@ -977,6 +1059,7 @@ async def admin_list_drive_files(
         "current_folder_id": browse_id,
         "hidden_ids": list(hidden_ids),
         "portal_user_id": portal_user_id,
+        "next_cursor": next_cursor,
     }
 
 
@@ -1053,11 +1136,24 @@ async def admin_visibility_summary(
     portal_user_id: str,
     current_user: User = Depends(get_current_user),
 ):
-    """Returns the raw visibility config for a portal user."""
+    """
+    Returns the raw visibility config for a portal user. Once the linked
+    folder is mirrored, also the hidden items that still exist (with names)
+    and the total number of items under the folder.
+    """
     if not _can_manage_portal(current_user):
         raise HTTPException(403, "Insufficient permissions")
     doc = await db.client_drive_visibility.find_one({"portal_user_id": portal_user_id}, {"_id": 0})
-    return doc or {"portal_user_id": portal_user_id, "hidden_ids": []}
+    doc = doc or {"portal_user_id": portal_user_id, "hidden_ids": []}
+
+    portal_user = await db.client_portal_users.find_one(
+        {"id": portal_user_id}, {"_id": 0, "google_drive_folder_id": 1}
+    )
+    root_folder_id = (portal_user or {}).get("google_drive_folder_id")
+    if root_folder_id and await drive_mirror.root_ready(root_folder_id):
+        doc["hidden_files"] = await drive_mirror.hidden_entries(root_folder_id, doc.get("hidden_ids", []))
+        doc["total_items"] = await drive_mirror.count_entries(root_folder_id)
+    return doc
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -1116,7 +1212,7 @@ async def get_portal_settings(
     # separate round trip.
     folder_id = _extract_folder_id(doc.get("root_drive_folder"))
     doc["root_drive_folder_id"] = folder_id
-    doc["root_drive_folder_name"] = _get_folder_name(folder_id) if folder_id else None
+    doc["root_drive_folder_name"] = await _get_folder_name(folder_id) if folder_id else None
     return doc
 
 
@@ -1638,7 +1734,7 @@ async def link_existing_drive_folder(
     # Try to resolve the folder name from Drive if not explicitly provided
     folder_name = (body.folder_name or "").strip() or None
     if not folder_name:
-        folder_name = _get_folder_name(folder_id)
+        folder_name = await _get_folder_name(folder_id)
     if not folder_name or folder_name == folder_id:
         # Fall back to company name if Drive lookup fails (no credentials / wrong scope)
         folder_name = client_doc.get("company_name") or client_doc.get("name") or "My Documents"
@@ -1746,7 +1842,7 @@ async def admin_browse_drive_folder(
         raise HTTPException(400, "Please provide a valid Drive folder ID or share link.")
 
     try:
-        files = _fetch_drive_files_raw(resolved_folder_id)
+        files = await _fetch_drive_files(resolved_folder_id)
     except Exception as exc:
         raise HTTPException(503, f"Could not reach Google Drive: {exc}")
 
@@ -1765,6 +1861,8 @@ async def portal_drive_files(
     folder_id: Optional[str] = Query(None, description="Subfolder to browse"),
     parent_folder_id: Optional[str] = Query(None, description="The parent folder that listed folder_id (for security validation)"),
     breadcrumb_json: Optional[str] = Query(None, description="JSON-encoded breadcrumb from client for continuity"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(500, ge=1, le=1000),
     portal_user=Depends(get_current_portal_client),
 ):
     """
@@ -1777,6 +1875,10 @@ async def portal_drive_files(
       - Subfolder access: the client must supply the parent_folder_id from which they
         navigated. We re-fetch that parent's listing and confirm folder_id is present
         and visible there. This means each hop is validated against its direct parent.
+      Once the root is mirrored, the check runs against the mirror entry
+      instead (folder is under this root, is a child of the parent, not hidden).
+
+    Paged: follow `next_cursor` until it is null.
     """
     root_folder_id = portal_user.get("google_drive_folder_id")
     if not root_folder_id:
@@ -1801,23 +1903,30 @@ async def portal_drive_files(
         # Determine which parent to validate against
         validate_parent = parent_folder_id if parent_folder_id else root_folder_id
 
-        try:
-            parent_files = _fetch_drive_files_raw(validate_parent)
-        except Exception:
-            return {"files": [], "folders": [], "breadcrumb": breadcrumb,
-                    "error": "Could not reach Google Drive."}
-
-        # Check folder_id is a visible folder in the parent listing
-        visible_folder_ids = {
-            f["id"] for f in parent_files
-            if f.get("mimeType") == "application/vnd.google-apps.folder"
-            and f["id"] not in hidden_ids
-        }
-
-        if folder_id in visible_folder_ids:
+        folder_name = None
+        if await drive_mirror.root_ready(root_folder_id):
+            entry = await drive_mirror.get_entry(folder_id)
+            if (entry and entry.get("is_folder") and folder_id not in hidden_ids
+                    and root_folder_id in entry.get("roots", [])
+                    and validate_parent in entry.get("parents", [])):
+                folder_name = entry.get("name") or folder_id
+        else:
+            try:
+                parent_files = await _fetch_drive_files(validate_parent)
+            except Exception:
+                return {"files": [], "folders": [], "breadcrumb": breadcrumb,
+                        "error": "Could not reach Google Drive."}
+
+            # Check folder_id is a visible folder in the parent listing
+            folder_name = next((
+                f["name"] for f in parent_files
+                if f["id"] == folder_id
+                and f.get("mimeType") == "application/vnd.google-apps.folder"
+                and f["id"] not in hidden_ids
+            ), None)
+
+        if folder_name is not None:
             browse_id = folder_id
-            # Get folder name from parent listing
-            folder_name = next((f["name"] for f in parent_files if f["id"] == folder_id), folder_id)
             # Rebuild breadcrumb: parse existing client breadcrumb + append new entry
             try:
                 import json as _json
@@ -1834,7 +1943,7 @@ async def portal_drive_files(
             browse_id = root_folder_id
 
     try:
-        all_files = _fetch_drive_files_raw(browse_id)
+        visible_all, next_cursor = await _list_drive_folder(browse_id, root_folder_id, hidden_ids, cursor, limit)
     except HTTPException as e:
         if e.status_code == 503:
             return {"files": [], "folders": [], "breadcrumb": breadcrumb,
@@ -1851,7 +1960,6 @@ async def portal_drive_files(
         return {"files": [], "folders": [], "breadcrumb": breadcrumb,
                 "error": "Could not reach Google Drive."}
 
-    visible_all = [f for f in all_files if f["id"] not in hidden_ids]
     folders = [f for f in visible_all if f.get("mimeType") == "application/vnd.google-apps.folder"]
     files   = [f for f in visible_all if f.get("mimeType") != "application/vnd.google-apps.folder"]
 
@@ -1861,6 +1969,7 @@ async def portal_drive_files(
         "breadcrumb": breadcrumb,
         "root_folder_id": root_folder_id,
         "current_folder_id": browse_id,
+        "next_cursor": next_cursor,
     }
 
 
@@ -2680,7 +2789,7 @@ async def ensure_root_folder(
             "client_id": client_id,
             "client_name": client_name,
             "portal_username": username,
-            "hashed_password": pwd_context.hash(generated_password),
+            "hashed_password": await password_hashing.hash_password(generated_password),
             "display_name": client_name,
             "email": None,
             "is_active": True,
@@ -2983,12 +3092,19 @@ async def list_client_subfolders(
     root_folder_id = portal_user.get("google_drive_folder_id")
     if not root_folder_id:
         return {"subfolders": [], "root_folder_id": None}
-    from backend.invoicing import _get_drive_service, _drive_configured
-    if not _drive_configured():
-        return {"subfolders": [], "root_folder_id": root_folder_id}
-    service = _get_drive_service()
-    all_items = _fetch_drive_files_raw(root_folder_id, include_subfolders=False)
-    subfolders = [{"id": f["id"], "name": f["name"]} for f in all_items if f.get("mimeType") == "application/vnd.google-apps.folder"]
+    subfolders, cursor = [], None
+    try:
+        while True:
+            page, cursor = await _list_drive_folder(root_folder_id, root_folder_id, cursor=cursor, limit=1000)
+            folders = [f for f in page if f.get("mimeType") == "application/vnd.google-apps.folder"]
+            subfolders += [{"id": f["id"], "name": f["name"]} for f in folders]
+            # Mirror pages sort folders first: a page with a file holds the last of them
+            if not cursor or len(folders) < len(page):
+                break
+    except HTTPException as e:
+        if e.status_code == 503:
+            return {"subfolders": [], "root_folder_id": root_folder_id}
+        raise
     return {"subfolders": subfolders, "root_folder_id": root_folder_id}
 
 
@@ -1,3 +1,4 @@
+import asyncio
 import io
 import uuid
 import logging
@@ -8,8 +9,11 @@ from zoneinfo import ZoneInfo
 import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from pydantic import BaseModel, Field, ConfigDict
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 from backend.dependencies import db, get_current_user, check_module_permission
+from backend.index_manifest import ensure_indexes, index
 from backend.models import User
 from backend.invoicing import (
     _compute_invoice_totals,
@@ -70,6 +74,12 @@ CATEGORIES  = ["ROC", "GST", "ITR", "TDS", "AUDIT", "PF_ESIC", "PT", "OTHER"]
 STATUSES    = ["not_started", "in_progress", "completed", "filed", "na"]
 FREQUENCIES = ["monthly", "quarterly", "half_yearly", "annual", "one_time"]
 
+# Excel import: client names are matched ignoring case ("ACME TRADERS" is
+# "Acme Traders") through the `company_name_ci` index, which must be declared
+# with the same collation for the lookup to use it.
+NAME_COLLATION      = {"locale": "en", "strength": 2}
+IMPORT_LOOKUP_CHUNK = 1000
+
 CATEGORY_LABELS = {
     "ROC":     "ROC / MCA",
     "GST":     "GST",
@@ -729,23 +739,26 @@ async def bulk_assign_clients(
         # 3. Modal-level fallback
         return data.assigned_to or None
 
-    # Already-assigned client IDs
+    client_ids = list(dict.fromkeys(data.client_ids))  # de-duplicate, keep order
+
+    # Already-assigned client IDs (only among the requested ones)
     existing_ids: set = set()
     async for a in db.compliance_assignments.find(
-        {"compliance_id": compliance_id}, {"_id": 0, "client_id": 1}
+        {"compliance_id": compliance_id, "client_id": {"$in": client_ids}}, {"_id": 0, "client_id": 1}
     ):
         existing_ids.add(a["client_id"])
 
     # Fetch client info in bulk — include assigned_to and assignments fields
     clients = await db.clients.find(
-        {"id": {"$in": data.client_ids}},
+        {"id": {"$in": client_ids}},
         {"_id": 0, "id": 1, "company_name": 1, "assigned_to": 1, "assignments": 1},
-    ).to_list(5000)
+    ).to_list(None)
     client_map = {c["id"]: c for c in clients}
 
+    now = _now()
     docs = []
-    skipped = 0
-    for cid in data.client_ids:
+    skipped = len(data.client_ids) - len(client_ids)
+    for cid in client_ids:
         if cid in existing_ids:
             skipped += 1
             continue
@@ -759,17 +772,17 @@ async def bulk_assign_clients(
             "status":        data.default_status,
             "assigned_to":   assigned_id,
             "notes":         None,
-            "created_at":    _now(),
-            "updated_at":    _now(),
-            "completed_at":  _now() if data.default_status in ("completed", "filed") else None,
-            "filed_at":      _now() if data.default_status == "filed" else None,
+            "created_at":    now,
+            "updated_at":    now,
+            "completed_at":  now if data.default_status in ("completed", "filed") else None,
+            "filed_at":      now if data.default_status == "filed" else None,
         }
         docs.append({**doc, "_id": doc["id"]})
 
-    if docs:
-        await db.compliance_assignments.insert_many(docs)
+    added = await _insert_assignments(docs) if docs else 0
+    skipped += len(docs) - added
 
-    return {"added": len(docs), "skipped": skipped, "total_requested": len(data.client_ids)}
+    return {"added": added, "skipped": skipped, "total_requested": len(data.client_ids)}
 
 
 @router.patch("/{compliance_id}/assignments/bulk-update")
@@ -891,7 +904,7 @@ async def preview_excel(
 ):
     """Return columns + first 10 rows so the frontend can map columns before import."""
     contents = await file.read()
-    df = _read_file(contents, file.filename or "upload.xlsx")
+    df = await asyncio.to_thread(_read_file, contents, file.filename or "upload.xlsx")
     df.columns = [str(c).strip() for c in df.columns]
     df = df.where(pd.notnull(df), None)          # NaN → None
     preview = df.head(10).to_dict(orient="records")
@@ -928,7 +941,7 @@ async def import_from_excel(
         raise HTTPException(404, "Compliance not found")
 
     contents = await file.read()
-    df = _read_file(contents, file.filename or "upload.xlsx")
+    df = await asyncio.to_thread(_read_file, contents, file.filename or "upload.xlsx")
     df.columns = [str(c).strip() for c in df.columns]
 
     # Auto-detect client column if not found
@@ -950,14 +963,108 @@ async def import_from_excel(
         if ua:
             fallback_assigned = ua["id"]
 
-    # Build lookup maps
-    all_clients = await db.clients.find(
-        {}, {"_id": 0, "id": 1, "company_name": 1}
-    ).to_list(50000)
-    client_name_map = {c["company_name"].strip().lower(): c for c in all_clients if c.get("company_name")}
+    return await import_assignment_rows(
+        compliance_id, df, client_col, status_col, notes_col, assigned_col, fallback_assigned,
+    )
+
+
+def _text_column(df: pd.DataFrame, col: str) -> Optional[pd.Series]:
+    """`col` as stripped strings, blank for empty / NaN cells; None if there is no such column."""
+    if not col or col not in df.columns:
+        return None
+    values = df[col].where(df[col].notna(), "").astype(str).str.strip()
+    return values.mask(values.str.lower() == "nan", "")
 
-    all_users = await db.users.find({}, {"_id": 0, "id": 1, "full_name": 1}).to_list(500)
-    user_name_map = {u["full_name"].strip().lower(): u["id"] for u in all_users if u.get("full_name")}
+
+def _map_import_rows(
+    df: pd.DataFrame,
+    client_col: str,
+    status_col: str,
+    notes_col: str,
+    assigned_col: str,
+    user_name_map: Dict[str, str],
+) -> pd.DataFrame:
+    """
+    Column-wise mapping of the sheet to assignment fields: raw_name, name_key,
+    status, notes ('' = none), assigned_to ('' = none). Rows without a client
+    name are dropped; a client listed twice keeps its last row.
+    """
+    names = _text_column(df, client_col)
+    rows = pd.DataFrame({"raw_name": names, "name_key": names.str.lower()})
+
+    statuses = _text_column(df, status_col)
+    if statuses is None:
+        rows["status"] = "not_started"
+    else:
+        statuses = statuses.str.lower().str.replace(" ", "_", regex=False)
+        rows["status"] = statuses.where(statuses.isin(STATUSES), "not_started")
+
+    notes = _text_column(df, notes_col)
+    rows["notes"] = "" if notes is None else notes
+
+    assigned = _text_column(df, assigned_col)
+    rows["assigned_to"] = "" if assigned is None else assigned.str.lower().map(user_name_map).fillna("")
+
+    rows = rows[rows["name_key"] != ""]
+    return rows.drop_duplicates("name_key", keep="last")
+
+
+async def _clients_by_name(names: List[str]) -> Dict[str, dict]:
+    """
+    Clients whose company_name is one of `names`, ignoring case, keyed by
+    lower-cased name. Served by the `company_name_ci` index (same collation).
+    """
+    found: Dict[str, dict] = {}
+    for i in range(0, len(names), IMPORT_LOOKUP_CHUNK):
+        async for c in db.clients.find(
+            {"company_name": {"$in": names[i:i + IMPORT_LOOKUP_CHUNK]}},
+            {"_id": 0, "id": 1, "company_name": 1},
+            collation=NAME_COLLATION,
+        ):
+            if c.get("company_name"):
+                found[c["company_name"].strip().lower()] = c
+    return found
+
+
+async def _insert_assignments(docs: List[dict]) -> int:
+    """
+    Unordered insert_many; rows that hit the (compliance_id, client_id)
+    unique index (assigned concurrently, or repeated) are skipped.
+    Returns the number inserted.
+    """
+    try:
+        await db.compliance_assignments.insert_many(docs, ordered=False)
+        return len(docs)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in errors):
+            raise
+        return e.details.get("nInserted", len(docs) - len(errors))
+
+
+async def import_assignment_rows(
+    compliance_id: str,
+    df: pd.DataFrame,
+    client_col: str,
+    status_col: str = "",
+    notes_col: str = "",
+    assigned_col: str = "",
+    fallback_assigned: Optional[str] = None,
+) -> dict:
+    """
+    Create / update the assignments of one compliance from a parsed sheet.
+
+    Clients are looked up only for the names in the file; new assignments
+    go out in one insert_many and changes to existing ones in one unordered
+    bulk_write.
+    """
+    user_name_map: Dict[str, str] = {}
+    if _text_column(df, assigned_col) is not None:
+        all_users = await db.users.find({}, {"_id": 0, "id": 1, "full_name": 1}).to_list(500)
+        user_name_map = {u["full_name"].strip().lower(): u["id"] for u in all_users if u.get("full_name")}
+
+    rows = _map_import_rows(df, client_col, status_col, notes_col, assigned_col, user_name_map)
+    client_name_map = await _clients_by_name(rows["raw_name"].tolist())
 
     # Existing assignments for this compliance (by client name, lower)
     existing_map: dict = {}
@@ -966,79 +1073,53 @@ async def import_from_excel(
     ):
         existing_map[a["client_name"].strip().lower()] = a["id"]
 
+    now = _now()
     to_insert = []
-    to_update = []
+    updates = []
     not_found_clients = []
-
-    for _, row in df.iterrows():
-        raw_name = str(row.get(client_col, "") or "").strip()
-        if not raw_name or raw_name.lower() == "nan":
-            continue
-
-        name_key    = raw_name.lower()
-        client_doc  = client_name_map.get(name_key)
-        client_id   = client_doc["id"] if client_doc else ""
-        client_name = client_doc["company_name"] if client_doc else raw_name
+    for rec in rows.to_dict("records"):
+        name_key   = rec["name_key"]
+        client_doc = client_name_map.get(name_key)
         if not client_doc:
-            not_found_clients.append(raw_name)
-
-        # Status
-        status_val = "not_started"
-        if status_col and status_col in df.columns:
-            raw_s = str(row.get(status_col, "") or "").strip().lower().replace(" ", "_")
-            if raw_s in STATUSES:
-                status_val = raw_s
-
-        # Notes
-        notes_val = None
-        if notes_col and notes_col in df.columns:
-            nv = str(row.get(notes_col, "") or "").strip()
-            if nv and nv.lower() != "nan":
-                notes_val = nv
-
-        # Assigned to
-        assigned_id = None
-        if assigned_col and assigned_col in df.columns:
-            av = str(row.get(assigned_col, "") or "").strip().lower()
-            assigned_id = user_name_map.get(av)
-        # Fall back to default if no per-row value
-        if not assigned_id and fallback_assigned:
-            assigned_id = fallback_assigned
+            not_found_clients.append(rec["raw_name"])
+        status_val  = rec["status"]
+        notes_val   = rec["notes"] or None
+        assigned_id = rec["assigned_to"] or fallback_assigned
 
         if name_key in existing_map:
-            to_update.append((existing_map[name_key], {
+            updates.append(UpdateOne({"id": existing_map[name_key]}, {"$set": {
                 "status":     status_val,
                 "notes":      notes_val,
-                "updated_at": _now(),
+                "updated_at": now,
                 **({"assigned_to": assigned_id} if assigned_id else {}),
-                **({"completed_at": _now()} if status_val in ("completed", "filed") else {}),
-                **({"filed_at":     _now()} if status_val == "filed" else {}),
-            }))
+                **({"completed_at": now} if status_val in ("completed", "filed") else {}),
+                **({"filed_at":     now} if status_val == "filed" else {}),
+            }}))
         else:
             doc = {
                 "id":            str(uuid.uuid4()),
                 "compliance_id": compliance_id,
-                "client_id":     client_id,
-                "client_name":   client_name,
+                "client_id":     client_doc["id"] if client_doc else "",
+                "client_name":   client_doc["company_name"] if client_doc else rec["raw_name"],
                 "status":        status_val,
                 "assigned_to":   assigned_id,
                 "notes":         notes_val,
-                "created_at":    _now(),
-                "updated_at":    _now(),
-                "completed_at":  _now() if status_val in ("completed", "filed") else None,
-                "filed_at":      _now() if status_val == "filed" else None,
+                "created_at":    now,
+                "updated_at":    now,
+                "completed_at":  now if status_val in ("completed", "filed") else None,
+                "filed_at":      now if status_val == "filed" else None,
             }
             to_insert.append({**doc, "_id": doc["id"]})
-            existing_map[name_key] = doc["id"]
 
-    if to_insert:
-        await db.compliance_assignments.insert_many(to_insert)
-    for aid, upd in to_update:
-        await db.compliance_assignments.update_one({"id": aid}, {"$set": upd})
+    added = await _insert_assignments(to_insert) if to_insert else 0
+    updated = 0
+    if updates:
+        result = await db.compliance_assignments.bulk_write(updates, ordered=False)
+        updated = result.matched_count
 
     return {
-        "added":               len(to_insert),
-        "updated":             len(to_update),
+        "added":               added,
+        "updated":             updated,
         "total_rows_in_file":  len(df),
         "clients_not_in_db":   not_found_clients[:20],  # show max 20
     }
@@ -1048,21 +1129,25 @@ async def import_from_excel(
 # INDEXES  (call once at startup, idempotent)
 # ─────────────────────────────────────────────────────────────────────────────
 
+INDEXES = [
+    index("compliance_masters", "id", unique=True),
+    index("compliance_masters", "category"),
+    index("compliance_masters", "fy_year"),
+    # WhatsApp compliance reminders look up the masters due on the alert days
+    index("compliance_masters", [("due_date", 1), ("status", 1)]),
+    index("compliance_assignments", "id", unique=True),
+    index("compliance_assignments", "compliance_id"),
+    index("compliance_assignments", "client_id"),
+    index("compliance_assignments", "status"),
+    index("compliance_assignments", [("compliance_id", 1), ("client_id", 1)], unique=True),
+    # Excel import: case-insensitive lookup of the client names in the file
+    index("clients", [("company_name", 1), ("id", 1)], collation=NAME_COLLATION, name="company_name_ci"),
+]
+
+
 async def create_compliance_indexes():
-    try:
-        await db.compliance_masters.create_index("id",       unique=True, background=True)
-        await db.compliance_masters.create_index("category", background=True)
-        await db.compliance_masters.create_index("fy_year",  background=True)
-        await db.compliance_assignments.create_index("id",            unique=True, background=True)
-        await db.compliance_assignments.create_index("compliance_id", background=True)
-        await db.compliance_assignments.create_index("client_id",     background=True)
-        await db.compliance_assignments.create_index("status",        background=True)
-        await db.compliance_assignments.create_index(
-            [("compliance_id", 1), ("client_id", 1)], unique=True, background=True
-        )
-        logger.info("Compliance indexes ensured")
-    except Exception as exc:
-        logger.warning("Compliance index creation: %s", exc)
+    """Ensure the compliance master / assignment indexes."""
+    await ensure_indexes(INDEXES)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Dict, Any, Optional
 from backend.dependencies import db
@@ -9,16 +10,17 @@ class ContextManager:
     async def gather_user_context(company_id: str, tenant_id: str) -> Dict[str, Any]:
         """Collects metrics, settings, and pending tasks for prompt enrichment."""
         try:
-            # Query active stats
-            pending_invoices_count = await db.ai_document_memory.count_documents({
-                "company_id": company_id,
-                "decision": "REQUIRES_REVIEW"
-            })
-            
-            pending_approvals_count = await db.approval_requests.count_documents({
-                "company_id": company_id,
-                "status": "PENDING"
-            })
+            # Query active stats (independent counts, run together)
+            pending_invoices_count, pending_approvals_count = await asyncio.gather(
+                db.ai_document_memory.count_documents({
+                    "company_id": company_id,
+                    "decision": "REQUIRES_REVIEW"
+                }),
+                db.approval_requests.count_documents({
+                    "company_id": company_id,
+                    "status": "PENDING"
+                }),
+            )
             
             return {
                 "company_id": company_id,
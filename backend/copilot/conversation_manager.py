@@ -2,23 +2,46 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 import uuid
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from backend.dependencies import db
+from backend.index_manifest import ensure_indexes, index
 
 logger = logging.getLogger("conversation_manager")
 
+# Messages live in copilot_message_buckets, BUCKET_SIZE per document, keyed
+# by (session_id, seq). A message's position comes from the session's
+# message_count, so bucket `seq` holds messages seq*BUCKET_SIZE+1 .. +BUCKET_SIZE
+# and the newest bucket is always the highest seq.
+BUCKET_SIZE = 50
+HISTORY_WINDOW = 20
+
+
+INDEXES = [
+    index("copilot_sessions", "id", unique=True),
+    index("copilot_sessions", [("user_id", 1), ("updated_at", -1)]),
+    index("copilot_message_buckets", [("session_id", 1), ("seq", -1)], unique=True),
+]
+
+
+async def create_copilot_indexes():
+    """Create MongoDB indexes for Copilot sessions and message buckets."""
+    await ensure_indexes(INDEXES)
+
+
 class ConversationManager:
     @staticmethod
     async def create_session(user_id: str, company_id: str, title: str = "New Chat") -> Dict[str, Any]:
         """Creates a new user chat session."""
         now = datetime.now(timezone.utc).isoformat()
         session_id = str(uuid.uuid4())
-        
+
         session_doc = {
             "id": session_id,
             "user_id": user_id,
             "company_id": company_id,
             "title": title,
-            "messages": [],
+            "message_count": 0,
             "status": "active",
             "created_at": now,
             "updated_at": now
@@ -33,21 +56,82 @@ class ConversationManager:
 
     @staticmethod
     async def append_message(session_id: str, role: str, text: str) -> bool:
-        """Appends a new message to the chat session history."""
+        """Appends a new message to the newest history bucket of the session."""
         now = datetime.now(timezone.utc).isoformat()
+        session = await db.copilot_sessions.find_one_and_update(
+            {"id": session_id},
+            {"$inc": {"message_count": 1}, "$set": {"updated_at": now}},
+            projection={"_id": 0, "message_count": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not session:
+            return False
+        n = session["message_count"]
         msg = {
+            "n": n,
             "role": role, # user, assistant
             "text": text,
             "timestamp": now
         }
-        result = await db.copilot_sessions.update_one(
-            {"id": session_id},
-            {
-                "$push": {"messages": msg},
-                "$set": {"updated_at": now}
-            }
-        )
-        return result.modified_count > 0
+        bucket = {"session_id": session_id, "seq": (n - 1) // BUCKET_SIZE}
+        update = {
+            "$push": {"messages": msg},
+            "$inc": {"count": 1},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"created_at": now},
+        }
+        try:
+            await db.copilot_message_buckets.update_one(bucket, update, upsert=True)
+        except DuplicateKeyError:
+            # Two writers opened the same bucket at once; it exists now.
+            await db.copilot_message_buckets.update_one(bucket, update)
+        return True
+
+    @staticmethod
+    async def _legacy_messages(session_id: str, session: Optional[Dict[str, Any]], limit: int = 0) -> List[Dict[str, Any]]:
+        """History embedded in the session document by sessions from before bucketing."""
+        if session is not None and not session.get("messages"):
+            return []
+        projection = {"_id": 0, "messages": {"$slice": -limit} if limit else 1}
+        doc = await db.copilot_sessions.find_one({"id": session_id}, projection)
+        return (doc or {}).get("messages") or []
+
+    @staticmethod
+    async def get_recent_messages(
+        session_id: str, limit: int = HISTORY_WINDOW, session: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Last `limit` messages, oldest first, read from the newest bucket(s) only.
+
+        The buckets are picked from the session's message_count: the last
+        `limit` messages can span two buckets even when `limit` < BUCKET_SIZE.
+        A count that is a few appends stale only widens the range. Pass the
+        already-loaded `session` to skip loading it again.
+        """
+        if limit <= 0:
+            return []
+        if session is None or session.get("message_count") is None:
+            doc = await db.copilot_sessions.find_one({"id": session_id}, {"_id": 0, "message_count": 1})
+            count = (doc or {}).get("message_count") or 0
+        else:
+            count = session["message_count"]
+        first_seq = max(count - limit, 0) // BUCKET_SIZE
+        buckets = await db.copilot_message_buckets.find(
+            {"session_id": session_id, "seq": {"$gte": first_seq}}, {"_id": 0, "messages": 1}
+        ).to_list(None)
+        messages = sorted((m for b in buckets for m in b.get("messages", [])), key=lambda m: m.get("n", 0))
+        if len(messages) < limit and first_seq == 0:
+            messages = await ConversationManager._legacy_messages(
+                session_id, session, limit - len(messages)) + messages
+        return messages[-limit:]
+
+    @staticmethod
+    async def get_messages(session_id: str) -> List[Dict[str, Any]]:
+        """Full history of a session, oldest first."""
+        buckets = await db.copilot_message_buckets.find(
+            {"session_id": session_id}, {"_id": 0, "messages": 1}
+        ).sort("seq", 1).to_list(None)
+        messages = sorted((m for b in buckets for m in b.get("messages", [])), key=lambda m: m.get("n", 0))
+        return await ConversationManager._legacy_messages(session_id, None) + messages
 
     @staticmethod
     async def list_user_sessions(user_id: str) -> List[Dict[str, Any]]:
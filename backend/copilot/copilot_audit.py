@@ -3,6 +3,7 @@ from typing import Dict, Any, Optional
 from datetime import datetime, timezone
 import uuid
 from backend.dependencies import db
+from backend.licensing import usage_meter
 
 logger = logging.getLogger("copilot_audit")
 
@@ -44,9 +45,5 @@ class CopilotAudit:
         })
         
         # Track AI Usage Metric for Licensing
-        await db.customer_usage.update_one(
-            {"tenant_id": company_id, "metric": "copilot_tokens"},
-            {"$inc": {"value": tokens_used or len(query + response) // 4}, "$set": {"updated_at": now}},
-            upsert=True
-        )
+        usage_meter.increment(company_id, "copilot_tokens", tokens_used or len(query + response) // 4)
         return audit_id
@@ -1,8 +1,6 @@
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime, timezone
-import uuid
-from backend.dependencies import db
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
 from backend.copilot.prompt_manager import PromptManager
 from backend.copilot.context_manager import ContextManager
 from backend.copilot.copilot_permissions import CopilotPermissions
@@ -13,78 +11,156 @@ from backend.copilot.reasoning_engine import ReasoningEngine
 
 logger = logging.getLogger("copilot_engine")
 
+# History writes for abandoned streams, kept referenced until they finish
+_pending_writes: set = set()
+
 class CopilotEngine:
     @staticmethod
-    async def process_copilot_request(
+    async def prepare_request(
         user: Any,
         session_id: Optional[str],
         query: str,
         role_preset: str = "assistant"
     ) -> Dict[str, Any]:
-        """Runs the complete Copilot pipeline: Perms -> Tools -> Context -> Prompt -> LLM Reasoning -> Audit."""
+        """Perms -> (Tools | Session + History | Context) -> Prompt.
+
+        The three middle stages don't depend on each other and run concurrently.
+        Returns the state that the reasoning step and finish_request need.
+        """
         user_id = getattr(user, "id", "system")
         company_id = getattr(user, "company_id", "default_comp")
         tenant_id = getattr(user, "tenant_id", "default_tenant")
-        
+
         # 1. Verify general financial permission if querying financials
         if any(w in query.lower() for w in ["balance sheet", "profit", "ledger", "financial", "cash flow"]):
             CopilotPermissions.assert_can_query_financials(user)
 
         # 2. Match background tool using natural language
-        matched_tool = await ToolRouter.match_tool(query, company_id)
-        tool_data = None
-        if matched_tool:
-            logger.info(f"Matched tool for query: {matched_tool}")
-            tool_data = await ToolRouter.execute_matched_tool(matched_tool)
-            
-        # 3. Retrieve chat session or start a new one
-        if not session_id:
-            session = await ConversationManager.create_session(user_id, company_id, title=query[:30])
-            session_id = session["id"]
-        else:
-            session = await ConversationManager.get_session(session_id)
+        async def tool_stage() -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+            matched_tool = await ToolRouter.match_tool(query, company_id)
+            tool_data = None
+            if matched_tool:
+                logger.info(f"Matched tool for query: {matched_tool}")
+                tool_data = await ToolRouter.execute_matched_tool(matched_tool)
+            return matched_tool, tool_data
+
+        # 3. Retrieve chat session (or start a new one), read the prompt window
+        #    from the newest history bucket, then append the user message
+        async def session_stage() -> Tuple[str, list]:
+            session = await ConversationManager.get_session(session_id) if session_id else None
             if not session:
                 session = await ConversationManager.create_session(user_id, company_id, title=query[:30])
-                session_id = session["id"]
-
-        # Append user message to history
-        await ConversationManager.append_message(session_id, "user", query)
+            history = await ConversationManager.get_recent_messages(session["id"], session=session)
+            await ConversationManager.append_message(session["id"], "user", query)
+            return session["id"], history
 
         # 4. Gather active tenant context details
-        context_info = await ContextManager.gather_user_context(company_id, tenant_id)
+        (matched_tool, tool_data), (session_id, history), context_info = await asyncio.gather(
+            tool_stage(),
+            session_stage(),
+            ContextManager.gather_user_context(company_id, tenant_id),
+        )
         if tool_data:
             context_info["tool_results"] = tool_data
 
         # 5. Formulate prompt using PromptManager
-        system_instruction = PromptManager.get_system_prompt(role_preset, str(context_info))
-        
-        # 6. Call provider-agnostic reasoning model
-        reasoning_result = await ReasoningEngine.get_response(
-            prompt=query,
-            system_instruction=system_instruction
+        system_instruction = PromptManager.get_system_prompt(
+            role_preset, str(context_info), PromptManager.format_history(history)
         )
+        return {
+            "user_id": user_id,
+            "company_id": company_id,
+            "session_id": session_id,
+            "query": query,
+            "matched_tool": matched_tool,
+            "tool_data": tool_data,
+            "system_instruction": system_instruction,
+        }
+
+    @staticmethod
+    async def finish_request(state: Dict[str, Any], reasoning_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Stores the assistant reply and the audit trail for a prepared request."""
         response_text = reasoning_result["text"]
+        matched_tool = state["matched_tool"]
 
-        # Append assistant message to history
-        await ConversationManager.append_message(session_id, "assistant", response_text)
-
-        # 7. Immutably log metrics and trace to copilot audit database
-        tokens_used = reasoning_result.get("tokens", len(query + response_text) // 4)
-        await CopilotAudit.log_copilot_interaction(
-            user_id=user_id,
-            company_id=company_id,
-            session_id=session_id,
-            query=query,
-            response=response_text,
-            matched_tools=[matched_tool] if matched_tool else [],
-            tokens_used=tokens_used
+        # 7. Append assistant message to history and immutably log metrics and
+        #    trace to copilot audit database
+        tokens_used = reasoning_result.get("tokens", len(state["query"] + response_text) // 4)
+        await asyncio.gather(
+            ConversationManager.append_message(state["session_id"], "assistant", response_text),
+            CopilotAudit.log_copilot_interaction(
+                user_id=state["user_id"],
+                company_id=state["company_id"],
+                session_id=state["session_id"],
+                query=state["query"],
+                response=response_text,
+                matched_tools=[matched_tool] if matched_tool else [],
+                tokens_used=tokens_used
+            ),
         )
 
         return {
-            "session_id": session_id,
+            "session_id": state["session_id"],
             "response": response_text,
             "matched_tool": matched_tool,
-            "tool_data": tool_data,
+            "tool_data": state["tool_data"],
             "provider_used": reasoning_result.get("provider"),
             "model_used": reasoning_result.get("model")
         }
+
+    @staticmethod
+    async def process_copilot_request(
+        user: Any,
+        session_id: Optional[str],
+        query: str,
+        role_preset: str = "assistant"
+    ) -> Dict[str, Any]:
+        """Runs the complete Copilot pipeline: Perms -> Tools/Context -> Prompt -> LLM Reasoning -> Audit."""
+        state = await CopilotEngine.prepare_request(user, session_id, query, role_preset)
+
+        # 6. Call provider-agnostic reasoning model
+        reasoning_result = await ReasoningEngine.get_response(
+            prompt=query,
+            system_instruction=state["system_instruction"]
+        )
+        return await CopilotEngine.finish_request(state, reasoning_result)
+
+    @staticmethod
+    async def stream_copilot_request(state: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Streams the reasoning step of a prepared request as (event, data) pairs.
+
+        Emits "meta" (session and tool results) first, a "token" per text chunk
+        as the model produces it, and "done" once history and audit are saved.
+        """
+        yield "meta", {
+            "session_id": state["session_id"],
+            "matched_tool": state["matched_tool"],
+            "tool_data": state["tool_data"],
+        }
+
+        reasoning_result: Dict[str, Any] = {}
+        text = ""
+        completed = False
+        try:
+            async for chunk in ReasoningEngine.stream_response(
+                prompt=state["query"],
+                system_instruction=state["system_instruction"],
+                result=reasoning_result,
+            ):
+                text += chunk
+                yield "token", {"text": chunk}
+            completed = True
+        finally:
+            if not completed and text:
+                # Client went away mid-answer: keep what it was shown so the
+                # stored history matches the conversation it saw.
+                task = asyncio.ensure_future(CopilotEngine.finish_request(state, {"text": text}))
+                _pending_writes.add(task)
+                task.add_done_callback(_pending_writes.discard)
+
+        final = await CopilotEngine.finish_request(state, reasoning_result)
+        yield "done", {
+            "session_id": final["session_id"],
+            "provider_used": final["provider_used"],
+            "model_used": final["model_used"],
+        }
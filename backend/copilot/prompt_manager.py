@@ -1,11 +1,11 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 logger = logging.getLogger("prompt_manager")
 
 class PromptManager:
     @staticmethod
-    def get_system_prompt(role: str = "assistant", context_info: str = "") -> str:
+    def get_system_prompt(role: str = "assistant", context_info: str = "", history: str = "") -> str:
         """Generates clean system prompts for the corporate AI Copilot."""
         base_prompt = (
             "You are Taskosphere Enterprise Copilot, a world-class AI ERP Assistant. "
@@ -22,9 +22,23 @@ class PromptManager:
             
         if context_info:
             base_prompt += f"\n\nActive Context Details:\n{context_info}"
+
+        if history:
+            base_prompt += f"\n\nConversation So Far:\n{history}"
             
         return base_prompt
 
+    @staticmethod
+    def format_history(messages: List[Dict[str, Any]], max_chars: int = 1500) -> str:
+        """Renders recent chat turns for the prompt, trimming long messages."""
+        lines = []
+        for m in messages:
+            text = (m.get("text") or "").strip()
+            if len(text) > max_chars:
+                text = text[:max_chars] + " ..."
+            lines.append(f"{'User' if m.get('role') == 'user' else 'Assistant'}: {text}")
+        return "\n".join(lines)
+
     @staticmethod
     def get_reconciliation_prompt(bank_records: str, ledger_records: str) -> str:
         return (
@@ -1,6 +1,9 @@
 import os
+import re
 import logging
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional
+
+from backend.ai import llm_gateway
 
 logger = logging.getLogger("reasoning_engine")
 
@@ -11,32 +14,19 @@ class ReasoningEngine:
         active_provider = provider or os.getenv("DEFAULT_AI_PROVIDER", "gemini")
         logger.info(f"Invoking reasoning engine using active provider: {active_provider}")
         
-        # Merge system instructions if provided
-        final_prompt = prompt
-        if system_instruction:
-            final_prompt = f"System Directive: {system_instruction}\n\nUser Question: {prompt}"
-            
-        # Fallback response if API key is not present or if we need to call Gemini
-        # Gemini call
-        if active_provider == "gemini":
+        # Gemini / Groq via the shared gateway (blocking SDK calls used to stall the event loop)
+        if active_provider in llm_gateway.PROVIDERS:
             try:
-                gemini_key = os.getenv("GEMINI_API_KEY") or os.getenv("REACT_APP_GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-                if gemini_key:
-                    from google import genai
-                    client = genai.Client(api_key=gemini_key)
-                    response = client.models.generate_content(
-                        model='gemini-2.5-flash',
-                        contents=final_prompt,
-                    )
-                    if response.text:
-                        return {
-                            "text": response.text,
-                            "provider": "gemini",
-                            "model": "gemini-2.5-flash",
-                            "tokens": len(response.text) // 4
-                        }
+                text = await llm_gateway.generate("copilot", prompt, system=system_instruction,
+                                                  provider=active_provider, temperature=0.2)
+                return {
+                    "text": text,
+                    "provider": active_provider,
+                    "model": llm_gateway._default_model(active_provider, False),
+                    "tokens": len(text) // 4
+                }
             except Exception as e:
-                logger.error(f"Gemini API call failed: {e}", exc_info=True)
+                logger.error(f"{active_provider.title()} API call failed: {e}")
                 
         # Fallback mock engine (to keep things robust and failproof)
         mock_response = ReasoningEngine._generate_fallback_response(prompt)
@@ -47,6 +37,53 @@ class ReasoningEngine:
             "tokens": len(mock_response) // 4
         }
 
+    @staticmethod
+    async def stream_response(
+        prompt: str,
+        provider: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        """Streaming counterpart of get_response: yields text chunks as the model produces them.
+
+        `result` (if given) is filled with the same text/provider/model/tokens keys
+        get_response returns once the stream ends.
+        """
+        result = result if result is not None else {}
+        active_provider = provider or os.getenv("DEFAULT_AI_PROVIDER", "gemini")
+        logger.info(f"Streaming reasoning engine response using provider: {active_provider}")
+
+        stream = None
+        if active_provider in llm_gateway.PROVIDERS:
+            stream = llm_gateway.stream("copilot", prompt, system=system_instruction,
+                                        provider=active_provider, temperature=0.2)
+            try:
+                async for chunk in stream:
+                    yield chunk
+            except Exception as e:
+                if stream.text:
+                    logger.error(f"Copilot stream cut off after {len(stream.text)} chars: {e}")
+                else:
+                    logger.error(f"Copilot stream failed, using fallback response: {e}")
+        if stream is not None and stream.text:
+            result.update({
+                "text": stream.text,
+                "provider": stream.provider,
+                "model": stream.model,
+                "tokens": stream.tokens_out or len(stream.text) // 4,
+            })
+            return
+
+        mock_response = ReasoningEngine._generate_fallback_response(prompt)
+        for chunk in re.findall(r"\S+\s*", mock_response):
+            yield chunk
+        result.update({
+            "text": mock_response,
+            "provider": active_provider,
+            "model": f"{active_provider}-pro-latest",
+            "tokens": len(mock_response) // 4,
+        })
+
     @staticmethod
     def _generate_fallback_response(prompt: str) -> str:
         p = prompt.lower()
@@ -0,0 +1,320 @@
+"""
+dashboard_counters.py
+────────────────────────────────────────────────────────────────────────────────
+Materialized aggregates behind GET /api/dashboard/stats.
+
+Instead of loading every visible task, DSC row and client on each dashboard
+load, small counter documents in `dashboard_counters` are kept up to date on
+writes:
+
+  tasks:org               all tasks
+  tasks:user:<uid>        tasks the user is assigned to, sub-assigned to or created
+  tasks:assignee:<uid>    tasks assigned to the user (team workload)
+  dsc:org                 DSC register size
+  clients:org             all clients
+  clients:user:<uid>      clients the user is assigned to / created / has an assignment on
+
+Fields are flat so they can be $inc-ed directly:
+  total, st_<status>, due_<YYYY-MM-DDTHH:MM UTC> (open tasks by due minute),
+  bday_<MM-DD> (personal birthdays by calendar day).
+
+Time-based values are derived at read time from the buckets — a task becomes
+overdue when the clock passes its due bucket, with no write needed. The
+reconciler (job runner, every 5 min) rebuilds any kind marked dirty by a
+bulk write, and every kind at least every 6 h to repair drift.
+
+Write sites call `record_change(kind, before, after)` with the document
+before/after the write (None for insert/delete). Writes that touch many
+documents at once call `mark_dirty(kind)` instead. A rebuild `$set`s the
+counts it scanned, which can overwrite an `$inc` that landed meanwhile, so
+while one runs (`rebuilding_<kind>` in the meta doc) record_change also
+marks the kind dirty and the next reconcile rebuilds it again.
+"""
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from backend.dependencies import db, personal_birthday_candidates
+from backend.index_manifest import ensure_indexes, index
+
+logger = logging.getLogger("dashboard_counters")
+
+KINDS = ("tasks", "dsc", "clients")
+META_ID = "meta"
+FULL_REBUILD_EVERY = timedelta(hours=6)
+REBUILD_LEASE = timedelta(minutes=30)    # a crashed rebuild stops flagging writes after this
+
+_TASK_FIELDS = {"_id": 0, "id": 1, "status": 1, "due_date": 1,
+                "assigned_to": 1, "sub_assignees": 1, "created_by": 1}
+_DSC_FIELDS = {"_id": 0, "id": 1}
+_CLIENT_FIELDS = {"_id": 0, "id": 1, "birthday": 1, "client_type": 1, "contact_persons": 1,
+                  "company_name": 1, "assigned_to": 1, "created_by": 1, "assignments": 1}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CONTRIBUTIONS — what one source document adds to which counter docs
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _minute_key(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M")
+
+
+def _task_due_key(task: Dict[str, Any]) -> Optional[str]:
+    raw = task.get("due_date")
+    if not raw or task.get("status") == "completed":
+        return None
+    try:
+        due = datetime.fromisoformat(raw) if isinstance(raw, str) else raw
+        if due.tzinfo is None:
+            due = due.replace(tzinfo=timezone.utc)
+        return _minute_key(due)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _task_contrib(task: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    status = str(task.get("status") or "unknown").replace(".", "_")
+    fields = {"total": 1, f"st_{status}": 1}
+    due_key = _task_due_key(task)
+    if due_key:
+        fields[f"due_{due_key}"] = 1
+
+    out = {"tasks:org": fields}
+    involved = {task.get("assigned_to"), task.get("created_by")}
+    involved.update(task.get("sub_assignees") or [])
+    for uid in involved:
+        if uid:
+            out[f"tasks:user:{uid}"] = fields
+    if task.get("assigned_to"):
+        out[f"tasks:assignee:{task['assigned_to']}"] = fields
+    return out
+
+
+def _dsc_contrib(dsc: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    return {"dsc:org": {"total": 1}}
+
+
+def _birthday_keys(client: Dict[str, Any]) -> List[str]:
+    keys = []
+    for person in personal_birthday_candidates(client):
+        raw = person["birthday"]
+        try:
+            bday = date.fromisoformat(raw[:10]) if isinstance(raw, str) else raw
+            keys.append(f"{bday.month:02d}-{bday.day:02d}")
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return keys
+
+
+def _client_contrib(client: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    fields: Dict[str, int] = {"total": 1}
+    for key in _birthday_keys(client):
+        fields[f"bday_{key}"] = fields.get(f"bday_{key}", 0) + 1
+
+    out = {"clients:org": fields}
+    involved = {client.get("assigned_to"), client.get("created_by")}
+    for a in client.get("assignments") or []:
+        if isinstance(a, dict):
+            involved.add(a.get("user_id"))
+    for uid in involved:
+        if uid:
+            out[f"clients:user:{uid}"] = fields
+    return out
+
+
+_CONTRIB = {"tasks": _task_contrib, "dsc": _dsc_contrib, "clients": _client_contrib}
+_SOURCE = {"tasks": ("tasks", _TASK_FIELDS), "dsc": ("dsc_register", _DSC_FIELDS),
+           "clients": ("clients", _CLIENT_FIELDS)}
+
+
+def _scope_fields(counter_id: str) -> Dict[str, Any]:
+    kind, scope, *owner = counter_id.split(":", 2)
+    return {"kind": kind, "scope": scope, "owner": owner[0] if owner else None}
+
+
+def _diff(kind: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    contrib = _CONTRIB[kind]
+    deltas: Dict[str, Dict[str, int]] = {}
+    for doc, sign in ((before, -1), (after, 1)):
+        if not doc:
+            continue
+        for counter_id, fields in contrib(doc).items():
+            target = deltas.setdefault(counter_id, {})
+            for f, n in fields.items():
+                target[f] = target.get(f, 0) + sign * n
+    return {cid: {f: n for f, n in fields.items() if n} for cid, fields in deltas.items()
+            if any(fields.values())}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WRITE PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def record_change(kind: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """
+    Apply the counter delta of one document write. Never raises: on failure the
+    kind is marked dirty and the reconciler rebuilds it.
+    """
+    try:
+        deltas = _diff(kind, before, after)
+        if not deltas:
+            return
+        ops = [
+            UpdateOne({"_id": cid}, {"$inc": fields, "$setOnInsert": _scope_fields(cid)}, upsert=True)
+            for cid, fields in deltas.items()
+        ]
+        await db.dashboard_counters.bulk_write(ops, ordered=False)
+        if await db.dashboard_counters.find_one(
+                {"_id": META_ID, f"rebuilding_{kind}": {"$gt": datetime.now(timezone.utc)}}, {"_id": 1}):
+            await mark_dirty(kind)
+    except Exception as e:
+        logger.warning(f"Dashboard counter update for {kind} failed, marking dirty: {e}")
+        await mark_dirty(kind)
+
+
+async def mark_dirty(kind: str):
+    try:
+        await db.dashboard_counters.update_one(
+            {"_id": META_ID}, {"$set": {f"dirty_{kind}": True}}, upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Could not mark dashboard counters dirty for {kind}: {e}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# REBUILD / RECONCILE
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def rebuild(kind: str) -> int:
+    """Recompute every counter doc of one kind from the source collection."""
+    collection, projection = _SOURCE[kind]
+    contrib = _CONTRIB[kind]
+    # Clear the dirty flag before the scan and flag the rebuild as running:
+    # record_change re-marks the kind dirty while it is, since the $set below
+    # may overwrite its $inc with a count scanned before that write.
+    await db.dashboard_counters.update_one(
+        {"_id": META_ID},
+        {"$set": {f"dirty_{kind}": False, f"rebuilding_{kind}": datetime.now(timezone.utc) + REBUILD_LEASE}},
+        upsert=True,
+    )
+
+    totals: Dict[str, Dict[str, int]] = {}
+    async for doc in db[collection].find({}, projection):
+        for cid, fields in contrib(doc).items():
+            target = totals.setdefault(cid, {})
+            for f, n in fields.items():
+                target[f] = target.get(f, 0) + n
+    # The org doc always exists once built, even for an empty collection
+    totals.setdefault(f"{kind}:org", {"total": 0})
+
+    existing = {
+        d["_id"]: d for d in await db.dashboard_counters.find({"kind": kind}).to_list(length=None)
+    }
+    ops = []
+    for cid, fields in totals.items():
+        stale = {k: "" for k in existing.get(cid, {})
+                 if _is_counter_field(k) and k not in fields}
+        update: Dict[str, Any] = {"$set": {**fields, **_scope_fields(cid)}}
+        if stale:
+            update["$unset"] = stale
+        ops.append(UpdateOne({"_id": cid}, update, upsert=True))
+    if ops:
+        await db.dashboard_counters.bulk_write(ops, ordered=False)
+    gone = [cid for cid in existing if cid not in totals]
+    if gone:
+        await db.dashboard_counters.delete_many({"_id": {"$in": gone}})
+
+    await db.dashboard_counters.update_one(
+        {"_id": META_ID},
+        {"$set": {f"built_{kind}": datetime.now(timezone.utc), f"rebuilding_{kind}": None}},
+        upsert=True,
+    )
+    logger.info(f"Dashboard counters rebuilt for {kind}: {len(totals)} docs")
+    return len(totals)
+
+
+def _is_counter_field(key: str) -> bool:
+    return key == "total" or key.startswith(("st_", "due_", "bday_"))
+
+
+async def reconcile_dashboard_counters():
+    """Job-runner entry point: rebuild kinds that are dirty, missing or due for a full pass."""
+    meta = await db.dashboard_counters.find_one({"_id": META_ID}) or {}
+    now = datetime.now(timezone.utc)
+    for kind in KINDS:
+        built = meta.get(f"built_{kind}")
+        if isinstance(built, datetime) and built.tzinfo is None:
+            built = built.replace(tzinfo=timezone.utc)
+        if meta.get(f"dirty_{kind}") or not built or now - built > FULL_REBUILD_EVERY:
+            try:
+                await rebuild(kind)
+            except Exception as e:
+                logger.error(f"Dashboard counter rebuild for {kind} failed: {e}", exc_info=True)
+
+
+INDEXES = [
+    index("dashboard_counters", [("kind", 1), ("scope", 1)]),
+]
+
+
+async def create_dashboard_counter_indexes():
+    """Create MongoDB indexes for dashboard counters."""
+    await ensure_indexes(INDEXES)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# READ PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def load(counter_ids: Iterable[str]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """Returns (meta, {counter_id: doc}) in one round trip."""
+    ids = [META_ID, *counter_ids]
+    docs = await db.dashboard_counters.find({"_id": {"$in": ids}}).to_list(length=None)
+    by_id = {d["_id"]: d for d in docs}
+    return by_id.pop(META_ID, {}), by_id
+
+
+def is_ready(meta: Dict[str, Any], kind: str) -> bool:
+    return bool(meta.get(f"built_{kind}"))
+
+
+def task_stats(doc: Optional[Dict[str, Any]], now: datetime) -> Dict[str, int]:
+    doc = doc or {}
+    now_key = _minute_key(now)
+    overdue = sum(
+        n for k, n in doc.items()
+        if k.startswith("due_") and k[4:] < now_key and isinstance(n, (int, float))
+    )
+    return {
+        "total": int(doc.get("total", 0)),
+        "completed": int(doc.get("st_completed", 0)),
+        "pending": int(doc.get("st_pending", 0)),
+        "overdue": int(overdue),
+    }
+
+
+def upcoming_birthdays(doc: Optional[Dict[str, Any]], today: date, days: int = 7) -> int:
+    """Personal birthdays falling in [today, today + days]; Feb 29 counts on Feb 28 in non-leap years."""
+    doc = doc or {}
+    count = 0
+    for offset in range(days + 1):
+        d = today + timedelta(days=offset)
+        count += int(doc.get(f"bday_{d.month:02d}-{d.day:02d}", 0))
+        if d.month == 2 and d.day == 28 and (d + timedelta(days=1)).month == 3:
+            count += int(doc.get("bday_02-29", 0))
+    return count
+
+
+async def assignee_workload() -> Dict[str, Dict[str, int]]:
+    docs = await db.dashboard_counters.find({"kind": "tasks", "scope": "assignee"}).to_list(length=None)
+    return {
+        d["owner"]: {
+            "total": int(d.get("total", 0)),
+            "pending": int(d.get("st_pending", 0)),
+            "completed": int(d.get("st_completed", 0)),
+        }
+        for d in docs if d.get("owner")
+    }
@@ -1,5 +1,6 @@
 import os
 import logging
+import re
 import secrets as _secrets
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Dict, Any
@@ -69,7 +70,20 @@ class MockCursor:
         self._data = self._data[:n]
         return self
 
-    def sort(self, *args, **kwargs):
+    def sort(self, key_or_list=None, direction=None, **kwargs):
+        if isinstance(key_or_list, str):
+            keys = [(key_or_list, direction or 1)]
+        elif isinstance(key_or_list, dict):
+            keys = list(key_or_list.items())
+        else:
+            keys = list(key_or_list or [])
+        # Stable sorts from the last key to the first; None sorts lowest as in Mongo
+        for field, d in reversed(keys):
+            self._data.sort(
+                key=lambda doc: (doc.get(field) is not None, type(doc.get(field)).__name__,
+                                 doc.get(field) if doc.get(field) is not None else 0),
+                reverse=d == -1,
+            )
         return self
 
     def skip(self, n):
@@ -118,13 +132,16 @@ class MockCollection:
         doc = document.copy()
         if "_id" not in doc:
             doc["_id"] = str(uuid.uuid4())
+        if str(doc["_id"]) in self._store:
+            from pymongo.errors import DuplicateKeyError
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} _id: {doc['_id']}")
         self._store[str(doc["_id"])] = doc
         class InsertResult:
             def __init__(self, inserted_id):
                 self.inserted_id = inserted_id
         return InsertResult(doc["_id"])
 
-    async def insert_many(self, documents):
+    async def insert_many(self, documents, *args, **kwargs):
         inserted_ids = []
         for doc_in in documents:
             doc = doc_in.copy()
@@ -141,15 +158,29 @@ class MockCollection:
         doc = await self.find_one(query)
         if not doc:
             if upsert:
-                new_doc = query.copy()
+                new_doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+                if "$setOnInsert" in update:
+                    new_doc.update(update["$setOnInsert"])
                 if "$set" in update:
                     new_doc.update(update["$set"])
-                await self.insert_one(new_doc)
+                if "$inc" in update:
+                    for k, v in update["$inc"].items():
+                        new_doc[k] = new_doc.get(k, 0) + v
+                if "$max" in update:
+                    new_doc.update(update["$max"])
+                if "$push" in update:
+                    for k, v in update["$push"].items():
+                        new_doc[k] = list(v["$each"]) if isinstance(v, dict) and "$each" in v else [v]
+                if "$addToSet" in update:
+                    for k, v in update["$addToSet"].items():
+                        new_doc[k] = []
+                        self._add_to_set(new_doc, k, v)
+                ins = await self.insert_one(new_doc)
                 class UpdateResultUpsert:
                     def __init__(self):
                         self.matched_count = 0
                         self.modified_count = 1
-                        self.upserted_id = new_doc["_id"]
+                        self.upserted_id = ins.inserted_id
                 return UpdateResultUpsert()
             class UpdateResultNoMatch:
                 def __init__(self):
@@ -161,15 +192,32 @@ class MockCollection:
         if "$set" in update:
             for k, v in update["$set"].items():
                 doc[k] = v
+        if "$inc" in update:
+            for k, v in update["$inc"].items():
+                doc[k] = (doc.get(k) or 0) + v
         if "$unset" in update:
             for k in update["$unset"].keys():
                 doc.pop(k, None)
+        if "$max" in update:
+            for k, v in update["$max"].items():
+                if doc.get(k) is None or doc[k] < v:
+                    doc[k] = v
         if "$push" in update:
             for k, v in update["$push"].items():
                 if k not in doc:
                     doc[k] = []
                 if isinstance(doc[k], list):
-                    doc[k].append(v)
+                    if isinstance(v, dict) and "$each" in v:
+                        doc[k].extend(v["$each"])
+                    else:
+                        doc[k].append(v)
+        if "$addToSet" in update:
+            for k, v in update["$addToSet"].items():
+                self._add_to_set(doc, k, v)
+        if "$pull" in update:
+            for k, v in update["$pull"].items():
+                if isinstance(doc.get(k), list):
+                    doc[k] = [x for x in doc[k] if x != v]
         self._store[str(doc["_id"])] = doc
         class UpdateResult:
             def __init__(self, id):
@@ -178,6 +226,73 @@ class MockCollection:
                 self.upserted_id = None
         return UpdateResult(doc["_id"])
 
+    async def update_many(self, query, update, upsert=False, *args, **kwargs):
+        ids = [str(doc["_id"]) for doc in self._store.values() if self._matches(doc, query)]
+        for _id in ids:
+            await self.update_one({"_id": self._store[_id]["_id"]}, update)
+        if not ids and upsert:
+            return await self.update_one(query, update, upsert=True)
+        class UpdateManyResult:
+            def __init__(self, count):
+                self.matched_count = count
+                self.modified_count = count
+                self.upserted_id = None
+        return UpdateManyResult(len(ids))
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=False, *args, **kwargs):
+        """return_document=True (ReturnDocument.AFTER) returns the updated doc, else the original."""
+        before = await self.find_one(query)
+        await self.update_one(query, update, upsert=upsert)
+        if return_document:
+            return await self.find_one(query)
+        return before
+
+    async def replace_one(self, query, replacement, upsert=False, *args, **kwargs):
+        doc = await self.find_one(query)
+        _id = None
+        if doc is not None or upsert:
+            _id = doc["_id"] if doc is not None else replacement.get("_id", query.get("_id"))
+            self._store.pop(str(_id), None)
+            await self.insert_one({**replacement, "_id": _id})
+        class ReplaceResult:
+            def __init__(self):
+                self.matched_count = int(doc is not None)
+                self.modified_count = int(doc is not None)
+                self.upserted_id = _id if doc is None else None
+        return ReplaceResult()
+
+    async def bulk_write(self, requests, *args, **kwargs):
+        """Applies pymongo InsertOne / UpdateOne / UpdateMany / ReplaceOne / DeleteOne / DeleteMany ops in order."""
+        inserted = matched = upserted = deleted = 0
+        upserted_ids = {}
+        for idx, op in enumerate(requests):
+            kind = type(op).__name__
+            if kind == "InsertOne":
+                await self.insert_one(op._doc)
+                inserted += 1
+            elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                apply = {"UpdateOne": self.update_one, "UpdateMany": self.update_many,
+                         "ReplaceOne": self.replace_one}[kind]
+                res = await apply(op._filter, op._doc, upsert=bool(op._upsert))
+                matched += res.matched_count
+                if getattr(res, "upserted_id", None) is not None:
+                    upserted += 1
+                    upserted_ids[idx] = res.upserted_id
+            elif kind in ("DeleteOne", "DeleteMany"):
+                apply = self.delete_one if kind == "DeleteOne" else self.delete_many
+                res = await apply(op._filter)
+                deleted += res.deleted_count
+        class BulkWriteResult:
+            def __init__(self):
+                self.inserted_count = inserted
+                self.matched_count = matched
+                self.modified_count = matched
+                self.upserted_count = upserted
+                self.upserted_ids = upserted_ids
+                self.deleted_count = deleted
+        return BulkWriteResult()
+
     async def delete_one(self, query, *args, **kwargs):
         doc = await self.find_one(query)
         if doc:
@@ -210,6 +325,13 @@ class MockCollection:
                 count += 1
         return count
 
+    @staticmethod
+    def _add_to_set(doc, key, value):
+        items = doc.setdefault(key, [])
+        for v in value["$each"] if isinstance(value, dict) and "$each" in value else [value]:
+            if v not in items:
+                items.append(v)
+
     def _matches(self, doc, query):
         for q_key, q_val in query.items():
             if q_key == "$or":
@@ -229,33 +351,58 @@ class MockCollection:
 
             doc_val = doc.get(q_key)
             if isinstance(q_val, dict):
-                for op, op_val in q_val.items():
-                    if op == "$in":
-                        if doc_val not in op_val:
-                            return False
-                    elif op == "$nin":
-                        if doc_val in op_val:
-                            return False
-                    elif op == "$ne":
-                        if doc_val == op_val:
-                            return False
-                    elif op == "$gt":
-                        if doc_val is None or doc_val <= op_val:
-                            return False
-                    elif op == "$gte":
-                        if doc_val is None or doc_val < op_val:
-                            return False
-                    elif op == "$lt":
-                        if doc_val is None or doc_val >= op_val:
-                            return False
-                    elif op == "$lte":
-                        if doc_val is None or doc_val > op_val:
-                            return False
+                try:
+                    if not self._matches_ops(doc_val, q_val):
+                        return False
+                except TypeError:
+                    # Mongo only compares values of the same BSON type
+                    return False
+            elif isinstance(doc_val, list) and not isinstance(q_val, list):
+                # A scalar matches an array field that contains it
+                if str(q_val) not in [str(x) for x in doc_val]:
+                    return False
             else:
                 if str(doc_val) != str(q_val):
                     return False
         return True
 
+    @staticmethod
+    def _matches_ops(doc_val, q_val):
+        for op, op_val in q_val.items():
+            values = doc_val if isinstance(doc_val, list) else [doc_val]
+            if op == "$in":
+                if not any(v in op_val for v in values):
+                    return False
+            elif op == "$nin":
+                if any(v in op_val for v in values):
+                    return False
+            elif op == "$ne":
+                if op_val in values:
+                    return False
+            elif op == "$all":
+                if not isinstance(doc_val, list) or any(v not in doc_val for v in op_val):
+                    return False
+            elif op == "$size":
+                if not isinstance(doc_val, list) or len(doc_val) != op_val:
+                    return False
+            elif op == "$regex":
+                flags = re.IGNORECASE if "i" in q_val.get("$options", "") else 0
+                if not any(isinstance(v, str) and re.search(op_val, v, flags) for v in values):
+                    return False
+            elif op == "$gt":
+                if doc_val is None or doc_val <= op_val:
+                    return False
+            elif op == "$gte":
+                if doc_val is None or doc_val < op_val:
+                    return False
+            elif op == "$lt":
+                if doc_val is None or doc_val >= op_val:
+                    return False
+            elif op == "$lte":
+                if doc_val is None or doc_val > op_val:
+                    return False
+        return True
+
 class MockDatabase:
     def __init__(self):
         self._collections = {}
@@ -21,10 +21,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from datetime import datetime, date, timezone, timedelta
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
+import asyncio
+import json
 import logging
 import uuid
+import zlib
 
 from backend.dependencies import get_current_user, get_db, admin_required, db
+from backend.index_manifest import ensure_indexes, index
 from backend.models import User
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -101,6 +105,39 @@ class AgentBrowserPayload(BaseModel):
     totalBrowseSeconds: Optional[float] = 0
 
 
+class AgentActivityDelta(BaseModel):
+    """
+    Incremental activity push. `seq` increases by one per push from a given
+    agent/day; every other field carries only what happened since the
+    previous push (new timeline segments, seconds to add).
+    """
+    model_config = ConfigDict(extra="allow")
+    agent_id: str
+    user_id: str
+    machine_name: str
+    date: Optional[str] = None
+    seq: int
+    timeline: Optional[List[Dict[str, Any]]] = None
+    sessions: Optional[List[Dict[str, Any]]] = None
+    activeSeconds: Optional[float] = 0
+    idleSeconds: Optional[float] = 0
+    focusSeconds: Optional[float] = 0
+    appSeconds: Optional[Dict[str, float]] = None
+    websiteSeconds: Optional[Dict[str, float]] = None
+
+
+class AgentBrowserDelta(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    agent_id: str
+    user_id: str
+    machine_name: str
+    date: Optional[str] = None
+    seq: int
+    visits: Optional[List[Dict[str, Any]]] = None
+    domainSeconds: Optional[Dict[str, float]] = None
+    totalBrowseSeconds: Optional[float] = 0
+
+
 class AgentDscPayload(BaseModel):
     model_config = ConfigDict(extra="allow")
     agent_id: str
@@ -153,23 +190,369 @@ class AgentSystemInfo(BaseModel):
 # ── INDEXES ──────────────────────────────────────────────────────────────────
 
 
+INDEXES = [
+    index("desktop_agents", "agent_id", unique=True),
+    index("desktop_agents", "user_id"),
+    index("desktop_activity", [("user_id", 1), ("date", 1)]),
+    index("desktop_activity", "agent_id"),
+    index("desktop_browser", [("user_id", 1), ("date", 1)]),
+    index("desktop_dsc", "agent_id"),
+    index("desktop_usb", "agent_id"),
+    index("desktop_productivity", [("user_id", 1), ("date", 1)]),
+    index("desktop_health", "agent_id"),
+    index("desktop_updates", "version"),
+    index("desktop_logs", "agent_id"),
+    index("desktop_rollups", [("scope", 1), ("period", 1), ("key", 1)], unique=True),
+]
+
+
 async def create_desktop_indexes():
     """Create MongoDB indexes for desktop collections."""
+    await ensure_indexes(INDEXES)
+
+
+# ── TELEMETRY DELTAS, WRITE-BEHIND BUFFER & ROLLUPS ─────────────────────────
+#
+# Agents that speak the delta protocol push only what changed since their last
+# push, tagged with a per-agent/day `seq`. Deltas are merged in memory and
+# written every _FLUSH_INTERVAL_SEC as one bulk_write of $inc / $push updates,
+# so a day's document is never rewritten wholesale. Timeline segments and
+# browser visits are stored as zlib-compressed JSON chunks.
+#
+# desktop_rollups holds per-user and org-wide ("__all__") totals per day and
+# per ISO week; the summary endpoints read those instead of raw day docs.
+#
+# Bounds: a delta is acknowledged once buffered, so a hard crash can lose at
+# most one flush interval of telemetry. `seq` replays are dropped against the
+# last seq seen by this process (seeded from the stored doc), so a retry that
+# lands on a different worker before the first flush can be applied twice.
+# Deltas from a failed flush are re-queued, and seqs of agent/days older than
+# yesterday are forgotten once flushed.
+
+_FLUSH_INTERVAL_SEC = 5
+ORG_SCOPE = "__all__"
+
+_DELTA_SPECS: Dict[str, Dict[str, Any]] = {
+    "activity": {
+        "collection": "desktop_activity",
+        "counters": ("activeSeconds", "idleSeconds", "focusSeconds"),
+        "maps": {"appSeconds": "app_seconds", "websiteSeconds": "website_seconds"},
+        "lists": ("sessions",),
+        "chunked": ("timeline", "timeline_chunks"),
+    },
+    "browser": {
+        "collection": "desktop_browser",
+        "counters": ("totalBrowseSeconds",),
+        "maps": {"domainSeconds": "domain_seconds"},
+        "lists": (),
+        "chunked": ("visits", "visit_chunks"),
+    },
+}
+
+# (kind, agent_id, user_id, date) → merged delta waiting for the next flush
+_pending_deltas: Dict[tuple, Dict[str, Any]] = {}
+# (kind, agent_id, user_id, date) → highest seq accepted by this process
+_accepted_seq: Dict[tuple, int] = {}
+_flush_lock = asyncio.Lock()
+_flush_task = None
+
+
+def _safe_key(name: str) -> str:
+    """Map an app/domain name to a MongoDB-safe field name (no '.' or leading '$')."""
+    return str(name or "unknown")[:200].replace(".", "\uff0e").replace("$", "\uff04")
+
+
+def _unsafe_key(key: str) -> str:
+    # Older docs hold the escape as the six-character text \uff0e / \uff04.
+    return (key.replace("\uff0e", ".").replace("\uff04", "$")
+            .replace("\\uff0e", ".").replace("\\uff04", "$"))
+
+
+def _human(seconds: float) -> str:
+    """Duration as the agent formats it ("2h 13m", "50m")."""
+    h, m = int(seconds // 3600), int(seconds % 3600 // 60)
+    return f"{h}h {m}m" if h > 0 else f"{m}m"
+
+
+def _compress_chunk(items: List[Dict[str, Any]], seq_from: int, seq_to: int) -> Dict[str, Any]:
+    raw = json.dumps(items, separators=(",", ":"), default=str).encode("utf-8")
+    return {"seq_from": seq_from, "seq_to": seq_to, "count": len(items), "z": zlib.compress(raw, 6)}
+
+
+def _decompress_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    for chunk in chunks or []:
+        try:
+            items.extend(json.loads(zlib.decompress(bytes(chunk["z"])).decode("utf-8")))
+        except Exception as e:
+            logger.warning(f"[DesktopAgent] Skipping unreadable telemetry chunk: {e}")
+    return items
+
+
+def _top_entries(seconds_map: Dict[str, float], label: str, limit: int = 20,
+                 human: bool = False) -> List[Dict[str, Any]]:
+    ranked = sorted((seconds_map or {}).items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return [{label: _unsafe_key(k), "seconds": round(v), **({"human": _human(v)} if human else {})}
+            for k, v in ranked]
+
+
+def _expand_report(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Present a delta-built day doc in the same shape as a legacy full push:
+    decompress chunks into the plain list and derive top-N lists from the
+    per-name second counters. Legacy docs pass through unchanged.
+    """
+    doc.pop("_id", None)
+    if "timeline_chunks" in doc:
+        doc["timeline"] = (doc.get("timeline") or []) + _decompress_chunks(doc.pop("timeline_chunks"))
+    if "visit_chunks" in doc:
+        doc["visits"] = (doc.get("visits") or []) + _decompress_chunks(doc.pop("visit_chunks"))
+    if "app_seconds" in doc:
+        doc["topApps"] = _top_entries(doc.pop("app_seconds"), "name", human=True)
+    if "website_seconds" in doc:
+        doc["topWebsites"] = _top_entries(doc.pop("website_seconds"), "domain", human=True)
+    if "domain_seconds" in doc:
+        doc["topDomains"] = _top_entries(doc.pop("domain_seconds"), "domain")
+        # A full browser push sends its per-domain list as `visits` too.
+        if not doc.get("visits"):
+            doc["visits"] = doc["topDomains"]
+    return doc
+
+
+def _week_key(report_date: str) -> str:
+    """ISO week bucket key: the Monday of the week containing report_date."""
     try:
-        await db.desktop_agents.create_index("agent_id", unique=True)
-        await db.desktop_agents.create_index("user_id")
-        await db.desktop_activity.create_index([("user_id", 1), ("date", 1)])
-        await db.desktop_activity.create_index("agent_id")
-        await db.desktop_browser.create_index([("user_id", 1), ("date", 1)])
-        await db.desktop_dsc.create_index("agent_id")
-        await db.desktop_usb.create_index("agent_id")
-        await db.desktop_productivity.create_index([("user_id", 1), ("date", 1)])
-        await db.desktop_health.create_index("agent_id")
-        await db.desktop_updates.create_index("version")
-        await db.desktop_logs.create_index("agent_id")
-        logger.info("[DesktopAgent] Indexes created")
-    except Exception as e:
-        logger.error(f"[DesktopAgent] Index creation failed: {e}")
+        d = date.fromisoformat(report_date[:10])
+    except ValueError:
+        d = date.today()
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def _rollup_ops(user_id: str, report_date: str, inc: Dict[str, float]) -> list:
+    """UpdateOne ops applying `inc` to the user/day, user/week and org/day rollups."""
+    from pymongo import UpdateOne
+
+    inc = {k: v for k, v in inc.items() if v}
+    if not inc:
+        return []
+    now = _now_iso()
+    targets = [
+        (user_id, "day", report_date),
+        (user_id, "week", _week_key(report_date)),
+        (ORG_SCOPE, "day", report_date),
+    ]
+    return [
+        UpdateOne(
+            {"scope": scope, "period": period, "key": key},
+            {"$inc": inc, "$set": {"updated_at": now}},
+            upsert=True,
+        )
+        for scope, period, key in targets
+    ]
+
+
+async def _apply_rollups(ops: list):
+    if ops:
+        try:
+            await db.desktop_rollups.bulk_write(ops, ordered=False)
+        except Exception as e:
+            logger.error(f"[DesktopAgent] Rollup update failed: {e}")
+
+
+async def _accept_delta(kind: str, payload: BaseModel) -> Dict[str, Any]:
+    """Validate `seq` and merge a delta into the write-behind buffer."""
+    spec = _DELTA_SPECS[kind]
+    report_date = payload.date or _today()
+    key = (kind, payload.agent_id, payload.user_id, report_date)
+
+    last = _accepted_seq.get(key)
+    if last is None:
+        stored = await db[spec["collection"]].find_one(
+            {"agent_id": payload.agent_id, "user_id": payload.user_id, "date": report_date},
+            {"_id": 0, "last_seq": 1},
+        )
+        last = int((stored or {}).get("last_seq") or 0)
+    if payload.seq <= last:
+        return {"success": True, "ack_seq": last, "duplicate": True}
+
+    entry = _pending_deltas.setdefault(key, {
+        "machine_name": payload.machine_name,
+        "seq_from": payload.seq,
+        "seq_to": payload.seq,
+        "counters": {},
+        "maps": {},
+        "lists": {},
+        "chunked": [],
+    })
+    entry["machine_name"] = payload.machine_name
+    entry["seq_to"] = payload.seq
+    for field in spec["counters"]:
+        value = getattr(payload, field, 0) or 0
+        if value:
+            entry["counters"][field] = entry["counters"].get(field, 0) + value
+    for field, stored_as in spec["maps"].items():
+        for name, seconds in (getattr(payload, field, None) or {}).items():
+            path = f"{stored_as}.{_safe_key(name)}"
+            entry["maps"][path] = entry["maps"].get(path, 0) + (seconds or 0)
+    for field in spec["lists"]:
+        entry["lists"].setdefault(field, []).extend(getattr(payload, field, None) or [])
+    entry["chunked"].extend(getattr(payload, spec["chunked"][0], None) or [])
+
+    _accepted_seq[key] = payload.seq
+    gap = payload.seq > last + 1
+    if gap:
+        logger.warning(
+            f"[DesktopAgent] {kind} seq gap for agent={payload.agent_id} "
+            f"date={report_date}: expected {last + 1}, got {payload.seq}"
+        )
+    return {"success": True, "ack_seq": payload.seq, "gap": gap}
+
+
+def _requeue_delta(key: tuple, entry: Dict[str, Any]):
+    """Put a delta whose write failed back in front of anything buffered since."""
+    newer = _pending_deltas.get(key)
+    if newer is None:
+        _pending_deltas[key] = entry
+        return
+    for field, value in entry["counters"].items():
+        newer["counters"][field] = newer["counters"].get(field, 0) + value
+    for path, value in entry["maps"].items():
+        newer["maps"][path] = newer["maps"].get(path, 0) + value
+    for field, items in entry["lists"].items():
+        newer["lists"][field] = items + newer["lists"].get(field, [])
+    newer["chunked"] = entry["chunked"] + newer["chunked"]
+    newer["seq_from"] = entry["seq_from"]
+
+
+def _evict_accepted_seq():
+    """
+    Forget the seq of flushed agent/days older than yesterday: a late replay
+    for one re-reads `last_seq` from the stored doc instead.
+    """
+    cutoff = (date.today() - timedelta(days=1)).isoformat()
+    stale = [key for key in _accepted_seq if key[3] < cutoff and key not in _pending_deltas]
+    for key in stale:
+        del _accepted_seq[key]
+
+
+async def flush_telemetry_buffer() -> int:
+    """
+    Write all buffered deltas. Returns the number of day docs touched.
+
+    Deltas whose update fails are re-queued for the next flush, ahead of
+    anything buffered for the same agent/day since; their rollups are only
+    applied once the day doc update goes through.
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    async with _flush_lock:
+        if not _pending_deltas:
+            return 0
+        batch = dict(_pending_deltas)
+        _pending_deltas.clear()
+
+        now = _now_iso()
+        ops_by_collection: Dict[str, list] = {}
+        keys_by_collection: Dict[str, list] = {}
+        rollup_ops: list = []
+        for key, entry in batch.items():
+            kind, agent_id, user_id, report_date = key
+            spec = _DELTA_SPECS[kind]
+            update: Dict[str, Any] = {
+                "$set": {"machine_name": entry["machine_name"], "updated_at": now, "protocol": "delta"},
+                "$max": {"last_seq": entry["seq_to"]},
+                "$setOnInsert": {
+                    "agent_id": agent_id, "user_id": user_id,
+                    "date": report_date, "created_at": now,
+                },
+            }
+            inc = {**entry["counters"], **entry["maps"]}
+            if inc:
+                update["$inc"] = inc
+            push: Dict[str, Any] = {
+                field: {"$each": items} for field, items in entry["lists"].items() if items
+            }
+            if entry["chunked"]:
+                push[spec["chunked"][1]] = _compress_chunk(
+                    entry["chunked"], entry["seq_from"], entry["seq_to"]
+                )
+            if push:
+                update["$push"] = push
+            ops_by_collection.setdefault(spec["collection"], []).append(UpdateOne(
+                {"agent_id": agent_id, "user_id": user_id, "date": report_date},
+                update,
+                upsert=True,
+            ))
+            keys_by_collection.setdefault(spec["collection"], []).append(key)
+
+        for collection, ops in ops_by_collection.items():
+            keys = keys_by_collection[collection]
+            upserted: Dict[int, Any] = {}
+            try:
+                result = await db[collection].bulk_write(ops, ordered=False)
+                failed = set()
+                upserted = getattr(result, "upserted_ids", None) or {}
+            except BulkWriteError as e:
+                failed = {err["index"] for err in e.details.get("writeErrors", [])}
+                upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+                logger.error(f"[DesktopAgent] {len(failed)} of {len(ops)} telemetry updates to "
+                             f"{collection} failed; re-queued")
+            except Exception as e:
+                failed = set(range(len(ops)))
+                logger.error(f"[DesktopAgent] Telemetry flush to {collection} failed, "
+                             f"{len(ops)} updates re-queued: {e}")
+            for idx, key in enumerate(keys):
+                if idx in failed:
+                    _requeue_delta(key, batch[key])
+                    continue
+                _, _, user_id, report_date = key
+                counters = dict(batch[key]["counters"])
+                # A freshly upserted day doc counts as one more report for the day
+                if idx in upserted:
+                    counters[f"{collection}_reports"] = 1
+                rollup_ops.extend(_rollup_ops(user_id, report_date, counters))
+        await _apply_rollups(rollup_ops)
+        _evict_accepted_seq()
+        return len(batch)
+
+
+async def _telemetry_flush_loop():
+    while True:
+        await asyncio.sleep(_FLUSH_INTERVAL_SEC)
+        try:
+            await flush_telemetry_buffer()
+        except Exception as e:
+            logger.error(f"[DesktopAgent] Telemetry flush loop error: {e}")
+
+
+def start_telemetry_flush_loop():
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.get_event_loop().create_task(_telemetry_flush_loop())
+        logger.info("[DesktopAgent] Telemetry write-behind loop started")
+
+
+async def _snapshot_rollup_diff(collection: str, doc_filter: Dict[str, Any], update: Dict[str, Any],
+                                fields: tuple) -> Dict[str, float]:
+    """
+    Apply a legacy full-snapshot upsert and return how much each counter in
+    `fields` moved, so rollups stay correct for agents that still overwrite.
+    """
+    from pymongo import ReturnDocument
+
+    before = await db[collection].find_one_and_update(
+        doc_filter,
+        update,
+        projection={"_id": 0, **{f: 1 for f in fields}},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+    new_values = update["$set"]
+    diff = {f: (new_values.get(f) or 0) - ((before or {}).get(f) or 0) for f in fields}
+    if before is None:
+        diff[f"{collection}_reports"] = 1
+    return diff
 
 
 # ── DB reference (injected by dependency) ─────────────────────────────────────
@@ -270,7 +653,8 @@ async def push_activity(
         report_date = payload.date or _today()
         now = _now_iso()
 
-        await db.desktop_activity.update_one(
+        diff = await _snapshot_rollup_diff(
+            "desktop_activity",
             {
                 "agent_id": payload.agent_id,
                 "user_id": payload.user_id,
@@ -295,14 +679,29 @@ async def push_activity(
                     "created_at": now,
                 },
             },
-            upsert=True,
+            ("activeSeconds", "idleSeconds", "focusSeconds"),
         )
+        await _apply_rollups(_rollup_ops(payload.user_id, report_date, diff))
         return {"success": True, "message": "Activity report saved"}
     except Exception as e:
         logger.error(f"[DesktopAgent] Activity push error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/activity/delta")
+async def push_activity_delta(payload: AgentActivityDelta):
+    """
+    Incremental activity push: only timeline segments, sessions and seconds
+    accumulated since the previous push. Returns `ack_seq`; the agent should
+    resend anything after ack_seq and may drop everything up to it.
+    """
+    try:
+        return await _accept_delta("activity", payload)
+    except Exception as e:
+        logger.error(f"[DesktopAgent] Activity delta error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ── 3. Browser Report ────────────────────────────────────────────────────────
 
 
@@ -319,7 +718,8 @@ async def push_browser(
         report_date = payload.date or _today()
         now = _now_iso()
 
-        await db.desktop_browser.update_one(
+        diff = await _snapshot_rollup_diff(
+            "desktop_browser",
             {
                 "agent_id": payload.agent_id,
                 "user_id": payload.user_id,
@@ -340,14 +740,25 @@ async def push_browser(
                     "created_at": now,
                 },
             },
-            upsert=True,
+            ("totalBrowseSeconds",),
         )
+        await _apply_rollups(_rollup_ops(payload.user_id, report_date, diff))
         return {"success": True, "message": "Browser report saved"}
     except Exception as e:
         logger.error(f"[DesktopAgent] Browser push error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/browser/delta")
+async def push_browser_delta(payload: AgentBrowserDelta):
+    """Incremental browser push — new visits and per-domain seconds only."""
+    try:
+        return await _accept_delta("browser", payload)
+    except Exception as e:
+        logger.error(f"[DesktopAgent] Browser delta error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ── 4. DSC Status Sync ──────────────────────────────────────────────────────
 
 
@@ -452,7 +863,8 @@ async def push_productivity(
         report_date = payload.date or _today()
         now = _now_iso()
 
-        await db.desktop_productivity.update_one(
+        diff = await _snapshot_rollup_diff(
+            "desktop_productivity",
             {
                 "agent_id": payload.agent_id,
                 "user_id": payload.user_id,
@@ -476,8 +888,12 @@ async def push_productivity(
                     "created_at": now,
                 },
             },
-            upsert=True,
+            ("score",),
         )
+        await _apply_rollups(_rollup_ops(payload.user_id, report_date, {
+            "score_sum": diff["score"],
+            "score_count": diff.get("desktop_productivity_reports", 0),
+        }))
         return {"success": True, "message": "Productivity report saved"}
     except Exception as e:
         logger.error(f"[DesktopAgent] Productivity push error: {e}")
@@ -676,8 +1092,7 @@ async def get_activity_reports(
         .limit(limit)
         .to_list(length=limit)
     )
-    for doc in docs:
-        doc.pop("_id", None)
+    docs = [_expand_report(doc) for doc in docs]
 
     return {"success": True, "reports": docs}
 
@@ -721,8 +1136,7 @@ async def get_browser_reports(
         .limit(limit)
         .to_list(length=limit)
     )
-    for doc in docs:
-        doc.pop("_id", None)
+    docs = [_expand_report(doc) for doc in docs]
 
     return {"success": True, "reports": docs}
 
@@ -903,18 +1317,15 @@ async def get_desktop_summary(
     )
     dsc_connected = await db.desktop_agents.count_documents({"dsc_plugged": True})
 
-    # Today's activity summary
-    today_activities = await db.desktop_activity.find({"date": today}).to_list(
-        length=500
-    )
-    total_active_today = sum(a.get("activeSeconds", 0) for a in today_activities)
-    total_focus_today = sum(a.get("focusSeconds", 0) for a in today_activities)
-
-    # Productivity score average
-    today_prod = await db.desktop_productivity.find({"date": today}).to_list(length=500)
-    avg_score = 0
-    if today_prod:
-        avg_score = sum(p.get("score", 0) for p in today_prod) / len(today_prod)
+    # Today's activity / productivity totals come from the org-wide rollup,
+    # maintained on every push, instead of re-reading each day doc.
+    rollup = await db.desktop_rollups.find_one(
+        {"scope": ORG_SCOPE, "period": "day", "key": today}, {"_id": 0}
+    ) or {}
+    total_active_today = rollup.get("activeSeconds", 0)
+    total_focus_today = rollup.get("focusSeconds", 0)
+    score_count = rollup.get("score_count", 0)
+    avg_score = rollup.get("score_sum", 0) / score_count if score_count else 0
 
     # USB events today
     usb_today = await db.desktop_usb.count_documents(
@@ -933,11 +1344,57 @@ async def get_desktop_summary(
             "total_focus_today_seconds": total_focus_today,
             "avg_productivity_score": round(avg_score, 1),
             "usb_events_today": usb_today,
-            "activity_reports_today": len(today_activities),
+            "activity_reports_today": rollup.get("desktop_activity_reports", 0),
         },
     }
 
 
+# ── Rollups ──────────────────────────────────────────────────────────────────
+
+
+@router.get("/rollups")
+async def get_rollups(
+    period: str = Query(default="day", description="day or week"),
+    user_id: Optional[str] = Query(default=None, description="User, or omit for org-wide"),
+    date_from: Optional[str] = Query(default=None, alias="from"),
+    date_to: Optional[str] = Query(default=None, alias="to"),
+    limit: int = Query(default=60, le=400),
+    current_user: User = Depends(get_current_user),
+    db=Depends(get_db),
+):
+    """
+    Precomputed per-user (or org-wide) day/week totals: active, idle and
+    focus seconds, browse seconds, productivity score sum/count and report
+    counts. Admin sees all; staff sees own.
+    """
+    if period not in ("day", "week"):
+        raise HTTPException(status_code=400, detail="period must be 'day' or 'week'")
+    own_id = str(getattr(current_user, "id", "") or getattr(current_user, "_id", ""))
+    scope = user_id or ORG_SCOPE
+    if not _admin_or_self(current_user, scope):
+        scope = own_id
+
+    query: Dict[str, Any] = {"scope": scope, "period": period}
+    if date_from or date_to:
+        key_query = {}
+        if date_from:
+            key_query["$gte"] = _week_key(date_from) if period == "week" else date_from
+        if date_to:
+            key_query["$lte"] = date_to
+        query["key"] = key_query
+
+    docs = (
+        await db.desktop_rollups.find(query, {"_id": 0})
+        .sort("key", -1)
+        .limit(limit)
+        .to_list(length=limit)
+    )
+    for doc in docs:
+        count = doc.get("score_count") or 0
+        doc["avg_productivity_score"] = round(doc.get("score_sum", 0) / count, 1) if count else 0
+    return {"success": True, "period": period, "scope": scope, "rollups": docs}
+
+
 # ── Export Reports ───────────────────────────────────────────────────────────
 
 
@@ -992,8 +1449,7 @@ async def export_reports(
         .sort("date" if "date" in query else "timestamp", -1)
         .to_list(length=10000)
     )
-    for doc in docs:
-        doc.pop("_id", None)
+    docs = [_expand_report(doc) for doc in docs]
 
     return {
         "success": True,
@@ -0,0 +1,363 @@
+"""
+doc_extraction.py
+────────────────────────────────────────────────────────────────────────────────
+Document text / table / page-image extraction off the event loop.
+
+pdfplumber, python-docx, openpyxl and pandas parsing is pure CPU and was run
+directly inside async handlers (resume parsing, the AI document reader, ROC
+and MCA master-data uploads, purchase invoice uploads, MIS documents), so a
+single 40-page PDF stalled every other request on the worker.
+
+Every module now makes one call:
+
+    pages = await doc_extraction.extract("pdf_text", contents, max_pages=10)
+
+which runs the named parser (PARSERS below) in a bounded process pool:
+
+  EXTRACT_WORKERS       worker processes (default min(2, CPUs)); jobs beyond
+                        that queue in the parent, so the timeout only counts
+                        time spent running
+  EXTRACT_TIMEOUT_SEC   per-job limit (default 60). A worker cannot be
+                        interrupted mid-parse, so on a timeout the pool is
+                        killed and the next job starts a fresh one; jobs
+                        that were running beside it are retried once
+  EXTRACT_MEMORY_MB     address-space cap per worker (default 1536, 0 for
+                        none, POSIX only); a parse that exceeds it fails
+                        with ExtractionError instead of taking the host down
+
+Results are cached per process by the SHA-256 of the upload bytes plus the
+parser and its options (EXTRACT_CACHE_MB, default 64, least recently used
+evicted), and concurrent requests for the same key share one job — the
+same resume or statement uploaded twice is parsed once. Cached results are
+stored pickled, so callers may mutate what they get back.
+
+Parsers raise their own exceptions (a corrupt PDF raises whatever
+pdfplumber raises) through to the caller; pool-level failures raise
+ExtractionError / ExtractionTimeout.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import pickle
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("doc_extraction")
+
+WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(2, os.cpu_count() or 1))))
+TIMEOUT_SEC = float(os.getenv("EXTRACT_TIMEOUT_SEC", "60"))
+MEMORY_MB = int(os.getenv("EXTRACT_MEMORY_MB", "1536"))
+CACHE_BYTES = int(os.getenv("EXTRACT_CACHE_MB", "64")) * 1024 * 1024
+
+
+class ExtractionError(RuntimeError):
+    """The extraction job itself failed (worker died, out of memory, pool shut down)."""
+
+
+class ExtractionTimeout(ExtractionError):
+    """The extraction job ran longer than its timeout."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# PARSERS (run inside the worker processes)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _pdf_text(contents: bytes, max_pages: Optional[int] = None, tables: bool = False,
+              x_tolerance: Optional[float] = None, y_tolerance: Optional[float] = None,
+              layout: bool = False, text_flow: bool = False) -> List[str]:
+    """
+    Text of each page (empty string for a page without a text layer). With
+    tables=True, each table's non-empty rows are appended to its page as
+    "cell | cell" lines. layout / text_flow fall back to plain extraction
+    on pages where they fail.
+    """
+    import pdfplumber
+
+    kwargs = {k: v for k, v in (("x_tolerance", x_tolerance), ("y_tolerance", y_tolerance)) if v is not None}
+    pages = []
+    with pdfplumber.open(io.BytesIO(contents)) as pdf:
+        for page in pdf.pages[:max_pages]:
+            t = None
+            if layout or text_flow:
+                try:
+                    t = page.extract_text(layout=True) if layout else page.extract_text(use_text_flow=True)
+                except Exception:
+                    t = None
+            t = t or page.extract_text(**kwargs) or ""
+            if tables:
+                for table in page.extract_tables():
+                    rows = []
+                    for row in table:
+                        cells = [str(c).strip() if c else "" for c in row]
+                        if any(cells):
+                            rows.append(" | ".join(cells))
+                    if rows:
+                        t += "\n" + "\n".join(rows)
+            pages.append(t)
+    return pages
+
+
+def _pdf_tables(contents: bytes, max_pages: Optional[int] = None) -> List[List[List[Any]]]:
+    """Every ruled table on the pages, in page order, as raw rows of cells."""
+    import pdfplumber
+
+    out = []
+    with pdfplumber.open(io.BytesIO(contents)) as pdf:
+        for page in pdf.pages[:max_pages]:
+            out.extend(t for t in (page.extract_tables() or []) if t)
+    return out
+
+
+def _pdf_images(contents: bytes, max_pages: Optional[int] = None, resolution: int = 150,
+                quality: int = 85, image_format: str = "JPEG") -> List[bytes]:
+    """Each page rendered to JPEG (or `image_format`) bytes, for the vision models."""
+    import pdfplumber
+
+    images = []
+    with pdfplumber.open(io.BytesIO(contents)) as pdf:
+        for page in pdf.pages[:max_pages]:
+            pil_img = page.to_image(resolution=resolution).original
+            if pil_img.mode not in ("RGB", "L"):
+                pil_img = pil_img.convert("RGB")
+            buf = io.BytesIO()
+            pil_img.save(buf, format=image_format, quality=quality)
+            images.append(buf.getvalue())
+            del pil_img, buf
+    return images
+
+
+def _pdf_page_count(contents: bytes) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(contents)) as pdf:
+        return len(pdf.pages)
+
+
+def _image_jpeg(contents: bytes, quality: int = 85) -> bytes:
+    """An uploaded image (any format PIL reads) re-encoded as RGB / greyscale JPEG."""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(contents))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _docx_text(contents: bytes) -> List[str]:
+    """Non-empty paragraphs, then each table row's non-empty cells as "cell | cell"."""
+    import docx
+
+    d = docx.Document(io.BytesIO(contents))
+    parts = [p.text for p in d.paragraphs if p.text.strip()]
+    for table in d.tables:
+        for row in table.rows:
+            cells = [c.text.strip() for c in row.cells if c.text.strip()]
+            if cells:
+                parts.append(" | ".join(cells))
+    return parts
+
+
+def _workbook_rows(contents: bytes) -> Dict[str, List[List[Any]]]:
+    """Cell values of every row, per sheet in workbook order (openpyxl, cached formula values)."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(io.BytesIO(contents), data_only=True, read_only=True)
+    try:
+        return {ws.title: [list(row) for row in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+
+def _sheet_text(contents: bytes, engine: Optional[str] = None) -> str:
+    """The first sheet as a pandas text table."""
+    import pandas as pd
+
+    return pd.read_excel(io.BytesIO(contents), engine=engine).to_string(index=False)
+
+
+def _mis_document(contents: bytes, filename: str):
+    from backend.mis_doc_readers import read_document
+
+    return read_document(contents, filename)
+
+
+PARSERS: Dict[str, Callable[..., Any]] = {
+    "pdf_text": _pdf_text,
+    "pdf_tables": _pdf_tables,
+    "pdf_images": _pdf_images,
+    "pdf_page_count": _pdf_page_count,
+    "image_jpeg": _image_jpeg,
+    "docx_text": _docx_text,
+    "workbook_rows": _workbook_rows,
+    "sheet_text": _sheet_text,
+    "mis_document": _mis_document,
+}
+
+
+def _run(kind: str, contents: bytes, options: Dict[str, Any]) -> bytes:
+    # Pickled here so the parent caches exactly what it receives.
+    try:
+        result = PARSERS[kind](contents, **options)
+    except MemoryError:
+        raise ExtractionError(f"{kind}: document too large to extract within {MEMORY_MB} MB")
+    return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _init_worker(memory_mb: int):
+    # One BLAS thread per worker: the pool is the parallelism, and idle
+    # thread buffers count against the address-space cap.
+    for var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:  # not POSIX
+        return
+    limit = memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not cap extraction worker memory: {e}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# POOL
+# ─────────────────────────────────────────────────────────────────────────────
+
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the parent has a running event loop and driver threads
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_init_worker, initargs=(MEMORY_MB,))
+    return _pool
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots, _slots_loop = asyncio.Semaphore(WORKERS), loop
+    return _slots
+
+
+def _kill_pool(pool: ProcessPoolExecutor):
+    """Tear down a pool whose worker is stuck; shutdown() alone would wait for it."""
+    global _pool
+    if _pool is pool:
+        _pool = None
+    # ProcessPoolExecutor has no public way to stop a running task.
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        try:
+            proc.kill()
+        except Exception:
+            pass
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _run_in_pool(kind: str, contents: bytes, options: Dict[str, Any], timeout: float) -> bytes:
+    loop = asyncio.get_running_loop()
+    async with _get_slots():
+        for _ in range(2):
+            pool = _get_pool()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(pool, _run, kind, contents, options), timeout)
+            except asyncio.TimeoutError:
+                _kill_pool(pool)
+                raise ExtractionTimeout(f"{kind}: extraction took longer than {timeout:.0f}s")
+            except BrokenProcessPool:
+                # A worker died (killed after another job's timeout, or by the
+                # OS): retry once on a fresh pool.
+                if _pool is pool:
+                    _kill_pool(pool)
+    raise ExtractionError(f"{kind}: extraction worker died")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CACHE / PUBLIC API
+# ─────────────────────────────────────────────────────────────────────────────
+
+_cache: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+_cache_size = 0
+_inflight: Dict[Tuple[str, str, str], "asyncio.Future[bytes]"] = {}
+
+
+def _cache_get(key) -> Optional[bytes]:
+    blob = _cache.get(key)
+    if blob is not None:
+        _cache.move_to_end(key)
+    return blob
+
+
+def _cache_put(key, blob: bytes):
+    global _cache_size
+    if len(blob) > CACHE_BYTES // 4:
+        return  # one huge result would evict everything else
+    old = _cache.pop(key, None)
+    if old is not None:
+        _cache_size -= len(old)
+    _cache[key] = blob
+    _cache_size += len(blob)
+    while _cache_size > CACHE_BYTES and _cache:
+        _, evicted = _cache.popitem(last=False)
+        _cache_size -= len(evicted)
+
+
+def clear_cache():
+    global _cache_size
+    _cache.clear()
+    _cache_size = 0
+
+
+async def extract(kind: str, contents: bytes, *, timeout: Optional[float] = None, **options) -> Any:
+    """
+    Run parser `kind` (a key of PARSERS) over the upload bytes in the
+    extraction pool and return its result; identical bytes, parser and
+    options are served from the cache.
+    """
+    if kind not in PARSERS:
+        raise ValueError(f"Unknown extraction parser: {kind}")
+    key = (hashlib.sha256(contents).hexdigest(), kind, repr(sorted(options.items())))
+    blob = _cache_get(key)
+    if blob is None:
+        pending = _inflight.get(key)
+        if pending is not None:
+            blob = await asyncio.shield(pending)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            _inflight[key] = future
+            try:
+                blob = await _run_in_pool(kind, contents, options, timeout or TIMEOUT_SEC)
+                _cache_put(key, blob)
+                future.set_result(blob)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # mark retrieved when nobody else was waiting
+                raise
+            finally:
+                _inflight.pop(key, None)
+    return pickle.loads(blob)
@@ -0,0 +1,561 @@
+"""
+drive_mirror.py
+────────────────────────────────────────────────────────────────────────────────
+Local metadata mirror of the Google Drive folders linked to client portal users.
+
+Portal browsing, the admin visibility views and folder-name lookups used to
+call Drive `files().list` / `files().get` on every request (one page of at
+most 500 items, no paging). They now read from Mongo:
+
+  drive_mirror_roots    one doc per linked root folder
+                        {_id: folder_id, name, status: pending|ready|missing,
+                         synced_at, item_count}
+  drive_mirror_files    one doc per file/folder under a ready root
+                        {_id: file_id, id, name, name_lower, mimeType, is_folder,
+                         folder_rank, size, modifiedTime, webViewLink, iconLink,
+                         parents, roots, synced_at}
+  drive_mirror_state    {_id: "changes", page_token} — Drive changes feed position
+
+The reconciler (job runner, every minute) registers newly linked roots,
+replays the Drive changes feed from the stored page token, crawls roots that
+are new or due for a drift-repair pass, and drops roots that are no longer
+linked. The start page token is taken before any crawl, so edits made while
+a crawl runs are replayed afterwards (applying a change is idempotent).
+
+Readers call `list_folder`; it returns None while a root is still pending so
+the caller can fall back to a live (paged) listing via `live_list`.
+
+All Drive access goes through a backend object (`set_backend`):
+GoogleDriveBackend for production, FakeDriveBackend for tests and local runs
+without Drive credentials.
+"""
+
+import asyncio
+import itertools
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from pymongo import UpdateOne
+
+from backend.dependencies import db
+from backend.index_manifest import ensure_indexes, index
+from backend import list_sync
+
+logger = logging.getLogger("drive_mirror")
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+ITEM_FIELDS = "id,name,mimeType,size,modifiedTime,webViewLink,iconLink,parents,trashed"
+# Fields returned to API callers — the shape of the old live listing.
+OUTPUT_FIELDS = ("id", "name", "mimeType", "size", "modifiedTime", "webViewLink", "iconLink")
+LIST_SORT = [("folder_rank", 1), ("name_lower", 1), ("_id", 1)]
+
+STATE_ID = "changes"
+FULL_RECRAWL_EVERY = timedelta(hours=24)
+WRITE_BATCH = 500
+
+# Drive calls are blocking; cap how many run at once across the process.
+_DRIVE_CALLS = asyncio.Semaphore(3)
+
+
+class ChangesTokenExpired(Exception):
+    """The stored changes page token is no longer accepted by Drive."""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# BACKENDS
+# ─────────────────────────────────────────────────────────────────────────────
+
+class GoogleDriveBackend:
+    """Drive v3 API via the shared OAuth service from invoicing."""
+
+    def configured(self) -> bool:
+        from backend.invoicing import _drive_configured
+        return _drive_configured()
+
+    def _service(self):
+        from backend.invoicing import _get_drive_service
+        return _get_drive_service()
+
+    def list_children(self, folder_id: str) -> List[Dict[str, Any]]:
+        service = self._service()
+        items: List[Dict[str, Any]] = []
+        page_token = None
+        while True:
+            result = service.files().list(
+                q=f"'{folder_id}' in parents and trashed = false",
+                fields=f"nextPageToken,files({ITEM_FIELDS})",
+                orderBy="folder,name",
+                pageSize=1000,
+                pageToken=page_token,
+            ).execute()
+            items.extend(result.get("files", []))
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                return items
+
+    def get_item(self, file_id: str) -> Optional[Dict[str, Any]]:
+        from googleapiclient.errors import HttpError
+        try:
+            return self._service().files().get(fileId=file_id, fields=ITEM_FIELDS).execute()
+        except HttpError as e:
+            if getattr(e.resp, "status", None) == 404:
+                return None
+            raise
+
+    def start_page_token(self) -> str:
+        return self._service().changes().getStartPageToken().execute()["startPageToken"]
+
+    def list_changes(self, page_token: str) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+        """One page of changes: (changes, next_page_token, new_start_page_token)."""
+        from googleapiclient.errors import HttpError
+        try:
+            result = self._service().changes().list(
+                pageToken=page_token,
+                fields=f"nextPageToken,newStartPageToken,changes(fileId,removed,file({ITEM_FIELDS}))",
+                pageSize=1000,
+                includeRemoved=True,
+                spaces="drive",
+            ).execute()
+        except HttpError as e:
+            status = getattr(e.resp, "status", None)
+            if status in (404, 410) or (status == 400 and "pageToken" in str(e)):
+                raise ChangesTokenExpired(str(e))
+            raise
+        return result.get("changes", []), result.get("nextPageToken"), result.get("newStartPageToken")
+
+
+class FakeDriveBackend:
+    """
+    In-memory Drive with a changes feed, for tests and local development.
+
+        fake = FakeDriveBackend()
+        root = fake.add_folder("Acme Ltd")
+        fake.add_file("gst.pdf", parent=root)
+        drive_mirror.set_backend(fake)
+    """
+
+    def __init__(self, page_size: int = 100):
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.log: List[Dict[str, Any]] = []   # position in this list is the page token
+        self.page_size = page_size
+        self.calls: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _record(self, file_id: str, removed: bool = False):
+        item = self.items.get(file_id)
+        self.log.append({"fileId": file_id, "removed": removed,
+                         "file": dict(item) if item and not removed else None})
+
+    def add_file(self, name: str, parent: Optional[str] = None, mime_type: str = "application/pdf",
+                 file_id: Optional[str] = None, **extra) -> str:
+        file_id = file_id or f"fake{next(self._ids)}"
+        self.items[file_id] = {
+            "id": file_id, "name": name, "mimeType": mime_type,
+            "parents": [parent] if parent else [], "trashed": False,
+            "modifiedTime": datetime.now(timezone.utc).isoformat(),
+            "webViewLink": f"https://drive.example/{file_id}", **extra,
+        }
+        self._record(file_id)
+        return file_id
+
+    def add_folder(self, name: str, parent: Optional[str] = None, file_id: Optional[str] = None) -> str:
+        return self.add_file(name, parent=parent, mime_type=FOLDER_MIME, file_id=file_id)
+
+    def rename(self, file_id: str, name: str):
+        self.items[file_id]["name"] = name
+        self._record(file_id)
+
+    def move(self, file_id: str, new_parent: str):
+        self.items[file_id]["parents"] = [new_parent]
+        self._record(file_id)
+
+    def trash(self, file_id: str):
+        self.items[file_id]["trashed"] = True
+        self._record(file_id)
+
+    def delete(self, file_id: str):
+        self.items.pop(file_id, None)
+        self._record(file_id, removed=True)
+
+    def expire_tokens(self):
+        """Make every previously issued page token invalid."""
+        self.log = [None] * len(self.log)
+
+    # backend interface
+    def configured(self) -> bool:
+        return True
+
+    def list_children(self, folder_id: str) -> List[Dict[str, Any]]:
+        self._count("list_children")
+        children = [dict(f) for f in self.items.values()
+                    if folder_id in f["parents"] and not f["trashed"]]
+        children.sort(key=lambda f: (f["mimeType"] != FOLDER_MIME, f["name"].lower()))
+        return children
+
+    def get_item(self, file_id: str) -> Optional[Dict[str, Any]]:
+        self._count("get_item")
+        item = self.items.get(file_id)
+        return dict(item) if item else None
+
+    def start_page_token(self) -> str:
+        self._count("start_page_token")
+        return str(len(self.log))
+
+    def list_changes(self, page_token: str):
+        self._count("list_changes")
+        start = int(page_token)
+        if start < len(self.log) and self.log[start] is None:
+            raise ChangesTokenExpired(page_token)
+        page = self.log[start:start + self.page_size]
+        end = start + len(page)
+        if end < len(self.log):
+            return page, str(end), None
+        return page, None, str(end)
+
+
+_backend = None
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = GoogleDriveBackend()
+    return _backend
+
+
+async def _call(fn, *args):
+    async with _DRIVE_CALLS:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def live_list(folder_id: str) -> List[Dict[str, Any]]:
+    """All children of a folder straight from Drive (every page), in listing shape."""
+    items = await _call(get_backend().list_children, folder_id)
+    return [_output(i) for i in items]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WRITES
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _output(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: item[k] for k in OUTPUT_FIELDS if k in item}
+
+
+def _entry(item: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    is_folder = item.get("mimeType") == FOLDER_MIME
+    name = item.get("name") or ""
+    return {
+        **_output(item),
+        "name_lower": name.lower(),
+        "is_folder": is_folder,
+        "folder_rank": 0 if is_folder else 1,
+        "parents": item.get("parents") or [],
+        "synced_at": now,
+    }
+
+
+async def _flush(ops: List[Any]):
+    if ops:
+        await db.drive_mirror_files.bulk_write(ops, ordered=False)
+        ops.clear()
+
+
+async def _crawl(folder_id: str, roots: Sequence[str], replace_roots: bool, now: datetime) -> int:
+    """
+    Mirror everything below `folder_id`. With replace_roots the subtree's
+    `roots` are set to exactly `roots` (a folder moved in by a change);
+    otherwise they are added (a root crawl). Returns the number of entries.
+    """
+    backend = get_backend()
+    ops: List[Any] = []
+    count = 0
+    frontier = [folder_id]
+    while frontier:
+        next_frontier = []
+        for parent in frontier:
+            for item in await _call(backend.list_children, parent):
+                update = {"$set": _entry(item, now)}
+                if replace_roots:
+                    update["$set"]["roots"] = list(roots)
+                else:
+                    update["$addToSet"] = {"roots": {"$each": list(roots)}}
+                ops.append(UpdateOne({"_id": item["id"]}, update, upsert=True))
+                count += 1
+                if item.get("mimeType") == FOLDER_MIME:
+                    next_frontier.append(item["id"])
+                if len(ops) >= WRITE_BATCH:
+                    await _flush(ops)
+        frontier = next_frontier
+    await _flush(ops)
+    return count
+
+
+async def crawl_root(root_id: str) -> int:
+    """Full listing of one root; entries no longer under it lose that root."""
+    now = datetime.now(timezone.utc)
+    root = await _call(get_backend().get_item, root_id)
+    if root is None or root.get("trashed"):
+        await _drop_root_entries(root_id)
+        await db.drive_mirror_roots.update_one(
+            {"_id": root_id}, {"$set": {"status": "missing", "synced_at": now}}
+        )
+        return 0
+    count = await _crawl(root_id, [root_id], replace_roots=False, now=now)
+    # Anything under this root that the crawl did not touch has left it
+    await db.drive_mirror_files.update_many(
+        {"roots": root_id, "synced_at": {"$lt": now}}, {"$pull": {"roots": root_id}}
+    )
+    await db.drive_mirror_files.delete_many({"roots": {"$size": 0}})
+    await db.drive_mirror_roots.update_one(
+        {"_id": root_id},
+        {"$set": {"name": root.get("name"), "status": "ready", "synced_at": now, "item_count": count}},
+    )
+    logger.info(f"[DriveMirror] Crawled root {root_id}: {count} entries")
+    return count
+
+
+async def _drop_root_entries(root_id: str):
+    await db.drive_mirror_files.update_many({"roots": root_id}, {"$pull": {"roots": root_id}})
+    await db.drive_mirror_files.delete_many({"roots": {"$size": 0}})
+
+
+async def _remove_subtree(file_id: str):
+    ids = [file_id]
+    frontier = [file_id]
+    while frontier:
+        children = await db.drive_mirror_files.find(
+            {"parents": {"$in": frontier}, "is_folder": True}, {"_id": 1}
+        ).to_list(None)
+        frontier = [c["_id"] for c in children if c["_id"] not in ids]
+        ids.extend(frontier)
+    await db.drive_mirror_files.delete_many({"$or": [{"_id": {"$in": ids}}, {"parents": {"$in": ids}}]})
+
+
+async def _roots_for_parents(parents: Iterable[str], ready_roots: Set[str]) -> Set[str]:
+    parents = list(parents)
+    roots = {p for p in parents if p in ready_roots}
+    if parents:
+        rows = await db.drive_mirror_files.find(
+            {"_id": {"$in": parents}, "is_folder": True}, {"_id": 0, "roots": 1}
+        ).to_list(None)
+        for r in rows:
+            roots.update(r.get("roots") or [])
+    return roots & ready_roots
+
+
+async def _apply_change(change: Dict[str, Any], ready_roots: Set[str], now: datetime):
+    file_id = change.get("fileId")
+    item = change.get("file")
+    if not file_id:
+        return
+    if file_id in ready_roots:
+        # The linked root itself: keep its name current, never drop it here
+        if change.get("removed") or (item and item.get("trashed")):
+            await _drop_root_entries(file_id)
+            await db.drive_mirror_roots.update_one({"_id": file_id}, {"$set": {"status": "missing"}})
+            ready_roots.discard(file_id)
+        elif item:
+            await db.drive_mirror_roots.update_one({"_id": file_id}, {"$set": {"name": item.get("name")}})
+        return
+    if change.get("removed") or not item or item.get("trashed"):
+        await _remove_subtree(file_id)
+        return
+
+    roots = await _roots_for_parents(item.get("parents") or [], ready_roots)
+    existing = await db.drive_mirror_files.find_one({"_id": file_id}, {"_id": 0, "roots": 1})
+    if not roots:
+        if existing:
+            await _remove_subtree(file_id)   # moved out of every linked folder
+        return
+
+    await db.drive_mirror_files.update_one(
+        {"_id": file_id}, {"$set": {**_entry(item, now), "roots": sorted(roots)}}, upsert=True
+    )
+    if item.get("mimeType") == FOLDER_MIME and (not existing or set(existing.get("roots") or []) != roots):
+        # Newly visible folder: its children did not change, so the feed
+        # will not mention them — list them now.
+        await _crawl(file_id, sorted(roots), replace_roots=True, now=now)
+
+
+async def sync_changes() -> int:
+    """Replay the Drive changes feed into the mirror. Returns changes applied."""
+    backend = get_backend()
+    state = await db.drive_mirror_state.find_one({"_id": STATE_ID}) or {}
+    token = state.get("page_token")
+    if not token:
+        await _reset_feed()
+        return 0
+
+    ready_roots = {r["_id"] for r in await db.drive_mirror_roots.find(
+        {"status": "ready"}, {"_id": 1}
+    ).to_list(None)}
+    applied = 0
+    while token:
+        try:
+            changes, next_token, new_start = await _call(backend.list_changes, token)
+        except ChangesTokenExpired:
+            logger.warning("[DriveMirror] Changes token expired — recrawling every root")
+            await _reset_feed()
+            return applied
+        now = datetime.now(timezone.utc)
+        for change in changes:
+            await _apply_change(change, ready_roots, now)
+        applied += len(changes)
+        token = next_token
+        await db.drive_mirror_state.update_one(
+            {"_id": STATE_ID},
+            {"$set": {"page_token": next_token or new_start, "updated_at": now}},
+            upsert=True,
+        )
+    return applied
+
+
+async def _reset_feed():
+    """Start the feed from now and schedule every root for a full crawl."""
+    token = await _call(get_backend().start_page_token)
+    await db.drive_mirror_state.update_one(
+        {"_id": STATE_ID},
+        {"$set": {"page_token": token, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    await db.drive_mirror_roots.update_many({"status": "ready"}, {"$set": {"status": "pending"}})
+
+
+async def _linked_roots() -> Set[str]:
+    rows = await db.client_portal_users.find(
+        {"google_drive_folder_id": {"$nin": [None, ""]}}, {"_id": 0, "google_drive_folder_id": 1}
+    ).to_list(None)
+    return {r["google_drive_folder_id"] for r in rows if r.get("google_drive_folder_id")}
+
+
+async def reconcile_drive_mirror():
+    """Job: register/drop roots, replay the changes feed, crawl due roots."""
+    backend = get_backend()
+    if not await _call(backend.configured):
+        return
+
+    linked = await _linked_roots()
+    known = {r["_id"]: r for r in await db.drive_mirror_roots.find({}).to_list(None)}
+    for root_id in linked - set(known):
+        await db.drive_mirror_roots.update_one(
+            {"_id": root_id}, {"$setOnInsert": {"status": "pending"}}, upsert=True
+        )
+    for root_id in set(known) - linked:
+        await _drop_root_entries(root_id)
+        await db.drive_mirror_roots.delete_one({"_id": root_id})
+
+    # Feed first: the token must predate any crawl so nothing is missed
+    await sync_changes()
+
+    cutoff = datetime.now(timezone.utc) - FULL_RECRAWL_EVERY
+    due = await db.drive_mirror_roots.find(
+        {"$or": [{"status": "pending"}, {"synced_at": {"$lt": cutoff}}]}, {"_id": 1}
+    ).to_list(None)
+    for r in due:
+        try:
+            await crawl_root(r["_id"])
+        except Exception as e:
+            logger.error(f"[DriveMirror] Crawl of {r['_id']} failed: {e}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# READS
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def root_ready(root_id: str) -> bool:
+    doc = await db.drive_mirror_roots.find_one({"_id": root_id, "status": "ready"}, {"_id": 1})
+    return doc is not None
+
+
+async def get_entry(file_id: str) -> Optional[Dict[str, Any]]:
+    return await db.drive_mirror_files.find_one({"_id": file_id}, {"_id": 0})
+
+
+async def list_folder(
+    folder_id: str,
+    root_id: str,
+    hidden_ids: Iterable[str] = (),
+    cursor: Optional[str] = None,
+    limit: int = 500,
+) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """
+    One page of a folder's children (folders first, then by name) from the
+    mirror, excluding `hidden_ids`. None if the root is not mirrored yet or
+    `folder_id` is not inside it — the caller should fall back to Drive.
+    """
+    if not await root_ready(root_id):
+        return None
+    if folder_id != root_id:
+        folder = await db.drive_mirror_files.find_one(
+            {"_id": folder_id, "roots": root_id, "is_folder": True}, {"_id": 1}
+        )
+        if not folder:
+            return None
+    query: Dict[str, Any] = {"parents": folder_id}
+    hidden = list(hidden_ids)
+    if hidden:
+        query["_id"] = {"$nin": hidden}
+    # The sort keys must be in the projection for the cursor to be built
+    projection = {k: 1 for k in OUTPUT_FIELDS + ("folder_rank", "name_lower")}
+    docs, next_cursor = await list_sync.keyset_page(
+        db.drive_mirror_files, query, LIST_SORT, cursor, limit, projection=projection
+    )
+    for d in docs:
+        d.pop("folder_rank", None)
+        d.pop("name_lower", None)
+    return docs, next_cursor
+
+
+async def folder_name(folder_id: str) -> Optional[str]:
+    """Display name of a folder from the mirror, else from Drive. None if unknown."""
+    doc = await db.drive_mirror_roots.find_one({"_id": folder_id, "name": {"$ne": None}}, {"name": 1})
+    if not doc:
+        doc = await db.drive_mirror_files.find_one({"_id": folder_id}, {"name": 1})
+    if doc:
+        return doc["name"]
+    try:
+        backend = get_backend()
+        if not await _call(backend.configured):
+            return None
+        item = await _call(backend.get_item, folder_id)
+        return item.get("name") if item else None
+    except Exception as e:
+        logger.warning(f"[DriveMirror] Folder name lookup for {folder_id} failed: {e}")
+        return None
+
+
+async def hidden_entries(root_id: str, hidden_ids: Iterable[str]) -> List[Dict[str, Any]]:
+    """Mirror entries for the hidden ids that still exist under the root."""
+    hidden = list(hidden_ids)
+    if not hidden:
+        return []
+    return await db.drive_mirror_files.find(
+        {"_id": {"$in": hidden}, "roots": root_id},
+        {"_id": 0, "id": 1, "name": 1, "mimeType": 1, "is_folder": 1, "parents": 1},
+    ).to_list(len(hidden))
+
+
+async def count_entries(root_id: str) -> int:
+    return await db.drive_mirror_files.count_documents({"roots": root_id})
+
+
+INDEXES = [
+    index("drive_mirror_files", [("parents", 1), ("folder_rank", 1), ("name_lower", 1), ("_id", 1)]),
+    index("drive_mirror_files", [("roots", 1), ("synced_at", 1)]),
+    index("drive_mirror_roots", "status"),
+]
+
+
+async def create_drive_mirror_indexes():
+    """Create MongoDB indexes for the Drive metadata mirror."""
+    await ensure_indexes(INDEXES)
@@ -19,6 +19,7 @@ from pydantic import BaseModel
 from bson import ObjectId
 
 from backend.dependencies import get_current_user, db, check_module_permission, get_team_user_ids
+from backend.index_manifest import ensure_indexes, index
 
 try:
     from cryptography.fernet import Fernet
@@ -1688,37 +1689,34 @@ def _attach_extra_attrs(ev_out: ExtractedEventOut, ev: Dict, mid: str):
 # SCHEDULED SCAN LOOP
 # =============================================================================
 
-_scan_task = None
-
-async def _scheduled_scan_loop():
-    logger.info("Email scheduled scan loop started.")
-    while True:
+async def run_scheduled_scans():
+    """
+    One pass of the per-user scheduled email scan (job runner, every minute).
+    Users whose preferred scan time is within ±5 min and who have not been
+    scanned today are scanned now.
+    """
+    now_ist    = datetime.now(IST)
+    prefs_list = await db[COL_AUTO_PREFS].find({}).to_list(length=500)
+    for pref in prefs_list:
+        user_id     = pref.get("user_id")
+        scan_hour   = pref.get("scan_time_hour", 12)
+        scan_minute = pref.get("scan_time_minute", 0)
+        target       = now_ist.replace(hour=scan_hour, minute=scan_minute, second=0, microsecond=0)
+        if abs((now_ist - target).total_seconds()) > 300:
+            continue
+        sched = await db[COL_SCAN_SCHEDULE].find_one({"user_id": user_id}, {"_id": 0})
+        if sched and (sched.get("last_run", "")[:10] == now_ist.strftime("%Y-%m-%d")):
+            continue
+        logger.info(f"Scheduled scan: user {user_id}")
         try:
-            now_ist    = datetime.now(IST)
-            prefs_list = await db[COL_AUTO_PREFS].find({}).to_list(length=500)
-            for pref in prefs_list:
-                user_id     = pref.get("user_id")
-                scan_hour   = pref.get("scan_time_hour", 12)
-                scan_minute = pref.get("scan_time_minute", 0)
-                target       = now_ist.replace(hour=scan_hour, minute=scan_minute, second=0, microsecond=0)
-                if abs((now_ist - target).total_seconds()) > 300:
-                    continue
-                sched = await db[COL_SCAN_SCHEDULE].find_one({"user_id": user_id}, {"_id": 0})
-                if sched and (sched.get("last_run", "")[:10] == now_ist.strftime("%Y-%m-%d")):
-                    continue
-                logger.info(f"Scheduled scan: user {user_id}")
-                try:
-                    await _run_full_scan_for_user(user_id, pref)
-                    await db[COL_SCAN_SCHEDULE].update_one(
-                        {"user_id": user_id},
-                        {"$set": {"last_run": now_ist.isoformat(), "user_id": user_id}},
-                        upsert=True
-                    )
-                except Exception as e:
-                    logger.error(f"Scheduled scan error user {user_id}: {e}")
+            await _run_full_scan_for_user(user_id, pref)
+            await db[COL_SCAN_SCHEDULE].update_one(
+                {"user_id": user_id},
+                {"$set": {"last_run": now_ist.isoformat(), "user_id": user_id}},
+                upsert=True
+            )
         except Exception as e:
-            logger.error(f"Scan loop error: {e}")
-        await asyncio.sleep(60)
+            logger.error(f"Scheduled scan error user {user_id}: {e}")
 
 
 async def _run_full_scan_for_user(user_id: str, prefs: Dict, limit: int = 50):
@@ -1789,49 +1787,27 @@ async def _run_full_scan_for_user(user_id: str, prefs: Dict, limit: int = 50):
             )
 
 def start_scheduled_scan_loop():
-    global _scan_task
-    _scan_task = asyncio.get_event_loop().create_task(_scheduled_scan_loop())
-    logger.info("Scheduled email scan loop registered.")
+    from backend.job_runner import job_runner, every
+    job_runner.add_job("email_scheduled_scan", run_scheduled_scans, every(minutes=1), timeout=1800)
+    logger.info("Scheduled email scan job registered.")
+
+
+INDEXES = [
+    index(COL_CONNECTIONS, [("user_id", 1), ("email_address", 1)], unique=True),
+    index(COL_EVENTS, [("user_id", 1), ("message_id", 1)], unique=True, sparse=True),
+    index(COL_EVENTS, [("user_id", 1), ("tm_app_no", 1)], sparse=True),
+    index(COL_EVENTS, [("user_id", 1), ("date", -1)]),
+    index("reminders", [("user_id", 1), ("tm_app_no", 1)], sparse=True),
+    index("reminders", [("user_id", 1), ("id", 1)], sparse=True),
+    index("reminder_dup_ignores", [("user_id", 1), ("pair_key", 1)], unique=True),
+    index("todos", [("user_id", 1), ("tm_app_no", 1), ("is_completed", 1)], sparse=True),
+    index("todos", [("user_id", 1), ("id", 1)], sparse=True),
+]
 
 
 async def create_email_indexes():
-    """
-    Create MongoDB indexes for email integration collections.
-    Call once from app startup (lifespan / on_startup).
-    """
-    try:
-        await db[COL_CONNECTIONS].create_index(
-            [("user_id", 1), ("email_address", 1)], unique=True, background=True
-        )
-        await db[COL_EVENTS].create_index(
-            [("user_id", 1), ("message_id", 1)], unique=True,
-            sparse=True, background=True
-        )
-        await db[COL_EVENTS].create_index(
-            [("user_id", 1), ("tm_app_no", 1)], background=True, sparse=True
-        )
-        await db[COL_EVENTS].create_index(
-            [("user_id", 1), ("date", -1)], background=True
-        )
-        await db["reminders"].create_index(
-            [("user_id", 1), ("tm_app_no", 1)], background=True, sparse=True
-        )
-        await db["reminders"].create_index(
-            [("user_id", 1), ("id", 1)], background=True, sparse=True
-        )
-        await db["reminder_dup_ignores"].create_index(
-            [("user_id", 1), ("pair_key", 1)], unique=True, background=True
-        )
-        await db["todos"].create_index(
-            [("user_id", 1), ("tm_app_no", 1), ("is_completed", 1)],
-            background=True, sparse=True
-        )
-        await db["todos"].create_index(
-            [("user_id", 1), ("id", 1)], background=True, sparse=True
-        )
-        logger.info("Email integration indexes created/verified.")
-    except Exception as e:
-        logger.warning(f"Index creation warning (non-fatal): {e}")
+    """Create MongoDB indexes for email integration collections."""
+    await ensure_indexes(INDEXES)
 
 
 # =============================================================================
@@ -32,6 +32,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 
 from backend.dependencies import db, get_current_user
+from backend.index_manifest import ensure_indexes, index
 from backend.models import User
 from backend import accounting_core as ac
 
@@ -281,10 +282,16 @@ async def dashboard_metrics(company_id: str = Query(""), current_user: User = De
     }
 
 
+INDEXES = [
+    index("gst_portal_registrations", "company_id"),
+    index("gst_portal_registrations", [("company_id", 1), ("gstin", 1)], unique=True),
+    index("gst_portal_snapshots", "company_id"),
+    index("gst_portal_snapshots", "gstin"),
+    index("gst_portal_audit_risk", "company_id"),
+    index("gst_portal_audit_risk", [("company_id", 1), ("gstin", 1), ("period", 1)]),
+]
+
+
 async def create_gst_portal_sync_indexes():
-    await db.gst_portal_registrations.create_index("company_id")
-    await db.gst_portal_registrations.create_index([("company_id", 1), ("gstin", 1)], unique=True)
-    await db.gst_portal_snapshots.create_index("company_id")
-    await db.gst_portal_snapshots.create_index("gstin")
-    await db.gst_portal_audit_risk.create_index("company_id")
-    await db.gst_portal_audit_risk.create_index([("company_id", 1), ("gstin", 1), ("period", 1)])
+    """Ensure the GST portal registration, snapshot and audit-risk indexes."""
+    await ensure_indexes(INDEXES)
@@ -30,6 +30,7 @@ from fastapi import (
 from pydantic import BaseModel, Field, ConfigDict
 
 from backend.dependencies import db, get_current_user, build_client_query
+from backend.index_manifest import ensure_indexes, index
 from backend.models import User
 
 logger   = logging.getLogger(__name__)
@@ -1621,18 +1622,20 @@ Keep the response clear, professional, and actionable. Use Indian GST terminolog
 
 # ─── INDEXES (extended) ───────────────────────────────────────────────────────
 
+INDEXES = [
+    index("gst_reconciliation_sessions", "id", unique=True),
+    index("gst_reconciliation_sessions", "created_by"),
+    index("gst_reconciliation_sessions", "created_at"),
+    index("gst_reconciliation_sessions", "type"),
+    index("gst_reconciliation_sessions", "client_id"),
+    index("gst_audit_logs", "timestamp"),
+    index("gst_audit_logs", "user_id"),
+    index("gst_vendor_profiles", "gstin", unique=True),
+    index("gst_vendor_profiles", "risk_level"),
+    index("gst_vendor_profiles", "risk_score"),
+]
+
+
 async def create_gst_reconciliation_indexes():
-    try:
-        await db.gst_reconciliation_sessions.create_index("id",         unique=True, background=True)
-        await db.gst_reconciliation_sessions.create_index("created_by", background=True)
-        await db.gst_reconciliation_sessions.create_index("created_at", background=True)
-        await db.gst_reconciliation_sessions.create_index("type",       background=True)
-        await db.gst_reconciliation_sessions.create_index("client_id",  background=True)
-        await db.gst_audit_logs.create_index("timestamp",  background=True)
-        await db.gst_audit_logs.create_index("user_id",    background=True)
-        await db.gst_vendor_profiles.create_index("gstin",      unique=True, background=True)
-        await db.gst_vendor_profiles.create_index("risk_level", background=True)
-        await db.gst_vendor_profiles.create_index("risk_score", background=True)
-        logger.info("GST Reconciliation indexes ensured (v2)")
-    except Exception as exc:
-        logger.warning("GST Reconciliation index creation: %s", exc)
+    """Ensure the GST reconciliation session, audit and vendor indexes."""
+    await ensure_indexes(INDEXES)
@@ -0,0 +1,457 @@
+"""
+Index manifest
+==============
+
+Every MongoDB index the backend relies on is declared as an `IndexSpec`,
+either in CORE_INDEXES below (collections owned by server.py) or in an
+`INDEXES` list in the module that owns the collection. `manifest()` collects
+them all from MANIFEST_MODULES.
+
+`reconcile_indexes()` runs once at startup:
+
+  lock      One worker takes the `index_manifest` lease in job_locks; the
+            others skip, the indexes are cluster-wide anyway.
+  diff      `list_indexes` once per collection (concurrently), compared by
+            key pattern against the manifest. Indexes that already exist
+            are left alone; an existing index with the same keys but other
+            options (unique, sparse, TTL, partial filter) is reported as a
+            conflict and never rebuilt automatically.
+  create    Only the missing indexes, one `create_indexes` call per
+            collection, collections in parallel (INDEX_BUILD_CONCURRENCY,
+            default 8). If a batch fails, its indexes are retried one by one
+            so a single bad index (e.g. duplicates under a unique key) does
+            not block the rest.
+  drop      Indexes listed in DROPPED_INDEXES are removed if still present.
+
+`ensure_indexes(specs)` is the same diff-and-create for a subset, without
+the lock; the per-module create_*_indexes() helpers use it for scripts and
+tests that need their module's indexes outside of app startup.
+
+Both are no-ops on the in-memory MockDatabase (no MONGO_URL), which has no
+indexes to list or build.
+
+The `background` option is not part of specs: MongoDB 4.2+ ignores it.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from backend.dependencies import MockDatabase, db
+
+logger = logging.getLogger("index_manifest")
+
+# Options that make two indexes on the same keys different indexes.
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+LOCK_ID = "index_manifest"
+LOCK_TTL_SECONDS = 900
+
+
+class IndexSpec:
+    """One index: collection, key pattern and create_index options."""
+
+    __slots__ = ("collection", "keys", "options")
+
+    def __init__(self, collection: str, keys: List[Tuple[str, Any]], options: Dict[str, Any]):
+        self.collection = collection
+        self.keys = keys
+        self.options = options
+
+    @property
+    def key(self) -> Tuple[Tuple[str, Any], ...]:
+        return tuple(self.keys)
+
+    @property
+    def name(self) -> str:
+        return self.options.get("name") or "_".join(f"{f}_{d}" for f, d in self.keys)
+
+    def model(self) -> IndexModel:
+        return IndexModel(self.keys, **self.options)
+
+    def __repr__(self):
+        opts = "".join(f", {k}={v!r}" for k, v in self.options.items())
+        return f"index({self.collection!r}, {self.keys!r}{opts})"
+
+
+def index(collection: str, keys: Union[str, Sequence[Tuple[str, Any]]], **options) -> IndexSpec:
+    """Declare an index; `keys` is a field name or a list of (field, direction)."""
+    options.pop("background", None)
+    if isinstance(keys, str):
+        keys = [(keys, 1)]
+    return IndexSpec(collection, [(f, d) for f, d in keys], options)
+
+
+# ─── Manifest ────────────────────────────────────────────────────────────────
+
+MANIFEST_MODULES = (
+    "backend.compliance",
+    "backend.salary_slip_router",
+    "backend.gst_reconciliation",
+    "backend.zero_touch_entry",
+    "backend.copilot.conversation_manager",
+    "backend.gst_portal_sync",
+    "backend.accounting_lock",
+    "backend.accounting_extended",
+    "backend.desktop_agent",
+    "backend.attendance_identix",
+    "backend.list_sync",
+    "backend.bank_accounts",
+    "backend.notifications",
+    "backend.email_integration",
+    "backend.job_runner",
+    "backend.dashboard_counters",
+    "backend.search.search_index",
+    "backend.search.party_index",
+    "backend.drive_mirror",
+    "backend.lead_prefilter",
+    "backend.licensing.usage_meter",
+    "backend.bulk_mail",
+    "backend.client_calendar",
+    "backend.journal_rollup",
+    "backend.validation_totals",
+    "backend.live_events",
+)
+
+# (collection, index name) pairs that must not exist any more.
+DROPPED_INDEXES = (
+    # Replaced by the unique (user_id, email_address) index.
+    ("email_connections", "user_id_1_provider_1"),
+)
+
+CORE_INDEXES = [
+    index("tasks", "assigned_to"),
+    index("tasks", "created_by"),
+    index("tasks", "due_date"),
+    index("tasks", [("assigned_to", 1), ("status", 1)]),
+    index("tasks", "created_at"),
+    # ── Activity Timeline & Automation Engine ───────────────────────────────
+    index("client_activities", [("client_id", 1), ("created_at", -1)]),
+    index("pending_client_messages", [("status", 1), ("created_at", -1)]),
+    index("service_expiries", "client_id"),
+    index("service_expiries", "expiry_date"),
+    # ── MIS ─────────────────────────────────────────────────────────────────
+    index("mis_transactions", [("client_id", 1), ("period", 1), ("doc_type", 1)]),
+    index("mis_uploads", [("client_id", 1), ("period", 1)]),
+    index("mis_manual", [("client_id", 1), ("period", 1)], unique=True),
+    # ── Phase 10 self-learning ──────────────────────────────────────────────
+    index("knowledge_base", [("company_id", 1), ("category", 1), ("key", 1)], unique=True),
+    index("learning_events", [("company_id", 1), ("created_at", -1)]),
+    index("manual_corrections", [("company_id", 1), ("created_at", -1)]),
+    index("recommendation_history", [("company_id", 1), ("status", 1)]),
+    index("embeddings", [("target_id", 1), ("target_type", 1)]),
+    index("learning_versions", [("entity_id", 1), ("entity_type", 1)]),
+    index("learning_queue", [("status", 1), ("created_at", 1)]),
+    index("learning_audit", [("company_id", 1), ("timestamp", -1)]),
+    # ── Phase 11 enterprise automation ──────────────────────────────────────
+    index("workflow_definitions", [("company_id", 1), ("category", 1)]),
+    index("workflow_definitions", "id", unique=True),
+    index("workflow_instances", [("company_id", 1), ("status", 1)]),
+    index("workflow_instances", "id", unique=True),
+    index("workflow_history", [("company_id", 1), ("instance_id", 1)]),
+    index("workflow_templates", "id", unique=True),
+    index("approval_requests", [("company_id", 1), ("status", 1)]),
+    index("approval_requests", "id", unique=True),
+    index("approval_history", [("company_id", 1), ("approval_id", 1)]),
+    index("automation_rules", [("company_id", 1), ("is_active", 1)]),
+    index("business_events", [("company_id", 1), ("event_type", 1)]),
+    index("business_events", [("dispatch_status", 1), ("next_attempt_at", 1)]),
+    index("business_events", "claim_token", sparse=True),
+    index("notification_history", [("company_id", 1), ("user_id", 1)]),
+    index("dashboard_cache", "id", unique=True),
+    index("analytics_data", "company_id"),
+    index("kpi_history", "company_id"),
+    index("workflow_audit", [("company_id", 1), ("action", 1)]),
+    # ── AI memory foundation ────────────────────────────────────────────────
+    index("ai_document_memory", "fingerprint"),
+    index("ai_document_memory", "vendor_gstin"),
+    index("ai_document_memory", "invoice_number"),
+    index("ai_document_memory", "vendor_name"),
+    index("ai_document_memory", "created_at"),
+    # ── Staff, clients, attendance, visits ──────────────────────────────────
+    index("users", "email"),
+    index("staff_activity", "user_id"),
+    index("staff_activity", "timestamp"),
+    index("staff_activity", [("user_id", 1), ("timestamp", -1)]),
+    index("staff_activity", "type"),
+    index("staff_activity", "domain"),
+    index("staff_activity", [("user_id", 1), ("type", 1)]),
+    index("due_dates", "department"),
+    index("referrers", "name"),
+    index("clients", "assigned_to"),
+    # Paginated list + merge search
+    index("clients", "company_name"),
+    index("clients", "created_by"),
+    index("clients", [("assignments.user_id", 1)]),
+    index("clients", "status"),
+    index("clients", [("company_name", 1), ("status", 1)]),
+    index("clients", [("created_by", 1), ("company_name", 1)], unique=True),
+    index("dsc_register", "expiry_date"),
+    index("dsc_register", [("assigned_to", 1), ("expiry_date", 1)]),
+    index("todos", [("user_id", 1), ("created_at", -1)]),
+    index("attendance", [("user_id", 1), ("date", -1)]),
+    index("attendance", [("user_id", 1), ("date", 1)], unique=True),
+    index("holidays", "date", unique=True),
+    index("visits", [("assigned_to", 1), ("visit_date", -1)]),
+    index("visits", "visit_date"),
+    index("visits", "client_id"),
+    index("visits", "status"),
+    index("quotations", [("created_by", 1), ("created_at", -1)]),
+    index("quotations", "status"),
+    index("quotations", "service"),
+    index("companies", "created_by"),
+    index("companies", "name"),
+    index("access_requests", [("user_id", 1), ("status", 1)]),
+    index("access_requests", "status"),
+    index("trademark_sphere", "application_number", unique=True),
+    # ── Bank / accounting / permission governance ───────────────────────────
+    index("bank_accounts", "company_id"),
+    index("bank_transactions", [("bank_account_id", 1), ("date", -1)]),
+    index("bank_transactions", "matched_type"),
+    index("bank_reconciliation_audit", [("bank_transaction_id", 1), ("timestamp", -1)]),
+    index("chart_of_accounts", [("company_id", 1), ("code", 1)], unique=True),
+    index("journal_entries", [("company_id", 1), ("entry_date", -1)]),
+    # Hit on every sync
+    index("journal_entries", [("company_id", 1), ("source", 1), ("source_id", 1)]),
+    index("journal_entries", "id", unique=True),
+    index("journal_lines", "account_id"),
+    # Covers the Trial Balance aggregation
+    index("journal_lines", [("company_id", 1), ("entry_date", -1), ("account_id", 1)]),
+    index("journal_lines", [("entry_id", 1), ("account_id", 1)]),
+    # Every report load, reconcile and invoice CRUD; without these large
+    # books (10k+ invoices) take 5-10 s per page.
+    index("invoices", [("company_id", 1), ("status", 1)]),
+    index("invoices", [("company_id", 1), ("invoice_date", -1)]),
+    index("invoices", [("company_id", 1), ("invoice_type", 1)]),
+    index("invoices", "id", unique=True),
+    index("invoices", "paid_bank_txn_id", sparse=True),
+    index("payments", [("company_id", 1), ("invoice_id", 1)]),
+    index("payments", "id", unique=True),
+    index("purchase_invoices", [("company_id", 1), ("status", 1)]),
+    index("purchase_invoices", [("company_id", 1), ("invoice_date", -1)]),
+    index("purchase_invoices", "id", unique=True),
+    index("purchase_invoices", "paid_bank_txn_id", sparse=True),
+    index("purchase_payments", [("company_id", 1), ("purchase_invoice_id", 1)]),
+    index("purchase_payments", "id", unique=True),
+    index("audit_logs", [("module", 1), ("record_id", 1), ("timestamp", -1)]),
+    index("audit_logs", [("user_id", 1), ("timestamp", -1)]),
+    # ── WhatsApp Hub ────────────────────────────────────────────────────────
+    # Duplicate check on every bulk-sync insert; without it a 1000+ message
+    # sync scans the collection per message and times out.
+    index("whatsapp_hub_messages", [("message_id", 1), ("session_id", 1)], sparse=True),
+    index("whatsapp_hub_messages", [("jid", 1), ("timestamp", -1)]),
+    index("whatsapp_hub_messages", "timestamp"),
+    index("whatsapp_hub_contacts", "jid", unique=True),
+    index("whatsapp_hub_contacts", [("last_message_at", -1)]),
+    index("whatsapp_hub_contacts", "session_id"),
+    index("whatsapp_hub_groups", "jid", unique=True),
+]
+
+
+def manifest() -> List[IndexSpec]:
+    """CORE_INDEXES plus every MANIFEST_MODULES `INDEXES`, de-duplicated by key pattern."""
+    specs = list(CORE_INDEXES)
+    for name in MANIFEST_MODULES:
+        specs.extend(importlib.import_module(name).INDEXES)
+    return _dedupe(specs)
+
+
+def _dedupe(specs: Iterable[IndexSpec]) -> List[IndexSpec]:
+    seen: Dict[Tuple[str, tuple], IndexSpec] = {}
+    for spec in specs:
+        first = seen.get((spec.collection, spec.key))
+        if first is None:
+            seen[(spec.collection, spec.key)] = spec
+        elif _options(first.options) != _options(spec.options):
+            logger.warning(f"[IndexManifest] {spec.collection}: {spec!r} conflicts with "
+                           f"{first!r}; keeping the first declaration")
+    return list(seen.values())
+
+
+# ─── Diff and create ─────────────────────────────────────────────────────────
+
+def _options(info: Dict[str, Any]) -> Dict[str, Any]:
+    out = {}
+    for opt in _COMPARED_OPTIONS:
+        value = info.get(opt)
+        if opt in ("unique", "sparse"):
+            value = bool(value)
+            if not value:
+                continue
+        elif value is None:
+            continue
+        elif opt == "expireAfterSeconds":
+            value = int(value)
+        out[opt] = value
+    return out
+
+
+def _existing_key(info: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple((f, int(d) if isinstance(d, (int, float)) else d) for f, d in info["key"].items())
+
+
+async def _list_indexes(collection: str) -> List[Dict[str, Any]]:
+    return await db[collection].list_indexes().to_list(None)
+
+
+async def _create(collection: str, specs: List[IndexSpec], report: Dict[str, Any]):
+    try:
+        await db[collection].create_indexes([s.model() for s in specs])
+        report["created"].extend(f"{collection}.{s.name}" for s in specs)
+        return
+    except Exception as e:
+        if len(specs) == 1:
+            report["failed"].append({"index": f"{collection}.{specs[0].name}", "error": str(e)[:300]})
+            logger.error(f"[IndexManifest] {collection}.{specs[0].name} creation failed: {e}")
+            return
+        logger.warning(f"[IndexManifest] {collection}: batch of {len(specs)} failed ({e}); "
+                       f"retrying one by one")
+    for spec in specs:
+        await _create(collection, [spec], report)
+
+
+async def _reconcile_collection(collection: str, specs: List[IndexSpec], drops: List[str],
+                                report: Dict[str, Any], sem: asyncio.Semaphore):
+    async with sem:
+        try:
+            existing = await _list_indexes(collection)
+        except Exception as e:
+            report["failed"].append({"index": f"{collection}.*", "error": f"list_indexes: {str(e)[:300]}"})
+            logger.error(f"[IndexManifest] {collection}: list_indexes failed: {e}")
+            return
+        by_key = {_existing_key(info): info for info in existing}
+        names = {info.get("name") for info in existing}
+
+        for name in drops:
+            if name in names:
+                try:
+                    await db[collection].drop_index(name)
+                    report["dropped"].append(f"{collection}.{name}")
+                except Exception as e:
+                    logger.warning(f"[IndexManifest] {collection}.{name} drop failed: {e}")
+
+        missing = []
+        for spec in specs:
+            info = by_key.get(spec.key)
+            if info is None:
+                missing.append(spec)
+            elif _options(info) != _options(spec.options):
+                report["conflicts"].append({
+                    "index": f"{collection}.{info.get('name')}",
+                    "existing": _options(info),
+                    "declared": _options(spec.options),
+                })
+            else:
+                report["existing"] += 1
+        if missing:
+            await _create(collection, missing, report)
+
+
+def _skip_report() -> Optional[Dict[str, Any]]:
+    if isinstance(db, MockDatabase):
+        logger.debug("[IndexManifest] in-memory database; indexes skipped")
+        return {"skipped": "in-memory database", "seconds": 0.0}
+    return None
+
+
+async def ensure_indexes(specs: Iterable[IndexSpec], drops: Iterable[Tuple[str, str]] = ()) -> Dict[str, Any]:
+    """Create whichever of `specs` are missing. Returns a report of what was done."""
+    skipped = _skip_report()
+    if skipped:
+        return skipped
+    t0 = time.perf_counter()
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in _dedupe(specs):
+        by_collection.setdefault(spec.collection, []).append(spec)
+    drop_map: Dict[str, List[str]] = {}
+    for collection, name in drops:
+        drop_map.setdefault(collection, []).append(name)
+        by_collection.setdefault(collection, [])
+
+    report: Dict[str, Any] = {"collections": len(by_collection), "declared": 0, "existing": 0,
+                              "created": [], "dropped": [], "conflicts": [], "failed": []}
+    report["declared"] = sum(len(v) for v in by_collection.values())
+    sem = asyncio.Semaphore(max(1, int(os.environ.get("INDEX_BUILD_CONCURRENCY", "8"))))
+    await asyncio.gather(*(
+        _reconcile_collection(c, s, drop_map.get(c, []), report, sem)
+        for c, s in by_collection.items()
+    ))
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    for conflict in report["conflicts"]:
+        logger.warning(f"[IndexManifest] {conflict['index']} exists as {conflict['existing']}, "
+                       f"declared as {conflict['declared']}; left as is")
+    return report
+
+
+# ─── Startup reconcile ───────────────────────────────────────────────────────
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+_last_report: Optional[Dict[str, Any]] = None
+
+
+async def _acquire_lock() -> bool:
+    now = datetime.now(timezone.utc)
+    try:
+        await db.job_locks.update_one(
+            {"_id": LOCK_ID, "expires_at": {"$lt": now}},
+            {"$set": {"owner": _OWNER, "acquired_at": now,
+                      "expires_at": now + timedelta(seconds=LOCK_TTL_SECONDS)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def _release_lock():
+    try:
+        await db.job_locks.delete_one({"_id": LOCK_ID, "owner": _OWNER})
+    except Exception as e:
+        logger.warning(f"[IndexManifest] lock release failed (expires on its own): {e}")
+
+
+async def reconcile_indexes() -> Dict[str, Any]:
+    """Bring the database in line with the manifest; at most one worker at a time."""
+    global _last_report
+    skipped = _skip_report()
+    if skipped:
+        _last_report = skipped
+        return skipped
+    t0 = time.perf_counter()
+    try:
+        specs = manifest()
+        if not await _acquire_lock():
+            _last_report = {"skipped": "another worker holds the index lock",
+                            "seconds": round(time.perf_counter() - t0, 3)}
+            logger.info("[IndexManifest] another worker is reconciling indexes; skipped")
+            return _last_report
+        try:
+            report = await ensure_indexes(specs, DROPPED_INDEXES)
+        finally:
+            await _release_lock()
+    except Exception as e:
+        logger.error(f"[IndexManifest] reconcile failed: {e}")
+        _last_report = {"error": str(e), "seconds": round(time.perf_counter() - t0, 3)}
+        return _last_report
+
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    _last_report = report
+    logger.info(
+        f"[IndexManifest] {report['declared']} indexes on {report['collections']} collections: "
+        f"{report['existing']} present, {len(report['created'])} created, "
+        f"{len(report['dropped'])} dropped, {len(report['conflicts'])} conflicts, "
+        f"{len(report['failed'])} failed in {report['seconds']}s"
+    )
+    return report
+
+
+def last_report() -> Optional[Dict[str, Any]]:
+    return _last_report
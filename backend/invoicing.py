@@ -36,6 +36,8 @@ from pydantic import BaseModel, Field, field_validator
 
 from backend.dependencies import db, get_current_user, check_module_permission
 from backend.models import User
+from backend import change_hooks, list_sync
+from backend import validation_totals
 
 # ✅ Google imports (clean)
 from google.auth.transport.requests import Request
@@ -2335,6 +2337,8 @@ async def import_backup(
                 await db.clients.bulk_write(bulk_updates, ordered=False)
         except Exception as e:
             result.errors.append(f"Clients bulk write: {e}")
+        if bulk_inserts or bulk_updates:
+            await change_hooks.mark_dirty("clients")
 
     # ══════════════════════════════════════════════════════════════════════
     # 2.  PRODUCTS / ITEMS  — one pre-fetch → single insert_many
@@ -2452,6 +2456,7 @@ async def import_backup(
             if new_invoices:
                 await db.invoices.insert_many(new_invoices, ordered=False)
                 result.invoices_imported += len(new_invoices)
+                await validation_totals.note_changed("invoice", [i["id"] for i in new_invoices])
         except Exception as e:
             result.errors.append(f"Invoices bulk insert: {e}")
 
@@ -2573,7 +2578,14 @@ async def remove_backup(
         raise HTTPException(status_code=400, detail="source query param is required")
 
     inv_res    = await db.invoices.delete_many({"imported_from": source})
+    purged = await db.clients.find(
+        {"imported_from": source},
+        {"_id": 0, **{f: 1 for f in list_sync.SCOPE_FIELDS["clients"]}},
+    ).to_list(length=None)
     client_res = await db.clients.delete_many({"imported_from": source})
+    if client_res.deleted_count:
+        await change_hooks.mark_dirty("clients")
+        await list_sync.record_tombstone("clients", purged)
     prod_res   = await db.products.delete_many({"imported_from": source})
 
     return {
@@ -3344,6 +3356,7 @@ async def delete_purchase_invoice(invoice_id: str, current_user: User = Depends(
         if existing_pe:
             await db.journal_lines.delete_many({"entry_id": existing_pe["id"]})
             await db.journal_entries.delete_one({"id": existing_pe["id"]})
+            await validation_totals.note_changed("entry", [existing_pe["id"]])
     await db.purchase_payments.delete_many({"purchase_invoice_id": invoice_id})
 
     _old_entries = await db.journal_entries.find({"source": "purchase", "source_id": invoice_id}, {"_id": 0, "id": 1}).to_list(50)
@@ -3351,6 +3364,7 @@ async def delete_purchase_invoice(invoice_id: str, current_user: User = Depends(
         _old_ids = [e["id"] for e in _old_entries]
         await db.journal_lines.delete_many({"entry_id": {"$in": _old_ids}})
         await db.journal_entries.delete_many({"id": {"$in": _old_ids}})
+        await validation_totals.note_changed("entry", _old_ids)
 
     await db.purchase_invoices.delete_one({"id": invoice_id})
     client_id = existing.get("client_id")
@@ -3547,6 +3561,7 @@ async def create_invoice(data: InvoiceCreate, current_user: User = Depends(check
         # advance figure these previously had.
         amount_due = round(max(raw["grand_total"] - advance, 0.0), 2)
         await db.invoices.update_one({"id": raw["id"]}, {"$set": {"amount_paid": advance, "amount_due": amount_due}})
+        await validation_totals.note_changed("invoice", [raw["id"]], data.company_id or "")
         raw["amount_paid"], raw["amount_due"] = advance, amount_due
     raw.pop("_id", None)
     return raw
@@ -4326,6 +4341,7 @@ async def bulk_delete_invoices(ids: List[str], current_user: User = Depends(chec
                 if existing_pe:
                     await db.journal_lines.delete_many({"entry_id": existing_pe["id"]})
                     await db.journal_entries.delete_one({"id": existing_pe["id"]})
+                    await validation_totals.note_changed("entry", [existing_pe["id"]])
             await db.payments.delete_many({"invoice_id": inv_id})
 
             r = await db.invoices.delete_one({"id": inv_id})
@@ -4356,6 +4372,7 @@ async def delete_invoice(inv_id: str, current_user: User = Depends(check_module_
         if existing_pe:
             await db.journal_lines.delete_many({"entry_id": existing_pe["id"]})
             await db.journal_entries.delete_one({"id": existing_pe["id"]})
+            await validation_totals.note_changed("entry", [existing_pe["id"]])
     await db.payments.delete_many({"invoice_id": inv_id})
 
     result = await db.invoices.delete_one({"id": inv_id})
@@ -4715,6 +4732,7 @@ async def generate_recurring(inv_id: str, current_user: User = Depends(check_mod
                "is_recurring": False, "created_at": now, "updated_at": now, "pdf_drive_link": ""}
     new_inv.pop("_id", None)
     await db.invoices.insert_one({**new_inv})
+    await validation_totals.note_changed("invoice", [new_inv["id"]], new_inv.get("company_id") or "")
     new_inv.pop("_id", None)
     return {"status": "success", "invoice_no": new_inv["invoice_no"], "id": new_inv["id"]}
 
@@ -4942,9 +4960,11 @@ async def sync_invoice_journal_entry(invoice_id: str):
         _old_ids = [e["id"] for e in _old_entries]
         await db.journal_lines.delete_many({"entry_id": {"$in": _old_ids}})
         await db.journal_entries.delete_many({"id": {"$in": _old_ids}})
+        await validation_totals.note_changed("entry", _old_ids)
         
     # 2. Fetch the current invoice document
     inv = await db.invoices.find_one({"id": invoice_id})
+    await validation_totals.note_changed("invoice", [invoice_id], (inv.get("company_id") or "") if inv else None)
     if not inv:
         return
         
@@ -5032,6 +5052,7 @@ async def sync_payment_journal_entry(payment_id: str):
         _old_ids = [e["id"] for e in _old_entries]
         await db.journal_lines.delete_many({"entry_id": {"$in": _old_ids}})
         await db.journal_entries.delete_many({"id": {"$in": _old_ids}})
+        await validation_totals.note_changed("entry", _old_ids)
         
     # 2. Fetch the current payment document
     payment = await db.payments.find_one({"id": payment_id})
@@ -5114,6 +5135,7 @@ async def sync_purchase_journal_entry(invoice_id: str):
         _old_ids = [e["id"] for e in _old_entries]
         await db.journal_lines.delete_many({"entry_id": {"$in": _old_ids}})
         await db.journal_entries.delete_many({"id": {"$in": _old_ids}})
+        await validation_totals.note_changed("entry", _old_ids)
 
     # 2. Fetch the current purchase invoice document
     inv = await db.purchase_invoices.find_one({"id": invoice_id})
@@ -5190,6 +5212,7 @@ async def sync_purchase_payment_journal_entry(payment_id: str):
         _old_ids = [e["id"] for e in _old_entries]
         await db.journal_lines.delete_many({"entry_id": {"$in": _old_ids}})
         await db.journal_entries.delete_many({"id": {"$in": _old_ids}})
+        await validation_totals.note_changed("entry", _old_ids)
 
     # 2. Fetch the current payment document
     payment = await db.purchase_payments.find_one({"id": payment_id})
@@ -5350,6 +5373,7 @@ async def _dedupe_journal_entries(company_id: str, source: str):
     if dup_ids:
         await db.journal_lines.delete_many({"entry_id": {"$in": dup_ids}})
         await db.journal_entries.delete_many({"id": {"$in": dup_ids}})
+        await validation_totals.note_changed("entry", dup_ids, company_id)
 
 
 async def _reconcile_and_sync_all_sales_and_payments_impl(company_id: str):
@@ -5392,6 +5416,7 @@ async def _reconcile_and_sync_all_sales_and_payments_impl(company_id: str):
         if stale_sale_ids:
             await db.journal_lines.delete_many({"entry_id": {"$in": stale_sale_ids}})
             await db.journal_entries.delete_many({"id": {"$in": stale_sale_ids}})
+            await validation_totals.note_changed("entry", stale_sale_ids, company_id)
             
         # 4. Sync missing/outdated sale entries & auto-reconcile invoice payments with db.payments
         for inv in active_invoices:
@@ -5446,6 +5471,7 @@ async def _reconcile_and_sync_all_sales_and_payments_impl(company_id: str):
                         _je_ids = [r["id"] for r in _je_rows]
                         await db.journal_lines.delete_many({"entry_id": {"$in": _je_ids}})
                         await db.journal_entries.delete_many({"id": {"$in": _je_ids}})
+                        await validation_totals.note_changed("entry", _je_ids, company_id)
                     if p.get("auto_generated"):
                         await db.payments.delete_one({"id": p["id"]})
                 # Treat the invoice as fully paid — the bank match journal is the
@@ -5513,6 +5539,7 @@ async def _reconcile_and_sync_all_sales_and_payments_impl(company_id: str):
                         "updated_at": datetime.now(timezone.utc).isoformat()
                     }}
                 )
+                await validation_totals.note_changed("invoice", [inv_id], company_id)
                 
         # 5. Fetch all payments for this company
         payments = await db.payments.find({"company_id": company_id}).to_list(10000)
@@ -5555,6 +5582,7 @@ async def _reconcile_and_sync_all_sales_and_payments_impl(company_id: str):
         if stale_pay_ids:
             await db.journal_lines.delete_many({"entry_id": {"$in": stale_pay_ids}})
             await db.journal_entries.delete_many({"id": {"$in": stale_pay_ids}})
+            await validation_totals.note_changed("entry", stale_pay_ids, company_id)
             
         # 8. Sync missing/outdated payment entries. Also re-sync entries that
         # were posted before the client_name fallback fix, which show up as
@@ -5576,6 +5604,7 @@ async def _reconcile_and_sync_all_sales_and_payments_impl(company_id: str):
                 if pe:
                     await db.journal_lines.delete_many({"entry_id": pe["id"]})
                     await db.journal_entries.delete_one({"id": pe["id"]})
+                    await validation_totals.note_changed("entry", [pe["id"]], company_id)
                 continue
             stale_narration = pe and "for Invoice Unknown" in (pe.get("narration") or "") and (p.get("client_name") or "").strip()
             if not pe or stale_narration or abs(float(pe.get("total_debit", 0)) - float(p.get("amount", 0))) > 0.01:
@@ -5612,6 +5641,7 @@ async def _reconcile_and_sync_all_purchases_and_payments_impl(company_id: str):
         if stale_ids:
             await db.journal_lines.delete_many({"entry_id": {"$in": stale_ids}})
             await db.journal_entries.delete_many({"id": {"$in": stale_ids}})
+            await validation_totals.note_changed("entry", stale_ids, company_id)
 
         for inv in active_invoices:
             inv_id = inv["id"]
@@ -5651,6 +5681,7 @@ async def _reconcile_and_sync_all_purchases_and_payments_impl(company_id: str):
                     continue
                 await db.journal_lines.delete_many({"entry_id": bank_je["id"]})
                 await db.journal_entries.delete_one({"id": bank_je["id"]})
+                await validation_totals.note_changed("entry", [bank_je["id"]], company_id)
                 amount = float(inv.get("grand_total") or 0) or float(bank_je.get("total_debit") or 0)
                 if amount > 0 and ap_id and bnk_id:
                     await _post_je(
@@ -5700,6 +5731,7 @@ async def _reconcile_and_sync_all_purchases_and_payments_impl(company_id: str):
         if stale_pay_ids:
             await db.journal_lines.delete_many({"entry_id": {"$in": stale_pay_ids}})
             await db.journal_entries.delete_many({"id": {"$in": stale_pay_ids}})
+            await validation_totals.note_changed("entry", stale_pay_ids, company_id)
 
         for p in payments:
             p_id = p["id"]
@@ -5731,6 +5763,7 @@ async def sync_unprepared_income_journal_entry(income_id: str):
         old_ids = [e["id"] for e in old_entries]
         await db.journal_lines.delete_many({"entry_id": {"$in": old_ids}})
         await db.journal_entries.delete_many({"id": {"$in": old_ids}})
+        await validation_totals.note_changed("entry", old_ids)
         
     # 2. Fetch the current record
     inc = await db.unprepared_incomes.find_one({"id": income_id})
@@ -5851,6 +5884,7 @@ async def delete_unprepared_income(income_id: str, current_user: User = Depends(
         old_ids = [e["id"] for e in old_entries]
         await db.journal_lines.delete_many({"entry_id": {"$in": old_ids}})
         await db.journal_entries.delete_many({"id": {"$in": old_ids}})
+        await validation_totals.note_changed("entry", old_ids)
         
     await db.unprepared_incomes.delete_one({"id": income_id})
     return {"success": True}
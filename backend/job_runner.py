@@ -0,0 +1,478 @@
+"""
+job_runner.py
+────────────────────────────────────────────────────────────────────────────────
+Single asyncio-native runner for all periodic background work.
+
+Replaces the APScheduler BackgroundScheduler thread (which had to bridge every
+job back onto the event loop with run_coroutine_threadsafe) and the ad-hoc
+`while True` loops that each module used to spawn.
+
+Every uvicorn worker runs the same schedule, but each fire is executed once
+cluster-wide:
+
+  * Occurrence claim — every scheduled fire has a deterministic run key
+    "<job_id>@<fire time>". The worker that inserts that `_id` into
+    `job_runs` first owns the run; the others get a DuplicateKeyError and
+    skip. The same document becomes the run's history record.
+  * Singleton lock — jobs with `singleton=True` (default) also take a
+    `job_locks` lease for up to `timeout` seconds, so a long run cannot
+    overlap the next fire on another worker.
+
+Per job you get a cron or interval trigger, a per-process concurrency limit,
+a timeout, and a random start jitter. In-process counters plus the stored
+history are exposed under /api/jobs (admin only).
+
+Usage:
+    from backend.job_runner import job_runner, cron, every
+
+    job_runner.add_job("mark_absent_daily", mark_absent_job, cron(hour=19))
+    job_runner.add_job("wa_scheduled_bulk", run_bulk, every(minutes=1), timeout=1800)
+    job_runner.start()          # from the FastAPI startup hook
+    await job_runner.stop()     # from the shutdown hook
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from backend.dependencies import db, require_admin
+from backend.index_manifest import ensure_indexes, index
+from backend.models import User
+
+logger = logging.getLogger("job_runner")
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# Run-history documents expire after this many days (TTL index on created_at)
+HISTORY_RETENTION_DAYS = 14
+# Upper bound on how long the dispatcher sleeps between schedule checks
+_MAX_TICK_SEC = 30
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# TRIGGERS
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _as_set(value: Union[None, int, Iterable[int]], full: range) -> List[int]:
+    if value is None:
+        return list(full)
+    if isinstance(value, int):
+        return [value]
+    return sorted(set(value))
+
+
+@dataclass
+class CronTrigger:
+    """Wall-clock schedule. day_of_week uses Python's weekday() (Mon=0 … Sun=6)."""
+    minute: List[int]
+    hour: List[int]
+    day: Optional[List[int]] = None
+    day_of_week: Optional[List[int]] = None
+    tz: ZoneInfo = IST
+
+    def next_after(self, after: datetime) -> datetime:
+        local = after.astimezone(self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = local.replace(hour=0, minute=0)
+        for _ in range(400):
+            if (self.day is None or day.day in self.day) and \
+               (self.day_of_week is None or day.weekday() in self.day_of_week):
+                for h in self.hour:
+                    for m in self.minute:
+                        candidate = day.replace(hour=h, minute=m)
+                        if candidate >= local:
+                            return candidate.astimezone(timezone.utc)
+            day = (day + timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError("cron trigger never fires")
+
+    def describe(self) -> str:
+        return f"cron(minute={self.minute}, hour={self.hour}, day={self.day}, dow={self.day_of_week})"
+
+
+@dataclass
+class IntervalTrigger:
+    """Fires every `seconds`, aligned to the epoch so all workers agree on fire times."""
+    seconds: int
+
+    def next_after(self, after: datetime) -> datetime:
+        ts = after.timestamp()
+        return datetime.fromtimestamp((int(ts // self.seconds) + 1) * self.seconds, tz=timezone.utc)
+
+    def describe(self) -> str:
+        return f"every({self.seconds}s)"
+
+
+def cron(minute: Union[int, Iterable[int]] = 0, hour: Union[None, int, Iterable[int]] = None,
+         day: Union[None, int, Iterable[int]] = None,
+         day_of_week: Union[None, int, Iterable[int]] = None, tz: ZoneInfo = IST) -> CronTrigger:
+    return CronTrigger(
+        minute=_as_set(minute, range(60)),
+        hour=_as_set(hour, range(24)),
+        day=None if day is None else _as_set(day, range(1, 32)),
+        day_of_week=None if day_of_week is None else _as_set(day_of_week, range(7)),
+        tz=tz,
+    )
+
+
+def every(seconds: int = 0, minutes: int = 0, hours: int = 0) -> IntervalTrigger:
+    total = seconds + minutes * 60 + hours * 3600
+    if total <= 0:
+        raise ValueError("interval must be positive")
+    return IntervalTrigger(seconds=total)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# JOB REGISTRY
+# ─────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class Job:
+    id: str
+    func: Callable[[], Awaitable[Any]]
+    trigger: Union[CronTrigger, IntervalTrigger]
+    timeout: float = 120
+    max_concurrency: int = 1
+    jitter: float = 0
+    singleton: bool = True
+    catch_up: bool = False
+    next_run: Optional[datetime] = None
+    semaphore: asyncio.Semaphore = field(default=None, repr=False)
+    metrics: Dict[str, Any] = field(default_factory=lambda: {
+        "runs": 0, "succeeded": 0, "failed": 0, "timed_out": 0,
+        "skipped_claimed": 0, "skipped_locked": 0, "skipped_busy": 0,
+        "total_duration_ms": 0, "last_status": None, "last_run_at": None,
+        "last_duration_ms": None, "last_error": None,
+    })
+
+
+class JobRunner:
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._jobs: Dict[str, Job] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    # ── Registration ─────────────────────────────────────────────────────────
+
+    def add_job(self, job_id: str, func: Callable[[], Awaitable[Any]],
+                trigger: Union[CronTrigger, IntervalTrigger], *, timeout: float = 120,
+                max_concurrency: int = 1, jitter: float = 0, singleton: bool = True,
+                catch_up: bool = False) -> Job:
+        """
+        Register (or replace) a job. `func` is an argument-less coroutine function.
+
+        catch_up: on start, run the most recent missed fire from the last 24 h
+                  if no worker has claimed it (only for idempotent jobs).
+        """
+        job = Job(
+            id=job_id, func=func, trigger=trigger, timeout=timeout,
+            max_concurrency=max(1, max_concurrency), jitter=max(0.0, jitter),
+            singleton=singleton, catch_up=catch_up,
+        )
+        job.semaphore = asyncio.Semaphore(job.max_concurrency)
+        job.next_run = trigger.next_after(datetime.now(timezone.utc))
+        self._jobs[job_id] = job
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def remove_job(self, job_id: str):
+        """Stop scheduling a job. A run already in flight finishes normally."""
+        self._jobs.pop(job_id, None)
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_event_loop().create_task(self._dispatch_loop())
+        logger.info(f"Job runner started as {self.owner} with {len(self._jobs)} job(s)")
+
+    async def stop(self, grace: float = 10):
+        # wait_for() can swallow a cancel that races the wakeup event
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._running:
+            await asyncio.wait(list(self._running), timeout=grace)
+        logger.info("Job runner stopped")
+
+    async def _dispatch_loop(self):
+        await self._run_catch_ups()
+        while not self._stopping:
+            try:
+                now = datetime.now(timezone.utc)
+                for job in list(self._jobs.values()):
+                    if job.next_run and job.next_run <= now:
+                        fire_at = job.next_run
+                        job.next_run = job.trigger.next_after(now)
+                        self._spawn(job, fire_at)
+                upcoming = [j.next_run for j in self._jobs.values() if j.next_run]
+                delay = _MAX_TICK_SEC
+                if upcoming:
+                    delay = min(delay, max(0.0, (min(upcoming) - datetime.now(timezone.utc)).total_seconds()))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Job runner dispatch error: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _run_catch_ups(self):
+        now = datetime.now(timezone.utc)
+        for job in self._jobs.values():
+            if not job.catch_up:
+                continue
+            missed = job.trigger.next_after(now - timedelta(days=1))
+            last_missed = None
+            while missed <= now:
+                last_missed = missed
+                missed = job.trigger.next_after(missed)
+            if last_missed:
+                self._spawn(job, last_missed)
+
+    def _spawn(self, job: Job, fire_at: datetime, manual: bool = False):
+        task = asyncio.get_event_loop().create_task(self._execute(job, fire_at, manual))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    # ── Leases ───────────────────────────────────────────────────────────────
+
+    async def _claim(self, job: Job, run_key: str, fire_at: datetime, manual: bool) -> bool:
+        from pymongo.errors import DuplicateKeyError
+        try:
+            await db.job_runs.insert_one({
+                "_id": run_key,
+                "job_id": job.id,
+                "scheduled_for": fire_at,
+                "owner": self.owner,
+                "manual": manual,
+                "status": "claimed",
+                "created_at": datetime.now(timezone.utc),
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _acquire_lock(self, job: Job) -> bool:
+        from pymongo.errors import DuplicateKeyError
+        now = datetime.now(timezone.utc)
+        try:
+            await db.job_locks.update_one(
+                {"_id": job.id, "expires_at": {"$lt": now}},
+                {"$set": {
+                    "owner": self.owner,
+                    "acquired_at": now,
+                    "expires_at": now + timedelta(seconds=job.timeout + 30),
+                }},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _release_lock(self, job: Job):
+        try:
+            await db.job_locks.delete_one({"_id": job.id, "owner": self.owner})
+        except Exception as e:
+            logger.warning(f"Job {job.id}: lock release failed (expires on its own): {e}")
+
+    # ── Execution ────────────────────────────────────────────────────────────
+
+    async def _execute(self, job: Job, fire_at: datetime, manual: bool = False):
+        m = job.metrics
+        if job.semaphore.locked():
+            m["skipped_busy"] += 1
+            logger.info(f"Job {job.id}: previous run still in progress on this worker, skipping")
+            return
+        async with job.semaphore:
+            if job.jitter and not manual:
+                await asyncio.sleep(random.uniform(0, job.jitter))
+
+            run_key = f"{job.id}@{fire_at.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+            if manual:
+                run_key += f"#manual-{uuid.uuid4().hex[:8]}"
+            try:
+                if not await self._claim(job, run_key, fire_at, manual):
+                    m["skipped_claimed"] += 1
+                    return
+                if job.singleton and not await self._acquire_lock(job):
+                    m["skipped_locked"] += 1
+                    await db.job_runs.update_one(
+                        {"_id": run_key}, {"$set": {"status": "skipped_locked"}}
+                    )
+                    return
+            except Exception as e:
+                logger.error(f"Job {job.id}: lease error, not running this fire: {e}")
+                return
+
+            started = time.monotonic()
+            started_at = datetime.now(timezone.utc)
+            status, error = "succeeded", None
+            try:
+                await db.job_runs.update_one(
+                    {"_id": run_key}, {"$set": {"status": "running", "started_at": started_at}}
+                )
+                await asyncio.wait_for(job.func(), timeout=job.timeout)
+            except asyncio.TimeoutError:
+                status, error = "timed_out", f"exceeded {job.timeout}s"
+                m["timed_out"] += 1
+            except asyncio.CancelledError:
+                status, error = "cancelled", "runner shutting down"
+                raise
+            except Exception as e:
+                status, error = "failed", f"{type(e).__name__}: {e}"
+                m["failed"] += 1
+                logger.error(f"Job {job.id} failed: {error}", exc_info=True)
+            finally:
+                duration_ms = int((time.monotonic() - started) * 1000)
+                m["runs"] += 1
+                if status == "succeeded":
+                    m["succeeded"] += 1
+                m["total_duration_ms"] += duration_ms
+                m.update(last_status=status, last_run_at=started_at.isoformat(),
+                         last_duration_ms=duration_ms, last_error=error)
+                if job.singleton:
+                    await self._release_lock(job)
+                try:
+                    await db.job_runs.update_one(
+                        {"_id": run_key},
+                        {"$set": {
+                            "status": status,
+                            "error": error,
+                            "finished_at": datetime.now(timezone.utc),
+                            "duration_ms": duration_ms,
+                        }},
+                    )
+                except Exception as e:
+                    logger.warning(f"Job {job.id}: could not record run history: {e}")
+
+    async def run_now(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if not job:
+            return False
+        self._spawn(job, datetime.now(timezone.utc), manual=True)
+        return True
+
+    # ── Introspection ────────────────────────────────────────────────────────
+
+    def status(self) -> List[Dict[str, Any]]:
+        out = []
+        for job in self._jobs.values():
+            m = dict(job.metrics)
+            m["avg_duration_ms"] = round(m["total_duration_ms"] / m["runs"]) if m["runs"] else None
+            out.append({
+                "id": job.id,
+                "trigger": job.trigger.describe(),
+                "next_run": job.next_run.isoformat() if job.next_run else None,
+                "timeout": job.timeout,
+                "max_concurrency": job.max_concurrency,
+                "jitter": job.jitter,
+                "singleton": job.singleton,
+                "running_here": job.semaphore.locked(),
+                "metrics": m,
+            })
+        return out
+
+
+job_runner = JobRunner()
+
+
+INDEXES = [
+    index("job_runs", "created_at", expireAfterSeconds=HISTORY_RETENTION_DAYS * 86400),
+    index("job_runs", [("job_id", 1), ("created_at", -1)]),
+    # Expired locks are also cleaned by Mongo; the runner itself only
+    # relies on the expires_at comparison, never on TTL timing.
+    index("job_locks", "expires_at", expireAfterSeconds=0),
+]
+
+
+async def create_job_runner_indexes():
+    """Create MongoDB indexes for job run history and locks."""
+    await ensure_indexes(INDEXES)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ADMIN ROUTES
+# ─────────────────────────────────────────────────────────────────────────────
+
+router = APIRouter(prefix="/jobs", tags=["Background Jobs"])
+
+
+@router.get("")
+async def list_jobs(current_user: User = Depends(require_admin())):
+    """Registered jobs with their next fire time and this worker's counters."""
+    return {"owner": job_runner.owner, "jobs": job_runner.status()}
+
+
+@router.get("/history")
+async def job_history(
+    job_id: Optional[str] = Query(default=None),
+    status: Optional[str] = Query(default=None),
+    limit: int = Query(default=100, le=1000),
+    current_user: User = Depends(require_admin()),
+):
+    """Cluster-wide run history (one row per executed or skipped fire)."""
+    query: Dict[str, Any] = {}
+    if job_id:
+        query["job_id"] = job_id
+    if status:
+        query["status"] = status
+    runs = await db.job_runs.find(query).sort("created_at", -1).limit(limit).to_list(limit)
+    for r in runs:
+        r["run_key"] = r.pop("_id")
+        for k in ("scheduled_for", "created_at", "started_at", "finished_at"):
+            if isinstance(r.get(k), datetime):
+                r[k] = r[k].isoformat()
+    return {"runs": runs, "count": len(runs)}
+
+
+@router.get("/metrics")
+async def job_metrics(current_user: User = Depends(require_admin())):
+    """Per-job success/failure/timeout counts and durations over the retained history."""
+    pipeline = [
+        {"$group": {
+            "_id": {"job_id": "$job_id", "status": "$status"},
+            "count": {"$sum": 1},
+            "avg_ms": {"$avg": "$duration_ms"},
+            "max_ms": {"$max": "$duration_ms"},
+        }},
+    ]
+    per_job: Dict[str, Dict[str, Any]] = {}
+    async for row in db.job_runs.aggregate(pipeline):
+        entry = per_job.setdefault(row["_id"]["job_id"], {"by_status": {}})
+        entry["by_status"][row["_id"]["status"]] = {
+            "count": row["count"],
+            "avg_ms": round(row["avg_ms"]) if row.get("avg_ms") is not None else None,
+            "max_ms": row.get("max_ms"),
+        }
+    return {"retention_days": HISTORY_RETENTION_DAYS, "jobs": per_job}
+
+
+@router.post("/{job_id}/run")
+async def trigger_job(job_id: str, current_user: User = Depends(require_admin())):
+    """Run a job now (still subject to its singleton lock)."""
+    if not await job_runner.run_now(job_id):
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {"success": True, "message": f"Job {job_id} triggered"}
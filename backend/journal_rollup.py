@@ -0,0 +1,301 @@
+"""
+journal_rollup.py
+────────────────────────────────────────────────────────────────────────────────
+Monthly per-account movement rollup of `journal_lines`, read by the cash
+flow, financial ratio, comparative and year-wise reports instead of the raw
+lines.
+
+Each of those reports used to load up to 200k journal lines per period and
+sum them in Python. Instead `journal_monthly` keeps one document per company
+and calendar month:
+
+  _id            "<company_id>:<YYYY-MM>"
+  company_id
+  month          "YYYY-MM"
+  accounts       [{account_id, debit, credit}] — the month's totals
+  line_count     number of journal lines the totals were built from
+  version        bumped by mark_changed() whenever the month's lines are written
+  built_version  the version the totals were built at
+
+`account_movements(company_id, from_date, to_date)` serves the whole months
+of a range from the rollup and the partial months at either end with one
+live `$group`; `account_movements_many` does the same for the several
+ranges of one report with a single read of the months they cover. A month is rebuilt (one `$group` over all stale months of the
+request) when it has no document, when `built_version != version`, or when
+`line_count` differs from the live count of its lines. The count is an
+index-only `$group` on (company_id, entry_date) and catches the many
+`delete_many({"entry_id": ...})` call sites that do not report their
+deletes; mark_changed() catches the edits that delete and re-insert the
+same number of lines. A rebuild is only stored if the version has not moved
+while it ran.
+
+Write sites that insert journal lines call `mark_changed(docs)` with the new
+lines (and, for edits, the entry as it was). The refresh job (job runner,
+every 5 min) rebuilds months marked changed so reports rarely pay for it.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from backend.dependencies import db
+from backend.index_manifest import ensure_indexes, index
+
+logger = logging.getLogger("journal_rollup")
+
+REFRESH_BATCH = 500
+
+Movements = Dict[str, Tuple[float, float]]  # account_id -> (debit, credit)
+
+
+def _month_id(company_id: str, month: str) -> str:
+    return f"{company_id}:{month}"
+
+
+def _date_q(lo: Optional[str], hi: str) -> Dict[str, str]:
+    return {"$gte": lo, "$lte": hi} if lo else {"$lte": hi}
+
+
+def _add(totals: Dict[str, List[float]], account_id: str, debit: float, credit: float):
+    t = totals[account_id]
+    t[0] += debit or 0
+    t[1] += credit or 0
+
+
+def split_range(from_date: Optional[str], to_date: str):
+    """
+    Split the inclusive range into the whole calendar months it covers and the
+    partial ranges left at either end: ((lo, hi) or None, [(lo, hi), ...]).
+    `lo` of the whole months is None when from_date is None (since the
+    beginning). Unparseable dates give no whole months, so the caller falls
+    back to a live sum of the range.
+    """
+    try:
+        end = date.fromisoformat(to_date[:10])
+        start = date.fromisoformat(from_date[:10]) if from_date else None
+    except (TypeError, ValueError):
+        return None, [(from_date, to_date)]
+
+    next_month = (end.replace(day=28) + timedelta(days=4)).replace(day=1)
+    whole_end = end if end == next_month - timedelta(days=1) else end.replace(day=1) - timedelta(days=1)
+    if start is None:
+        whole_start = None
+    elif start.day == 1:
+        whole_start = start
+    else:
+        whole_start = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    if whole_start is not None and whole_start > whole_end:
+        return None, [(from_date, to_date)]
+    edges = []
+    if start is not None and start < whole_start:
+        edges.append((from_date, (whole_start - timedelta(days=1)).isoformat()))
+    if end > whole_end:
+        edges.append(((whole_end + timedelta(days=1)).isoformat(), to_date))
+    return (whole_start.isoformat() if whole_start else None, whole_end.isoformat()), edges
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WRITE PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def mark_changed(docs: Iterable[Dict[str, Any]]):
+    """
+    Bump the version of every (company, month) the given journal lines or
+    entries fall in, so the rollup rebuilds them. Never raises.
+    """
+    try:
+        keys = {(d.get("company_id") or "", str(d["entry_date"])[:7])
+                for d in docs if d and d.get("entry_date")}
+        ops = [UpdateOne({"_id": _month_id(c, m)},
+                         {"$inc": {"version": 1}, "$setOnInsert": {"company_id": c, "month": m}},
+                         upsert=True)
+               for c, m in sorted(keys)]
+        if ops:
+            await db.journal_monthly.bulk_write(ops, ordered=False)
+    except Exception as e:
+        logger.warning(f"Journal rollup invalidation failed (line counts will catch it): {e}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# BUILD
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _live_movements(company_id: str, ranges: List[Tuple[Optional[str], str]]) -> Movements:
+    """Per-account debit / credit totals of the lines in `ranges`, summed by the server."""
+    match = {"company_id": company_id,
+             "$or": [{"entry_date": _date_q(lo, hi)} for lo, hi in ranges]}
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$account_id", "debit": {"$sum": "$debit"}, "credit": {"$sum": "$credit"}}},
+    ]
+    return {row["_id"]: (row["debit"], row["credit"])
+            async for row in db.journal_lines.aggregate(pipeline)}
+
+
+async def _month_counts(company_id: str, lo: Optional[str], hi: str) -> Dict[str, int]:
+    pipeline = [
+        {"$match": {"company_id": company_id, "entry_date": _date_q(lo, hi)}},
+        {"$group": {"_id": {"$substrBytes": ["$entry_date", 0, 7]}, "n": {"$sum": 1}}},
+    ]
+    return {row["_id"]: row["n"] async for row in db.journal_lines.aggregate(pipeline)}
+
+
+def _month_range(month: str) -> Tuple[str, str]:
+    first = date.fromisoformat(f"{month}-01")
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return first.isoformat(), last.isoformat()
+
+
+async def build_months(company_id: str, months: List[str]) -> Dict[str, Movements]:
+    """Recompute and store the rollup of `months` with one `$group`; returns the fresh totals."""
+    if not months:
+        return {}
+    await db.journal_monthly.bulk_write([
+        UpdateOne({"_id": _month_id(company_id, m)},
+                  {"$setOnInsert": {"company_id": company_id, "month": m, "version": 0}},
+                  upsert=True)
+        for m in months
+    ], ordered=False)
+    versions = {d["month"]: d.get("version", 0) for d in await db.journal_monthly.find(
+        {"_id": {"$in": [_month_id(company_id, m) for m in months]}}, {"month": 1, "version": 1}
+    ).to_list(None)}
+
+    pipeline = [
+        {"$match": {"company_id": company_id,
+                    "$or": [{"entry_date": _date_q(*_month_range(m))} for m in months]}},
+        {"$group": {"_id": {"month": {"$substrBytes": ["$entry_date", 0, 7]}, "account_id": "$account_id"},
+                    "debit": {"$sum": "$debit"}, "credit": {"$sum": "$credit"}, "n": {"$sum": 1}}},
+    ]
+    built: Dict[str, Movements] = {m: {} for m in months}
+    counts: Dict[str, int] = defaultdict(int)
+    async for row in db.journal_lines.aggregate(pipeline):
+        month = row["_id"]["month"]
+        built.setdefault(month, {})[row["_id"]["account_id"]] = (row["debit"], row["credit"])
+        counts[month] += row["n"]
+
+    now = datetime.now(timezone.utc)
+    ops = []
+    for m in months:
+        v = versions.get(m, 0)
+        ops.append(UpdateOne(
+            {"_id": _month_id(company_id, m), "version": v},
+            {"$set": {
+                "accounts": [{"account_id": aid, "debit": dr, "credit": cr}
+                             for aid, (dr, cr) in built[m].items()],
+                "line_count": counts[m],
+                "built_version": v,
+                "built_at": now,
+            }},
+        ))
+    await db.journal_monthly.bulk_write(ops, ordered=False)
+    return built
+
+
+async def refresh_journal_rollup():
+    """Job-runner entry point: rebuild months changed since they were last built."""
+    stale = await db.journal_monthly.find(
+        {"$expr": {"$ne": ["$version", "$built_version"]}}, {"company_id": 1, "month": 1}
+    ).to_list(REFRESH_BATCH)
+    by_company: Dict[str, List[str]] = defaultdict(list)
+    for d in stale:
+        by_company[d.get("company_id") or ""].append(d["month"])
+    for company_id, months in by_company.items():
+        try:
+            await build_months(company_id, months)
+        except Exception as e:
+            logger.error(f"Journal rollup refresh for {company_id or '<default>'} failed: {e}", exc_info=True)
+
+
+INDEXES = [
+    index("journal_monthly", [("company_id", 1), ("month", 1)]),
+]
+
+
+async def create_journal_rollup_indexes():
+    """Create MongoDB indexes for the monthly journal rollup."""
+    await ensure_indexes(INDEXES)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# READ PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _fresh(doc: Optional[Dict[str, Any]], line_count: int) -> bool:
+    return bool(doc) and doc.get("built_version") == doc.get("version") \
+        and doc.get("line_count") == line_count
+
+
+async def _monthly_movements(company_id: str, lo: Optional[str], hi: str) -> Dict[str, Movements]:
+    """Totals of each month with lines in the whole-month range [lo, hi], rebuilding stale ones."""
+    counts = await _month_counts(company_id, lo, hi)
+    month_q = {"$gte": lo[:7], "$lte": hi[:7]} if lo else {"$lte": hi[:7]}
+    docs = {d["month"]: d for d in await db.journal_monthly.find(
+        {"company_id": company_id, "month": month_q}, {"_id": 0}
+    ).to_list(None)}
+    monthly: Dict[str, Movements] = {}
+    stale = []
+    for month in sorted(set(counts) | {m for m, d in docs.items() if d.get("line_count")}):
+        doc = docs.get(month)
+        if not _fresh(doc, counts.get(month, 0)):
+            stale.append(month)
+            continue
+        monthly[month] = {a["account_id"]: (a["debit"], a["credit"]) for a in doc.get("accounts", [])}
+    if stale:
+        monthly.update(await build_months(company_id, stale))
+    return monthly
+
+
+async def account_movements_many(company_id: str,
+                                 ranges: List[Tuple[Optional[str], str]]) -> List[Movements]:
+    """
+    account_movements for several ranges of one report, in order. The month
+    counts and rollup documents are read once for all the months the ranges
+    cover (and stale months rebuilt once), so an opening balance "since the
+    first entry" next to a period total costs one pass over history, not two.
+    """
+    splits = [split_range(from_date, to_date) for from_date, to_date in ranges]
+    wholes = [whole for whole, _ in splits if whole]
+    monthly: Dict[str, Movements] = {}
+    if wholes:
+        lo = None if any(w[0] is None for w in wholes) else min(w[0] for w in wholes)
+        monthly = await _monthly_movements(company_id, lo, max(w[1] for w in wholes))
+
+    results = []
+    for whole, edges in splits:
+        totals: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+        if whole:
+            first = whole[0][:7] if whole[0] else ""
+            last = whole[1][:7]
+            for month, moves in monthly.items():
+                if first <= month <= last:
+                    for aid, (dr, cr) in moves.items():
+                        _add(totals, aid, dr, cr)
+        if edges:
+            for aid, (dr, cr) in (await _live_movements(company_id, edges)).items():
+                _add(totals, aid, dr, cr)
+        results.append({aid: (dr, cr) for aid, (dr, cr) in totals.items()})
+    return results
+
+
+async def account_movements(company_id: str, from_date: Optional[str], to_date: str) -> Movements:
+    """
+    Per-account (debit, credit) totals of the journal lines dated within
+    [from_date, to_date]; from_date None means since the first entry.
+    """
+    return (await account_movements_many(company_id, [(from_date, to_date)]))[0]
+
+
+async def account_balances(company_id: str, from_date: Optional[str], to_date: str) -> Dict[str, float]:
+    """Net movement (debit − credit) per account over [from_date, to_date]."""
+    return (await account_balances_many(company_id, [(from_date, to_date)]))[0]
+
+
+async def account_balances_many(company_id: str,
+                                ranges: List[Tuple[Optional[str], str]]) -> List[Dict[str, float]]:
+    """account_balances for several ranges, sharing one read as account_movements_many does."""
+    return [{aid: dr - cr for aid, (dr, cr) in moves.items()}
+            for moves in await account_movements_many(company_id, ranges)]
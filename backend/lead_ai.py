@@ -27,6 +27,7 @@ Actual database actions remain in the appropriate Telegram/backend modules.
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
@@ -34,9 +35,11 @@ import re
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-import httpx
 from fastapi import HTTPException
 
+from backend import lead_prefilter
+from backend.ai import llm_gateway
+
 logger = logging.getLogger("lead_ai")
 
 
@@ -421,6 +424,22 @@ def _build_prompt(message: str) -> str:
     return f"{_SYSTEM_PROMPT}\n\nUSER MESSAGE:\n{message.strip()}"
 
 
+def _build_batch_prompt(messages: List[str]) -> str:
+    numbered = "\n\n".join(
+        f"--- USER MESSAGE {i} ---\n{m.strip()}"
+        for i, m in enumerate(messages, start=1)
+    )
+    return (
+        f"{_SYSTEM_PROMPT}\n\n"
+        f"Below are {len(messages)} separate user messages from different "
+        "users. Classify and extract each one independently; never carry "
+        "information from one message to another.\n"
+        'Return {"results": [ ... ]} with exactly one object per message, '
+        "in the same order, each in the structure above.\n\n"
+        f"{numbered}"
+    )
+
+
 # =============================================================================
 # JSON PARSING
 # =============================================================================
@@ -752,203 +771,6 @@ def _normalize_universal_result(
     }
 
 
-# =============================================================================
-# GEMINI
-# =============================================================================
-
-async def _call_gemini(prompt: str) -> str:
-
-    key = _gemini_key()
-
-    if not key:
-        raise HTTPException(
-            status_code=500,
-            detail="Gemini API key is not configured on the server.",
-        )
-
-    model = _gemini_model()
-
-    url = (
-        "https://generativelanguage.googleapis.com/v1beta/"
-        f"models/{model}:generateContent"
-    )
-
-    payload = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [
-                    {
-                        "text": prompt
-                    }
-                ],
-            }
-        ],
-        "generationConfig": {
-            "temperature": 0.0,
-            "maxOutputTokens": 2048,
-            "responseMimeType": "application/json",
-        },
-    }
-
-    try:
-        async with httpx.AsyncClient(
-            timeout=45
-        ) as client:
-
-            response = await client.post(
-                url,
-                params={"key": key},
-                headers={
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-            )
-
-    except Exception as exc:
-        raise HTTPException(
-            status_code=502,
-            detail=f"Gemini connection error: {exc}",
-        )
-
-    if response.status_code == 429:
-        raise HTTPException(
-            status_code=429,
-            detail="Gemini quota exceeded.",
-        )
-
-    if response.status_code != 200:
-
-        raise HTTPException(
-            status_code=422,
-            detail=(
-                f"Gemini API error {response.status_code}: "
-                f"{response.text[:500]}"
-            ),
-        )
-
-    try:
-        data = response.json()
-
-        parts = (
-            data
-            .get("candidates", [{}])[0]
-            .get("content", {})
-            .get("parts", [])
-        )
-
-        text = "".join(
-            part.get("text", "")
-            for part in parts
-            if isinstance(part, dict)
-        )
-
-        if not text:
-            raise ValueError(
-                "Gemini returned an empty response"
-            )
-
-        return text
-
-    except Exception as exc:
-
-        raise HTTPException(
-            status_code=422,
-            detail=f"Gemini response parsing error: {exc}",
-        )
-
-
-# =============================================================================
-# GROQ
-# =============================================================================
-
-async def _call_groq(prompt: str) -> str:
-
-    key = _groq_key()
-
-    if not key:
-        raise HTTPException(
-            status_code=500,
-            detail="Groq API key is not configured on the server.",
-        )
-
-    payload = {
-        "model": _groq_model(),
-        "messages": [
-            {
-                "role": "system",
-                "content": (
-                    "You are a structured business ERP intent "
-                    "classification engine. Return JSON only."
-                ),
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            },
-        ],
-        "temperature": 0,
-        "max_tokens": 2048,
-        "response_format": {
-            "type": "json_object"
-        },
-    }
-
-    try:
-        async with httpx.AsyncClient(
-            timeout=45
-        ) as client:
-
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
-
-    except Exception as exc:
-
-        raise HTTPException(
-            status_code=502,
-            detail=f"Groq connection error: {exc}",
-        )
-
-    if response.status_code == 429:
-        raise HTTPException(
-            status_code=429,
-            detail="Groq quota exceeded.",
-        )
-
-    if response.status_code != 200:
-
-        raise HTTPException(
-            status_code=422,
-            detail=(
-                f"Groq API error {response.status_code}: "
-                f"{response.text[:500]}"
-            ),
-        )
-
-    try:
-        data = response.json()
-
-        return (
-            data
-            .get("choices", [{}])[0]
-            .get("message", {})
-            .get("content", "")
-        )
-
-    except Exception as exc:
-
-        raise HTTPException(
-            status_code=422,
-            detail=f"Groq response parsing error: {exc}",
-        )
-
-
 # =============================================================================
 # UNIVERSAL MESSAGE DETECTION
 # =============================================================================
@@ -963,6 +785,10 @@ async def detect_intent(
     """
     Universal natural-language message classifier.
 
+    Obvious non-requests are answered locally as "unknown" by
+    backend.lead_prefilter; the rest are micro-batched into shared
+    provider calls.
+
     This function only understands/extracts the request.
     It does not create or modify database records.
     """
@@ -982,89 +808,81 @@ async def detect_intent(
 
     message = message.strip()
 
-    prompt = _build_prompt(message)
-
-    provider = _provider()
-
-    raw_text: Optional[str] = None
-    first_error: Optional[Exception] = None
+    source_fields = {
+        "source": source,
+        "source_chat_id": source_chat_id,
+        "source_sender_id": source_sender_id,
+        "source_sender_name": source_sender_name,
+        "original_message": message,
+    }
 
-    try:
+    # Greetings, acknowledgements, media captions etc. never reach the LLM.
+    keep, score, reason = lead_prefilter.screen("intent", message)
 
-        if provider == "gemini":
-            raw_text = await _call_gemini(prompt)
-        else:
-            raw_text = await _call_groq(prompt)
+    if not keep:
 
-    except Exception as exc:
+        return {
+            "intent": "unknown",
+            "confidence": round(1.0 - score, 4),
+            "data": _normalise_data({}),
+            "prefiltered": reason,
+            **source_fields,
+        }
 
-        first_error = exc
+    result = dict(await _batcher.submit(message))
 
-        try:
+    await lead_prefilter.record_outcome(
+        "intent",
+        message,
+        result["intent"] != "unknown",
+        source,
+    )
 
-            if provider == "gemini" and _groq_key():
+    result.update(source_fields)
 
-                logger.warning(
-                    "Gemini universal AI failed; "
-                    "falling back to Groq: %r",
-                    exc,
-                )
+    logger.info(
+        "AI intent detected: %s confidence=%.2f source=%s",
+        result["intent"],
+        result["confidence"],
+        source,
+    )
 
-                raw_text = await _call_groq(prompt)
+    return result
 
-            elif provider == "groq" and _gemini_key():
 
-                logger.warning(
-                    "Groq universal AI failed; "
-                    "falling back to Gemini: %r",
-                    exc,
-                )
+async def _complete(prompt: str, max_tokens: int = 2048) -> str:
+    """Call the configured provider through the LLM gateway (falls back to the other one)."""
 
-                raw_text = await _call_gemini(prompt)
-
-            else:
-                raise
+    return await llm_gateway.generate(
+        "lead_intent",
+        prompt,
+        system=(
+            "You are a structured business ERP intent "
+            "classification engine. Return JSON only."
+        ),
+        json_mode=True,
+        max_tokens=max_tokens,
+        provider=_provider(),
+        models={
+            "gemini": _gemini_model(),
+            "groq": _groq_model(),
+        },
+        timeout=45,
+    )
 
-        except Exception:
 
-            logger.exception(
-                "Universal AI provider call failed"
-            )
+async def _classify_one(message: str) -> Dict[str, Any]:
 
-            if first_error is not None:
-                raise first_error
+    raw_text = await _complete(_build_prompt(message))
 
-            raise
+    lead_prefilter.note_llm_call("intent", 1)
 
     try:
 
-        parsed = _extract_json_text(
-            raw_text or ""
+        return _normalize_universal_result(
+            _extract_json_text(raw_text or "")
         )
 
-        result = _normalize_universal_result(
-            parsed
-        )
-
-        result.update(
-            {
-                "source": source,
-                "source_chat_id": source_chat_id,
-                "source_sender_id": source_sender_id,
-                "source_sender_name": source_sender_name,
-                "original_message": message,
-            }
-        )
-
-        logger.info(
-            "AI intent detected: %s confidence=%.2f source=%s",
-            result["intent"],
-            result["confidence"],
-            source,
-        )
-
-        return result
-
     except Exception as exc:
 
         logger.exception(
@@ -1081,6 +899,70 @@ async def detect_intent(
         )
 
 
+async def _classify_batch(messages: List[str]) -> List[Any]:
+    """
+    One provider call for several messages. If the batched answer cannot
+    be matched back to the messages, each message is retried on its own.
+    """
+
+    if len(messages) == 1:
+
+        try:
+            return [await _classify_one(messages[0])]
+        except Exception as exc:
+            return [exc]
+
+    raw_text = await _complete(
+        _build_batch_prompt(messages),
+        max_tokens=min(2048 * len(messages), 8192),
+    )
+
+    try:
+
+        items = _extract_json_text(raw_text or "").get("results")
+
+        if (
+            isinstance(items, list)
+            and len(items) == len(messages)
+            and all(isinstance(i, dict) for i in items)
+        ):
+            results = [_normalize_universal_result(i) for i in items]
+            lead_prefilter.note_llm_call("intent", len(messages))
+            return results
+
+        logger.warning(
+            "Universal AI batch returned %s results for %d messages; "
+            "retrying singly",
+            len(items) if isinstance(items, list) else "no",
+            len(messages),
+        )
+
+    except Exception as exc:
+
+        logger.warning(
+            "Unable to parse universal AI batch response, "
+            "retrying singly: %r",
+            exc,
+        )
+
+    # The batch call answered nothing; the single retries count themselves.
+    lead_prefilter.note_llm_call("intent", 0)
+
+    return await asyncio.gather(
+        *(_classify_one(m) for m in messages),
+        return_exceptions=True,
+    )
+
+
+# Messages arriving within the window share one provider call.
+_batcher = lead_prefilter.MicroBatcher(
+    "intent",
+    _classify_batch,
+    window=float(os.environ.get("LEAD_AI_BATCH_WINDOW", "0.3")),
+    max_size=int(os.environ.get("LEAD_AI_BATCH_SIZE", "6")),
+)
+
+
 # =============================================================================
 # ACTION DATA HELPER
 # =============================================================================
@@ -0,0 +1,481 @@
+"""
+lead_prefilter.py
+────────────────────────────────────────────────────────────────────────────────
+Cheap local screening in front of the lead / intent LLM calls.
+
+Every inbound WhatsApp group message and every free-text Telegram message
+used to reach Gemini/Groq, including greetings, "ok", stickers and media
+captions. Two stages now sit in front of the provider:
+
+Pre-filter (`screen`)
+    Regex/keyword features scored by a small logistic model. Obvious
+    non-requests are dropped by rule (greeting/ack only, emoji only, bare
+    link, media caption) or by score (probability below `discard_below`
+    with no service keyword, phone, e-mail or action word). A small audit
+    fraction of model discards is sent to the LLM anyway so the model keeps
+    seeing its own misses.
+
+    Two model kinds:
+      whatsapp_lead   label = the LLM said "is a lead"
+      intent          label = the LLM returned an intent other than "unknown"
+
+    LLM verdicts are stored in `lead_prefilter_samples` (`record_outcome`).
+    `train_lead_prefilter` (job runner, daily) refits each kind from those
+    samples and lowers `discard_below` until at most 1 % of known positives
+    would have been dropped. Until a kind has enough samples the built-in
+    weights below are used.
+
+    LEAD_PREFILTER_MODE=on (default) | shadow (score and count, never drop) | off
+
+Micro-batching (`MicroBatcher`)
+    Messages that pass are queued for a short window and sent to the
+    provider as one prompt; see whatsapp_lead_ai / lead_ai.
+
+`get_metrics()` reports messages seen, dropped (by rule / by model), LLM
+calls made and calls saved by batching. Counters are per worker process.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from backend.dependencies import db
+from backend.index_manifest import ensure_indexes, index
+
+logger = logging.getLogger("lead_prefilter")
+
+KINDS = ("whatsapp_lead", "intent")
+
+MIN_TRAINING_SAMPLES = 200
+MIN_CLASS_SAMPLES = 20
+TRAINING_WINDOW = 5000
+SAMPLE_RETENTION_DAYS = 180
+MAX_RECALL_LOSS = 0.01
+MODEL_REFRESH_SECONDS = 600
+
+
+def _mode() -> str:
+    value = (os.environ.get("LEAD_PREFILTER_MODE") or "on").strip().lower()
+    return value if value in ("on", "shadow", "off") else "on"
+
+
+def _audit_rate() -> float:
+    try:
+        return max(0.0, min(1.0, float(os.environ.get("LEAD_PREFILTER_AUDIT_RATE", "0.02"))))
+    except ValueError:
+        return 0.02
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# FEATURES
+# ─────────────────────────────────────────────────────────────────────────────
+
+_SERVICE_RE = re.compile(
+    r"\b(trade\s?marks?|tm\b|brand\s+registration|copyright|patent|gst(?:in)?|itr|income\s+tax|tds|"
+    r"roc|mca|llp|pvt\.?\s*ltd|private\s+limited|opc|company\s+(?:registration|formation|incorporation)|"
+    r"incorporat\w*|msme|udyam|fssai|iec|dsc|digital\s+signature|audit\w*|account(?:ing|s)|book\s?keeping|"
+    r"compliance|registration|return\s+filing|filing|annual\s+return|partnership\s+deed|payroll|pf\b|esic?|"
+    r"shop\s+act|trade\s+licen[cs]e|startup\s+india|12a|80g|society|trust)\b",
+    re.IGNORECASE,
+)
+_LEAD_RE = re.compile(
+    r"\b(lead|enquiry|inquiry|requirement|required|interested|wants?|needs?|looking\s+for|refer(?:red|ence|ral)?|"
+    r"prospect|new\s+client|chahiye|karwana|karana|karna\s+hai|krna\s+hai)\b",
+    re.IGNORECASE,
+)
+_ACTION_RE = re.compile(
+    r"\b(create|add|make|generate|prepare|raise|send|assign|remind|schedule|show|list|share|pending|"
+    r"task|invoice|bill|quotation|quote|estimate|client|follow[\s-]?up)\b",
+    re.IGNORECASE,
+)
+_WHEN_RE = re.compile(
+    r"\b(today|tomorrow|tonight|kal|aaj|by\s+\w+day|deadline|due|next\s+week|this\s+week|"
+    r"\d{1,2}(?:st|nd|rd|th)?\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w*)\b",
+    re.IGNORECASE,
+)
+_MONEY_RE = re.compile(r"(₹|\brs\.?\s*\d|\binr\b|\d+\s*(?:k|lakh|lac|thousand)\b|\bamount\b|\bfees?\b)", re.IGNORECASE)
+_PHONE_RE = re.compile(r"(?:\+?91[\s-]?)?\b[6-9]\d{4}[\s-]?\d{5}\b")
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b")
+_ID_RE = re.compile(r"\b(?:\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]|[A-Z]{5}\d{4}[A-Z])\b")
+_NAME_PAIR_RE = re.compile(r"\b[A-Z][a-z]+\s+[A-Z][a-z]+\b")
+_URL_RE = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+_MEDIA_RE = re.compile(
+    r"^(?:(?:img|vid|aud|ptt|doc|pxl|screenshot|wa)[-_]\S*|\S+\.(?:jpe?g|png|gif|webp|heic|mp4|mov|mp3|"
+    r"ogg|opus|m4a|pdf|docx?|xlsx?|zip))$|\b(?:image|video|audio|document|sticker|gif)\s+omitted\b|"
+    r"<(?:media|attached)[^>]*>|this\s+message\s+was\s+deleted",
+    re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"[a-z0-9']+", re.IGNORECASE)
+
+_GREETINGS = {
+    "hi", "hii", "hiii", "hello", "hey", "hlo", "helo", "namaste", "namaskar", "gm", "gn",
+    "good", "morning", "evening", "afternoon", "night", "day", "sir", "madam", "mam", "maam",
+    "ji", "all", "everyone", "team", "dear", "bhai", "bro", "happy", "diwali", "holi", "new",
+    "year", "birthday", "wishes", "wish", "you", "and", "your", "family", "a", "very", "to",
+}
+_ACKS = {
+    "ok", "okay", "okk", "k", "kk", "done", "noted", "thanks", "thank", "thx", "ty", "welcome",
+    "yes", "no", "yeah", "yup", "sure", "fine", "great", "nice", "good", "cool", "received",
+    "got", "it", "will", "do", "check", "checking", "haan", "ha", "nahi", "theek", "hai", "sir",
+    "ji", "mam", "madam", "tq", "np", "👍", "🙏", "right", "correct", "perfect", "the", "same",
+}
+
+FEATURES = (
+    "service", "lead_word", "action_word", "when", "money", "phone", "email", "tax_id",
+    "name_pair", "question", "words", "short", "greeting_only", "ack_only", "no_letters",
+    "url_only", "media",
+)
+
+# Features that by themselves keep a message away from a score-based drop.
+_STRONG = ("service", "lead_word", "phone", "email", "tax_id")
+_STRONG_BY_KIND = {"whatsapp_lead": _STRONG, "intent": _STRONG + ("action_word",)}
+
+_DEFAULT_WEIGHTS = {
+    "whatsapp_lead": {
+        "bias": -1.5, "service": 2.5, "lead_word": 2.0, "action_word": 0.3, "when": 0.2,
+        "money": 0.4, "phone": 1.2, "email": 0.8, "tax_id": 0.6, "name_pair": 0.6,
+        "question": -0.2, "words": 0.6, "short": -1.5, "greeting_only": -5.0, "ack_only": -5.0,
+        "no_letters": -5.0, "url_only": -3.0, "media": -4.0,
+    },
+    "intent": {
+        "bias": -1.2, "service": 1.5, "lead_word": 1.5, "action_word": 2.5, "when": 1.0,
+        "money": 1.0, "phone": 0.8, "email": 0.6, "tax_id": 0.6, "name_pair": 0.4,
+        "question": 0.2, "words": 0.5, "short": -1.0, "greeting_only": -5.0, "ack_only": -5.0,
+        "no_letters": -5.0, "url_only": -3.0, "media": -4.0,
+    },
+}
+DEFAULT_DISCARD_BELOW = 0.08
+
+# Hard rules — dropped without scoring unless a strong signal is present
+_RULES = ("no_letters", "media", "url_only", "greeting_only", "ack_only")
+
+
+def features(text: str) -> Dict[str, float]:
+    text = (text or "").strip()
+    words = [w.lower() for w in _WORD_RE.findall(text)]
+    stripped_url = _URL_RE.sub(" ", text).strip()
+    return {
+        "service": min(len(_SERVICE_RE.findall(text)), 3) / 3.0,
+        "lead_word": 1.0 if _LEAD_RE.search(text) else 0.0,
+        "action_word": 1.0 if _ACTION_RE.search(text) else 0.0,
+        "when": 1.0 if _WHEN_RE.search(text) else 0.0,
+        "money": 1.0 if _MONEY_RE.search(text) else 0.0,
+        "phone": 1.0 if _PHONE_RE.search(text) else 0.0,
+        "email": 1.0 if _EMAIL_RE.search(text) else 0.0,
+        "tax_id": 1.0 if _ID_RE.search(text) else 0.0,
+        "name_pair": 1.0 if _NAME_PAIR_RE.search(text) else 0.0,
+        "question": 1.0 if text.endswith("?") else 0.0,
+        "words": min(math.log1p(len(words)) / math.log1p(40), 1.0),
+        "short": 1.0 if len(words) <= 3 else 0.0,
+        "greeting_only": 1.0 if words and all(w in _GREETINGS for w in words) else 0.0,
+        "ack_only": 1.0 if words and all(w in _ACKS for w in words) else 0.0,
+        "no_letters": 0.0 if re.search(r"[^\W\d_]", text) else 1.0,
+        "url_only": 1.0 if _URL_RE.search(text) and not _WORD_RE.search(stripped_url) else 0.0,
+        "media": 1.0 if _MEDIA_RE.search(text) and len(words) <= 6 else 0.0,
+    }
+
+
+def _probability(weights: Dict[str, float], feats: Dict[str, float]) -> float:
+    z = weights.get("bias", 0.0) + sum(weights.get(k, 0.0) * v for k, v in feats.items())
+    z = max(-30.0, min(30.0, z))
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MODELS
+# ─────────────────────────────────────────────────────────────────────────────
+
+_models: Dict[str, Dict[str, Any]] = {}
+_models_loaded_at: float = float("-inf")
+_refreshing: Optional[asyncio.Task] = None
+
+
+def _model(kind: str) -> Dict[str, Any]:
+    return _models.get(kind) or {
+        "weights": _DEFAULT_WEIGHTS[kind], "discard_below": DEFAULT_DISCARD_BELOW, "source": "default",
+    }
+
+
+async def _refresh_models():
+    global _models_loaded_at
+    try:
+        rows = await db.lead_prefilter_models.find({"_id": {"$in": list(KINDS)}}).to_list(len(KINDS))
+        _models.clear()
+        for row in rows:
+            _models[row["_id"]] = {
+                "weights": row["weights"],
+                "discard_below": row.get("discard_below", DEFAULT_DISCARD_BELOW),
+                "source": "trained",
+                "trained_at": row.get("trained_at"),
+            }
+    except Exception as e:
+        logger.warning(f"[LeadPrefilter] Could not load trained models, using defaults: {e}")
+    _models_loaded_at = time.monotonic()
+
+
+def _ensure_models_fresh():
+    global _refreshing
+    if time.monotonic() - _models_loaded_at < MODEL_REFRESH_SECONDS:
+        return
+    if _refreshing is None or _refreshing.done():
+        _refreshing = asyncio.create_task(_refresh_models())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SCREENING
+# ─────────────────────────────────────────────────────────────────────────────
+
+_metrics: Dict[str, Dict[str, Any]] = {
+    kind: {"seen": 0, "dropped_rule": 0, "dropped_model": 0, "audited": 0, "passed": 0,
+           "shadow_would_drop": 0, "llm_calls": 0, "llm_messages": 0, "screen_us_total": 0.0}
+    for kind in KINDS
+}
+
+
+def classify(kind: str, text: str) -> Tuple[bool, float, str]:
+    """
+    (keep, probability, reason) for one message — pure CPU, no I/O.
+    reason is "pass", "rule:<name>" or "model". A message with a strong
+    signal (service, lead word, phone, e-mail, GSTIN/PAN; action word for
+    intent) is never dropped.
+    """
+    feats = features(text)
+    strong = any(feats[k] for k in _STRONG_BY_KIND[kind])
+    if not strong:
+        for rule in _RULES:
+            if feats[rule]:
+                return False, 0.0, f"rule:{rule}"
+    model = _model(kind)
+    p = _probability(model["weights"], feats)
+    if p < model["discard_below"] and not strong:
+        return False, p, "model"
+    return True, p, "pass"
+
+
+def screen(kind: str, text: str) -> Tuple[bool, float, str]:
+    """
+    Decide whether `text` should go to the LLM, honouring
+    LEAD_PREFILTER_MODE and the audit rate, and update the counters.
+    """
+    mode = _mode()
+    if mode == "off":
+        return True, 1.0, "off"
+    _ensure_models_fresh()
+    m = _metrics[kind]
+    started = time.perf_counter()
+    keep, p, reason = classify(kind, text)
+    m["screen_us_total"] += (time.perf_counter() - started) * 1e6
+    m["seen"] += 1
+    if keep:
+        m["passed"] += 1
+        return True, p, reason
+    if mode == "shadow":
+        m["shadow_would_drop"] += 1
+        return True, p, f"shadow:{reason}"
+    if reason == "model" and random.random() < _audit_rate():
+        m["audited"] += 1
+        return True, p, "audit"
+    m["dropped_rule" if reason.startswith("rule:") else "dropped_model"] += 1
+    return False, p, reason
+
+
+def note_llm_call(kind: str, messages: int):
+    """Count one provider call that answered `messages` messages (0: a wasted call)."""
+    m = _metrics[kind]
+    m["llm_calls"] += 1
+    m["llm_messages"] += messages
+
+
+async def record_outcome(kind: str, text: str, label: bool, source: Optional[str] = None):
+    """Store an LLM verdict as a training sample. Never raises."""
+    if not text or not text.strip():
+        return
+    try:
+        await db.lead_prefilter_samples.insert_one({
+            "kind": kind,
+            "text": text.strip()[:2000],
+            "label": bool(label),
+            "source": source,
+            "created_at": datetime.now(timezone.utc),
+        })
+    except Exception as e:
+        logger.warning(f"[LeadPrefilter] Could not record {kind} sample: {e}")
+
+
+def get_metrics() -> Dict[str, Any]:
+    out = {"mode": _mode(), "kinds": {}}
+    for kind in KINDS:
+        m = _metrics[kind]
+        dropped = m["dropped_rule"] + m["dropped_model"]
+        out["kinds"][kind] = {
+            "model": _model(kind).get("source"),
+            "discard_below": round(_model(kind)["discard_below"], 4),
+            "seen": m["seen"],
+            "passed": m["passed"],
+            "dropped_rule": m["dropped_rule"],
+            "dropped_model": m["dropped_model"],
+            "audited": m["audited"],
+            "shadow_would_drop": m["shadow_would_drop"],
+            "llm_calls": m["llm_calls"],
+            "llm_messages": m["llm_messages"],
+            "llm_calls_avoided": dropped + max(0, m["llm_messages"] - m["llm_calls"]),
+            "avg_screen_us": round(m["screen_us_total"] / m["seen"], 1) if m["seen"] else None,
+        }
+    return out
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# TRAINING
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _fit(rows: Sequence[Tuple[Dict[str, float], bool]], epochs: int = 300, lr: float = 0.5,
+         l2: float = 1e-3) -> Dict[str, float]:
+    """Class-balanced L2 logistic regression by batch gradient descent."""
+    import numpy as np
+
+    X = np.array([[f[k] for k in FEATURES] for f, _ in rows], dtype=float)
+    y = np.array([1.0 if label else 0.0 for _, label in rows])
+    pos = y.sum()
+    neg = len(y) - pos
+    sample_w = np.where(y == 1.0, len(y) / (2 * pos), len(y) / (2 * neg))
+    w = np.zeros(X.shape[1])
+    b = 0.0
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-np.clip(X @ w + b, -30, 30)))
+        err = (p - y) * sample_w
+        w -= lr * (X.T @ err / len(y) + l2 * w)
+        b -= lr * err.mean()
+    weights = {k: float(v) for k, v in zip(FEATURES, w)}
+    weights["bias"] = float(b)
+    return weights
+
+
+def _discard_threshold(weights: Dict[str, float], positives: List[Dict[str, float]]) -> float:
+    """Highest threshold (capped at the default) that drops at most MAX_RECALL_LOSS of positives."""
+    scores = sorted(_probability(weights, f) for f in positives)
+    idx = int(len(scores) * MAX_RECALL_LOSS)
+    return min(DEFAULT_DISCARD_BELOW, scores[idx]) if scores else DEFAULT_DISCARD_BELOW
+
+
+async def train(kind: str) -> Optional[Dict[str, Any]]:
+    """Refit one kind from recent samples. Returns the stored model or None if too few samples."""
+    samples = await db.lead_prefilter_samples.find(
+        {"kind": kind}, {"_id": 0, "text": 1, "label": 1}
+    ).sort("created_at", -1).limit(TRAINING_WINDOW).to_list(TRAINING_WINDOW)
+    positives = sum(1 for s in samples if s.get("label"))
+    negatives = len(samples) - positives
+    if len(samples) < MIN_TRAINING_SAMPLES or min(positives, negatives) < MIN_CLASS_SAMPLES:
+        logger.info(f"[LeadPrefilter] {kind}: {len(samples)} samples ({positives} positive) — keeping current model")
+        return None
+
+    rows = [(features(s["text"]), bool(s.get("label"))) for s in samples]
+    loop = asyncio.get_running_loop()
+    weights = await loop.run_in_executor(None, _fit, rows)
+    discard_below = _discard_threshold(weights, [f for f, label in rows if label])
+    doc = {
+        "weights": weights,
+        "discard_below": discard_below,
+        "samples": len(samples),
+        "positives": positives,
+        "trained_at": datetime.now(timezone.utc),
+    }
+    await db.lead_prefilter_models.update_one({"_id": kind}, {"$set": doc}, upsert=True)
+    logger.info(f"[LeadPrefilter] {kind}: trained on {len(samples)} samples, discard_below={discard_below:.4f}")
+    return doc
+
+
+async def train_lead_prefilter():
+    """Job: refit every kind, then reload the in-process models."""
+    for kind in KINDS:
+        try:
+            await train(kind)
+        except Exception as e:
+            logger.error(f"[LeadPrefilter] Training {kind} failed: {e}")
+    await _refresh_models()
+
+
+INDEXES = [
+    index("lead_prefilter_samples", [("kind", 1), ("created_at", -1)]),
+    index("lead_prefilter_samples", "created_at", expireAfterSeconds=SAMPLE_RETENTION_DAYS * 86400),
+]
+
+
+async def create_lead_prefilter_indexes():
+    """Create MongoDB indexes for pre-filter training samples."""
+    await ensure_indexes(INDEXES)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MICRO-BATCHING
+# ─────────────────────────────────────────────────────────────────────────────
+
+class MicroBatcher:
+    """
+    Collects items submitted within `window` seconds (up to `max_size`) and
+    resolves them with one `run_batch(items)` call, which must return one
+    result per item in order (an Exception instance fails just that item).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        window: float = 0.3,
+        max_size: int = 8,
+    ):
+        self.name = name
+        self.run_batch = run_batch
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks.
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._cancel_timer()
+            self._spawn_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._spawn_flush)
+        return await future
+
+    def _spawn_flush(self):
+        task = asyncio.get_running_loop().create_task(self._flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def _flush(self):
+        self._cancel_timer()
+        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._spawn_flush)
+        if not batch:
+            return
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"{self.name}: batch returned {len(results)} results for {len(batch)} items")
+        except Exception as exc:
+            results = [exc] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Response
 from typing import List, Optional, Literal
 from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator
 from datetime import datetime, timezone
@@ -18,9 +18,11 @@ from backend.dependencies import (
     _get_perm,
     assert_module_permission,
     check_module_permission,
+    require_admin,
 )
 
 from backend.notifications import create_notification
+from backend import change_hooks, lead_prefilter, list_sync
 
 router = APIRouter(prefix="/leads", tags=["Leads Management"])
 
@@ -260,6 +262,12 @@ async def get_unique_services(current_user=Depends(check_module_permission("lead
     return sorted([s for s in combined if s])
 
 
+@router.get("/meta/ai-prefilter")
+async def get_lead_ai_prefilter_metrics(current_user=Depends(require_admin())):
+    """Lead/intent pre-filter and micro-batching counters for this worker: messages dropped and LLM calls avoided."""
+    return lead_prefilter.get_metrics()
+
+
 @router.get("/followups")
 async def get_due_followups(current_user=Depends(check_module_permission("leads", "view"))):
     """Returns leads with follow-up dates that are due."""
@@ -323,22 +331,60 @@ async def create_lead(
 @router.get("", response_model=List[Lead])
 @router.get("/", response_model=List[Lead], include_in_schema=False)
 async def get_leads(
+    response: Response,
     status_filter: Optional[Literal[
         "new", "contacted", "meeting", "proposal",
         "negotiation", "on_hold", "qualified", "won", "lost"
     ]] = Query(None, alias="status"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous X-Next-Cursor header"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Keyset page size; enables cursor paging"),
     current_user=Depends(check_module_permission("leads", "view")),
 ):
-    """List leads with permission matrix applied."""
+    """
+    List leads with permission matrix applied.
+
+    Without `limit`/`cursor` this returns the 1000 most recently updated
+    leads, as before. With them, pages continue past that cap in the same
+    order; the next cursor is in the X-Next-Cursor header.
+    """
     query = _build_lead_query(current_user)
     if status_filter:
         query["status"] = status_filter
 
-    cursor = db.leads.find(query).sort("updated_at", -1)
-    leads_raw = await cursor.to_list(length=1000)
+    if limit is not None or cursor:
+        leads_raw, next_cursor = await list_sync.keyset_page(
+            db.leads, query, [("updated_at", -1), ("_id", -1)], cursor, limit or 100,
+            strip_id=False,
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return [normalize_lead_doc(lead) for lead in leads_raw]
+
+    leads_raw = await db.leads.find(query).sort("updated_at", -1).to_list(length=1000)
     return [normalize_lead_doc(lead) for lead in leads_raw]
 
 
+@router.get("/sync")
+async def sync_leads(
+    changed_since: Optional[str] = Query(None, description="ISO timestamp; the next_since of the previous sync"),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(200, ge=1, le=1000),
+    current_user=Depends(check_module_permission("leads", "view")),
+):
+    """Delta sync for the lead list — same contract as GET /api/tasks/sync."""
+    result = await list_sync.delta_page(
+        db.leads, "leads", _build_lead_query(current_user), changed_since, cursor, limit,
+        strip_id=False,
+    )
+    changed = []
+    for lead in result["changed"]:
+        lead = normalize_lead_doc(lead)
+        lead.pop("_id", None)
+        changed.append(lead)
+    result["changed"] = changed
+    return result
+
+
 @router.get("/{lead_id}/quotations")
 async def get_lead_quotations(lead_id: str, current_user=Depends(check_module_permission("leads", "view"))):
     """
@@ -453,6 +499,7 @@ async def update_lead(
     update_dict["updated_at"] = datetime.now(timezone.utc)
 
     await db.leads.update_one({"_id": obj_id}, {"$set": update_dict})
+    await list_sync.record_change("leads", existing, update_dict)
 
     await create_audit_log(
         current_user=current_user,
@@ -504,7 +551,7 @@ async def convert_lead_to_client(
     client_id = str(uuid.uuid4())
     client_data = {
         "id": client_id,
-        "company_name": lead["company_name"],
+        "company_name": (lead["company_name"] or "").strip(),
         "contact_name": lead.get("contact_name"),
         "email": lead.get("email"),
         "phone": lead.get("phone") or "0000000000",
@@ -518,6 +565,7 @@ async def convert_lead_to_client(
     }
 
     await db.clients.insert_one(client_data)
+    await change_hooks.record_change("clients", None, client_data)
 
     await db.leads.update_one(
         {"_id": obj_id},
@@ -571,6 +619,7 @@ async def convert_lead_to_client(
         task["due_date"] = tr.due_date
 
     await db.tasks.insert_one(task)
+    await change_hooks.record_change("tasks", None, task)
 
     # Notify the task assignee (if different from current user)
     if task_assigned_to != current_user.id:
@@ -623,11 +672,14 @@ async def delete_lead(lead_id: str, current_user=Depends(check_module_permission
 
     obj_id = validate_obj_id(lead_id)
 
-    existing = await db.leads.find_one({"_id": obj_id}, {"_id": 0, "company_name": 1})
+    existing = await db.leads.find_one(
+        {"_id": obj_id}, {"_id": 0, "company_name": 1, **{f: 1 for f in list_sync.SCOPE_FIELDS["leads"]}}
+    )
 
     result = await db.leads.delete_one({"_id": obj_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Lead not found")
+    await list_sync.record_tombstone("leads", [{**(existing or {}), "_id": lead_id}])
 
     await create_audit_log(
         current_user=current_user,
@@ -6,53 +6,43 @@ from backend.learning.learning_storage import LearningStorage
 
 logger = logging.getLogger("learning_scheduler")
 
+QUEUE_JOB_ID = "learning_queue"
+STATS_JOB_ID = "learning_statistics"
+
+
 class LearningScheduler:
-    _running = False
-    _loop_task = None
 
     @classmethod
     def start(cls):
         """
-        Starts the background processing loop if not already running.
+        Registers queue processing (every 10 s) and statistics refresh
+        (every 10 min) on the shared job runner.
         """
-        if cls._running:
+        from backend.job_runner import job_runner, every
+
+        if job_runner.get_job(QUEUE_JOB_ID):
             return
-        cls._running = True
-        cls._loop_task = asyncio.create_task(cls._scheduler_loop())
-        logger.info("Self-Learning AI Scheduler loop started.")
+        job_runner.add_job(QUEUE_JOB_ID, cls.process_queue, every(seconds=10), timeout=300)
+        job_runner.add_job(STATS_JOB_ID, cls.refresh_learning_statistics, every(minutes=10), timeout=120)
+        logger.info("Self-Learning AI Scheduler jobs registered.")
 
     @classmethod
     def stop(cls):
-        cls._running = False
-        if cls._loop_task:
-            cls._loop_task.cancel()
-        logger.info("Self-Learning AI Scheduler loop stopped.")
+        from backend.job_runner import job_runner
+
+        job_runner.remove_job(QUEUE_JOB_ID)
+        job_runner.remove_job(STATS_JOB_ID)
+        logger.info("Self-Learning AI Scheduler jobs removed.")
 
     @classmethod
-    async def _scheduler_loop(cls):
+    async def process_queue(cls):
         """
-        Main scheduler loop that periodically processes the queue and compiles statistics.
+        Drains pending learning tasks until the queue is empty.
         """
-        iteration_count = 0
-        while cls._running:
-            try:
-                # Process pending tasks
-                processed_any = True
-                while processed_any:
-                    processed_any = await BackgroundLearningJobs.process_queue_once()
-                    await asyncio.sleep(0.1)
-
-                # Periodic operations: every 60 iterations (approx. 10 minutes)
-                if iteration_count % 60 == 0:
-                    await cls.refresh_learning_statistics()
-
-                iteration_count += 1
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in LearningScheduler loop: {e}", exc_info=True)
-
-            await asyncio.sleep(10)
+        processed_any = True
+        while processed_any:
+            processed_any = await BackgroundLearningJobs.process_queue_once()
+            await asyncio.sleep(0.1)
 
     @classmethod
     async def refresh_learning_statistics(cls):
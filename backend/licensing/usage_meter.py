@@ -0,0 +1,297 @@
+"""
+Write-behind usage metering
+===========================
+
+Metered counters (`customer_usage`: api_calls, storage_bytes,
+copilot_tokens, email_attachments_scanned, ...) and per-call log rows
+(`api_usage`) used to cost one or two round trips on every request. They
+are now buffered in process:
+
+  increment(tenant, metric, n)   adds to an in-memory delta; no I/O
+  log(collection, row)           queues a row for insert
+  await flush()                  one bulk_write of `$inc` upserts for all
+                                 pending deltas, one insert_many per log
+                                 collection
+
+A background loop flushes every USAGE_FLUSH_INTERVAL_SEC (default 5), and
+early once MAX_BUFFERED_LOGS rows are queued. `stop()` cancels the loop and
+flushes whatever is left; server shutdown awaits it.
+
+Reads (`await value()`, `peek()`) return the stored total plus this
+worker's unflushed delta. The stored total is loaded once per counter and
+refreshed in the background after USAGE_REFRESH_SEC (default 30), so quota
+checks never wait on Mongo after the first read of a counter. A flush adds
+its deltas to the stored totals it sent them for, unless a read of that
+counter overlapped the write: that read may or may not include the deltas,
+so the flush reads the counter again instead.
+
+Bounds
+------
+* An increment is acknowledged once buffered. A hard crash (SIGKILL, OOM)
+  loses at most what was buffered since the last successful flush, i.e.
+  about one flush interval of traffic. A graceful shutdown loses nothing.
+* A flush that fails puts its deltas back, so they go out with the next
+  flush. Only ops the server reported as failed are re-queued after a
+  partial BulkWriteError. On a transport error the outcome is unknown and
+  the whole batch is retried, so that batch may be counted twice: metering
+  is at-least-once across failed flushes, exactly-once otherwise.
+* Log rows from a failed flush are re-queued up to MAX_BUFFERED_LOGS per
+  collection. Beyond that the oldest rows are dropped and counted in
+  `stats()["dropped_logs"]`. Counters are never dropped.
+* Another worker's unflushed increments are invisible here, so a quota read
+  can trail the cluster total by up to one flush interval plus
+  USAGE_REFRESH_SEC.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from backend.dependencies import db
+from backend.index_manifest import index
+
+logger = logging.getLogger("usage_meter")
+
+FLUSH_INTERVAL_SEC = float(os.environ.get("USAGE_FLUSH_INTERVAL_SEC", "5"))
+REFRESH_SEC = float(os.environ.get("USAGE_REFRESH_SEC", "30"))
+MAX_BUFFERED_LOGS = int(os.environ.get("USAGE_MAX_BUFFERED_LOGS", "10000"))
+
+INDEXES = [
+    # One counter document per (tenant, metric): concurrent upserts from
+    # several workers collide on this instead of creating duplicates.
+    index("customer_usage", [("tenant_id", 1), ("metric", 1)], unique=True),
+    index("api_usage", [("tenant_id", 1), ("created_at", -1)]),
+]
+
+_Key = Tuple[str, str]
+
+_pending: Dict[_Key, float] = {}
+_pending_logs: Dict[str, List[Dict[str, Any]]] = {}
+_stored: Dict[_Key, Tuple[float, float, int, int]] = {}  # key -> (stored value, loaded at, read started, read done)
+_refreshing: set = set()
+_loading: Dict[_Key, int] = {}  # key -> reads in flight
+_ticks = itertools.count()  # orders reads against flushes
+_stats = {"flushes": 0, "flush_errors": 0, "ops_written": 0, "logs_written": 0, "dropped_logs": 0}
+
+_flush_lock = asyncio.Lock()
+_flush_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ─── Buffering ───────────────────────────────────────────────────────────────
+
+def increment(tenant_id: str, metric: str, value: float = 1) -> Optional[float]:
+    """Buffer `value` onto (tenant, metric). Returns the local total if known."""
+    key = (tenant_id, metric)
+    _pending[key] = _pending.get(key, 0) + value
+    return peek(tenant_id, metric)
+
+
+def log(collection: str, row: Dict[str, Any]):
+    """Queue `row` for a batched insert into `collection`."""
+    rows = _pending_logs.setdefault(collection, [])
+    rows.append(row)
+    if len(rows) > MAX_BUFFERED_LOGS:
+        del rows[0]
+        _stats["dropped_logs"] += 1
+    if len(rows) >= MAX_BUFFERED_LOGS and _wakeup is not None:
+        _wakeup.set()
+
+
+def peek(tenant_id: str, metric: str) -> Optional[float]:
+    """Stored total + unflushed delta, or None if the counter was never loaded."""
+    key = (tenant_id, metric)
+    stored = _stored.get(key)
+    if stored is None:
+        return None
+    if time.monotonic() - stored[1] > REFRESH_SEC and key not in _refreshing:
+        _refreshing.add(key)
+        asyncio.ensure_future(_refresh(key))
+    return stored[0] + _pending.get(key, 0)
+
+
+async def _load(key: _Key) -> float:
+    started = next(_ticks)
+    _loading[key] = _loading.get(key, 0) + 1
+    try:
+        doc = await db.customer_usage.find_one({"tenant_id": key[0], "metric": key[1]}, {"_id": 0, "value": 1})
+    finally:
+        _loading[key] -= 1
+        if not _loading[key]:
+            del _loading[key]
+    value = (doc or {}).get("value", 0) or 0
+    stored = _stored.get(key)
+    if stored is None or stored[2] < started:  # an older read never overwrites a newer one
+        _stored[key] = (value, time.monotonic(), started, next(_ticks))
+    return value
+
+
+async def _refresh(key: _Key):
+    try:
+        await _load(key)
+    except Exception as e:
+        logger.warning(f"[UsageMeter] refresh of {key} failed: {e}")
+    finally:
+        _refreshing.discard(key)
+
+
+async def value(tenant_id: str, metric: str) -> float:
+    """Current total for quota checks; reads Mongo only the first time."""
+    current = peek(tenant_id, metric)
+    if current is None:
+        await _load((tenant_id, metric))
+        current = peek(tenant_id, metric)
+    return current
+
+
+def pending_for(tenant_id: str) -> Dict[str, float]:
+    """This worker's unflushed deltas for one tenant, by metric."""
+    return {metric: v for (tenant, metric), v in _pending.items() if tenant == tenant_id}
+
+
+def stats() -> Dict[str, Any]:
+    return {**_stats, "pending_counters": len(_pending),
+            "pending_logs": sum(len(rows) for rows in _pending_logs.values())}
+
+
+# ─── Flushing ────────────────────────────────────────────────────────────────
+
+def _requeue_counters(items: List[Tuple[_Key, float]]):
+    for key, delta in items:
+        _pending[key] = _pending.get(key, 0) + delta
+
+
+def _requeue_logs(collection: str, rows: List[Dict[str, Any]]):
+    queue = _pending_logs.setdefault(collection, [])
+    queue[:0] = rows
+    overflow = len(queue) - MAX_BUFFERED_LOGS
+    if overflow > 0:
+        del queue[:overflow]
+        _stats["dropped_logs"] += overflow
+
+
+async def _flush_counters(batch: Dict[_Key, float], now: str):
+    items = [(key, delta) for key, delta in batch.items() if delta]
+    if not items:
+        return
+    sent = next(_ticks)
+    ops = [
+        UpdateOne(
+            {"tenant_id": tenant_id, "metric": metric},
+            {"$inc": {"value": delta}, "$set": {"updated_at": now}},
+            upsert=True,
+        )
+        for (tenant_id, metric), delta in items
+    ]
+    try:
+        await db.customer_usage.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"] for err in e.details.get("writeErrors", [])}
+        _requeue_counters([items[i] for i in sorted(failed)])
+        _stats["flush_errors"] += 1
+        _stats["ops_written"] += len(items) - len(failed)
+        logger.error(f"[UsageMeter] {len(failed)} of {len(items)} counter updates failed; re-queued")
+        return
+    except Exception as e:
+        _requeue_counters(items)
+        _stats["flush_errors"] += 1
+        logger.error(f"[UsageMeter] counter flush failed, {len(items)} updates re-queued: {e}")
+        return
+    _stats["ops_written"] += len(items)
+    reload = []
+    for key, delta in items:
+        stored = _stored.get(key)
+        if stored is None:
+            continue
+        if stored[3] < sent and key not in _loading:
+            _stored[key] = (stored[0] + delta, *stored[1:])
+        else:  # a read overlapped the write
+            reload.append(key)
+    for key, result in zip(reload, await asyncio.gather(*map(_load, reload), return_exceptions=True)):
+        if isinstance(result, Exception):
+            _stored.pop(key, None)  # reloaded by the next value()
+            logger.warning(f"[UsageMeter] reload of {key} after flush failed: {result}")
+
+
+async def _flush_logs(collection: str, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    try:
+        await db[collection].insert_many(rows, ordered=False)
+    except BulkWriteError as e:
+        # Duplicate keys are rows that already made it in on an earlier try.
+        failed = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != 11000}
+        _requeue_logs(collection, [rows[i] for i in sorted(failed)])
+        _stats["flush_errors"] += 1
+        _stats["logs_written"] += len(rows) - len(failed)
+        logger.error(f"[UsageMeter] {len(failed)} of {len(rows)} {collection} rows failed; re-queued")
+        return
+    except Exception as e:
+        _requeue_logs(collection, rows)
+        _stats["flush_errors"] += 1
+        logger.error(f"[UsageMeter] {collection} flush failed, {len(rows)} rows re-queued: {e}")
+        return
+    _stats["logs_written"] += len(rows)
+
+
+async def flush() -> int:
+    """Write everything buffered. Returns the number of counter updates + rows sent."""
+    async with _flush_lock:
+        if not _pending and not any(_pending_logs.values()):
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+        logs = {c: rows for c, rows in _pending_logs.items() if rows}
+        _pending_logs.clear()
+
+        now = _now_iso()
+        await asyncio.gather(
+            _flush_counters(batch, now),
+            *(_flush_logs(c, rows) for c, rows in logs.items()),
+        )
+        _stats["flushes"] += 1
+        return len(batch) + sum(len(rows) for rows in logs.values())
+
+
+async def _flush_loop():
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=FLUSH_INTERVAL_SEC)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            await flush()
+        except Exception as e:
+            logger.error(f"[UsageMeter] flush loop error: {e}")
+
+
+def start_flush_loop():
+    global _flush_task, _wakeup
+    if _flush_task is None or _flush_task.done():
+        _wakeup = asyncio.Event()
+        _flush_task = asyncio.get_event_loop().create_task(_flush_loop())
+        logger.info("[UsageMeter] write-behind loop started")
+
+
+async def stop():
+    """Stop the loop and flush what is left (call on shutdown)."""
+    global _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _flush_task = None
+    await flush()
@@ -0,0 +1,323 @@
+"""
+list_sync.py
+────────────────────────────────────────────────────────────────────────────────
+Keyset pagination and delta sync shared by the tasks, clients and leads lists.
+
+Keyset pagination
+    Pages are fetched with a range condition on the sort key(s) plus `_id` as
+    tie-breaker, instead of count_documents + skip. The position is carried
+    in an opaque `cursor` string, so deep pages cost the same as the first.
+    Each sort field is expected to hold a single BSON type (Mongo only
+    compares within a type).
+
+Delta sync (`changed_since`)
+    Returns the caller's records whose updated_at / created_at is at or after
+    the watermark, plus ids to evict, from `sync_tombstones` (kept
+    TOMBSTONE_RETENTION_DAYS). A tombstone copies the record's SCOPE_FIELDS,
+    so the caller's own access query selects the ones it could see:
+      * a delete leaves one tombstone with the record as it was;
+      * an update that changes SCOPE_FIELDS (a reassignment, say) leaves one
+        for the old audience and an `entered` one for the new audience.
+    The caller evicts a record when its latest tombstone it can see is not an
+    `entered` one, i.e. it saw the record before and cannot see it now.
+    Both come from the change_hooks write sites (`record_change`); bulk
+    writes (`mark_dirty`) name no records and leave no tombstones, so a
+    record moved out of scope by one stays in the old audience's cache until
+    it resyncs. The response carries `next_since` for the following call. A
+    watermark older than the tombstone retention gets `reset: true` — the
+    client must drop its cache and resync in full.
+
+    Timestamps in these collections are stored both as BSON dates and as ISO
+    strings with a non-negative UTC offset (IST or UTC). The Mongo filter
+    compares the string form against the naive UTC watermark, which returns a
+    superset; `changed_after` then applies the exact check in Python.
+"""
+
+import base64
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import json_util
+from fastapi import HTTPException
+
+from backend.dependencies import db
+from backend.index_manifest import ensure_indexes, index
+
+logger = logging.getLogger("list_sync")
+
+TOMBSTONE_RETENTION_DAYS = 30
+# next_since is moved back by this much so writes that were in flight while
+# the page was read are picked up by the next call (clients upsert by id).
+WATERMARK_SKEW = timedelta(seconds=5)
+CHANGE_FIELDS = ("updated_at", "created_at")
+# Fields the access queries of the synced lists read; tombstones keep them.
+SCOPE_FIELDS = {
+    "tasks": ("type", "assigned_to", "sub_assignees", "created_by"),
+    "clients": ("id", "assigned_to", "created_by", "assignments", "approval_status"),
+    "leads": ("assigned_to", "created_by"),
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CURSORS
+# ─────────────────────────────────────────────────────────────────────────────
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json_util.dumps(state, json_options=json_util.RELAXED_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_clause(sort: Sequence[Tuple[str, int]], values: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Condition selecting documents strictly after `values` in `sort` order.
+    For sort [(a, 1), (_id, 1)] and values [va, vid]:
+        {$or: [{a: {$gt: va}}, {a: va, _id: {$gt: vid}}]}
+    Missing / null values sort first ascending and last descending, as in Mongo.
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        value = values[i]
+        branch = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        if value is None:
+            if direction == 1:
+                # Everything non-null sorts after null
+                branch[field] = {"$ne": None}
+            else:
+                continue
+        else:
+            branch[field] = {"$gt" if direction == 1 else "$lt": value}
+            if direction == -1:
+                # Missing values sort last descending and never match $lt
+                branches.append({**branch, field: None})
+        branches.append(branch)
+    return {"$or": branches}
+
+
+def cursor_values(doc: Dict[str, Any], sort: Sequence[Tuple[str, int]]) -> List[Any]:
+    return [doc.get(field) for field, _ in sort]
+
+
+def and_query(*clauses: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    parts = [c for c in clauses if c]
+    if not parts:
+        return {}
+    if len(parts) == 1:
+        return parts[0]
+    return {"$and": parts}
+
+
+async def keyset_page(
+    collection,
+    query: Dict[str, Any],
+    sort: Sequence[Tuple[str, int]],
+    cursor: Optional[str],
+    limit: int,
+    projection: Optional[Dict[str, Any]] = None,
+    strip_id: bool = True,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of `query` in `sort` order (which must end with _id).
+    Returns (docs, next_cursor); `_id` is removed unless strip_id is False.
+    """
+    state = decode_cursor(cursor)
+    if state is not None:
+        query = and_query(query, keyset_clause(sort, state["k"]))
+    proj = dict(projection or {})
+    proj.pop("_id", None)
+    docs = await collection.find(query, proj or None).sort(list(sort)).limit(limit + 1).to_list(limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor({"k": cursor_values(docs[-1], sort)}) if has_more and docs else None
+    if strip_id:
+        for d in docs:
+            d.pop("_id", None)
+    return docs, next_cursor
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# DELTA SYNC
+# ─────────────────────────────────────────────────────────────────────────────
+
+def parse_since(value: str) -> datetime:
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="changed_since must be an ISO-8601 timestamp")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def changed_since_clause(since: datetime, fields: Iterable[str] = CHANGE_FIELDS) -> Dict[str, Any]:
+    since_str = since.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+    branches = []
+    for field in fields:
+        branches.append({field: {"$gte": since}})
+        branches.append({field: {"$gte": since_str}})
+    return {"$or": branches}
+
+
+def changed_after(doc: Dict[str, Any], since: datetime, fields: Iterable[str] = CHANGE_FIELDS) -> bool:
+    for field in fields:
+        ts = _as_utc(doc.get(field))
+        if ts is not None and ts >= since:
+            return True
+    return False
+
+
+def _record_id(doc: Dict[str, Any]) -> str:
+    return str(doc.get("id") or doc.get("_id") or "")
+
+
+def _scope(collection: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {f: doc[f] for f in SCOPE_FIELDS.get(collection, ()) if f in doc}
+
+
+def _tombstone(collection: str, doc: Dict[str, Any], at: datetime, entered: bool = False) -> Dict[str, Any]:
+    return {**_scope(collection, doc), "collection": collection, "record_id": _record_id(doc),
+            "deleted_at": at, "entered": entered}
+
+
+async def _insert_tombstones(collection: str, docs: List[Dict[str, Any]]):
+    if not docs:
+        return
+    try:
+        await db.sync_tombstones.insert_many(docs, ordered=False)
+    except Exception as e:
+        logger.warning(f"Could not record {len(docs)} tombstone(s) for {collection}: {e}")
+
+
+async def record_tombstone(collection: str, records: Iterable[Optional[Dict[str, Any]]]):
+    """Remember deleted records (as they were before the delete) so the
+    delta-sync clients that could see them evict them. Never raises."""
+    now = datetime.now(timezone.utc)
+    await _insert_tombstones(collection, [
+        _tombstone(collection, doc, now) for doc in records if doc and _record_id(doc)
+    ])
+
+
+async def record_change(kind: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """change_hooks view: tombstones for a delete, or for an update that
+    changes who can see the record. Never raises."""
+    if kind not in SCOPE_FIELDS or not before or not _record_id(before):
+        return
+    if after is None:
+        await record_tombstone(kind, [before])
+    elif _scope(kind, before) != _scope(kind, after):
+        now = datetime.now(timezone.utc)
+        await _insert_tombstones(kind, [
+            _tombstone(kind, before, now), _tombstone(kind, {**before, **after}, now, entered=True),
+        ])
+
+
+async def mark_dirty(kind: str):
+    """change_hooks view: a bulk write names no records, so there is nothing to record."""
+
+
+async def delta_page(
+    collection,
+    collection_name: str,
+    access_query: Dict[str, Any],
+    changed_since: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+    projection: Optional[Dict[str, Any]] = None,
+    change_fields: Iterable[str] = CHANGE_FIELDS,
+    strip_id: bool = True,
+) -> Dict[str, Any]:
+    """
+    One page of a delta sync. Without `changed_since` this is the initial full
+    snapshot. Follow `next_cursor` until it is None, then store `next_since`.
+    """
+    state = decode_cursor(cursor) or {}
+    started = state.get("t") or datetime.now(timezone.utc)
+    if isinstance(started, datetime) and started.tzinfo is None:
+        started = started.replace(tzinfo=timezone.utc)
+    since = parse_since(changed_since) if changed_since else None
+
+    if since and since < datetime.now(timezone.utc) - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        return {"reset": True, "changed": [], "deleted": [], "next_cursor": None, "next_since": None}
+
+    sort = [("_id", 1)]
+    query = and_query(
+        access_query,
+        changed_since_clause(since, change_fields) if since else None,
+        keyset_clause(sort, state["k"]) if state.get("k") else None,
+    )
+    proj = dict(projection or {})
+    proj.pop("_id", None)
+    raw = await collection.find(query, proj or None).sort(sort).limit(limit).to_list(limit)
+
+    next_cursor = None
+    if len(raw) == limit:
+        next_cursor = encode_cursor({"t": started, "k": cursor_values(raw[-1], sort)})
+
+    if since:
+        raw = [d for d in raw if changed_after(d, since, change_fields)]
+    changed = []
+    for d in raw:
+        if strip_id:
+            d.pop("_id", None)
+        changed.append(d)
+
+    deleted: List[str] = []
+    if since and not state:
+        rows = await db.sync_tombstones.find(
+            and_query({"collection": collection_name, "deleted_at": {"$gte": since}}, access_query),
+            {"_id": 0, "record_id": 1, "deleted_at": 1, "entered": 1},
+        ).to_list(length=None)
+        # Per record, the latest tombstone this caller can see; an "entered"
+        # one wins a tie (the caller is in both the old and new audience).
+        latest: Dict[str, Tuple[datetime, bool]] = {}
+        for r in rows:
+            mark = (r["deleted_at"], bool(r.get("entered")))
+            if r["record_id"] not in latest or mark > latest[r["record_id"]]:
+                latest[r["record_id"]] = mark
+        deleted = sorted(rid for rid, (_, entered) in latest.items() if not entered)
+
+    return {
+        "reset": False,
+        "changed": changed,
+        "deleted": deleted,
+        "next_cursor": next_cursor,
+        "next_since": (started - WATERMARK_SKEW).isoformat(),
+    }
+
+
+INDEXES = [
+    index("sync_tombstones", "deleted_at", expireAfterSeconds=TOMBSTONE_RETENTION_DAYS * 86400),
+    index("sync_tombstones", [("collection", 1), ("deleted_at", 1)]),
+    index("tasks", "updated_at"),
+    index("clients", [("company_name", 1), ("_id", 1)]),
+    index("clients", "updated_at"),
+    index("leads", [("updated_at", -1), ("_id", -1)]),
+]
+
+
+async def create_list_sync_indexes():
+    """Create MongoDB indexes for keyset paging, delta sync and tombstones."""
+    await ensure_indexes(INDEXES)
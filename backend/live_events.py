@@ -0,0 +1,584 @@
+"""Per-user server push channel: GET /api/events/stream.
+
+The frontend used to poll for everything that changes under a user: the due
+reminder popups, the notification badge and list, and the WhatsApp Hub chat
+list. Each poll paid for get_current_user, the cross-visibility union and a
+count_documents. Now every tab opens one Server-Sent Events stream and gets:
+
+  hello         {"unread": n, "popups": bool, "hub": bool}, once per connect
+  notification  a notification document as it is inserted
+  unread        {"delta": +-n} or {"count": n} when the unread badge moves
+  popup         due reminders and popup notifications, the same items
+                GET /reminders/due-popups returns
+  wa_message,   WhatsApp Hub activity, to users with hub access
+  wa_sync
+
+The polling endpoints stay as they were; the frontend only polls while its
+stream is down. A stream ends after STREAM_MAX_SEC (or when its queue
+overflows) and the browser reconnects, which re-checks the token and the
+user's access.
+
+Events go through a PubSub. InMemoryPubSub hands them to the subscriptions
+of this process. MongoPubSub also appends them to `live_events` (TTL) and
+each process tails that collection every LIVE_EVENTS_POLL_SEC for events
+published elsewhere, for the channels it has subscribers on. A
+subscription only gets tailed events published after it was created, so a
+stream that (re)connects is not replayed what its hello already covers.
+LIVE_EVENTS_BACKEND picks one ("memory" / "mongo"); the default is mongo
+when MONGO_URL is set.
+
+Due reminders are fired by a timer wheel. For every user with a stream open
+on this process and popup access, the pending reminders due within
+REMINDER_LOOKAHEAD_SEC are slotted by the second of their remind_at (and
+reloaded every REMINDER_RELOAD_SEC); write sites call `reminder_scheduled`
+for new or moved ones. When a slot comes due the wheel claims that user's
+due items with the filter the polling endpoint uses, one document at a
+time, so each popup is delivered once whichever worker, tab or poll gets
+there first; if publishing them fails the claim is released again.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+
+from backend.dependencies import db, get_cross_visibility_union, get_current_user, get_user_permissions
+from backend.index_manifest import ensure_indexes, index
+from backend.models import User
+
+logger = logging.getLogger("live_events")
+
+BACKEND = os.getenv("LIVE_EVENTS_BACKEND") or ("mongo" if os.getenv("MONGO_URL") else "memory")
+POLL_SEC = float(os.getenv("LIVE_EVENTS_POLL_SEC", "1"))
+RETENTION_SEC = 300
+OVERLAP_SEC = 5
+SEEN_MAX = 5000
+QUEUE_SIZE = 200
+HEARTBEAT_SEC = 25
+STREAM_MAX_SEC = 1800
+
+LOOKAHEAD_SEC = int(os.getenv("REMINDER_LOOKAHEAD_SEC", "3600"))
+RELOAD_SEC = int(os.getenv("REMINDER_RELOAD_SEC", "300"))
+WHEEL_SLOTS = 512
+POPUP_BATCH = 20
+
+HUB_CHANNEL = "whatsapp_hub"
+WHEEL_CHANNEL = "reminder_wheel"
+
+
+def user_channel(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+
+# ── Pub/sub ──────────────────────────────────────────────────────────────────
+
+class Subscription:
+    """A queue of (event, data) for one consumer of one or more channels."""
+
+    def __init__(self, pubsub: "InMemoryPubSub", channels: Iterable[str]):
+        self.pubsub = pubsub
+        self.channels = tuple(channels)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+        # Tailed events published before this are not for this consumer:
+        # the stream's hello already counted them.
+        self.created_at = datetime.now(timezone.utc)
+
+    def deliver(self, event: str, data: Any):
+        try:
+            self.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # A consumer this far behind resyncs on reconnect instead.
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[Tuple[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.pubsub.unsubscribe(self)
+
+
+class InMemoryPubSub:
+    """Fan-out to the subscriptions of this process only."""
+
+    def __init__(self):
+        self._subs: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        sub = Subscription(self, channels)
+        for channel in sub.channels:
+            self._subs.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        for channel in sub.channels:
+            subs = self._subs.get(channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[channel]
+
+    def _deliver(self, channel: str, event: str, data: Any, at: Optional[datetime] = None):
+        for sub in list(self._subs.get(channel, ())):
+            if at is None or at >= sub.created_at:
+                sub.deliver(event, data)
+
+    async def publish_many(self, messages: List[Tuple[str, str, Any]]):
+        for channel, event, data in messages:
+            self._deliver(channel, event, data)
+
+    async def publish(self, channel: str, event: str, data: Any):
+        await self.publish_many([(channel, event, data)])
+
+    async def stop(self):
+        pass
+
+
+class MongoPubSub(InMemoryPubSub):
+    """InMemoryPubSub plus the `live_events` collection, tailed by every process."""
+
+    def __init__(self):
+        super().__init__()
+        self.origin = uuid.uuid4().hex
+        self._since = datetime.now(timezone.utc)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        if self._task is None or self._task.done():
+            # Start from now, not from whenever the last tail stopped.
+            self._since = datetime.now(timezone.utc)
+            self._task = asyncio.create_task(self._tail())
+        return super().subscribe(channels)
+
+    async def publish_many(self, messages: List[Tuple[str, str, Any]]):
+        await super().publish_many(messages)
+        now = datetime.now(timezone.utc)
+        docs = [{"id": uuid.uuid4().hex, "origin": self.origin, "channel": channel,
+                 "event": event, "data": data, "at": now}
+                for channel, event, data in messages]
+        if docs:
+            await db.live_events.insert_many(docs, ordered=False)
+
+    async def poll_once(self) -> int:
+        """Deliver the events other processes published since the last poll."""
+        if not self._subs:
+            self._since = datetime.now(timezone.utc)
+            return 0
+        docs = await db.live_events.find(
+            {"at": {"$gt": self._since - timedelta(seconds=OVERLAP_SEC)},
+             "origin": {"$ne": self.origin}, "channel": {"$in": list(self._subs)}},
+            {"_id": 0},
+        ).sort("at", 1).to_list(length=None)
+        delivered = 0
+        for doc in docs:
+            at = doc["at"] if doc["at"].tzinfo else doc["at"].replace(tzinfo=timezone.utc)
+            self._since = max(self._since, at)
+            if doc["id"] in self._seen:
+                continue
+            self._seen[doc["id"]] = None
+            self._deliver(doc["channel"], doc["event"], doc.get("data"), at)
+            delivered += 1
+        while len(self._seen) > SEEN_MAX:
+            self._seen.popitem(last=False)
+        return delivered
+
+    async def _tail(self):
+        while True:
+            await asyncio.sleep(POLL_SEC)
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("live_events tail failed: %s", e)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+pubsub: InMemoryPubSub = MongoPubSub() if BACKEND == "mongo" else InMemoryPubSub()
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _jsonable(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return json.loads(json.dumps({k: v for k, v in doc.items() if k != "_id"}, default=_json_default))
+
+
+async def publish_many(messages: List[Tuple[str, str, Any]]):
+    """Publish without ever failing the write that triggered it."""
+    if not messages:
+        return
+    try:
+        await pubsub.publish_many(messages)
+    except Exception as e:
+        logger.warning("live_events publish failed: %s", e)
+
+
+async def publish(channel: str, event: str, data: Any):
+    await publish_many([(channel, event, data)])
+
+
+# ── Write-site hooks ─────────────────────────────────────────────────────────
+
+async def notifications_created(docs: Iterable[Dict[str, Any]]):
+    """Push inserted notifications and the badge delta to their users."""
+    messages: List[Tuple[str, str, Any]] = []
+    unread: Dict[str, int] = {}
+    popups: Set[str] = set()
+    for doc in docs:
+        user_id = doc.get("user_id")
+        if not user_id:
+            continue
+        messages.append((user_channel(user_id), "notification", _jsonable(doc)))
+        if not doc.get("is_read"):
+            unread[user_id] = unread.get(user_id, 0) + 1
+            if doc.get("popup"):
+                popups.add(user_id)
+    messages.extend((user_channel(uid), "unread", {"delta": n}) for uid, n in unread.items())
+    now = datetime.now(timezone.utc).isoformat()
+    messages.extend((WHEEL_CHANNEL, "schedule", {"user_id": uid, "at": now}) for uid in popups)
+    await publish_many(messages)
+
+
+async def unread_changed(user_id: str, *, delta: Optional[int] = None, count: Optional[int] = None):
+    """Push a badge change: a delta when it is known, otherwise the new count."""
+    if delta == 0:
+        return
+    await publish(user_channel(user_id), "unread", {"delta": delta} if delta is not None else {"count": count})
+
+
+async def reminder_scheduled(user_id: Any, remind_at: Any):
+    """Tell the wheels a reminder for `user_id` was added or moved to `remind_at`."""
+    if user_id and remind_at:
+        await publish(WHEEL_CHANNEL, "schedule", {"user_id": str(user_id), "at": str(remind_at)})
+
+
+# ── Due popups ───────────────────────────────────────────────────────────────
+
+async def popups_enabled(user: User) -> bool:
+    """The popup gating rule of GET /reminders/due-popups."""
+    if user.role == "admin":
+        return True
+    if not get_user_permissions(user).get("can_receive_popup_reminders", False):
+        return False
+    return bool(await get_cross_visibility_union(user.id))
+
+
+async def claim_due_popups(user: User) -> List[Dict[str, Any]]:
+    """
+    Claim and return the user's due reminders and unshown popup notifications.
+
+    Each document is claimed with its own conditional update, so when a
+    poll and a wheel (or two workers) race for it only one returns it.
+    """
+    return (await _claim(user))[0]
+
+
+async def _claim(user: User) -> Tuple[List[Dict[str, Any]], List[Any], List[str]]:
+    """claim_due_popups, plus the claimed reminder _ids and notification ids."""
+    if not await popups_enabled(user):
+        return [], [], []
+
+    user_id = str(user.id)
+    now_iso = datetime.now(timezone.utc).isoformat()
+    due_docs = await db.reminders.find({
+        "user_id": user_id,
+        "remind_at": {"$lte": now_iso},
+        "is_dismissed": False,
+        "is_fired": False,
+    }).sort("remind_at", 1).limit(POPUP_BATCH).to_list(length=POPUP_BATCH)
+
+    results = []
+    reminder_ids: List[Any] = []
+    for doc in due_docs:
+        claimed = await db.reminders.update_one(
+            {"_id": doc["_id"], "is_fired": False},
+            {"$set": {"is_fired": True, "updated_at": now_iso}},
+        )
+        if claimed.modified_count:
+            reminder_ids.append(doc["_id"])
+            results.append({
+                "id": str(doc.get("_id")),
+                "type": doc.get("reminder_type", "reminder"),
+                "title": doc.get("title", "Reminder"),
+                "message": doc.get("description", ""),
+                "task_id": doc.get("related_task_id"),
+            })
+
+    popup_docs = await db.notifications.find({
+        "user_id": user_id,
+        "popup": True,
+        "is_read": False,
+    }).sort("created_at", 1).limit(POPUP_BATCH).to_list(length=POPUP_BATCH)
+
+    notification_ids: List[str] = []
+    for doc in popup_docs:
+        if not doc.get("id"):
+            continue
+        claimed = await db.notifications.update_one(
+            {"id": doc["id"], "is_read": False},
+            {"$set": {"is_read": True}},
+        )
+        if claimed.modified_count:
+            notification_ids.append(doc["id"])
+            results.append({
+                "id": doc.get("id"),
+                "type": doc.get("type") or "task_popup",
+                "title": doc.get("title", "Reminder"),
+                "message": doc.get("message", ""),
+                "task_id": doc.get("task_id"),
+            })
+    await unread_changed(user_id, delta=-len(notification_ids))
+    return results, reminder_ids, notification_ids
+
+
+async def _release(user_id: str, reminder_ids: List[Any], notification_ids: List[str]):
+    """Undo a claim whose popup could not be published, so it is offered again."""
+    if reminder_ids:
+        await db.reminders.update_many(
+            {"_id": {"$in": reminder_ids}, "is_fired": True},
+            {"$set": {"is_fired": False, "updated_at": datetime.now(timezone.utc).isoformat()}},
+        )
+    if notification_ids:
+        await db.notifications.update_many(
+            {"id": {"$in": notification_ids}, "is_read": True},
+            {"$set": {"is_read": False}},
+        )
+        await unread_changed(user_id, delta=len(notification_ids))
+
+
+def _epoch(value: Any) -> Optional[float]:
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class ReminderWheel:
+    """
+    A hashed timing wheel of (due second, user id), one slot per second.
+
+    Only users with a stream open on this process are kept; an entry for a
+    user who has since disconnected is dropped when its slot comes due.
+    """
+
+    def __init__(self, slots: int = WHEEL_SLOTS):
+        self._slots: List[Set[Tuple[int, str]]] = [set() for _ in range(slots)]
+        self._cursor = int(time.time())
+        self._users: Dict[str, List[Any]] = {}      # user id -> [open streams, User, loaded at]
+        self._sub: Optional[Subscription] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return sum(len(slot) for slot in self._slots)
+
+    def add(self, user_id: str, due: float):
+        sec = max(int(due), self._cursor + 1)
+        self._slots[sec % len(self._slots)].add((sec, user_id))
+
+    def advance(self, now: float) -> Set[str]:
+        """Move the cursor to `now` and return the users with something due."""
+        now_sec = int(now)
+        due: Set[str] = set()
+        for sec in range(self._cursor + 1, min(now_sec, self._cursor + len(self._slots)) + 1):
+            slot = self._slots[sec % len(self._slots)]
+            ready = {entry for entry in slot if entry[0] <= now_sec}
+            slot -= ready
+            due.update(uid for _, uid in ready)
+        self._cursor = max(self._cursor, now_sec)
+        return due
+
+    async def attach(self, user: User):
+        """A stream with popup access opened for `user` on this process."""
+        entry = self._users.get(user.id)
+        if entry:
+            entry[0] += 1
+            entry[1] = user
+            return
+        self._users[user.id] = [1, user, 0.0]
+        if self._task is None or self._task.done():
+            self._sub = pubsub.subscribe([WHEEL_CHANNEL])
+            self._task = asyncio.create_task(self._run())
+        await self.load(user.id)
+
+    def detach(self, user_id: str):
+        entry = self._users.get(user_id)
+        if entry:
+            entry[0] -= 1
+            if entry[0] <= 0:
+                del self._users[user_id]
+
+    async def load(self, user_id: str):
+        """Slot the user's pending reminders due within the lookahead."""
+        entry = self._users.get(user_id)
+        if not entry:
+            return
+        entry[2] = time.monotonic()
+        now = time.time()
+        horizon = datetime.fromtimestamp(now + LOOKAHEAD_SEC, timezone.utc).isoformat()
+        docs = await db.reminders.find(
+            {"user_id": str(user_id), "remind_at": {"$lte": horizon},
+             "is_dismissed": False, "is_fired": False},
+            {"remind_at": 1},
+        ).to_list(length=None)
+        for doc in docs:
+            due = _epoch(doc.get("remind_at"))
+            if due is not None:
+                self.add(user_id, min(due, now + LOOKAHEAD_SEC))
+        if await db.notifications.find_one({"user_id": str(user_id), "popup": True, "is_read": False}, {"_id": 1}):
+            self.add(user_id, now)
+
+    async def fire(self, user_id: str) -> List[Dict[str, Any]]:
+        entry = self._users.get(user_id)
+        if not entry:
+            return []
+        items, reminder_ids, notification_ids = await _claim(entry[1])
+        if not items:
+            return []
+        try:
+            # Not the swallowing publish(): a popup that was claimed but never
+            # sent would be lost, so the claim is released for the next try.
+            await pubsub.publish(user_channel(user_id), "popup", items)
+        except Exception:
+            await _release(user_id, reminder_ids, notification_ids)
+            self.add(user_id, time.time() + 1)
+            raise
+        return items
+
+    def _on_event(self, event: str, data: Any):
+        if event != "schedule" or not isinstance(data, dict):
+            return
+        user_id = str(data.get("user_id") or "")
+        due = _epoch(data.get("at"))
+        if user_id in self._users and due is not None and due <= time.time() + LOOKAHEAD_SEC:
+            self.add(user_id, due)
+
+    async def tick(self):
+        """Take schedule events, fire what is due and reload stale users."""
+        while self._sub is not None and not self._sub.queue.empty():
+            self._on_event(*self._sub.queue.get_nowait())
+        for user_id in self.advance(time.time()):
+            try:
+                await self.fire(user_id)
+            except Exception as e:
+                logger.warning("reminder wheel: firing for %s failed: %s", user_id, e)
+        stale = [uid for uid, entry in self._users.items() if time.monotonic() - entry[2] > RELOAD_SEC]
+        for user_id in stale:
+            try:
+                await self.load(user_id)
+            except Exception as e:
+                logger.warning("reminder wheel: reload for %s failed: %s", user_id, e)
+
+    async def _run(self):
+        while self._users:
+            await self.tick()
+            item = await self._sub.get(1 - time.time() % 1)
+            if item is not None:
+                self._on_event(*item)
+        self.stop()
+
+    def stop(self):
+        if self._sub is not None:
+            self._sub.close()
+            self._sub = None
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+
+wheel = ReminderWheel()
+
+
+# ── Stream ───────────────────────────────────────────────────────────────────
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+async def _stream_user(request: Request, token: Optional[str]) -> User:
+    # EventSource cannot send headers, so the token may come as ?token=.
+    auth_header = request.headers.get("Authorization", "")
+    raw_token = auth_header[7:] if auth_header.startswith("Bearer ") else token
+    if not raw_token:
+        raise HTTPException(401, "Authentication required")
+    return await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=raw_token))
+
+
+def _frame(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+
+@router.get("/stream")
+async def event_stream(request: Request, token: Optional[str] = None):
+    """Server-Sent Events for the signed-in user; see the module docstring."""
+    from backend.whatsapp_hub import _has_hub_access
+
+    user = await _stream_user(request, token)
+    popups = await popups_enabled(user)
+    hub = await _has_hub_access(user)
+    unread = await db.notifications.count_documents({"user_id": user.id, "is_read": False})
+
+    sub = pubsub.subscribe([user_channel(user.id)] + ([HUB_CHANNEL] if hub else []))
+    if popups:
+        await wheel.attach(user)
+
+    async def generator():
+        try:
+            yield "retry: 5000\n" + _frame("hello", {"unread": int(unread or 0), "popups": popups, "hub": hub})
+            deadline = time.monotonic() + STREAM_MAX_SEC
+            while not sub.overflowed and time.monotonic() < deadline:
+                item = await sub.get(min(HEARTBEAT_SEC, deadline - time.monotonic()))
+                yield _frame(*item) if item else ": ping\n\n"
+        finally:
+            sub.close()
+            if popups:
+                wheel.detach(user.id)
+
+    return StreamingResponse(
+        generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Connection": "keep-alive",
+        },
+    )
+
+
+async def shutdown():
+    wheel.stop()
+    await pubsub.stop()
+
+
+INDEXES = [
+    index("live_events", "at", expireAfterSeconds=RETENTION_SEC),
+    index("live_events", [("channel", 1), ("at", 1)]),
+]
+
+
+async def create_live_events_indexes():
+    """Ensure the TTL and tail indexes of the live event feed."""
+    await ensure_indexes(INDEXES)
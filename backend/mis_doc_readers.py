@@ -20,6 +20,9 @@ Everything is normalised into a single `ParsedDoc`:
 
 Downstream parsers in `backend/mis_report.py` try each table until one maps to
 the expected register/bank/GST shape, then fall back to text parsing.
+
+mis_report calls `read_document` through the extraction pool
+(`doc_extraction.extract("mis_document", ...)`), never on the event loop.
 """
 
 from __future__ import annotations
@@ -48,7 +48,9 @@ from pydantic import BaseModel, Field
 
 from backend.dependencies import db, get_current_user, check_permission, build_client_query
 from backend.models import User, ClientCreate
-from backend.mis_doc_readers import read_document, ParsedDocument
+from backend import change_hooks
+from backend import doc_extraction
+from backend.mis_doc_readers import ParsedDocument
 from backend.mis_gst_parser import parse_gst_tables, gst_summary
 from backend.mis_exports import build_pdf_report, build_word_report, build_excel_workbook
 
@@ -204,10 +206,10 @@ def _read_tabular(file_bytes: bytes, filename: str) -> pd.DataFrame:
 # HELPERS — universal document reading (Excel / CSV / PDF / Word)
 # ══════════════════════════════════════════════════════════════════════════
 
-def _read_any(file_bytes: bytes, filename: str) -> ParsedDocument:
-    """Read any supported document into tables + plain text."""
+async def _read_any(file_bytes: bytes, filename: str) -> ParsedDocument:
+    """Read any supported document into tables + plain text (in the extraction pool)."""
     try:
-        return read_document(file_bytes, filename)
+        return await doc_extraction.extract("mis_document", file_bytes, filename=filename)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not read file '{filename}': {e}")
 
@@ -630,6 +632,7 @@ async def quick_create_mis_client(payload: QuickClientCreate, current_user: User
     doc["approval_status"] = "approved" if current_user.role == "admin" else "pending"
     await db.clients.insert_one(doc)
     doc.pop("_id", None)
+    await change_hooks.record_change("clients", None, doc)
     return doc
 
 
@@ -670,7 +673,7 @@ async def upload_mis_document(
     try:
         # Every document type now accepts Excel, CSV, PDF and Word — the
         # reader normalises all four into tables + text before parsing.
-        doc = _read_any(file_bytes, filename)
+        doc = await _read_any(file_bytes, filename)
 
         if doc_type in ("sales", "purchase"):
             # Try the highest-scoring table first; if that yields nothing useful,
@@ -10,7 +10,9 @@ from typing import List, Optional
 import uuid
 import logging
 
+from backend import live_events
 from backend.dependencies import db, get_current_user, require_admin
+from backend.index_manifest import ensure_indexes, index
 from pydantic import BaseModel, Field, ConfigDict
 from backend.models import User
 
@@ -102,13 +104,17 @@ router = APIRouter(
 )
 
 
+INDEXES = [
+    index("notifications", "user_id"),
+    index("notifications", "is_read"),
+    index("notifications", "created_at"),
+    index("notifications", [("user_id", 1), ("is_read", 1)]),
+]
+
+
 async def create_notification_indexes():
-    try:
-        await db.notifications.create_index("user_id")
-        await db.notifications.create_index("is_read")
-        await db.notifications.create_index("created_at")
-    except Exception as e:
-        logger.error(f"Index creation failed: {e}")
+    """Ensure the notification list / unread-count indexes."""
+    await ensure_indexes(INDEXES)
 
 
 # ====================== INTERNAL UTILITY ======================
@@ -142,6 +148,7 @@ async def create_notification(
             raise Exception("Insert failed")
 
         doc.pop("_id", None)
+        await live_events.notifications_created([doc])
 
         return notification
 
@@ -227,6 +234,7 @@ async def notify_admins_leave(
                 docs,
                 ordered=False
             )
+            await live_events.notifications_created(docs)
 
     except Exception as e:
         logger.error(
@@ -274,6 +282,7 @@ async def notify_admins_and_permitted(
                 docs,
                 ordered=False
             )
+            await live_events.notifications_created(docs)
 
     except Exception as e:
         logger.error(
@@ -460,6 +469,7 @@ async def send_notification(
                 docs,
                 ordered=False
             )
+            await live_events.notifications_created(docs)
 
         return {
             "status": "success",
@@ -507,6 +517,7 @@ async def send_notification(
                 docs,
                 ordered=False
             )
+            await live_events.notifications_created(docs)
 
         return {
             "status": "success",
@@ -661,6 +672,7 @@ async def mark_all_notifications_read(
             }
         },
     )
+    await live_events.unread_changed(current_user.id, count=0)
 
     return {
         "message": "All notifications marked as read"
@@ -677,6 +689,7 @@ async def clear_all_notifications(
             "user_id": current_user.id
         }
     )
+    await live_events.unread_changed(current_user.id, count=0)
 
     return {
         "message": "All notifications cleared"
@@ -690,7 +703,8 @@ async def mark_notification_read(
     current_user: User = Depends(get_current_user),
 ):
 
-    result = await db.notifications.update_one(
+    # The document as it was, so only an unread one moves the badge.
+    before = await db.notifications.find_one_and_update(
         {
             "id": notification_id,
             "user_id": current_user.id
@@ -700,9 +714,10 @@ async def mark_notification_read(
                 "is_read": True
             }
         },
+        projection={"is_read": 1},
     )
 
-    if result.matched_count == 0:
+    if before is None:
 
         raise HTTPException(
             status_code=404,
@@ -712,6 +727,9 @@ async def mark_notification_read(
             ),
         )
 
+    if not before.get("is_read"):
+        await live_events.unread_changed(current_user.id, delta=-1)
+
     return {
         "message": "Notification marked as read"
     }
@@ -740,6 +758,16 @@ async def delete_notification(
             ),
         )
 
+    await live_events.unread_changed(
+        current_user.id,
+        count=await db.notifications.count_documents(
+            {
+                "user_id": current_user.id,
+                "is_read": False
+            }
+        ),
+    )
+
     return {
         "message": "Notification deleted"
     }
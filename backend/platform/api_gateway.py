@@ -2,7 +2,7 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 import uuid
-from backend.dependencies import db
+from backend.licensing import usage_meter
 
 logger = logging.getLogger("api_gateway")
 
@@ -22,22 +22,17 @@ class APIGateway:
             "response_time_ms": response_time_ms,
             "created_at": now
         }
-        await db.api_usage.insert_one(api_log)
+        # Buffered: written with the next usage_meter flush
+        usage_meter.log("api_usage", api_log)
         
         # Increment developer portal metrics
-        await db.customer_usage.update_one(
-            {"tenant_id": tenant_id, "metric": "api_calls"},
-            {"$inc": {"value": 1}, "$set": {"updated_at": now}},
-            upsert=True
-        )
+        usage_meter.increment(tenant_id, "api_calls")
         return call_id
 
     @staticmethod
     async def get_api_usage_metrics(tenant_id: str) -> Dict[str, Any]:
         """Calculates api usage metrics for subscription checks."""
-        now = datetime.now(timezone.utc).isoformat()
-        usage_doc = await db.customer_usage.find_one({"tenant_id": tenant_id, "metric": "api_calls"})
-        total_calls = usage_doc.get("value", 0) if usage_doc else 0
+        total_calls = await usage_meter.value(tenant_id, "api_calls")
         return {
             "tenant_id": tenant_id,
             "total_calls": total_calls,
@@ -1,7 +1,6 @@
 import logging
 from typing import Dict, Any, Optional
-from datetime import datetime, timezone
-from backend.dependencies import db
+from backend.licensing import usage_meter
 
 logger = logging.getLogger("storage_manager")
 
@@ -12,8 +11,7 @@ class StorageManager:
         # Standard default limit: 10 GB (in bytes)
         default_limit = 10 * 1024 * 1024 * 1024
         
-        doc = await db.customer_usage.find_one({"tenant_id": tenant_id, "metric": "storage_bytes"})
-        used_bytes = doc.get("value", 0) if doc else 0
+        used_bytes = await usage_meter.value(tenant_id, "storage_bytes")
         
         return {
             "tenant_id": tenant_id,
@@ -26,12 +24,7 @@ class StorageManager:
     @staticmethod
     async def record_storage_allocation(tenant_id: str, file_size_bytes: int) -> bool:
         """Tracks storage allocation and increments metric usage."""
-        now = datetime.now(timezone.utc).isoformat()
-        await db.customer_usage.update_one(
-            {"tenant_id": tenant_id, "metric": "storage_bytes"},
-            {"$inc": {"value": file_size_bytes}, "$set": {"updated_at": now}},
-            upsert=True
-        )
+        usage_meter.increment(tenant_id, "storage_bytes", file_size_bytes)
         logger.info(f"Allocated {file_size_bytes} bytes for tenant {tenant_id}.")
         return True
 
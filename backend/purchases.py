@@ -14,7 +14,6 @@ import re
 import json
 import uuid
 import base64
-from io import BytesIO
 from datetime import datetime, timezone
 from typing import Optional, List
 
@@ -24,6 +23,8 @@ from pydantic import BaseModel
 
 from backend.dependencies import db, get_current_user
 from backend.models import User
+from backend.search import party_index
+from backend import doc_extraction
 
 # Reuse the vision helpers already built for the AI Document Reader instead
 # of duplicating the Groq integration.
@@ -99,40 +100,12 @@ def _normalize_date(raw: str) -> str:
     return raw
 
 
-def _norm_company(s: str) -> str:
-    s = (s or "").lower()
-    s = re.sub(r"\b(pvt\.?|private|ltd\.?|limited|llp|inc\.?|co\.?|company|the|enterprises|traders|industries)\b", "", s)
-    s = re.sub(r"[^a-z0-9]+", " ", s).strip()
-    return s
-
-
 async def _match_clients(vendor_name: str) -> List[dict]:
     if not vendor_name:
         return []
-    clients = await db.clients.find({}, {"_id": 0, "id": 1, "company_name": 1}).to_list(5000)
-    target = _norm_company(vendor_name)
-    if not target:
-        return []
-    target_tokens = set(target.split())
-    scored = []
-    for c in clients:
-        cn = _norm_company(c.get("company_name"))
-        if not cn:
-            continue
-        tokens = set(cn.split())
-        if not tokens:
-            continue
-        overlap = len(target_tokens & tokens)
-        union = len(target_tokens | tokens) or 1
-        score = overlap / union
-        if cn == target:
-            score = 1.0
-        elif target in cn or cn in target:
-            score = max(score, 0.85)
-        if score >= 0.3:
-            scored.append({"client_id": c["id"], "company_name": c.get("company_name", ""), "score": round(score, 2)})
-    scored.sort(key=lambda x: -x["score"])
-    return scored[:5]
+    matches = await party_index.top_k("clients", vendor_name, k=5, min_score=0.3)
+    return [{"client_id": c["id"], "company_name": c["name"], "score": round(score, 2)}
+            for score, c in matches]
 
 
 async def _extract_text_from_upload(contents: bytes, filename: str) -> str:
@@ -141,15 +114,8 @@ async def _extract_text_from_upload(contents: bytes, filename: str) -> str:
     if ext == "pdf":
         text_content = ""
         try:
-            import pdfplumber
-
-            pages = []
-            with pdfplumber.open(BytesIO(contents)) as pdf:
-                for page in pdf.pages[:10]:
-                    t = page.extract_text()
-                    if t and t.strip():
-                        pages.append(t.strip())
-            text_content = "\n".join(pages)
+            pages = await doc_extraction.extract("pdf_text", contents, max_pages=10)
+            text_content = "\n".join(t.strip() for t in pages if t.strip())
         except Exception:
             text_content = ""
 
@@ -158,17 +124,8 @@ async def _extract_text_from_upload(contents: bytes, filename: str) -> str:
 
         # Scanned PDF — no text layer → render pages to images → Groq vision
         try:
-            import pdfplumber
-
-            page_images = []
-            with pdfplumber.open(BytesIO(contents)) as pdf:
-                for page in pdf.pages[:3]:
-                    pil_img = page.to_image(resolution=150).original
-                    if pil_img.mode not in ("RGB", "L"):
-                        pil_img = pil_img.convert("RGB")
-                    buf = BytesIO()
-                    pil_img.save(buf, format="JPEG", quality=85)
-                    page_images.append((base64.b64encode(buf.getvalue()).decode(), "image/jpeg"))
+            page_images = [(base64.b64encode(img).decode(), "image/jpeg")
+                           for img in await doc_extraction.extract("pdf_images", contents, max_pages=3)]
             if not page_images:
                 return ""
             prompt = (
@@ -181,14 +138,7 @@ async def _extract_text_from_upload(contents: bytes, filename: str) -> str:
 
     if ext in ("jpg", "jpeg", "png", "webp"):
         try:
-            from PIL import Image as PILImage
-
-            img = PILImage.open(BytesIO(contents))
-            if img.mode not in ("RGB", "L"):
-                img = img.convert("RGB")
-            buf = BytesIO()
-            img.save(buf, format="JPEG", quality=85)
-            img_b64 = base64.b64encode(buf.getvalue()).decode()
+            img_b64 = base64.b64encode(await doc_extraction.extract("image_jpeg", contents)).decode()
         except Exception as e:
             raise HTTPException(status_code=422, detail=f"Could not open image: {e}")
         prompt = (
@@ -25,6 +25,8 @@ from backend.dependencies import (
     _get_perm,
 )
 from backend.models import User
+from backend.bulk_mail import get_pool, send_with_retry
+from backend.search import party_index
 
 try:
     from fpdf import FPDF
@@ -1494,7 +1496,7 @@ def _build_checklist_pdf(q: dict, company: dict) -> BytesIO:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def _send_email_with_pdf(
+async def _send_email_with_pdf(
     smtp_host: str,
     smtp_port: int,
     smtp_user: str,
@@ -1518,10 +1520,10 @@ def _send_email_with_pdf(
     part.add_header("Content-Disposition", f'attachment; filename="{filename}"')
     msg.attach(part)
 
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.send_message(msg)
+    # Reuses the company's pooled SMTP connection instead of a fresh
+    # connect + STARTTLS + login per mail (see backend/bulk_mail.py)
+    pool = get_pool(smtp_host, smtp_port, smtp_user, smtp_password)
+    await send_with_retry(pool, msg, smtp_user, to_email)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1644,6 +1646,7 @@ async def create_company(
         raise HTTPException(400, "Company name is required")
     await db.companies.insert_one(doc)
     doc.pop("_id", None)
+    await party_index.record_change("companies", None, doc)
     return doc
 
 
@@ -1763,6 +1766,8 @@ async def update_company(
     }
     await db.companies.update_one({"id": company_id}, {"$set": update})
     updated = await db.companies.find_one({"id": company_id}, {"_id": 0})
+    if updated:
+        await party_index.record_change("companies", None, updated)
     # Keep the Bank Accounts page in sync: mirror the company's primary
     # bank details into the bank_accounts collection whenever they change
     # here (Invoice/Quotation settings both save through this endpoint).
@@ -1783,6 +1788,7 @@ async def delete_company(
     if not existing:
         raise HTTPException(404, "Company not found")
     await db.companies.delete_one({"id": company_id})
+    await party_index.record_change("companies", existing, None)
     return {"message": "Company deleted"}
 
 
@@ -2301,7 +2307,7 @@ async def send_quotation_email(
     )
 
     try:
-        _send_email_with_pdf(
+        await _send_email_with_pdf(
             smtp_host=smtp_host,
             smtp_port=int(company.get("smtp_port", 587)),
             smtp_user=smtp_user,
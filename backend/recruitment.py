@@ -21,7 +21,6 @@ Adds, on top of what "Employee Interviews" already did:
     and a source breakdown, for a dashboard summary strip on the page.
 """
 
-import io
 import os
 import re
 import uuid
@@ -34,6 +33,7 @@ from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator
 from bson import ObjectId
 
 from backend.dependencies import db, get_current_user, create_audit_log, _get_perm
+from backend import doc_extraction
 from backend.governance_core import has_action_access
 
 router = APIRouter(prefix="/recruitment", tags=["Recruitment"])
@@ -623,35 +623,25 @@ async def _groq_vision_structured_resume(page_images_b64: list, filename: str) -
         return {}
 
 
+# Resume PDFs: first 10 pages, tables appended as "cell | cell" rows.
+_RESUME_PDF_TEXT = {"max_pages": 10, "tables": True, "x_tolerance": 3, "y_tolerance": 3}
+
+
 async def _extract_resume_text(contents: bytes, filename: str) -> str:
     """Extract text from PDF/DOCX/TXT resume with table support.
 
     Text-based PDFs → Gemini (same pattern as ai_document_reader.py).
     Scanned/image PDFs → Groq vision (up to 4 pages).
     DOCX / TXT → parsed locally.
+    PDF and DOCX parsing runs in the extraction pool (backend/doc_extraction.py).
     """
     import base64
 
     ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
 
     if ext == "pdf":
-        import pdfplumber
-
-        text_parts = []
-        with pdfplumber.open(io.BytesIO(contents)) as pdf:
-            for page in pdf.pages[:10]:
-                t = page.extract_text(x_tolerance=3, y_tolerance=3) or ""
-                for table in page.extract_tables():
-                    rows = []
-                    for row in table:
-                        cells = [str(c).strip() if c else "" for c in row]
-                        if any(cells):
-                            rows.append(" | ".join(cells))
-                    if rows:
-                        t += "\n" + "\n".join(rows)
-                if t.strip():
-                    text_parts.append(t)
-        text = "\n\n".join(text_parts).strip()
+        pages = await doc_extraction.extract("pdf_text", contents, **_RESUME_PDF_TEXT)
+        text = "\n\n".join(t for t in pages if t.strip()).strip()
 
         if text:
             # Text-based PDF — use Gemini to clean / transcribe
@@ -689,15 +679,8 @@ async def _extract_resume_text(contents: bytes, filename: str) -> str:
                     detail="GROQ_API_KEY is not configured on the server.",
                 )
 
-            page_images_b64 = []
-            with pdfplumber.open(io.BytesIO(contents)) as pdf:
-                for page in pdf.pages[:4]:  # max 4 pages for Groq
-                    pil_img = page.to_image(resolution=150).original
-                    if pil_img.mode not in ("RGB", "L"):
-                        pil_img = pil_img.convert("RGB")
-                    buf = io.BytesIO()
-                    pil_img.save(buf, format="JPEG", quality=85)
-                    page_images_b64.append(base64.b64encode(buf.getvalue()).decode())
+            page_images_b64 = [base64.b64encode(img).decode() for img in
+                               await doc_extraction.extract("pdf_images", contents, max_pages=4)]  # max 4 pages for Groq
 
             if not page_images_b64:
                 raise HTTPException(
@@ -753,16 +736,7 @@ async def _extract_resume_text(contents: bytes, filename: str) -> str:
 
     if ext == "docx":
         try:
-            import docx
-
-            d = docx.Document(io.BytesIO(contents))
-            parts = [p.text for p in d.paragraphs if p.text.strip()]
-            for table in d.tables:
-                for row in table.rows:
-                    cells = [c.text.strip() for c in row.cells if c.text.strip()]
-                    if cells:
-                        parts.append(" | ".join(cells))
-            return "\n".join(parts)
+            return "\n".join(await doc_extraction.extract("docx_text", contents))
         except Exception as e:
             raise HTTPException(
                 status_code=422, detail=f"Could not read .docx resume: {e}"
@@ -996,17 +970,12 @@ async def parse_resume(
 
     # ── Special handling for scanned PDFs ────────────────────────────────────
     if ext == "pdf":
-        import pdfplumber
         import base64
 
-        # First check if PDF has any extractable text
-        has_text = False
-        with pdfplumber.open(io.BytesIO(contents)) as pdf:
-            for page in pdf.pages[:3]:
-                t = page.extract_text(x_tolerance=3, y_tolerance=3) or ""
-                if t.strip():
-                    has_text = True
-                    break
+        # First check if PDF has any extractable text (the same extraction
+        # _extract_resume_text runs, so it is served from the cache there)
+        pages = await doc_extraction.extract("pdf_text", contents, **_RESUME_PDF_TEXT)
+        has_text = any(t.strip() for t in pages[:3])
 
         if not has_text:
             # Scanned PDF — use Groq vision to directly extract structured fields
@@ -1018,17 +987,10 @@ async def parse_resume(
             try:
                 groq_key = os.environ.get("GROQ_API_KEY", "")
                 if groq_key:
-                    page_images_b64 = []
-                    with pdfplumber.open(io.BytesIO(contents)) as pdf:
-                        for page in pdf.pages[:4]:  # max 4 pages
-                            pil_img = page.to_image(resolution=150).original
-                            if pil_img.mode not in ("RGB", "L"):
-                                pil_img = pil_img.convert("RGB")
-                            buf = io.BytesIO()
-                            pil_img.save(buf, format="JPEG", quality=85)
-                            page_images_b64.append(
-                                base64.b64encode(buf.getvalue()).decode()
-                            )
+                    page_images_b64 = [
+                        base64.b64encode(img).decode()
+                        for img in await doc_extraction.extract("pdf_images", contents, max_pages=4)  # max 4 pages
+                    ]
 
                     if page_images_b64:
                         # Get structured fields directly from vision
@@ -1362,7 +1324,7 @@ async def convert_to_user(
         "email": payload.email,
         "full_name": payload.full_name,
         "role": payload.role,
-        "password": get_password_hash(payload.password),
+        "password": await get_password_hash(payload.password),
         "departments": payload.departments or [],
         "phone": payload.phone,
         "punch_in_time": payload.punch_in_time or "10:30",
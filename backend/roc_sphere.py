@@ -41,6 +41,7 @@ from pydantic import BaseModel, Field, ConfigDict
 
 from backend.dependencies import db, get_current_user, check_module_permission
 from backend.models import User
+from backend import doc_extraction
 
 # Permission flags used here (see backend/models.py DEFAULT_ROLE_PERMISSIONS
 # and backend/dependencies.py MODULE_ACTION_MAP):
@@ -529,24 +530,15 @@ def _identify_roc_form_type(filename: str, text: str) -> str:
     return "roc-form"
 
 
-def _extract_text_from_upload(filename: str, raw: bytes) -> str:
+async def _extract_text_from_upload(filename: str, raw: bytes) -> str:
     name = (filename or "").lower()
     try:
         if name.endswith(".pdf"):
-            import pdfplumber
-            text_parts = []
-            with pdfplumber.open(io.BytesIO(raw)) as pdf:
-                for page in pdf.pages[:20]:
-                    text_parts.append(page.extract_text() or "")
-            return "\n".join(text_parts)
+            return "\n".join(await doc_extraction.extract("pdf_text", raw, max_pages=20))
         if name.endswith((".xlsx", ".xls")):
-            import openpyxl
-            wb = openpyxl.load_workbook(io.BytesIO(raw), data_only=True)
-            lines = []
-            for ws in wb.worksheets:
-                for row in ws.iter_rows(values_only=True):
-                    lines.append(" ".join(str(c) for c in row if c is not None))
-            return "\n".join(lines)
+            sheets = await doc_extraction.extract("workbook_rows", raw)
+            return "\n".join(" ".join(str(c) for c in row if c is not None)
+                             for rows in sheets.values() for row in rows)
         if name.endswith(".csv"):
             return raw.decode("utf-8", errors="ignore")
         return raw.decode("utf-8", errors="ignore")
@@ -614,14 +606,14 @@ def _parse_mgt_shareholders(text: str) -> List[Dict[str, Any]]:
     return rows
 
 
-def _parse_directors_for_form(form_type: str, filename: str, raw: bytes, text: str) -> List[Dict[str, Any]]:
+async def _parse_directors_for_form(form_type: str, filename: str, raw: bytes, text: str) -> List[Dict[str, Any]]:
     """Directors register — gated to MGT-7/MGT-7A. Prefers the bordered
     table-grid reader (far more reliable than a text-line scan) and only
     falls back to the text-regex scan above when no bordered table is
     found, e.g. an MGT-7A that was flattened/scanned oddly."""
     if form_type not in DIRECTOR_SHAREHOLDER_SOURCE_TYPES:
         return []
-    people = _parse_master_director_tables(raw) if (filename or "").lower().endswith(".pdf") else []
+    people = await _parse_master_director_tables(raw) if (filename or "").lower().endswith(".pdf") else []
     if not people:
         people = _parse_people(text)["people"]
     return people
@@ -847,7 +839,7 @@ async def upload_master_data(
             errors.append(f"{filename}: skipped — empty file")
             continue
         try:
-            text = _extract_text_from_upload(filename, raw)
+            text = await _extract_text_from_upload(filename, raw)
         except Exception as e:  # a single corrupt/scanned PDF must not kill the batch
             logger.warning("roc_sphere upload-roc-form: failed to parse %s: %s", filename, e)
             errors.append(f"{filename}: could not be read — it may be scanned/image-only or password-protected")
@@ -859,7 +851,7 @@ async def upload_master_data(
         form_type = _identify_roc_form_type(filename, text)
         extracted: Dict[str, Any] = parse_roc_general_fields(text)
 
-        directors = _parse_directors_for_form(form_type, filename, raw, text)
+        directors = await _parse_directors_for_form(form_type, filename, raw, text)
         if directors:
             extracted["_directors"] = directors
         shareholders = _parse_shareholders_for_form(form_type, text)
@@ -993,7 +985,7 @@ def _match_master_label(line_lower: str):
     return None, None
 
 
-def _read_master_data_text(filename: str, raw: bytes) -> str:
+async def _read_master_data_text(filename: str, raw: bytes) -> str:
     """Own file→text reader for Master Data uploads. PDFs use text-flow
     ordering (reading order by position rather than raw stream order) so
     the label/value pairs on the MCA export don't get scrambled — the
@@ -1001,23 +993,11 @@ def _read_master_data_text(filename: str, raw: bytes) -> str:
     name = (filename or "").lower()
     try:
         if name.endswith(".pdf"):
-            import pdfplumber
-            parts = []
-            with pdfplumber.open(io.BytesIO(raw)) as pdf:
-                for page in pdf.pages[:8]:
-                    t = None
-                    try:
-                        t = page.extract_text(use_text_flow=True)
-                    except Exception:
-                        t = None
-                    parts.append(t or page.extract_text() or "")
-            return "\n".join(parts)
+            return "\n".join(await doc_extraction.extract("pdf_text", raw, max_pages=8, text_flow=True))
         if name.endswith((".xlsx", ".xls")):
-            import openpyxl
-            wb = openpyxl.load_workbook(io.BytesIO(raw), data_only=True)
             lines = []
-            for ws in wb.worksheets:
-                for row in ws.iter_rows(values_only=True):
+            for rows in (await doc_extraction.extract("workbook_rows", raw)).values():
+                for row in rows:
                     cells = [str(c).strip() for c in row if c is not None and str(c).strip()]
                     if cells:
                         lines.append(" ".join(cells))
@@ -1030,7 +1010,7 @@ def _read_master_data_text(filename: str, raw: bytes) -> str:
         return ""
 
 
-def _parse_master_director_tables(raw: bytes) -> List[Dict[str, Any]]:
+async def _parse_master_director_tables(raw: bytes) -> List[Dict[str, Any]]:
     """Read the Director/Signatory table straight from the PDF's table
     grid (bordered on the MCA Master Data export) rather than scanning
     text lines — far more reliable than regex here since the table's
@@ -1039,30 +1019,27 @@ def _parse_master_director_tables(raw: bytes) -> List[Dict[str, Any]]:
     Date / Signatory, letting position alone locate every field."""
     directors: List[Dict[str, Any]] = []
     try:
-        import pdfplumber
-        with pdfplumber.open(io.BytesIO(raw)) as pdf:
-            for page in pdf.pages:
-                for table in (page.extract_tables() or []):
-                    if not table or len(table) < 2:
-                        continue
-                    header_line = " ".join(str(c or "") for c in table[0]).lower()
-                    if "din" not in header_line:
-                        continue
-                    for row in table[1:]:
-                        if not row or len(row) < 4 or not any(row):
-                            continue
-                        name = str(row[2] or "").replace("\n", " ").strip()
-                        din = str(row[1] or "").replace("\n", " ").strip()
-                        if not name or not din or not re.search(r"[A-Za-z]", name) or not re.search(r"\d", din):
-                            continue
-                        appt_i, cess_i = len(row) - 3, len(row) - 2
-                        directors.append({
-                            "name": re.sub(r"\s+", " ", name),
-                            "din": din,
-                            "designation": (str(row[3] or "").replace("\n", " ").strip() or "Director"),
-                            "date_of_appointment": str(row[appt_i] or "").strip() or None if appt_i > 0 else None,
-                            "date_of_cessation": (str(row[cess_i] or "").strip() or None) if 0 <= cess_i < len(row) and str(row[cess_i] or "").strip() not in ("", "-") else None,
-                        })
+        for table in await doc_extraction.extract("pdf_tables", raw):
+            if not table or len(table) < 2:
+                continue
+            header_line = " ".join(str(c or "") for c in table[0]).lower()
+            if "din" not in header_line:
+                continue
+            for row in table[1:]:
+                if not row or len(row) < 4 or not any(row):
+                    continue
+                name = str(row[2] or "").replace("\n", " ").strip()
+                din = str(row[1] or "").replace("\n", " ").strip()
+                if not name or not din or not re.search(r"[A-Za-z]", name) or not re.search(r"\d", din):
+                    continue
+                appt_i, cess_i = len(row) - 3, len(row) - 2
+                directors.append({
+                    "name": re.sub(r"\s+", " ", name),
+                    "din": din,
+                    "designation": (str(row[3] or "").replace("\n", " ").strip() or "Director"),
+                    "date_of_appointment": str(row[appt_i] or "").strip() or None if appt_i > 0 else None,
+                    "date_of_cessation": (str(row[cess_i] or "").strip() or None) if 0 <= cess_i < len(row) and str(row[cess_i] or "").strip() not in ("", "-") else None,
+                })
     except Exception as e:  # pragma: no cover
         logger.warning("roc_sphere master-data: director table extraction failed: %s", e)
     return directors
@@ -1084,14 +1061,14 @@ def _map_master_category(class_of_company_raw: Optional[str], category_raw: Opti
     return None
 
 
-def extract_mca_master_data(filename: str, raw: bytes) -> Dict[str, Any]:
+async def extract_mca_master_data(filename: str, raw: bytes) -> Dict[str, Any]:
     """Parse an MCA Master Data export (PDF/XLSX/CSV) into Company Master
     fields. Separate parser/algorithm from the ROC-form parsers above —
     walks the document as an ordered label→value sequence (handling both
     same-line values like 'CIN U80900GJ...' and MCA's multi-line wrapped
     values like the registered address) rather than regex-scanning the
     whole blob."""
-    text = _read_master_data_text(filename, raw)
+    text = await _read_master_data_text(filename, raw)
     lines = [re.sub(r"\s+", " ", x).strip() for x in text.splitlines()]
     lines = [x for x in lines if x]
 
@@ -1140,7 +1117,7 @@ def extract_mca_master_data(filename: str, raw: bytes) -> Dict[str, Any]:
     # Table-grid extraction (PDF only) is far more reliable than the
     # regex line-scan, so prefer it and only fall back for XLSX/CSV or a
     # PDF whose director table has no visible borders.
-    people = _parse_master_director_tables(raw) if (filename or "").lower().endswith(".pdf") else []
+    people = await _parse_master_director_tables(raw) if (filename or "").lower().endswith(".pdf") else []
     if not people:
         people = _parse_people(text)["people"]
     if people:
@@ -1189,7 +1166,7 @@ async def fetch_master_data(
             errors.append(f"{filename}: skipped — empty file")
             continue
         try:
-            extracted = extract_mca_master_data(filename, raw)
+            extracted = await extract_mca_master_data(filename, raw)
         except Exception as e:
             logger.warning("roc_sphere master-data: failed to parse %s: %s", filename, e)
             errors.append(f"{filename}: could not be read — file may be corrupted or password-protected")
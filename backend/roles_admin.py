@@ -37,16 +37,14 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
-from passlib.context import CryptContext
 from pydantic import BaseModel, ConfigDict, Field
 
 from backend.dependencies import db, get_current_user, create_audit_log
+from backend.password_hashing import hash_password
 from backend.models import User, DEFAULT_ROLE_PERMISSIONS, MODULE_HIERARCHY
 
 router = APIRouter(prefix="/role-admin", tags=["Roles Admin"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 BUILTIN_ROLES: Dict[str, Dict[str, str]] = {
     "admin": {
         "label": "Admin",
@@ -414,7 +412,7 @@ async def create_employee(payload: EmployeeIn, current_user: User = Depends(get_
         "full_name": payload.full_name.strip(),
         "role": role["base_role"],
         "role_key": role["key"],
-        "password": pwd_context.hash(payload.password),
+        "password": await hash_password(payload.password),
         "departments": payload.departments or [],
         "phone": payload.phone,
         "permissions": base_template,
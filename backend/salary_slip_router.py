@@ -25,6 +25,8 @@
 #   db.salary_slips             — generated payslips (fully self-contained
 #                                  snapshots, so a slip never changes even if
 #                                  the employee/company record is edited later)
+#   db.salary_slip_pdfs         — pre-rendered PDF per slip (see "Pre-rendering")
+#   db.counters                 — "salary_slip_no_<year>": last slip number issued
 #
 # A "company_key" is either "client:<client_id>" or "manual:<manual_company_id>".
 # The frontend is expected to source the "client:*" options from the existing,
@@ -36,11 +38,17 @@
 
 from __future__ import annotations
 
+import asyncio
+import multiprocessing
+import os
+import re
 import uuid
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
 from io import BytesIO
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
 from fastapi.responses import StreamingResponse
@@ -54,11 +62,14 @@ from reportlab.lib import colors
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    PageBreak, HRFlowable,
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable,
 )
 
+from pymongo import UpdateOne
+
 from backend.dependencies import db, get_current_user, check_module_permission
+from backend.index_manifest import ensure_indexes, index
+from backend.job_runner import job_runner
 from backend.models import User
 
 logger = logging.getLogger("salary_slip")
@@ -210,14 +221,55 @@ def _sum_items(items: List[Dict[str, Any]]) -> float:
     return round(sum(float(it.get("amount") or 0) for it in items), 2)
 
 
-async def _next_slip_no(year: int) -> str:
-    """Human-friendly sequential slip reference, e.g. PS-2026-0007.
-    Uses count_documents (works against both the real MongoDB driver and the
-    in-memory mock DB used in local/dev mode) rather than an atomic counter,
-    which is an acceptable trade-off for a low-volume internal document.
+_SLIP_NO_RE = re.compile(r"^PS-\d{4}-(\d+)$")
+_seeded_slip_years: set = set()
+
+
+def _slip_no(year: int, seq: int) -> str:
+    return f"PS-{year}-{seq:04d}"
+
+
+async def _seed_slip_counter(year: int):
+    """
+    Start the year's counter after the highest number already issued (slips
+    numbered before the counter existed). `$max` makes concurrent seeding
+    harmless; it only ever runs once per year per process.
     """
-    count = await db.salary_slips.count_documents({"slip_year": year})
-    return f"PS-{year}-{count + 1:04d}"
+    if year in _seeded_slip_years:
+        return
+    key = f"salary_slip_no_{year}"
+    if not await db.counters.find_one({"_id": key}):
+        highest = 0
+        async for s in db.salary_slips.find({"slip_year": year}, {"_id": 0, "slip_no": 1}):
+            m = _SLIP_NO_RE.match(s.get("slip_no") or "")
+            if m:
+                highest = max(highest, int(m.group(1)))
+        await db.counters.update_one({"_id": key}, {"$max": {"seq": highest}}, upsert=True)
+    _seeded_slip_years.add(year)
+
+
+async def _reserve_slip_nos(year: int, n: int) -> List[str]:
+    """
+    Reserve `n` consecutive slip references for `year`, e.g. PS-2026-0007,
+    with a single atomic `$inc` on the year's counter — concurrent requests
+    get disjoint blocks. Numbers of a block that ends up unused are skipped.
+    """
+    if n <= 0:
+        return []
+    await _seed_slip_counter(year)
+    counter = await db.counters.find_one_and_update(
+        {"_id": f"salary_slip_no_{year}"},
+        {"$inc": {"seq": n}},
+        upsert=True,
+        return_document=True,
+    )
+    last = counter.get("seq", n)
+    return [_slip_no(year, seq) for seq in range(last - n + 1, last + 1)]
+
+
+async def _next_slip_no(year: int) -> str:
+    """Human-friendly sequential slip reference, e.g. PS-2026-0007."""
+    return (await _reserve_slip_nos(year, 1))[0]
 
 
 # ═════════════════════════════════════════════════════════════════════════
@@ -919,6 +971,7 @@ def _compute_slip_doc(
         "created_by":       created_by,
         "created_at":       _now(),
         "updated_at":       _now(),
+        "pdf_pending":      True,
     }
 
 
@@ -982,13 +1035,14 @@ async def bulk_generate_slips(
     emp_ids = [e["id"] for e in employees]
     years = sorted({p.year for p in periods})
     existing = await db.salary_slips.find(
-        {"employee_id": {"$in": emp_ids}, "year": {"$in": years}},
-        {"_id": 0, "employee_id": 1, "month": 1, "year": 1},
-    ).to_list(20000) if emp_ids else []
-    existing_keys = {(e["employee_id"], e["month"], e["year"]) for e in existing}
+        {"employee_id": {"$in": emp_ids}, "slip_year": {"$in": years}},
+        {"_id": 0, "employee_id": 1, "slip_month": 1, "slip_year": 1},
+    ).to_list(None) if emp_ids else []
+    existing_keys = {(e["employee_id"], e["slip_month"], e["slip_year"]) for e in existing}
 
-    generated: List[Dict[str, Any]] = []
     skipped: List[Dict[str, str]] = []
+    planned: List[Tuple[Dict[str, Any], SlipPeriod, List[Dict[str, Any]], List[Dict[str, Any]]]] = []
+    structures: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
 
     for period in periods:
         for employee in employees:
@@ -997,25 +1051,38 @@ async def bulk_generate_slips(
                 skipped.append({"employee_id": employee["id"], "name": employee.get("name", ""),
                                  "reason": f"Payslip already exists for {MONTH_NAMES[period.month]} {period.year}"})
                 continue
-            earnings = _line_items([SalaryLineItem(**it) for it in employee.get("default_earnings", [])])
-            deductions = _line_items([SalaryLineItem(**it) for it in employee.get("default_deductions", [])])
+            if employee["id"] not in structures:
+                structures[employee["id"]] = (
+                    _line_items([SalaryLineItem(**it) for it in employee.get("default_earnings", [])]),
+                    _line_items([SalaryLineItem(**it) for it in employee.get("default_deductions", [])]),
+                )
+            earnings, deductions = structures[employee["id"]]
             if not earnings:
                 skipped.append({"employee_id": employee["id"], "name": employee.get("name", ""),
                                  "reason": "No default salary structure configured"})
                 continue
-            slip_no = await _next_slip_no(period.year)
-            doc = _compute_slip_doc(
-                employee=employee, company=company, month=period.month, year=period.year,
-                pay_date=body.pay_date, total_days=body.total_days, paid_days=body.paid_days,
-                lop_days=body.lop_days, earnings=earnings, deductions=deductions,
-                template=body.template, notes=None, status=body.status,
-                created_by=current_user.id, slip_no=slip_no,
-            )
-            await db.salary_slips.insert_one({**doc, "_id": doc["id"]})
-            doc.pop("_id", None)
-            generated.append(doc)
+            planned.append((employee, period, earnings, deductions))
             existing_keys.add(key)  # guard against duplicate periods within the same request
 
+    # One block of slip numbers per year, then a single insert for the run
+    per_year: Dict[int, int] = {}
+    for _, period, _, _ in planned:
+        per_year[period.year] = per_year.get(period.year, 0) + 1
+    numbers = {year: iter(await _reserve_slip_nos(year, n)) for year, n in per_year.items()}
+
+    generated: List[Dict[str, Any]] = []
+    for employee, period, earnings, deductions in planned:
+        generated.append(_compute_slip_doc(
+            employee=employee, company=company, month=period.month, year=period.year,
+            pay_date=body.pay_date, total_days=body.total_days, paid_days=body.paid_days,
+            lop_days=body.lop_days, earnings=earnings, deductions=deductions,
+            template=body.template, notes=None, status=body.status,
+            created_by=current_user.id, slip_no=next(numbers[period.year]),
+        ))
+    if generated:
+        await db.salary_slips.insert_many([{**doc, "_id": doc["id"]} for doc in generated], ordered=False)
+        await job_runner.run_now(PDF_RENDER_JOB)
+
     return {
         "generated_count": len(generated),
         "skipped_count":   len(skipped),
@@ -1125,6 +1192,7 @@ async def update_slip(
         updates["net_pay_words"] = amount_in_words(net_pay)
 
     updates["updated_at"] = _now()
+    updates["pdf_pending"] = True
     await db.salary_slips.update_one({"id": slip_id}, {"$set": updates})
     updated = await db.salary_slips.find_one({"id": slip_id}, {"_id": 0})
     return updated
@@ -1139,6 +1207,7 @@ async def delete_slip(
     if not existing:
         raise HTTPException(404, "Salary slip not found")
     await db.salary_slips.delete_one({"id": slip_id})
+    await db.salary_slip_pdfs.delete_one({"_id": slip_id})
     return {"deleted": True}
 
 
@@ -1167,6 +1236,7 @@ async def duplicate_slip(
         "created_by": current_user.id,
         "created_at": _now(),
         "updated_at": _now(),
+        "pdf_pending": True,
     }
     await db.salary_slips.insert_one({**new_doc, "_id": new_doc["id"]})
     new_doc.pop("_id", None)
@@ -1451,24 +1521,139 @@ def build_slip_pdf(slip: dict) -> bytes:
     return buf.getvalue()
 
 
-def build_combined_slip_pdf(slips: List[dict]) -> bytes:
+def _merge_pdfs(parts: List[bytes]) -> bytes:
+    """Concatenate single-slip PDFs into one document (bulk download)."""
+    from pypdf import PdfReader, PdfWriter
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(BytesIO(part)))
+    writer.add_metadata({"/Title": "Payslips"})
     buf = BytesIO()
-    st = _styles()
-    doc = SimpleDocTemplate(
-        buf, pagesize=A4,
-        leftMargin=L_MARGIN, rightMargin=R_MARGIN,
-        topMargin=14 * mm, bottomMargin=16 * mm,
-        title="Payslips",
-    )
-    story: List[Any] = []
-    for i, slip in enumerate(slips):
-        if i > 0:
-            story.append(PageBreak())
-        story.extend(_render_slip_story(slip, st))
-    doc.build(story)
+    writer.write(buf)
     return buf.getvalue()
 
 
+# ── Pre-rendering ───────────────────────────────────────────────────────────
+# New and edited slips carry `pdf_pending: True`. The salary_slip_pdf_render
+# job (every minute, and kicked right after a bulk generate) renders them in
+# a process pool — reportlab is pure Python, so threads would only take turns
+# on the GIL — and stores the bytes in `salary_slip_pdfs`, stamped with the
+# slip's updated_at. Downloads use a stored PDF while its stamp still
+# matches and render the rest in the same pool.
+
+PDF_RENDER_JOB = "salary_slip_pdf_render"
+PDF_WORKERS = int(os.getenv("SALARY_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_RENDER_CHUNK = 20    # slips per pool task
+PDF_RENDER_PAGE = 400    # slips loaded per pass of the render job
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        # spawn, not fork: the parent has a running event loop and driver threads
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+
+def _render_many(slips: List[dict]) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """Pool task: (slip id, pdf, error) per slip, so one bad slip does not sink the chunk."""
+    out = []
+    for slip in slips:
+        try:
+            out.append((slip["id"], build_slip_pdf(slip), None))
+        except Exception as e:
+            out.append((slip["id"], None, str(e)[:300]))
+    return out
+
+
+async def _render_in_pool(slips: List[dict]) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    loop = asyncio.get_running_loop()
+    pool = _get_pdf_pool()
+    chunks = [slips[i:i + PDF_RENDER_CHUNK] for i in range(0, len(slips), PDF_RENDER_CHUNK)]
+    try:
+        results = await asyncio.gather(*(loop.run_in_executor(pool, _render_many, c) for c in chunks))
+    except BrokenProcessPool:
+        shutdown_pdf_pool()  # a worker died (OOM / killed); the next call starts a fresh pool
+        raise
+    return [r for chunk in results for r in chunk]
+
+
+async def _store_pdfs(slips: List[dict], rendered: List[Tuple[str, Optional[bytes], Optional[str]]]):
+    """
+    Save rendered PDFs and clear `pdf_pending` — only where the slip was not
+    edited meanwhile. A slip that fails to render is not retried until its
+    next edit.
+    """
+    stamps = {s["id"]: s.get("updated_at") for s in slips}
+    now = _now()
+    stores, clears = [], []
+    for slip_id, pdf, error in rendered:
+        if pdf is not None:
+            stores.append(UpdateOne(
+                {"_id": slip_id},
+                {"$set": {"pdf": pdf, "rendered_for": stamps[slip_id], "rendered_at": now}},
+                upsert=True,
+            ))
+        else:
+            logger.error(f"Payslip {slip_id}: PDF render failed: {error}")
+        clears.append(UpdateOne({"id": slip_id, "updated_at": stamps[slip_id]}, {"$unset": {"pdf_pending": ""}}))
+    if stores:
+        await db.salary_slip_pdfs.bulk_write(stores, ordered=False)
+    if clears:
+        await db.salary_slips.bulk_write(clears, ordered=False)
+
+
+async def render_pending_slip_pdfs() -> int:
+    """Job-runner entry point: render every slip flagged `pdf_pending`."""
+    done = 0
+    while True:
+        slips = await db.salary_slips.find(
+            {"pdf_pending": True}, {"_id": 0}
+        ).limit(PDF_RENDER_PAGE).to_list(PDF_RENDER_PAGE)
+        if not slips:
+            break
+        await _store_pdfs(slips, await _render_in_pool(slips))
+        done += len(slips)
+    if done:
+        logger.info(f"Rendered {done} payslip PDFs")
+    return done
+
+
+async def _slip_pdfs(slips: List[dict]) -> Dict[str, bytes]:
+    """PDF per slip id: stored copies that are still current, the rest rendered now."""
+    stored = {
+        d["_id"]: d for d in await db.salary_slip_pdfs.find(
+            {"_id": {"$in": [s["id"] for s in slips]}}
+        ).to_list(None)
+    }
+    out: Dict[str, bytes] = {}
+    missing = []
+    for slip in slips:
+        copy = stored.get(slip["id"])
+        if copy and copy.get("pdf") and copy.get("rendered_for") == slip.get("updated_at"):
+            out[slip["id"]] = bytes(copy["pdf"])
+        else:
+            missing.append(slip)
+    if missing:
+        rendered = await _render_in_pool(missing)
+        await _store_pdfs(missing, rendered)
+        for slip_id, pdf, error in rendered:
+            if pdf is None:
+                raise HTTPException(500, f"Could not render payslip PDF: {error}")
+            out[slip_id] = pdf
+    return out
+
+
 def _safe_filename(*parts: str) -> str:
     name = "_".join(p for p in parts if p)
     for ch in ("/", "\\", '"', "'"):
@@ -1484,7 +1669,7 @@ async def download_slip_pdf(
     slip = await db.salary_slips.find_one({"id": slip_id}, {"_id": 0})
     if not slip:
         raise HTTPException(404, "Salary slip not found")
-    pdf_bytes = build_slip_pdf(slip)
+    pdf_bytes = (await _slip_pdfs([slip]))[slip_id]
     filename = _safe_filename(slip.get("employee_name", "payslip"), slip.get("period_label", "")) + ".pdf"
     return StreamingResponse(
         iter([pdf_bytes]),
@@ -1511,7 +1696,9 @@ async def download_bulk_pdf(
     order = {sid: i for i, sid in enumerate(body.slip_ids)}
     slips.sort(key=lambda s: order.get(s["id"], 0))
 
-    pdf_bytes = build_combined_slip_pdf(slips)
+    pdfs = await _slip_pdfs(slips)
+    parts = [pdfs[s["id"]] for s in slips]
+    pdf_bytes = parts[0] if len(parts) == 1 else await asyncio.to_thread(_merge_pdfs, parts)
     label = slips[0].get("period_label", "payslips")
     filename = _safe_filename("Payslips", label) + ".pdf"
     return StreamingResponse(
@@ -1541,17 +1728,20 @@ async def get_presets(
 # INDEXES (call once at startup, idempotent)
 # ═════════════════════════════════════════════════════════════════════════
 
+INDEXES = [
+    index("salary_manual_companies", "id", unique=True),
+    index("salary_employees", "id", unique=True),
+    index("salary_employees", "company_key"),
+    index("salary_employees", "status"),
+    index("salary_slips", "id", unique=True),
+    index("salary_slips", "employee_id"),
+    index("salary_slips", "company_key"),
+    index("salary_slips", [("slip_year", 1), ("slip_month", 1)]),
+    index("salary_slips", "created_at"),
+    index("salary_slips", "pdf_pending", sparse=True),
+]
+
+
 async def create_salary_slip_indexes():
-    try:
-        await db.salary_manual_companies.create_index("id", unique=True, background=True)
-        await db.salary_employees.create_index("id", unique=True, background=True)
-        await db.salary_employees.create_index("company_key", background=True)
-        await db.salary_employees.create_index("status", background=True)
-        await db.salary_slips.create_index("id", unique=True, background=True)
-        await db.salary_slips.create_index("employee_id", background=True)
-        await db.salary_slips.create_index("company_key", background=True)
-        await db.salary_slips.create_index([("slip_year", 1), ("slip_month", 1)], background=True)
-        await db.salary_slips.create_index("created_at", background=True)
-        logger.info("Salary slip indexes ensured")
-    except Exception as exc:
-        logger.warning("Salary slip index creation: %s", exc)
+    """Ensure the salary slip indexes."""
+    await ensure_indexes(INDEXES)
@@ -0,0 +1,193 @@
+"""
+Benchmark bank statement import: dedupe against a large account and
+invoice matching for every new line.
+
+Seeds a throwaway bank account with --existing transactions (default 200k)
+and --invoices open invoices per collection, then imports a --lines
+statement (default 20k) in which --overlap of the lines are already on the
+account. Reports:
+
+  dedupe   old: load the account's history and count keys in Python
+           new: fingerprint `$in` lookups + insert_many
+  backfill one-time fingerprinting of the seeded rows (seeded unfingerprinted,
+           as on an account imported before fingerprints existed)
+  matching old: candidate queries per line (timed on --sample lines and
+           extrapolated)
+           new: one candidate pool for the upload, matched in memory
+
+Matching is timed without posting journal entries. Everything it creates
+is tagged with a random bench id and removed at the end (unless --keep), but
+run it against a scratch database (MONGO_URL / DB_NAME).
+
+Usage:
+    python -m backend.scripts.bench_bank_statement_import
+    python -m backend.scripts.bench_bank_statement_import --existing 50000 --lines 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from backend.dependencies import db
+from backend.bank_accounts import (
+    _CandidatePool,
+    _match_transaction,
+    create_bank_statement_indexes,
+    ensure_bank_fingerprints,
+    import_statement_rows,
+)
+
+DESCRIPTIONS = [
+    "NEFT {n} ACME TRADERS", "UPI/{n}/ZOMATO", "IMPS {n} RENT", "CHQ {n} CLEARING",
+    "ACH DR {n} INSURANCE", "CASH DEPOSIT {n}", "RTGS {n} SUPPLIER PAYMENT",
+]
+
+
+def _random_line(rnd, start, days):
+    amount = round(rnd.uniform(100, 250000), 2)
+    debit = rnd.random() < 0.6
+    return {
+        "date": (start + timedelta(days=rnd.randrange(days))).isoformat(),
+        "description": rnd.choice(DESCRIPTIONS).format(n=rnd.randrange(10**6)),
+        "reference": f"REF{rnd.randrange(10**9)}" if rnd.random() < 0.5 else "",
+        "debit": amount if debit else 0.0,
+        "credit": 0.0 if debit else amount,
+        "balance_after": None,
+    }
+
+
+async def _insert_batches(collection, docs, batch=5000):
+    for i in range(0, len(docs), batch):
+        await collection.insert_many(docs[i:i + batch], ordered=False)
+
+
+async def _seed(args, rnd, bench_id, account_id, company_id, start):
+    history = []
+    docs = []
+    for _ in range(args.existing):
+        line = _random_line(rnd, start, 730)
+        history.append(line)
+        docs.append({**line, "id": str(uuid.uuid4()), "bank_account_id": account_id,
+                     "company_id": company_id, "created_at": "2024-01-01T00:00:00", "bench_id": bench_id})
+    await _insert_batches(db.bank_transactions, docs)
+
+    for i in range(args.invoices):
+        d = (start + timedelta(days=rnd.randrange(730))).isoformat()
+        amount = round(rnd.uniform(100, 250000), 2)
+        await db.purchase_invoices.insert_one({
+            "id": f"{bench_id}-p{i}", "company_id": company_id, "payment_status": "unpaid",
+            "invoice_date": d, "grand_total": amount, "supplier_name": "Bench supplier", "bench_id": bench_id,
+        })
+        await db.invoices.insert_one({
+            "id": f"{bench_id}-s{i}", "company_id": company_id, "status": "sent",
+            "invoice_date": d, "grand_total": amount, "amount_due": amount, "bench_id": bench_id,
+        })
+    return history
+
+
+def _legacy_dedupe(db_txns, rows):
+    empty = ("", "-", ".", "0", "nan", "none", "n/a", "null")
+    db_counts, db_refs = {}, set()
+    for t in db_txns:
+        ref = str(t.get("reference") or "").strip().lower()
+        if ref and ref not in empty:
+            db_refs.add(ref)
+        key = (t["date"], round(float(t.get("debit") or 0.0), 2), round(float(t.get("credit") or 0.0), 2),
+               str(t.get("description") or "").strip().lower())
+        db_counts[key] = db_counts.get(key, 0) + 1
+    uploaded, fresh = {}, []
+    for row in rows:
+        ref = str(row.get("reference") or "").strip().lower()
+        if ref and ref not in empty and ref in db_refs:
+            continue
+        key = (row["date"], round(float(row.get("debit") or 0.0), 2), round(float(row.get("credit") or 0.0), 2),
+               str(row.get("description") or "").strip().lower())
+        seen = uploaded.get(key, 0)
+        uploaded[key] = seen + 1
+        if seen < db_counts.get(key, 0):
+            continue
+        fresh.append(row)
+    return fresh
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--existing", type=int, default=200_000)
+    parser.add_argument("--lines", type=int, default=20_000)
+    parser.add_argument("--overlap", type=float, default=0.25,
+                        help="Fraction of statement lines already on the account.")
+    parser.add_argument("--invoices", type=int, default=5000,
+                        help="Open purchase and sale invoices to seed (each).")
+    parser.add_argument("--sample", type=int, default=500,
+                        help="Lines timed for the per-line matching baseline.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded data in place.")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    bench_id = f"bench-{uuid.uuid4().hex[:8]}"
+    account_id, company_id = f"{bench_id}-acct", f"{bench_id}-co"
+    start = date(2024, 1, 1)
+    await create_bank_statement_indexes()
+
+    t0 = time.perf_counter()
+    history = await _seed(args, rnd, bench_id, account_id, company_id, start)
+    print(f"seeded {args.existing} transactions, {2 * args.invoices} invoices in {time.perf_counter() - t0:.1f}s")
+
+    overlap = int(args.lines * args.overlap)
+    rows = rnd.sample(history, overlap) + [_random_line(rnd, start + timedelta(days=365), 365)
+                                           for _ in range(args.lines - overlap)]
+    rnd.shuffle(rows)
+    try:
+        t0 = time.perf_counter()
+        db_txns = await db.bank_transactions.find({"bank_account_id": account_id}).to_list(None)
+        legacy_fresh = _legacy_dedupe(db_txns, rows)
+        old_dedupe = time.perf_counter() - t0
+        del db_txns
+
+        t0 = time.perf_counter()
+        backfilled = await ensure_bank_fingerprints(account_id)
+        backfill = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        result = await import_statement_rows({"id": account_id, "company_id": company_id}, rows,
+                                             "bench.csv", False, bench_id)
+        new_import = time.perf_counter() - t0
+        saved = result["saved"]
+        assert len(saved) == len(legacy_fresh), (len(saved), len(legacy_fresh))
+
+        sample = saved[:args.sample]
+        t0 = time.perf_counter()
+        for doc in sample:
+            await _match_transaction(company_id, doc)
+        per_line = (time.perf_counter() - t0) / max(1, len(sample))
+
+        t0 = time.perf_counter()
+        pool = await _CandidatePool.load(company_id, [d["date"] for d in saved],
+                                         [d.get("description", "") for d in saved])
+        pool_load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        matched = 0
+        for doc in saved:
+            matched += bool(await _match_transaction(company_id, doc, pool))
+        pooled = time.perf_counter() - t0
+
+        print(f"\nstatement: {args.lines} lines, {len(saved)} new, {args.lines - len(saved)} duplicates")
+        print(f"dedupe    old  load {args.existing} + count in Python : {old_dedupe:8.2f}s (dedupe only, no inserts)")
+        print(f"          new  fingerprint lookup + insert_many     : {new_import:8.2f}s (includes inserting {len(saved)})")
+        print(f"backfill  one-time fingerprinting of {backfilled} rows  : {backfill:8.2f}s")
+        print(f"matching  old  per-line queries                     : {per_line * 1000:8.2f}ms/line "
+              f"-> ~{per_line * len(saved):.1f}s for {len(saved)} lines")
+        print(f"          new  pool load                            : {pool_load:8.2f}s")
+        print(f"          new  in-memory match, all lines           : {pooled:8.2f}s ({matched} matched)")
+    finally:
+        if not args.keep:
+            await db.bank_transactions.delete_many({"bank_account_id": account_id})
+            await db.purchase_invoices.delete_many({"bench_id": bench_id})
+            await db.invoices.delete_many({"bench_id": bench_id})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
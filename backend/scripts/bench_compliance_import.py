@@ -0,0 +1,165 @@
+"""
+Benchmark the compliance assignment Excel import.
+
+Seeds --clients clients (default 50k) and two identical compliance items,
+each with --existing of the file's clients (default 50%) already assigned,
+then imports the same --rows sheet (default 10k) into both:
+
+  old  load every client, walk the sheet with iterrows(), one update_one
+       per existing assignment
+  new  import_assignment_rows(): column-wise mapping, a case-insensitive
+       `$in` lookup of just the names in the sheet, one insert_many and one
+       unordered bulk_write
+
+--missing of the rows name clients that do not exist, and names are written
+in random case. Everything created is tagged with a random bench id and
+removed at the end (unless --keep), but run it against a scratch database
+(MONGO_URL / DB_NAME).
+
+Usage:
+    python -m backend.scripts.bench_compliance_import
+    python -m backend.scripts.bench_compliance_import --clients 20000 --rows 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import pandas as pd
+
+from backend.compliance import STATUSES, create_compliance_indexes, import_assignment_rows
+from backend.dependencies import db
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+async def _legacy_import(compliance_id, df, client_col, status_col, notes_col, assigned_col):
+    """The import loop as it was before the bulk rewrite."""
+    all_clients = await db.clients.find({}, {"_id": 0, "id": 1, "company_name": 1}).to_list(50000)
+    client_name_map = {c["company_name"].strip().lower(): c for c in all_clients if c.get("company_name")}
+    all_users = await db.users.find({}, {"_id": 0, "id": 1, "full_name": 1}).to_list(500)
+    user_name_map = {u["full_name"].strip().lower(): u["id"] for u in all_users if u.get("full_name")}
+    existing_map = {}
+    async for a in db.compliance_assignments.find(
+        {"compliance_id": compliance_id}, {"_id": 0, "id": 1, "client_name": 1}
+    ):
+        existing_map[a["client_name"].strip().lower()] = a["id"]
+
+    to_insert, to_update = [], []
+    for _, row in df.iterrows():
+        raw_name = str(row.get(client_col, "") or "").strip()
+        if not raw_name or raw_name.lower() == "nan":
+            continue
+        name_key = raw_name.lower()
+        client_doc = client_name_map.get(name_key)
+        raw_s = str(row.get(status_col, "") or "").strip().lower().replace(" ", "_")
+        status_val = raw_s if raw_s in STATUSES else "not_started"
+        nv = str(row.get(notes_col, "") or "").strip()
+        notes_val = nv if nv and nv.lower() != "nan" else None
+        assigned_id = user_name_map.get(str(row.get(assigned_col, "") or "").strip().lower())
+        if name_key in existing_map:
+            to_update.append((existing_map[name_key], {"status": status_val, "notes": notes_val,
+                                                        "updated_at": _now(),
+                                                        **({"assigned_to": assigned_id} if assigned_id else {})}))
+        else:
+            doc_id = str(uuid.uuid4())
+            # Unknown names get a unique placeholder client_id; with "" the
+            # ordered insert_many would stop at the unique index.
+            to_insert.append({"_id": doc_id, "id": doc_id, "compliance_id": compliance_id,
+                              "client_id": client_doc["id"] if client_doc else f"missing-{doc_id}",
+                              "client_name": client_doc["company_name"] if client_doc else raw_name,
+                              "status": status_val, "assigned_to": assigned_id, "notes": notes_val,
+                              "created_at": _now(), "updated_at": _now()})
+            existing_map[name_key] = doc_id
+    if to_insert:
+        await db.compliance_assignments.insert_many(to_insert)
+    for aid, upd in to_update:
+        await db.compliance_assignments.update_one({"id": aid}, {"$set": upd})
+    return {"added": len(to_insert), "updated": len(to_update)}
+
+
+async def _seed(args, rnd, bench_id):
+    clients = [{"id": f"{bench_id}-c{i}", "company_name": f"{bench_id} Client {i} Pvt Ltd", "bench_id": bench_id}
+               for i in range(args.clients)]
+    for i in range(0, len(clients), 5000):
+        await db.clients.insert_many(clients[i:i + 5000], ordered=False)
+    users = [{"id": f"{bench_id}-u{i}", "full_name": f"{bench_id} Staff {i}", "bench_id": bench_id}
+             for i in range(20)]
+    await db.users.insert_many(users)
+
+    picked = rnd.sample(clients, min(args.rows, len(clients)))
+    n_existing = int(len(picked) * args.existing)
+    compliance_ids = [f"{bench_id}-old", f"{bench_id}-new"]
+    for cid in compliance_ids:
+        await db.compliance_masters.insert_one({"id": cid, "name": "Bench", "category": "GST", "bench_id": bench_id})
+        docs = []
+        for c in picked[:n_existing]:
+            doc_id = str(uuid.uuid4())
+            docs.append({"_id": doc_id, "id": doc_id, "compliance_id": cid, "client_id": c["id"],
+                         "client_name": c["company_name"], "status": "not_started", "bench_id": bench_id})
+        for i in range(0, len(docs), 5000):
+            await db.compliance_assignments.insert_many(docs[i:i + 5000], ordered=False)
+
+    names = []
+    for i in range(args.rows):
+        if rnd.random() < args.missing:
+            names.append(f"{bench_id} Unknown {i}")
+        else:
+            name = picked[i % len(picked)]["company_name"]
+            names.append(rnd.choice([name, name.upper(), name.lower()]))
+    df = pd.DataFrame({
+        "Client Name": names,
+        "Status": [rnd.choice(STATUSES + ["In Progress", ""]) for _ in names],
+        "Notes": [rnd.choice(["", "checked", "awaiting docs"]) for _ in names],
+        "Assigned To": [rnd.choice(users)["full_name"] for _ in names],
+    })
+    return compliance_ids, df
+
+
+async def _cleanup(bench_id, compliance_ids):
+    await db.compliance_assignments.delete_many({"compliance_id": {"$in": compliance_ids}})
+    for collection in ("clients", "users", "compliance_masters"):
+        await db[collection].delete_many({"bench_id": bench_id})
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=50_000)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--existing", type=float, default=0.5,
+                        help="Fraction of the sheet's clients already assigned.")
+    parser.add_argument("--missing", type=float, default=0.05,
+                        help="Fraction of rows naming clients that do not exist.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded data in place.")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    bench_id = f"bench-{uuid.uuid4().hex[:8]}"
+    await create_compliance_indexes()
+
+    t0 = time.perf_counter()
+    (old_id, new_id), df = await _seed(args, rnd, bench_id)
+    print(f"seeded {args.clients} clients, {args.rows}-row sheet in {time.perf_counter() - t0:.1f}s")
+    try:
+        t0 = time.perf_counter()
+        old = await _legacy_import(old_id, df, "Client Name", "Status", "Notes", "Assigned To")
+        old_secs = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        new = await import_assignment_rows(new_id, df, "Client Name", "Status", "Notes", "Assigned To")
+        new_secs = time.perf_counter() - t0
+
+        print(f"old  {old_secs:8.2f}s  added {old['added']:6d}  updated {old['updated']:6d}  (updates = rows)")
+        print(f"new  {new_secs:8.2f}s  added {new['added']:6d}  updated {new['updated']:6d}  (updates = assignments)")
+        print(f"speedup {old_secs / new_secs:.1f}x" if new_secs else "")
+    finally:
+        if not args.keep:
+            await _cleanup(bench_id, [old_id, new_id])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
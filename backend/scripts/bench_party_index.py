@@ -0,0 +1,140 @@
+"""
+Benchmark vendor-name matching against the in-memory party index.
+
+Builds --parties synthetic company names (default 50k) and matches --queries
+vendor names against them (default 2000: variants of existing names with
+another legal form, word order or case, plus names that match nothing):
+
+  old  the purchase matcher as it was: normalize every party name and
+       compute the Jaccard overlap with each one, per query
+  new  PartyIndex.top_k(): walk the query's tokens rarest first and stop
+       once no unscored party can make the top 5
+
+Both return the top 5 above 0.3; the script checks they agree (the old
+scan counting name containment by whole words, as the index does). Runs
+in memory, no database needed.
+
+Usage:
+    python -m backend.scripts.bench_party_index
+    python -m backend.scripts.bench_party_index --parties 100000 --queries 5000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from backend.search.party_index import PartyIndex, normalize_name
+
+WORDS = (
+    "shree sai ganesh krishna balaji laxmi durga om sri royal national global star "
+    "sun moon bharat india hind deccan coastal metro urban rural green blue silver "
+    "golden diamond crystal prime supreme elite apex pioneer classic modern smart "
+    "tech info soft net data cloud digital systems solutions services consultants "
+    "logistics transport travels foods agro dairy textiles garments steel cement "
+    "chemicals pharma healthcare motors auto electricals electronics builders "
+    "developers constructions infra realty exports imports trading marketing media"
+).split()
+FORMS = ["Pvt Ltd", "Private Limited", "LLP", "Ltd", "& Co", "Enterprises", "Traders", ""]
+
+
+def _legacy_match(target_name, clients):
+    """The per-query scan _match_clients did before the index (containment by whole words)."""
+    target = normalize_name(target_name)
+    if not target:
+        return []
+    target_tokens = set(target.split())
+    scored = []
+    for c in clients:
+        cn = normalize_name(c.get("company_name"))
+        if not cn:
+            continue
+        tokens = set(cn.split())
+        overlap = len(target_tokens & tokens)
+        score = overlap / (len(target_tokens | tokens) or 1)
+        if cn == target:
+            score = 1.0
+        elif f" {target} " in f" {cn} " or f" {cn} " in f" {target} ":
+            score = max(score, 0.85)
+        if score >= 0.3:
+            scored.append((c["id"], round(score, 2)))
+    scored.sort(key=lambda x: -x[1])
+    return scored[:5]
+
+
+SYLLABLES = "ka ra ma na sha ta vi de pa la ja su ri ni go ve mi ro bha kri".split()
+
+
+def _proper_nouns(rnd, n):
+    """Surname / brand-like words, the long tail real party names are made of."""
+    return ["".join(rnd.choice(SYLLABLES) for _ in range(rnd.choice((2, 3, 3, 4)))) for _ in range(n)]
+
+
+def _name(rnd, proper):
+    # A distinctive word or two, then common business words (Zipf-ish: the
+    # first words of WORDS are the most frequent).
+    words = rnd.sample(proper, rnd.choice((1, 1, 2)))
+    words += [WORDS[min(int(rnd.paretovariate(1.2)) - 1, len(WORDS) - 1)] for _ in range(rnd.choice((1, 2, 2, 3)))]
+    return " ".join(w.title() for w in dict.fromkeys(words)) + (" " + rnd.choice(FORMS)).rstrip()
+
+
+def _variant(rnd, name):
+    words = normalize_name(name).split()
+    if len(words) > 1 and rnd.random() < 0.3:
+        rnd.shuffle(words)
+    text = " ".join(words) + " " + rnd.choice(FORMS)
+    return rnd.choice([text, text.upper(), text.title()])
+
+
+def _pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--parties", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--legacy-queries", type=int, default=100,
+                        help="Queries to time the old full scan on (it is slow).")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    proper = _proper_nouns(rnd, max(1000, args.parties // 3))
+    clients = [{"id": f"c{i}", "company_name": _name(rnd, proper)} for i in range(args.parties)]
+    queries = [_variant(rnd, rnd.choice(clients)["company_name"]) if rnd.random() < 0.8
+               else f"{rnd.choice(['Zenith', 'Orbit', 'Quasar'])} {rnd.choice(WORDS).title()} Works"
+               for _ in range(args.queries)]
+
+    t0 = time.perf_counter()
+    idx = PartyIndex("clients")
+    for c in clients:
+        idx.put(c)
+    print(f"indexed {len(idx)} parties, {len(idx.postings)} tokens in {time.perf_counter() - t0:.2f}s")
+
+    new_times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        idx.top_k(q, k=5, min_score=0.3)
+        new_times.append(time.perf_counter() - t0)
+
+    old_times, mismatches = [], 0
+    for q in queries[:args.legacy_queries]:
+        t0 = time.perf_counter()
+        old = _legacy_match(q, clients)
+        old_times.append(time.perf_counter() - t0)
+        new = [(p["id"], round(s, 2)) for s, p in idx.top_k(q, k=5, min_score=0.3)]
+        # Same scores; ids may differ only among equal scores at the cut.
+        if [s for _, s in old] != [s for _, s in new]:
+            mismatches += 1
+
+    for label, times in (("old", old_times), ("new", new_times)):
+        print(f"{label}  {len(times):6d} queries  p50 {_pct(times, .5) * 1e3:8.3f} ms"
+              f"  p99 {_pct(times, .99) * 1e3:8.3f} ms  mean {statistics.mean(times) * 1e3:8.3f} ms")
+    print(f"score mismatches: {mismatches} / {len(old_times)}")
+    if old_times:
+        print(f"speedup {statistics.mean(old_times) / statistics.mean(new_times):.0f}x (mean)")
+
+
+if __name__ == "__main__":
+    main()
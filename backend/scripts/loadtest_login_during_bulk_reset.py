@@ -0,0 +1,113 @@
+"""
+Measure client-portal login latency on its own and while a bulk portal
+password reset is running, to check that bcrypt work from the reset does not
+starve interactive logins.
+
+Runs against a live server. The bulk reset really resets the selected
+accounts, so point it at a staging database.
+
+Usage:
+    python -m backend.scripts.loadtest_login_during_bulk_reset \\
+        --base-url http://localhost:8000 \\
+        --admin-email admin@example.com --admin-password ... \\
+        --portal-username demo --portal-password ... \\
+        --concurrency 20 --duration 15
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+async def _login_loop(client, args, stop_at, samples, errors):
+    payload = {"username": args.portal_username, "password": args.portal_password}
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            resp = await client.post("/api/client-portal/login", json=payload)
+            if resp.status_code != 200:
+                errors.append(resp.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        samples.append((time.perf_counter() - started) * 1000)
+
+
+async def _measure(client, args):
+    samples, errors = [], []
+    stop_at = time.monotonic() + args.duration
+    await asyncio.gather(*(
+        _login_loop(client, args, stop_at, samples, errors) for _ in range(args.concurrency)
+    ))
+    return samples, errors
+
+
+def _report(label, samples, errors):
+    print(
+        f"{label:<22} n={len(samples):<6} errors={len(errors):<4} "
+        f"p50={_percentile(samples, 50):8.1f}ms  p95={_percentile(samples, 95):8.1f}ms  "
+        f"p99={_percentile(samples, 99):8.1f}ms  mean={statistics.fmean(samples) if samples else float('nan'):8.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--admin-email", required=True)
+    parser.add_argument("--admin-password", required=True)
+    parser.add_argument("--portal-username", required=True)
+    parser.add_argument("--portal-password", required=True)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per phase")
+    parser.add_argument("--portal-user-id", action="append", required=True,
+                        help="Account to bulk-reset (repeatable). Must not include the "
+                             "account used for --portal-username, or its logins start failing.")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        resp = await client.post(
+            "/api/auth/login", json={"email": args.admin_email, "password": args.admin_password}
+        )
+        resp.raise_for_status()
+        admin_headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+        baseline = await _measure(client, args)
+
+        reset_body = {"portal_user_ids": args.portal_user_id}
+        reset_started = time.perf_counter()
+        reset_task = asyncio.create_task(client.post(
+            "/api/client-portal/users/bulk-reset-password", json=reset_body, headers=admin_headers,
+            timeout=None,
+        ))
+        # Give the reset a moment to reach the hashing stage before sampling
+        await asyncio.sleep(0.2)
+        during = await _measure(client, args)
+        reset_resp = await reset_task
+        reset_ms = (time.perf_counter() - reset_started) * 1000
+
+    _report("baseline", *baseline)
+    _report("during bulk reset", *during)
+    if reset_resp.status_code == 200:
+        data = reset_resp.json()
+        print(f"bulk reset: {data.get('reset_count')} reset, {data.get('failed_count')} failed "
+              f"in {reset_ms:.0f}ms")
+    else:
+        print(f"bulk reset failed: HTTP {reset_resp.status_code} {reset_resp.text[:200]}")
+    if reset_ms < args.duration * 1000:
+        print("note: the reset finished before the sampling window ended; "
+              "use more accounts or a shorter --duration for a tighter comparison")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
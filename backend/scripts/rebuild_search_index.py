@@ -0,0 +1,32 @@
+"""
+Backfill (or fully rebuild) the `search_index` collection used by entity
+search, the client typeahead and WhatsApp Hub search.
+
+Safe to run while the app is serving traffic: entries are upserted in place
+and only entries for records that no longer exist are removed.
+
+Usage:
+    python -m backend.scripts.rebuild_search_index                 # all kinds
+    python -m backend.scripts.rebuild_search_index --kind clients  # one kind
+"""
+import argparse
+import asyncio
+
+from backend.search.search_index import KINDS, create_search_index_indexes, rebuild
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--kind", choices=KINDS, action="append",
+                        help="Kind to rebuild (repeatable). Default: all.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    await create_search_index_indexes()
+    for kind in args.kind or KINDS:
+        count = await rebuild(kind, batch_size=args.batch_size)
+        print(f"{kind}: {count} index entries")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Trim the whitespace around stored client names.
+
+compliance._clients_by_name matches company_name exactly (ignoring case
+only), so a name saved with stray spaces before client write sites started
+trimming never matches an import row. Each repaired client goes through
+change_hooks, so the dashboard counters, search index and list-sync views
+see the rename. A name whose trimmed form is taken by another client of the
+same creator is reported and left as it is.
+
+Usage:
+    python -m backend.scripts.trim_client_names            # trim
+    python -m backend.scripts.trim_client_names --dry-run  # report only
+"""
+import argparse
+import asyncio
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+from backend import change_hooks
+from backend.dependencies import db
+
+logger = logging.getLogger(__name__)
+
+
+async def trim_client_names(dry_run: bool = False) -> int:
+    """Returns the number of names trimmed (or, with dry_run, to trim)."""
+    trimmed = 0
+    async for c in db.clients.find({"company_name": {"$regex": r"^\s|\s$"}}, {"_id": 0}):
+        name = c.get("company_name")
+        if not isinstance(name, str) or name.strip() == name:
+            continue
+        if dry_run:
+            print(f"{c['id']}: {name!r}")
+            trimmed += 1
+            continue
+        try:
+            result = await db.clients.update_one({"id": c["id"], "company_name": name},
+                                                 {"$set": {"company_name": name.strip()}})
+        except DuplicateKeyError:
+            logger.warning(f"Client {c['id']}: trimmed name {name.strip()!r} is taken; left untrimmed")
+            continue
+        if result.modified_count:
+            await change_hooks.record_change("clients", c, {**c, "company_name": name.strip()})
+            trimmed += 1
+    return trimmed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dry-run", action="store_true", help="List the padded names without changing them.")
+    args = parser.parse_args()
+
+    count = await trim_client_names(dry_run=args.dry_run)
+    print(f"{count} client names {'to trim' if args.dry_run else 'trimmed'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
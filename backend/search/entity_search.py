@@ -23,6 +23,7 @@ import re
 from typing import Any, Dict, List, Optional
 
 from backend.dependencies import db
+from backend.search import search_index
 
 logger = logging.getLogger("entity_search")
 
@@ -77,6 +78,15 @@ def _or(fields: List[str], query: str) -> Dict[str, Any]:
     return {"$or": [{f: rx} for f in fields]}
 
 
+async def _fetch_ranked(collection, key: str, ids: List[str], projection: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Load records by id, returned in the order of `ids` (index rank)."""
+    if not ids:
+        return []
+    docs = await collection.find({key: {"$in": ids}}, projection).to_list(len(ids))
+    by_id = {d.get(key): d for d in docs}
+    return [by_id[i] for i in ids if i in by_id]
+
+
 async def _user_name_map(user_ids: List[Optional[str]]) -> Dict[str, str]:
     ids = sorted({u for u in user_ids if u})
     if not ids:
@@ -91,9 +101,13 @@ class EntitySearch:
     # ── Clients / companies ────────────────────────────────────────────────
     @staticmethod
     async def search_clients(query: str, limit: int = 25) -> List[Dict[str, Any]]:
-        docs = await db.clients.find(
-            _or(CLIENT_TEXT_FIELDS, query), {"_id": 0}
-        ).limit(limit).to_list(limit)
+        hits = await search_index.search("client", query, limit)
+        if hits is not None:
+            docs = await _fetch_ranked(db.clients, "id", [h["ref_id"] for h in hits], {"_id": 0})
+        else:
+            docs = await db.clients.find(
+                _or(CLIENT_TEXT_FIELDS, query), {"_id": 0}
+            ).limit(limit).to_list(limit)
         if not docs:
             return []
 
@@ -168,6 +182,12 @@ class EntitySearch:
     async def search_individuals(query: str, limit: int = 25) -> List[Dict[str, Any]]:
         """Matches a person's name/DIN inside any client's contact_persons,
         and returns one row per matching person (not per company)."""
+        projection = {"_id": 0, "id": 1, "company_name": 1, "assigned_to": 1,
+                      "contact_persons": 1, "dsc_details": 1}
+        hits = await search_index.search("individual", query, limit)
+        if hits is not None:
+            return await EntitySearch._individual_rows(hits, projection)
+
         rx = _rx(query)
         docs = await db.clients.find(
             {"$or": [
@@ -225,21 +245,82 @@ class EntitySearch:
                     })
         return rows[:limit]
 
+    @staticmethod
+    async def _individual_rows(hits: List[Dict[str, Any]], projection: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Rows for index hits, which point at one contact person / DSC holder each."""
+        client_ids = list(dict.fromkeys(h["ref_id"] for h in hits))
+        clients = {d["id"]: d for d in await _fetch_ranked(db.clients, "id", client_ids, projection)}
+        names = await _user_name_map([c.get("assigned_to") for c in clients.values()])
+
+        rows: List[Dict[str, Any]] = []
+        for h in hits:
+            d = clients.get(h["ref_id"])
+            field, idx = h.get("path") or (None, None)
+            items = (d or {}).get(field) or []
+            if not d or not isinstance(idx, int) or idx >= len(items) or not isinstance(items[idx], dict):
+                continue
+            item = items[idx]
+            assigned = {
+                "company_name": d.get("company_name"),
+                "assigned_to": d.get("assigned_to"),
+                "assigned_to_name": names.get(d.get("assigned_to") or "", "Unassigned"),
+            }
+            if field == "contact_persons":
+                rows.append({
+                    "source": "individual",
+                    "entity": "individual",
+                    "id": f"{d.get('id')}::{item.get('name')}",
+                    "client_id": d.get("id"),
+                    "title": item.get("name") or "Unnamed person",
+                    "subtitle": item.get("designation") or "Contact person",
+                    "din": item.get("din"),
+                    "email": item.get("email"),
+                    "phone": item.get("phone"),
+                    **assigned,
+                    "link": "/clients",
+                })
+            else:
+                rows.append({
+                    "source": "individual",
+                    "entity": "individual",
+                    "id": f"{d.get('id')}::dsc::{item.get('certificate_number')}",
+                    "client_id": d.get("id"),
+                    "title": item.get("holder_name"),
+                    "subtitle": "DSC holder",
+                    "expiry_date": item.get("expiry_date"),
+                    **assigned,
+                    "link": "/dsc",
+                })
+        return rows
+
     # ── Tasks ──────────────────────────────────────────────────────────────
     @staticmethod
     async def search_tasks(query: str, limit: int = 25) -> List[Dict[str, Any]]:
         # Tasks match either on their own text, or by belonging to a client
         # whose name matches ("show me everything for Desai Tech Weave").
-        matched_clients = await db.clients.find(
-            {"company_name": _rx(query)}, {"_id": 0, "id": 1, "company_name": 1}
-        ).limit(50).to_list(50)
-        client_names = {c["id"]: c.get("company_name") for c in matched_clients}
-
-        or_clauses: List[Dict[str, Any]] = [{f: _rx(query)} for f in TASK_TEXT_FIELDS]
-        if client_names:
-            or_clauses.append({"client_id": {"$in": list(client_names.keys())}})
-
-        docs = await db.tasks.find({"$or": or_clauses}, {"_id": 0}).limit(limit).to_list(limit)
+        task_hits = await search_index.search("task", query, limit)
+        client_hits = await search_index.search("client", query, 50) if task_hits is not None else None
+        if task_hits is not None and client_hits is not None:
+            # Title matches from the index first, then tasks of matching clients
+            client_names = {h["ref_id"]: h.get("title") for h in client_hits}
+            docs = await _fetch_ranked(db.tasks, "id", [h["ref_id"] for h in task_hits], {"_id": 0})
+            if len(docs) < limit and client_names:
+                have = [d.get("id") for d in docs]
+                docs += await db.tasks.find(
+                    {"client_id": {"$in": list(client_names.keys())}, "id": {"$nin": have}},
+                    {"_id": 0},
+                ).limit(limit - len(docs)).to_list(limit - len(docs))
+        else:
+            matched_clients = await db.clients.find(
+                {"company_name": _rx(query)}, {"_id": 0, "id": 1, "company_name": 1}
+            ).limit(50).to_list(50)
+            client_names = {c["id"]: c.get("company_name") for c in matched_clients}
+
+            or_clauses: List[Dict[str, Any]] = [{f: _rx(query)} for f in TASK_TEXT_FIELDS]
+            if client_names:
+                or_clauses.append({"client_id": {"$in": list(client_names.keys())}})
+
+            docs = await db.tasks.find({"$or": or_clauses}, {"_id": 0}).limit(limit).to_list(limit)
         if not docs:
             return []
 
@@ -0,0 +1,408 @@
+"""In-memory inverted token index over party names, for matching a vendor or
+"billed to" name from an uploaded document against the firm's clients and
+companies, plus the compiled zero-touch category rules.
+
+The purchase upload used to load up to 5000 clients and compute token
+overlap against every one of them; zero-touch entry re-read the company
+list and the category rules for every document. Instead each worker keeps:
+
+  parties   per kind ("clients", "companies"): id -> {id, name, norm,
+            tokens, ...extra fields}, in load order
+  postings  normalized token -> name length in tokens -> ids of the parties
+            whose name contains it
+  by_norm   normalized name -> ids
+  keys      exact lookups (company GSTIN / email) -> id
+  rules     company id -> compiled category rules
+
+`top_k(kind, name)` scores with the Jaccard overlap of normalized name
+tokens the purchase matcher always used (exact name = 1.0, one name
+contained in the other >= 0.85). It walks the query's words from rarest to
+commonest and scores the parties in each posting list; a party not reached
+after i words lacks i of the query's n words, so it scores at most
+(n - i) / n and the walk stops once that is below min_score or the k-th
+best score. Posting lists are split by name length so long names that
+cannot reach that score are skipped. Parties whose whole name is a run of
+the query's words are looked up directly. Containment counts whole words
+only, so "jaro shree" no longer scores 0.85 against "desujaro shree".
+
+Freshness: write sites call `record_change(kind, before, after)`, which
+applies the change locally and appends it to `party_index_changes`; every
+PARTY_INDEX_TTL seconds each worker replays the changes made on other
+workers (re-reading those records). `mark_dirty(kind)` after bulk writes
+bumps a generation in `party_index_meta` and every worker reloads the kind
+in full; so does the periodic full reload. The first lookup on a worker
+waits for the load, later refreshes run in the background.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from backend.dependencies import db
+from backend.index_manifest import ensure_indexes, index
+
+logger = logging.getLogger("party_index")
+
+TTL_SEC = int(os.getenv("PARTY_INDEX_TTL", "10"))
+FULL_RELOAD_SEC = 1800
+CHANGE_RETENTION_SEC = 86400
+RULE_CACHE_MAX = 1000
+
+KINDS = ("clients", "companies")
+
+# kind -> (collection, name field, extra fields kept with the party, exact-lookup fields)
+_SOURCES = {
+    "clients": ("clients", "company_name", (), ()),
+    "companies": ("companies", "name", ("gstin", "email"), ("gstin", "email")),
+}
+
+_SUFFIXES = re.compile(
+    r"\b(pvt\.?|private|ltd\.?|limited|llp|inc\.?|co\.?|company|the|enterprises|traders|industries)\b"
+)
+
+
+def normalize_name(name: Any) -> str:
+    """Lower-case, drop legal-form / filler words and punctuation."""
+    s = _SUFFIXES.sub("", str(name or "").lower())
+    return re.sub(r"[^a-z0-9]+", " ", s).strip()
+
+
+def _key_value(field: str, value: Any) -> str:
+    v = str(value or "").strip()
+    return v.upper() if field == "gstin" else v.lower()
+
+
+def _floor(heap: List[Tuple[float, int, str]], k: int, min_score: float) -> float:
+    """Score a new candidate has to reach: min_score, or the k-th best once there are k."""
+    return heap[0][0] if len(heap) == k else min_score
+
+
+class PartyIndex:
+    def __init__(self, kind: str):
+        self.kind = kind
+        _, self.name_field, self.extra_fields, self.key_fields = _SOURCES[kind]
+        self.parties: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[int, Set[str]]] = {}
+        self.df: Dict[str, int] = {}
+        self.by_norm: Dict[str, Set[str]] = {}
+        self.keys: Dict[str, Dict[str, str]] = {f: {} for f in self.key_fields}
+        self.generation = 0
+        self.loaded_at = float("-inf")   # monotonic time of the last full load
+        self.synced_at = float("-inf")   # monotonic time of the last refresh
+        self.synced_wall: Optional[datetime] = None
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.parties)
+
+    def put(self, doc: Dict[str, Any]):
+        pid = doc.get("id")
+        if not pid:
+            return
+        seq = self.parties[pid]["seq"] if pid in self.parties else None
+        self.drop(pid)
+        if seq is None:
+            self._seq += 1
+            seq = self._seq
+        name = doc.get(self.name_field) or ""
+        norm = normalize_name(name)
+        party = {"id": pid, "name": name, "norm": norm, "tokens": frozenset(norm.split()), "seq": seq,
+                 **{f: doc.get(f) for f in self.extra_fields}}
+        self.parties[pid] = party
+        size = len(party["tokens"])
+        for t in party["tokens"]:
+            self.postings.setdefault(t, {}).setdefault(size, set()).add(pid)
+            self.df[t] = self.df.get(t, 0) + 1
+        if norm:
+            self.by_norm.setdefault(norm, set()).add(pid)
+        for f in self.key_fields:
+            v = _key_value(f, doc.get(f))
+            if v:
+                self.keys[f].setdefault(v, pid)
+
+    def drop(self, pid: str):
+        party = self.parties.pop(pid, None)
+        if not party:
+            return
+        size = len(party["tokens"])
+        for t in party["tokens"]:
+            buckets = self.postings.get(t, {})
+            bucket = buckets.get(size)
+            if bucket is not None and pid in bucket:
+                bucket.remove(pid)
+                if not bucket:
+                    del buckets[size]
+                self.df[t] -= 1
+                if not self.df[t]:
+                    del self.postings[t], self.df[t]
+        bucket = self.by_norm.get(party["norm"])
+        if bucket is not None:
+            bucket.discard(pid)
+            if not bucket:
+                del self.by_norm[party["norm"]]
+        for f in self.key_fields:
+            v = _key_value(f, party.get(f))
+            if v and self.keys[f].get(v) == pid:
+                del self.keys[f][v]
+                # Another party may share the value
+                for other in self.parties.values():
+                    if _key_value(f, other.get(f)) == v:
+                        self.keys[f][v] = other["id"]
+                        break
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Every party in load order."""
+        return sorted(self.parties.values(), key=lambda p: p["seq"])
+
+    def lookup(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        pid = self.keys.get(field, {}).get(_key_value(field, value))
+        return self.parties.get(pid) if pid else None
+
+    def top_k(self, name: str, k: int = 5, min_score: float = 0.3) -> List[Tuple[float, Dict[str, Any]]]:
+        norm = normalize_name(name)
+        words = norm.split()
+        query = frozenset(words)
+        if not query or k <= 0:
+            return []
+        padded = f" {norm} "
+        heap: List[Tuple[float, int, str]] = []   # k best as (score, -seq, id), worst first
+        seen: Set[str] = set()
+
+        def consider(pid: str):
+            seen.add(pid)
+            p = self.parties[pid]
+            overlap = len(query & p["tokens"])
+            score = overlap / (len(query) + len(p["tokens"]) - overlap)
+            if p["norm"] == norm:
+                score = 1.0
+            elif padded in f" {p['norm']} " or f" {p['norm']} " in padded:
+                score = max(score, 0.85)
+            if score >= min_score:
+                item = (score, -p["seq"], pid)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+        # Parties named by a run of the query's words ("tech" in "sharma tech
+        # solutions") score by containment without sharing a rare word.
+        for i in range(len(words)):
+            for j in range(i + 1, len(words) + 1):
+                for pid in self.by_norm.get(" ".join(words[i:j]), ()):
+                    if pid not in seen:
+                        consider(pid)
+
+        n = len(query)
+        for i, token in enumerate(sorted(query, key=lambda t: self.df.get(t, 0))):
+            # Parties not seen yet lack the i rarest query words, so one with
+            # `size` words shares at most m = min(n - i, size) with the query.
+            # Containment (0.85) needs every query word: only possible at i == 0.
+            if (n - i) / n < _floor(heap, k, min_score):
+                break
+            for size, bucket in self.postings.get(token, {}).items():
+                m = min(n - i, size)
+                bound = max(m / (n + size - m), 0.85 if i == 0 else 0.0)
+                if bound < _floor(heap, k, min_score):
+                    continue
+                for pid in bucket:
+                    if pid not in seen:
+                        consider(pid)
+        return [(score, self.parties[pid]) for score, _, pid in sorted(heap, reverse=True)]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# LOADING / SYNC
+# ─────────────────────────────────────────────────────────────────────────────
+
+_indexes: Dict[str, PartyIndex] = {}
+_load_locks: Dict[str, asyncio.Lock] = {}
+_refreshing: Set[str] = set()
+_refresh_tasks: Set[asyncio.Task] = set()
+_rules: Dict[str, Tuple[List[Tuple[Pattern, Dict[str, Any]]], Optional[Pattern]]] = {}
+
+
+def _projection(kind: str) -> Dict[str, int]:
+    _, name_field, extra, _keys = _SOURCES[kind]
+    return {"_id": 0, "id": 1, name_field: 1, **{f: 1 for f in extra}}
+
+
+async def _generation(kind: str) -> int:
+    meta = await db.party_index_meta.find_one({"_id": "meta"}) or {}
+    return meta.get(f"generation_{kind}", 0)
+
+
+async def _load(kind: str) -> PartyIndex:
+    started = datetime.now(timezone.utc) - timedelta(seconds=5)
+    idx = PartyIndex(kind)
+    idx.generation = await _generation(kind)
+    collection = _SOURCES[kind][0]
+    n = 0
+    async for doc in db[collection].find({}, _projection(kind)):
+        idx.put(doc)
+        n += 1
+        if n % 1000 == 0:
+            await asyncio.sleep(0)  # don't starve requests while loading
+    idx.loaded_at = idx.synced_at = time.monotonic()
+    idx.synced_wall = started
+    _indexes[kind] = idx
+    logger.info(f"[PartyIndex] Loaded {n} {kind}")
+    return idx
+
+
+async def _refresh(kind: str):
+    """Replay other workers' changes, or reload in full when the kind was bulk-written."""
+    try:
+        idx = _indexes.get(kind)
+        if idx is None or time.monotonic() - idx.loaded_at > FULL_RELOAD_SEC \
+                or await _generation(kind) != idx.generation:
+            await _load(kind)
+            if kind == "companies":
+                _rules.clear()
+            return
+        now, wall = time.monotonic(), datetime.now(timezone.utc) - timedelta(seconds=5)
+        kinds = [kind, "rules"] if kind == "companies" else [kind]
+        changes = await db.party_index_changes.find(
+            {"at": {"$gte": idx.synced_wall}, "kind": {"$in": kinds}}, {"_id": 0, "kind": 1, "ref_id": 1}
+        ).to_list(None)
+        ids = {c["ref_id"] for c in changes if c["kind"] == kind}
+        if ids:
+            collection = _SOURCES[kind][0]
+            found = {d["id"]: d for d in await db[collection].find(
+                {"id": {"$in": list(ids)}}, _projection(kind)).to_list(None)}
+            for pid in ids:
+                if pid in found:
+                    idx.put(found[pid])
+                else:
+                    idx.drop(pid)
+        if kind == "companies":
+            for c in changes:
+                if c["kind"] == "rules":
+                    _rules.pop(c["ref_id"], None)
+        idx.synced_at, idx.synced_wall = now, wall
+    except Exception as e:
+        logger.warning(f"[PartyIndex] Refresh of {kind} failed: {e}")
+    finally:
+        _refreshing.discard(kind)
+
+
+async def get_index(kind: str) -> PartyIndex:
+    """
+    The worker's index for `kind`, loading it on first use. A copy older than
+    PARTY_INDEX_TTL keeps serving while it is refreshed in the background.
+    """
+    idx = _indexes.get(kind)
+    if idx is None:
+        lock = _load_locks.setdefault(kind, asyncio.Lock())
+        async with lock:
+            idx = _indexes.get(kind) or await _load(kind)
+    elif time.monotonic() - idx.synced_at > TTL_SEC and kind not in _refreshing:
+        _refreshing.add(kind)
+        task = asyncio.create_task(_refresh(kind))
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+    return idx
+
+
+async def top_k(kind: str, name: str, k: int = 5, min_score: float = 0.3) -> List[Tuple[float, Dict[str, Any]]]:
+    """Best-scoring parties of `kind` for `name`, highest first."""
+    return (await get_index(kind)).top_k(name, k, min_score)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CATEGORY RULES
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _compile_rules(rules: Iterable[Dict[str, Any]]):
+    compiled = []
+    for rule in rules:
+        try:
+            compiled.append((re.compile(rule["match"], re.IGNORECASE), rule))
+        except (re.error, KeyError, TypeError) as e:
+            logger.warning(f"[PartyIndex] Skipping invalid category rule {rule.get('match')!r}: {e}")
+    try:
+        # One pass answers "does any rule match?" for the common no-match case.
+        combined = re.compile("|".join(f"(?:{p.pattern})" for p, _ in compiled), re.IGNORECASE) \
+            if compiled else None
+    except re.error:
+        combined = None
+    return compiled, combined
+
+
+async def category_rules(company_id: str, defaults: List[Dict[str, Any]]):
+    """
+    Compiled category rules of a company (its own, else `defaults`), as
+    ([(pattern, rule), ...] in priority order, combined pattern or None).
+    """
+    await get_index("companies")  # keeps the change feed (and rule invalidation) ticking
+    cached = _rules.get(company_id)
+    if cached is None:
+        rows = await db.zte_category_rules.find({"company_id": company_id}, {"_id": 0}).to_list(500)
+        if len(_rules) >= RULE_CACHE_MAX:
+            _rules.clear()
+        cached = _rules[company_id] = _compile_rules(rows or defaults)
+    return cached
+
+
+def first_rule(compiled, text: str) -> Optional[Dict[str, Any]]:
+    """The first rule (in priority order) whose pattern occurs in `text`."""
+    rules, combined = compiled
+    if combined is not None and not combined.search(text):
+        return None
+    return next((rule for pattern, rule in rules if pattern.search(text)), None)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WRITE PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def record_change(kind: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """
+    Apply one written record (after=None for a delete; kind "rules" takes the
+    rule documents and invalidates their company's rules). Never raises: on
+    failure the kind is marked dirty and every worker reloads it.
+    """
+    ref_id = (after or before or {}).get("company_id" if kind == "rules" else "id")
+    if ref_id is None or (kind != "rules" and not ref_id):
+        return
+    try:
+        if kind == "rules":
+            _rules.pop(ref_id, None)
+        else:
+            idx = _indexes.get(kind)
+            if idx is not None:
+                if after:
+                    idx.put({**(before or {}), **after})
+                else:
+                    idx.drop(ref_id)
+        await db.party_index_changes.insert_one(
+            {"kind": kind, "ref_id": ref_id, "at": datetime.now(timezone.utc)}
+        )
+    except Exception as e:
+        logger.warning(f"Party index update for {kind}:{ref_id} failed, marking dirty: {e}")
+        await mark_dirty("companies" if kind == "rules" else kind)
+
+
+async def mark_dirty(kind: str):
+    try:
+        await db.party_index_meta.update_one(
+            {"_id": "meta"}, {"$inc": {f"generation_{kind}": 1}}, upsert=True
+        )
+        if kind == "companies":
+            _rules.clear()
+    except Exception as e:
+        logger.error(f"Could not mark party index dirty for {kind}: {e}")
+
+
+INDEXES = [
+    index("party_index_changes", "at", expireAfterSeconds=CHANGE_RETENTION_SEC),
+]
+
+
+async def create_party_index_indexes():
+    """Create MongoDB indexes for the party index change feed."""
+    await ensure_indexes(INDEXES)
@@ -0,0 +1,603 @@
+"""Maintained n-gram search index for typeahead over clients, people, tasks
+and WhatsApp Hub contacts.
+
+The entity searches used unanchored, case-insensitive `$regex` across up to
+24 fields, which cannot use an index and scans every document. Instead each
+searchable record gets one or more entries in `search_index`:
+
+  _id           "<entity>:<key>"
+  entity        client | individual | task | wa_contact
+  source        "<kind>:<record id>" — every entry derived from one record
+  ref_id        id the caller loads (client id, task id, contact jid)
+  path          for individuals: ["contact_persons" | "dsc_details", index]
+  title         display title; rank = its length (shorter wins ties)
+  title_tokens / tokens   normalized words of the title / of every field
+  tgrams / grams          edge n-grams (prefixes) of those words
+  tri                     trigrams, for typo-tolerant fallback
+
+A query is normalized the same way. Each query word must be a prefix of some
+indexed word (`grams: {$all: [...]}`, multikey index, sorted by rank);
+title matches are tried first. When that finds fewer than `limit` hits and a
+word is long enough, entries sharing trigrams are re-scored with a bounded
+edit distance, so "desia" still finds "Desai".
+
+Write sites call `record_change(kind, before, after)` next to the matching
+dashboard counter hook; bulk writes call `mark_dirty(kind)` and the
+reconciler (job runner) rebuilds the kind; every kind is also rebuilt daily
+to repair drift from writes without a hook. `python -m
+backend.scripts.rebuild_search_index` backfills from scratch. Until a kind
+has been built, `search()` returns None and callers keep their regex path.
+
+SEARCH_INDEX_MODE=memory (or auto, when the index has at most
+SEARCH_INDEX_MEMORY_MAX entries) serves lookups from an in-process copy.
+It is loaded in the background (MongoDB answers until then), picks up
+entries re-indexed on other workers every SEARCH_INDEX_MEMORY_TTL seconds
+and is reloaded in full every 30 min; local writes apply immediately.
+Entries of deleted records can linger until the full reload, which is
+harmless because callers load hits by id and skip missing records.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+
+from backend.dependencies import db
+from backend.index_manifest import ensure_indexes, index
+
+logger = logging.getLogger("search_index")
+
+MIN_GRAM = 2
+MAX_GRAM = 12
+FUZZY_MIN_LEN = 4
+MODE = os.getenv("SEARCH_INDEX_MODE", "auto").lower()
+MEMORY_MAX_ENTRIES = int(os.getenv("SEARCH_INDEX_MEMORY_MAX", "20000"))
+MEMORY_TTL_SEC = int(os.getenv("SEARCH_INDEX_MEMORY_TTL", "30"))
+MEMORY_FULL_RELOAD_SEC = 1800
+META_TTL_SEC = 60
+SCOPED_MAX_HITS = 1000
+FULL_REBUILD_EVERY = timedelta(hours=24)
+
+KINDS = ("clients", "tasks", "wa_contacts")
+
+CLIENT_INDEX_FIELDS = [
+    "company_name", "client_type_label", "email", "phone", "city", "state",
+    "address", "gstin", "gst_number", "pan", "pan_number", "tan_number", "cin",
+    "llpin", "msme_number", "tally_ledger_name", "notes", "referred_by",
+]
+PERSON_INDEX_FIELDS = ["name", "email", "phone", "din", "designation"]
+TASK_INDEX_FIELDS = ["title", "description", "type", "category"]
+PHONE_FIELDS = {"phone"}
+
+_PROJECTIONS = {
+    "clients": {"_id": 0, "id": 1, "contact_persons": 1, "dsc_details": 1,
+                **{f: 1 for f in CLIENT_INDEX_FIELDS}},
+    "tasks": {"_id": 0, "id": 1, **{f: 1 for f in TASK_INDEX_FIELDS}},
+    "wa_contacts": {"_id": 0, "jid": 1, "display_name": 1, "phone": 1},
+}
+_COLLECTIONS = {"clients": "clients", "tasks": "tasks", "wa_contacts": "whatsapp_hub_contacts"}
+_ENTRY_FIELDS = {"_id": 1, "entity": 1, "source": 1, "ref_id": 1, "path": 1, "title": 1, "rank": 1,
+                 "title_tokens": 1, "tokens": 1, "tgrams": 1, "grams": 1, "tri": 1}
+_SCORE_FIELDS = {"_id": 1, "ref_id": 1, "path": 1, "title": 1, "rank": 1, "title_tokens": 1, "tokens": 1}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# NORMALIZATION
+# ─────────────────────────────────────────────────────────────────────────────
+
+def tokenize(text: Any) -> List[str]:
+    """Lower-case, accent-folded alphanumeric words."""
+    if text is None:
+        return []
+    folded = unicodedata.normalize("NFKD", str(text))
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).lower()
+    return _WORD.findall(folded)
+
+
+def _field_tokens(value: Any, phone: bool = False) -> List[str]:
+    words = tokenize(value)
+    out = list(words)
+    # "Tech-Weave" is also findable as "techweave", "+91 98765 43210" as "9876543210"
+    out.extend(a + b for a, b in zip(words, words[1:]))
+    if phone:
+        digits = "".join(w for w in words if w.isdigit())
+        if digits:
+            out.extend([digits, digits[-10:]])
+    return out
+
+
+def _edge_grams(tokens: Iterable[str]) -> List[str]:
+    grams: Set[str] = set()
+    for t in tokens:
+        for n in range(MIN_GRAM, min(len(t), MAX_GRAM) + 1):
+            grams.add(t[:n])
+    return sorted(grams)
+
+
+def _trigrams(tokens: Iterable[str]) -> List[str]:
+    out: Set[str] = set()
+    for t in tokens:
+        out.update(t[i:i + 3] for i in range(len(t) - 2))
+    return sorted(out)
+
+
+def _entry(entity: str, key: str, source: str, ref_id: str, title: str,
+           fields: Iterable[Tuple[str, Any]], path: Optional[list] = None) -> Dict[str, Any]:
+    title_tokens = sorted(set(_field_tokens(title)))
+    tokens: Set[str] = set(title_tokens)
+    for name, value in fields:
+        values = value if isinstance(value, list) else [value]
+        for v in values:
+            tokens.update(_field_tokens(v, phone=name in PHONE_FIELDS))
+    tokens_sorted = sorted(tokens)
+    return {
+        "_id": f"{entity}:{key}",
+        "entity": entity,
+        "source": source,
+        "ref_id": ref_id,
+        "path": path,
+        "title": title,
+        "rank": len(title or ""),
+        "title_tokens": title_tokens,
+        "tokens": tokens_sorted,
+        "tgrams": _edge_grams(title_tokens),
+        "grams": _edge_grams(tokens_sorted),
+        "tri": _trigrams(tokens_sorted),
+    }
+
+
+def _entries_for(kind: str, doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if kind == "clients":
+        cid = doc.get("id")
+        if not cid:
+            return []
+        source = f"clients:{cid}"
+        entries = [_entry("client", cid, source, cid, doc.get("company_name") or "",
+                          [(f, doc.get(f)) for f in CLIENT_INDEX_FIELDS])]
+        for i, person in enumerate(doc.get("contact_persons") or []):
+            if isinstance(person, dict) and any(person.get(f) for f in PERSON_INDEX_FIELDS):
+                entries.append(_entry(
+                    "individual", f"{cid}:cp{i}", source, cid, person.get("name") or "",
+                    [(f, person.get(f)) for f in PERSON_INDEX_FIELDS], ["contact_persons", i],
+                ))
+        for i, dsc in enumerate(doc.get("dsc_details") or []):
+            if isinstance(dsc, dict) and dsc.get("holder_name"):
+                entries.append(_entry(
+                    "individual", f"{cid}:dsc{i}", source, cid, dsc["holder_name"], [],
+                    ["dsc_details", i],
+                ))
+        return entries
+    if kind == "tasks":
+        tid = doc.get("id")
+        if not tid:
+            return []
+        return [_entry("task", tid, f"tasks:{tid}", tid, doc.get("title") or "",
+                       [(f, doc.get(f)) for f in TASK_INDEX_FIELDS])]
+    if kind == "wa_contacts":
+        jid = doc.get("jid")
+        if not jid:
+            return []
+        return [_entry("wa_contact", jid, f"wa_contacts:{jid}", jid, doc.get("display_name") or "",
+                       [("phone", doc.get("phone"))])]
+    raise ValueError(f"Unknown search index kind: {kind}")
+
+
+def _record_id(kind: str, doc: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not doc:
+        return None
+    return doc.get("jid") if kind == "wa_contacts" else doc.get("id")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SCORING
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _within_edits(a: str, b: str, k: int) -> bool:
+    """Edit distance(a, b) <= k, counting an adjacent swap as one edit.
+    Banded so it stays O(len * k)."""
+    if abs(len(a) - len(b)) > k:
+        return False
+    far = k + 1
+    before = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [far] * len(b)
+        for j in range(max(1, i - k), min(len(b), i + k) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if before and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], before[j - 2] + 1)
+        if min(cur) > k:
+            return False
+        before, prev = prev, cur
+    return prev[-1] <= k
+
+
+def _edit_budget(word: str) -> int:
+    if len(word) < FUZZY_MIN_LEN:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def _word_score(word: str, tokens: List[str], fuzzy: bool) -> float:
+    best = 0.0
+    budget = _edit_budget(word) if fuzzy else 0
+    for t in tokens:
+        if t == word:
+            return 1.0
+        if t.startswith(word):
+            best = max(best, 0.7)
+        elif budget and best < 0.4 and (
+            _within_edits(word, t, budget) or _within_edits(word, t[:len(word)], budget)
+        ):
+            best = 0.4
+    return best
+
+
+def _score(words: List[str], entry: Dict[str, Any], fuzzy: bool) -> float:
+    total = 0.0
+    matched = 0
+    for w in words:
+        s = max(2 * _word_score(w, entry.get("title_tokens") or [], fuzzy),
+                _word_score(w, entry.get("tokens") or [], fuzzy))
+        if s:
+            matched += 1
+        total += s
+    # Fuzzy mode forgives one unmatched word in longer queries
+    # ("desai tech weave" vs "Desai Techweave")
+    needed = len(words) - 1 if fuzzy and len(words) >= 3 else len(words)
+    return total if matched >= needed else 0.0
+
+
+def _rank(words: List[str], entries: Iterable[Dict[str, Any]], fuzzy: bool,
+          limit: int, seen: Set[str]) -> List[Dict[str, Any]]:
+    scored = []
+    for e in entries:
+        if e["_id"] in seen:
+            continue
+        s = _score(words, e, fuzzy)
+        if s > 0:
+            scored.append((s, e))
+    scored.sort(key=lambda se: (-se[0], len(se[1].get("title") or ""), se[1].get("title") or ""))
+    hits = []
+    for s, e in scored[:limit]:
+        seen.add(e["_id"])
+        hits.append({"key": e["_id"], "ref_id": e["ref_id"], "path": e.get("path"),
+                     "title": e.get("title"), "score": round(s, 3)})
+    return hits
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# IN-MEMORY MODE
+# ─────────────────────────────────────────────────────────────────────────────
+
+_POSTING_FIELDS = (("t", "tgrams"), ("g", "grams"), ("3", "tri"))
+
+
+class _MemoryIndex:
+    def __init__(self):
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.by_source: Dict[str, Set[str]] = {}
+        # (tag, entity) -> gram -> entry keys
+        self.postings: Dict[Tuple[str, str], Dict[str, Set[str]]] = {}
+        self.loaded_at = float("-inf")   # monotonic time of the last full load
+        self.synced_at = float("-inf")   # monotonic time of the last refresh
+        self.synced_wall: Optional[datetime] = None
+
+    def put(self, e: Dict[str, Any]):
+        key = e["_id"]
+        if key in self.entries:
+            self.drop(key)
+        self.entries[key] = e
+        self.by_source.setdefault(e["source"], set()).add(key)
+        for tag, field in _POSTING_FIELDS:
+            table = self.postings.setdefault((tag, e["entity"]), {})
+            for g in e.get(field) or ():
+                bucket = table.get(g)
+                if bucket is None:
+                    table[g] = {key}
+                else:
+                    bucket.add(key)
+
+    def drop(self, key: str):
+        e = self.entries.pop(key, None)
+        if not e:
+            return
+        self.by_source.get(e["source"], set()).discard(key)
+        for tag, field in _POSTING_FIELDS:
+            table = self.postings.get((tag, e["entity"]), {})
+            for g in e.get(field) or ():
+                bucket = table.get(g)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del table[g]
+
+    def replace_source(self, source: str, entries: List[Dict[str, Any]]):
+        for key in list(self.by_source.get(source, ())):
+            self.drop(key)
+        for e in entries:
+            self.put(e)
+
+    def candidates(self, tag: str, entity: str, grams: List[str], pool: int) -> List[Dict[str, Any]]:
+        table = self.postings.get((tag, entity), {})
+        sets = [table.get(g, set()) for g in grams]
+        if not sets:
+            return []
+        keys = set.intersection(*sorted(sets, key=len))
+        # Same cut as the Mongo path: the `pool` shortest titles
+        return heapq.nsmallest(pool, (self.entries[k] for k in keys), key=lambda e: e.get("rank", 0))
+
+    def fuzzy_candidates(self, entity: str, tri: List[str], min_overlap: int, pool: int) -> List[Dict[str, Any]]:
+        table = self.postings.get(("3", entity), {})
+        counts: Counter = Counter()
+        for g in tri:
+            counts.update(table.get(g, ()))
+        # Same cut as the Mongo path: most shared trigrams, then shortest title
+        best = heapq.nsmallest(
+            pool, ((n, k) for k, n in counts.items() if n >= min_overlap),
+            key=lambda nk: (-nk[0], self.entries[nk[1]].get("rank", 0)),
+        )
+        return [self.entries[k] for _, k in best]
+
+
+_memory: Optional[_MemoryIndex] = None
+_memory_disabled = MODE == "mongo"
+_memory_loading = False
+_memory_load_task: Optional[asyncio.Task] = None
+_ready_cache: Dict[str, Any] = {"at": 0.0, "meta": {}}
+
+
+async def _fill(mem: _MemoryIndex, query: Dict[str, Any]) -> int:
+    n = 0
+    async for e in db.search_index.find(query, _ENTRY_FIELDS):
+        mem.put(e)
+        n += 1
+        if n % 200 == 0:
+            await asyncio.sleep(0)  # don't starve requests while loading
+    return n
+
+
+async def _load_memory():
+    """Full load or incremental refresh of the in-memory copy (background task)."""
+    global _memory, _memory_disabled, _memory_loading
+    try:
+        now = time.monotonic()
+        # Overlap the previous sync a little so in-flight writes aren't missed
+        wall = datetime.now(timezone.utc) - timedelta(seconds=5)
+        mem = _memory
+        if mem is None or now - mem.loaded_at > MEMORY_FULL_RELOAD_SEC:
+            if MODE == "auto" and await db.search_index.count_documents({}) > MEMORY_MAX_ENTRIES:
+                _memory_disabled = True
+                _memory = None
+                logger.info("[SearchIndex] Index too large for memory mode, using MongoDB lookups")
+                return
+            mem = _MemoryIndex()
+            n = await _fill(mem, {})
+            mem.loaded_at = now
+            _memory = mem
+            logger.info(f"[SearchIndex] Loaded {n} entries into memory")
+        else:
+            await _fill(mem, {"indexed_at": {"$gte": mem.synced_wall}})
+        mem.synced_at, mem.synced_wall = now, wall
+    except Exception as e:
+        logger.warning(f"[SearchIndex] Memory load failed: {e}")
+    finally:
+        _memory_loading = False
+
+
+def _memory_index() -> Optional[_MemoryIndex]:
+    """
+    Current in-memory index, or None to use MongoDB (Mongo mode, or the first
+    load still running). A slightly stale copy keeps serving while it is
+    refreshed in the background.
+    """
+    global _memory_loading, _memory_load_task
+    if _memory_disabled:
+        return None
+    stale = _memory is None or time.monotonic() - _memory.synced_at > MEMORY_TTL_SEC
+    if stale and not _memory_loading:
+        _memory_loading = True
+        _memory_load_task = asyncio.create_task(_load_memory())
+    return _memory
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WRITE PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def record_change(kind: str, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]):
+    """
+    Re-index one record after a write (after=None for a delete). Never raises:
+    on failure the kind is marked dirty and the reconciler rebuilds it.
+    """
+    record_id = _record_id(kind, after) or _record_id(kind, before)
+    if not record_id:
+        return
+    source = f"{kind}:{record_id}"
+    try:
+        now = datetime.now(timezone.utc)
+        entries = [{**e, "indexed_at": now} for e in (_entries_for(kind, after) if after else [])]
+        keys = [e["_id"] for e in entries]
+        await db.search_index.delete_many({"source": source, "_id": {"$nin": keys}})
+        if entries:
+            await db.search_index.bulk_write(
+                [UpdateOne({"_id": e["_id"]}, {"$set": e}, upsert=True) for e in entries],
+                ordered=False,
+            )
+        if _memory is not None:
+            _memory.replace_source(source, entries)
+    except Exception as e:
+        logger.warning(f"Search index update for {source} failed, marking dirty: {e}")
+        await mark_dirty(kind)
+
+
+async def mark_dirty(kind: str):
+    try:
+        await db.search_index_meta.update_one(
+            {"_id": "meta"}, {"$set": {f"dirty_{kind}": True}}, upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Could not mark search index dirty for {kind}: {e}")
+
+
+async def rebuild(kind: str, batch_size: int = 1000) -> int:
+    """Re-index every record of one kind and drop entries for records that are gone."""
+    await db.search_index_meta.update_one(
+        {"_id": "meta"}, {"$set": {f"dirty_{kind}": False}}, upsert=True
+    )
+    started = datetime.now(timezone.utc)
+    count = 0
+    ops: List[UpdateOne] = []
+    async for doc in db[_COLLECTIONS[kind]].find({}, _PROJECTIONS[kind]):
+        for e in _entries_for(kind, doc):
+            ops.append(UpdateOne({"_id": e["_id"]}, {"$set": {**e, "indexed_at": started}}, upsert=True))
+            count += 1
+        if len(ops) >= batch_size:
+            await db.search_index.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await db.search_index.bulk_write(ops, ordered=False)
+    # Anything of this kind not touched by this pass belongs to a deleted record
+    await db.search_index.delete_many(
+        {"source": {"$regex": f"^{kind}:"}, "indexed_at": {"$lt": started}}
+    )
+    await db.search_index_meta.update_one(
+        {"_id": "meta"}, {"$set": {f"built_{kind}": datetime.now(timezone.utc)}}, upsert=True
+    )
+    _ready_cache["at"] = 0.0
+    if _memory is not None:
+        # Entries of records deleted since the last load go away on a full reload
+        _memory.loaded_at = _memory.synced_at = float("-inf")
+    logger.info(f"[SearchIndex] Rebuilt {kind}: {count} entries")
+    return count
+
+
+async def reconcile_search_index():
+    """Job-runner entry point: rebuild kinds that are dirty, never built or due a drift-repair pass."""
+    meta = await db.search_index_meta.find_one({"_id": "meta"}) or {}
+    now = datetime.now(timezone.utc)
+    for kind in KINDS:
+        built = meta.get(f"built_{kind}")
+        if isinstance(built, datetime) and built.tzinfo is None:
+            built = built.replace(tzinfo=timezone.utc)
+        if meta.get(f"dirty_{kind}") or not built or now - built > FULL_REBUILD_EVERY:
+            try:
+                await rebuild(kind)
+            except Exception as e:
+                logger.error(f"[SearchIndex] Rebuild of {kind} failed: {e}", exc_info=True)
+
+
+INDEXES = [
+    index("search_index", [("entity", 1), ("tgrams", 1), ("rank", 1)]),
+    index("search_index", [("entity", 1), ("grams", 1), ("rank", 1)]),
+    index("search_index", [("entity", 1), ("tri", 1)]),
+    index("search_index", "source"),
+]
+
+
+async def create_search_index_indexes():
+    """Create MongoDB indexes for the search index."""
+    await ensure_indexes(INDEXES)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# READ PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+_ENTITY_KIND = {"client": "clients", "individual": "clients", "task": "tasks", "wa_contact": "wa_contacts"}
+
+
+async def is_ready(entity: str) -> bool:
+    now = time.monotonic()
+    if now - _ready_cache["at"] > META_TTL_SEC:
+        _ready_cache["meta"] = await db.search_index_meta.find_one({"_id": "meta"}) or {}
+        _ready_cache["at"] = now
+    return bool(_ready_cache["meta"].get(f"built_{_ENTITY_KIND[entity]}"))
+
+
+def query_words(query: str) -> List[str]:
+    return [w for w in dict.fromkeys(tokenize(query)) if len(w) >= MIN_GRAM]
+
+
+async def search(entity: str, query: str, limit: int = 25) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ranked hits for `query`: [{key, ref_id, path, title, score}], best first.
+    Returns None when the index cannot answer (not built yet, or the query has
+    no word of at least MIN_GRAM characters) so callers fall back to a scan.
+    """
+    words = query_words(query)
+    if not words or not await is_ready(entity):
+        return None
+    grams = sorted({w[:MAX_GRAM] for w in words})
+    pool = max(limit * 4, 100)
+    seen: Set[str] = set()
+    mem = _memory_index()
+
+    # 1) every word prefixes a title word, 2) every word prefixes any field word
+    hits: List[Dict[str, Any]] = []
+    for tag, field in (("t", "tgrams"), ("g", "grams")):
+        if len(hits) >= limit:
+            break
+        if mem is not None:
+            cands = mem.candidates(tag, entity, grams, pool)
+        else:
+            cands = await db.search_index.find(
+                {"entity": entity, field: {"$all": grams}}, _SCORE_FIELDS
+            ).sort("rank", 1).limit(pool).to_list(pool)
+        hits += _rank(words, cands, False, limit - len(hits), seen)
+
+    # 3) typo tolerance: entries sharing at least half the query trigrams
+    if len(hits) < limit and any(_edit_budget(w) for w in words):
+        tri = _trigrams(words)
+        min_overlap = max(1, len(tri) // 2)
+        if mem is not None:
+            cands = mem.fuzzy_candidates(entity, tri, min_overlap, pool)
+        else:
+            cands = await db.search_index.aggregate([
+                {"$match": {"entity": entity, "tri": {"$in": tri}}},
+                {"$project": {**_SCORE_FIELDS,
+                              "overlap": {"$size": {"$setIntersection": ["$tri", tri]}}}},
+                {"$match": {"overlap": {"$gte": min_overlap}}},
+                {"$sort": {"overlap": -1, "rank": 1}},
+                {"$limit": pool},
+            ]).to_list(pool)
+        hits += _rank(words, cands, True, limit - len(hits), seen)
+    return hits
+
+
+async def search_scoped(entity: str, query: str, limit: int,
+                        allowed: Callable[[List[str]], Awaitable[Iterable[str]]]
+                        ) -> Optional[List[Dict[str, Any]]]:
+    """
+    search() restricted to the records the caller may see. The index carries
+    no access fields, so `allowed(ref_ids)` returns the subset of a batch the
+    caller can load; the ranked window widens until `limit` allowed hits are
+    found, the index has no more, or SCOPED_MAX_HITS hits have been checked.
+    Returns None when search() would.
+    """
+    window = limit * 4
+    checked: Set[str] = set()
+    visible: Set[str] = set()
+    while True:
+        hits = await search(entity, query, window)
+        if hits is None:
+            return None
+        fresh = list(dict.fromkeys(h["ref_id"] for h in hits if h["ref_id"] not in checked))
+        if fresh:
+            visible.update(await allowed(fresh))
+            checked.update(fresh)
+        kept = [h for h in hits if h["ref_id"] in visible]
+        if len(kept) >= limit or len(hits) < window or window >= SCOPED_MAX_HITS:
+            return kept[:limit]
+        window = min(window * 4, SCOPED_MAX_HITS)
@@ -9,7 +9,7 @@ import pytz
 import traceback
 import asyncio
 import calendar
-import requests
+import time
 import httpx
 import shutil
 import pandas as pd
@@ -20,17 +20,18 @@ from collections import Counter
 # Added 'backend.' to invoicing to match the others
 from backend.quickcompany_trademark_router import router as qc_trademark_router
 from backend.whatsapp_hub import router as whatsapp_hub_router
-from backend.compliance import router as compliance_router, create_compliance_indexes
+from backend.compliance import router as compliance_router
 from backend.roc_sphere import router as roc_sphere_router  # ROC Sphere: Companies Act document automation
-from backend.salary_slip_router import router as salary_slip_router, create_salary_slip_indexes
+from backend.salary_slip_router import (
+    router as salary_slip_router, PDF_RENDER_JOB, render_pending_slip_pdfs, shutdown_pdf_pool,
+)
 from backend.ai_document_reader import router as ai_document_reader_router
 from backend.gst_reconciliation import router as gst_reconciliation_router
 from backend.mis_report import router as mis_report_router
-from backend.gst_reconciliation import create_gst_reconciliation_indexes
-from backend.zero_touch_entry import router as zero_touch_entry_router, create_zte_indexes
+from backend.zero_touch_entry import router as zero_touch_entry_router
 from backend.learning.learning_router import router as learning_router
-from backend.gst_portal_sync import router as gst_portal_sync_router, create_gst_portal_sync_indexes
-from backend.accounting_lock import router as accounting_lock_router, create_accounting_integrity_indexes
+from backend.gst_portal_sync import router as gst_portal_sync_router
+from backend.accounting_lock import router as accounting_lock_router
 from backend.reminders_router import router as reminders_router
 from backend.quotations import router as quotation_router
 from backend.purchases import router as purchases_router
@@ -41,7 +42,6 @@ from backend.invoicing import router as invoicing_router
 from backend.accounting_core import router as accounting_router
 from backend.party_ledgers import router as party_ledgers_router
 from backend.accounting_extended import router as accounting_ext_router
-from backend.accounting_extended import create_accounting_extended_indexes
 from backend.bank_accounts import router as bank_accounts_router
 from backend.permission_governance import router as permission_governance_router
 from backend.roles_admin import router as roles_admin_router
@@ -65,8 +65,8 @@ from backend.notifications import router as notification_router, create_notifica
 # ─────────────────────────────────────────────────────────────────────────────
 # Task-assigned popup helper
 # Inserts a manual reminder with remind_at = now so the assignee gets an
-# immediate on-screen popup the next time the frontend polls
-# GET /api/reminders/due-popups.
+# immediate on-screen popup, pushed over their event stream by the reminder
+# wheel (or picked up by the next poll of GET /api/reminders/due-popups).
 #
 # NOTE: This previously lived in backend/reminders_router.py, which became an
 # accidental duplicate of this file and caused a circular-import crash on
@@ -90,6 +90,7 @@ async def create_task_assigned_popup(assigned_to_user_id: str, task_title: str)
             "created_at": now_iso,
             "updated_at": now_iso,
         })
+        await live_events.reminder_scheduled(assigned_to_user_id, now_iso)
     except Exception as e:
         logger.error(
             f"[Popup] Failed to create task-assigned popup for {assigned_to_user_id}: {e}"
@@ -107,18 +108,22 @@ from backend.passwords import router as passwords_router
 from backend.auth_password_reset import router as auth_password_reset_router
 from backend.client_portal import router as client_portal_router
 from backend.activity_monitor import router as activity_monitor_router
-from backend.desktop_agent import router as desktop_agent_router, create_desktop_indexes
+from backend.desktop_agent import (
+    router as desktop_agent_router,
+    start_telemetry_flush_loop,
+    flush_telemetry_buffer,
+)
 from backend.whatsapp_integration import router as whatsapp_router
 from backend.whatsapp_scheduler import (
     wa_dsc_expiry_job,
     wa_compliance_job,
 )
-from backend.whatsapp_integration import wa_scheduled_bulk_job, wa_bridge_keepalive_job
+from backend.whatsapp_integration import wa_scheduled_bulk_job, ping_wa_bridge_keep_alive
 from backend.automation_engine import (
-    birthday_automation_job,
-    festival_greeting_job,
-    service_expiry_alert_job,
-    follow_up_reminder_job,
+    run_birthday_automation,
+    run_festival_greetings,
+    run_service_expiry_alerts,
+    run_follow_up_reminders,
 )
 
 from zoneinfo import ZoneInfo
@@ -145,13 +150,13 @@ from fastapi import (
     Form,
     Query,
     Request,
+    Response,
     Body,
 )
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.middleware.gzip import GZipMiddleware
-from passlib.context import CryptContext
 
 # Validation
 from pydantic import (
@@ -226,7 +231,36 @@ from backend.dependencies import (
 
 # External Services
 from fpdf import FPDF
-from apscheduler.schedulers.background import BackgroundScheduler
+from backend.job_runner import (
+    job_runner,
+    cron,
+    every,
+    router as job_runner_router,
+)
+from backend import dashboard_counters
+from backend.dashboard_counters import reconcile_dashboard_counters
+from backend import list_sync
+from backend import password_hashing
+from backend import doc_extraction
+from backend import live_events
+from backend.ai import llm_gateway
+from backend.licensing import usage_meter
+from backend import bulk_mail
+from backend.bulk_mail import (
+    render_template,
+    resume_bulk_mail_jobs,
+    router as bulk_mail_router,
+)
+from backend.search import search_index
+from backend import change_hooks
+from backend.search.search_index import reconcile_search_index
+from backend.drive_mirror import reconcile_drive_mirror
+from backend.client_calendar import reconcile_client_calendar
+from backend.journal_rollup import refresh_journal_rollup
+from backend.accounting_ai.reconciliation_validator import run_validation_audit
+from backend.lead_prefilter import train_lead_prefilter
+from backend import index_manifest
+from backend.index_manifest import reconcile_indexes
 
 # ====================== CONFIG ======================
 # Single IST definition
@@ -240,21 +274,13 @@ load_dotenv(ROOT_DIR / ".env")
 MCA_API_KEY = os.getenv("MCA_API_KEY", "")
 MCA_API_BASE_URL = os.getenv("MCA_API_BASE_URL", "https://api.mca.gov.in/MCA21/api/v1")
 
-# ── Main event loop reference (set at startup, used by APScheduler sync jobs) ─
-app_event_loop = None
-
 # ── Attendance proof upload directory ─────────────────────────────────────────
 PROOF_UPLOAD_DIR = ROOT_DIR / "uploads" / "attendance_proof"
 PROOF_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 # ====================== SECURITY CONFIG ===========================
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# ====================== SCHEDULER ======================
-scheduler = BackgroundScheduler(timezone=pytz.timezone("Asia/Kolkata"))
+# bcrypt runs on a bounded thread pool — see backend/password_hashing.py
 
-# IN-MEMORY CACHE for daily reminder (avoids DB query on every request)
-_last_reminder_date_cache: Optional[str] = None
 
 # ====================== APP ======================
 app = FastAPI(title="Taskosphere Backend", redirect_slashes=False)
@@ -293,7 +319,7 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # =============================================================
 # ABSENT MARKING CORE LOGIC
-# Runs via APScheduler at 19:00 IST every working day.
+# Runs as the "mark_absent_daily" job-runner job at 19:00 IST every working day.
 # Also exposed as POST /api/attendance/mark-absent-bulk for
 # manual admin triggering.
 #
@@ -392,28 +418,11 @@ async def _mark_absent_for_date(target_date_str: str) -> dict:
     }
 
 
-def mark_absent_users_task():
-    """
-    Sync wrapper called by APScheduler at 19:00 IST every working day.
-    Uses run_coroutine_threadsafe so Motor futures stay on the main event loop.
-    """
-    try:
-        import backend.server as _self
-
-        loop = _self.app_event_loop
-        if loop is None or loop.is_closed():
-            logger.warning(
-                "mark_absent_users_task: main event loop not ready, skipping."
-            )
-            return
-        today_str = datetime.now(IST).date().isoformat()
-        future = asyncio.run_coroutine_threadsafe(
-            _mark_absent_for_date(today_str), loop
-        )
-        result = future.result(timeout=120)
-        logger.info(f"Scheduled absent job result: {result}")
-    except Exception as e:
-        logger.error(f"mark_absent_users_task failed: {e}")
+async def mark_absent_users_job():
+    """Job runner entry point — 19:00 IST every day."""
+    today_str = datetime.now(IST).date().isoformat()
+    result = await _mark_absent_for_date(today_str)
+    logger.info(f"Scheduled absent job result: {result}")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -513,229 +522,37 @@ async def _force_punch_out_at_7pm(today_str: str) -> dict:
     return {"patched": patched, "date": today_str}
 
 
-def force_punch_out_11pm_task():
-    """
-    Sync wrapper called by APScheduler at 23:00 IST every day.
-    Uses run_coroutine_threadsafe so Motor futures stay on the main event loop.
-    """
-    try:
-        import backend.server as _self
-
-        loop = _self.app_event_loop
-        if loop is None or loop.is_closed():
-            logger.warning(
-                "force_punch_out_11pm_task: main event loop not ready, skipping."
-            )
-            return
-        today_str = datetime.now(ZoneInfo("Asia/Kolkata")).date().isoformat()
-        future = asyncio.run_coroutine_threadsafe(
-            _force_punch_out_at_7pm(today_str), loop
-        )
-        result = future.result(timeout=120)
-        logger.info(f"force_punch_out_11pm job result: {result}")
-    except Exception as e:
-        logger.error(f"force_punch_out_11pm_task failed: {e}")
-
-
-@app.on_event("startup")
-async def startup_event():
-    import backend.server as _self
-
-    _self.app_event_loop = asyncio.get_event_loop()
-    try:
-        await db.tasks.create_index("assigned_to")
-        # ── Activity Timeline & Automation Engine indexes ──────────────────
-        await db.client_activities.create_index([("client_id", 1), ("created_at", -1)])
-        await db.pending_client_messages.create_index([("status", 1), ("created_at", -1)])
-        await db.service_expiries.create_index("client_id")
-        await db.service_expiries.create_index("expiry_date")
-        await create_compliance_indexes()
-        await create_salary_slip_indexes()
-        await create_gst_reconciliation_indexes()
-        try:
-            await db.mis_transactions.create_index([("client_id", 1), ("period", 1), ("doc_type", 1)])
-            await db.mis_uploads.create_index([("client_id", 1), ("period", 1)])
-            await db.mis_manual.create_index([("client_id", 1), ("period", 1)], unique=True)
-        except Exception as _mis_idx_err:
-            logger.warning(f"MIS index creation skipped: {_mis_idx_err}")
-        await create_zte_indexes()
-        
-        # --- PHASE 10 SELF-LEARNING INDEXES ---
-        try:
-            await db.knowledge_base.create_index([("company_id", 1), ("category", 1), ("key", 1)], unique=True)
-            await db.learning_events.create_index([("company_id", 1), ("created_at", -1)])
-            await db.manual_corrections.create_index([("company_id", 1), ("created_at", -1)])
-            await db.recommendation_history.create_index([("company_id", 1), ("status", 1)])
-            await db.embeddings.create_index([("target_id", 1), ("target_type", 1)])
-            await db.learning_versions.create_index([("entity_id", 1), ("entity_type", 1)])
-            await db.learning_queue.create_index([("status", 1), ("created_at", 1)])
-            await db.learning_audit.create_index([("company_id", 1), ("timestamp", -1)])
-            logger.info("Phase 10 Self-Learning MongoDB indexes built.")
-        except Exception as e_idx10:
-            logger.warning(f"Phase 10 index creation warning: {e_idx10}")
-
-        # --- PHASE 11 ENTERPRISE AUTOMATION INDEXES ---
-        try:
-            await db.workflow_definitions.create_index([("company_id", 1), ("category", 1)])
-            await db.workflow_definitions.create_index("id", unique=True, background=True)
-            await db.workflow_instances.create_index([("company_id", 1), ("status", 1)])
-            await db.workflow_instances.create_index("id", unique=True, background=True)
-            await db.workflow_history.create_index([("company_id", 1), ("instance_id", 1)])
-            await db.workflow_templates.create_index("id", unique=True, background=True)
-            await db.approval_requests.create_index([("company_id", 1), ("status", 1)])
-            await db.approval_requests.create_index("id", unique=True, background=True)
-            await db.approval_history.create_index([("company_id", 1), ("approval_id", 1)])
-            await db.automation_rules.create_index([("company_id", 1), ("is_active", 1)])
-            await db.business_events.create_index([("company_id", 1), ("event_type", 1)])
-            await db.notification_history.create_index([("company_id", 1), ("user_id", 1)])
-            await db.dashboard_cache.create_index("id", unique=True, background=True)
-            await db.analytics_data.create_index("company_id")
-            await db.kpi_history.create_index("company_id")
-            await db.workflow_audit.create_index([("company_id", 1), ("action", 1)])
-            logger.info("Phase 11 Enterprise Automation MongoDB indexes built.")
-        except Exception as e_idx11:
-            logger.warning(f"Phase 11 index creation warning: {e_idx11}")
-
-        # AI Memory Foundation indexes
-        await db.ai_document_memory.create_index("fingerprint")
-        await db.ai_document_memory.create_index("vendor_gstin")
-        await db.ai_document_memory.create_index("invoice_number")
-        await db.ai_document_memory.create_index("vendor_name")
-        await db.ai_document_memory.create_index("created_at")
-        await create_gst_portal_sync_indexes()
-        await create_accounting_integrity_indexes()
-        await create_accounting_extended_indexes()
-        await db.tasks.create_index("created_by")
-        await db.tasks.create_index("due_date")
-        await db.users.create_index("email")
-        await db.staff_activity.create_index("user_id")
-        await db.staff_activity.create_index("timestamp")
-        await db.staff_activity.create_index([("user_id", 1), ("timestamp", -1)])
-        await db.due_dates.create_index("department")
-        await create_desktop_indexes()
-        await db.tasks.create_index([("assigned_to", 1), ("status", 1)])
-        await db.tasks.create_index("created_at")
-        await db.referrers.create_index("name")
-        await db.clients.create_index("assigned_to")
-        # Performance: faster paginated list + merge search
-        await db.clients.create_index("company_name")
-        await db.clients.create_index("created_by")
-        await db.clients.create_index([("assignments.user_id", 1)])
-        await db.clients.create_index("status")
-        await db.clients.create_index([("company_name", 1), ("status", 1)])
-        await db.dsc_register.create_index("expiry_date")
-        await db.todos.create_index([("user_id", 1), ("created_at", -1)])
-        await db.attendance.create_index([("user_id", 1), ("date", -1)])
-        await db.notifications.create_index("user_id")
-        await db.visits.create_index([("assigned_to", 1), ("visit_date", -1)])
-        await db.visits.create_index("visit_date")
-        await db.visits.create_index("client_id")
-        await db.visits.create_index("status")
-        await db.notifications.create_index([("user_id", 1), ("is_read", 1)])
-        await db.notifications.create_index("created_at")
-        await db.quotations.create_index([("created_by", 1), ("created_at", -1)])
-        await db.quotations.create_index("status")
-        await db.quotations.create_index("service")
-        await db.companies.create_index("created_by")
-        await db.companies.create_index("name")
-        # Bank / Accounting / Permission Governance (added for AI accounting features)
-        await db.bank_accounts.create_index("company_id")
-        await db.bank_transactions.create_index([("bank_account_id", 1), ("date", -1)])
-        await db.bank_transactions.create_index("matched_type")
-        await db.bank_reconciliation_audit.create_index([("bank_transaction_id", 1), ("timestamp", -1)])
-        await db.chart_of_accounts.create_index([("company_id", 1), ("code", 1)], unique=True)
-        await db.journal_entries.create_index([("company_id", 1), ("entry_date", -1)])
-        await db.journal_lines.create_index("entry_id")
-        await db.journal_lines.create_index("account_id")
-        await db.access_requests.create_index([("user_id", 1), ("status", 1)])
-        await db.access_requests.create_index("status")
-        await db.staff_activity.create_index("type")
-        await db.staff_activity.create_index("domain")
-        await db.staff_activity.create_index([("user_id", 1), ("timestamp", -1)])
-        await db.staff_activity.create_index([("user_id", 1), ("type", 1)])
-        await db.trademark_sphere.create_index("application_number", unique=True)
-
-        # ── FIXED: EMAIL CONNECTIONS INDEX ──────────────────────────────────
-        try:
-            # Drop old rule (Unique User + Provider)
-            await db.email_connections.drop_index("user_id_1_provider_1")
-        except Exception:
-            pass
-
-        # Create new rule (Unique User + Email Address)
-        await db.email_connections.create_index(
-            [("user_id", 1), ("email_address", 1)], unique=True, background=True
-        )
-
-        # Unique indexes — use background=True so they don't block startup if they already exist
-        await db.attendance.create_index(
-            [("user_id", 1), ("date", 1)], unique=True, background=True
-        )
-        await db.clients.create_index(
-            [("created_by", 1), ("company_name", 1)], unique=True, background=True
-        )
-        await db.holidays.create_index("date", unique=True, background=True)
-
-        # ── WhatsApp Hub indexes ─────────────────────────────────────────────
-        # message_id + session_id: used by duplicate check on every bulk-sync insert
-        # Without this index, bulk-sync with 1000+ messages does a full collection scan
-        # per message → extremely slow, times out, and appears to store nothing.
-        await db.whatsapp_hub_messages.create_index(
-            [("message_id", 1), ("session_id", 1)], background=True, sparse=True
-        )
-        await db.whatsapp_hub_messages.create_index(
-            [("jid", 1), ("timestamp", -1)], background=True
-        )
-        await db.whatsapp_hub_messages.create_index("timestamp", background=True)
-        await db.whatsapp_hub_contacts.create_index("jid", unique=True, background=True)
-        await db.whatsapp_hub_contacts.create_index(
-            [("last_message_at", -1)], background=True
-        )
-        await db.whatsapp_hub_contacts.create_index("session_id", background=True)
-        await db.whatsapp_hub_groups.create_index("jid", unique=True, background=True)
-
-        # ── ACCOUNTING / INVOICING — the most-queried collections ────────────
-        # These are called on every report load, reconcile, and invoice CRUD.
-        # Without indexes every call does a full collection scan; with large
-        # data sets (10k+ invoices) that causes 5-10 s latency per page.
-        await db.invoices.create_index([("company_id", 1), ("status", 1)], background=True)
-        await db.invoices.create_index([("company_id", 1), ("invoice_date", -1)], background=True)
-        await db.invoices.create_index([("company_id", 1), ("invoice_type", 1)], background=True)
-        await db.invoices.create_index("id", unique=True, background=True)
-        await db.invoices.create_index("paid_bank_txn_id", background=True, sparse=True)
+async def force_punch_out_11pm_job():
+    """Job runner entry point — 23:00 IST every day."""
+    today_str = datetime.now(ZoneInfo("Asia/Kolkata")).date().isoformat()
+    result = await _force_punch_out_at_7pm(today_str)
+    logger.info(f"force_punch_out_11pm job result: {result}")
 
-        await db.payments.create_index([("company_id", 1), ("invoice_id", 1)], background=True)
-        await db.payments.create_index("invoice_id", background=True)
-        await db.payments.create_index("id", unique=True, background=True)
 
-        await db.purchase_invoices.create_index([("company_id", 1), ("status", 1)], background=True)
-        await db.purchase_invoices.create_index([("company_id", 1), ("invoice_date", -1)], background=True)
-        await db.purchase_invoices.create_index("id", unique=True, background=True)
-        await db.purchase_invoices.create_index("paid_bank_txn_id", background=True, sparse=True)
+# Wall time of each startup phase on this worker, for GET /api/admin/startup-report.
+_startup_phases: Dict[str, float] = {}
 
-        await db.purchase_payments.create_index([("company_id", 1), ("purchase_invoice_id", 1)], background=True)
-        await db.purchase_payments.create_index("purchase_invoice_id", background=True)
-        await db.purchase_payments.create_index("id", unique=True, background=True)
 
-        # Journal entries: source+source_id compound is hit on every sync
-        await db.journal_entries.create_index([("company_id", 1), ("source", 1), ("source_id", 1)], background=True)
-        await db.journal_entries.create_index([("source", 1), ("source_id", 1)], background=True)
-        await db.journal_entries.create_index("id", unique=True, background=True)
+class _StartupClock:
+    """Records each phase as the time since the previous mark."""
 
-        # Journal lines: compound index covering Trial Balance aggregation
-        await db.journal_lines.create_index([("company_id", 1), ("entry_date", -1), ("account_id", 1)], background=True)
-        await db.journal_lines.create_index([("entry_id", 1), ("account_id", 1)], background=True)
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
 
-        # Audit logs: queried by module+record_id and user+timestamp
-        await db.audit_logs.create_index([("module", 1), ("record_id", 1), ("timestamp", -1)], background=True)
-        await db.audit_logs.create_index([("user_id", 1), ("timestamp", -1)], background=True)
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        _startup_phases[phase] = round(now - self.last, 3)
+        self.last = now
 
-        # DSC register: expiry-based lookups
-        await db.dsc_register.create_index([("assigned_to", 1), ("expiry_date", 1)], background=True)
 
-    except Exception as e:
-        # Log index creation errors but do NOT crash the server
-        logger.warning(f"Index creation warning (non-fatal): {e}")
+@app.on_event("startup")
+async def startup_event():
+    clock = _StartupClock()
+    # Indexes are declared in backend/index_manifest.py (CORE_INDEXES plus
+    # each module's INDEXES). One worker diffs them against list_indexes and
+    # builds only the missing ones; the others skip.
+    await reconcile_indexes()
+    clock.mark("indexes")
 
     try:
         visits = await db.visits.find({"id": {"$exists": False}}).to_list(10000)
@@ -748,119 +565,95 @@ async def startup_event():
         logger.info(f"✅ Visit ID repair: {repaired} documents patched")
     except Exception as e:
         logger.error(f"⚠️ Visit ID repair failed (non-fatal): {e}")
+    clock.mark("visit_id_repair")
 
     # Scheduled jobs=====================================================================
+    # All periodic work runs on the asyncio job runner. Every worker registers
+    # the same schedule; each fire is claimed in Mongo so it runs once
+    # cluster-wide (see backend/job_runner.py).
     try:
-        scheduler.add_job(fetch_indian_holidays_task, "cron", day=1, hour=0, minute=5)
-        # Also run immediately on startup so holidays are available from day 1
-        scheduler.add_job(
-            fetch_indian_holidays_task,
-            "date",
-            run_date=datetime.now(pytz.timezone("Asia/Kolkata")),
-        )
+        job_runner.add_job("fetch_indian_holidays", fetch_indian_holidays_job,
+                           cron(day=1, hour=0, minute=5), timeout=120)
         # Absent marking job — fires every working day at 19:00 IST
-        scheduler.add_job(
-            mark_absent_users_task,
-            "cron",
-            hour=19,
-            minute=0,
-            timezone=pytz.timezone("Asia/Kolkata"),
-            id="mark_absent_daily",
-            replace_existing=True,
-        )
+        job_runner.add_job("mark_absent_daily", mark_absent_users_job,
+                           cron(hour=19, minute=0), timeout=120)
         # Auto punch-out job — fires at 23:00 IST; records punch_out = 7 PM for
         # any user who punched in today but never manually punched out.
-        scheduler.add_job(
-            force_punch_out_11pm_task,
-            "cron",
-            hour=23,
-            minute=0,
-            timezone=pytz.timezone("Asia/Kolkata"),
-            id="force_punch_out_11pm",
-            replace_existing=True,
-        )
+        job_runner.add_job("force_punch_out_11pm", force_punch_out_11pm_job,
+                           cron(hour=23, minute=0), timeout=120)
+        # Pending-task reminder mail — 10:00 IST. catch_up re-fires it after a
+        # restart past 10 AM; the job's own last_reminder_date guard keeps it
+        # to one send per day.
+        job_runner.add_job("daily_task_reminder", daily_task_reminder_job,
+                           cron(hour=10, minute=0), timeout=600, catch_up=True)
 
         # ── Automation Engine jobs ────────────────────────────────────────
         # Supersedes the old WA-only wa_birthday_job: handles WhatsApp +
         # Email birthdays, the admin approval gate, and timeline logging.
-        scheduler.add_job(
-            birthday_automation_job,
-            "cron",
-            hour=9,
-            minute=0,
-            timezone=pytz.timezone("Asia/Kolkata"),
-            id="birthday_automation",
-            replace_existing=True,
-        )
-        scheduler.add_job(
-            festival_greeting_job,
-            "cron",
-            hour=9,
-            minute=5,
-            timezone=pytz.timezone("Asia/Kolkata"),
-            id="festival_greetings",
-            replace_existing=True,
-        )
-        scheduler.add_job(
-            service_expiry_alert_job,
-            "cron",
-            hour=9,
-            minute=45,
-            timezone=pytz.timezone("Asia/Kolkata"),
-            id="service_expiry_alerts",
-            replace_existing=True,
-        )
-        scheduler.add_job(
-            follow_up_reminder_job,
-            "cron",
-            hour=10,
-            minute=15,
-            timezone=pytz.timezone("Asia/Kolkata"),
-            id="follow_up_reminders",
-            replace_existing=True,
-        )
+        job_runner.add_job("birthday_automation", run_birthday_automation,
+                           cron(hour=9, minute=0), timeout=900)
+        job_runner.add_job("festival_greetings", run_festival_greetings,
+                           cron(hour=9, minute=5), timeout=900)
+        job_runner.add_job("service_expiry_alerts", run_service_expiry_alerts,
+                           cron(hour=9, minute=45), timeout=300)
+        job_runner.add_job("follow_up_reminders", run_follow_up_reminders,
+                           cron(hour=10, minute=15), timeout=300)
 
         # ── WhatsApp notification jobs ────────────────────────────────────
-        scheduler.add_job(
-            wa_dsc_expiry_job,
-            "cron",
-            hour=9,
-            minute=30,
-            timezone=pytz.timezone("Asia/Kolkata"),
-            id="wa_dsc_expiry_alerts",
-            replace_existing=True,
-        )
-        scheduler.add_job(
-            wa_compliance_job,
-            "cron",
-            hour=10,
-            minute=0,
-            timezone=pytz.timezone("Asia/Kolkata"),
-            id="wa_compliance_reminders",
-            replace_existing=True,
-        )
-        # Scheduled bulk send runner — checks every minute for due jobs
-        scheduler.add_job(
-            wa_scheduled_bulk_job,
-            "interval",
-            minutes=1,
-            id="wa_scheduled_bulk",
-            replace_existing=True,
-        )
+        job_runner.add_job("wa_dsc_expiry_alerts", wa_dsc_expiry_job,
+                           cron(hour=9, minute=30), timeout=900)
+        job_runner.add_job("wa_compliance_reminders", wa_compliance_job,
+                           cron(hour=10, minute=0), timeout=900)
+        # Scheduled bulk send runner — checks every minute for due jobs. Large
+        # batches can outlive the interval; the singleton lock keeps runs
+        # from overlapping on any worker.
+        job_runner.add_job("wa_scheduled_bulk", wa_scheduled_bulk_job,
+                           every(minutes=1), timeout=3600)
         # Keep wa-bridge warm so Render's free instance never spins down —
         # fixes the 429/CORS/502 cascade caused by cold-start request bursts.
-        scheduler.add_job(
-            wa_bridge_keepalive_job,
-            "interval",
-            minutes=5,
-            id="wa_bridge_keepalive",
-            replace_existing=True,
-        )
-
-        scheduler.start()
-        logger.info("APScheduler started successfully.")
+        job_runner.add_job("wa_bridge_keepalive", ping_wa_bridge_keep_alive,
+                           every(minutes=5), timeout=15, jitter=10)
+        # Dashboard counters — rebuilds kinds marked dirty by bulk writes and
+        # does a full drift-repair pass every 6 h.
+        job_runner.add_job("dashboard_counters_reconcile", reconcile_dashboard_counters,
+                           every(minutes=5), timeout=600, catch_up=True)
+        # Search index — backfills kinds never built and rebuilds kinds
+        # marked dirty by bulk writes.
+        job_runner.add_job("search_index_reconcile", reconcile_search_index,
+                           every(minutes=5), timeout=1800, catch_up=True)
+        # Client calendar — (month, day) projection of birthdays and DSC
+        # expiries read by the greeting/alert jobs; rebuilds dirty kinds.
+        job_runner.add_job("client_calendar_reconcile", reconcile_client_calendar,
+                           every(minutes=5), timeout=900, catch_up=True)
+        # Monthly journal rollup — rebuilds the per-account month totals of
+        # months whose journal lines were written since they were built.
+        job_runner.add_job("journal_rollup_refresh", refresh_journal_rollup,
+                           every(minutes=5), timeout=900)
+        # Ledger validation audit — full rescan of every book, rebuilding the
+        # running totals the on-demand validator checks incrementally.
+        job_runner.add_job("validation_audit", run_validation_audit,
+                           cron(hour=2, minute=30), timeout=7200, catch_up=True)
+        # Drive metadata mirror for client portal folders — replays the Drive
+        # changes feed and crawls newly linked folders.
+        job_runner.add_job("drive_mirror_sync", reconcile_drive_mirror,
+                           every(minutes=1), timeout=900)
+        # Lead/intent pre-filter — refits the local classifier from stored
+        # LLM verdicts.
+        job_runner.add_job("lead_prefilter_train", train_lead_prefilter,
+                           every(hours=24), timeout=600, catch_up=True)
+        # Bulk SMTP mail — resumes jobs whose worker died mid-send once
+        # their lease has expired.
+        job_runner.add_job("bulk_mail_resume", resume_bulk_mail_jobs,
+                           every(minutes=1), timeout=3600)
+        # Payslip PDFs — pre-renders new and edited slips in a process pool;
+        # bulk generation also triggers it right away.
+        job_runner.add_job(PDF_RENDER_JOB, render_pending_slip_pdfs,
+                           every(minutes=1), timeout=1800)
+
+        job_runner.start()
     except Exception as e:
-        logger.error(f"APScheduler startup failed: {e}")
+        logger.error(f"Job runner startup failed: {e}")
+    clock.mark("jobs")
 
     # ── AUTO-SYNC HOLIDAYS ON EVERY BOOT ─────────────────────────────────────
     # Runs async in the background — never blocks startup.
@@ -939,15 +732,22 @@ async def startup_event():
 
     asyncio.create_task(_keep_alive_ping())
 
+    # Desktop agent telemetry deltas are buffered in memory and written in batches
+    start_telemetry_flush_loop()
+    # Usage counters and API call logs likewise (backend/licensing/usage_meter.py)
+    usage_meter.start_flush_loop()
+    clock.mark("background_tasks")
+
     # 🔥 AUTO MIGRATION: Add consent_given for old users
     try:
         result = await db.users.update_many(
-            {},  # all users
+            {"consent_given": {"$ne": True}},  # only users not yet migrated
             {"$set": {"consent_given": True}},
         )
         logger.info(f"Consent cleanup: Updated {result.modified_count} users")
     except Exception as e:
         logger.error(f"Consent cleanup failed: {e}")
+    clock.mark("consent_cleanup")
 
     # ── PHASE 10 SELF-LEARNING SCHEDULER START ──
     try:
@@ -975,6 +775,10 @@ async def startup_event():
         # Start the escalation & automation scheduler background loop
         WorkflowScheduler.start()
         logger.info("Phase 11 Workflow Scheduler started successfully on boot.")
+
+        # Outbox dispatcher for business events (listeners + automation rules)
+        from backend.workflow.event_bus import EventBus
+        EventBus.start()
     except Exception as e_wf_sched:
         logger.error(f"Failed to start Phase 11 Workflow Scheduler on boot: {e_wf_sched}")
 
@@ -992,9 +796,39 @@ async def startup_event():
         asyncio.create_task(bootstrap_saas_platform_async())
     except Exception as e_saas_import:
         logger.error(f"Failed to import SaaS Platform Engine: {e_saas_import}")
+    clock.mark("schedulers")
+
+    _startup_phases["total"] = round(time.perf_counter() - clock.started, 3)
+    logger.info("Startup finished in %.2fs (%s)", _startup_phases["total"],
+                ", ".join(f"{k} {v:.2f}s" for k, v in _startup_phases.items() if k != "total"))
 
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_runner.stop()
+    try:
+        from backend.workflow.event_bus import EventBus
+        await EventBus.stop()
+    except Exception as e:
+        logger.error(f"Event bus shutdown failed: {e}")
+    # Drain write-behind buffers so acknowledged data is not lost on deploy/restart
+    try:
+        await flush_telemetry_buffer()
+    except Exception as e:
+        logger.error(f"Desktop telemetry flush on shutdown failed: {e}")
+    try:
+        await usage_meter.stop()
+    except Exception as e:
+        logger.error(f"Usage meter flush on shutdown failed: {e}")
+    await bulk_mail.close_pools()
+    shutdown_pdf_pool()
+    password_hashing.shutdown()
+    doc_extraction.shutdown()
+    await live_events.shutdown()
+    await llm_gateway.aclose()
+
+
 # ====================== HEALTH ======================
 @app.api_route("/health", methods=["GET", "HEAD"])
 async def health():
@@ -1155,58 +989,40 @@ async def calculate_expected_hours(
     return _expected_hours_pure(start_date_str, end_date_str, shift_start, shift_end, holidays)
 
 
-def fetch_indian_holidays_task():
-    """
-    Scheduled job (sync wrapper for BackgroundScheduler) to fetch holidays.
-    Uses run_coroutine_threadsafe so Motor futures stay on the main event loop.
-    """
-
-    async def _async_fetch():
-        try:
-            now = datetime.now(IST)
-            for year in [now.year, now.year + 1]:
-                url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/IN"
-                response = requests.get(url, timeout=10)
-                if response.status_code != 200:
-                    continue
-                external_holidays = response.json()
-                count = 0
-                for h in external_holidays:
-                    date_str = h["date"]
-                    existing = await db.holidays.find_one(
-                        {"date": date_str}, {"_id": 0}
-                    )
-                    if not existing:
-                        new_holiday = {
-                            "date": date_str,
-                            "name": h.get("localName") or h.get("name", "Holiday"),
-                            "status": "confirmed",
-                            "type": "public",
-                            "created_at": datetime.now(IST).isoformat(),
-                        }
-                        await db.holidays.insert_one(new_holiday)
-                        count += 1
-                    elif existing.get("status") not in ("confirmed", "rejected"):
-                        await db.holidays.update_one(
-                            {"date": date_str}, {"$set": {"status": "confirmed"}}
-                        )
-                logger.info(f"Auto-synced holidays for {year}: {count} new")
-        except Exception as e:
-            logger.error(f"Holiday Autofetch Failed: {str(e)}")
-
+async def fetch_indian_holidays_job():
+    """Job runner entry point — monthly holiday sync from date.nager.at."""
     try:
-        import backend.server as _self
-
-        loop = _self.app_event_loop
-        if loop is None or loop.is_closed():
-            logger.warning(
-                "fetch_indian_holidays_task: main event loop not ready, skipping."
-            )
-            return
-        future = asyncio.run_coroutine_threadsafe(_async_fetch(), loop)
-        future.result(timeout=120)
+        now = datetime.now(IST)
+        for year in [now.year, now.year + 1]:
+            url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/IN"
+            async with httpx.AsyncClient(timeout=10) as http:
+                response = await http.get(url)
+            if response.status_code != 200:
+                continue
+            external_holidays = response.json()
+            count = 0
+            for h in external_holidays:
+                date_str = h["date"]
+                existing = await db.holidays.find_one(
+                    {"date": date_str}, {"_id": 0}
+                )
+                if not existing:
+                    new_holiday = {
+                        "date": date_str,
+                        "name": h.get("localName") or h.get("name", "Holiday"),
+                        "status": "confirmed",
+                        "type": "public",
+                        "created_at": datetime.now(IST).isoformat(),
+                    }
+                    await db.holidays.insert_one(new_holiday)
+                    count += 1
+                elif existing.get("status") not in ("confirmed", "rejected"):
+                    await db.holidays.update_one(
+                        {"date": date_str}, {"$set": {"status": "confirmed"}}
+                    )
+            logger.info(f"Auto-synced holidays for {year}: {count} new")
     except Exception as e:
-        logger.error(f"fetch_indian_holidays_task failed: {e}")
+        logger.error(f"Holiday Autofetch Failed: {str(e)}")
 
 
 # ROUTER
@@ -1613,22 +1429,11 @@ async def detect_duplicate_tasks(current_user: User = Depends(get_current_user))
     import json as _json, re as _re
 
     # ── 1. Verify Gemini is configured ────────────────────────────────────
-    gemini_key = os.environ.get("GEMINI_API_KEY", "")
-    if not gemini_key:
+    if not os.environ.get("GEMINI_API_KEY", ""):
         raise HTTPException(
             status_code=503, detail="GEMINI_API_KEY is not set on the server."
         )
 
-    try:
-        import google.generativeai as _genai
-
-        _genai.configure(api_key=gemini_key)
-        _model = _genai.GenerativeModel("gemini-2.0-flash")
-    except ImportError:
-        raise HTTPException(
-            status_code=503, detail="google-generativeai package not installed."
-        )
-
     # ── 2. Scope query same as GET /tasks ──────────────────────────────────
     query: dict = {"type": {"$ne": "todo"}}
     if current_user.role != "admin":
@@ -1674,14 +1479,20 @@ async def detect_duplicate_tasks(current_user: User = Depends(get_current_user))
 
     # ── 4. Call Gemini ─────────────────────────────────────────────────────
     try:
-        resp = await _model.generate_content_async(prompt)
-        raw = _re.sub(r"```[a-zA-Z]*", "", resp.text.strip()).replace("```", "").strip()
+        text = await llm_gateway.generate(
+            "task_duplicates",
+            prompt,
+            provider="gemini",
+            models={"gemini": "gemini-2.0-flash"},
+            fallback=False,
+        )
+        raw = _re.sub(r"```[a-zA-Z]*", "", text.strip()).replace("```", "").strip()
         groups = _json.loads(raw)
         if not isinstance(groups, list):
             groups = []
     except Exception as e:
-        err_str = str(e)
-        if "429" in err_str or "quota" in err_str.lower() or "rate" in err_str.lower():
+        err_str = str(getattr(e, "detail", e))
+        if getattr(e, "status_code", None) == 429 or "quota" in err_str.lower():
             raise HTTPException(
                 status_code=429,
                 detail=(
@@ -1767,62 +1578,43 @@ async def detect_duplicate_tasks_grok(
 
     # ── 4. Call Groq API (OpenAI-compatible endpoint) ─────────────────────
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {groq_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a task deduplication assistant. Always respond with valid JSON only — no markdown, no code fences, no explanation.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 1024,
-                },
-            )
+        raw_text = await llm_gateway.generate(
+            "task_duplicates",
+            prompt,
+            system="You are a task deduplication assistant. Always respond with valid JSON only — no markdown, no code fences, no explanation.",
+            temperature=0.1,
+            max_tokens=1024,
+            provider="groq",
+            models={"groq": "llama-3.3-70b-versatile"},
+            fallback=False,
+        )
+        # Strip markdown code fences if model wraps response in them
+        raw_text = _re.sub(r"```[a-zA-Z]*", "", raw_text.strip()).replace("```", "").strip()
+        groups = _json.loads(raw_text)
+        if not isinstance(groups, list):
+            groups = []
 
-        if response.status_code == 429:
+    except llm_gateway.LLMError as e:
+        if e.status_code == 429:
             raise HTTPException(
                 status_code=429,
                 detail="Groq API rate limit exceeded. Please wait a moment and try again.",
             )
-        if response.status_code == 401:
+        if e.upstream_status == 401:
             raise HTTPException(
                 status_code=503,
                 detail="Invalid GROQ_API_KEY. Please check your Groq API key on Render.",
             )
-        if not response.is_success:
+        if e.status_code == 504:
             raise HTTPException(
-                status_code=502,
-                detail=f"Groq API error: {response.status_code} — {response.text[:200]}",
+                status_code=504, detail="Groq API timed out. Please try again."
             )
-
-        data = response.json()
-        raw_text = data["choices"][0]["message"]["content"].strip()
-        # Strip markdown code fences if model wraps response in them
-        raw_text = _re.sub(r"```[a-zA-Z]*", "", raw_text).replace("```", "").strip()
-        groups = _json.loads(raw_text)
-        if not isinstance(groups, list):
-            groups = []
-
-    except HTTPException:
-        raise
+        raise HTTPException(status_code=502, detail=str(e.detail)[:300])
     except _json.JSONDecodeError as e:
         logger.warning(f"Groq returned non-JSON response: {e}")
         raise HTTPException(
             status_code=500, detail="Groq returned an unparseable response. Try again."
         )
-    except httpx.TimeoutException:
-        raise HTTPException(
-            status_code=504, detail="Groq API timed out. Please try again."
-        )
     except Exception as e:
         err_str = str(e)
         logger.warning(f"Groq duplicate detection failed: {e}")
@@ -1832,12 +1624,12 @@ async def detect_duplicate_tasks_grok(
 
 
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hashing.verify_password(plain_password, hashed_password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hashing.hash_password(password)
 
 
 async def send_email(to_email: str, subject: str, body: str):
@@ -2250,6 +2042,7 @@ async def promote_todo(
             await db.todos.delete_one({"_id": ObjectId(todo_id)}, session=session)
 
         await session.with_transaction(cb)
+    await change_hooks.record_change("tasks", None, new_task)
     return {"message": "Todo promoted to task successfully"}
 
 
@@ -2342,7 +2135,7 @@ async def register(
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
 
     requested_role = (
         user_data.role.value if hasattr(user_data.role, "value") else user_data.role
@@ -2438,7 +2231,7 @@ async def self_register(user_data: UserCreate, request: Request):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     default_permissions = DEFAULT_ROLE_PERMISSIONS.get("staff", {})
     user_id = str(uuid.uuid4())
 
@@ -2494,7 +2287,7 @@ async def login(credentials: UserLogin, request: Request):
 
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
 
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password(credentials.password, user["password"]):
         try:
             await AuditSecurity.log_security_event(
                 event_type="login_failed",
@@ -2600,6 +2393,12 @@ async def security_scan(current_user: User = Depends(require_admin())):
     return await SecurityMonitor.run_security_scan()
 
 
+@api_router.get("/admin/startup-report")
+async def startup_report(current_user: User = Depends(require_admin())):
+    """Admin-only: this worker's startup phase timings and index reconcile result."""
+    return {"phases": _startup_phases, "indexes": index_manifest.last_report()}
+
+
 @api_router.get("/security/events")
 async def security_events(
     limit: int = Query(50, ge=1, le=500),
@@ -2860,7 +2659,7 @@ async def update_user(
             update_payload["monthly_salary"] = None
     new_password = user_data.get("password")
     if new_password and len(new_password.strip()) > 0:
-        update_payload["password"] = get_password_hash(new_password)
+        update_payload["password"] = await get_password_hash(new_password)
     if update_payload:
         await db.users.update_one({"id": user_id}, {"$set": update_payload})
     await create_audit_log(
@@ -2958,23 +2757,30 @@ async def offboard_user(
 
     # 1. Tasks
     if body.transfer_tasks:
+        task_now = datetime.now(IST).isoformat()
         r1 = await db.tasks.update_many(
             {"assigned_to": user_id},
-            {"$set": {"assigned_to": body.replacement_user_id}},
+            {"$set": {"assigned_to": body.replacement_user_id, "updated_at": task_now}},
         )
         r2 = await db.tasks.update_many(
-            {"created_by": user_id}, {"$set": {"created_by": body.replacement_user_id}}
+            {"created_by": user_id},
+            {"$set": {"created_by": body.replacement_user_id, "updated_at": task_now}},
         )
         transfer_summary["tasks_assigned"] = r1.modified_count
         transfer_summary["tasks_created"] = r2.modified_count
+        await change_hooks.mark_dirty("tasks")
 
     # 2. Clients
     if body.transfer_clients:
         r = await db.clients.update_many(
             {"assigned_to": user_id},
-            {"$set": {"assigned_to": body.replacement_user_id}},
+            {"$set": {
+                "assigned_to": body.replacement_user_id,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }},
         )
         transfer_summary["clients_reassigned"] = r.modified_count
+        await change_hooks.mark_dirty("clients")
 
     # 3. DSC
     if body.transfer_dsc:
@@ -2983,6 +2789,7 @@ async def offboard_user(
             {"$set": {"assigned_to": body.replacement_user_id}},
         )
         transfer_summary["dsc_transferred"] = r.modified_count
+        await change_hooks.mark_dirty("dsc")
 
     # 4. Documents
     if body.transfer_documents:
@@ -4882,6 +4689,7 @@ async def create_task(
         if doc.get(field) and isinstance(doc[field], datetime):
             doc[field] = doc[field].isoformat()
     await db.tasks.insert_one(doc)
+    await change_hooks.record_change("tasks", None, doc)
     if task.assigned_to and task.assigned_to != current_user.id:
         await create_notification(
             user_id=task.assigned_to,
@@ -4933,6 +4741,7 @@ async def create_tasks_bulk(
         if task_dict.get("due_date"):
             task_dict["due_date"] = task_dict["due_date"].isoformat()
         await db.tasks.insert_one(task_dict)
+        await change_hooks.record_change("tasks", None, task_dict)
         if task_dict.get("assigned_to") and task_dict["assigned_to"] != current_user.id:
             await create_notification(
                 user_id=task_dict["assigned_to"],
@@ -4979,11 +4788,59 @@ async def import_tasks_from_csv(
     return await create_tasks_bulk(payload, current_user)
 
 
+async def _build_tasks_access_query(current_user: User) -> dict:
+    """Permission-scoped task list query (excludes personal todos)."""
+    query = {"type": {"$ne": "todo"}}
+    if current_user.role == "admin":
+        return query
+    permissions = get_user_permissions(current_user)
+    allowed_users = permissions.get("view_other_tasks", []) or []
+    if current_user.role == "manager":
+        # Manager: Own + Team (same department)
+        team_ids = await get_team_user_ids(current_user.id)
+        allowed_users = list(set(allowed_users + team_ids))
+    or_clauses = [
+        {"assigned_to": current_user.id},
+        {"sub_assignees": current_user.id},
+        {"created_by": current_user.id},
+    ]
+    if allowed_users:
+        or_clauses.append({"assigned_to": {"$in": allowed_users}})
+        or_clauses.append({"created_by": {"$in": allowed_users}})
+    query["$or"] = or_clauses
+    return query
+
+
+async def _decorate_tasks(tasks: list) -> list:
+    """Attach assignee/creator names and coerce dates for list responses."""
+    user_ids = {
+        task.get("assigned_to") for task in tasks if task.get("assigned_to")
+    } | {task.get("created_by") for task in tasks if task.get("created_by")}
+    users = await db.users.find(
+        {"id": {"$in": list(user_ids)}}, {"_id": 0, "id": 1, "full_name": 1}
+    ).to_list(length=None) if user_ids else []
+    user_map = {u["id"]: u.get("full_name") for u in users}
+    for task in tasks:
+        task["created_at"] = safe_dt(task.get("created_at"))
+        task["updated_at"] = safe_dt(task.get("updated_at"))
+        task["due_date"] = safe_dt(task.get("due_date"))
+        task["assigned_to_name"] = user_map.get(task.get("assigned_to"), "Unknown")
+        task["created_by_name"] = user_map.get(task.get("created_by"), "Unknown")
+        if not isinstance(task.get("sub_assignees"), list):
+            task["sub_assignees"] = []
+        if not isinstance(task.get("comments"), list):
+            task["comments"] = []
+    return tasks
+
+
 @api_router.get("/tasks")
 async def get_tasks(
+    response: Response,
     current_user: User = Depends(check_module_permission("tasks", "view")),
     page: Optional[int] = Query(None, ge=1, description="Optional: page number for paginated response"),
     page_size: Optional[int] = Query(None, ge=1, le=500, description="Optional: results per page (only used if `page` is set)"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous X-Next-Cursor header"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Keyset page size; enables cursor paging"),
 ):
     """
     BUG FIX: this used to hard-cap at .to_list(1000) — any company with more
@@ -4996,26 +4853,20 @@ async def get_tasks(
     get back a paginated {tasks, total, page, page_size, total_pages} object
     instead, for future adoption by list views that don't need the whole
     dataset client-side at once.
+
+    Keyset paging: pass `limit` (and `cursor` for later pages) to get a plain
+    array, newest first, with the next page's cursor in the X-Next-Cursor
+    header (absent on the last page). No count/skip, so deep pages stay cheap.
     """
-    query = {"type": {"$ne": "todo"}}
-    if current_user.role == "admin":
-        pass
-    else:
-        permissions = get_user_permissions(current_user)
-        allowed_users = permissions.get("view_other_tasks", []) or []
-        if current_user.role == "manager":
-            # Manager: Own + Team (same department)
-            team_ids = await get_team_user_ids(current_user.id)
-            allowed_users = list(set(allowed_users + team_ids))
-        or_clauses = [
-            {"assigned_to": current_user.id},
-            {"sub_assignees": current_user.id},
-            {"created_by": current_user.id},
-        ]
-        if allowed_users:
-            or_clauses.append({"assigned_to": {"$in": allowed_users}})
-            or_clauses.append({"created_by": {"$in": allowed_users}})
-        query["$or"] = or_clauses
+    query = await _build_tasks_access_query(current_user)
+
+    if limit is not None or cursor:
+        tasks, next_cursor = await list_sync.keyset_page(
+            db.tasks, query, [("_id", -1)], cursor, limit or 100
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return await _decorate_tasks(tasks)
 
     total = None
     if page is not None:
@@ -5032,23 +4883,7 @@ async def get_tasks(
     else:
         tasks = await db.tasks.find(query, {"_id": 0}).to_list(length=None)
 
-    user_ids = {
-        task.get("assigned_to") for task in tasks if task.get("assigned_to")
-    } | {task.get("created_by") for task in tasks if task.get("created_by")}
-    users = await db.users.find(
-        {"id": {"$in": list(user_ids)}}, {"_id": 0, "password": 0}
-    ).to_list(length=None)
-    user_map = {u["id"]: u["full_name"] for u in users}
-    for task in tasks:
-        task["created_at"] = safe_dt(task.get("created_at"))
-        task["updated_at"] = safe_dt(task.get("updated_at"))
-        task["due_date"] = safe_dt(task.get("due_date"))
-        task["assigned_to_name"] = user_map.get(task.get("assigned_to"), "Unknown")
-        task["created_by_name"] = user_map.get(task.get("created_by"), "Unknown")
-        if not isinstance(task.get("sub_assignees"), list):
-            task["sub_assignees"] = []
-        if not isinstance(task.get("comments"), list):
-            task["comments"] = []
+    await _decorate_tasks(tasks)
 
     if page is not None:
         return {
@@ -5061,6 +4896,27 @@ async def get_tasks(
     return tasks
 
 
+@api_router.get("/tasks/sync")
+async def sync_tasks(
+    current_user: User = Depends(check_module_permission("tasks", "view")),
+    changed_since: Optional[str] = Query(None, description="ISO timestamp; the next_since of the previous sync"),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(200, ge=1, le=1000),
+):
+    """
+    Delta sync for the task list. Returns
+    {changed, deleted, next_cursor, next_since, reset}: follow next_cursor
+    until it is null, then keep next_since for the next call. Without
+    changed_since the first pass is a full snapshot; reset=true means the
+    watermark is too old and the client must resync from scratch.
+    """
+    query = await _build_tasks_access_query(current_user)
+    result = await list_sync.delta_page(
+        db.tasks, "tasks", query, changed_since, cursor, limit
+    )
+    await _decorate_tasks(result["changed"])
+    return result
+
 
 @api_router.get("/tasks/{task_id}/detail")
 async def get_task_detail(task_id: str, current_user: User = Depends(get_current_user)):
@@ -5197,6 +5053,7 @@ async def patch_task(
         updates["completed_at"] = datetime.now(IST).isoformat()
     await db.tasks.update_one({"id": task_id}, {"$set": updates})
     updated_task = await db.tasks.find_one({"id": task_id}, {"_id": 0})
+    await change_hooks.record_change("tasks", old_data, updated_task)
     action_type = (
         "TASK_STATUS_CHANGED"
         if "status" in updates and old_data.get("status") != updates.get("status")
@@ -5228,6 +5085,7 @@ async def delete_task(task_id: str, current_user: User = Depends(get_current_use
     )
     assert_record_visibility(current_user, existing, team_ids)
     await db.tasks.delete_one({"id": task_id})
+    await change_hooks.record_change("tasks", existing, None)
     await create_audit_log(
         current_user=current_user,
         action="DELETE_TASK",
@@ -5260,7 +5118,10 @@ async def add_task_comment(
         "text": comment_data.get("text"),
         "created_at": datetime.now(IST).isoformat(),
     }
-    await db.tasks.update_one({"id": task_id}, {"$push": {"comments": comment}})
+    await db.tasks.update_one(
+        {"id": task_id},
+        {"$push": {"comments": comment}, "$set": {"updated_at": comment["created_at"]}},
+    )
     return comment
 
 
@@ -5822,6 +5683,7 @@ async def create_dsc(
         doc["expiry_date"] = _to_iso(doc["expiry_date"])
         await db.dsc_register.insert_one(doc)
         doc.pop("_id", None)
+        await change_hooks.record_change("dsc", None, doc)
         return dsc
     except Exception as e:
         logger.error(f"DSC create error: {e}", exc_info=True)
@@ -5858,6 +5720,7 @@ async def get_dsc_list(
     )
     dsc_list = await cursor.to_list(length=limit)
     now = datetime.now(IST)
+    auto_expired = False
 
     for dsc in dsc_list:
         # Safely parse stored ISO strings back to datetime for comparison
@@ -5906,6 +5769,9 @@ async def get_dsc_list(
                     )
                     dsc["current_status"] = "EXPIRED"
                     dsc["movement_log"] = movement_log
+                    auto_expired = True
+    if auto_expired:
+        await change_hooks.mark_dirty("dsc")
 
     return DSCListResponse(data=dsc_list, total=total, page=page, limit=limit)
 
@@ -5925,6 +5791,7 @@ async def update_dsc(
     update_data["expiry_date"] = _to_iso(update_data["expiry_date"])
 
     await db.dsc_register.update_one({"id": dsc_id}, {"$set": update_data})
+    await change_hooks.record_change("dsc", existing, {**existing, **update_data})
     await create_audit_log(
         current_user,
         action="UPDATE_DSC",
@@ -5967,6 +5834,7 @@ async def delete_dsc(
     result = await db.dsc_register.delete_one({"id": dsc_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="DSC not found")
+    await change_hooks.record_change("dsc", existing, None)
     return {"message": "DSC deleted successfully"}
 
 
@@ -5991,18 +5859,15 @@ async def record_dsc_movement(
     movement_log = existing.get("movement_log", [])
     movement_log.append(movement)
 
-    await db.dsc_register.update_one(
-        {"id": dsc_id},
-        {
-            "$set": {
-                "current_status": movement_data.movement_type,
-                "current_location": "with_company"
-                if movement_data.movement_type == "IN"
-                else "taken_by_client",
-                "movement_log": movement_log,
-            }
-        },
-    )
+    movement_set = {
+        "current_status": movement_data.movement_type,
+        "current_location": "with_company"
+        if movement_data.movement_type == "IN"
+        else "taken_by_client",
+        "movement_log": movement_log,
+    }
+    await db.dsc_register.update_one({"id": dsc_id}, {"$set": movement_set})
+    await change_hooks.record_change("dsc", existing, {**existing, **movement_set})
     await create_audit_log(
         current_user,
         action="UPDATE_DSC",
@@ -6054,6 +5919,9 @@ async def update_dsc_movement(
         {"id": dsc_id},
         {"$set": {"current_status": new_status, "movement_log": movement_log}},
     )
+    await change_hooks.record_change(
+        "dsc", existing, {**existing, "current_status": new_status, "movement_log": movement_log}
+    )
     await create_audit_log(
         current_user,
         action="UPDATE_DSC",
@@ -7661,6 +7529,7 @@ async def sync_master_sheets(
                         upsert=True,
                     )
                     sync_results["clients"] += 1
+                await change_hooks.mark_dirty("clients")
             elif "due" in sheet_type or "compliance" in sheet_type:
                 for rec in records:
                     await db.due_dates.insert_one(
@@ -11133,6 +11002,8 @@ async def import_clients_from_csv(
             errors.append({"row": i, "company": company_name, "error": str(e)[:80]})
             skipped_count += 1
 
+    if created_count:
+        await change_hooks.mark_dirty("clients")
     return {
         "message": f"{created_count} client(s) imported successfully",
         "clients_created": created_count,
@@ -11229,6 +11100,7 @@ async def create_client(
 
         doc.pop("_id", None)
         await db.clients.insert_one(doc)
+        await change_hooks.record_change("clients", None, doc)
         return client
     except ValidationError as ve:
         logger.error(
@@ -11394,6 +11266,7 @@ async def approve_client(client_id: str, current_user: User = Depends(get_curren
                 "approval_status": "approved",
                 "approved_by": current_user.id,
                 "approved_at": datetime.now(timezone.utc).isoformat(),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
                 "rejection_reason": None,
             }
         },
@@ -11418,6 +11291,7 @@ async def reject_client(
                 "approval_status": "rejected",
                 "approved_by": current_user.id,
                 "approved_at": datetime.now(timezone.utc).isoformat(),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
                 "rejection_reason": (payload or {}).get("reason") or "",
             }
         },
@@ -11488,14 +11362,20 @@ def _normalize_client_dates(client: dict) -> dict:
 
 @api_router.get("/clients", response_model=List[Client])
 async def get_clients(
+    response: Response,
     current_user: User = Depends(check_module_permission("clients", "view")),
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous X-Next-Cursor header"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Keyset page size; enables cursor paging"),
 ):
     """
     Return clients with pagination so the first page renders fast.
     Default page_size=100 keeps initial payload small; callers can pass
     page_size=500 (or loop pages) when they need the full list (e.g. export).
+
+    Pass `limit` (and `cursor` for later pages) for keyset paging instead of
+    skip: same order, next cursor in the X-Next-Cursor header.
     """
     permissions = get_user_permissions(current_user)
     team_ids = None
@@ -11504,6 +11384,14 @@ async def get_clients(
 
     query = _build_clients_access_query(current_user, permissions, team_ids)
 
+    if limit is not None or cursor:
+        clients, next_cursor = await list_sync.keyset_page(
+            db.clients, query, [("company_name", 1), ("_id", 1)], cursor, limit or page_size
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return [_normalize_client_dates(c) for c in clients]
+
     skip = (page - 1) * page_size
     clients = (
         await db.clients.find(query, {"_id": 0})
@@ -11534,7 +11422,35 @@ async def search_clients(
 
     access_query = _build_clients_access_query(current_user, permissions, team_ids)
 
-    # Build text filter (regex — fast enough for ≤10 k docs)
+    # Minimal projection — only what the Merge dialog renders
+    projection = {
+        "_id": 0,
+        "id": 1,
+        "company_name": 1,
+        "client_type": 1,
+        "phone": 1,
+        "email": 1,
+        "gstin": 1,
+        "status": 1,
+    }
+
+    # Ranked prefix/typo-tolerant lookup via the n-gram index, paged until
+    # `limit` hits the user can see are found.
+    found: dict = {}
+
+    async def load_visible(ref_ids):
+        id_filter = {"id": {"$in": ref_ids}}
+        docs = await db.clients.find(
+            {"$and": [access_query, id_filter]} if access_query else id_filter, projection
+        ).to_list(len(ref_ids))
+        found.update((c["id"], c) for c in docs)
+        return [c["id"] for c in docs]
+
+    hits = await search_index.search_scoped("client", q, limit, load_visible) if q.strip() else None
+    if hits is not None:
+        return [found[h["ref_id"]] for h in hits]
+
+    # Build text filter (regex — used until the search index is built)
     search_filter: dict = {}
     if q.strip():
         regex = {"$regex": q.strip(), "$options": "i"}
@@ -11555,18 +11471,6 @@ async def search_clients(
     else:
         combined = access_query
 
-    # Minimal projection — only what the Merge dialog renders
-    projection = {
-        "_id": 0,
-        "id": 1,
-        "company_name": 1,
-        "client_type": 1,
-        "phone": 1,
-        "email": 1,
-        "gstin": 1,
-        "status": 1,
-    }
-
     clients = (
         await db.clients.find(combined, projection)
         .sort("company_name", 1)
@@ -11576,6 +11480,26 @@ async def search_clients(
     return clients
 
 
+@api_router.get("/clients/sync")
+async def sync_clients(
+    current_user: User = Depends(check_module_permission("clients", "view")),
+    changed_since: Optional[str] = Query(None, description="ISO timestamp; the next_since of the previous sync"),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(200, ge=1, le=1000),
+):
+    """Delta sync for the client list — same contract as GET /tasks/sync."""
+    permissions = get_user_permissions(current_user)
+    team_ids = None
+    if current_user.role == "manager":
+        team_ids = await get_team_user_ids(current_user.id)
+    query = _build_clients_access_query(current_user, permissions, team_ids)
+    result = await list_sync.delta_page(
+        db.clients, "clients", query, changed_since, cursor, limit
+    )
+    result["changed"] = [convert_objectids(c) for c in result["changed"]]
+    return result
+
+
 @api_router.get("/clients/{client_id}", response_model=Client)
 async def get_client(client_id: str, current_user: User = Depends(get_current_user)):
     client = await db.clients.find_one({"id": client_id}, {"_id": 0})
@@ -11721,6 +11645,9 @@ async def update_client(
         "itr_data",
     }
     update_data = {k: v for k, v in client_data.items() if k in ALLOWED_FIELDS}
+    # Stored names are trimmed (compliance import matches them exactly, ignoring case)
+    if isinstance(update_data.get("company_name"), str):
+        update_data["company_name"] = update_data["company_name"].strip()
 
     # ── Convert empty strings → None for nullable fields ────────────
     NULLABLE_FIELDS = {
@@ -11831,7 +11758,9 @@ async def update_client(
                 cp["birthday"] = safe_iso(cp.get("birthday"))
 
     # ── Persist ─────────────────────────────────────────────────────
+    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     await db.clients.update_one({"id": client_id}, {"$set": update_data})
+    await change_hooks.record_change("clients", existing, {**existing, **update_data})
 
     # Sanitise existing record before passing to audit log so that bare
     # date objects (datetime.date) in old DB records don't cause a
@@ -11906,11 +11835,15 @@ async def delete_client(client_id: str, current_user: User = Depends(get_current
 
     # Nullify any leads that were converted to this client
     await db.leads.update_many(
-        {"converted_client_id": client_id}, {"$set": {"converted_client_id": None}}
+        {"converted_client_id": client_id},
+        {"$set": {"converted_client_id": None, "updated_at": datetime.now(timezone.utc)}},
     )
 
     # Also unlink tasks referencing this client
-    await db.tasks.update_many({"client_id": client_id}, {"$set": {"client_id": None}})
+    await db.tasks.update_many(
+        {"client_id": client_id},
+        {"$set": {"client_id": None, "updated_at": datetime.now(IST).isoformat()}},
+    )
 
     await create_audit_log(
         current_user,
@@ -11923,6 +11856,7 @@ async def delete_client(client_id: str, current_user: User = Depends(get_current
     result = await db.clients.delete_one({"id": client_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Client not found")
+    await change_hooks.record_change("clients", existing, None)
 
     return {
         "message": f"Client '{existing.get('company_name', client_id)}' deleted successfully"
@@ -11993,6 +11927,7 @@ async def get_dept_member_count(current_user: User = Depends(get_current_user)):
 async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
     now = datetime.now(IST)
     task_query = {}
+    allowed_users = []
     if current_user.role != "admin":
         permissions = get_user_permissions(current_user)
         if not permissions.get("can_view_all_tasks", False):
@@ -12007,12 +11942,7 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
                 {"assigned_to": {"$in": allowed_users}},
             ]
 
-    # PERF FIX: these six queries are independent of one another (none depends
-    # on another's result), but were previously awaited one-at-a-time in series
-    # — each round trip to Mongo adds its own latency, so six serial calls take
-    # roughly 6x as long as they need to. Firing them concurrently with
-    # asyncio.gather cuts dashboard load time down to the slowest single query
-    # instead of the sum of all of them.
+    extra_clients = []
     if current_user.role == "admin":
         client_query = {}
     else:
@@ -12027,36 +11957,81 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
             or_clauses.append({"id": {"$in": extra_clients}})
         client_query = {"$or": or_clauses}
 
+    # Materialized counters (see dashboard_counters.py) cover the common
+    # visibility scopes: everything, or a staff member's own tasks/clients.
+    # Scopes that union in other users' records fall back to loading rows.
+    if not task_query:
+        task_scope = "tasks:org"
+    elif current_user.role == "staff" and not allowed_users:
+        task_scope = f"tasks:user:{current_user.id}"
+    else:
+        task_scope = None
+    if not client_query:
+        client_scope = "clients:org"
+    elif not extra_clients:
+        client_scope = f"clients:user:{current_user.id}"
+    else:
+        client_scope = None
+
+    counter_meta, counters = await dashboard_counters.load(
+        [c for c in (task_scope, client_scope, "dsc:org") if c]
+    )
+    if not dashboard_counters.is_ready(counter_meta, "tasks"):
+        task_scope = None
+    if not dashboard_counters.is_ready(counter_meta, "clients"):
+        client_scope = None
+    dsc_ready = dashboard_counters.is_ready(counter_meta, "dsc")
+
     due_date_query = {"status": "pending"}
     if current_user.role != "admin" and current_user.departments:
         due_date_query["department"] = {"$in": current_user.departments}
 
+    # Only certificates that can be expired/expiring are loaded. ISO strings
+    # and BSON dates are bounded separately (Mongo compares within a type);
+    # the two extra days of slack are trimmed by the exact check below.
+    dsc_cutoff = now + timedelta(days=92)
+    dsc_query = {
+        "$or": [
+            {"expiry_date": {"$lte": dsc_cutoff.date().isoformat()}},
+            {"expiry_date": {"$lte": dsc_cutoff}},
+        ]
+    }
+
     async def _empty_list():
         return []
 
+    async def _none():
+        return None
+
     # PERF: Use tight projections — fetch only the fields this handler actually
-    # reads. Eliminates transmitting large blobs (notes, attachments, address
-    # strings, etc.) that the dashboard never touches.
+    # reads. Independent queries run concurrently.
     (
         tasks,
         dsc_list,
+        dsc_total,
         clients,
         closed_masters_stat,
         due_dates,
         users_for_workload,
+        workload_counters,
     ) = await asyncio.gather(
         db.tasks.find(task_query, {
             "_id": 0, "id": 1, "status": 1, "due_date": 1,
             "assigned_to": 1, "sub_assignees": 1, "created_by": 1,
-        }).to_list(length=None),
-        db.dsc_register.find({}, {
+        }).to_list(length=None)
+        if task_scope is None
+        else _empty_list(),
+        db.dsc_register.find(dsc_query, {
             "_id": 0, "id": 1, "holder_name": 1,
             "certificate_number": 1, "expiry_date": 1,
         }).to_list(length=None),
+        db.dsc_register.count_documents({}) if not dsc_ready else _none(),
         db.clients.find(client_query, {
             "_id": 0, "id": 1, "birthday": 1, "client_type": 1,
             "contact_persons": 1, "company_name": 1,
-        }).to_list(length=None),
+        }).to_list(length=None)
+        if client_scope is None
+        else _empty_list(),
         db.compliance_masters.find(
             {"is_closed": True}, {"_id": 0, "name": 1, "calendar_due_date_id": 1}
         ).to_list(length=None),
@@ -12067,27 +12042,40 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
         .to_list(length=None)
         if current_user.role != "staff"
         else _empty_list(),
+        dashboard_counters.assignee_workload()
+        if task_scope == "tasks:org" and current_user.role != "staff"
+        else _none(),
     )
-    total_tasks = len(tasks)
-    completed_tasks = len([t for t in tasks if t["status"] == "completed"])
-    pending_tasks = len([t for t in tasks if t["status"] == "pending"])
-    overdue_tasks = 0
-    for task in tasks:
-        if task.get("due_date") and task["status"] != "completed":
-            try:
-                due_date = (
-                    datetime.fromisoformat(task["due_date"])
-                    if isinstance(task["due_date"], str)
-                    else task["due_date"]
-                )
-                if due_date.tzinfo is None:
-                    due_date = due_date.replace(tzinfo=timezone.utc)
-                if due_date < now:
-                    overdue_tasks += 1
-            except (ValueError, TypeError):
-                continue
 
-    total_dsc = len(dsc_list)
+    if task_scope is not None:
+        stats = dashboard_counters.task_stats(counters.get(task_scope), now)
+        total_tasks = stats["total"]
+        completed_tasks = stats["completed"]
+        pending_tasks = stats["pending"]
+        overdue_tasks = stats["overdue"]
+    else:
+        total_tasks = len(tasks)
+        completed_tasks = len([t for t in tasks if t["status"] == "completed"])
+        pending_tasks = len([t for t in tasks if t["status"] == "pending"])
+        overdue_tasks = 0
+        for task in tasks:
+            if task.get("due_date") and task["status"] != "completed":
+                try:
+                    due_date = (
+                        datetime.fromisoformat(task["due_date"])
+                        if isinstance(task["due_date"], str)
+                        else task["due_date"]
+                    )
+                    if due_date.tzinfo is None:
+                        due_date = due_date.replace(tzinfo=timezone.utc)
+                    if due_date < now:
+                        overdue_tasks += 1
+                except (ValueError, TypeError):
+                    continue
+
+    total_dsc = (
+        int((counters.get("dsc:org") or {}).get("total", 0)) if dsc_ready else dsc_total
+    )
     expiring_dsc_count = 0
     expired_dsc_count = 0
     expiring_dsc_list = []
@@ -12116,33 +12104,37 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
         except (ValueError, TypeError):
             continue
 
-    total_clients = len(clients)
     today = date.today()
-    upcoming_birthdays = 0
-
-    for client in clients:
-        for person in personal_birthday_candidates(client):
-            raw = person["birthday"]
-            try:
-                bday = (
-                    date.fromisoformat(raw[:10])
-                    if isinstance(raw, str)
-                    else raw
-                )
+    if client_scope is not None:
+        client_counter = counters.get(client_scope)
+        total_clients = int((client_counter or {}).get("total", 0))
+        upcoming_birthdays = dashboard_counters.upcoming_birthdays(client_counter, today)
+    else:
+        total_clients = len(clients)
+        upcoming_birthdays = 0
+        for client in clients:
+            for person in personal_birthday_candidates(client):
+                raw = person["birthday"]
                 try:
-                    this_year_bday = bday.replace(year=today.year)
-                except ValueError:
-                    this_year_bday = bday.replace(year=today.year, day=28)
-                if this_year_bday < today:
+                    bday = (
+                        date.fromisoformat(raw[:10])
+                        if isinstance(raw, str)
+                        else raw
+                    )
                     try:
-                        this_year_bday = bday.replace(year=today.year + 1)
+                        this_year_bday = bday.replace(year=today.year)
                     except ValueError:
-                        this_year_bday = bday.replace(year=today.year + 1, day=28)
-                days_until = (this_year_bday - today).days
-                if 0 <= days_until <= 7:
-                    upcoming_birthdays += 1
-            except (ValueError, TypeError):
-                continue
+                        this_year_bday = bday.replace(year=today.year, day=28)
+                    if this_year_bday < today:
+                        try:
+                            this_year_bday = bday.replace(year=today.year + 1)
+                        except ValueError:
+                            this_year_bday = bday.replace(year=today.year + 1, day=28)
+                    days_until = (this_year_bday - today).days
+                    if 0 <= days_until <= 7:
+                        upcoming_birthdays += 1
+                except (ValueError, TypeError):
+                    continue
 
     upcoming_due_dates_count = 0
 
@@ -12175,19 +12167,24 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
 
     team_workload = []
     if current_user.role != "staff":
+        if workload_counters is None:
+            workload_counters = {}
+            for t in tasks:
+                w = workload_counters.setdefault(
+                    t.get("assigned_to"), {"total": 0, "pending": 0, "completed": 0}
+                )
+                w["total"] += 1
+                if t["status"] in ("pending", "completed"):
+                    w[t["status"]] += 1
         for user in users_for_workload:
-            user_tasks = [t for t in tasks if t.get("assigned_to") == user["id"]]
+            w = workload_counters.get(user["id"]) or {}
             team_workload.append(
                 {
                     "user_id": user["id"],
                     "user_name": user["full_name"],
-                    "total_tasks": len(user_tasks),
-                    "pending_tasks": len(
-                        [t for t in user_tasks if t["status"] == "pending"]
-                    ),
-                    "completed_tasks": len(
-                        [t for t in user_tasks if t["status"] == "completed"]
-                    ),
+                    "total_tasks": w.get("total", 0),
+                    "pending_tasks": w.get("pending", 0),
+                    "completed_tasks": w.get("completed", 0),
                 }
             )
 
@@ -12667,66 +12664,12 @@ async def get_due_reminder_popups(current_user: User = Depends(get_current_user)
       If either condition fails, no popups are fetched or marked fired —
       the underlying reminders stay pending so they can fire once the
       user is granted access.
-    """
-    if current_user.role != "admin":
-        perms = get_user_permissions(current_user)
-        has_popup_permission = perms.get("can_receive_popup_reminders", False)
-        cross_visibility_on = bool(await get_cross_visibility_union(current_user.id))
-        if not (has_popup_permission and cross_visibility_on):
-            return []
-
-    now_iso = datetime.now(timezone.utc).isoformat()
-    cursor = db.reminders.find({
-        "user_id": str(current_user.id),
-        "remind_at": {"$lte": now_iso},
-        "is_dismissed": False,
-        "is_fired": False,
-    }).sort("remind_at", 1).limit(20)
-
-    due_docs = await cursor.to_list(length=20)
-    if due_docs:
-        ids = [doc["_id"] for doc in due_docs]
-        await db.reminders.update_many(
-            {"_id": {"$in": ids}},
-            {"$set": {"is_fired": True, "updated_at": now_iso}},
-        )
-
-    results = [
-        {
-            "id": str(doc.get("_id")),
-            "type": doc.get("reminder_type", "reminder"),
-            "title": doc.get("title", "Reminder"),
-            "message": doc.get("description", ""),
-            "task_id": doc.get("related_task_id"),
-        }
-        for doc in due_docs
-    ]
-
-    popup_cursor = db.notifications.find({
-        "user_id": str(current_user.id),
-        "popup": True,
-        "is_read": False,
-    }).sort("created_at", 1).limit(20)
-    popup_docs = await popup_cursor.to_list(length=20)
-    if popup_docs:
-        popup_ids = [doc["id"] for doc in popup_docs if doc.get("id")]
-        if popup_ids:
-            await db.notifications.update_many(
-                {"id": {"$in": popup_ids}},
-                {"$set": {"is_read": True}},
-            )
-        results.extend([
-            {
-                "id": doc.get("id"),
-                "type": doc.get("type") or "task_popup",
-                "title": doc.get("title", "Reminder"),
-                "message": doc.get("message", ""),
-                "task_id": doc.get("task_id"),
-            }
-            for doc in popup_docs
-        ])
 
-    return results
+    The frontend only polls this while its /api/events/stream connection
+    is down; otherwise the reminder wheel in backend/live_events.py claims
+    the same items and pushes them as `popup` events.
+    """
+    return await live_events.claim_due_popups(current_user)
 
 
 @api_router.post("/send-pending-task-reminders")
@@ -13270,77 +13213,6 @@ class BulkClientEmailRequest(BaseModel):
     attachment_base64: Optional[str] = ""  # base64 (no data: prefix)
 
 
-def _render_body(template: str, variables: dict) -> str:
-    """Substitute {key} placeholders; unknown keys are left as-is."""
-    result = template
-    for k, v in variables.items():
-        result = result.replace("{" + k + "}", str(v or ""))
-    return result
-
-
-async def _send_one_smtp(
-    smtp_host,
-    smtp_port,
-    smtp_user,
-    smtp_pass,
-    from_name,
-    to_email,
-    subject,
-    body_plain,
-    body_html=None,
-    attachments=None,
-):
-    """Synchronous SMTP send wrapped for asyncio.
-    `attachments` is an optional list of {"name": str, "content": base64str}.
-    """
-    import smtplib, ssl, base64 as _b64, mimetypes
-    from email.mime.multipart import MIMEMultipart
-    from email.mime.text import MIMEText
-    from email.mime.base import MIMEBase
-    from email import encoders
-
-    body_part = None
-    if body_html:
-        body_part = MIMEMultipart("alternative")
-        body_part.attach(MIMEText(body_plain, "plain", "utf-8"))
-        body_part.attach(MIMEText(body_html, "html", "utf-8"))
-    else:
-        body_part = MIMEText(body_plain, "plain", "utf-8")
-
-    clean_atts = [a for a in (attachments or []) if a and a.get("content")]
-    if clean_atts:
-        msg = MIMEMultipart("mixed")
-        msg.attach(body_part)
-        for a in clean_atts:
-            fname = a.get("name") or "attachment"
-            try:
-                raw = _b64.b64decode(a["content"])
-            except Exception:
-                continue
-            ctype, _ = mimetypes.guess_type(fname)
-            maintype, subtype = (
-                ctype.split("/", 1) if ctype else ("application", "octet-stream")
-            )
-            part = MIMEBase(maintype, subtype)
-            part.set_payload(raw)
-            encoders.encode_base64(part)
-            part.add_header("Content-Disposition", "attachment", filename=fname)
-            msg.attach(part)
-    else:
-        msg = body_part
-
-    msg["Subject"] = subject
-    msg["From"] = f"{from_name} <{smtp_user}>" if from_name else smtp_user
-    msg["To"] = to_email
-
-    ctx = ssl.create_default_context()
-    with smtplib.SMTP(smtp_host, int(smtp_port), timeout=20) as server:
-        server.ehlo()
-        server.starttls(context=ctx)
-        server.login(smtp_user, smtp_pass)
-        server.sendmail(smtp_user, [to_email], msg.as_string())
-
-
 @api_router.post("/email/send-bulk-clients")
 async def send_bulk_client_emails(
     req: BulkClientEmailRequest,
@@ -13352,6 +13224,11 @@ async def send_bulk_client_emails(
       auto / smtp  → company SMTP (if company_id provided and SMTP configured) →
                      falls back to Brevo if SMTP missing
       brevo        → always Brevo
+
+    SMTP sends run in the background as a persisted bulk mail job over
+    pooled connections (backend/bulk_mail.py); the response returns at once
+    with its job_id and status "running", and the job is followed (and,
+    if interrupted, resumed) under /email/bulk-jobs/{job_id}.
     """
     if not req.recipients:
         raise HTTPException(400, "No recipients provided")
@@ -13365,22 +13242,9 @@ async def send_bulk_client_emails(
     _override_name = (req.override_sender_name or "").strip()
 
     if req.company_id and req.send_method in ("auto", "smtp"):
-        comp = await db.companies.find_one({"id": req.company_id}, {"_id": 0})
-        if comp:
-            sh = (comp.get("smtp_host") or "").strip()
-            su = (comp.get("smtp_user") or "").strip()
-            sp = (comp.get("smtp_password") or "").strip()
-            if sh and su and sp:
-                company_smtp = {
-                    "host": sh,
-                    "port": int(comp.get("smtp_port", 587)),
-                    "user": su,
-                    "password": sp,
-                    "from_name": comp.get("smtp_from_name")
-                    or comp.get("name")
-                    or company_name,
-                }
-                company_name = company_smtp["from_name"]
+        company_smtp = await bulk_mail.company_smtp_settings(req.company_id, company_name)
+        if company_smtp:
+            company_name = company_smtp["from_name"]
 
     use_brevo = (req.send_method == "brevo") or (company_smtp is None)
 
@@ -13419,19 +13283,46 @@ async def send_bulk_client_emails(
             }
         ]
 
-    # ── Send loop ──────────────────────────────────────────────────────────
+    # ── Company SMTP: pooled, throttled, resumable job ─────────────────────
+    if not use_brevo:
+        job = await bulk_mail.create_job(
+            created_by=current_user.id,
+            company_id=req.company_id,
+            subject=req.subject,
+            body_template=req.body_template,
+            is_html=req.is_html,
+            from_name=company_name,
+            recipients=[r.dict() for r in req.recipients],
+            attachments=_attachments,
+        )
+        bulk_mail.start_job(job["id"])
+        queued = job["total"] - job["failed"]
+        logger.info(
+            f"Bulk client email (SMTP job {job['id']}) by {current_user.email}: "
+            f"{queued} queued, {job['failed']} invalid"
+        )
+        return {
+            "message": f"Sending {queued} email(s) in the background.",
+            "status": "running",
+            "sent": 0,
+            "failed": job["failed"],
+            "pending": queued,
+            "failed_list": [],
+            "job_id": job["id"],
+        }
+
+    # ── Brevo send loop ────────────────────────────────────────────────────
     sent_count = 0
     fail_count = 0
     failed_list = []
-    import asyncio
 
     for rec in req.recipients:
         if not rec.email or "@" not in rec.email:
             fail_count += 1
             continue
         vars_ = {"name": rec.name, "email": rec.email, **rec.variables}
-        subject_rendered = _render_body(req.subject, vars_)
-        body_rendered = _render_body(req.body_template, vars_)
+        subject_rendered = render_template(req.subject, vars_)
+        body_rendered = render_template(req.body_template, vars_)
         body_html_r = body_rendered if req.is_html else None
         body_plain_r = (
             body_rendered
@@ -13443,31 +13334,13 @@ async def send_bulk_client_emails(
         )
 
         try:
-            if use_brevo:
-                await _brevo_send(
-                    rec.email,
-                    subject_rendered,
-                    body_plain_r,
-                    body_html_r,
-                    attachments=_attachments,
-                )
-            else:
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(
-                    None,
-                    lambda: _send_one_smtp(
-                        company_smtp["host"],
-                        company_smtp["port"],
-                        company_smtp["user"],
-                        company_smtp["password"],
-                        company_smtp["from_name"],
-                        rec.email,
-                        subject_rendered,
-                        body_plain_r,
-                        body_html_r,
-                        attachments=_attachments,
-                    ),
-                )
+            await _brevo_send(
+                rec.email,
+                subject_rendered,
+                body_plain_r,
+                body_html_r,
+                attachments=_attachments,
+            )
             sent_count += 1
         except Exception as e:
             fail_count += 1
@@ -13584,11 +13457,14 @@ async def send_pending_task_reminders_internal():
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# AUTO DAILY REMINDER MIDDLEWARE
+# AUTO DAILY REMINDER JOB
 # ─────────────────────────────────────────────────────────────────────────────
-async def _run_daily_reminder_job(today_str: str):
-    """Background job - never blocks requests."""
-    global _last_reminder_date_cache
+async def daily_task_reminder_job():
+    """
+    Job runner entry point — 10:00 IST. Sends the pending-task reminder mail
+    once per day; system_settings.last_reminder_date is the durable guard.
+    """
+    today_str = datetime.now(pytz.timezone("Asia/Kolkata")).date().isoformat()
     try:
         setting = await db.system_settings.find_one(
             {"key": "last_reminder_date"}, {"_id": 0}
@@ -13602,32 +13478,10 @@ async def _run_daily_reminder_job(today_str: str):
                 {"$set": {"value": today_str}},
                 upsert=True,
             )
-        _last_reminder_date_cache = today_str
     except Exception as e:
         logger.error(f"Auto daily reminder job failed: {e}")
 
 
-@app.middleware("http")
-async def auto_daily_reminder(request: Request, call_next):
-    global _last_reminder_date_cache
-    try:
-        india_time = datetime.now(pytz.timezone("Asia/Kolkata"))
-        today_str = india_time.date().isoformat()
-        # Only fire after 10 AM and if the in-memory cache hasn't already
-        # been set for today. The cache acts as a fast pre-check; the actual
-        # DB-level atomic upsert inside _run_daily_reminder_job prevents
-        # duplicate sends even if multiple workers race past here.
-        if india_time.hour >= 10 and _last_reminder_date_cache != today_str:
-            # Set cache immediately to prevent other concurrent requests from
-            # spawning duplicate background tasks in the same process.
-            _last_reminder_date_cache = today_str
-            asyncio.ensure_future(_run_daily_reminder_job(today_str))  # fire-and-forget
-    except Exception as e:
-        logger.error(f"Auto reminder middleware error: {e}")
-    response = await call_next(request)
-    return response
-
-
 # ==================== HOLIDAY ROUTES ====================
 @api_router.get("/holidays", response_model=list[HolidayResponse])
 async def get_holidays(current_user: User = Depends(get_current_user)):
@@ -14421,12 +14275,15 @@ api_router.include_router(automation_router)
 api_router.include_router(service_expiry_router)
 api_router.include_router(recruitment_router)
 api_router.include_router(notification_router)
+api_router.include_router(live_events.router)
 api_router.include_router(email_router)
 api_router.include_router(activity_monitor_router)
 api_router.include_router(desktop_agent_router)
 api_router.include_router(client_portal_router)
 api_router.include_router(reminders_router)
 api_router.include_router(whatsapp_router)
+api_router.include_router(job_runner_router)   # /api/jobs — background job status & history
+api_router.include_router(bulk_mail_router)    # /api/email/bulk-jobs — bulk SMTP job progress & resume
 app.include_router(google_auth_router)
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -14581,23 +14438,29 @@ async def merge_clients(payload: dict, current_user: User = Depends(get_current_
 
     merged["merged_from"] = secondary_ids
     merged["merged_at"] = datetime.now(timezone.utc).isoformat()
+    merged["updated_at"] = merged["merged_at"]
 
     # Update primary
     merged.pop("_id", None)
     await db.clients.update_one({"id": primary_id}, {"$set": merged})
 
     # Migrate tasks/leads that reference secondary clients to primary
+    task_now = datetime.now(IST).isoformat()
+    lead_now = datetime.now(timezone.utc)
     for sid in secondary_ids:
         await db.tasks.update_many(
-            {"client_id": sid}, {"$set": {"client_id": primary_id}}
+            {"client_id": sid}, {"$set": {"client_id": primary_id, "updated_at": task_now}}
         )
         await db.leads.update_many(
-            {"converted_client_id": sid}, {"$set": {"converted_client_id": primary_id}}
+            {"converted_client_id": sid},
+            {"$set": {"converted_client_id": primary_id, "updated_at": lead_now}},
         )
 
     # Delete secondaries
     for sid in secondary_ids:
         await db.clients.delete_one({"id": sid})
+    await change_hooks.mark_dirty("clients")
+    await list_sync.record_tombstone("clients", secondaries)
 
     # Return updated primary
     updated = await db.clients.find_one({"id": primary_id})
@@ -12,8 +12,10 @@ Public API
 - ``get_gemini_client()``     → cached ``genai.Client`` instance
 - ``gemini_extract_json``     → async, returns parsed dict from a Gemini vision
                                 extraction using Gemini 2.5 Flash with strict
-                                JSON output. Raises HTTPException(500) on
-                                failure (never crashes the process).
+                                JSON output, sent through
+                                ``backend.ai.llm_gateway``. Raises
+                                HTTPException(500) on failure (never
+                                crashes the process).
 
 Design notes
 ────────────
@@ -126,51 +128,29 @@ async def gemini_extract_json(
         allowed to crash — every exception is caught and re-raised as an
         HTTPException with the original error text.
     """
-    client = get_gemini_client()
     model_name = (model or _GEMINI_MODEL_NAME or "gemini-2.5-flash").strip()
 
-    # Build the request using the google-genai SDK. The call is synchronous
-    # inside the SDK, so we execute it in a thread pool so the FastAPI event
-    # loop is not blocked.
-    import asyncio
-    try:
-        from google.genai import types as genai_types  # type: ignore
-    except Exception as e:  # pragma: no cover - defensive
-        logger.exception("google-genai types import failed")
-        raise HTTPException(status_code=500, detail=f"google-genai import error: {e}") from e
+    # The request goes through the shared LLM gateway (pooled HTTP client,
+    # response cache, concurrency budget, cost metrics under
+    # "document_extraction").
+    from backend.ai import llm_gateway
 
     try:
-        image_bytes = _b64_to_bytes(image_b64)
-    except Exception as e:
-        logger.exception("Bad base64 image payload")
-        raise HTTPException(status_code=500, detail=f"Invalid image payload: {e}") from e
-
-    def _call_gemini():
-        contents = [
-            genai_types.Part.from_bytes(data=image_bytes, mime_type=mime_type),
+        raw_text = await llm_gateway.generate(
+            "document_extraction",
             prompt,
-        ]
-        # response_mime_type forces the model into strict JSON output.
-        cfg = genai_types.GenerateContentConfig(
-            temperature=0,
-            max_output_tokens=2048,
-            response_mime_type="application/json",
+            images=[(image_b64, mime_type)],
+            json_mode=True,
+            max_tokens=2048,
+            provider="gemini",
+            models={"gemini": model_name},
+            fallback=False,
         )
-        return client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=cfg,
-        )
-
-    try:
-        response = await asyncio.to_thread(_call_gemini)
-    except HTTPException:
-        raise
-    except Exception as e:
+    except llm_gateway.LLMError as e:
         # Never crash the server — surface as HTTP 500 with the original text.
-        logger.exception("Gemini generate_content failed")
-        err_text = str(e)
-        if "PERMISSION_DENIED" in err_text or "403" in err_text:
+        logger.error("Gemini generate_content failed: %s", e.detail)
+        err_text = str(e.detail)
+        if e.upstream_status == 403 or "PERMISSION_DENIED" in err_text:
             # This specific message ("Your project has been denied access.
             # Please contact support.") comes straight from Google's Gemini
             # API servers rejecting the whole GCP project behind the API
@@ -194,16 +174,7 @@ async def gemini_extract_json(
                     "projects recently."
                 ),
             ) from e
-        raise HTTPException(status_code=500, detail=f"Gemini API error: {e}") from e
-
-    raw_text = getattr(response, "text", None)
-    if not raw_text:
-        # Fallback: dig into candidates if .text is empty
-        try:
-            parts = response.candidates[0].content.parts  # type: ignore[attr-defined]
-            raw_text = "".join(getattr(p, "text", "") for p in parts)
-        except Exception:
-            raw_text = ""
+        raise HTTPException(status_code=500, detail=err_text) from e
 
     if not raw_text:
         logger.error("Gemini returned an empty response")
@@ -217,8 +188,3 @@ async def gemini_extract_json(
             status_code=500,
             detail=f"Gemini did not return valid JSON: {e}. Raw: {raw_text[:300]}",
         ) from e
-
-
-def _b64_to_bytes(image_b64: str) -> bytes:
-    import base64
-    return base64.b64decode(image_b64)
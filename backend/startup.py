@@ -1,12 +1,10 @@
 import asyncio
 import logging
-import pytz
 from datetime import datetime, timezone
 from backend.dependencies import client, db
-from apscheduler.schedulers.background import BackgroundScheduler
+from backend.job_runner import job_runner, create_job_runner_indexes
 
 logger = logging.getLogger(__name__)
-scheduler = BackgroundScheduler(timezone=pytz.timezone("Asia/Kolkata"))
 
 
 async def startup_event():
@@ -121,9 +119,9 @@ async def startup_event():
         except Exception as e:
             logger.error(f"Failed to initialize validation indexes: {e}")
 
-        # ✅ START SCHEDULER
-        if not scheduler.running:
-            scheduler.start()
+        # ✅ START JOB RUNNER
+        await create_job_runner_indexes()
+        job_runner.start()
 
     except Exception as e:
         logger.error(f"Startup failed: {e}")
@@ -31,6 +31,9 @@ from datetime import datetime, timezone, date, timedelta
 from fastapi import APIRouter, Request
 from backend.dependencies import db
 from backend.notifications import create_notification
+from backend import change_hooks
+from backend import validation_totals
+from backend.ai import llm_gateway
 from backend.lead_ai import process_lead_message
 
 # ── Invoice helpers (shared with web app — no duplication) ────────────────────
@@ -678,7 +681,7 @@ def _tg_normalize_conversational_text(text: str) -> str:
 
 
 async def _tg_ai_command(text: str, user_id=None, chat_id=None):
-    if not TG_AI_KEY or not httpx:
+    if not TG_AI_KEY:
         return None
     original_text = str(text or "").strip()
     parser_text = _tg_normalize_conversational_text(original_text)
@@ -807,17 +810,15 @@ Return this shape:
 USER MESSAGE:
 {parser_text}
 """.strip()
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{TG_AI_MODEL}:generateContent?key={TG_AI_KEY}"
-    payload = {
-        "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {"temperature": 0, "responseMimeType": "application/json"},
-    }
     try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            r = await client.post(url, json=payload)
-            r.raise_for_status()
-            data = r.json()
-        raw = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+        raw = await llm_gateway.generate(
+            "telegram_nl",
+            prompt,
+            json_mode=True,
+            provider="gemini",
+            models={"gemini": TG_AI_MODEL},
+            timeout=20.0,
+        )
         raw = raw.strip()
         if raw.startswith("```"):
             raw = re.sub(r"^```(?:json)?\s*", "", raw, flags=re.I)
@@ -970,6 +971,7 @@ async def _tg_natural_language_handler(chat_id: int, text: str, message: dict) -
             "type": "task",
         }
         await db.tasks.insert_one(new_task)
+        await change_hooks.record_change("tasks", None, new_task)
         if assignee:
             await create_notification(user_id=assignee["id"], title="New Task Assigned", message=f"Task '{title}' assigned via Telegram", type="assignment")
         await send_message(
@@ -1057,6 +1059,7 @@ async def _tg_natural_language_handler(chat_id: int, text: str, message: dict) -
             "created_at": datetime.now(timezone.utc), "status": "active",
         }
         await db.clients.insert_one(doc)
+        await change_hooks.record_change("clients", None, doc)
         await send_message(chat_id, _tg_human_client_created(doc))
         return True
 
@@ -1253,7 +1256,9 @@ async def telegram_webhook(request: Request):  # noqa: C901  (complex but intent
             # ── Delete task shortcut ──────────────────────────────
             if clicked.startswith("delete_"):
                 task_id = clicked.replace("delete_", "")
+                existing_task = await db.tasks.find_one({"id": task_id}, {"_id": 0})
                 await db.tasks.delete_one({"id": task_id})
+                await change_hooks.record_change("tasks", existing_task, None)
                 await send_message(chat_id, "🗑 Done — I removed that task.")
                 return {"status": "task_deleted"}
 
@@ -1675,6 +1680,7 @@ async def telegram_webhook(request: Request):  # noqa: C901  (complex but intent
                         "type":                "task",
                     }
                     await db.tasks.insert_one(new_task)
+                    await change_hooks.record_change("tasks", None, new_task)
                     await db.telegram_conversations.delete_many({"telegram_id": chat_id})
                     if new_task.get("assigned_to"):
                         await create_notification(
@@ -2635,6 +2641,7 @@ async def _handle_confirm_invoice(chat_id: int, data: dict) -> dict:
 
         await db.invoices.insert_one(invoice_doc)
         invoice_doc.pop("_id", None)
+        await validation_totals.note_changed("invoice", [invoice_doc["id"]], company_id)
 
         # Notify the user in the web app
         if user:
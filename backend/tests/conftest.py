@@ -0,0 +1,30 @@
+"""
+Shared setup for the backend tests.
+
+MONGO_URL is cleared before any test module imports backend.dependencies,
+so everything runs against the in-memory MockDatabase; the `db` fixture
+hands it to tests. Tests may be plain `async def` functions: each runs to
+completion in its own event loop.
+"""
+import asyncio
+import inspect
+import os
+
+import pytest
+
+os.environ.pop("MONGO_URL", None)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    kwargs = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**kwargs))
+    return True
+
+
+@pytest.fixture
+def db():
+    from backend.dependencies import db
+    return db
@@ -0,0 +1,199 @@
+"""
+Pooled bulk SMTP sending (backend/bulk_mail.py) against a local aiosmtpd
+server: connection reuse, 4xx retry and resuming an interrupted job.
+"""
+import asyncio
+import socket
+import uuid
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+from aiosmtpd.smtp import AuthResult
+
+from backend import bulk_mail
+
+
+class RecordingHandler:
+    """Accepts everything; optionally defers the first RCPT for some addresses."""
+
+    def __init__(self, defer=()):
+        self.defer = set(defer)
+        self.deferred = []
+        self.delivered = []
+        self.peers = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.defer:
+            self.defer.discard(address)
+            self.deferred.append(address)
+            return "451 4.7.1 Greylisted, try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.peers.add(session.peer)
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(handler):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        controller = aiosmtpd_controller.Controller(
+            handler, hostname="127.0.0.1", port=port,
+            auth_require_tls=False,
+            authenticator=lambda *args: AuthResult(success=True),
+        )
+        controller.start()
+        servers.append(controller)
+        return port
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(bulk_mail, "RETRY_BASE_SEC", 0.01)
+    bulk_mail._pools.clear()
+
+
+async def _company(db, port):
+    company_id = f"co-{uuid.uuid4().hex[:8]}"
+    await db.companies.insert_one({
+        "id": company_id, "name": "Test Co", "smtp_host": "127.0.0.1", "smtp_port": port,
+        "smtp_user": "mailer@test.local", "smtp_password": "secret",
+    })
+    return company_id
+
+
+def _recipients(n, domains=("a.test", "b.test")):
+    return [{"email": f"user{i}@{domains[i % len(domains)]}", "name": f"User {i}", "variables": {"n": i}}
+            for i in range(n)]
+
+
+async def _make_job(company_id, recipients):
+    return await bulk_mail.create_job(
+        created_by="tester", company_id=company_id, subject="Hello {name}",
+        body_template="Statement #{n} for {name}", is_html=False, from_name="Test Co",
+        recipients=recipients,
+    )
+
+
+async def test_bulk_job_reuses_pooled_connections(smtp_server, db):
+    handler = RecordingHandler()
+    port = smtp_server(handler)
+    job = await _make_job(await _company(db, port), _recipients(40) + [{"email": "not-an-address"}])
+    summary = await bulk_mail.run_job(job["id"], throttle=bulk_mail.DomainThrottle(per_minute=0))
+    assert summary["status"] == "completed"
+    assert (summary["sent"], summary["failed"], summary["pending"]) == (40, 1, 0)
+    assert [(f["email"], f["error"]) for f in summary["failed_list"]] == [("not-an-address", "invalid address")]
+    pool = next(iter(bulk_mail._pools.values()))
+    assert pool.messages == 40
+    assert pool.connects <= bulk_mail.POOL_SIZE
+    await bulk_mail.close_pools()
+    assert sorted(handler.delivered) == sorted(r["email"] for r in _recipients(40))
+    assert len(handler.peers) <= bulk_mail.POOL_SIZE
+
+
+async def test_4xx_reply_is_retried(smtp_server, db):
+    handler = RecordingHandler(defer={"user1@b.test", "user2@a.test"})
+    port = smtp_server(handler)
+    job = await _make_job(await _company(db, port), _recipients(4))
+    summary = await bulk_mail.run_job(job["id"], throttle=bulk_mail.DomainThrottle(per_minute=0))
+    assert (summary["sent"], summary["failed"]) == (4, 0)
+    rec = await db.bulk_mail_recipients.find_one({"job_id": job["id"], "email": "user1@b.test"})
+    assert rec["attempts"] == 2
+    await bulk_mail.close_pools()
+    assert sorted(handler.deferred) == ["user1@b.test", "user2@a.test"]
+    assert len(handler.delivered) == 4
+
+
+async def test_interrupted_job_resumes_pending_only(smtp_server, db):
+    handler = RecordingHandler()
+    port = smtp_server(handler)
+    job = await _make_job(await _company(db, port), _recipients(10))
+    # Simulate a worker that recorded three deliveries and then died.
+    for idx in range(3):
+        await db.bulk_mail_recipients.update_one(
+            {"_id": f"{job['id']}:{idx}"}, {"$set": {"status": "sent", "attempts": 1}})
+    await db.bulk_mail_jobs.update_one(
+        {"id": job["id"]},
+        {"$set": {"owner": "dead-worker", "lease_until": "2000-01-01T00:00:00+00:00"},
+         "$inc": {"sent": 3}})
+
+    await bulk_mail.resume_bulk_mail_jobs()
+    await asyncio.gather(*bulk_mail._background)
+    summary = await bulk_mail.job_summary(job["id"])
+    assert summary["status"] == "completed"
+    assert (summary["sent"], summary["failed"], summary["pending"]) == (10, 0, 0)
+    assert summary["runs"] == 1
+    await bulk_mail.close_pools()
+    assert sorted(handler.delivered) == sorted(r["email"] for r in _recipients(10)[3:])
+
+
+async def test_background_job_builds_messages_per_send_slot(smtp_server, db, monkeypatch):
+    handler = RecordingHandler()
+    port = smtp_server(handler)
+    monkeypatch.setattr(bulk_mail, "WORKERS", 3)
+    built, done, peak = [0], [0], [0]
+    build_message, add = bulk_mail.build_message, bulk_mail._Progress.add
+
+    def counting_build(*args, **kwargs):
+        built[0] += 1
+        peak[0] = max(peak[0], built[0] - done[0])
+        return build_message(*args, **kwargs)
+
+    def counting_add(self, *args, **kwargs):
+        done[0] += 1
+        return add(self, *args, **kwargs)
+
+    monkeypatch.setattr(bulk_mail, "build_message", counting_build)
+    monkeypatch.setattr(bulk_mail._Progress, "add", counting_add)
+    job = await _make_job(await _company(db, port), _recipients(20))
+    await bulk_mail.start_job(job["id"])
+    summary = await bulk_mail.job_summary(job["id"])
+    assert (summary["status"], summary["sent"]) == ("completed", 20)
+    assert built[0] == 20 and peak[0] <= 3
+    await bulk_mail.close_pools()
+
+
+async def test_crashed_worker_stops_the_run_and_leaves_it_resumable(smtp_server, db, monkeypatch):
+    handler = RecordingHandler()
+    port = smtp_server(handler)
+    monkeypatch.setattr(bulk_mail, "WORKERS", 3)
+    monkeypatch.setattr(bulk_mail, "PROGRESS_BATCH", 2)
+    flush = bulk_mail._Progress.flush
+
+    async def failing_flush(self, final=None):
+        if final is None and self.rows:
+            raise RuntimeError("progress write failed")
+        return await flush(self, final)
+
+    monkeypatch.setattr(bulk_mail._Progress, "flush", failing_flush)
+    job = await _make_job(await _company(db, port), _recipients(20))
+    summary = await bulk_mail.run_job(job["id"], throttle=bulk_mail.DomainThrottle(per_minute=0))
+    assert (summary["status"], summary["error"]) == ("failed", "progress write failed")
+    assert summary["pending"] > 0 and summary["sent"] + summary["pending"] == 20
+    await bulk_mail.close_pools()
+    assert len(handler.delivered) < 20  # the other workers stopped too
+
+
+async def test_domain_throttle_spaces_sends():
+    throttle = bulk_mail.DomainThrottle(concurrency=1, per_minute=600)  # one per 0.1 s
+    stamps = []
+
+    async def one():
+        async with throttle.slot("slow.test"):
+            stamps.append(asyncio.get_running_loop().time())
+
+    await asyncio.gather(*(one() for _ in range(4)))
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert all(g >= 0.09 for g in gaps)
@@ -0,0 +1,109 @@
+"""
+Date-of-year projection for the greeting / alert jobs (backend/client_calendar.py)
+and the paced WhatsApp dispatcher.
+"""
+import time
+import uuid
+from datetime import date
+
+from backend import change_hooks, client_calendar
+from backend.whatsapp_scheduler import SendDispatcher
+
+
+def _client(**fields):
+    return {"id": f"cl-{uuid.uuid4().hex[:8]}", "company_name": "Acme", **fields}
+
+
+async def test_rebuild_then_incremental_changes(db):
+    proprietor = _client(client_type="proprietor", birthday="1980-03-14", phone="9000000001")
+    company = _client(client_type="pvt_ltd", birthday="2001-03-14",  # incorporation date, not a birthday
+                      contact_persons=[{"name": "Director", "birthday": "1975-03-14", "phone": "9000000002"}])
+    await db.clients.insert_many([proprietor, company])
+    assert await client_calendar.birthdays_on(date(2026, 3, 14)) is None  # not built yet
+
+    await client_calendar.rebuild("clients")
+    names = sorted(e["name"] for e in await client_calendar.birthdays_on(date(2026, 3, 14))
+                   if e["client_id"] in (proprietor["id"], company["id"]))
+    assert names == ["Acme", "Director"]
+
+    moved = {**proprietor, "birthday": "1980-07-01"}
+    await client_calendar.record_change("clients", proprietor, moved)
+    on_14th = {e["client_id"] for e in await client_calendar.birthdays_on(date(2026, 3, 14))}
+    assert proprietor["id"] not in on_14th and company["id"] in on_14th
+    assert [e["client_id"] for e in await client_calendar.birthdays_on(date(2026, 7, 1))
+            if e["client_id"] == proprietor["id"]] == [proprietor["id"]]
+
+    await client_calendar.record_change("clients", company, None)
+    on_14th = {e["client_id"] for e in await client_calendar.birthdays_on(date(2026, 3, 14))}
+    assert company["id"] not in on_14th
+
+
+async def test_dsc_expiries_by_date(db):
+    dsc_id = f"dsc-{uuid.uuid4().hex[:8]}"
+    await db.dsc_register.insert_one({"id": dsc_id, "client_id": "cl-1", "holder_name": "Holder",
+                                      "expiry_date": "2026-11-02T00:00:00", "serial_number": "S1"})
+    await client_calendar.reconcile_client_calendar()
+    hits = await client_calendar.dsc_expiring_on([date(2026, 11, 2), date(2026, 11, 9)])
+    assert [(e["ref_id"], e["holder"], e["serial"]) for e in hits if e["ref_id"] == dsc_id] == \
+        [(dsc_id, "Holder", "S1")]
+    await client_calendar.record_change("dsc", {"id": dsc_id, "expiry_date": "2026-11-02"}, None)
+    hits = await client_calendar.dsc_expiring_on([date(2026, 11, 2)])
+    assert dsc_id not in {e["ref_id"] for e in hits}
+
+
+async def test_change_hooks_reach_the_calendar(db):
+    dsc = {"id": f"dsc-{uuid.uuid4().hex[:8]}", "client_id": "cl-1", "holder_name": "Holder",
+           "expiry_date": "2026-12-01T00:00:00", "serial_number": "S2"}
+    await db.dsc_register.insert_one(dict(dsc))
+    await client_calendar.rebuild("dsc")
+
+    renewed = {**dsc, "expiry_date": "2027-12-01T00:00:00"}
+    await change_hooks.record_change("dsc", dsc, renewed)
+    assert dsc["id"] not in {e["ref_id"] for e in await client_calendar.dsc_expiring_on([date(2026, 12, 1)])}
+    assert dsc["id"] in {e["ref_id"] for e in await client_calendar.dsc_expiring_on([date(2027, 12, 1)])}
+
+
+async def test_a_write_during_the_rebuild_scan_triggers_another_pass(db, monkeypatch):
+    dsc = {"id": f"dsc-{uuid.uuid4().hex[:8]}", "client_id": "cl-1", "holder_name": "Holder",
+           "expiry_date": "2026-10-05T00:00:00", "serial_number": "S3"}
+    renewed = {**dsc, "expiry_date": "2027-10-05T00:00:00"}
+    await db.dsc_register.insert_one(dict(dsc))
+    scan = db.dsc_register.find
+
+    def find(*args, **kwargs):
+        async def rows():
+            async for doc in scan(*args, **kwargs):
+                yield doc
+                if doc["id"] == dsc["id"]:  # renewed after the scan read it
+                    await db.dsc_register.update_one({"id": dsc["id"]}, {"$set": renewed})
+                    await client_calendar.record_change("dsc", dsc, renewed)
+        return rows()
+
+    monkeypatch.setattr(db.dsc_register, "find", find)
+    await client_calendar.rebuild("dsc")
+    assert dsc["id"] in {e["ref_id"] for e in await client_calendar.dsc_expiring_on([date(2026, 10, 5)])}
+
+    meta = await db.client_calendar.find_one({"_id": client_calendar.META_ID})
+    assert meta["dirty_dsc"]  # the reconciler runs another pass
+
+    monkeypatch.setattr(db.dsc_register, "find", scan)
+    await client_calendar.reconcile_client_calendar()
+    assert dsc["id"] not in {e["ref_id"] for e in await client_calendar.dsc_expiring_on([date(2026, 10, 5)])}
+    assert dsc["id"] in {e["ref_id"] for e in await client_calendar.dsc_expiring_on([date(2027, 10, 5)])}
+
+
+async def test_dispatcher_paces_and_isolates_failures():
+    stamps = []
+
+    def make(i):
+        async def send():
+            stamps.append(time.monotonic())
+            if i == 2:
+                raise RuntimeError("gateway said no")
+            return i != 3
+        return send
+
+    ok, failed = await SendDispatcher(rate=20, burst=2, concurrency=2).run(make(i) for i in range(6))
+    assert (ok, failed) == (4, 2)
+    # Two go out on the burst, the other four wait ~1/20 s each.
+    assert stamps[-1] - stamps[0] >= 0.15
@@ -0,0 +1,103 @@
+"""
+Compliance assignment import (backend/compliance.py): column mapping,
+inserts vs. updates of existing assignments and the client lookup limited to
+the names in the sheet.
+"""
+import uuid
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from backend import compliance
+from backend.scripts.trim_client_names import trim_client_names
+
+
+async def _seed(db):
+    tag = uuid.uuid4().hex[:8]
+    clients = [{"id": f"{tag}-c{i}", "company_name": f"Client {tag} {i}"} for i in range(3)]
+    await db.clients.insert_many(clients)
+    await db.users.insert_one({"id": f"{tag}-u", "full_name": f"Staff {tag}"})
+    compliance_id = f"{tag}-cm"
+    await db.compliance_assignments.insert_one({
+        "_id": f"{tag}-a0", "id": f"{tag}-a0", "compliance_id": compliance_id, "client_id": clients[0]["id"],
+        "client_name": clients[0]["company_name"], "status": "not_started", "notes": None,
+    })
+    return tag, clients, compliance_id
+
+
+async def test_import_maps_columns_and_splits_inserts_from_updates(db):
+    tag, clients, compliance_id = await _seed(db)
+    df = pd.DataFrame({
+        "Client Name": [f" {clients[0]['company_name']} ", clients[1]["company_name"], None,
+                        "Unknown Pvt Ltd", clients[1]["company_name"]],
+        "Status": ["Filed", "in progress", "completed", "bogus", "In Progress"],
+        "Notes": ["done", float("nan"), "x", "", "second row wins"],
+        "Assigned": [f"staff {tag}", "", "", "nobody", f"STAFF {tag}"],
+    })
+    seen_queries = []
+    original_find = db.clients.find
+
+    def recording_find(query=None, *args, **kwargs):
+        seen_queries.append(query)
+        return original_find(query, *args, **kwargs)
+
+    db.clients.find = recording_find
+    try:
+        result = await compliance.import_assignment_rows(
+            compliance_id, df, "Client Name", "Status", "Notes", "Assigned", fallback_assigned="fallback")
+    finally:
+        del db.clients.find
+
+    assert (result["added"], result["updated"], result["total_rows_in_file"]) == (2, 1, 5)
+    assert result["clients_not_in_db"] == ["Unknown Pvt Ltd"]
+    # Only the names in the file were looked up.
+    assert len(seen_queries) == 1
+    assert sorted(seen_queries[0]["company_name"]["$in"]) == sorted(
+        [clients[0]["company_name"], clients[1]["company_name"], "Unknown Pvt Ltd"])
+
+    rows = {a["client_name"]: a for a in await db.compliance_assignments.find(
+        {"compliance_id": compliance_id}).to_list(None)}
+    updated = rows[clients[0]["company_name"]]
+    assert (updated["status"], updated["notes"], updated["assigned_to"]) == ("filed", "done", f"{tag}-u")
+    assert updated["filed_at"] and updated["completed_at"]
+    added = rows[clients[1]["company_name"]]
+    assert (added["client_id"], added["status"], added["notes"], added["assigned_to"]) == \
+        (clients[1]["id"], "in_progress", "second row wins", f"{tag}-u")
+    unknown = rows["Unknown Pvt Ltd"]
+    assert (unknown["client_id"], unknown["status"], unknown["notes"], unknown["assigned_to"]) == \
+        ("", "not_started", None, "fallback")
+
+
+async def test_reimport_updates_in_one_bulk_write(db):
+    tag, clients, compliance_id = await _seed(db)
+    df = pd.DataFrame({"Client Name": [c["company_name"] for c in clients]})
+    first = await compliance.import_assignment_rows(compliance_id, df, "Client Name")
+    assert (first["added"], first["updated"]) == (2, 1)
+
+    calls = []
+    original = db.compliance_assignments.bulk_write
+
+    async def counting_bulk_write(ops, *args, **kwargs):
+        calls.append(len(ops))
+        return await original(ops, *args, **kwargs)
+
+    db.compliance_assignments.bulk_write = counting_bulk_write
+    try:
+        second = await compliance.import_assignment_rows(compliance_id, df, "Client Name")
+    finally:
+        del db.compliance_assignments.bulk_write
+    assert (second["added"], second["updated"]) == (0, 3)
+    assert calls == [3]
+
+
+async def test_padded_client_names_are_trimmed_and_then_matched(db):
+    tag = uuid.uuid4().hex[:8]
+    await db.clients.insert_many([
+        {"id": f"{tag}-p", "company_name": f"  Padded {tag} "},
+        {"id": f"{tag}-t", "company_name": f"Trim {tag}"},
+    ])
+    assert await trim_client_names() >= 1
+    assert (await db.clients.find_one({"id": f"{tag}-p"}))["company_name"] == f"Padded {tag}"
+    found = await compliance._clients_by_name([f"Padded {tag}", f"Trim {tag}"])
+    assert {c["id"] for c in found.values()} == {f"{tag}-p", f"{tag}-t"}
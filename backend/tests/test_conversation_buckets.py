@@ -0,0 +1,56 @@
+"""
+Copilot chat history in copilot_message_buckets
+(backend/copilot/conversation_manager.py): BUCKET_SIZE messages per document,
+recent-window reads across a bucket boundary, and legacy embedded history.
+"""
+import pytest
+
+from backend.copilot.conversation_manager import BUCKET_SIZE, ConversationManager
+
+
+async def _session_with(n):
+    session = await ConversationManager.create_session("u1", "co1")
+    for i in range(1, n + 1):
+        assert await ConversationManager.append_message(session["id"], "user", f"m{i}")
+    return session["id"]
+
+
+async def test_messages_fill_buckets_in_order(db):
+    session_id = await _session_with(BUCKET_SIZE + 3)
+    buckets = await db.copilot_message_buckets.find({"session_id": session_id}).to_list(None)
+    assert sorted((b["seq"], b["count"]) for b in buckets) == [(0, BUCKET_SIZE), (1, 3)]
+    history = await ConversationManager.get_messages(session_id)
+    assert [m["n"] for m in history] == list(range(1, BUCKET_SIZE + 4))
+
+
+@pytest.mark.parametrize("total, limit", [
+    (BUCKET_SIZE + 3, 20),          # 3 in the newest bucket, 17 from the one before
+    (2 * BUCKET_SIZE + 1, 20),
+    (BUCKET_SIZE, 20),              # ends exactly at a boundary
+    (2 * BUCKET_SIZE + 5, BUCKET_SIZE + 10),
+    (7, 20),
+])
+async def test_recent_window_crosses_bucket_boundary(total, limit):
+    session_id = await _session_with(total)
+    expected = [f"m{i}" for i in range(max(total - limit, 0) + 1, total + 1)]
+    recent = await ConversationManager.get_recent_messages(session_id, limit=limit)
+    assert [m["text"] for m in recent] == expected
+    # The same window from a session loaded before the last appends.
+    stale = {"id": session_id, "message_count": total - 2}
+    recent = await ConversationManager.get_recent_messages(session_id, limit=limit, session=stale)
+    assert [m["text"] for m in recent] == expected
+
+
+async def test_legacy_history_fills_the_window(db, monkeypatch):
+    session = await ConversationManager.create_session("u1", "co1")
+    legacy = [{"role": "user", "text": f"old{i}"} for i in range(5)]
+    await db.copilot_sessions.update_one({"id": session["id"]}, {"$set": {"messages": legacy}})
+    await ConversationManager.append_message(session["id"], "assistant", "new")
+
+    # The MockDatabase ignores the $slice projection the real read uses.
+    async def last(session_id, session, limit=0):
+        return legacy[-limit:]
+
+    monkeypatch.setattr(ConversationManager, "_legacy_messages", staticmethod(last))
+    recent = await ConversationManager.get_recent_messages(session["id"], limit=4)
+    assert [m["text"] for m in recent] == ["old2", "old3", "old4", "new"]
@@ -0,0 +1,94 @@
+"""
+Materialized dashboard counters (backend/dashboard_counters.py).
+"""
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from backend import dashboard_counters
+
+
+def _uid():
+    return f"u-{uuid.uuid4().hex[:8]}"
+
+
+async def _user_docs(db, *uids):
+    docs = {}
+    for uid in uids:
+        for scope in ("user", "assignee"):
+            doc = await db.dashboard_counters.find_one({"_id": f"tasks:{scope}:{uid}"})
+            fields = {k: v for k, v in (doc or {}).items()
+                      if dashboard_counters._is_counter_field(k) and v}
+            if fields:  # an all-zero doc reads the same as a missing one
+                docs[doc["_id"]] = fields
+    return docs
+
+
+async def test_incremental_changes_match_a_rebuild(db):
+    alice, bob = _uid(), _uid()
+    due = (datetime.now(timezone.utc) + timedelta(days=2)).isoformat()
+    tasks = [
+        {"id": f"t-{uuid.uuid4().hex[:8]}", "status": "pending", "due_date": due,
+         "assigned_to": alice, "created_by": bob},
+        {"id": f"t-{uuid.uuid4().hex[:8]}", "status": "in_progress", "assigned_to": bob,
+         "created_by": bob, "sub_assignees": [alice]},
+    ]
+    await dashboard_counters.rebuild("tasks")
+    for t in tasks:
+        await db.tasks.insert_one(dict(t))
+        await dashboard_counters.record_change("tasks", None, t)
+
+    done = {**tasks[0], "status": "completed", "assigned_to": bob}
+    await db.tasks.update_one({"id": done["id"]}, {"$set": {"status": "completed", "assigned_to": bob}})
+    await dashboard_counters.record_change("tasks", tasks[0], done)
+
+    incremental = await _user_docs(db, alice, bob)
+    assert incremental[f"tasks:assignee:{bob}"] == {"total": 2, "st_completed": 1, "st_in_progress": 1}
+    # alice only keeps the task she is sub-assigned to
+    assert incremental[f"tasks:user:{alice}"] == {"total": 1, "st_in_progress": 1}
+    await dashboard_counters.rebuild("tasks")
+    assert await _user_docs(db, alice, bob) == incremental
+
+
+def test_overdue_comes_from_due_buckets_at_read_time():
+    now = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+    doc = {"total": 4, "st_pending": 3, "st_completed": 1,
+           "due_2026-10-19T11:59": 2, "due_2026-10-19T12:00": 1}
+    assert dashboard_counters.task_stats(doc, now) == {"total": 4, "completed": 1, "pending": 3, "overdue": 2}
+    assert dashboard_counters.task_stats(doc, now + timedelta(minutes=1))["overdue"] == 3
+
+
+def test_leap_day_birthdays_count_on_feb_28():
+    doc = {"bday_02-29": 1, "bday_03-02": 2}
+    assert dashboard_counters.upcoming_birthdays(doc, date(2027, 2, 27), days=3) == 3
+    assert dashboard_counters.upcoming_birthdays(doc, date(2028, 2, 27), days=1) == 0
+
+
+async def test_mark_dirty_is_repaired_by_the_reconciler(db):
+    owner = _uid()
+    await dashboard_counters.rebuild("clients")
+    # a bulk write that skipped record_change
+    await db.clients.insert_one({"id": f"cl-{uuid.uuid4().hex[:8]}", "assigned_to": owner})
+    await dashboard_counters.mark_dirty("clients")
+
+    await dashboard_counters.reconcile_dashboard_counters()
+    meta, docs = await dashboard_counters.load([f"clients:user:{owner}"])
+    assert dashboard_counters.is_ready(meta, "clients") and not meta.get("dirty_clients")
+    assert docs[f"clients:user:{owner}"]["total"] == 1
+
+
+async def test_writes_during_a_rebuild_mark_the_kind_dirty(db):
+    owner = _uid()
+    await dashboard_counters.rebuild("tasks")
+    await db.dashboard_counters.update_one(  # another worker's rebuild is scanning
+        {"_id": dashboard_counters.META_ID},
+        {"$set": {"rebuilding_tasks": datetime.now(timezone.utc) + timedelta(minutes=1)}})
+    task = {"id": f"t-{uuid.uuid4().hex[:8]}", "status": "pending", "assigned_to": owner}
+    await db.tasks.insert_one(dict(task))
+    await dashboard_counters.record_change("tasks", None, task)
+    meta, _ = await dashboard_counters.load([])
+    assert meta["dirty_tasks"]
+
+    await dashboard_counters.reconcile_dashboard_counters()
+    meta, docs = await dashboard_counters.load([f"tasks:assignee:{owner}"])
+    assert not meta["dirty_tasks"] and not meta["rebuilding_tasks"]
+    assert docs[f"tasks:assignee:{owner}"]["total"] == 1
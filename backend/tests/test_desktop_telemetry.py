@@ -0,0 +1,68 @@
+"""
+Desktop agent delta telemetry (backend/desktop_agent.py): the write-behind
+buffer keeps deltas whose flush failed, and forgets old per-day seqs.
+"""
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+from backend import desktop_agent as agent
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(monkeypatch):
+    monkeypatch.setattr(agent, "_pending_deltas", {})
+    monkeypatch.setattr(agent, "_accepted_seq", {})
+
+
+def _delta(agent_id, seq, seconds):
+    return agent.AgentActivityDelta(
+        agent_id=agent_id, user_id=agent_id, machine_name="pc", date=date.today().isoformat(),
+        seq=seq, activeSeconds=seconds, timeline=[{"seq": seq}],
+    )
+
+
+async def test_failed_flush_is_requeued(db, monkeypatch):
+    agent_id = f"a-{uuid.uuid4().hex[:8]}"
+    await agent._accept_delta("activity", _delta(agent_id, 1, 30))
+
+    async def broken(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+
+    monkeypatch.setattr(db.desktop_activity, "bulk_write", broken)
+    assert await agent.flush_telemetry_buffer() == 1
+    assert len(agent._pending_deltas) == 1
+    assert not await db.desktop_rollups.find_one({"scope": agent_id})
+
+    # Pushed while the write was failing: merged behind the re-queued delta.
+    await agent._accept_delta("activity", _delta(agent_id, 2, 20))
+    del db.desktop_activity.bulk_write
+    assert await agent.flush_telemetry_buffer() == 1
+    assert agent._pending_deltas == {}
+
+    doc = await db.desktop_activity.find_one({"agent_id": agent_id})
+    assert (doc["activeSeconds"], doc["last_seq"]) == (50, 2)
+    [chunk] = doc["timeline_chunks"]
+    assert (chunk["seq_from"], chunk["seq_to"], chunk["count"]) == (1, 2, 2)
+    rollup = await db.desktop_rollups.find_one({"scope": agent_id, "period": "day"})
+    assert (rollup["activeSeconds"], rollup["desktop_activity_reports"]) == (50, 1)
+
+
+async def test_old_seqs_are_forgotten_once_flushed(db):
+    old = (date.today() - timedelta(days=3)).isoformat()
+    agent._accepted_seq[("activity", "a-old", "u1", old)] = 7
+    await agent._accept_delta("activity", _delta(f"a-{uuid.uuid4().hex[:8]}", 1, 5))
+    await agent.flush_telemetry_buffer()
+    assert [key[3] for key in agent._accepted_seq] == [date.today().isoformat()]
+
+
+def test_expanded_delta_doc_has_the_full_push_shape():
+    doc = {"app_seconds": {agent._safe_key("Code.exe"): 7980.4, "legacy\\uff0eexe": 120},
+           "domain_seconds": {agent._safe_key("mail.google.com"): 3000}}
+    assert "." not in "".join(doc["app_seconds"]) and "\\" not in agent._safe_key("a.b")
+    report = agent._expand_report(doc)
+    assert report["topApps"] == [{"name": "Code.exe", "seconds": 7980, "human": "2h 13m"},
+                                 {"name": "legacy.exe", "seconds": 120, "human": "2m"}]
+    assert report["topDomains"] == [{"domain": "mail.google.com", "seconds": 3000}]
+    assert report["visits"] == report["topDomains"]
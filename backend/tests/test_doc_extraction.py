@@ -0,0 +1,90 @@
+"""
+Document extraction service (backend/doc_extraction.py): parsers running in
+the process pool, the content-hash cache, shared in-flight jobs and the
+per-job timeout.
+"""
+import asyncio
+import io
+
+import pytest
+
+from backend import doc_extraction
+
+
+def _workbook() -> bytes:
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    wb.active.title = "Ledger"
+    wb.active.append(["Party", "Amount"])
+    wb.active.append(["Acme", 120])
+    wb.create_sheet("Notes").append(["checked"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def fresh_service():
+    doc_extraction.clear_cache()
+    yield
+    doc_extraction.shutdown()
+
+
+@pytest.fixture
+def pool_runs(monkeypatch):
+    runs = []
+    real = doc_extraction._run_in_pool
+
+    async def counting(kind, contents, options, timeout):
+        runs.append(kind)
+        return await real(kind, contents, options, timeout)
+
+    monkeypatch.setattr(doc_extraction, "_run_in_pool", counting)
+    return runs
+
+
+async def test_parsers_run_in_the_pool_and_results_are_cached(pool_runs):
+    contents = _workbook()
+    sheets = await doc_extraction.extract("workbook_rows", contents)
+    assert sheets == {"Ledger": [["Party", "Amount"], ["Acme", 120]], "Notes": [["checked"]]}
+    # Same bytes: served from the cache, and a private copy each time.
+    sheets["Ledger"].clear()
+    assert (await doc_extraction.extract("workbook_rows", contents))["Ledger"][1] == ["Acme", 120]
+    assert pool_runs == ["workbook_rows"]
+
+    doc = await doc_extraction.extract("mis_document", b"party,amount\nAcme,120\n", filename="sales.csv")
+    assert doc.kind == "csv" and "Acme" in doc.tables[0].to_string()
+    assert pool_runs == ["workbook_rows", "mis_document"]
+
+
+async def test_concurrent_requests_share_one_job(pool_runs):
+    contents = _workbook()
+    results = await asyncio.gather(*(doc_extraction.extract("workbook_rows", contents) for _ in range(4)))
+    assert len(pool_runs) == 1
+    assert all(r == results[0] for r in results)
+
+
+async def test_timeout_kills_the_pool_and_the_next_job_starts_fresh():
+    contents = _workbook()
+    # Starting a worker alone takes longer than this.
+    with pytest.raises(doc_extraction.ExtractionTimeout):
+        await doc_extraction.extract("workbook_rows", contents, timeout=0.001)
+    assert doc_extraction._pool is None
+    assert "Notes" in await doc_extraction.extract("workbook_rows", contents)
+
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(doc_extraction, "CACHE_BYTES", 60)
+    for key in "abc":
+        doc_extraction._cache_put(key, b"x" * 15)
+    assert doc_extraction._cache_get("a") is not None
+    doc_extraction._cache_put("d", b"x" * 15)
+    doc_extraction._cache_put("e", b"x" * 15)       # evicts b, the least recently used
+    doc_extraction._cache_put("huge", b"x" * 16)    # over a quarter of the cache: not kept
+    assert list(doc_extraction._cache) == ["c", "a", "d", "e"]
+    assert doc_extraction._cache_size == 60
+
+
+async def test_unknown_parser():
+    with pytest.raises(ValueError):
+        await doc_extraction.extract("ocr", b"...")
@@ -0,0 +1,122 @@
+"""
+Drive metadata mirror (backend/drive_mirror.py) against the in-memory
+FakeDriveBackend.
+"""
+import pytest
+
+from backend import client_portal, drive_mirror
+from backend.drive_mirror import FakeDriveBackend
+from backend.models import User
+
+
+@pytest.fixture
+def fake():
+    fake = FakeDriveBackend(page_size=2)
+    drive_mirror.set_backend(fake)
+    yield fake
+    drive_mirror.set_backend(None)
+
+
+async def _link(db, fake):
+    """A linked root holding two folders and a file: root/{Returns/{gst.pdf}, Notices, pan.pdf}."""
+    for name in ("drive_mirror_files", "drive_mirror_roots", "drive_mirror_state", "client_portal_users"):
+        await db[name].delete_many({})
+    root = fake.add_folder("Acme Ltd")
+    tree = {
+        "root": root,
+        "returns": fake.add_folder("Returns", parent=root),
+        "notices": fake.add_folder("Notices", parent=root),
+        "pan": fake.add_file("pan.pdf", parent=root),
+    }
+    tree["gst"] = fake.add_file("gst.pdf", parent=tree["returns"])
+    await db.client_portal_users.insert_one({"id": "portal-1", "google_drive_folder_id": root})
+    await drive_mirror.reconcile_drive_mirror()
+    return tree
+
+
+async def _names(folder_id, root_id, **kwargs):
+    page = await drive_mirror.list_folder(folder_id, root_id, **kwargs)
+    return None if page is None else [d["name"] for d in page[0]]
+
+
+async def test_crawl_mirrors_the_linked_tree(db, fake):
+    tree = await _link(db, fake)
+    assert await drive_mirror.root_ready(tree["root"])
+    assert await drive_mirror.count_entries(tree["root"]) == 4
+    # folders first, then by name
+    assert await _names(tree["root"], tree["root"]) == ["Notices", "Returns", "pan.pdf"]
+    assert await _names(tree["returns"], tree["root"]) == ["gst.pdf"]
+    assert await drive_mirror.folder_name(tree["returns"]) == "Returns"
+
+    calls = fake.calls.get("list_children", 0)
+    assert await _names(tree["root"], tree["root"]) == ["Notices", "Returns", "pan.pdf"]
+    assert fake.calls.get("list_children", 0) == calls  # reads never hit Drive
+
+
+async def test_changes_feed_applies_rename_move_and_trash(db, fake):
+    tree = await _link(db, fake)
+    outside = fake.add_folder("Elsewhere")
+    fake.add_file("old.pdf", parent=outside)
+
+    fake.rename(tree["pan"], "PAN card.pdf")
+    fake.move(tree["gst"], tree["notices"])
+    fake.move(outside, tree["root"])         # a folder moved in brings its children
+    fake.trash(tree["returns"])
+    assert await drive_mirror.sync_changes() > 0
+
+    assert await _names(tree["root"], tree["root"]) == ["Elsewhere", "Notices", "PAN card.pdf"]
+    assert await _names(tree["notices"], tree["root"]) == ["gst.pdf"]
+    assert await _names(outside, tree["root"]) == ["old.pdf"]
+    assert await drive_mirror.get_entry(tree["returns"]) is None
+
+    fake.move(outside, "somewhere-unlinked")  # moved out: the subtree leaves the mirror
+    await drive_mirror.sync_changes()
+    assert await drive_mirror.get_entry(outside) is None
+    assert await drive_mirror.count_entries(tree["root"]) == 3
+
+
+async def test_expired_token_resets_the_feed_and_recrawls(db, fake):
+    tree = await _link(db, fake)
+    fake.add_file("missed.pdf", parent=tree["root"])
+    fake.expire_tokens()
+
+    await drive_mirror.sync_changes()
+    assert not await drive_mirror.root_ready(tree["root"])
+    assert await drive_mirror.list_folder(tree["root"], tree["root"]) is None  # caller falls back to Drive
+
+    await drive_mirror.reconcile_drive_mirror()
+    assert "missed.pdf" in await _names(tree["root"], tree["root"])
+
+
+async def test_list_folder_pages_and_hides(db, fake):
+    tree = await _link(db, fake)
+    for i in range(5):
+        fake.add_file(f"doc-{i}.pdf", parent=tree["notices"])
+    await drive_mirror.sync_changes()
+
+    seen, cursor = [], None
+    while True:
+        docs, cursor = await drive_mirror.list_folder(tree["notices"], tree["root"], cursor=cursor, limit=2)
+        seen += [d["name"] for d in docs]
+        if cursor is None:
+            break
+    assert seen == [f"doc-{i}.pdf" for i in range(5)]
+
+    hidden = [tree["pan"]]
+    assert await _names(tree["root"], tree["root"], hidden_ids=hidden) == ["Notices", "Returns"]
+    assert [e["id"] for e in await drive_mirror.hidden_entries(tree["root"], hidden)] == hidden
+    # a folder outside the root is not served from the mirror
+    assert await drive_mirror.list_folder("not-in-root", tree["root"]) is None
+
+
+async def test_client_subfolders_are_read_past_the_first_page(db, fake, monkeypatch):
+    tree = await _link(db, fake)
+    list_drive_folder = client_portal._list_drive_folder
+
+    async def one_at_a_time(*args, **kwargs):
+        return await list_drive_folder(*args, **{**kwargs, "limit": 1})
+
+    monkeypatch.setattr(client_portal, "_list_drive_folder", one_at_a_time)
+    result = await client_portal.list_client_subfolders("portal-1", current_user=User(id="u-admin", email="a@x.in", role="admin"))
+    assert [f["name"] for f in result["subfolders"]] == ["Notices", "Returns"]
+    assert result["root_folder_id"] == tree["root"]
@@ -0,0 +1,109 @@
+"""
+Outbox dispatcher of the workflow EventBus (backend/workflow/event_bus.py):
+claiming, per-listener delivery bookkeeping, retry and dead-lettering.
+"""
+import uuid
+
+import pytest
+
+from backend.workflow import event_bus
+from backend.workflow.automation_engine import AutomationEngine
+from backend.workflow.event_bus import EventBus
+from backend.workflow.rule_engine import CompiledRule, RuleEngine
+
+
+@pytest.fixture(autouse=True)
+def isolated_bus(monkeypatch):
+    monkeypatch.setattr(EventBus, "_listeners", {})
+    monkeypatch.setattr(EventBus, "_listener_stats", {})
+    monkeypatch.setattr(EventBus, "_metrics", dict(EventBus._metrics))
+
+
+async def _publish(event_type="invoice_created"):
+    company_id = f"co-{uuid.uuid4().hex[:8]}"
+    return await EventBus.publish(company_id, event_type, "inv-1", "u1", {"amount": 100})
+
+
+async def _claim(db, event_id):
+    [event] = [e for e in await EventBus._claim_batch(100) if e["id"] == event_id]
+    return event
+
+
+async def test_listeners_run_once_and_the_event_is_done(db):
+    seen = []
+
+    async def listener(event):
+        seen.append(event["id"])
+
+    EventBus.subscribe("invoice_created", listener)
+    event = await _publish()
+    await EventBus._dispatch(await _claim(db, event["id"]))
+
+    stored = await db.business_events.find_one({"id": event["id"]})
+    assert seen == [event["id"]]
+    assert stored["dispatch_status"] == "done" and stored["attempts"] == 1
+    assert event_bus.AUTOMATION_KEY in stored["delivered"]
+
+
+async def test_automation_failures_are_retried_then_dead_lettered(db, monkeypatch):
+    seen = []
+
+    async def listener(event):
+        seen.append(event["id"])
+
+    async def rules_unavailable(company_id, rule_type):
+        raise ConnectionError("rules collection unreachable")
+
+    EventBus.subscribe("invoice_created", listener)
+    monkeypatch.setattr(RuleEngine, "get_compiled_rules", rules_unavailable)
+    event = await _publish()
+    await EventBus._dispatch(await _claim(db, event["id"]))
+
+    stored = await db.business_events.find_one({"id": event["id"]})
+    assert stored["dispatch_status"] == "pending"
+    assert stored["last_error"].startswith(f"{event_bus.AUTOMATION_KEY}: ConnectionError")
+    assert event_bus.AUTOMATION_KEY not in stored["delivered"]
+
+    for _ in range(event_bus.MAX_ATTEMPTS - 1):
+        await EventBus._dispatch(await db.business_events.find_one({"id": event["id"]}))
+    stored = await db.business_events.find_one({"id": event["id"]})
+    assert (stored["dispatch_status"], stored["attempts"]) == ("dead", event_bus.MAX_ATTEMPTS)
+    # The listener that succeeded the first time is not re-run on retries.
+    assert seen == [event["id"]]
+
+    assert await EventBus.redrive_dead_letters(stored["company_id"]) == 1
+    assert (await db.business_events.find_one({"id": event["id"]}))["dispatch_status"] == "pending"
+
+
+async def test_claimed_batch_is_matched_once_per_rule_set(db, monkeypatch):
+    loads, actions = [], []
+    rule = {"id": "r1", "action_type": "log", "conditions": [
+        {"field": "amount", "operator": ">", "threshold": 50}]}
+
+    async def compiled(company_id, rule_type):
+        loads.append((company_id, rule_type))
+        return [CompiledRule(rule)]
+
+    async def run_action(event, matched_rule):
+        actions.append((event["id"], matched_rule["id"]))
+
+    monkeypatch.setattr(RuleEngine, "get_compiled_rules", compiled)
+    monkeypatch.setattr(AutomationEngine, "_run_action", run_action)
+    company_id = f"co-{uuid.uuid4().hex[:8]}"
+    events = await EventBus.publish_many([
+        {"company_id": company_id, "event_type": "invoice_created", "source_id": f"inv-{i}",
+         "user_id": "u1", "payload": {"amount": amount}}
+        for i, amount in enumerate((100, 10, 75))
+    ])
+    ids = {e["id"] for e in events}
+    claimed = [e for e in await EventBus._claim_batch(100) if e["id"] in ids]
+    await EventBus._prematch_automation(claimed)
+    assert loads == [(company_id, "event_invoice_created")]
+
+    for event in claimed:
+        await EventBus._dispatch(event)
+    assert loads == [(company_id, "event_invoice_created")]
+    assert sorted(actions) == sorted((e["id"], "r1") for e in events if e["payload"]["amount"] > 50)
+    stored = await db.business_events.find({"id": {"$in": list(ids)}}).to_list(None)
+    assert {e["dispatch_status"] for e in stored} == {"done"}
+    assert not any(event_bus.PREMATCH_FIELD in e for e in stored)
@@ -0,0 +1,88 @@
+"""
+Index manifest (backend/index_manifest.py): every module in MANIFEST_MODULES
+declares INDEXES, specs are de-duplicated, and reconciling creates only the
+missing indexes, reports conflicts, retries a failed batch one by one and is
+skipped on the in-memory database.
+"""
+import logging
+
+from backend import index_manifest as im
+from backend.index_manifest import index
+
+
+class FakeCollection:
+    def __init__(self, existing, bad=()):
+        self.indexes = {info["name"]: info for info in existing}
+        self.bad = set(bad)
+        self.create_calls = []
+        self.dropped = []
+
+    def list_indexes(self):
+        collection = self
+
+        class Cursor:
+            async def to_list(self, length):
+                return list(collection.indexes.values())
+        return Cursor()
+
+    async def create_indexes(self, models):
+        docs = [m.document for m in models]
+        self.create_calls.append([d["name"] for d in docs])
+        if any(d["name"] in self.bad for d in docs):
+            raise RuntimeError("E11000 duplicate key")
+        for d in docs:
+            self.indexes[d["name"]] = {"name": d["name"], "key": dict(d["key"]),
+                                       **{k: v for k, v in d.items() if k not in ("name", "key")}}
+
+    async def drop_index(self, name):
+        self.dropped.append(name)
+        self.indexes.pop(name)
+
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+def test_manifest_loads_and_dedupes():
+    specs = im.manifest()
+    keys = [(s.collection, s.key) for s in specs]
+    assert len(keys) == len(set(keys))
+    assert ("copilot_message_buckets", (("session_id", 1), ("seq", -1))) in keys
+
+    dupes = [index("c", "a"), index("c", [("a", 1)], unique=True), index("c", "b")]
+    assert [s.name for s in im._dedupe(dupes)] == ["a_1", "b_1"]
+
+
+async def test_only_missing_indexes_are_created(monkeypatch):
+    invoices = FakeCollection([
+        {"name": "_id_", "key": {"_id": 1}},
+        {"name": "id_1", "key": {"id": 1}, "unique": True},
+        {"name": "number_1", "key": {"number": 1.0}},             # doubles from the server compare equal
+        {"name": "old_idx", "key": {"legacy": 1}},
+    ], bad={"status_1"})
+    monkeypatch.setattr(im, "db", FakeDB(invoices=invoices))
+    report = await im.ensure_indexes(
+        [
+            index("invoices", "id", unique=True),
+            index("invoices", "number", unique=True),          # exists without unique: conflict
+            index("invoices", [("company_id", 1), ("date", -1)]),
+            index("invoices", "status"),
+        ],
+        drops=[("invoices", "old_idx")],
+    )
+    assert report["existing"] == 1
+    assert [c["index"] for c in report["conflicts"]] == ["invoices.number_1"]
+    assert report["created"] == ["invoices.company_id_1_date_-1"]
+    assert [f["index"] for f in report["failed"]] == ["invoices.status_1"]
+    assert report["dropped"] == ["invoices.old_idx"]
+    # One batch, then one by one after it failed.
+    assert invoices.create_calls == [["company_id_1_date_-1", "status_1"], ["company_id_1_date_-1"], ["status_1"]]
+
+
+async def test_in_memory_database_is_skipped(caplog):
+    with caplog.at_level(logging.INFO, logger="index_manifest"):
+        assert (await im.ensure_indexes([index("invoices", "id")]))["skipped"]
+        assert (await im.reconcile_indexes())["skipped"] == "in-memory database"
+    assert im.last_report()["skipped"]
+    assert not [r for r in caplog.records if r.levelno >= logging.WARNING]
@@ -0,0 +1,99 @@
+"""
+Async job runner (backend/job_runner.py): triggers, run claims, singleton
+locks and run history.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from backend.job_runner import IST, JobRunner, cron, every
+
+
+def _job_id():
+    return f"job-{uuid.uuid4().hex[:8]}"
+
+
+def test_cron_fires_on_the_next_matching_wall_clock_minute():
+    trigger = cron(minute=30, hour=[9, 18], day_of_week=0)  # Mondays 09:30 and 18:30 IST
+    after = datetime(2026, 10, 19, 10, 0, tzinfo=IST)       # a Monday
+    assert trigger.next_after(after) == datetime(2026, 10, 19, 18, 30, tzinfo=IST)
+    assert trigger.next_after(datetime(2026, 10, 19, 18, 30, tzinfo=IST)) == \
+        datetime(2026, 10, 26, 9, 30, tzinfo=IST)
+
+
+def test_interval_is_aligned_to_the_epoch():
+    trigger = every(minutes=5)
+    fire = trigger.next_after(datetime(2026, 10, 19, 10, 2, 17, tzinfo=timezone.utc))
+    assert fire == datetime(2026, 10, 19, 10, 5, tzinfo=timezone.utc)
+    assert trigger.next_after(fire) == datetime(2026, 10, 19, 10, 10, tzinfo=timezone.utc)
+
+
+async def test_outcomes_are_counted_and_recorded(db):
+    runner = JobRunner()
+    calls = []
+
+    async def ok():
+        calls.append("ok")
+
+    async def boom():
+        raise RuntimeError("nope")
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    fire_at = datetime(2026, 10, 19, 4, 0, tzinfo=timezone.utc)
+    for func, timeout, status in ((ok, 5, "succeeded"), (boom, 5, "failed"), (slow, 0.05, "timed_out")):
+        job = runner.add_job(_job_id(), func, every(hours=1), timeout=timeout)
+        await runner._execute(job, fire_at)
+        run = await db.job_runs.find_one({"job_id": job.id})
+        assert run["status"] == status and job.metrics["last_status"] == status
+        assert job.metrics["runs"] == 1
+        assert await db.job_locks.find_one({"_id": job.id}) is None  # released either way
+    assert calls == ["ok"]
+    assert runner.get_job(job.id).metrics["timed_out"] == 1
+
+
+async def test_a_fire_runs_once_across_workers(db):
+    job_id, calls = _job_id(), []
+
+    async def work():
+        calls.append(1)
+
+    first, second = JobRunner(), JobRunner()
+    jobs = [w.add_job(job_id, work, every(minutes=1)) for w in (first, second)]
+    fire_at = datetime(2026, 10, 19, 4, 0, tzinfo=timezone.utc)
+    await first._execute(jobs[0], fire_at)
+    await second._execute(jobs[1], fire_at)
+    assert calls == [1]
+    assert jobs[1].metrics["skipped_claimed"] == 1
+
+
+async def test_singleton_lock_blocks_an_overlapping_fire(db):
+    job_id, release = _job_id(), asyncio.Event()
+
+    async def long_run():
+        await release.wait()
+
+    first, second = JobRunner(), JobRunner()
+    a = first.add_job(job_id, long_run, every(minutes=1))
+    b = second.add_job(job_id, long_run, every(minutes=1))
+    running = asyncio.ensure_future(first._execute(a, datetime(2026, 10, 19, 4, 0, tzinfo=timezone.utc)))
+    await asyncio.sleep(0.05)
+    await second._execute(b, datetime(2026, 10, 19, 4, 1, tzinfo=timezone.utc))
+    assert b.metrics["skipped_locked"] == 1
+    release.set()
+    await running
+    assert a.metrics["succeeded"] == 1
+
+
+async def test_run_now_bypasses_the_schedule(db):
+    runner, calls = JobRunner(), []
+
+    async def work():
+        calls.append(1)
+
+    runner.add_job("manual-" + _job_id(), work, cron(hour=3))
+    assert await runner.run_now(next(iter(runner._jobs)))
+    await asyncio.wait(list(runner._running))
+    assert calls == [1]
+    assert not await runner.run_now("unknown")
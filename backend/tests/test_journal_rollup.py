@@ -0,0 +1,108 @@
+"""
+Monthly journal rollup (backend/journal_rollup.py): range splitting and the
+choice between stored months, rebuilt months and live edge sums. The
+MockDatabase has no aggregation support, so the three pipeline helpers are
+replaced by recording stand-ins.
+"""
+import uuid
+
+import pytest
+
+from backend import journal_rollup as rollup
+
+
+def test_split_range():
+    assert rollup.split_range("2024-04-01", "2025-03-31") == (("2024-04-01", "2025-03-31"), [])
+    assert rollup.split_range("2024-04-15", "2024-07-10") == (
+        ("2024-05-01", "2024-06-30"), [("2024-04-15", "2024-04-30"), ("2024-07-01", "2024-07-10")])
+    assert rollup.split_range(None, "2024-02-29") == ((None, "2024-02-29"), [])
+    assert rollup.split_range(None, "2024-03-05") == ((None, "2024-02-29"), [("2024-03-01", "2024-03-05")])
+    # Inside one month, or not a date: no whole months.
+    assert rollup.split_range("2024-06-02", "2024-06-20") == (None, [("2024-06-02", "2024-06-20")])
+    assert rollup.split_range("2024-06-02", "2024-07-20") == (None, [("2024-06-02", "2024-07-20")])
+    assert rollup.split_range("bogus", "2024-07-20") == (None, [("bogus", "2024-07-20")])
+
+
+@pytest.fixture
+def company(monkeypatch):
+    company_id = f"co-{uuid.uuid4().hex[:8]}"
+    calls = {"counts": [], "build": [], "live": []}
+    counts = {"2024-04": 2, "2024-05": 3, "2024-06": 1}
+
+    async def month_counts(cid, lo, hi):
+        calls["counts"].append((lo, hi))
+        return dict(counts)
+
+    async def build_months(cid, months):
+        calls["build"].append(list(months))
+        return {m: {"cash": (100.0, 0.0)} for m in months}
+
+    async def live(cid, ranges):
+        calls["live"].append(list(ranges))
+        return {"cash": (0.0, 5.0), "sales": (0.0, 7.0)}
+
+    monkeypatch.setattr(rollup, "_month_counts", month_counts)
+    monkeypatch.setattr(rollup, "build_months", build_months)
+    monkeypatch.setattr(rollup, "_live_movements", live)
+    return company_id, counts, calls
+
+
+async def _store(db, company_id, month, line_count, accounts, version=1):
+    await db.journal_monthly.insert_one({
+        "_id": f"{company_id}:{month}", "company_id": company_id, "month": month,
+        "accounts": accounts, "line_count": line_count, "version": version, "built_version": version,
+    })
+
+
+async def test_fresh_months_come_from_the_rollup(company, db):
+    company_id, counts, calls = company
+    for month, n in counts.items():
+        await _store(db, company_id, month, n, [{"account_id": "cash", "debit": 10.0, "credit": 1.0}])
+    moves = await rollup.account_movements(company_id, "2024-04-01", "2024-07-03")
+    assert calls["build"] == [] and calls["live"] == [[("2024-07-01", "2024-07-03")]]
+    assert moves == {"cash": (30.0, 8.0), "sales": (0.0, 7.0)}
+    assert await rollup.account_balances(company_id, "2024-04-01", "2024-06-30") == {"cash": 27.0}
+
+
+async def test_changed_deleted_and_missing_months_are_rebuilt(company, db):
+    company_id, counts, calls = company
+    cash = [{"account_id": "cash", "debit": 10.0, "credit": 0.0}]
+    await _store(db, company_id, "2024-04", 2, cash)
+    await _store(db, company_id, "2024-05", 3, cash)
+    await _store(db, company_id, "2024-03", 4, cash)   # every line since deleted
+    # 2024-06 has lines but no rollup yet; 2024-05 gets a new posting.
+    await rollup.mark_changed([{"company_id": company_id, "entry_date": "2024-05-20"}])
+
+    moves = await rollup.account_movements(company_id, None, "2024-06-30")
+    assert calls["live"] == []
+    assert calls["build"] == [["2024-03", "2024-05", "2024-06"]]
+    assert moves == {"cash": (310.0, 0.0)}
+
+    doc = await db.journal_monthly.find_one({"_id": f"{company_id}:2024-05"})
+    assert (doc["version"], doc["built_version"]) == (2, 1)
+
+
+async def test_mark_changed_creates_and_bumps_month_versions(db):
+    company_id = f"co-{uuid.uuid4().hex[:8]}"
+    await rollup.mark_changed([
+        {"company_id": company_id, "entry_date": "2024-08-01"},
+        {"company_id": company_id, "entry_date": "2024-08-31"},
+        {"company_id": company_id, "entry_date": "2024-09-02"},
+        {"company_id": company_id},
+    ])
+    await rollup.mark_changed([{"company_id": company_id, "entry_date": "2024-08-15"}])
+    docs = {d["month"]: d for d in await db.journal_monthly.find({"company_id": company_id}).to_list(None)}
+    assert {m: d["version"] for m, d in docs.items()} == {"2024-08": 2, "2024-09": 1}
+    assert not rollup._fresh(docs["2024-08"], 0)
+
+
+async def test_ranges_of_one_report_share_one_read(company, db):
+    company_id, counts, calls = company
+    for month, n in counts.items():
+        await _store(db, company_id, month, n, [{"account_id": "cash", "debit": 10.0, "credit": 0.0}])
+    opening, period, page = await rollup.account_movements_many(company_id, [
+        (None, "2024-04-30"), ("2024-05-01", "2024-06-30"), (None, "2024-05-31"),
+    ])
+    assert calls["counts"] == [(None, "2024-06-30")] and calls["build"] == []
+    assert (opening, period, page) == ({"cash": (10.0, 0.0)}, {"cash": (20.0, 0.0)}, {"cash": (20.0, 0.0)})
+    assert await rollup.account_balances_many(company_id, [("2024-06-01", "2024-06-30")]) == [{"cash": 10.0}]
@@ -0,0 +1,41 @@
+"""
+Lead pre-filter helpers (backend/lead_prefilter.py): the micro-batcher that
+shares one LLM call between messages, and the calls-avoided metric.
+"""
+import asyncio
+
+import pytest
+
+from backend import lead_prefilter
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(lead_prefilter, "_metrics", {
+        kind: dict.fromkeys(counters, 0) for kind, counters in lead_prefilter._metrics.items()
+    })
+
+
+async def test_batcher_groups_items_and_keeps_its_tasks():
+    calls = []
+
+    async def run_batch(items):
+        calls.append(list(items))
+        return [ValueError("bad") if i == 3 else i * 10 for i in items]
+
+    batcher = lead_prefilter.MicroBatcher("t", run_batch, window=0.01, max_size=2)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(5)), return_exceptions=True)
+    assert results[:3] == [0, 10, 20] and isinstance(results[3], ValueError) and results[4] == 40
+    assert sorted(map(len, calls)) == [1, 2, 2]
+    await asyncio.sleep(0)
+    assert batcher._flushes == set()
+
+
+def test_only_answered_batches_count_as_avoided_calls():
+    lead_prefilter.note_llm_call("intent", 4)          # one call for four messages
+    lead_prefilter.note_llm_call("intent", 0)          # a batch that could not be parsed...
+    for _ in range(3):
+        lead_prefilter.note_llm_call("intent", 1)      # ...retried one message at a time
+    metrics = lead_prefilter.get_metrics()["kinds"]["intent"]
+    assert (metrics["llm_calls"], metrics["llm_messages"]) == (5, 7)
+    assert metrics["llm_calls_avoided"] == 2
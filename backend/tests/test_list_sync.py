@@ -0,0 +1,84 @@
+"""
+Keyset paging and delta sync (backend/list_sync.py).
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from backend import list_sync
+
+
+def _collection(db):
+    name = f"sync_{uuid.uuid4().hex[:8]}"
+    return name, db[name]
+
+
+def _iso(dt):
+    return dt.isoformat()
+
+
+async def test_keyset_pages_cover_every_record_once(db):
+    _, coll = _collection(db)
+    await coll.insert_many([{"_id": f"{i:03d}", "id": f"r{i}"} for i in range(7)])
+
+    seen, cursor = [], None
+    while True:
+        docs, cursor = await list_sync.keyset_page(coll, {}, [("_id", 1)], cursor, 3)
+        seen += [d["id"] for d in docs]
+        assert all("_id" not in d for d in docs)
+        if cursor is None:
+            break
+    assert seen == [f"r{i}" for i in range(7)]
+
+
+def test_bad_cursor_is_a_400():
+    with pytest.raises(HTTPException) as exc:
+        list_sync.decode_cursor("not-a-cursor!")
+    assert exc.value.status_code == 400
+
+
+async def test_delta_evicts_only_what_the_caller_could_see(db, monkeypatch):
+    name, coll = _collection(db)
+    monkeypatch.setitem(list_sync.SCOPE_FIELDS, name, ("owner",))
+    now = datetime.now(timezone.utc)
+    old, recent = _iso(now - timedelta(days=2)), _iso(now)
+    await coll.insert_many([
+        {"_id": "a", "id": "a", "owner": "u1", "updated_at": old},
+        {"_id": "b", "id": "b", "owner": "u1", "updated_at": recent},
+        {"_id": "c", "id": "c", "owner": "u2", "updated_at": recent},
+        {"_id": "f", "id": "f", "owner": "u1", "updated_at": recent},
+        {"_id": "g", "id": "g", "owner": "u1", "updated_at": recent},
+    ])
+    # c was reassigned away from u1, f the other way, g away and back again
+    await list_sync.record_change(name, {"id": "c", "owner": "u1"}, {"id": "c", "owner": "u2"})
+    await list_sync.record_change(name, {"id": "f", "owner": "u2"}, {"id": "f", "owner": "u1"})
+    await list_sync.record_change(name, {"id": "g", "owner": "u1"}, {"id": "g", "owner": "u2"})
+    await list_sync.record_change(name, {"id": "g", "owner": "u2"}, {"id": "g", "owner": "u1"})
+    await list_sync.record_change(name, {"id": "b", "owner": "u1"}, {"id": "b", "owner": "u1", "x": 1})
+    await list_sync.record_tombstone(name, [{"id": "gone", "owner": "u1"}, {"id": "theirs", "owner": "u2"}])
+
+    since = _iso(now - timedelta(hours=1))
+    page = await list_sync.delta_page(coll, name, {"owner": "u1"}, since, None, 100)
+    assert not page["reset"]
+    assert [d["id"] for d in page["changed"]] == ["b", "f", "g"]
+    assert page["deleted"] == ["c", "gone"]
+    assert page["next_cursor"] is None
+    assert list_sync.parse_since(page["next_since"]) <= now
+
+    page = await list_sync.delta_page(coll, name, {"owner": "u2"}, since, None, 100)
+    assert [d["id"] for d in page["changed"]] == ["c"]
+    assert page["deleted"] == ["f", "g", "theirs"]
+
+
+async def test_snapshot_is_scoped_and_old_watermarks_reset(db):
+    name, coll = _collection(db)
+    await coll.insert_many([{"_id": "a", "id": "a", "owner": "u1"},
+                            {"_id": "b", "id": "b", "owner": "u2"}])
+    page = await list_sync.delta_page(coll, name, {"owner": "u1"}, None, None, 100)
+    assert [d["id"] for d in page["changed"]] == ["a"] and page["deleted"] == []
+
+    stale = _iso(datetime.now(timezone.utc) - timedelta(days=list_sync.TOMBSTONE_RETENTION_DAYS + 1))
+    page = await list_sync.delta_page(coll, name, {"owner": "u1"}, stale, None, 100)
+    assert page["reset"] and page["changed"] == []
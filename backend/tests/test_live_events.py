@@ -0,0 +1,183 @@
+"""
+Server push channel (backend/live_events.py): pub/sub fan-out in one process
+and across workers through the `live_events` feed, the reminder timer wheel,
+and the notification hooks.
+"""
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend import live_events, notifications
+from backend.models import User
+
+
+def _drain(sub):
+    items = []
+    while not sub.queue.empty():
+        items.append(sub.queue.get_nowait())
+    return items
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(live_events, "pubsub", live_events.InMemoryPubSub())
+    monkeypatch.setattr(live_events, "wheel", live_events.ReminderWheel())
+
+
+async def test_in_memory_fan_out():
+    ps = live_events.InMemoryPubSub()
+    alice = ps.subscribe(["user:a", "hub"])
+    bob = ps.subscribe(["user:b"])
+    await ps.publish("user:a", "unread", {"delta": 1})
+    await ps.publish_many([("hub", "wa_sync", {}), ("user:b", "unread", {"count": 0})])
+    assert _drain(alice) == [("unread", {"delta": 1}), ("wa_sync", {})]
+    assert _drain(bob) == [("unread", {"count": 0})]
+
+    alice.close()
+    await ps.publish("hub", "wa_sync", {})
+    assert _drain(alice) == [] and ps._subs.keys() == {"user:b"}
+
+    for _ in range(live_events.QUEUE_SIZE + 1):
+        await ps.publish("user:b", "unread", {"delta": 1})
+    assert bob.overflowed
+
+
+async def test_events_reach_other_workers():
+    first, second = live_events.MongoPubSub(), live_events.MongoPubSub()
+    channel = f"user:{uuid.uuid4().hex[:8]}"
+    mine = first.subscribe([channel])
+    theirs = second.subscribe([channel])
+    await first.publish(channel, "notification", {"title": "Hi"})
+    assert _drain(mine) == [("notification", {"title": "Hi"})]
+
+    assert await second.poll_once() == 1
+    assert _drain(theirs) == [("notification", {"title": "Hi"})]
+    # The overlap window re-reads the event; it is not delivered twice.
+    assert await second.poll_once() == 0
+    # A worker does not replay its own events.
+    assert await first.poll_once() == 0
+    await first.stop()
+    await second.stop()
+
+
+async def test_new_subscriptions_skip_earlier_events():
+    first, second = live_events.MongoPubSub(), live_events.MongoPubSub()
+    channel = f"user:{uuid.uuid4().hex[:8]}"
+    early = second.subscribe([channel])
+    await first.publish(channel, "unread", {"delta": 1})
+    late = second.subscribe([channel])  # a reconnect after the event
+    await second.poll_once()
+    assert _drain(early) == [("unread", {"delta": 1})]
+    assert _drain(late) == []
+    await first.stop()
+    await second.stop()
+
+
+def test_wheel_slots_by_second():
+    wheel = live_events.ReminderWheel(slots=8)
+    now = wheel._cursor
+    wheel.add("a", now + 2)
+    wheel.add("b", now + 10)     # a full turn later, in the same slot as a
+    wheel.add("c", now - 60)     # overdue: the next tick
+    assert wheel.advance(now + 1) == {"c"}
+    assert wheel.advance(now + 2) == {"a"}
+    assert len(wheel) == 1
+    assert wheel.advance(now + 9) == set()
+    assert wheel.advance(now + 40) == {"b"}
+    assert len(wheel) == 0
+
+
+async def _reminder(db, user_id, remind_at):
+    await db.reminders.insert_one({
+        "user_id": user_id, "title": "Call back", "description": "GST query",
+        "remind_at": remind_at.isoformat(), "reminder_type": "reminder",
+        "related_task_id": "t1", "is_dismissed": False, "is_fired": False,
+    })
+
+
+async def test_wheel_fires_due_reminders_once(db):
+    admin = User(id=f"u-{uuid.uuid4().hex[:8]}", email="a@x.in", role="admin")
+    now = datetime.now(timezone.utc)
+    await _reminder(db, admin.id, now - timedelta(minutes=1))
+    await _reminder(db, admin.id, now + timedelta(minutes=30))
+    stream = live_events.pubsub.subscribe([live_events.user_channel(admin.id)])
+    wheel = live_events.wheel
+    wheel._cursor = int(time.time()) - 2
+    await wheel.attach(admin)
+    assert len(wheel) == 2
+
+    await wheel.tick()
+    [(event, items)] = _drain(stream)
+    assert event == "popup"
+    assert [(i["title"], i["message"], i["task_id"]) for i in items] == [("Call back", "GST query", "t1")]
+    # Already claimed: neither the wheel nor a poll returns it again.
+    assert await live_events.claim_due_popups(admin) == []
+
+    # A reminder written elsewhere is slotted through the wheel channel.
+    await _reminder(db, admin.id, now - timedelta(seconds=5))
+    await live_events.reminder_scheduled(admin.id, now - timedelta(seconds=5))
+    wheel._cursor = int(time.time()) - 1
+    await wheel.tick()
+    assert [e for e, _ in _drain(stream)] == ["popup"]
+
+    wheel.detach(admin.id)
+    wheel.stop()
+
+
+async def test_failed_publish_releases_the_claim(db, monkeypatch):
+    admin = User(id=f"u-{uuid.uuid4().hex[:8]}", email="a@x.in", role="admin")
+    await _reminder(db, admin.id, datetime.now(timezone.utc) - timedelta(minutes=1))
+    note = await notifications.create_notification(admin.id, "Task", "Please review", popup=True)
+    wheel = live_events.wheel
+    await wheel.attach(admin)
+
+    async def broken(*args):
+        raise ConnectionError("feed down")
+
+    monkeypatch.setattr(live_events.pubsub, "publish", broken)
+    with pytest.raises(ConnectionError):
+        await wheel.fire(admin.id)
+    assert await db.reminders.find_one({"user_id": admin.id, "is_fired": False})
+    assert (await db.notifications.find_one({"id": note.id}))["is_read"] is False
+
+    del live_events.pubsub.publish
+    assert len(await wheel.fire(admin.id)) == 2
+    wheel.detach(admin.id)
+    wheel.stop()
+
+
+async def test_popups_are_gated(db):
+    staff = User(id=f"u-{uuid.uuid4().hex[:8]}", email="s@x.in", role="staff")
+    now = datetime.now(timezone.utc)
+    await _reminder(db, staff.id, now - timedelta(minutes=1))
+    assert not await live_events.popups_enabled(staff)
+    assert await live_events.claim_due_popups(staff) == []
+    assert await db.reminders.find_one({"user_id": staff.id, "is_fired": False})
+
+
+async def test_notification_hooks_publish_badge_changes():
+    admin = User(id=f"u-{uuid.uuid4().hex[:8]}", email="a@x.in", role="admin")
+    stream = live_events.pubsub.subscribe([live_events.user_channel(admin.id)])
+    wheel_feed = live_events.pubsub.subscribe([live_events.WHEEL_CHANNEL])
+
+    note = await notifications.create_notification(admin.id, "Task", "Please review", popup=True)
+    (event, doc), (_, delta) = _drain(stream)
+    assert (event, doc["id"], doc["title"], delta) == ("notification", note.id, "Task", {"delta": 1})
+    assert [(e, d["user_id"]) for e, d in _drain(wheel_feed)] == [("schedule", admin.id)]
+
+    # The popup is shown once, and showing it marks it read.
+    [item] = await live_events.claim_due_popups(admin)
+    assert item["id"] == note.id
+    assert _drain(stream) == [("unread", {"delta": -1})]
+
+    other = await notifications.create_notification(admin.id, "Leave", "Applied")
+    _drain(stream)
+    await notifications.mark_notification_read(other.id, admin)
+    assert _drain(stream) == [("unread", {"delta": -1})]
+    await notifications.mark_notification_read(other.id, admin)
+    assert _drain(stream) == []
+
+    await notifications.clear_all_notifications(admin)
+    assert _drain(stream) == [("unread", {"count": 0})]
@@ -0,0 +1,97 @@
+"""
+LLM gateway (backend/ai/llm_gateway.py): cache, coalescing, fallback,
+budgets and metrics, with the provider transports replaced by fakes.
+"""
+import asyncio
+
+import pytest
+
+from backend.ai import llm_gateway
+from backend.ai.llm_gateway import LLMError
+
+
+class FakeProvider:
+    def __init__(self, name, fail=None, delay=0.0):
+        self.name = name
+        self.fail = fail
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, model, prompt, system, images, json_mode, temperature, max_tokens, timeout):
+        self.calls.append(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise self.fail
+        return f"{self.name}:{prompt}", 1000, 500
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-gemini")
+    monkeypatch.setenv("GROQ_API_KEY", "test-groq")
+    monkeypatch.delenv("AI_PROVIDER", raising=False)
+    for name in ("LLM_CACHE_TTL", "LLM_GEMINI_RPM", "LLM_PRICES_JSON"):
+        monkeypatch.delenv(name, raising=False)
+    fakes = {"gemini": FakeProvider("gemini"), "groq": FakeProvider("groq")}
+    monkeypatch.setattr(llm_gateway, "_TRANSPORTS", fakes)
+    monkeypatch.setattr(llm_gateway, "_budgets", {})
+    monkeypatch.setattr(llm_gateway, "_metrics", {})
+    llm_gateway.clear_cache()
+    yield fakes
+    llm_gateway.clear_cache()
+
+
+async def test_normalised_prompts_share_a_cache_entry(providers):
+    first = await llm_gateway.generate("ocr", "Read  this\r\nreceipt ")
+    again = await llm_gateway.generate("ocr", "Read this\nreceipt")
+    assert first == again == "gemini:Read  this\r\nreceipt "
+    assert len(providers["gemini"].calls) == 1
+
+    await llm_gateway.generate("ocr", "Read this\nreceipt", cache_ttl=0)
+    assert len(providers["gemini"].calls) == 2
+
+    row = llm_gateway.get_metrics()["features"]["ocr"]
+    assert (row["requests"], row["cache_hits"]) == (3, 1)
+    assert row["tokens_in"] == 2000 and row["cost_usd"] > 0 and row["saved_cost_usd"] == row["cost_usd"] / 2
+
+
+async def test_identical_in_flight_requests_are_coalesced(providers):
+    providers["gemini"].delay = 0.05
+    results = await asyncio.gather(*(llm_gateway.generate("intent", "same") for _ in range(5)))
+    assert set(results) == {"gemini:same"}
+    assert len(providers["gemini"].calls) == 1
+    assert llm_gateway.get_metrics()["features"]["intent"]["coalesced"] == 4
+
+
+async def test_provider_failures_fall_back_once(providers):
+    providers["gemini"].fail = LLMError(429, "quota", provider="gemini", upstream_status=429)
+    assert await llm_gateway.generate("lead", "hello") == "groq:hello"
+    assert llm_gateway.get_metrics()["features"]["lead"]["fallbacks"] == 1
+
+    with pytest.raises(LLMError) as exc:
+        await llm_gateway.generate("lead", "no fallback", fallback=False)
+    assert exc.value.status_code == 429
+
+    # not a provider-side failure: the error is the caller's to see
+    providers["gemini"].fail = LLMError(403, "forbidden", provider="gemini")
+    with pytest.raises(LLMError) as exc:
+        await llm_gateway.generate("lead", "forbidden")
+    assert exc.value.status_code == 403 and providers["groq"].calls == ["hello"]
+
+
+async def test_groq_is_skipped_for_more_images_than_it_takes(providers):
+    providers["gemini"].fail = LLMError(422, "upstream", provider="gemini")
+    images = [("aGk=", "image/png")] * (llm_gateway.GROQ_MAX_IMAGES + 1)
+    with pytest.raises(LLMError):
+        await llm_gateway.generate("ocr", "scan", images=images)
+    assert providers["groq"].calls == []
+
+
+async def test_rpm_budget_fails_fast(providers, monkeypatch):
+    monkeypatch.setenv("LLM_GEMINI_RPM", "1")
+    monkeypatch.setenv("LLM_BUDGET_MAX_WAIT", "0")
+    await llm_gateway.generate("telegram", "one", fallback=False, cache_ttl=0)
+    with pytest.raises(LLMError) as exc:
+        await llm_gateway.generate("telegram", "two", fallback=False, cache_ttl=0)
+    assert exc.value.status_code == 429 and providers["gemini"].calls == ["one"]
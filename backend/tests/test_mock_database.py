@@ -0,0 +1,44 @@
+"""
+The in-memory MockDatabase (backend/dependencies.py) that tests and
+MONGO_URL-less runs use: bulk_write applies each pymongo op with the
+semantics of its single-op method, and array fields, sorts and set updates
+behave as in Mongo.
+"""
+import uuid
+
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateMany, UpdateOne
+
+
+async def test_bulk_write_many_ops_touch_every_match(db):
+    coll = db[f"bulk_{uuid.uuid4().hex[:8]}"]
+    await coll.insert_many([{"k": i, "group": i % 2, "seen": False} for i in range(6)])
+
+    res = await coll.bulk_write([
+        UpdateMany({"group": 0}, {"$set": {"seen": True}}),
+        UpdateOne({"group": 1}, {"$set": {"seen": True}}),
+        DeleteMany({"group": 0, "k": {"$gte": 2}}),
+        DeleteOne({"group": 1}),
+        InsertOne({"k": 6, "group": 0, "seen": False}),
+    ])
+    assert (res.matched_count, res.deleted_count, res.inserted_count) == (4, 3, 1)
+    assert sorted(d["k"] for d in await coll.find({}).to_list(None)) == [0, 3, 5, 6]
+    assert [d["k"] for d in await coll.find({"seen": True}).to_list(None)] == [0]
+
+    res = await coll.bulk_write([UpdateMany({"k": 99}, {"$set": {"seen": True}}, upsert=True)])
+    assert res.upserted_count == 1 and await coll.find_one({"k": 99})
+
+
+async def test_array_fields_sort_and_set_updates(db):
+    coll = db[f"arrays_{uuid.uuid4().hex[:8]}"]
+    await coll.insert_many([{"_id": "a", "n": 2, "tags": ["x"]}, {"_id": "b", "n": None, "tags": []},
+                            {"_id": "c", "n": 1, "tags": ["x", "y"]}])
+    assert [d["_id"] for d in await coll.find({"tags": "x"}).to_list(None)] == ["a", "c"]
+    assert [d["_id"] for d in await coll.find({"tags": {"$size": 0}}).to_list(None)] == ["b"]
+    assert [d["_id"] for d in await coll.find({"tags": {"$in": ["y"]}}).to_list(None)] == ["c"]
+    assert [d["_id"] for d in await coll.find({}).sort("n", 1).to_list(None)] == ["b", "c", "a"]
+    assert [d["_id"] for d in await coll.find({}).sort([("n", -1)]).to_list(None)] == ["a", "c", "b"]
+
+    await coll.update_one({"_id": "a"}, {"$addToSet": {"tags": {"$each": ["x", "z"]}}})
+    await coll.update_one({"_id": "c"}, {"$pull": {"tags": "x"}})
+    assert (await coll.find_one({"_id": "a"}))["tags"] == ["x", "z"]
+    assert (await coll.find_one({"_id": "c"}))["tags"] == ["y"]
@@ -0,0 +1,130 @@
+"""
+Party name index (backend/search/party_index.py): top-k scoring against the
+plain Jaccard scan it replaced, exact-key lookups, the change feed between
+workers and the compiled category rules.
+"""
+import random
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from backend.search import party_index
+from backend.search.party_index import PartyIndex, normalize_name
+
+
+def _scan(query, parties, k=5, min_score=0.3):
+    """Score every party the way the purchase matcher did before the index."""
+    norm = normalize_name(query)
+    q = set(norm.split())
+    scored = []
+    for seq, (pid, name) in enumerate(parties):
+        cn = normalize_name(name)
+        tokens = set(cn.split())
+        if not cn:
+            continue
+        score = len(q & tokens) / len(q | tokens)
+        if cn == norm:
+            score = 1.0
+        elif f" {norm} " in f" {cn} " or f" {cn} " in f" {norm} ":
+            score = max(score, 0.85)
+        if score >= min_score:
+            scored.append((score, -seq, pid))
+    return [pid for _, _, pid in sorted(scored, reverse=True)[:k]]
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(party_index, "_indexes", {})
+    monkeypatch.setattr(party_index, "_rules", {})
+
+
+def test_top_k_matches_a_full_scan():
+    rnd = random.Random(7)
+    words = "sharma tech solutions shree sai krishna infra global steel foods agro trading".split()
+    parties = [(f"p{i}", " ".join(rnd.sample(words, rnd.choice((1, 2, 3, 4)))) + rnd.choice((" Pvt Ltd", " LLP", "")))
+               for i in range(400)]
+    idx = PartyIndex("clients")
+    for pid, name in parties:
+        idx.put({"id": pid, "company_name": name})
+
+    for _ in range(200):
+        query = " ".join(rnd.sample(words + ["zenith"], rnd.choice((1, 2, 3, 4))))
+        for k, min_score in ((5, 0.3), (1, 0.75), (20, 0.1)):
+            got = [p["id"] for _, p in idx.top_k(query, k, min_score)]
+            assert got == _scan(query, parties, k, min_score), query
+
+
+def test_scores_and_updates():
+    idx = PartyIndex("clients")
+    idx.put({"id": "a", "company_name": "Sharma Tech Solutions Pvt Ltd"})
+    idx.put({"id": "b", "company_name": "Tech"})
+    idx.put({"id": "c", "company_name": "Desusharma Tech"})
+
+    top = {p["id"]: round(s, 2) for s, p in idx.top_k("SHARMA TECH SOLUTIONS LLP", min_score=0.2)}
+    assert top == {"a": 1.0, "b": 0.85, "c": 0.25}
+
+    idx.put({"id": "a", "company_name": "Verma Foods"})
+    assert [p["id"] for _, p in idx.top_k("sharma tech solutions", min_score=0.2)] == ["b", "c"]
+    idx.drop("b")
+    assert [p["id"] for _, p in idx.top_k("sharma tech solutions", min_score=0.2)] == ["c"]
+    assert [p["id"] for p in idx.all()] == ["a", "c"]
+    assert idx.top_k("") == [] and idx.top_k("Pvt Ltd") == []
+
+
+def test_company_key_lookups():
+    idx = PartyIndex("companies")
+    idx.put({"id": "x", "name": "Acme", "gstin": "27abcde1234f1z5", "email": "Books@Acme.in"})
+    idx.put({"id": "y", "name": "Acme Two", "gstin": "27ABCDE1234F1Z5"})
+    assert idx.lookup("gstin", " 27ABCDE1234F1Z5 ")["id"] == "x"
+    assert idx.lookup("email", "books@acme.in")["name"] == "Acme"
+    idx.drop("x")
+    assert idx.lookup("gstin", "27abcde1234f1z5")["id"] == "y"
+    assert idx.lookup("email", "books@acme.in") is None
+
+
+async def test_changes_reach_other_workers(db):
+    name = f"Zq{uuid.uuid4().hex[:6]} Logistics"
+    await db.clients.insert_one({"id": "zq-1", "company_name": name})
+    idx = await party_index.get_index("clients")
+    assert idx.top_k(name)[0][1]["id"] == "zq-1"
+
+    # Another worker renames the client and records the change.
+    await db.clients.update_one({"id": "zq-1"}, {"$set": {"company_name": "Renamed Movers"}})
+    await db.party_index_changes.insert_one(
+        {"kind": "clients", "ref_id": "zq-1", "at": datetime.now(timezone.utc)})
+    await party_index._refresh("clients")
+    assert idx.top_k(name) == []
+    assert idx.top_k("renamed movers")[0][1]["id"] == "zq-1"
+
+    # A local write applies at once.
+    await party_index.record_change("clients", {"id": "zq-1", "company_name": "Renamed Movers"}, None)
+    assert idx.top_k("renamed movers") == []
+
+    # A bulk write reloads the kind in full.
+    await party_index.mark_dirty("clients")
+    await party_index._refresh("clients")
+    assert party_index._indexes["clients"] is not idx
+    assert party_index._indexes["clients"].top_k("renamed movers")[0][1]["id"] == "zq-1"
+
+
+async def test_category_rules_are_compiled_once_and_invalidated(db):
+    defaults = [{"match": r"\bfuel|petrol\b", "account": "Fuel"}, {"match": "rent", "account": "Rent"}]
+    company_id = f"co-{uuid.uuid4().hex[:8]}"
+    compiled = await party_index.category_rules(company_id, defaults)
+    assert party_index.first_rule(compiled, "Office RENT March")["account"] == "Rent"
+    assert party_index.first_rule(compiled, "Petrol bill")["account"] == "Fuel"
+    assert party_index.first_rule(compiled, "Stationery") is None
+    assert await party_index.category_rules(company_id, defaults) is compiled
+
+    rule = {"company_id": company_id, "match": "stationery", "account": "Office Expenses"}
+    await db.zte_category_rules.insert_one(dict(rule))
+    await party_index.record_change("rules", None, rule)
+    compiled = await party_index.category_rules(company_id, defaults)
+    assert party_index.first_rule(compiled, "Stationery")["account"] == "Office Expenses"
+    assert party_index.first_rule(compiled, "Office rent") is None
+
+
+def test_invalid_rule_patterns_are_skipped():
+    compiled = party_index._compile_rules([{"match": "(unclosed"}, {"match": "gst", "account": "Taxes"}])
+    assert party_index.first_rule(compiled, "GST payment")["account"] == "Taxes"
@@ -0,0 +1,123 @@
+"""
+Bulk payslip generation (backend/salary_slip_router.py): block-reserved slip
+numbers, one insert for the whole run and PDF pre-rendering.
+"""
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("reportlab")
+
+from backend import salary_slip_router as slips
+
+
+@pytest.fixture(autouse=True)
+def thread_pool(monkeypatch):
+    # Render in threads: a spawned worker would need the app's full environment.
+    pool = ThreadPoolExecutor(2)
+    monkeypatch.setattr(slips, "_get_pdf_pool", lambda: pool)
+    yield
+    pool.shutdown()
+
+
+async def _seed_company(db, n_employees):
+    company_id = f"co-{uuid.uuid4().hex[:8]}"
+    await db.salary_manual_companies.insert_one({"id": company_id, "name": "Bench Co"})
+    key = f"manual:{company_id}"
+    await db.salary_employees.insert_many([{
+        "id": f"{company_id}-e{i}", "company_key": key, "name": f"Employee {i}", "status": "active",
+        "default_earnings": [{"label": "Basic", "amount": 20000 + i}],
+        "default_deductions": [{"label": "Professional Tax", "amount": 200}],
+    } for i in range(n_employees)])
+    return key
+
+
+async def test_concurrent_reservations_do_not_overlap(db):
+    year = 2091
+    await db.salary_slips.insert_one({"id": "old", "slip_year": year, "slip_no": f"PS-{year}-0041"})
+    blocks = await asyncio.gather(*(slips._reserve_slip_nos(year, 5) for _ in range(4)))
+    issued = [no for block in blocks for no in block]
+    assert len(set(issued)) == 20
+    assert min(issued) == f"PS-{year}-0042"
+    assert await slips._next_slip_no(year) == f"PS-{year}-0062"
+
+
+async def test_bulk_generate_reserves_one_block_per_year_and_inserts_once(db):
+    key = await _seed_company(db, 5)
+    body = slips.BulkGenerateBody(company_key=key, periods=[
+        {"month": 11, "year": 2092}, {"month": 12, "year": 2092}, {"month": 1, "year": 2093},
+    ])
+    user = SimpleNamespace(id="tester")
+
+    calls = {"inc": 0, "insert_many": 0, "insert_one": 0}
+    originals = {
+        "find_one_and_update": db.counters.find_one_and_update,
+        "insert_many": db.salary_slips.insert_many,
+        "insert_one": db.salary_slips.insert_one,
+    }
+
+    async def counting_inc(*args, **kwargs):
+        calls["inc"] += 1
+        return await originals["find_one_and_update"](*args, **kwargs)
+
+    async def counting_insert_many(*args, **kwargs):
+        calls["insert_many"] += 1
+        return await originals["insert_many"](*args, **kwargs)
+
+    async def counting_insert_one(*args, **kwargs):
+        calls["insert_one"] += 1
+        return await originals["insert_one"](*args, **kwargs)
+
+    db.counters.find_one_and_update = counting_inc
+    db.salary_slips.insert_many = counting_insert_many
+    db.salary_slips.insert_one = counting_insert_one
+    try:
+        result = await slips.bulk_generate_slips(body, current_user=user)
+    finally:
+        del db.counters.find_one_and_update
+        del db.salary_slips.insert_many
+        del db.salary_slips.insert_one
+
+    assert (result["generated_count"], result["skipped_count"]) == (15, 0)
+    assert calls == {"inc": 2, "insert_many": 1, "insert_one": 0}
+    numbers = sorted(s["slip_no"] for s in result["generated"] if s["slip_year"] == 2092)
+    assert numbers == [f"PS-2092-{n:04d}" for n in range(1, 11)]
+
+    again = await slips.bulk_generate_slips(body, current_user=user)
+    assert (again["generated_count"], again["skipped_count"]) == (0, 15)
+
+
+async def test_pending_pdfs_are_rendered_and_reused(db):
+    key = await _seed_company(db, 3)
+    body = slips.BulkGenerateBody(company_key=key, month=6, year=2094)
+    result = await slips.bulk_generate_slips(body, current_user=SimpleNamespace(id="tester"))
+    ids = [s["id"] for s in result["generated"]]
+
+    assert await slips.render_pending_slip_pdfs() >= 3
+    assert not await db.salary_slips.find({"id": {"$in": ids}, "pdf_pending": True}).to_list(None)
+    stored = await db.salary_slip_pdfs.find({"_id": {"$in": ids}}).to_list(None)
+    assert len(stored) == 3 and all(d["pdf"].startswith(b"%PDF") for d in stored)
+
+    slip_docs = await db.salary_slips.find({"id": {"$in": ids}}).to_list(None)
+    rendered = []
+    original = slips._render_in_pool
+
+    async def recording(batch):
+        rendered.extend(s["id"] for s in batch)
+        return await original(batch)
+
+    slips._render_in_pool = recording
+    try:
+        pdfs = await slips._slip_pdfs(slip_docs)
+        assert rendered == [] and set(pdfs) == set(ids)
+
+        # An edited slip is rendered again.
+        await db.salary_slips.update_one({"id": ids[0]}, {"$set": {"updated_at": "later"}})
+        edited = await db.salary_slips.find_one({"id": ids[0]})
+        await slips._slip_pdfs([edited])
+        assert rendered == [ids[0]]
+    finally:
+        slips._render_in_pool = original
@@ -0,0 +1,69 @@
+"""
+n-gram search index (backend/search/search_index.py), served from the
+in-memory copy so the Mongo-only operators ($all, aggregate) are not needed.
+"""
+import uuid
+
+import pytest
+
+from backend.search import search_index
+
+
+def _client(name, **fields):
+    return {"id": f"cl-{uuid.uuid4().hex[:8]}", "company_name": name, **fields}
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    mem = search_index._MemoryIndex()
+    monkeypatch.setattr(search_index, "_memory", mem)
+    monkeypatch.setattr(search_index, "_memory_index", lambda: mem)
+    return mem
+
+
+async def _build(db, memory, clients):
+    await db.clients.insert_many(clients)
+    await search_index.rebuild("clients")
+    await search_index._fill(memory, {})
+
+
+async def test_prefix_and_typo_lookup(db, memory):
+    textiles = _client("Zephyrine Textiles", city="Surat")
+    foods = _client("Zephyrine Foods", city="Pune")
+    await _build(db, memory, [textiles, foods])
+
+    hits = await search_index.search("client", "zephy tex")
+    assert [h["ref_id"] for h in hits] == [textiles["id"]]
+    # non-title fields match after title matches
+    assert {h["ref_id"] for h in await search_index.search("client", "zephyrine surat")} == {textiles["id"]}
+    # one transposition is forgiven
+    assert foods["id"] in {h["ref_id"] for h in await search_index.search("client", "zephyrnie foods")}
+    # a single-letter query cannot use the index
+    assert await search_index.search("client", "z") is None
+
+
+async def test_record_change_reindexes_one_client(db, memory):
+    client = _client("Quillane Exports")
+    await _build(db, memory, [client])
+    renamed = {**client, "company_name": "Quillane Imports"}
+    await search_index.record_change("clients", client, renamed)
+    assert [h["title"] for h in await search_index.search("client", "quillane")] == ["Quillane Imports"]
+    await search_index.record_change("clients", renamed, None)
+    assert await search_index.search("client", "quillane") == []
+
+
+async def test_scoped_search_widens_until_enough_visible_hits(db, memory):
+    clients = [_client(f"Quorvex {i:02d}") for i in range(1, 13)]
+    await _build(db, memory, clients)
+    visible_id = clients[10]["id"]  # "Quorvex 11", ranked near the end
+    batches = []
+
+    async def allowed(ref_ids):
+        batches.append(list(ref_ids))
+        return [r for r in ref_ids if r == visible_id]
+
+    hits = await search_index.search_scoped("client", "quorvex", 1, allowed)
+    assert [h["ref_id"] for h in hits] == [visible_id]
+    # the second window only asks about ids the first did not cover
+    assert len(batches) == 2 and not set(batches[0]) & set(batches[1])
+    assert sum(len(b) for b in batches) == 12
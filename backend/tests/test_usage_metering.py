@@ -0,0 +1,145 @@
+"""
+Write-behind usage metering (backend/licensing/usage_meter.py): increments
+coalesce into one flush, log rows are batched, failed flushes are re-queued
+and shutdown drains the buffers.
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from backend.licensing import usage_meter
+from backend.licensing.usage_tracker import UsageTracker
+from backend.platform.api_gateway import APIGateway
+
+
+@pytest.fixture(autouse=True)
+def clean_meter():
+    usage_meter._pending.clear()
+    usage_meter._pending_logs.clear()
+    usage_meter._stored.clear()
+    yield
+    usage_meter._pending.clear()
+    usage_meter._pending_logs.clear()
+
+
+def _tenant():
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+async def _stored_value(db, tenant_id, metric):
+    doc = await db.customer_usage.find_one({"tenant_id": tenant_id, "metric": metric})
+    return (doc or {}).get("value", 0)
+
+
+async def test_increments_coalesce_into_one_write(db):
+    tenant = _tenant()
+    calls = []
+    original = db.customer_usage.bulk_write
+
+    async def counting_bulk_write(ops, *args, **kwargs):
+        calls.append(len(ops))
+        return await original(ops, *args, **kwargs)
+
+    db.customer_usage.bulk_write = counting_bulk_write
+    try:
+        for _ in range(250):
+            await APIGateway.log_api_call(tenant, "/v1/invoices", "GET", 200, 12.5)
+        usage_meter.increment(tenant, "storage_bytes", 4096)
+        assert await _stored_value(db, tenant, "api_calls") == 0  # nothing written yet
+        await usage_meter.flush()
+    finally:
+        del db.customer_usage.bulk_write
+    assert calls == [2]
+    assert await _stored_value(db, tenant, "api_calls") == 250
+    assert await _stored_value(db, tenant, "storage_bytes") == 4096
+    assert len(await db.api_usage.find({"tenant_id": tenant}).to_list(None)) == 250
+
+
+async def test_reads_include_unflushed_increments(db):
+    tenant = _tenant()
+    await db.customer_usage.insert_one({"tenant_id": tenant, "metric": "email_attachments_scanned", "value": 10})
+    assert await UsageTracker.track_metric_usage(tenant, "email_attachments_scanned", 1) == 11
+    assert await UsageTracker.track_metric_usage(tenant, "email_attachments_scanned", 2) == 13
+    assert usage_meter.peek(tenant, "email_attachments_scanned") == 13
+    assert (await UsageTracker.get_monthly_usage(tenant))["email_attachments_scanned"] == 13
+    metrics = await APIGateway.get_api_usage_metrics(tenant)
+    assert metrics["total_calls"] == 0
+    await usage_meter.flush()
+    assert await _stored_value(db, tenant, "email_attachments_scanned") == 13
+    assert usage_meter.peek(tenant, "email_attachments_scanned") == 13
+
+
+async def test_a_refresh_overlapping_a_flush_does_not_double_count(db):
+    tenant = _tenant()
+    await db.customer_usage.insert_one({"tenant_id": tenant, "metric": "api_calls", "value": 10})
+    assert await usage_meter.value(tenant, "api_calls") == 10
+    usage_meter.increment(tenant, "api_calls", 5)
+
+    written = asyncio.Event()
+    find_one, bulk_write = db.customer_usage.find_one, db.customer_usage.bulk_write
+
+    async def read_after_the_write(query, *args, **kwargs):
+        if args:  # the meter's projected read, not the write's own lookup
+            await written.wait()
+        return await find_one(query, *args, **kwargs)
+
+    async def write(*args, **kwargs):
+        result = await bulk_write(*args, **kwargs)
+        written.set()
+        await refresh  # the refresh reads the new total before the write is acknowledged
+        return result
+
+    db.customer_usage.find_one = read_after_the_write
+    db.customer_usage.bulk_write = write
+    try:
+        refresh = asyncio.ensure_future(usage_meter._refresh((tenant, "api_calls")))
+        await asyncio.sleep(0)
+        await usage_meter.flush()
+    finally:
+        del db.customer_usage.find_one
+        del db.customer_usage.bulk_write
+    assert await _stored_value(db, tenant, "api_calls") == 15
+    assert usage_meter.peek(tenant, "api_calls") == 15
+
+
+async def test_failed_flush_is_requeued(db):
+    tenant = _tenant()
+    async def failing(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+
+    usage_meter.increment(tenant, "api_calls", 5)
+    usage_meter.log("api_usage", {"id": "row-1", "tenant_id": tenant})
+    db.customer_usage.bulk_write = failing
+    db.api_usage.insert_many = failing
+    try:
+        await usage_meter.flush()
+    finally:
+        del db.customer_usage.bulk_write
+        del db.api_usage.insert_many
+    assert await _stored_value(db, tenant, "api_calls") == 0
+    assert usage_meter.pending_for(tenant) == {"api_calls": 5}
+
+    usage_meter.increment(tenant, "api_calls", 1)
+    await usage_meter.flush()
+    assert await _stored_value(db, tenant, "api_calls") == 6
+    assert await db.api_usage.find_one({"id": "row-1"}) is not None
+    assert usage_meter.pending_for(tenant) == {}
+
+
+def test_log_buffer_is_bounded(monkeypatch):
+    monkeypatch.setattr(usage_meter, "MAX_BUFFERED_LOGS", 3)
+    dropped = usage_meter.stats()["dropped_logs"]
+    for i in range(5):
+        usage_meter.log("api_usage", {"id": f"bounded-{i}"})
+    assert [r["id"] for r in usage_meter._pending_logs["api_usage"]] == ["bounded-2", "bounded-3", "bounded-4"]
+    assert usage_meter.stats()["dropped_logs"] == dropped + 2
+
+
+async def test_stop_flushes_pending_usage(db):
+    tenant = _tenant()
+    usage_meter.start_flush_loop()
+    usage_meter.increment(tenant, "copilot_tokens", 700)
+    await usage_meter.stop()
+    assert await _stored_value(db, tenant, "copilot_tokens") == 700
+    assert usage_meter.stats()["pending_counters"] == 0
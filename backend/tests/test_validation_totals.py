@@ -0,0 +1,146 @@
+"""
+Running totals behind the reconciliation validator (backend/validation_totals.py):
+per-document contributions, incremental syncs from the change feed, the
+count safety net for unreported writes and the full audit.
+"""
+import uuid
+
+from backend import validation_totals as vt
+
+
+def test_invoice_contribution():
+    inv = {"company_id": "co", "invoice_type": "tax_invoice", "status": "sent", "invoice_number": "INV-1",
+           "grand_total": 118.0, "amount_paid": 18.0, "amount_due": 100.0, "total_gst": 18.0}
+    assert vt.invoice_contribution(inv) == {"company_id": "co", "revenue": 118.0, "collections": 18.0,
+                                            "outstanding": 100.0, "gst_sales": 118.0}
+    assert vt.invoice_contribution({**inv, "status": "cancelled"}) == {"company_id": "co"}
+    assert vt.invoice_contribution({**inv, "invoice_type": "proforma"}) == {"company_id": "co"}
+    assert vt.invoice_contribution({**inv, "total_gst": 0, "gst_type": "Export"})["export_sales"] == 118.0
+
+    off = vt.invoice_contribution({**inv, "amount_due": 90.0})
+    assert (off["diff"], off["abs_diff"], off["invoice_number"]) == (10.0, 10.0, "INV-1")
+
+
+async def _book(db):
+    company_id = f"co-{uuid.uuid4().hex[:8]}"
+    for aid, code in (("ar", "1100"), ("sales", "4000"), ("bank", "1010")):
+        await db.chart_of_accounts.update_one(
+            {"id": f"{aid}-{company_id}"}, {"$set": {"id": f"{aid}-{company_id}", "code": code}}, upsert=True)
+    return company_id
+
+
+async def _invoice(db, company_id, grand, paid, **extra):
+    inv = {"id": f"inv-{uuid.uuid4().hex[:8]}", "company_id": company_id, "invoice_type": "tax_invoice",
+           "status": "sent", "grand_total": grand, "amount_paid": paid, "amount_due": grand - paid,
+           "client_name": "Acme", **extra}
+    await db.invoices.insert_one(dict(inv))
+    return inv
+
+
+async def _entry(db, company_id, amount, source="sale", source_id=None):
+    eid = f"je-{uuid.uuid4().hex[:8]}"
+    await db.journal_entries.insert_one({"id": eid, "company_id": company_id, "source": source,
+                                         "source_id": source_id, "entry_date": "2024-05-01"})
+    for account, debit, credit in (("ar", amount, 0.0), ("sales", 0.0, amount)):
+        await db.journal_lines.insert_one({"entry_id": eid, "company_id": company_id,
+                                           "account_id": f"{account}-{company_id}", "debit": debit, "credit": credit})
+    return eid
+
+
+async def test_sync_folds_only_noted_changes(db):
+    book = await _book(db)
+    inv = await _invoice(db, book, 100.0, 40.0)
+    eid = await _entry(db, book, 100.0, source_id=inv["id"])
+    state = await vt.sync_book(book)      # first sync audits
+    assert (state["revenue"], state["outstanding"], state["ar"], state["customer_ledger"]) == (100.0, 60.0, 100.0, 100.0)
+    assert state["n_invoice"] == 1 and state["n_entry"] == 1
+
+    await db.invoices.update_one({"id": inv["id"]}, {"$set": {"amount_paid": 100.0, "amount_due": 0.0}})
+    await vt.note_changed("invoice", [inv["id"]], book)
+    await db.journal_lines.delete_many({"entry_id": eid})
+    await db.journal_entries.delete_one({"id": eid})
+    await vt.note_changed("entry", [eid])   # company unknown
+    state = await vt.sync_book(book)
+    assert state["examined"] >= 2
+    assert (state["collections"], state["outstanding"], state["n_entry"]) == (100.0, 0.0, 0)
+    assert state["ar"] == 0.0 and state["debit"] == 0.0
+
+    # Re-examining unchanged documents (the watermark overlap) is a no-op.
+    assert await vt.reexamine("invoice", [inv["id"]]) == 0
+    assert await vt.reexamine("entry", [eid]) == 0
+    assert (await vt.sync_book(book))["revenue"] == 100.0
+
+
+async def test_unreported_writes_are_caught_by_counts(db):
+    book = await _book(db)
+    await _invoice(db, book, 50.0, 0.0)
+    await vt.sync_book(book)
+    # A bulk import that does not call note_changed.
+    await _invoice(db, book, 70.0, 0.0)
+    await _entry(db, book, 70.0, source="import")
+    state = await vt.sync_book(book)
+    assert (state["revenue"], state["sales"], state["n_invoice"]) == (120.0, -70.0, 2)
+
+
+async def test_audit_rebuilds_and_reports_drift(db):
+    book = await _book(db)
+    inv = await _invoice(db, book, 100.0, 0.0)
+    await vt.sync_book(book)
+    # An update no hook reported: the running totals are stale...
+    await db.invoices.update_one({"id": inv["id"]}, {"$set": {"grand_total": 150.0, "amount_due": 150.0}})
+    assert (await vt.sync_book(book))["revenue"] == 100.0
+    # ...until the audit rebuilds them.
+    state = await vt.audit_book(book)
+    assert state["revenue"] == 150.0 and state["audit_drift"]["revenue"] == -50.0
+
+
+async def test_lines_of_a_missing_entry_still_count(db):
+    book = await _book(db)
+    eid = await _entry(db, book, 40.0, source="manual")
+    gone = await _entry(db, book, 60.0, source="manual")
+    await db.journal_entries.delete_one({"id": gone})  # lines left behind, as trial_balance still sees them
+    state = await vt.audit_book(book)
+    assert (state["debit"], state["credit"], state["n_entry"], state["n_orphan"]) == (100.0, 100.0, 1, 1)
+
+    await db.journal_entries.delete_one({"id": eid})
+    await vt.note_changed("entry", [eid], book)
+    state = await vt.sync_book(book)
+    assert (state["debit"], state["n_entry"], state["n_orphan"]) == (100.0, 0, 2)
+
+    await db.journal_lines.delete_many({"entry_id": {"$in": [eid, gone]}})
+    await vt.note_changed("entry", [eid, gone], book)
+    state = await vt.sync_book(book)
+    assert (state["debit"], state["n_orphan"]) == (0.0, 0)
+    # a second audit replaces the contributions in place
+    assert (await vt.audit_book(book))["examined"] == 0
+
+
+async def test_culprits_come_from_contributions(db):
+    book = await _book(db)
+    await _invoice(db, book, 100.0, 0.0)
+    bad = await _invoice(db, book, 100.0, 10.0, amount_due=80.0, invoice_number="INV-9")
+    worse = await _invoice(db, book, 200.0, 0.0, amount_due=150.0)
+    manual = await _entry(db, book, 30.0, source="manual")
+    await _entry(db, book, 100.0, source_id=bad["id"])
+    await vt.sync_book(book)
+
+    culprits = {c["id"]: c["diff"] for c in await vt.revenue_culprits(book)}
+    assert culprits == {worse["id"]: 50.0, bad["id"]: 10.0}
+    assert [(c["entry_id"], c["net_amount"]) for c in await vt.manual_entries(book, "ar", ("sale", "payment"))] \
+        == [(manual, 30.0)]
+
+
+async def test_default_book_sums_every_book(db, monkeypatch):
+    book = await _book(db)
+    other = f"co-{uuid.uuid4().hex[:8]}"
+
+    async def books():
+        return [book, other]
+
+    monkeypatch.setattr("backend.accounting_core._all_book_ids", books)
+    await _invoice(db, book, 100.0, 0.0)
+    await _invoice(db, other, 25.0, 25.0)
+    mine = await vt.book_totals(book)
+    everything = await vt.book_totals("")
+    assert mine["revenue"] == 100.0
+    assert everything["revenue"] >= 125.0 and everything["collections"] >= 25.0
@@ -0,0 +1,521 @@
+"""
+validation_totals.py
+────────────────────────────────────────────────────────────────────────────────
+Running totals behind the reconciliation validator
+(backend/accounting_ai/reconciliation_validator.py).
+
+The validator used to load every invoice of a book twice and its journal
+lines four times (over a million documents per book) on every run, and
+trial-balance views trigger a run. Instead each invoice and journal entry
+has a stored contribution, and each book the sums of them:
+
+  validation_contrib  _id "invoice:<id>" | "entry:<id>" | "orphan:<entry id>",
+                      kind, ref_id,
+                      company_id, v (bumped on every change) and what the
+                      document adds to its book: revenue / collections /
+                      outstanding / <bucket>_sales for a live tax invoice,
+                      debit / credit / ar / sales / bank / customer_ledger
+                      for an entry — plus what culprit reports need
+                      (abs_diff of an invoice whose grand_total is not
+                      amount_paid + amount_due; source of an entry).
+  validation_totals   _id = company_id ("" = default book): the sums,
+                      n_invoice / n_entry, watermark, clean_at, audited_at.
+  validation_changes  {kind, ref_id, company_id, at}: ids written since,
+                      kept CHANGE_RETENTION_SEC.
+
+Invoice and journal write sites call `note_changed(kind, ids, company_id)`
+after writing. `sync_book()` re-examines only the documents noted since
+the book's watermark: it recomputes their contribution, swaps it in
+(guarded by `v`, so two workers never apply the same change twice) and
+`$inc`s the difference into the totals. Re-examining an unchanged document
+is a no-op, so overlapping watermarks are harmless. As a safety net for
+write sites that do not report (bulk imports, scripts), the book's invoice
+and entry counts — index-only `count_documents` — are compared with the
+number of contributions, and on a mismatch the ids are diffed and the
+missing or extra ones re-examined. Updates the hooks miss are caught by
+`audit_book()`, the full rescan, which rebuilds every contribution and
+logs how far the running totals had drifted; the validator runs it on
+demand (audit mode) and the job runner daily.
+
+Lines whose entry no longer exists still count, as they do in
+accounting_core.trial_balance: per missing entry they form an "orphan"
+contribution with the entry fields (debit / credit / ar / ...), counted in
+n_orphan. An entry's orphan contribution is re-examined along with the
+entry. The default book ("") reported the
+union of every book and still does: its figures are the sum of every
+book's totals.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pymongo import ReplaceOne
+
+from backend.dependencies import db
+from backend.index_manifest import ensure_indexes, index
+
+logger = logging.getLogger("validation_totals")
+
+TOLERANCE = 0.05             # rupees — floating point / rounding slack
+CHANGE_RETENTION_SEC = 7 * 86400
+BATCH = 500
+AR_CODE, SALES_CODE, BANK_CODE = "1100", "4000", "1010"
+CUSTOMER_SOURCES = ("sale", "payment")
+
+INVOICE_FIELDS = ("revenue", "collections", "outstanding",
+                  "gst_sales", "non_gst_sales", "export_sales", "exempt_sales")
+ENTRY_FIELDS = ("debit", "credit", "ar", "sales", "bank", "customer_ledger")
+SUM_FIELDS = {"invoice": INVOICE_FIELDS, "entry": ENTRY_FIELDS, "orphan": ENTRY_FIELDS}
+KINDS = ("invoice", "entry")
+ORPHAN = "orphan"            # lines of a missing entry; re-examined with the entry
+_COLLECTIONS = {"invoice": "invoices", "entry": "journal_entries"}
+
+_INVOICE_PROJECTION = {"_id": 0, "id": 1, "company_id": 1, "invoice_type": 1, "status": 1,
+                       "invoice_number": 1, "client_name": 1, "grand_total": 1, "amount_paid": 1,
+                       "amount_due": 1, "total_gst": 1, "is_gst_invoice": 1, "invoice_category": 1,
+                       "gst_type": 1}
+_ENTRY_PROJECTION = {"_id": 0, "id": 1, "company_id": 1, "entry_date": 1, "narration": 1,
+                     "source": 1, "source_id": 1}
+
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _round2(v: Any) -> float:
+    return round(float(v or 0), 2)
+
+
+def _key(kind: str, ref_id: str) -> str:
+    return f"{kind}:{ref_id}"
+
+
+def _book(doc: Dict[str, Any]) -> str:
+    return doc.get("company_id") or ""
+
+
+def _book_q(company_id: str) -> Dict[str, Any]:
+    return {"company_id": company_id} if company_id else {"company_id": {"$in": ["", None]}}
+
+
+def _chunks(items: List[Any], size: int = BATCH):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WRITE PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def note_changed(kind: str, ids: Iterable[Optional[str]], company_id: Optional[str] = None):
+    """
+    Record that invoices (kind "invoice") or journal entries ("entry") were
+    inserted, updated or deleted. company_id None when the caller does not
+    know it: every book's next sync looks at those. Never raises.
+    """
+    try:
+        now = datetime.now(timezone.utc)
+        docs = [{"kind": kind, "ref_id": i, "company_id": company_id, "at": now}
+                for i in dict.fromkeys(ids) if i]
+        if docs:
+            await db.validation_changes.insert_many(docs, ordered=False)
+    except Exception as e:
+        logger.warning(f"Validation change note for {kind} failed (the daily audit will catch it): {e}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CONTRIBUTIONS
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _sales_bucket(inv: Dict[str, Any]) -> str:
+    # An invoice is a GST invoice if it actually carries GST value or is
+    # explicitly flagged as one; export/exempt are called out separately
+    # where the data marks them, everything else is "domestic non-GST".
+    gst_type = (inv.get("gst_type") or inv.get("invoice_category") or "").lower()
+    if "export" in gst_type:
+        return "export"
+    if "exempt" in gst_type:
+        return "exempt"
+    if inv.get("is_gst_invoice") or _round2(inv.get("total_gst")) > 0:
+        return "gst"
+    return "non_gst"
+
+
+def invoice_contribution(inv: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Revenue / Collections / Outstanding straight from the invoice's own
+    grand_total / amount_paid / amount_due (never re-derived from workflow
+    status); cancelled and non-tax invoices add nothing, matching
+    invoicing.invoice_stats().
+    """
+    c: Dict[str, Any] = {"company_id": _book(inv)}
+    if inv.get("invoice_type") != "tax_invoice" or inv.get("status") == "cancelled":
+        return c
+    grand, paid, due = _round2(inv.get("grand_total")), _round2(inv.get("amount_paid")), _round2(inv.get("amount_due"))
+    c.update({"revenue": grand, "collections": paid, "outstanding": max(0.0, due),
+              f"{_sales_bucket(inv)}_sales": grand})
+    diff = _round2(grand - (paid + due))
+    if abs(diff) > TOLERANCE:
+        c.update({"diff": diff, "abs_diff": abs(diff),
+                  "invoice_number": inv.get("invoice_number") or "(no number)",
+                  "client_name": inv.get("client_name") or "",
+                  "grand_total": grand, "amount_paid": paid, "amount_due": due})
+    return c
+
+
+async def _account_codes(account_ids: Set[str]) -> Dict[str, str]:
+    codes: Dict[str, str] = {}
+    for chunk in _chunks(list(account_ids), 2000):
+        async for a in db.chart_of_accounts.find(
+                {"id": {"$in": chunk}, "code": {"$in": [AR_CODE, SALES_CODE, BANK_CODE]}},
+                {"_id": 0, "id": 1, "code": 1}):
+            codes[a["id"]] = a["code"]
+    return codes
+
+
+async def _named_sources(source_ids: Set[str]) -> Set[str]:
+    """Invoice / payment ids that carry a client_name (Customer Ledger can attribute them)."""
+    named: Set[str] = set()
+    for chunk in _chunks(list(source_ids), 2000):
+        for collection in (db.invoices, db.payments):
+            async for d in collection.find({"id": {"$in": chunk}}, {"_id": 0, "id": 1, "client_name": 1}):
+                if d.get("client_name"):
+                    named.add(d["id"])
+    return named
+
+
+async def entry_contributions(entries: List[Dict[str, Any]],
+                              moves: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Contribution of each entry from its lines' totals per account
+    (`moves[entry_id][account_id] = {"debit", "credit"}`): trial balance
+    debit / credit, and the net on Accounts Receivable (1100), Sales (4000)
+    and Bank Accounts (1010). `customer_ledger` is the AR net of a sale /
+    payment entry whose invoice or payment names a client.
+    """
+    codes = await _account_codes({aid for m in moves.values() for aid in m})
+    out: Dict[str, Dict[str, Any]] = {}
+    for e in entries:
+        net = defaultdict(float)
+        debit = credit = 0.0
+        for aid, t in moves.get(e["id"], {}).items():
+            debit += t["debit"]
+            credit += t["credit"]
+            code = codes.get(aid)
+            if code:
+                net[code] += t["debit"] - t["credit"]
+        out[e["id"]] = {
+            "company_id": _book(e), "debit": debit, "credit": credit,
+            "ar": net[AR_CODE], "sales": net[SALES_CODE], "bank": net[BANK_CODE],
+            "source": e.get("source") or "manual", "source_id": e.get("source_id"),
+            "entry_date": e.get("entry_date"), "narration": (e.get("narration") or "")[:200],
+        }
+    sourced = {c["source_id"] for c in out.values()
+               if c["source"] in CUSTOMER_SOURCES and c["source_id"] and abs(c["ar"]) > 1e-9}
+    named = await _named_sources(sourced) if sourced else set()
+    for c in out.values():
+        c["customer_ledger"] = c["ar"] if c["source"] in CUSTOMER_SOURCES and c["source_id"] in named else 0.0
+    return out
+
+
+_LINE_PROJECTION = {"_id": 0, "entry_id": 1, "account_id": 1, "debit": 1, "credit": 1, "company_id": 1}
+
+
+def _add_line(moves: Dict[str, Dict[str, Dict[str, float]]], books: Dict[str, str], l: Dict[str, Any]):
+    t = moves[l["entry_id"]].setdefault(l["account_id"], {"debit": 0.0, "credit": 0.0})
+    t["debit"] += l.get("debit") or 0
+    t["credit"] += l.get("credit") or 0
+    books[l["entry_id"]] = _book(l)
+
+
+async def _line_moves(entry_ids: List[str], books: Optional[Dict[str, str]] = None
+                      ) -> Dict[str, Dict[str, Dict[str, float]]]:
+    moves: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(dict)
+    books = {} if books is None else books
+    async for l in db.journal_lines.find({"entry_id": {"$in": entry_ids}}, _LINE_PROJECTION):
+        _add_line(moves, books, l)
+    return moves
+
+
+async def _orphan_contributions(moves: Dict[str, Dict[str, Dict[str, float]]],
+                                books: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Contributions of lines whose entry is gone, one per missing entry id."""
+    return await entry_contributions(
+        [{"id": eid, "company_id": books.get(eid, ""), "source": ORPHAN} for eid in moves], moves)
+
+
+async def _current(kind: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fresh contributions of the given ids; ids that no longer exist are absent."""
+    if kind == "invoice":
+        return {inv["id"]: invoice_contribution(inv) for inv in
+                await db.invoices.find({"id": {"$in": ids}}, _INVOICE_PROJECTION).to_list(None)}
+    entries = await db.journal_entries.find({"id": {"$in": ids}}, _ENTRY_PROJECTION).to_list(None)
+    if kind == ORPHAN:
+        live = {e["id"] for e in entries}
+        books: Dict[str, str] = {}
+        moves = await _line_moves([i for i in ids if i not in live], books)
+        return await _orphan_contributions(moves, books)
+    return await entry_contributions(entries, await _line_moves([e["id"] for e in entries]))
+
+
+def _delta(totals: Dict[str, Dict[str, float]], kind: str, contrib: Dict[str, Any], sign: int):
+    t = totals[contrib.get("company_id") or ""]
+    t[f"n_{kind}"] = t.get(f"n_{kind}", 0) + sign
+    for f in SUM_FIELDS[kind]:
+        if contrib.get(f):
+            t[f] = t.get(f, 0.0) + sign * contrib[f]
+
+
+def _same(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> bool:
+    if old is None or new is None:
+        return old is new
+    return all(old.get(f) == v for f, v in new.items()) and \
+        not any(f not in new for f in old if f not in ("_id", "kind", "ref_id", "v"))
+
+
+async def reexamine(kind: str, ids: Iterable[str]) -> int:
+    """
+    Bring the contributions of `ids` up to date and fold the difference into
+    the totals of the books involved. Returns how many changed.
+    """
+    changed = 0
+    for chunk in _chunks(list(dict.fromkeys(ids))):
+        old = {d["ref_id"]: d for d in await db.validation_contrib.find(
+            {"_id": {"$in": [_key(kind, i) for i in chunk]}}).to_list(None)}
+        new = await _current(kind, chunk)
+        totals: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for ref_id in chunk:
+            o, n = old.get(ref_id), new.get(ref_id)
+            if _same(o, n):
+                continue
+            key = _key(kind, ref_id)
+            if o is None:
+                res = await db.validation_contrib.update_one(
+                    {"_id": key}, {"$setOnInsert": {"kind": kind, "ref_id": ref_id, "v": 1, **n}}, upsert=True)
+                applied = res.upserted_id is not None
+            elif n is None:
+                applied = (await db.validation_contrib.delete_one({"_id": key, "v": o["v"]})).deleted_count > 0
+            else:
+                gone = {f: "" for f in o if f not in n and f not in ("_id", "kind", "ref_id", "v")}
+                update = {"$set": n, "$inc": {"v": 1}}
+                if gone:
+                    update["$unset"] = gone
+                applied = (await db.validation_contrib.update_one({"_id": key, "v": o["v"]}, update)).modified_count > 0
+            if not applied:
+                continue  # another worker swapped it in first
+            changed += 1
+            if o is not None:
+                _delta(totals, kind, o, -1)
+            if n is not None:
+                _delta(totals, kind, n, +1)
+        for book, inc in totals.items():
+            await db.validation_totals.update_one({"_id": book}, {"$inc": inc}, upsert=True)
+    return changed
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SYNC / AUDIT
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def _id_diff(kind: str, company_id: str) -> Set[str]:
+    """Ids present in the collection or among the contributions but not both (index-only reads)."""
+    live = {d["id"] async for d in db[_COLLECTIONS[kind]].find(_book_q(company_id), {"_id": 0, "id": 1})}
+    stored = {d["ref_id"] async for d in db.validation_contrib.find(
+        {"kind": kind, **_book_q(company_id)}, {"_id": 0, "ref_id": 1})}
+    return live ^ stored
+
+
+async def sync_book(company_id: str) -> Dict[str, Any]:
+    """
+    Fold the documents written since the book's watermark into its totals
+    and return the totals document (with `examined`, the number of
+    documents re-examined). Audits the book instead when it has never been
+    built or its watermark is older than the change feed.
+    """
+    lock = _locks.setdefault(company_id, asyncio.Lock())
+    async with lock:
+        state = await db.validation_totals.find_one({"_id": company_id})
+        watermark = (state or {}).get("watermark")
+        if watermark is not None and watermark.tzinfo is None:
+            watermark = watermark.replace(tzinfo=timezone.utc)
+        started = datetime.now(timezone.utc)
+        if watermark is None or watermark < started - timedelta(seconds=CHANGE_RETENTION_SEC - 3600):
+            return await _audit_book(company_id)
+
+        changes = await db.validation_changes.find(
+            {"at": {"$gte": watermark}, "company_id": {"$in": [company_id, None]}},
+            {"_id": 0, "kind": 1, "ref_id": 1, "company_id": 1},
+        ).to_list(None)
+        pending: Dict[str, Set[str]] = {k: set() for k in KINDS}
+        unowned: Dict[str, Set[str]] = {k: set() for k in KINDS}
+        for c in changes:
+            if c.get("kind") in pending:
+                (unowned if c.get("company_id") is None else pending)[c["kind"]].add(c["ref_id"])
+        # Changes noted without a company: skip those another book owns.
+        for kind, ids in unowned.items():
+            if ids:
+                other = {d["ref_id"] for d in await db.validation_contrib.find(
+                    {"_id": {"$in": [_key(kind, i) for i in ids]}}, {"_id": 0, "ref_id": 1, "company_id": 1}
+                ).to_list(None) if (d.get("company_id") or "") != company_id}
+                pending[kind] |= ids - other
+        examined = 0
+        for kind in KINDS:
+            if pending[kind]:
+                await reexamine(kind, pending[kind])
+                examined += len(pending[kind])
+        if pending["entry"]:
+            await reexamine(ORPHAN, pending["entry"])
+
+        # Writes nobody reported show up as a count mismatch.
+        state = await db.validation_totals.find_one({"_id": company_id}) or {}
+        for kind in KINDS:
+            live = await db[_COLLECTIONS[kind]].count_documents(_book_q(company_id))
+            if live != state.get(f"n_{kind}", 0):
+                ids = await _id_diff(kind, company_id)
+                logger.info(f"[validation] book={company_id or '(default)'}: {len(ids)} unreported {kind} write(s)")
+                await reexamine(kind, ids)
+                if kind == "entry":
+                    await reexamine(ORPHAN, ids)
+                examined += len(ids)
+
+        await db.validation_totals.update_one(
+            {"_id": company_id}, {"$set": {"watermark": started - timedelta(seconds=5)}}, upsert=True)
+        state = await db.validation_totals.find_one({"_id": company_id}) or {}
+        state["examined"] = examined
+        return state
+
+
+async def audit_book(company_id: str) -> Dict[str, Any]:
+    """
+    Full rescan: rebuild every contribution of the book from its invoices
+    and journal lines and replace its totals. Logs the drift of the running
+    totals it replaces.
+    """
+    async with _locks.setdefault(company_id, asyncio.Lock()):
+        return await _audit_book(company_id)
+
+
+async def _audit_book(company_id: str) -> Dict[str, Any]:
+    started = datetime.now(timezone.utc)
+    q = _book_q(company_id)
+    fresh_contrib: Dict[str, Dict[str, Any]] = {}
+    totals: Dict[str, Dict[str, float]] = defaultdict(dict)
+
+    def add(kind: str, ref_id: str, c: Dict[str, Any]):
+        fresh_contrib[_key(kind, ref_id)] = {"kind": kind, "ref_id": ref_id, **c}
+        _delta(totals, kind, c, +1)
+
+    async for inv in db.invoices.find(q, _INVOICE_PROJECTION):
+        add("invoice", inv["id"], invoice_contribution(inv))
+
+    entries = await db.journal_entries.find(q, _ENTRY_PROJECTION).to_list(None)
+    moves: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(dict)
+    books: Dict[str, str] = {}
+    async for l in db.journal_lines.find(q, _LINE_PROJECTION):
+        _add_line(moves, books, l)
+    for chunk in _chunks(entries, 5000):
+        chunk_moves = {e["id"]: moves.pop(e["id"]) for e in chunk if e["id"] in moves}
+        for eid, c in (await entry_contributions(chunk, chunk_moves)).items():
+            add("entry", eid, c)
+    # What is left in `moves` are lines of entries that no longer exist.
+    for eid, c in (await _orphan_contributions(moves, books)).items():
+        add(ORPHAN, eid, c)
+
+    fresh = {"n_invoice": 0, "n_entry": 0, f"n_{ORPHAN}": 0, **{f: 0.0 for fs in SUM_FIELDS.values() for f in fs},
+             **totals.get(company_id, {})}
+    previous = await db.validation_totals.find_one({"_id": company_id}) or {}
+    drift = {f: _round2(previous.get(f, 0) - fresh[f]) for f in fresh
+             if previous and abs(previous.get(f, 0) - fresh[f]) > TOLERANCE}
+    if drift:
+        logger.warning(f"[validation] book={company_id or '(default)'}: running totals had drifted {drift}")
+
+    # Replace in place (bumping `v`, so a concurrent reexamine holding the
+    # old version does not apply on top), then drop what no longer exists.
+    stored = {d["_id"]: d.get("v") or 0 async for d in db.validation_contrib.find(q, {"_id": 1, "v": 1})}
+    ops = [ReplaceOne({"_id": key}, {**doc, "v": stored.get(key, 0) + 1}, upsert=True)
+           for key, doc in fresh_contrib.items()]
+    for chunk in _chunks(ops, 1000):
+        await db.validation_contrib.bulk_write(chunk, ordered=False)
+    for chunk in _chunks([key for key in stored if key not in fresh_contrib], 1000):
+        await db.validation_contrib.delete_many({"_id": {"$in": chunk}})
+    now = datetime.now(timezone.utc)
+    await db.validation_totals.update_one({"_id": company_id}, {"$set": {
+        **fresh, "watermark": started - timedelta(seconds=5), "audited_at": now, "audit_drift": drift,
+    }}, upsert=True)
+    state = await db.validation_totals.find_one({"_id": company_id}) or {}
+    state["examined"] = len(fresh_contrib)
+    return state
+
+
+async def mark_clean(company_id: str):
+    await db.validation_totals.update_one(
+        {"_id": company_id}, {"$set": {"clean_at": datetime.now(timezone.utc)}}, upsert=True)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# READ PATH
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def book_totals(company_id: str, audit: bool = False) -> Dict[str, Any]:
+    """
+    Up-to-date sums for a book ("" = every book, as the validator has always
+    reported it), synced incrementally or, with audit=True, rebuilt.
+    """
+    if company_id:
+        books = [company_id]
+    else:
+        from backend.accounting_core import _all_book_ids  # local import: avoid circular import at module load
+        books = sorted(set(await _all_book_ids()) | {d["_id"] for d in await db.validation_totals.find(
+            {}, {"_id": 1}).to_list(None)})
+    out: Dict[str, Any] = {f: 0.0 for fs in SUM_FIELDS.values() for f in fs}
+    out["examined"] = 0
+    for book in books:
+        state = await (audit_book(book) if audit else sync_book(book))
+        for f in [*INVOICE_FIELDS, *ENTRY_FIELDS, "examined"]:
+            out[f] += state.get(f) or 0
+    return out
+
+
+async def revenue_culprits(company_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Invoices whose own grand_total != amount_paid + amount_due, worst first."""
+    q: Dict[str, Any] = {"kind": "invoice", "abs_diff": {"$gt": TOLERANCE}}
+    if company_id:
+        q["company_id"] = company_id
+    docs = await db.validation_contrib.find(q).sort("abs_diff", -1).to_list(limit)
+    return [{"id": d["ref_id"], "invoice_number": d.get("invoice_number"), "client_name": d.get("client_name"),
+             "grand_total": d.get("grand_total"), "amount_paid": d.get("amount_paid"),
+             "amount_due": d.get("amount_due"), "diff": d.get("diff")} for d in docs]
+
+
+async def manual_entries(company_id: str, field: str, auto_sources: Iterable[str],
+                         limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Entries outside the invoice-sync pipeline (source not in `auto_sources`)
+    with a net on `field` ("ar" or "sales"), largest first.
+    """
+    q: Dict[str, Any] = {"kind": "entry", "source": {"$nin": list(auto_sources)}, field: {"$nin": [0, None]}}
+    if company_id:
+        q["company_id"] = company_id
+    culprits = []
+    async for d in db.validation_contrib.find(q, {"_id": 0, "ref_id": 1, field: 1, "entry_date": 1,
+                                                   "narration": 1, "source": 1}):
+        net = _round2(d.get(field))
+        if abs(net) > TOLERANCE:
+            culprits.append({"entry_id": d["ref_id"], "date": d.get("entry_date"),
+                             "narration": d.get("narration") or "(no narration)",
+                             "source": d.get("source") or "manual", "net_amount": net})
+    culprits.sort(key=lambda c: abs(c["net_amount"]), reverse=True)
+    return culprits[:limit]
+
+
+INDEXES = [
+    index("validation_changes", "at", expireAfterSeconds=CHANGE_RETENTION_SEC),
+    index("validation_contrib", [("kind", 1), ("company_id", 1), ("abs_diff", -1)]),
+    index("validation_contrib", [("kind", 1), ("company_id", 1), ("source", 1)]),
+]
+
+
+async def create_validation_totals_indexes():
+    """Create MongoDB indexes for the validator's running totals."""
+    await ensure_indexes(INDEXES)
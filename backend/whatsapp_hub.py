@@ -2,7 +2,8 @@
 whatsapp_hub.py — v3.0 (media support + SSE real-time + full history)
   ★ filename/file_size stored on all incoming messages
   ★ SSE /events endpoint for real-time frontend push
-  ★ _push_sse called on every incoming webhook message
+  ★ _push_sse called on every incoming webhook message (published on the
+    live_events hub channel, so streams on every worker receive it)
   ★ hub_conversation default limit raised to 200
   ★ Groups support + @lid safety (unchanged from v2.1)
 """
@@ -13,14 +14,17 @@ import asyncio
 import json
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from backend import live_events
 from backend.dependencies import get_current_user, require_admin
 from backend.models import User
+from backend import lead_prefilter
+from backend.search import search_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/whatsapp/hub", tags=["whatsapp-hub"])
@@ -52,7 +56,19 @@ async def _process_whatsapp_lead_in_background(
     try:
         from backend.whatsapp_lead_ai import detect_and_extract_whatsapp_lead
 
+        db = _db()
+        # Greetings, acknowledgements, media captions etc. never reach the LLM
+        keep, score, reason = lead_prefilter.screen("whatsapp_lead", message)
+        if not keep:
+            await db.whatsapp_hub_messages.update_one(
+                {"message_id": message_id, "session_id": session_id},
+                {"$set": {"lead_automation": "prefiltered", "lead_prefilter_reason": reason,
+                          "lead_prefilter_score": round(score, 4)}},
+            )
+            return
+
         result = await detect_and_extract_whatsapp_lead(message)
+        await lead_prefilter.record_outcome("whatsapp_lead", message, bool(result.get("is_lead")), "whatsapp")
         if not result.get("is_lead"):
             return
 
@@ -65,7 +81,6 @@ async def _process_whatsapp_lead_in_background(
             return
 
         lead = result.get("lead") or {}
-        db = _db()
 
         phone = (lead.get("phone") or sender_phone or "").strip() or None
         contact_name = (lead.get("contact_name") or sender_name or "").strip() or None
@@ -185,26 +200,14 @@ async def _process_whatsapp_lead_in_background(
             group_subject, message_id,
         )
 
-# ── SSE client registry ──────────────────────────────────────────────────────
-_sse_queues: List[asyncio.Queue] = []
+# ── SSE push ─────────────────────────────────────────────────────────────────
+# Hub events go out on the live_events hub channel as "wa_<event>": the
+# per-user /api/events/stream of every hub user and /events below (which
+# strips the prefix) both subscribe to it.
 
-
-def _push_sse(event: str, data: dict) -> None:
-    """Push an event to all connected SSE clients (non-blocking)."""
-    if not _sse_queues:
-        return
-    payload = {"event": event, "data": data}
-    dead = []
-    for q in list(_sse_queues):
-        try:
-            q.put_nowait(payload)
-        except Exception:
-            dead.append(q)
-    for q in dead:
-        try:
-            _sse_queues.remove(q)
-        except ValueError:
-            pass
+async def _push_sse(event: str, data: dict) -> None:
+    """Publish an event to every connected hub client, on any worker."""
+    await live_events.publish(live_events.HUB_CHANNEL, f"wa_{event}", data)
 
 
 def _safe(doc: dict) -> dict:
@@ -503,9 +506,13 @@ async def hub_incoming_message(request: Request):
          "$inc": {"unread_count": 1}},
         upsert=True,
     )
+    if not existing_contact or existing_contact.get("display_name") != resolved_name:
+        await search_index.record_change(
+            "wa_contacts", None, {"jid": jid, "display_name": resolved_name, "phone": phone}
+        )
 
     # ★ Push real-time event to all SSE subscribers
-    _push_sse("message", {
+    await _push_sse("message", {
         "jid":        jid,
         "session_id": session_id,
         "body":       body[:80],
@@ -640,9 +647,11 @@ async def hub_bulk_sync(request: Request):
             upsert=True,
         )
 
+    if contacts_upserted or messages_stored:
+        await search_index.mark_dirty("wa_contacts")
     logger.info("WA Hub bulk-sync: session=%s contacts=%d messages=%d",
                 session_id, contacts_upserted, messages_stored)
-    _push_sse("sync", {"session_id": session_id, "contacts": contacts_upserted, "messages": messages_stored})
+    await _push_sse("sync", {"session_id": session_id, "contacts": contacts_upserted, "messages": messages_stored})
     return {"ok": True, "contacts_upserted": contacts_upserted, "messages_stored": messages_stored}
 
 
@@ -685,6 +694,8 @@ async def hub_groups_sync(request: Request):
             upsert=True,
         )
         stored += 1
+    if stored:
+        await search_index.mark_dirty("wa_contacts")
     return {"ok": True, "groups_stored": stored}
 
 
@@ -1020,6 +1031,7 @@ async def hub_delete_conversation(contact_jid: str, current_user: User = Depends
     db = _db()
     await db["whatsapp_hub_messages"].delete_many({"jid": contact_jid})
     await db["whatsapp_hub_contacts"].delete_one({"jid": contact_jid})
+    await search_index.record_change("wa_contacts", {"jid": contact_jid}, None)
     return {"ok": True}
 
 
@@ -1168,23 +1180,20 @@ async def hub_events(
     if role != "admin" and not user_doc.get("wa_hub_access"):
         raise HTTPException(403, "No WhatsApp Hub access")
 
-    q: asyncio.Queue = asyncio.Queue(maxsize=100)
-    _sse_queues.append(q)
+    sub = live_events.pubsub.subscribe([live_events.HUB_CHANNEL])
 
     async def generator():
         try:
             yield ": connected\n\n"
-            while True:
-                try:
-                    payload = await asyncio.wait_for(q.get(), timeout=25)
-                    yield f"event: {payload['event']}\ndata: {json.dumps(payload['data'])}\n\n"
-                except asyncio.TimeoutError:
+            while not sub.overflowed:
+                item = await sub.get(25)
+                if item is None:
                     yield ": ping\n\n"
+                    continue
+                event, data = item
+                yield f"event: {event.removeprefix('wa_')}\ndata: {json.dumps(data)}\n\n"
         finally:
-            try:
-                _sse_queues.remove(q)
-            except ValueError:
-                pass
+            sub.close()
 
     return StreamingResponse(
         generator(),
@@ -1212,9 +1221,17 @@ async def hub_global_search(
     db      = _db()
     pattern = {"$regex": q.strip(), "$options": "i"}
 
-    contacts = await db["whatsapp_hub_contacts"].find({
-        "$or": [{"display_name": pattern}, {"phone": pattern}]
-    }).limit(limit).to_list(limit)
+    hits = await search_index.search("wa_contact", q, limit)
+    if hits is not None:
+        jids = [h["ref_id"] for h in hits]
+        found = {c["jid"]: c for c in await db["whatsapp_hub_contacts"].find(
+            {"jid": {"$in": jids}}
+        ).to_list(len(jids))}
+        contacts = [found[j] for j in jids if j in found]
+    else:
+        contacts = await db["whatsapp_hub_contacts"].find({
+            "$or": [{"display_name": pattern}, {"phone": pattern}]
+        }).limit(limit).to_list(limit)
 
     messages = await db["whatsapp_hub_messages"].find({
         "body": pattern
@@ -43,9 +43,6 @@ from backend.models import User
 
 logger = logging.getLogger(__name__)
 
-# Guards wa_scheduled_bulk_job against overlapping runs now that it no
-# longer blocks-and-waits on the coroutine (see wa_scheduled_bulk_job).
-_bulk_job_running = False
 router = APIRouter(prefix="/whatsapp", tags=["whatsapp"])
 
 WA_BRIDGE_URL = os.getenv("WA_BRIDGE_URL", "http://localhost:3002")
@@ -100,18 +97,6 @@ async def ping_wa_bridge_keep_alive():
         logger.warning(f"WA bridge keep-alive ping failed (non-fatal): {e}")
 
 
-def wa_bridge_keepalive_job():
-    """APScheduler sync wrapper — run every 5 minutes to keep wa-bridge warm."""
-    try:
-        from backend.server import app_event_loop
-        if app_event_loop is None or app_event_loop.is_closed():
-            return
-        future = asyncio.run_coroutine_threadsafe(ping_wa_bridge_keep_alive(), app_event_loop)
-        future.result(timeout=15)
-    except Exception as exc:
-        logger.warning(f"wa_bridge_keepalive_job failed (non-fatal): {exc}")
-
-
 # ── Pydantic models ──────────────────────────────────────────────────────────
 
 class WASessionCreate(BaseModel):
@@ -853,8 +838,8 @@ async def cancel_scheduled_bulk(job_id: str, current_user: User = Depends(get_cu
 
 async def _run_scheduled_bulk_jobs():
     """
-    Called by APScheduler every minute. Finds pending jobs whose scheduled_at
-    has passed and sends them via the WA bridge.
+    Run every minute by the "wa_scheduled_bulk" job-runner job. Finds pending
+    jobs whose scheduled_at has passed and sends them via the WA bridge.
     """
     db = _db()
     # Never send unless a WhatsApp number is connected
@@ -902,43 +887,12 @@ async def _run_scheduled_bulk_jobs():
         logger.info("Bulk job %s completed: sent=%d failed=%d", job_id, sent, failed)
 
 
-def wa_scheduled_bulk_job():
-    """APScheduler sync wrapper — run every minute.
-
-    APScheduler calls this from a background thread, but Motor (async MongoDB)
-    is bound to the main Uvicorn event loop.  Creating a *new* event loop here
-    causes "Future attached to a different loop".  Instead we schedule the
-    coroutine on the already-running main loop.
+async def wa_scheduled_bulk_job():
+    """Job runner entry point — every minute.
 
-    We do NOT block-and-wait here anymore: large recipient batches (each
-    recipient costs ~0.8s+ network latency) can easily exceed the 60s
-    scheduler interval, which previously caused this wrapper to time out,
-    collide with the next scheduled run, and cascade into a growing backlog
-    of missed/skipped executions. Firing-and-forgetting lets the bulk job
-    run to completion on the main loop regardless of how long it takes,
-    while _bulk_job_lock prevents two bulk runs from overlapping.
+    Large recipient batches (each recipient costs ~0.8s+ network latency) can
+    easily outlive the one-minute interval. The job runner's singleton lock
+    keeps a new tick from starting while a previous run is still sending, on
+    this worker or any other.
     """
-    global _bulk_job_running
-    if _bulk_job_running:
-        logger.info("wa_scheduled_bulk_job: previous run still in progress, skipping this tick.")
-        return
-    try:
-        from backend.server import app_event_loop
-        if app_event_loop is None or app_event_loop.is_closed():
-            logger.warning("wa_scheduled_bulk_job: main event loop not available yet, skipping.")
-            return
-
-        async def _guarded_run():
-            global _bulk_job_running
-            _bulk_job_running = True
-            try:
-                await _run_scheduled_bulk_jobs()
-            except Exception as exc:
-                logger.error("wa_scheduled_bulk_job failed: %s: %s", type(exc).__name__, exc)
-            finally:
-                _bulk_job_running = False
-
-        asyncio.run_coroutine_threadsafe(_guarded_run(), app_event_loop)
-    except Exception as exc:
-        _bulk_job_running = False
-        logger.error("wa_scheduled_bulk_job failed to schedule: %s: %s", type(exc).__name__, exc)
+    await _run_scheduled_bulk_jobs()
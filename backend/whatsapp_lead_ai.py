@@ -41,15 +41,18 @@ creation, duplicate detection, permissions and API routing belong elsewhere.
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
 import re
 from typing import Any, Dict, List, Optional
 
-import httpx
 from fastapi import HTTPException
 
+from backend import lead_prefilter
+from backend.ai import llm_gateway
+
 logger = logging.getLogger("whatsapp_lead_ai")
 
 
@@ -161,6 +164,21 @@ def _build_prompt(message: str) -> str:
     return f"{_SYSTEM_PROMPT}\n\nWHATSAPP MESSAGE:\n{message.strip()}"
 
 
+def _build_batch_prompt(messages: List[str]) -> str:
+    """Several independent messages in one request; one result per message."""
+    numbered = "\n\n".join(
+        f"--- MESSAGE {i} ---\n{m.strip()}" for i, m in enumerate(messages, start=1)
+    )
+    return (
+        f"{_SYSTEM_PROMPT}\n\n"
+        f"Below are {len(messages)} separate WhatsApp messages from different senders. "
+        "Analyse each one on its own; never carry information from one message to another.\n"
+        'Return {"results": [ ... ]} with exactly one object per message, in the same order, '
+        "each in the structure above.\n\n"
+        f"{numbered}"
+    )
+
+
 # -----------------------------------------------------------------------------
 # JSON extraction / normalization
 # -----------------------------------------------------------------------------
@@ -263,158 +281,98 @@ def _normalize_result(raw: Dict[str, Any]) -> Dict[str, Any]:
 
 
 # -----------------------------------------------------------------------------
-# Provider calls
+# Public API
 # -----------------------------------------------------------------------------
 
-async def _call_gemini(prompt: str) -> str:
-    key = _gemini_key()
-    if not key:
-        raise HTTPException(
-            status_code=500,
-            detail="Gemini API key is not configured on the server.",
-        )
-
-    url = (
-        "https://generativelanguage.googleapis.com/v1beta/"
-        f"models/{_gemini_model()}:generateContent"
-    )
-    payload = {
-        "contents": [{
-            "role": "user",
-            "parts": [{"text": prompt}],
-        }],
-        "generationConfig": {
-            "temperature": 0.0,
-            "maxOutputTokens": 1024,
-            "responseMimeType": "application/json",
+def _empty_result() -> Dict[str, Any]:
+    return {
+        "is_lead": False,
+        "confidence": 0.0,
+        "lead": {
+            "company_name": None,
+            "contact_name": None,
+            "email": None,
+            "phone": None,
+            "services": [],
+            "trademark_name": None,
+            "notes": None,
         },
     }
 
-    async with httpx.AsyncClient(timeout=45) as client:
-        response = await client.post(
-            url,
-            params={"key": key},
-            headers={"Content-Type": "application/json"},
-            json=payload,
-        )
 
-    if response.status_code == 429:
-        raise HTTPException(status_code=429, detail="Gemini quota exceeded.")
-    if response.status_code != 200:
-        raise HTTPException(
-            status_code=422,
-            detail=f"Gemini API error {response.status_code}: {response.text[:300]}",
-        )
-
-    data = response.json()
-    try:
-        parts = data["candidates"][0]["content"]["parts"]
-        return "".join(p.get("text", "") for p in parts if isinstance(p, dict))
-    except (KeyError, IndexError, TypeError):
-        raise HTTPException(status_code=422, detail="Gemini returned an empty response.")
+async def _complete(prompt: str, max_tokens: int = 1024) -> str:
+    # Provider fallback, caching and budgets live in the LLM gateway.
+    return await llm_gateway.generate(
+        "whatsapp_lead",
+        prompt,
+        json_mode=True,
+        max_tokens=max_tokens,
+        provider=_provider(),
+        models={"gemini": _gemini_model(), "groq": _groq_model()},
+        timeout=45,
+    )
 
 
-async def _call_groq(prompt: str) -> str:
-    key = _groq_key()
-    if not key:
+async def _detect_one(message: str) -> Dict[str, Any]:
+    raw_text = await _complete(_build_prompt(message))
+    lead_prefilter.note_llm_call("whatsapp_lead", 1)
+    try:
+        return _normalize_result(_extract_json_text(raw_text))
+    except Exception as exc:
+        logger.exception("Unable to parse WhatsApp lead AI response: %r", exc)
         raise HTTPException(
-            status_code=500,
-            detail="Groq API key is not configured on the server.",
+            status_code=422,
+            detail="AI returned an invalid WhatsApp lead extraction response.",
         )
 
-    payload = {
-        "model": _groq_model(),
-        "messages": [{
-            "role": "user",
-            "content": prompt,
-        }],
-        "temperature": 0,
-        "max_tokens": 1024,
-        "response_format": {"type": "json_object"},
-    }
-
-    async with httpx.AsyncClient(timeout=45) as client:
-        response = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {key}",
-                "Content-Type": "application/json",
-            },
-            json=payload,
-        )
 
-    if response.status_code == 429:
-        raise HTTPException(status_code=429, detail="Groq quota exceeded.")
-    if response.status_code != 200:
-        raise HTTPException(
-            status_code=422,
-            detail=f"Groq API error {response.status_code}: {response.text[:300]}",
-        )
+async def _detect_batch(messages: List[str]) -> List[Any]:
+    """
+    One provider call for several messages. If the batched answer cannot be
+    matched back to the messages, each message is retried on its own.
+    """
+    if len(messages) == 1:
+        try:
+            return [await _detect_one(messages[0])]
+        except Exception as exc:
+            return [exc]
 
-    data = response.json()
+    raw_text = await _complete(_build_batch_prompt(messages), max_tokens=min(1024 * len(messages), 8192))
     try:
-        return data["choices"][0]["message"]["content"]
-    except (KeyError, IndexError, TypeError):
-        raise HTTPException(status_code=422, detail="Groq returned an empty response.")
+        items = _extract_json_text(raw_text).get("results")
+        if isinstance(items, list) and len(items) == len(messages) and all(isinstance(i, dict) for i in items):
+            results = [_normalize_result(i) for i in items]
+            lead_prefilter.note_llm_call("whatsapp_lead", len(messages))
+            return results
+        logger.warning("WhatsApp lead AI batch returned %s results for %d messages; retrying singly",
+                       len(items) if isinstance(items, list) else "no", len(messages))
+    except Exception as exc:
+        logger.warning("Unable to parse WhatsApp lead AI batch response, retrying singly: %r", exc)
+    # The batch call answered nothing; the single retries count themselves.
+    lead_prefilter.note_llm_call("whatsapp_lead", 0)
+    return await asyncio.gather(*(_detect_one(m) for m in messages), return_exceptions=True)
 
 
-# -----------------------------------------------------------------------------
-# Public API
-# -----------------------------------------------------------------------------
+# Messages arriving within the window share one provider call.
+_batcher = lead_prefilter.MicroBatcher(
+    "whatsapp_lead",
+    _detect_batch,
+    window=float(os.environ.get("WHATSAPP_LEAD_AI_BATCH_WINDOW", "0.5")),
+    max_size=int(os.environ.get("WHATSAPP_LEAD_AI_BATCH_SIZE", "8")),
+)
+
 
 async def detect_and_extract_whatsapp_lead(message: str) -> Dict[str, Any]:
     """
     Analyze one WhatsApp message.
 
     Returns a normalized dictionary. This function does NOT write to MongoDB.
+    Concurrent calls are micro-batched into a single provider request;
+    screening obvious non-leads is the caller's job (backend.lead_prefilter).
     """
     if not isinstance(message, str) or not message.strip():
-        return {
-            "is_lead": False,
-            "confidence": 0.0,
-            "lead": {
-                "company_name": None,
-                "contact_name": None,
-                "email": None,
-                "phone": None,
-                "services": [],
-                "trademark_name": None,
-                "notes": None,
-            },
-        }
-
-    prompt = _build_prompt(message)
-    provider = _provider()
-
-    try:
-        if provider == "gemini":
-            raw_text = await _call_gemini(prompt)
-        else:
-            raw_text = await _call_groq(prompt)
-    except Exception as first_error:
-        # Keep the existing provider fallback philosophy: if both credentials
-        # exist, a provider-side failure can fall back to the other provider.
-        try:
-            if provider == "gemini" and _groq_key():
-                logger.warning("WhatsApp lead AI Gemini failed; falling back to Groq: %r", first_error)
-                raw_text = await _call_groq(prompt)
-            elif provider == "groq" and _gemini_key():
-                logger.warning("WhatsApp lead AI Groq failed; falling back to Gemini: %r", first_error)
-                raw_text = await _call_gemini(prompt)
-            else:
-                raise
-        except Exception:
-            logger.exception("WhatsApp lead AI provider call failed")
-            raise first_error
-
-    try:
-        return _normalize_result(_extract_json_text(raw_text))
-    except Exception as exc:
-        logger.exception("Unable to parse WhatsApp lead AI response: %r", exc)
-        raise HTTPException(
-            status_code=422,
-            detail="AI returned an invalid WhatsApp lead extraction response.",
-        )
+        return _empty_result()
+    return await _batcher.submit(message)
 
 
 # Backward-friendly alias for callers that prefer a shorter function name.
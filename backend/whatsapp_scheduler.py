@@ -6,17 +6,26 @@ Scheduled WhatsApp notification jobs:
   2. DSC expiry alerts     — 09:30 IST daily  (7-day and 1-day warnings)
   3. Compliance reminders  — 10:00 IST daily  (7-day and 1-day due-date warnings)
 
-Each job is a sync wrapper (APScheduler-compatible) around an async inner function.
+Each job is an async entry point registered on backend/job_runner.py.
 All messages are routed through send_whatsapp_notification() which logs every send
 to the whatsapp_messages collection.
+
+Recipients come from the indexed client_calendar projection (today's
+birthdays, DSC expiries on the alert days) and the clients involved are
+loaded in one query; until the projection is built the jobs scan as before.
+Sends go through SendDispatcher: a token bucket (WA_SEND_RATE_PER_SEC,
+default 1.25/s with bursts of WA_SEND_BURST) with WA_SEND_CONCURRENCY sends
+in flight, instead of awaiting each send and then sleeping 0.8 s.
 """
 
 from __future__ import annotations
 
 import asyncio
 import logging
+import os
+import time
 from datetime import date, datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
 
 import pytz
 
@@ -24,6 +33,54 @@ logger = logging.getLogger(__name__)
 
 IST = pytz.timezone("Asia/Kolkata")
 
+WA_SEND_RATE_PER_SEC = float(os.environ.get("WA_SEND_RATE_PER_SEC", "1.25"))
+WA_SEND_BURST = int(os.environ.get("WA_SEND_BURST", "3"))
+WA_SEND_CONCURRENCY = int(os.environ.get("WA_SEND_CONCURRENCY", "3"))
+
+
+class SendDispatcher:
+    """Token-bucket rate limit plus a cap on sends in flight.
+
+    `run(sends)` takes argument-less coroutine functions and returns
+    (succeeded, failed); a failing send is logged and does not stop the rest.
+    """
+
+    def __init__(self, rate: float = WA_SEND_RATE_PER_SEC, burst: int = WA_SEND_BURST,
+                 concurrency: int = WA_SEND_CONCURRENCY):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._lock = asyncio.Lock()
+
+    async def _take(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:  # FIFO: waiters get tokens in arrival order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def _one(self, send: Callable[[], Awaitable[Any]]) -> bool:
+        async with self.semaphore:
+            await self._take()
+            try:
+                return (await send()) is not False
+            except Exception as e:
+                logger.error("[WA Scheduler] send failed: %s", e)
+                return False
+
+    async def run(self, sends: Iterable[Callable[[], Awaitable[Any]]]) -> tuple:
+        results = await asyncio.gather(*(self._one(s) for s in sends))
+        ok = sum(1 for r in results if r)
+        return ok, len(results) - ok
+
 
 # ─── Async inner helpers ─────────────────────────────────────────────────────
 
@@ -50,6 +107,62 @@ def _fmt_phone(raw: Optional[str]) -> Optional[str]:
     return digits
 
 
+def _client_phone(client: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Client's own phone, else the first contact person with one."""
+    if not client:
+        return None
+    phone = _fmt_phone(client.get("phone"))
+    if phone:
+        return phone
+    for cp in client.get("contact_persons") or []:
+        ph = _fmt_phone(cp.get("phone"))
+        if ph:
+            return ph
+    return None
+
+
+async def _clients_by_id(db, ids: Iterable[Optional[str]], projection: Optional[dict] = None) -> Dict[str, dict]:
+    """One `$in` query for the clients a job needs instead of one find_one each."""
+    wanted = list({i for i in ids if i})
+    if not wanted:
+        return {}
+    docs = await db.clients.find({"id": {"$in": wanted}}, projection or {"_id": 0}).to_list(None)
+    return {c["id"]: c for c in docs}
+
+
+async def _birthday_targets(db, today: date) -> List[tuple]:
+    """(client, name, phone) for everyone whose birthday is today."""
+    from backend.client_calendar import birthdays_on
+    from backend.dependencies import personal_birthday_candidates
+
+    entries = await birthdays_on(today)
+    if entries is not None:
+        clients = await _clients_by_id(db, (e["client_id"] for e in entries))
+        return [(clients[e["client_id"]], e["name"], _fmt_phone(e.get("phone")))
+                for e in entries if e["client_id"] in clients]
+
+    # Projection not built yet: scan clients as before
+    targets = []
+    clients = await db.clients.find({}, {"_id": 0}).to_list(5000)
+    for client in clients:
+        # personal_birthday_candidates() already excludes a company's Date
+        # of Incorporation — it only returns the client's own birthday when
+        # client_type == "proprietor" (an individual), plus every contact
+        # person's birthday (directors/partners are always real people).
+        for person in personal_birthday_candidates(client):
+            bday_raw = person["birthday"]
+            try:
+                if isinstance(bday_raw, str):
+                    bday = date.fromisoformat(bday_raw[:10])
+                else:
+                    bday = bday_raw
+                if bday.month == today.month and bday.day == today.day:
+                    targets.append((client, person["name"], _fmt_phone(person["phone"])))
+            except (ValueError, TypeError, AttributeError):
+                pass
+    return targets
+
+
 async def _send_birthday_wishes():
     """
     Send WhatsApp birthday greetings to clients (and their contact persons)
@@ -57,7 +170,6 @@ async def _send_birthday_wishes():
     """
     from backend.server import db
     from backend.whatsapp_integration import send_whatsapp_notification, get_auto_settings
-    from backend.dependencies import personal_birthday_candidates
 
     if not await _is_wa_connected():
         logger.info("[WA Scheduler] Birthday job skipped — WhatsApp not connected")
@@ -70,57 +182,29 @@ async def _send_birthday_wishes():
     template = auto.get("birthday_template") or "🎂 Happy Birthday, {name}!"
 
 
-    today = date.today()
-    today_month = today.month
-    today_day = today.day
-
-    clients = await db.clients.find({}, {"_id": 0}).to_list(5000)
-
-    sent, skipped = 0, 0
-    for client in clients:
+    sends = []
+    for client, name, phone in await _birthday_targets(db, date.today()):
         # Per-client opt-out: skip if birthday auto-send turned off for this client
-        if client.get("wa_auto_birthday") is False:
+        if client.get("wa_auto_birthday") is False or not phone:
             continue
 
-        targets = []  # (phone, name) pairs to wish
-
-        # personal_birthday_candidates() already excludes a company's Date
-        # of Incorporation — it only returns the client's own birthday when
-        # client_type == "proprietor" (an individual), plus every contact
-        # person's birthday (directors/partners are always real people).
-        for person in personal_birthday_candidates(client):
-            bday_raw = person["birthday"]
-            try:
-                if isinstance(bday_raw, str):
-                    bday = date.fromisoformat(bday_raw[:10])
-                else:
-                    bday = bday_raw
-                if bday.month == today_month and bday.day == today_day:
-                    phone = _fmt_phone(person["phone"])
-                    if phone:
-                        targets.append((phone, person["name"]))
-            except (ValueError, TypeError):
-                pass
-
         # Custom per-client message overrides the global template
         client_msg = client.get("wa_birthday_message")
         raw_tpl = client_msg if (client_msg and client_msg.strip()) else template
-        for phone, name in targets:
-            try:
-                message = raw_tpl.format(name=name)
-            except (KeyError, IndexError, ValueError):
-                message = raw_tpl
-
-            await send_whatsapp_notification(
-                to=phone,
-                message=message,
-                message_type="birthday",
-                context_id=client.get("id"),
-                sent_by="scheduler:birthday",
-            )
-            sent += 1
-            await asyncio.sleep(0.8)   # rate-limit guard
-
+        try:
+            message = raw_tpl.format(name=name)
+        except (KeyError, IndexError, ValueError):
+            message = raw_tpl
+
+        sends.append(lambda phone=phone, message=message, client_id=client.get("id"): send_whatsapp_notification(
+            to=phone,
+            message=message,
+            message_type="birthday",
+            context_id=client_id,
+            sent_by="scheduler:birthday",
+        ))
+
+    sent, skipped = await SendDispatcher().run(sends)
     logger.info("[WA Scheduler] Birthday wishes sent=%d skipped=%d", sent, skipped)
 
 
@@ -131,6 +215,7 @@ async def _send_dsc_expiry_alerts():
     """
     from backend.server import db
     from backend.whatsapp_integration import send_whatsapp_notification, get_auto_settings
+    from backend.client_calendar import dsc_expiring_on
 
     if not await _is_wa_connected():
         logger.info("[WA Scheduler] DSC expiry job skipped — WhatsApp not connected")
@@ -143,60 +228,61 @@ async def _send_dsc_expiry_alerts():
 
     today = date.today()
     alert_offsets = [7, 1]  # days before expiry
+    target_dates = {today + timedelta(days=d): d for d in alert_offsets}
+
+    entries = await dsc_expiring_on(target_dates)
+    if entries is not None:
+        dscs = [{"id": e["ref_id"], "client_id": e.get("client_id"), "holder_name": e.get("holder"),
+                 "serial_number": e.get("serial"), "expiry_date": e["date"]} for e in entries]
+    else:
+        # Projection not built yet: query the register by date prefix as before
+        dscs = []
+        for target_date in target_dates:
+            dscs += await db.dsc_register.find(
+                {"expiry_date": {"$regex": f"^{target_date.isoformat()}"}},
+                {"_id": 0},
+            ).to_list(500)
+
+    clients = await _clients_by_id(
+        db, (d.get("client_id") for d in dscs),
+        {"_id": 0, "id": 1, "phone": 1, "contact_persons.phone": 1},
+    )
+
+    sends = []
+    for dsc in dscs:
+        expiry = str(dsc.get("expiry_date") or "")[:10]
+        try:
+            days_ahead = target_dates[date.fromisoformat(expiry)]
+        except (ValueError, KeyError):
+            continue
+        holder = dsc.get("holder_name") or "Holder"
+        serial = dsc.get("serial_number") or dsc.get("certificate_number") or "N/A"
+
+        # Try to get phone from linked client
+        phone = _client_phone(clients.get(dsc.get("client_id")))
+        if not phone:
+            logger.debug("[WA Scheduler] DSC %s — no phone found, skipping", serial)
+            continue
 
-    sent = 0
-    for days_ahead in alert_offsets:
-        target_date = today + timedelta(days=days_ahead)
-        target_str = target_date.isoformat()
-
-        dscs = await db.dsc_register.find(
-            {"expiry_date": {"$regex": f"^{target_str}"}},
-            {"_id": 0},
-        ).to_list(500)
-
-        for dsc in dscs:
-            holder = dsc.get("holder_name") or "Holder"
-            serial = dsc.get("serial_number") or dsc.get("certificate_number") or "N/A"
-            expiry = dsc.get("expiry_date", target_str)[:10]
-
-            # Try to get phone from linked client
-            phone = None
-            client_id = dsc.get("client_id")
-            if client_id:
-                client = await db.clients.find_one({"id": client_id}, {"_id": 0})
-                if client:
-                    phone = _fmt_phone(client.get("phone"))
-                    if not phone:
-                        for cp in client.get("contact_persons") or []:
-                            ph = _fmt_phone(cp.get("phone"))
-                            if ph:
-                                phone = ph
-                                break
-
-            if not phone:
-                logger.debug("[WA Scheduler] DSC %s — no phone found, skipping", serial)
-                continue
-
-            urgency = "⚠️ URGENT" if days_ahead == 1 else "🔔 Reminder"
-            message = (
-                f"{urgency}: *DSC Expiring in {days_ahead} Day{'s' if days_ahead > 1 else ''}*\n\n"
-                f"*Holder:* {holder}\n"
-                f"*Serial:* {serial}\n"
-                f"*Expiry Date:* {expiry}\n\n"
-                f"Please renew the DSC at the earliest to avoid disruption.\n\n"
-                f"_Taskosphere — DSC Manager_"
-            )
-            await send_whatsapp_notification(
-                to=phone,
-                message=message,
-                message_type="dsc",
-                context_id=dsc.get("id"),
-                sent_by="scheduler:dsc",
-            )
-            sent += 1
-            await asyncio.sleep(0.8)
-
-    logger.info("[WA Scheduler] DSC expiry alerts sent=%d", sent)
+        urgency = "⚠️ URGENT" if days_ahead == 1 else "🔔 Reminder"
+        message = (
+            f"{urgency}: *DSC Expiring in {days_ahead} Day{'s' if days_ahead > 1 else ''}*\n\n"
+            f"*Holder:* {holder}\n"
+            f"*Serial:* {serial}\n"
+            f"*Expiry Date:* {expiry}\n\n"
+            f"Please renew the DSC at the earliest to avoid disruption.\n\n"
+            f"_Taskosphere — DSC Manager_"
+        )
+        sends.append(lambda phone=phone, message=message, dsc_id=dsc.get("id"): send_whatsapp_notification(
+            to=phone,
+            message=message,
+            message_type="dsc",
+            context_id=dsc_id,
+            sent_by="scheduler:dsc",
+        ))
+
+    sent, failed = await SendDispatcher().run(sends)
+    logger.info("[WA Scheduler] DSC expiry alerts sent=%d failed=%d", sent, failed)
 
 
 async def _send_compliance_reminders():
@@ -218,100 +304,71 @@ async def _send_compliance_reminders():
 
     today = date.today()
     alert_offsets = [7, 1]
+    target_dates = {(today + timedelta(days=d)).isoformat(): d for d in alert_offsets}
+
+    # compliance_masters and due_dates both store "YYYY-MM-DD" strings
+    compliance_items = await db.compliance_masters.find(
+        {"due_date": {"$in": list(target_dates)}, "status": {"$nin": ["completed", "filed"]}},
+        {"_id": 0},
+    ).to_list(1000)
+    clients = await _clients_by_id(
+        db, (item.get("client_id") for item in compliance_items),
+        {"_id": 0, "id": 1, "company_name": 1, "phone": 1, "contact_persons.phone": 1},
+    )
+
+    sends = []
+    for item in compliance_items:
+        due = item.get("due_date")
+        days_ahead = target_dates.get(due)
+        if days_ahead is None:
+            continue
+        title = item.get("title") or item.get("compliance_name") or "Compliance Task"
+        client = clients.get(item.get("client_id"))
+        client_name = (client or {}).get("company_name") or item.get("client_name") or "Client"
 
-    sent = 0
-    for days_ahead in alert_offsets:
-        target_date = today + timedelta(days=days_ahead)
-        target_str = target_date.isoformat()
-
-        # compliance_masters and due_dates both store "YYYY-MM-DD" strings
-        compliance_items = await db.compliance_masters.find(
-            {"due_date": target_str, "status": {"$nin": ["completed", "filed"]}},
-            {"_id": 0},
-        ).to_list(500)
-
-        for item in compliance_items:
-            title = item.get("title") or item.get("compliance_name") or "Compliance Task"
-            due = item.get("due_date", target_str)
-            client_id = item.get("client_id")
-            client_name = item.get("client_name") or "Client"
-
-            phone = None
-            if client_id:
-                client = await db.clients.find_one({"id": client_id}, {"_id": 0})
-                if client:
-                    client_name = client.get("company_name") or client_name
-                    phone = _fmt_phone(client.get("phone"))
-                    if not phone:
-                        for cp in client.get("contact_persons") or []:
-                            ph = _fmt_phone(cp.get("phone"))
-                            if ph:
-                                phone = ph
-                                break
-
-            if not phone:
-                continue
-
-            urgency = "⚠️ URGENT" if days_ahead == 1 else "📋 Reminder"
-            message = (
-                f"{urgency}: *Compliance Due in {days_ahead} Day{'s' if days_ahead > 1 else ''}*\n\n"
-                f"*Task:* {title}\n"
-                f"*Client:* {client_name}\n"
-                f"*Due Date:* {due}\n\n"
-                f"Please ensure timely filing to avoid penalties.\n\n"
-                f"_Taskosphere — Compliance Manager_"
-            )
-            await send_whatsapp_notification(
-                to=phone,
-                message=message,
-                message_type="compliance",
-                context_id=item.get("id"),
-                sent_by="scheduler:compliance",
-            )
-            sent += 1
-            await asyncio.sleep(0.8)
-
-    logger.info("[WA Scheduler] Compliance reminders sent=%d", sent)
-
-
-# ─── APScheduler-compatible sync wrappers ────────────────────────────────────
-# Pattern mirrors mark_absent_users_task: creates a fresh event loop so
-# APScheduler (which runs jobs in threads) must use the main event loop
-# so that Motor (async MongoDB) futures are not attached to a different loop.
-
-def _run_on_main_loop(coro, timeout=55):
-    """Run an async coroutine on the main FastAPI/Uvicorn event loop from a thread."""
-    from backend.server import app_event_loop
-    if app_event_loop is None or app_event_loop.is_closed():
-        logger.warning("_run_on_main_loop: main event loop not ready, skipping job.")
-        return
-    future = asyncio.run_coroutine_threadsafe(coro, app_event_loop)
-    future.result(timeout=timeout)
-
+        phone = _client_phone(client)
+        if not phone:
+            continue
 
-def wa_birthday_job():
+        urgency = "⚠️ URGENT" if days_ahead == 1 else "📋 Reminder"
+        message = (
+            f"{urgency}: *Compliance Due in {days_ahead} Day{'s' if days_ahead > 1 else ''}*\n\n"
+            f"*Task:* {title}\n"
+            f"*Client:* {client_name}\n"
+            f"*Due Date:* {due}\n\n"
+            f"Please ensure timely filing to avoid penalties.\n\n"
+            f"_Taskosphere — Compliance Manager_"
+        )
+        sends.append(lambda phone=phone, message=message, item_id=item.get("id"): send_whatsapp_notification(
+            to=phone,
+            message=message,
+            message_type="compliance",
+            context_id=item_id,
+            sent_by="scheduler:compliance",
+        ))
+
+    sent, failed = await SendDispatcher().run(sends)
+    logger.info("[WA Scheduler] Compliance reminders sent=%d failed=%d", sent, failed)
+
+
+# ─── Job runner entry points ─────────────────────────────────────────────────
+# Registered in server.py's startup on backend/job_runner.py, which runs them
+# on the main event loop and records failures in the job history.
+
+async def wa_birthday_job():
     """
-    DEPRECATED — no longer registered in server.py's scheduler. Superseded by
-    backend/automation_engine.py::birthday_automation_job, which covers
+    DEPRECATED — no longer registered in server.py's job runner. Superseded by
+    backend/automation_engine.py::run_birthday_automation, which covers
     WhatsApp + Email, the admin approval gate, image attachments, and
     activity-timeline logging. Kept only so _send_birthday_wishes below
     still has a caller for reference; do not re-register this job.
     """
-    try:
-        _run_on_main_loop(_send_birthday_wishes())
-    except Exception as exc:
-        logger.error("wa_birthday_job failed: %s", exc)
+    await _send_birthday_wishes()
 
 
-def wa_dsc_expiry_job():
-    try:
-        _run_on_main_loop(_send_dsc_expiry_alerts())
-    except Exception as exc:
-        logger.error("wa_dsc_expiry_job failed: %s", exc)
+async def wa_dsc_expiry_job():
+    await _send_dsc_expiry_alerts()
 
 
-def wa_compliance_job():
-    try:
-        _run_on_main_loop(_send_compliance_reminders())
-    except Exception as exc:
-        logger.error("wa_compliance_job failed: %s", exc)
+async def wa_compliance_job():
+    await _send_compliance_reminders()
@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from backend.workflow.workflow_storage import WorkflowStorage
 from backend.workflow.rule_engine import RuleEngine
 from backend.workflow.notification_engine import NotificationEngine
@@ -9,53 +9,94 @@ logger = logging.getLogger("automation_engine")
 
 class AutomationEngine:
     @classmethod
-    async def trigger_by_event(cls, event: Dict[str, Any]):
+    async def trigger_by_event(cls, event: Dict[str, Any], raise_errors: bool = False):
         """
         Processes event-driven automation rules.
+        The event bus passes raise_errors so a failed rule lookup or action is
+        retried and eventually dead-lettered instead of counting as delivered.
         """
         try:
             company_id = event["company_id"]
             event_type = event["event_type"]
             payload = event["payload"]
-            
+
             # Find matching active rule
-            matched_rule = await RuleEngine.match_rule(company_id, f"event_{event_type}", payload)
+            matched_rule = await RuleEngine.match_rule(
+                company_id, f"event_{event_type}", payload, raise_errors=raise_errors
+            )
             if not matched_rule:
                 return
 
-            action_type = matched_rule.get("action_type")
-            action_config = matched_rule.get("action_config", {})
-
-            logger.info(f"Automation rule {matched_rule['id']} matched for event {event_type}. Triggering action: {action_type}")
-
-            if action_type == "start_workflow":
-                wf_def_id = action_config.get("workflow_definition_id")
-                if wf_def_id:
-                    await WorkflowEngine.start_workflow(
-                        company_id=company_id,
-                        definition_id=wf_def_id,
-                        entity_id=event["source_id"],
-                        entity_type=payload.get("entity_type", "document"),
-                        user_id=event.get("user_id", "SYSTEM"),
-                        input_data=payload
-                    )
-            elif action_type == "send_notification":
-                channel = action_config.get("channel", "in_app")
-                template_name = action_config.get("template_name")
-                if template_name:
-                    await NotificationEngine.send_notification(
-                        company_id=company_id,
-                        user_id=event.get("user_id", "SYSTEM"),
-                        channel=channel,
-                        template_name=template_name,
-                        context=payload
-                    )
-            else:
-                logger.info(f"Dynamic conditional automation action type '{action_type}' processed.")
+            await cls._run_action(event, matched_rule)
 
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Automation engine failed to trigger event: {e}", exc_info=True)
 
+    @classmethod
+    async def match_events(cls, events: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Batch rule matching for trigger_by_event: events are grouped by (company,
+        event type) and each group is matched against its compiled rule set in
+        one pass. Returns the matched rule (or None) per event, in input order;
+        a failure to load a rule set propagates.
+        """
+        groups: Dict[tuple, List[int]] = {}
+        for i, event in enumerate(events):
+            groups.setdefault((event["company_id"], event["event_type"]), []).append(i)
+
+        matches: List[Optional[Dict[str, Any]]] = [None] * len(events)
+        for (company_id, event_type), indexes in groups.items():
+            found = await RuleEngine.match_rules_batch(
+                company_id, f"event_{event_type}", [events[i].get("payload") or {} for i in indexes]
+            )
+            for i, matched_rule in zip(indexes, found):
+                matches[i] = matched_rule
+        return matches
+
+    @classmethod
+    async def run_matched(cls, event: Dict[str, Any], matched_rule: Optional[Dict[str, Any]]):
+        """Runs the action of a rule matched by match_events (None: nothing to do)."""
+        if matched_rule:
+            await cls._run_action(event, matched_rule)
+
+    @classmethod
+    async def _run_action(cls, event: Dict[str, Any], matched_rule: Dict[str, Any]):
+        company_id = event["company_id"]
+        event_type = event["event_type"]
+        payload = event["payload"]
+
+        action_type = matched_rule.get("action_type")
+        action_config = matched_rule.get("action_config", {})
+
+        logger.info(f"Automation rule {matched_rule['id']} matched for event {event_type}. Triggering action: {action_type}")
+
+        if action_type == "start_workflow":
+            wf_def_id = action_config.get("workflow_definition_id")
+            if wf_def_id:
+                await WorkflowEngine.start_workflow(
+                    company_id=company_id,
+                    definition_id=wf_def_id,
+                    entity_id=event["source_id"],
+                    entity_type=payload.get("entity_type", "document"),
+                    user_id=event.get("user_id", "SYSTEM"),
+                    input_data=payload
+                )
+        elif action_type == "send_notification":
+            channel = action_config.get("channel", "in_app")
+            template_name = action_config.get("template_name")
+            if template_name:
+                await NotificationEngine.send_notification(
+                    company_id=company_id,
+                    user_id=event.get("user_id", "SYSTEM"),
+                    channel=channel,
+                    template_name=template_name,
+                    context=payload
+                )
+        else:
+            logger.info(f"Dynamic conditional automation action type '{action_type}' processed.")
+
     @classmethod
     async def run_scheduled_automations(cls, company_id: str):
         """
@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 from backend.workflow.workflow_storage import WorkflowStorage
 from backend.workflow.audit_engine import WorkflowAuditEngine
@@ -14,7 +14,8 @@ class BusinessEventCreator:
         source_id: str,
         user_id: str,
         payload: Dict[str, Any],
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        extra_fields: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Creates, logs and stores a new structured business event.
@@ -27,7 +28,8 @@ class BusinessEventCreator:
             "user_id": user_id,
             "payload": payload,
             "description": description or f"Event {event_type} triggered for source {source_id}.",
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **(extra_fields or {})
         }
         event_id = await WorkflowStorage.save_business_event(event_doc)
         event_doc["id"] = event_id
@@ -46,3 +48,53 @@ class BusinessEventCreator:
 
         logger.info(f"Business event registered successfully: ID={event_id}, TYPE={event_type}")
         return event_doc
+
+    @staticmethod
+    async def create_events(
+        events: List[Dict[str, Any]],
+        extra_fields: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Batch form of create_event for bursts (e.g. bulk imports): all events and
+        their audit entries are written with one insert_many each.
+        Each item needs company_id, event_type, source_id, user_id and payload.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        event_docs = [
+            {
+                "company_id": e["company_id"],
+                "event_type": e["event_type"],
+                "source_id": e["source_id"],
+                "user_id": e["user_id"],
+                "payload": e.get("payload") or {},
+                "description": e.get("description") or f"Event {e['event_type']} triggered for source {e['source_id']}.",
+                "timestamp": now,
+                **(extra_fields or {})
+            }
+            for e in events
+        ]
+        if not event_docs:
+            return []
+        await WorkflowStorage.save_business_events(event_docs)
+
+        audit_docs = [
+            {
+                "company_id": doc["company_id"],
+                "user_id": doc["user_id"],
+                "action": f"EVENT_{doc['event_type'].upper()}",
+                "entity_id": doc["source_id"],
+                "entity_type": "business_event",
+                "details": ev.get("description") or f"Business event '{doc['event_type']}' was raised.",
+                "before_state": None,
+                "after_state": doc["payload"],
+                "meta_data": {"event_id": doc["id"]},
+            }
+            for ev, doc in zip(events, event_docs)
+        ]
+        try:
+            await WorkflowStorage.save_workflow_audits(audit_docs)
+        except Exception as e:
+            logger.error(f"Failed to log immutable audit events for batch: {e}", exc_info=True)
+
+        logger.info(f"Business events registered in batch: {len(event_docs)}")
+        return event_docs
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from typing import Dict, Any, List
 from backend.workflow.workflow_storage import WorkflowStorage
@@ -6,6 +7,14 @@ from backend.dependencies import db
 logger = logging.getLogger("dashboard_engine")
 
 class DashboardEngine:
+    @staticmethod
+    async def _count_by(collection, company_id: str, field: str) -> Dict[Any, int]:
+        pipeline = [
+            {"$match": {"company_id": company_id}},
+            {"$group": {"_id": field, "count": {"$sum": 1}}},
+        ]
+        return {row["_id"]: row["count"] async for row in collection.aggregate(pipeline)}
+
     @classmethod
     async def get_dashboard_summary(cls, company_id: str, force_refresh: bool = False) -> Dict[str, Any]:
         """
@@ -25,22 +34,29 @@ class DashboardEngine:
         try:
             logger.info(f"Computing fresh dashboard summary for {company_id}...")
             
+            # One grouped count per collection instead of a count_documents per status
+            wf_counts, app_counts, doc_counts = await asyncio.gather(
+                cls._count_by(db.workflow_instances, company_id, "$status"),
+                cls._count_by(db.approval_requests, company_id, "$status"),
+                cls._count_by(db.ai_document_memory, company_id, "$source"),
+            )
+
             # Workflow statuses
-            wf_total = await db.workflow_instances.count_documents({"company_id": company_id})
-            wf_running = await db.workflow_instances.count_documents({"company_id": company_id, "status": "RUNNING"})
-            wf_completed = await db.workflow_instances.count_documents({"company_id": company_id, "status": "COMPLETED"})
-            wf_paused = await db.workflow_instances.count_documents({"company_id": company_id, "status": "PAUSED"})
-            wf_failed = await db.workflow_instances.count_documents({"company_id": company_id, "status": "FAILED"})
+            wf_total = sum(wf_counts.values())
+            wf_running = wf_counts.get("RUNNING", 0)
+            wf_completed = wf_counts.get("COMPLETED", 0)
+            wf_paused = wf_counts.get("PAUSED", 0)
+            wf_failed = wf_counts.get("FAILED", 0)
 
             # Approval requests statuses
-            app_total = await db.approval_requests.count_documents({"company_id": company_id})
-            app_pending = await db.approval_requests.count_documents({"company_id": company_id, "status": "PENDING"})
-            app_approved = await db.approval_requests.count_documents({"company_id": company_id, "status": "APPROVED"})
-            app_rejected = await db.approval_requests.count_documents({"company_id": company_id, "status": "REJECTED"})
+            app_total = sum(app_counts.values())
+            app_pending = app_counts.get("PENDING", 0)
+            app_approved = app_counts.get("APPROVED", 0)
+            app_rejected = app_counts.get("REJECTED", 0)
 
             # Simple document status counts
-            doc_total = await db.ai_document_memory.count_documents({"company_id": company_id})
-            doc_zero_touch = await db.ai_document_memory.count_documents({"company_id": company_id, "source": "ai_zero_touch"})
+            doc_total = sum(doc_counts.values())
+            doc_zero_touch = doc_counts.get("ai_zero_touch", 0)
 
             # Assemble clean output structure
             dashboard_data = {
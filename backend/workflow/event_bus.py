@@ -1,6 +1,11 @@
 import asyncio
 import logging
-from typing import Dict, Any, List, Callable, Awaitable
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Callable, Awaitable, Optional
 from backend.workflow.business_events import BusinessEventCreator
 
 logger = logging.getLogger("event_bus")
@@ -8,8 +13,44 @@ logger = logging.getLogger("event_bus")
 # Type alias for event listeners/subscribers
 EventListener = Callable[[Dict[str, Any]], Awaitable[None]]
 
+# The business_events collection doubles as the outbox: every published event
+# carries a dispatch_status (pending → processing → done | dead) and is handed
+# to listeners by a bounded worker pool instead of one task per listener.
+WORKER_COUNT = int(os.environ.get("EVENT_BUS_WORKERS", "8"))
+DEFAULT_TYPE_CONCURRENCY = int(os.environ.get("EVENT_BUS_TYPE_CONCURRENCY", "4"))
+MAX_ATTEMPTS = 5
+LISTENER_TIMEOUT_SEC = 60
+LEASE_SEC = 300
+POLL_INTERVAL_SEC = 5
+RETRY_BASE_SEC = 10
+RETRY_MAX_SEC = 600
+
+AUTOMATION_KEY = "automation"
+# Set by the feeder on claimed events: the automation rule matched for the
+# whole batch at once (None: no rule). Never stored.
+PREMATCH_FIELD = "_automation_rule"
+
+
+def _listener_key(listener: EventListener) -> str:
+    return f"{getattr(listener, '__module__', '?')}.{getattr(listener, '__qualname__', repr(listener))}"
+
+
 class EventBus:
     _listeners: Dict[str, List[EventListener]] = {}
+    _type_limits: Dict[str, int] = {}
+    _type_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    _queue: Optional[asyncio.Queue] = None
+    _wakeup: Optional[asyncio.Event] = None
+    _tasks: List[asyncio.Task] = []
+    _stopping = False
+
+    _publish_times: deque = deque(maxlen=10000)
+    _metrics: Dict[str, Any] = {
+        "published": 0, "dispatched": 0, "retried": 0, "dead_lettered": 0,
+        "lag_ms_last": None, "lag_ms_max": 0, "lag_ms_total": 0,
+    }
+    _listener_stats: Dict[str, Dict[str, Any]] = {}
 
     @classmethod
     def subscribe(cls, event_type: str, listener: EventListener):
@@ -21,6 +62,25 @@ class EventBus:
         cls._listeners[event_type].append(listener)
         logger.info(f"Subscribed listener to event: {event_type}")
 
+    @classmethod
+    def set_concurrency(cls, event_type: str, limit: int):
+        """
+        Caps how many events of one type are dispatched at once on this worker.
+        """
+        cls._type_limits[event_type] = max(1, limit)
+        cls._type_semaphores.pop(event_type, None)
+
+    @staticmethod
+    def _outbox_fields() -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        return {
+            "dispatch_status": "pending",
+            "attempts": 0,
+            "queued_at": now,
+            "next_attempt_at": now,
+            "delivered": [],
+        }
+
     @classmethod
     async def publish(
         cls,
@@ -32,44 +92,304 @@ class EventBus:
         description: str = None
     ) -> Dict[str, Any]:
         """
-        Publishes a business event, logs it to database, and triggers all registered listeners.
+        Publishes a business event: it is stored in the outbox and delivered to
+        listeners and automation rules by the dispatcher (at least once).
         """
-        # 1. Create and store event
         event_doc = await BusinessEventCreator.create_event(
             company_id=company_id,
             event_type=event_type,
             source_id=source_id,
             user_id=user_id,
             payload=payload,
-            description=description
+            description=description,
+            extra_fields=cls._outbox_fields()
         )
+        cls._record_published(1)
+        return event_doc
+
+    @classmethod
+    async def publish_many(cls, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Publishes a burst of events with one batched insert.
+        Each item needs company_id, event_type, source_id, user_id and payload.
+        """
+        event_docs = await BusinessEventCreator.create_events(events, extra_fields=cls._outbox_fields())
+        cls._record_published(len(event_docs))
+        return event_docs
 
-        # 2. Fire listeners in a non-blocking task
-        listeners = cls._listeners.get(event_type, [])
-        generic_listeners = cls._listeners.get("*", [])  # Optional wildcard match
-        all_listeners = listeners + generic_listeners
+    @classmethod
+    def _record_published(cls, count: int):
+        now = time.monotonic()
+        cls._metrics["published"] += count
+        cls._publish_times.extend([now] * min(count, cls._publish_times.maxlen))
+        if cls._wakeup:
+            cls._wakeup.set()
 
-        for listener in all_listeners:
-            asyncio.create_task(cls._execute_listener(listener, event_doc))
+    # ── Dispatcher ───────────────────────────────────────────────────────────
 
-        # 3. Dynamic automation rule triggering
-        # We also trigger automation rule checks here as requested
-        from backend.workflow.automation_engine import AutomationEngine
-        asyncio.create_task(cls._trigger_automation(event_doc))
+    @classmethod
+    def start(cls):
+        """
+        Starts the outbox feeder and the bounded worker pool.
+        """
+        if cls._tasks:
+            return
+        cls._stopping = False
+        cls._queue = asyncio.Queue(maxsize=WORKER_COUNT * 4)
+        cls._wakeup = asyncio.Event()
+        loop = asyncio.get_event_loop()
+        cls._tasks = [loop.create_task(cls._feeder())]
+        cls._tasks += [loop.create_task(cls._worker()) for _ in range(WORKER_COUNT)]
+        logger.info(f"Event bus dispatcher started with {WORKER_COUNT} workers")
 
-        return event_doc
+    @classmethod
+    async def stop(cls):
+        # wait_for() can swallow a cancel that races the wakeup event, so the
+        # loops also check this flag
+        cls._stopping = True
+        if cls._wakeup:
+            cls._wakeup.set()
+        for task in cls._tasks:
+            task.cancel()
+        if cls._tasks:
+            await asyncio.gather(*cls._tasks, return_exceptions=True)
+        cls._tasks = []
+        # Events still queued or mid-flight keep their lease and are re-claimed
+        # once it expires.
+        logger.info("Event bus dispatcher stopped")
+
+    @classmethod
+    async def _claim_batch(cls, limit: int) -> List[Dict[str, Any]]:
+        from backend.dependencies import db
+        now = datetime.now(timezone.utc)
+        claimable = {
+            "$or": [
+                {"dispatch_status": "pending", "next_attempt_at": {"$lte": now}},
+                {"dispatch_status": "processing", "lease_until": {"$lt": now}},
+            ]
+        }
+        candidates = await db.business_events.find(claimable, {"_id": 0, "id": 1}) \
+            .sort("next_attempt_at", 1).limit(limit).to_list(limit)
+        if not candidates:
+            return []
+
+        token = uuid.uuid4().hex
+        await db.business_events.update_many(
+            {"$and": [{"id": {"$in": [c["id"] for c in candidates]}}, claimable]},
+            {"$set": {
+                "dispatch_status": "processing",
+                "claim_token": token,
+                "lease_until": now + timedelta(seconds=LEASE_SEC),
+            }}
+        )
+        return await db.business_events.find({"claim_token": token}, {"_id": 0}).to_list(limit)
+
+    @classmethod
+    async def _feeder(cls):
+        while not cls._stopping:
+            try:
+                free = cls._queue.maxsize - cls._queue.qsize()
+                claimed = await cls._claim_batch(free) if free > 0 else []
+                await cls._prematch_automation(claimed)
+                for event in claimed:
+                    # Blocks when workers are saturated — that is the backpressure
+                    await cls._queue.put(event)
+                if len(claimed) < free:
+                    cls._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(cls._wakeup.wait(), timeout=POLL_INTERVAL_SEC)
+                    except asyncio.TimeoutError:
+                        pass
+                elif free <= 0:
+                    await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Event bus feeder error: {e}", exc_info=True)
+                await asyncio.sleep(POLL_INTERVAL_SEC)
 
     @classmethod
-    async def _execute_listener(cls, listener: EventListener, event_doc: Dict[str, Any]):
+    async def _prematch_automation(cls, events: List[Dict[str, Any]]):
+        """
+        Matches a claimed batch against the compiled automation rules, one
+        pass per (company, event type). If that fails each event is matched
+        on its own when it is dispatched.
+        """
+        from backend.workflow.automation_engine import AutomationEngine
+        pending = [
+            e for e in events
+            if AUTOMATION_KEY not in (e.get("delivered") or []) and e.get("company_id") and e.get("event_type")
+        ]
+        if not pending:
+            return
         try:
-            await listener(event_doc)
+            matches = await AutomationEngine.match_events(pending)
         except Exception as e:
-            logger.error(f"Error executing listener for event {event_doc.get('event_type')}: {e}", exc_info=True)
+            logger.warning(f"Batch automation matching failed, matching per event: {e}")
+            return
+        for event, matched_rule in zip(pending, matches):
+            event[PREMATCH_FIELD] = matched_rule
+
+    @classmethod
+    def _semaphore_for(cls, event_type: str) -> asyncio.Semaphore:
+        sem = cls._type_semaphores.get(event_type)
+        if sem is None:
+            sem = asyncio.Semaphore(cls._type_limits.get(event_type, DEFAULT_TYPE_CONCURRENCY))
+            cls._type_semaphores[event_type] = sem
+        return sem
+
+    @classmethod
+    async def _worker(cls):
+        while True:
+            try:
+                event = await cls._queue.get()
+            except asyncio.CancelledError:
+                break
+            try:
+                async with cls._semaphore_for(event.get("event_type", "")):
+                    await cls._dispatch(event)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Event bus worker error on {event.get('id')}: {e}", exc_info=True)
+            finally:
+                cls._queue.task_done()
 
     @classmethod
-    async def _trigger_automation(cls, event_doc: Dict[str, Any]):
+    async def _dispatch(cls, event_doc: Dict[str, Any]):
+        from backend.dependencies import db
+        queued_at = event_doc.get("queued_at")
+        if isinstance(queued_at, datetime):
+            if queued_at.tzinfo is None:
+                queued_at = queued_at.replace(tzinfo=timezone.utc)
+            lag_ms = int((datetime.now(timezone.utc) - queued_at).total_seconds() * 1000)
+            cls._metrics["lag_ms_last"] = lag_ms
+            cls._metrics["lag_ms_max"] = max(cls._metrics["lag_ms_max"], lag_ms)
+            cls._metrics["lag_ms_total"] += lag_ms
+
+        event_type = event_doc.get("event_type")
+        prematched = PREMATCH_FIELD in event_doc
+        matched_rule = event_doc.pop(PREMATCH_FIELD, None)
+
+        async def automation(doc: Dict[str, Any]):
+            await cls._trigger_automation(doc, matched_rule if prematched else None, prematched)
+
+        targets = [(_listener_key(l), l) for l in cls._listeners.get(event_type, []) + cls._listeners.get("*", [])]
+        targets.append((AUTOMATION_KEY, automation))
+
+        # Listeners that succeeded on an earlier attempt are not re-run
+        delivered = set(event_doc.get("delivered") or [])
+        errors = []
+        for key, listener in targets:
+            if key in delivered:
+                continue
+            error = await cls._execute_listener(key, listener, event_doc)
+            if error:
+                errors.append(f"{key}: {error}")
+            else:
+                delivered.add(key)
+
+        attempts = (event_doc.get("attempts") or 0) + 1
+        update: Dict[str, Any] = {"attempts": attempts, "delivered": sorted(delivered), "claim_token": None}
+        if not errors:
+            update.update(dispatch_status="done", dispatched_at=datetime.now(timezone.utc), last_error=None)
+            cls._metrics["dispatched"] += 1
+        elif attempts >= MAX_ATTEMPTS:
+            update.update(dispatch_status="dead", last_error="; ".join(errors))
+            cls._metrics["dead_lettered"] += 1
+            logger.error(f"Event {event_doc.get('id')} ({event_type}) dead-lettered after {attempts} attempts: {errors}")
+        else:
+            delay = min(RETRY_MAX_SEC, RETRY_BASE_SEC * (2 ** (attempts - 1)))
+            update.update(
+                dispatch_status="pending",
+                next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+                last_error="; ".join(errors),
+            )
+            cls._metrics["retried"] += 1
+
+        await db.business_events.update_one(
+            {"id": event_doc["id"], "claim_token": event_doc.get("claim_token")},
+            {"$set": update}
+        )
+
+    @classmethod
+    async def _execute_listener(cls, key: str, listener: EventListener, event_doc: Dict[str, Any]) -> Optional[str]:
+        stats = cls._listener_stats.setdefault(key, {"calls": 0, "failures": 0, "total_ms": 0, "max_ms": 0})
+        started = time.monotonic()
+        error = None
         try:
-            from backend.workflow.automation_engine import AutomationEngine
-            await AutomationEngine.trigger_by_event(event_doc)
+            await asyncio.wait_for(listener(event_doc), timeout=LISTENER_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            error = f"timed out after {LISTENER_TIMEOUT_SEC}s"
         except Exception as e:
-            logger.error(f"Error in automatic workflow event routing: {e}", exc_info=True)
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"Error executing listener {key} for event {event_doc.get('event_type')}: {e}", exc_info=True)
+        elapsed = int((time.monotonic() - started) * 1000)
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed
+        stats["max_ms"] = max(stats["max_ms"], elapsed)
+        if error:
+            stats["failures"] += 1
+        return error
+
+    @classmethod
+    async def _trigger_automation(cls, event_doc: Dict[str, Any],
+                                  matched_rule: Optional[Dict[str, Any]] = None, prematched: bool = False):
+        from backend.workflow.automation_engine import AutomationEngine
+        if prematched:
+            await AutomationEngine.run_matched(event_doc, matched_rule)
+        else:
+            await AutomationEngine.trigger_by_event(event_doc, raise_errors=True)
+
+    # ── Operations ───────────────────────────────────────────────────────────
+
+    @classmethod
+    async def redrive_dead_letters(cls, company_id: Optional[str] = None) -> int:
+        """
+        Puts dead-lettered events back into the outbox with a fresh attempt budget.
+        """
+        from backend.dependencies import db
+        query: Dict[str, Any] = {"dispatch_status": "dead"}
+        if company_id:
+            query["company_id"] = company_id
+        result = await db.business_events.update_many(
+            query,
+            {"$set": {"dispatch_status": "pending", "attempts": 0,
+                      "next_attempt_at": datetime.now(timezone.utc)}}
+        )
+        if cls._wakeup:
+            cls._wakeup.set()
+        return result.modified_count
+
+    @classmethod
+    async def get_metrics(cls) -> Dict[str, Any]:
+        """
+        Publish rate, dispatch lag, listener latency and outbox depth.
+        Counters are per worker process; outbox counts are cluster-wide.
+        """
+        from backend.dependencies import db
+        now = time.monotonic()
+        recent = sum(1 for t in cls._publish_times if now - t <= 60)
+        m = cls._metrics
+        finished = m["dispatched"] + m["retried"] + m["dead_lettered"]
+        outbox = {}
+        for status in ("pending", "processing", "dead"):
+            outbox[status] = await db.business_events.count_documents({"dispatch_status": status})
+        return {
+            "published_total": m["published"],
+            "publish_rate_per_min": recent,
+            "dispatched": m["dispatched"],
+            "retried": m["retried"],
+            "dead_lettered": m["dead_lettered"],
+            "lag_ms": {
+                "last": m["lag_ms_last"],
+                "max": m["lag_ms_max"],
+                "avg": round(m["lag_ms_total"] / finished) if finished else None,
+            },
+            "queue_depth": cls._queue.qsize() if cls._queue else 0,
+            "outbox": outbox,
+            "listeners": {
+                key: {**s, "avg_ms": round(s["total_ms"] / s["calls"]) if s["calls"] else None}
+                for key, s in cls._listener_stats.items()
+            },
+        }
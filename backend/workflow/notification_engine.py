@@ -120,6 +120,7 @@ class NotificationEngine:
     async def _dispatch_in_app(cls, notif: Dict[str, Any]):
         """Saves an in-app alert inside the notifications or reminders collection."""
         from backend.dependencies import db
+        from backend import live_events
         alert = {
             "id": notif["id"],
             "user_id": notif["user_id"],
@@ -130,6 +131,7 @@ class NotificationEngine:
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         await db.notifications.insert_one(alert)
+        await live_events.notifications_created([alert])
         logger.info(f"In-App Notification saved for User {notif['user_id']}.")
 
     @classmethod
@@ -1,10 +1,100 @@
 import logging
-from typing import Dict, Any, List, Optional
+import time
+from typing import Dict, Any, List, Optional, Callable, Tuple, FrozenSet
 from backend.workflow.workflow_storage import WorkflowStorage
 
 logger = logging.getLogger("rule_engine")
 
+# Compiled rule sets are cached per (company_id, rule_type). Writes through
+# WorkflowStorage.save_automation_rule invalidate the entry on this worker;
+# the TTL bounds staleness for writes made on other workers.
+RULE_CACHE_TTL_SEC = 60
+
+Check = Callable[[Any], bool]
+
+
+def _never(_val: Any) -> bool:
+    return False
+
+
+def _compile_condition(op: str, threshold: Any) -> Check:
+    """
+    Turns one condition into a closure with the threshold pre-converted.
+    Mirrors RuleEngine.evaluate_condition: any conversion/type error is a non-match.
+    """
+    if op == "==":
+        return lambda v: v == threshold
+    if op == "!=":
+        return lambda v: v != threshold
+    if op in (">", "<", ">=", "<="):
+        try:
+            t = float(threshold)
+        except (TypeError, ValueError):
+            return _never
+        cmp = {
+            ">": lambda a: a > t,
+            "<": lambda a: a < t,
+            ">=": lambda a: a >= t,
+            "<=": lambda a: a <= t,
+        }[op]
+
+        def numeric(v: Any) -> bool:
+            try:
+                return cmp(float(v))
+            except (TypeError, ValueError):
+                return False
+        return numeric
+    if op == "in":
+        # Hashable scalars in a list/tuple/set threshold use a set lookup
+        members = None
+        if isinstance(threshold, (list, tuple, set, frozenset)):
+            try:
+                members = frozenset(threshold)
+            except TypeError:
+                members = None
+
+        def in_check(v: Any) -> bool:
+            try:
+                if members is not None and v.__hash__ is not None:
+                    return v in members
+                return v in threshold
+            except TypeError:
+                return False
+        return in_check
+    if op == "contains":
+        def contains(v: Any) -> bool:
+            try:
+                return threshold in v
+            except TypeError:
+                return False
+        return contains
+    return _never
+
+
+class CompiledRule:
+    __slots__ = ("rule", "fields", "checks")
+
+    def __init__(self, rule: Dict[str, Any]):
+        self.rule = rule
+        self.checks: List[Tuple[str, Check]] = [
+            (cond.get("field"), _compile_condition(cond.get("operator"), cond.get("threshold")))
+            for cond in rule.get("conditions", []) or []
+        ]
+        # Fields that must be present (non-None) for the rule to be considered
+        self.fields: FrozenSet[str] = frozenset(f for f, _ in self.checks)
+
+    def matches(self, data: Dict[str, Any]) -> bool:
+        for field, check in self.checks:
+            val = data.get(field)
+            if val is None or not check(val):
+                return False
+        return True
+
+
 class RuleEngine:
+    # (company_id, rule_type) -> (loaded_at monotonic, rules sorted by priority desc)
+    _compiled_cache: Dict[Tuple[str, str], Tuple[float, List[CompiledRule]]] = {}
+
     @staticmethod
     def evaluate_condition(field_val: Any, op: str, threshold: Any) -> bool:
         """
@@ -33,53 +123,81 @@ class RuleEngine:
             return False
 
     @classmethod
-    async def match_rule(cls, company_id: str, rule_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def invalidate(cls, company_id: Optional[str] = None, rule_type: Optional[str] = None):
+        """
+        Drops cached compiled rules. With no arguments the whole cache is cleared.
+        """
+        if company_id is None and rule_type is None:
+            cls._compiled_cache.clear()
+            return
+        for key in list(cls._compiled_cache):
+            if (company_id is None or key[0] == company_id) and (rule_type is None or key[1] == rule_type):
+                cls._compiled_cache.pop(key, None)
+
+    @classmethod
+    async def get_compiled_rules(cls, company_id: str, rule_type: str) -> List[CompiledRule]:
+        """
+        Active rules for (company, type), compiled and sorted by priority desc.
+        """
+        key = (company_id, rule_type)
+        cached = cls._compiled_cache.get(key)
+        if cached and time.monotonic() - cached[0] < RULE_CACHE_TTL_SEC:
+            return cached[1]
+
+        query = {
+            "company_id": company_id,
+            "rule_type": rule_type,
+            "is_active": True
+        }
+        rules = await WorkflowStorage.list_automation_rules(query)
+        # Sort by priority desc if priority exists, else storage order
+        rules = sorted(rules, key=lambda r: r.get("priority", 0), reverse=True)
+        compiled = [CompiledRule(r) for r in rules]
+        cls._compiled_cache[key] = (time.monotonic(), compiled)
+        return compiled
+
+    @staticmethod
+    def _first_match(compiled: List[CompiledRule], data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        present = {k for k, v in data.items() if v is not None}
+        for cr in compiled:
+            if cr.fields <= present and cr.matches(data):
+                return cr.rule
+        return None
+
+    @classmethod
+    async def match_rule(cls, company_id: str, rule_type: str, data: Dict[str, Any],
+                         raise_errors: bool = False) -> Optional[Dict[str, Any]]:
         """
         Finds and evaluates active configurable rules for a given type.
+        A rule with no conditions is an unconditional fallback and always matches.
+        With raise_errors a failure to load the rules propagates instead of
+        reading as "no match".
         """
         try:
-            query = {
-                "company_id": company_id,
-                "rule_type": rule_type,
-                "is_active": True
-            }
-            rules = await WorkflowStorage.list_automation_rules(query)
-            
-            # Sort by priority desc if priority exists, else random order
-            rules = sorted(rules, key=lambda r: r.get("priority", 0), reverse=True)
-            
-            for rule in rules:
-                conditions = rule.get("conditions", [])
-                if not conditions:
-                    # Default/fallback rule with no conditions is always a match
-                    logger.info(f"Unconditional rule matched: {rule.get('id')} ({rule.get('name')})")
-                    return rule
-                
-                # Check if all conditions are met
-                all_met = True
-                for cond in conditions:
-                    field = cond.get("field")
-                    op = cond.get("operator")
-                    threshold = cond.get("threshold")
-                    
-                    val = data.get(field)
-                    if val is None:
-                        all_met = False
-                        break
-                        
-                    if not cls.evaluate_condition(val, op, threshold):
-                        all_met = False
-                        break
-                
-                if all_met:
-                    logger.info(f"Rule matched: {rule.get('id')} ({rule.get('name')})")
-                    return rule
-            
-            return None
+            compiled = await cls.get_compiled_rules(company_id, rule_type)
+            rule = cls._first_match(compiled, data)
+            if rule:
+                logger.info(f"Rule matched: {rule.get('id')} ({rule.get('name')})")
+            return rule
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Rule Engine failed matching rules: {e}", exc_info=True)
             return None
 
+    @classmethod
+    async def match_rules_batch(cls, company_id: str, rule_type: str, items: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Matches many payloads against one compiled rule set in a single pass.
+        Returns the matched rule (or None) for each item, in input order.
+        A failure to load the rules propagates: the caller falls back to
+        matching each item on its own rather than reading it as "no match".
+        """
+        compiled = await cls.get_compiled_rules(company_id, rule_type)
+        if not compiled:
+            return [None] * len(items)
+        return [cls._first_match(compiled, data) for data in items]
+
     @classmethod
     async def get_required_approval_levels(cls, company_id: str, doc_type: str, total_value: float, data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from typing import Set
 from backend.workflow.approval_engine import ApprovalEngine
@@ -6,49 +5,46 @@ from backend.workflow.automation_engine import AutomationEngine
 
 logger = logging.getLogger("workflow_scheduler")
 
+JOB_ID = "workflow_escalations"
+
+
 class WorkflowScheduler:
-    _task: asyncio.Task = None
     _active_companies: Set[str] = set()
 
     @classmethod
     def start(cls):
-        """Starts the asynchronous background loop for escalations and automation tasks."""
-        if cls._task is not None and not cls._task.done():
-            logger.info("Workflow background scheduler is already running.")
+        """Registers escalation and automation checks on the shared job runner (every 15 s)."""
+        from backend.job_runner import job_runner, every
+
+        if job_runner.get_job(JOB_ID):
+            logger.info("Workflow background scheduler is already registered.")
             return
 
-        cls._task = asyncio.create_task(cls._loop())
-        logger.info("Workflow background scheduler loop initiated.")
+        job_runner.add_job(JOB_ID, cls.run_once, every(seconds=15), timeout=120)
+        logger.info("Workflow background scheduler job registered.")
 
     @classmethod
     def stop(cls):
-        if cls._task:
-            cls._task.cancel()
-            cls._task = None
-            logger.info("Workflow background scheduler loop stopped.")
+        from backend.job_runner import job_runner
+
+        job_runner.remove_job(JOB_ID)
+        logger.info("Workflow background scheduler job removed.")
 
     @classmethod
     def register_company(cls, company_id: str):
         cls._active_companies.add(company_id)
 
     @classmethod
-    async def _loop(cls):
-        while True:
+    async def run_once(cls):
+        # Default safety fallback company ID
+        companies = list(cls._active_companies) or ["default_comp"]
+
+        for company_id in companies:
             try:
-                # Runs every 60 seconds (or 10 seconds for real-time responsiveness)
-                await asyncio.sleep(15)
-                
-                # Default safety fallback company ID
-                companies = list(cls._active_companies) or ["default_comp"]
-                
-                for company_id in companies:
-                    # 1. Escalate and notify expired approvals
-                    await ApprovalEngine.escalate_and_notify_expiry(company_id)
-                    
-                    # 2. Trigger periodic automation checks
-                    await AutomationEngine.run_scheduled_automations(company_id)
-
-            except asyncio.CancelledError:
-                break
+                # 1. Escalate and notify expired approvals
+                await ApprovalEngine.escalate_and_notify_expiry(company_id)
+
+                # 2. Trigger periodic automation checks
+                await AutomationEngine.run_scheduled_automations(company_id)
             except Exception as e:
                 logger.error(f"Error in workflow scheduler execution step: {e}", exc_info=True)
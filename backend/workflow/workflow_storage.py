@@ -119,6 +119,8 @@ class WorkflowStorage:
             doc["created_at"] = cls._now_iso()
         doc["updated_at"] = cls._now_iso()
         await db.automation_rules.update_one({"id": doc["id"]}, {"$set": doc}, upsert=True)
+        from backend.workflow.rule_engine import RuleEngine
+        RuleEngine.invalidate(doc.get("company_id"))
         return doc["id"]
 
     @classmethod
@@ -135,6 +137,17 @@ class WorkflowStorage:
         await db.business_events.insert_one(doc)
         return doc["id"]
 
+    @classmethod
+    async def save_business_events(cls, docs: List[Dict[str, Any]]) -> List[str]:
+        for doc in docs:
+            if "id" not in doc:
+                doc["id"] = cls._generate_id()
+            if "timestamp" not in doc:
+                doc["timestamp"] = cls._now_iso()
+        if docs:
+            await db.business_events.insert_many(docs, ordered=False)
+        return [doc["id"] for doc in docs]
+
     @classmethod
     async def list_business_events(cls, query: Dict[str, Any], limit: int = 100) -> List[Dict[str, Any]]:
         return await db.business_events.find(query, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
@@ -207,6 +220,17 @@ class WorkflowStorage:
         await db.workflow_audit.insert_one(doc)
         return doc["id"]
 
+    @classmethod
+    async def save_workflow_audits(cls, docs: List[Dict[str, Any]]) -> List[str]:
+        for doc in docs:
+            if "id" not in doc:
+                doc["id"] = cls._generate_id()
+            if "timestamp" not in doc:
+                doc["timestamp"] = cls._now_iso()
+        if docs:
+            await db.workflow_audit.insert_many(docs, ordered=False)
+        return [doc["id"] for doc in docs]
+
     @classmethod
     async def get_audit_trail(cls, query: Dict[str, Any], limit: int = 500) -> List[Dict[str, Any]]:
         return await db.workflow_audit.find(query, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
@@ -70,8 +70,10 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Q
 from pydantic import BaseModel, Field
 
 from backend.dependencies import db, get_current_user
+from backend.index_manifest import ensure_indexes, index
 from backend.models import User
 from backend import accounting_core as ac
+from backend.search import party_index
 
 router = APIRouter(prefix="/api/zte", tags=["Zero-Touch Entry Engine"])
 
@@ -234,11 +236,11 @@ async def resolve_company(current_user: User, extracted: dict) -> Tuple[Optional
     Returns (company_id or None, human-readable reason, all_candidate_companies)."""
     # Companies are org-wide master data (Admin -> Master Data), so never scope
     # them by created_by -- otherwise documents uploaded by a non-admin could
-    # not be matched to companies the admin created.
-    companies = await db.companies.find(
-        {},
-        {"_id": 0, "id": 1, "name": 1, "gstin": 1, "email": 1},
-    ).to_list(500)
+    # not be matched to companies the admin created. Served from the worker's
+    # party index instead of re-reading the collection for every document.
+    index = await party_index.get_index("companies")
+    companies = [{"id": c["id"], "name": c["name"], "gstin": c.get("gstin"), "email": c.get("email")}
+                 for c in index.all()]
 
     if not companies:
         return None, "No companies are configured in Company Profiles yet.", []
@@ -250,20 +252,26 @@ async def resolve_company(current_user: User, extracted: dict) -> Tuple[Optional
     billed_name = (extracted.get("billed_to_name") or "").lower().strip()
 
     if billed_gstin:
-        for c in companies:
-            if (c.get("gstin") or "").upper().strip() == billed_gstin:
-                return c["id"], f"Matched by GSTIN ({billed_gstin}) to '{c['name']}'.", companies
+        c = index.lookup("gstin", billed_gstin)
+        if c:
+            return c["id"], f"Matched by GSTIN ({billed_gstin}) to '{c['name']}'.", companies
 
     if billed_email:
-        for c in companies:
-            if (c.get("email") or "").lower().strip() == billed_email:
-                return c["id"], f"Matched by billing email ({billed_email}) to '{c['name']}'.", companies
+        c = index.lookup("email", billed_email)
+        if c:
+            return c["id"], f"Matched by billing email ({billed_email}) to '{c['name']}'.", companies
 
     if billed_name:
         for c in companies:
             cname = (c.get("name") or "").lower().strip()
             if cname and (billed_name in cname or cname in billed_name):
                 return c["id"], f"Matched by company name to '{c['name']}'.", companies
+        # Names that differ in legal form or word order ("Acme Pvt Ltd" vs
+        # "ACME Private Limited"): best token match, before asking the LLM.
+        best = index.top_k(billed_name, k=1, min_score=0.75)
+        if best:
+            score, c = best[0]
+            return c["id"], f"Matched by company name to '{c['name']}' (similarity {score:.0%}).", companies
 
     # ── AI fallback: deterministic GSTIN/email/name matching found nothing.
     # Ask the LLM to reason over the full extracted context (letterhead name,
@@ -332,38 +340,17 @@ Only pick a company if there is real textual/contextual evidence (name
 similarity, known trading name, business context) — do not pick one just
 because it's the only option left unexamined."""
 
-    import asyncio
-    try:
-        from backend.services.gemini_client import get_gemini_client
-        from google.genai import types as genai_types  # type: ignore
-    except Exception as e:
-        _zte_logger.exception("Gemini SDK unavailable for company match")
-        return None, f"AI company match unavailable: {e}", 0.0
-
-    def _call_gemini_sync():
-        client = get_gemini_client()
-        cfg = genai_types.GenerateContentConfig(
-            temperature=0,
-            max_output_tokens=512,
-            response_mime_type="application/json",
-        )
-        return client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config=cfg,
-        )
+    from backend.ai import llm_gateway
 
     try:
-        response = await asyncio.to_thread(_call_gemini_sync)
-        raw = getattr(response, "text", "") or ""
-        if not raw:
-            try:
-                parts = response.candidates[0].content.parts  # type: ignore[attr-defined]
-                raw = "".join(getattr(p, "text", "") for p in parts)
-            except Exception:
-                raw = ""
-        if not raw:
-            return None, "AI company match returned empty response.", 0.0
+        raw = await llm_gateway.generate(
+            "company_match",
+            prompt,
+            json_mode=True,
+            max_tokens=512,
+            provider="gemini",
+            models={"gemini": "gemini-2.5-flash"},
+        )
         parsed = json.loads(_strip_json_fence(raw))
     except HTTPException as e:
         return None, f"AI company match failed: {e.detail}", 0.0
@@ -408,12 +395,12 @@ async def _get_category_rules(company_id: str) -> List[dict]:
 
 async def classify_expense_account(company_id: str, vendor_name: str) -> Tuple[str, str]:
     """Returns (account_code, category_label) for a PURCHASE line, falling back
-    to the generic 'Purchases' account when no rule matches."""
-    rules = await _get_category_rules(company_id)
-    vn = (vendor_name or "").lower()
-    for rule in rules:
-        if re.search(rule["match"], vn, flags=re.IGNORECASE):
-            return rule["account_code"], rule["label"]
+    to the generic 'Purchases' account when no rule matches. The rules are
+    compiled once per company and cached by the party index."""
+    rules = await party_index.category_rules(company_id, DEFAULT_CATEGORY_RULES)
+    rule = party_index.first_rule(rules, (vendor_name or "").lower())
+    if rule:
+        return rule["account_code"], rule["label"]
     return "5000", "Purchases (uncategorised)"
 
 
@@ -439,6 +426,7 @@ async def add_category_rule(rule: CategoryRule, current_user: User = Depends(get
     doc["created_at"] = datetime.now(timezone.utc).isoformat()
     await db.zte_category_rules.insert_one(doc)
     doc.pop("_id", None)
+    await party_index.record_change("rules", None, doc)
     return doc
 
 
@@ -1024,8 +1012,14 @@ async def reject_document(doc_id: str, body: RejectBody, current_user: User = De
     return {"success": True, "status": "rejected"}
 
 
+INDEXES = [
+    index("zte_processed_documents", "company_id"),
+    index("zte_processed_documents", "status"),
+    index("zte_category_rules", "company_id"),
+    index("fx_rate_cache", "id", unique=True),
+]
+
+
 async def create_zte_indexes():
-    await db.zte_processed_documents.create_index("company_id")
-    await db.zte_processed_documents.create_index("status")
-    await db.zte_category_rules.create_index("company_id")
-    await db.fx_rate_cache.create_index("id", unique=True)
+    """Ensure the zero-touch entry indexes."""
+    await ensure_indexes(INDEXES)
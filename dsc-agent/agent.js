@@ -79,6 +79,7 @@ const productivityEngine   = require('./modules/productivityEngine');
 const healthMonitor        = require('./modules/healthMonitor');
 const notificationReceiver = require('./modules/notificationReceiver');
 const offlineQueue         = require('./modules/offlineQueue');
+const deltaSync            = require('./modules/deltaSync');
 const autoUpdater          = require('./modules/autoUpdater');
 const systemInfo           = require('./modules/systemInfo');
 const tray                 = require('./modules/tray');
@@ -108,19 +109,35 @@ async function syncAll() {
 
   console.log('[agent] Running full sync...');
 
-  // 1. Activity
+  // 1. Activity — incremental push; full snapshot only for older backends
   try {
     const actReport = activityTracker.getReport();
     const idleMetrics = idleDetector.getMetrics();
-    await apiClient.post('/api/desktop/activity', {
+    const today = new Date().toISOString().slice(0, 10);
+    const delta = deltaSync.next('activity', today, {
+      activeSeconds: actReport.activeSeconds,
+      idleSeconds:   idleMetrics.idleSeconds,
+      focusSeconds:  idleMetrics.activeSeconds,
+    }, {
+      appSeconds: Object.fromEntries(actReport.topApps.map(a => [a.name, a.seconds])),
+    });
+    const ackResult = await apiClient.post('/api/desktop/activity/delta', {
       agent_id:     AGENT_ID,
       user_id:      authUserId,
       machine_name: os.hostname(),
-      date:         new Date().toISOString().slice(0, 10),
-      ...actReport,
-      idleSeconds:  idleMetrics.idleSeconds,
-      focusSeconds: idleMetrics.activeSeconds,
+      ...delta,
     }, authToken);
+    if (!deltaSync.ack('activity', ackResult)) {
+      await apiClient.post('/api/desktop/activity', {
+        agent_id:     AGENT_ID,
+        user_id:      authUserId,
+        machine_name: os.hostname(),
+        date:         today,
+        ...actReport,
+        idleSeconds:  idleMetrics.idleSeconds,
+        focusSeconds: idleMetrics.activeSeconds,
+      }, authToken);
+    }
   } catch (e) {
     offlineQueue.enqueue('/api/desktop/activity', {
       agent_id: AGENT_ID, user_id: authUserId, machine_name: os.hostname(),
@@ -132,12 +149,25 @@ async function syncAll() {
   // 2. Browser
   try {
     const browserReport = browserTracker.getReport();
-    await apiClient.post('/api/desktop/browser', {
+    const delta = deltaSync.next('browser', browserReport.date, {
+      totalBrowseSeconds: browserReport.totalBrowseSeconds,
+    }, {
+      domainSeconds: Object.fromEntries(browserReport.topDomains.map(d => [d.domain, d.seconds])),
+    });
+    const ackResult = await apiClient.post('/api/desktop/browser/delta', {
       agent_id:     AGENT_ID,
       user_id:      authUserId,
       machine_name: os.hostname(),
-      ...browserReport,
+      ...delta,
     }, authToken);
+    if (!deltaSync.ack('browser', ackResult)) {
+      await apiClient.post('/api/desktop/browser', {
+        agent_id:     AGENT_ID,
+        user_id:      authUserId,
+        machine_name: os.hostname(),
+        ...browserReport,
+      }, authToken);
+    }
   } catch (e) {
     offlineQueue.enqueue('/api/desktop/browser', {
       agent_id: AGENT_ID, user_id: authUserId,
@@ -0,0 +1,83 @@
+'use strict';
+
+/**
+ * deltaSync.js
+ * ─────────────────────────────────────────────────────────────────────────────
+ * Turns the cumulative activity / browser reports into incremental pushes for
+ * POST /api/desktop/activity/delta and /api/desktop/browser/delta.
+ *
+ * Each push carries only what changed since the last acknowledged push, plus
+ * a per-day sequence number. The backend answers with `ack_seq`:
+ *   - on ack, the sent snapshot becomes the new baseline;
+ *   - on failure, the same payload (same seq) is resent first next time, so
+ *     a push that reached the server but timed out is dropped as a duplicate
+ *     instead of being counted twice.
+ *
+ * Older backends without the delta routes never return `ack_seq`; callers then
+ * fall back to the full-snapshot endpoints.
+ */
+
+// kind → { date, seq, baseline: { counters, maps }, pending }
+const state = {};
+
+function round(n) {
+  return Math.round((n || 0) * 10) / 10;
+}
+
+function diffCounters(current, baseline) {
+  const out = {};
+  for (const [k, v] of Object.entries(current)) {
+    out[k] = Math.max(0, round(v - (baseline[k] || 0)));
+  }
+  return out;
+}
+
+function diffMap(current, baseline) {
+  const out = {};
+  for (const [name, secs] of Object.entries(current)) {
+    const d = round(secs - ((baseline && baseline[name]) || 0));
+    if (d > 0) out[name] = d;
+  }
+  return out;
+}
+
+/**
+ * Build the next delta payload for `kind`.
+ * @param {string} kind      - 'activity' | 'browser'
+ * @param {string} date      - report date (YYYY-MM-DD); a new date resets seq
+ * @param {object} counters  - cumulative scalar counters, e.g. { activeSeconds }
+ * @param {object} maps      - cumulative per-name seconds, e.g. { appSeconds: { chrome: 120 } }
+ * @param {object} [lists]   - new list items since the last build, e.g. { visits: [...] }
+ * @returns {object} payload fields including `seq` and `date`
+ */
+function next(kind, date, counters, maps, lists = {}) {
+  let s = state[kind];
+  if (!s || s.date !== date) {
+    s = state[kind] = { date, seq: 0, baseline: { counters: {}, maps: {} }, pending: null };
+  }
+  if (s.pending) return s.pending.payload;
+
+  const payload = { date, seq: s.seq + 1, ...diffCounters(counters, s.baseline.counters), ...lists };
+  for (const [field, current] of Object.entries(maps)) {
+    payload[field] = diffMap(current, s.baseline.maps[field]);
+  }
+  s.pending = { payload, snapshot: { counters: { ...counters }, maps: JSON.parse(JSON.stringify(maps)) } };
+  return payload;
+}
+
+/**
+ * Record the server response for the pending push of `kind`.
+ * @returns {boolean} true if the server speaks the delta protocol
+ */
+function ack(kind, result) {
+  const s = state[kind];
+  if (!s || !s.pending || !result || result.ack_seq === undefined) return false;
+  if (result.ack_seq >= s.pending.payload.seq) {
+    s.seq      = s.pending.payload.seq;
+    s.baseline = s.pending.snapshot;
+    s.pending  = null;
+  }
+  return true;
+}
+
+module.exports = { next, ack };
@@ -2452,8 +2452,16 @@ function EmailComposePanel({ isDark }) {
         attachment_base64: composeAttachB64 || null,
         attachment_name:   composeAttachName || null,
       });
-      setProgress({ done: r.data.sent, total: selectedClients.length, failed: r.data.failed });
-      toast.success(`✅ ${r.data.sent} email(s) sent`);
+      let d = r.data;
+      setProgress({ done: d.sent, total: selectedClients.length, failed: d.failed });
+      // SMTP sends run as a background job: follow it until it finishes
+      while (d.job_id && d.status === 'running') {
+        await new Promise(res => setTimeout(res, 2000));
+        d = (await api.get(`/email/bulk-jobs/${d.job_id}`)).data;
+        setProgress({ done: d.sent, total: selectedClients.length, failed: d.failed });
+      }
+      if (d.status === 'failed' && d.pending) toast.error(`Stopped after ${d.sent} email(s): ${d.error || 'send failed'}`);
+      else toast.success(`✅ ${d.sent} email(s) sent`);
     } catch (err) { toast.error(err.response?.data?.detail || 'Send failed'); }
     finally { setSending(false); }
   };
@@ -19,6 +19,8 @@ import GifLoader from '@/components/ui/GifLoader.jsx';
 import { toast } from 'sonner';
 import { motion, AnimatePresence } from 'framer-motion';
 import api from '@/lib/api';
+import { isLive } from '@/lib/liveEvents';
+import { useLiveEvent } from '@/hooks/useLiveEvent';
 
 const COLORS = {
   deepBlue:     '#0D3B66',
@@ -405,17 +407,29 @@ const DashboardLayout = ({ children }) => {
     return () => document.removeEventListener('mousedown', handle);
   }, [userMenuOpen]);
 
+  // Unread badge: pushed over the live event stream (the count on every
+  // connect, then deltas); the 30 s poll only runs while the stream is down.
+  const unreadRef = useRef(0);
+  const applyUnread = useCallback((count) => {
+    unreadRef.current = Math.max(0, count);
+    setHasUnread(unreadRef.current > 0);
+  }, []);
+  useLiveEvent('hello', (data) => applyUnread(data?.unread ?? 0));
+  useLiveEvent('unread', (data) => {
+    applyUnread(data?.count ?? unreadRef.current + (data?.delta ?? 0));
+  });
+
   useEffect(() => {
     const fetchUnread = async () => {
       try {
         const { data } = await api.get('/notifications/unread-count', { _silent: true });
-        setHasUnread((data?.count ?? 0) > 0);
+        applyUnread(data?.count ?? 0);
       } catch { /* ignore — 401/403 handled globally by api interceptor */ }
     };
     fetchUnread();
-    const interval = setInterval(fetchUnread, 30000);
+    const interval = setInterval(() => { if (!isLive()) fetchUnread(); }, 30000);
     return () => clearInterval(interval);
-  }, []);
+  }, [applyUnread]);
 
   if (loading) return <GifLoader />;
   if (!user) { navigate('/login', { replace: true }); return null; }
@@ -11,6 +11,8 @@ import {
 } from "@/components/ui/popover";
 import { ScrollArea } from "@/components/ui/scroll-area";
 import api from "@/lib/api";
+import { isLive } from "@/lib/liveEvents";
+import { useLiveEvent } from "@/hooks/useLiveEvent";
 import { toast } from "sonner";
 
 // ── Icon per notification type ────────────────────────────────────────────────
@@ -67,12 +69,23 @@ export const NotificationBell = () => {
     }
   }, []);
 
+  // New notifications and badge changes arrive over the live event stream;
+  // a (re)connect resyncs the list, and the poll only runs while it is down.
   useEffect(() => {
     fetchNotifications();
-    const id = setInterval(fetchNotifications, 60_000);
+    const id = setInterval(() => { if (!isLive()) fetchNotifications(); }, 60_000);
     return () => clearInterval(id);
   }, [fetchNotifications]);
 
+  useLiveEvent("hello", fetchNotifications);
+  useLiveEvent("notification", (doc) => {
+    if (!doc?.id) return;
+    setNotifications((prev) => (prev.some((n) => n.id === doc.id) ? prev : [doc, ...prev]));
+  });
+  useLiveEvent("unread", (data) => {
+    setUnreadCount((c) => Math.max(0, data?.count ?? c + (data?.delta ?? 0)));
+  });
+
   // ── Mark single read ───────────────────────────────────────────────────────
   const markAsRead = async (notificationId) => {
     // Optimistic update
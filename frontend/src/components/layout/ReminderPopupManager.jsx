@@ -11,10 +11,13 @@ import {
 import { Button } from "@/components/ui/button";
 import api from "@/lib/api";
 import { useAuth } from "@/contexts/AuthContext";
+import { isLive } from "@/lib/liveEvents";
+import { useLiveEvent } from "@/hooks/useLiveEvent";
 
-// How often to ask the backend "is anything due right now?"
-// Default is 30 s; users can override it from the "Notification settings"
-// panel on the Reminders page (writes localStorage key below).
+// Due popups are pushed over the live event stream the moment they fire;
+// polling only runs while that stream is down. Default is 30 s; users can
+// override it from the "Notification settings" panel on the Reminders page
+// (writes localStorage key below).
 // Per-item intervals live on the reminder/task itself (popup_interval_minutes)
 // and are honoured server-side when computing remind_at.
 const POPUP_POLL_LS_KEY = "universal_popup_poll_seconds";
@@ -72,7 +75,7 @@ const fireDesktopNotification = (item) => {
 
 /**
  * Mounted once near the root of the app (inside AuthProvider, outside the
- * route switch) so it keeps polling and can pop up on top of ANY page.
+ * route switch) so it keeps listening and can pop up on top of ANY page.
  */
 export default function ReminderPopupManager() {
   const { user } = useAuth();
@@ -87,23 +90,28 @@ export default function ReminderPopupManager() {
     }
   }, []);
 
+  const enqueue = useCallback((items) => {
+    if (!Array.isArray(items) || items.length === 0) return;
+    setQueue((prev) => {
+      const existingIds = new Set(prev.map((p) => p.id));
+      const fresh = items.filter((p) => !existingIds.has(p.id));
+      fresh.forEach(fireDesktopNotification);
+      return [...prev, ...fresh];
+    });
+  }, []);
+
   const fetchDuePopups = useCallback(async () => {
     if (!user) return;
     try {
       const { data } = await api.get("/reminders/due-popups");
-      if (Array.isArray(data) && data.length > 0) {
-        setQueue((prev) => {
-          const existingIds = new Set(prev.map((p) => p.id));
-          const fresh = data.filter((p) => !existingIds.has(p.id));
-          fresh.forEach(fireDesktopNotification);
-          return [...prev, ...fresh];
-        });
-      }
+      enqueue(data);
     } catch (err) {
       // Silent — popup polling should never disrupt the rest of the app
       console.error("Failed to fetch due popups:", err);
     }
-  }, [user]);
+  }, [user, enqueue]);
+
+  useLiveEvent("popup", enqueue, !!user);
 
   useEffect(() => {
     if (!user) return;
@@ -111,7 +119,9 @@ export default function ReminderPopupManager() {
 
     const start = () => {
       if (pollRef.current) clearInterval(pollRef.current);
-      pollRef.current = setInterval(fetchDuePopups, readPollIntervalMs());
+      pollRef.current = setInterval(() => {
+        if (!isLive()) fetchDuePopups();
+      }, readPollIntervalMs());
     };
     start();
 
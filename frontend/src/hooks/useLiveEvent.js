@@ -0,0 +1,24 @@
+/**
+ * useLiveEvent — subscribe a component to one event of the shared live
+ * event stream (see lib/liveEvents.js) for as long as it is mounted.
+ *
+ * Usage:
+ *   useLiveEvent('unread', (data) => { ... });
+ *
+ * The latest handler is always called, so it may close over fresh state
+ * without resubscribing on every render.
+ */
+import { useEffect, useRef } from 'react';
+import { subscribe } from '@/lib/liveEvents';
+
+export function useLiveEvent(event, handler, enabled = true) {
+  const handlerRef = useRef(handler);
+  handlerRef.current = handler;
+
+  useEffect(() => {
+    if (!enabled) return undefined;
+    return subscribe(event, (data) => handlerRef.current(data));
+  }, [event, enabled]);
+}
+
+export default useLiveEvent;
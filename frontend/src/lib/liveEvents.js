@@ -0,0 +1,95 @@
+// ─────────────────────────────────────────────────────────────
+// Live events — one Server-Sent Events stream per tab
+// (GET /api/events/stream, see backend/live_events.py) shared by every
+// component that wants server pushes:
+//
+//   hello         { unread, popups, hub }  on every (re)connect
+//   notification  a new notification document
+//   unread        { delta } or { count }   unread badge changes
+//   popup         [items]                  due reminders / popup notifications
+//   wa_message, wa_sync                    WhatsApp Hub activity
+//
+// Components keep their polling as the fallback and skip it while
+// isLive() is true. The "live" pseudo-event fires with true / false when
+// the stream comes up or goes down.
+// ─────────────────────────────────────────────────────────────
+import { BASE_URL, getToken } from "@/lib/api";
+
+const EVENTS = ["hello", "notification", "unread", "popup", "wa_message", "wa_sync"];
+const RECONNECT_MS = 8000;
+
+const listeners = new Map(); // event name -> Set of handlers
+let source = null;
+let reconnectTimer = null;
+let live = false;
+
+const emit = (event, data) => {
+  (listeners.get(event) || []).forEach((handler) => {
+    try { handler(data); } catch (err) { console.error(`[live] ${event} handler failed:`, err); }
+  });
+};
+
+const setLive = (value) => {
+  if (live === value) return;
+  live = value;
+  emit("live", value);
+};
+
+const disconnect = () => {
+  clearTimeout(reconnectTimer);
+  reconnectTimer = null;
+  if (source) { try { source.close(); } catch (_) {} }
+  source = null;
+  setLive(false);
+};
+
+const connect = () => {
+  clearTimeout(reconnectTimer);
+  reconnectTimer = null;
+  const token = getToken();
+  if (typeof window === "undefined" || !("EventSource" in window) || !token) {
+    reconnectTimer = setTimeout(connect, RECONNECT_MS);
+    return;
+  }
+  // EventSource cannot send headers, so the JWT goes in the query string.
+  const es = new EventSource(`${BASE_URL}/events/stream?token=${encodeURIComponent(token)}`);
+  EVENTS.forEach((name) => {
+    es.addEventListener(name, (e) => {
+      let data = null;
+      try { data = JSON.parse(e.data); } catch (_) {}
+      if (name === "hello") setLive(true);
+      emit(name, data);
+    });
+  });
+  es.onerror = () => {
+    setLive(false);
+    // CONNECTING: the browser retries by itself (the server ends streams
+    // periodically). CLOSED: e.g. a 401 — retry with a fresh token.
+    if (es.readyState === EventSource.CLOSED) {
+      source = null;
+      reconnectTimer = setTimeout(connect, RECONNECT_MS);
+    }
+  };
+  source = es;
+};
+
+const handlerCount = () => {
+  let n = 0;
+  listeners.forEach((set) => { n += set.size; });
+  return n;
+};
+
+/** Subscribe to one event; returns the unsubscribe function. */
+export function subscribe(event, handler) {
+  if (!listeners.has(event)) listeners.set(event, new Set());
+  listeners.get(event).add(handler);
+  if (!source && !reconnectTimer) connect();
+  return () => {
+    listeners.get(event)?.delete(handler);
+    if (handlerCount() === 0) disconnect();
+  };
+}
+
+export const isLive = () => live;
+
+export default { subscribe, isLive };
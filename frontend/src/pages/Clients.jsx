@@ -639,8 +639,16 @@ const BulkMessageModal = React.memo(({ open, onClose, mode, filteredClients, isD
         override_sender_email: activeSender?.email || null, override_sender_name: activeSender?.name || null,
         attachment_name: mediaFile?.name || '', attachment_base64: mediaFile?.base64 || '',
       });
-      setSendProgress({ done: r.data.sent, total: emailClients.length, results: r.data.failed_list || [] });
-      toast.success(r.data.sent + ' email(s) sent' + (r.data.failed > 0 ? ', ' + r.data.failed + ' failed' : ''));
+      let d = r.data;
+      setSendProgress({ done: d.sent, total: emailClients.length, results: d.failed_list || [] });
+      // SMTP sends run as a background job: follow it until it finishes
+      while (d.job_id && d.status === 'running') {
+        await new Promise(res => setTimeout(res, 2000));
+        d = (await api.get(`/email/bulk-jobs/${d.job_id}`)).data;
+        setSendProgress({ done: d.sent, total: emailClients.length, results: d.failed_list || [] });
+      }
+      if (d.status === 'failed' && d.pending) toast.error('Stopped after ' + d.sent + ' email(s): ' + (d.error || 'send failed'));
+      else toast.success(d.sent + ' email(s) sent' + (d.failed > 0 ? ', ' + d.failed + ' failed' : ''));
     } catch (err) {
       toast.error(err.response?.data?.detail || 'Email send failed. Check Settings -> Email Accounts.');
       setSendProgress(null);
@@ -67,16 +67,21 @@ function DayBookSection({ isDark, companyId }) {
   const [source, setSource] = useState('');
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [expanded, setExpanded] = useState({});
 
-  const fetchData = async () => {
-    setLoading(true);
+  // The API returns the book a page of days at a time; "Load more" appends
+  // the page after `next_cursor`. Totals come with the first page only.
+  const fetchData = async (cursor) => {
+    if (cursor) setLoadingMore(true); else setLoading(true);
     try {
-      const params = { company_id: companyId, source: source || undefined };
+      const params = { company_id: companyId, source: source || undefined, cursor: cursor || undefined };
       if (mode === 'fy') params.fy = fy; else { params.from_date = fromDate; params.to_date = toDate; }
-      const { data } = await api.get('/reports/day-book', { params });
-      setData(data);
-    } catch { toast.error('Failed to load Day Book'); } finally { setLoading(false); }
+      const { data: page } = await api.get('/reports/day-book', { params });
+      setData((prev) => (cursor && prev
+        ? { ...prev, days: [...prev.days, ...page.days], next_cursor: page.next_cursor }
+        : page));
+    } catch { toast.error('Failed to load Day Book'); } finally { setLoading(false); setLoadingMore(false); }
   };
   useEffect(() => { fetchData(); }, [mode, fy, source, companyId]);
   const toggle = (date) => setExpanded((e) => ({ ...e, [date]: !e[date] }));
@@ -132,6 +137,11 @@ function DayBookSection({ isDark, companyId }) {
                 )}
               </div>
             ))}
+            {data.next_cursor && (
+              <Button variant="outline" size="sm" className="w-full" disabled={loadingMore} onClick={() => fetchData(data.next_cursor)}>
+                {loadingMore ? <Loader2 className="h-4 w-4 animate-spin" /> : `Load more (from ${data.next_cursor})`}
+              </Button>
+            )}
             <div className={`grid grid-cols-[1fr_150px] gap-2 pt-3 mt-2 border-t font-bold text-sm ${isDark ? 'border-slate-700' : 'border-slate-200'}`}>
               <span className={isDark ? 'text-slate-100' : 'text-slate-900'}>Total (Debit / Credit)</span>
               <span className="text-right font-mono">{fmtC(data.total_debit)} / {fmtC(data.total_credit)}</span>
@@ -151,15 +161,25 @@ function CashBankBookSection({ isDark, companyId }) {
   const [toDate, setToDate] = useState('');
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  const fetchData = async () => {
-    setLoading(true);
+  // Paged by days like the Day Book: later pages append each account's rows.
+  const fetchData = async (cursor) => {
+    if (cursor) setLoadingMore(true); else setLoading(true);
     try {
-      const params = { company_id: companyId };
+      const params = { company_id: companyId, cursor: cursor || undefined };
       if (mode === 'fy') params.fy = fy; else { params.from_date = fromDate; params.to_date = toDate; }
-      const { data } = await api.get('/reports/cash-bank-book', { params });
-      setData(data);
-    } catch { toast.error('Failed to load Cash / Bank Book'); } finally { setLoading(false); }
+      const { data: page } = await api.get('/reports/cash-bank-book', { params });
+      setData((prev) => {
+        if (!cursor || !prev) return page;
+        const rowsById = Object.fromEntries(page.accounts.map((a) => [a.account_id, a.rows]));
+        return {
+          ...prev,
+          accounts: prev.accounts.map((a) => ({ ...a, rows: [...a.rows, ...(rowsById[a.account_id] || [])] })),
+          next_cursor: page.next_cursor,
+        };
+      });
+    } catch { toast.error('Failed to load Cash / Bank Book'); } finally { setLoading(false); setLoadingMore(false); }
   };
   useEffect(() => { fetchData(); }, [mode, fy, companyId]);
 
@@ -192,6 +212,11 @@ function CashBankBookSection({ isDark, companyId }) {
           </ReportCard>
         ))
       )}
+      {!loading && data?.next_cursor && (
+        <Button variant="outline" size="sm" className="w-full" disabled={loadingMore} onClick={() => fetchData(data.next_cursor)}>
+          {loadingMore ? <Loader2 className="h-4 w-4 animate-spin" /> : `Load more (from ${data.next_cursor})`}
+        </Button>
+      )}
     </div>
   );
 }
@@ -31,6 +31,8 @@ import { FixedSizeList as VList } from 'react-window';
 import AutoSizer from 'react-virtualized-auto-sizer';
 import api, { BASE_URL, getToken } from '@/lib/api';
 import { useAuth } from '@/contexts/AuthContext.jsx';
+import { isLive } from '@/lib/liveEvents';
+import { useLiveEvent } from '@/hooks/useLiveEvent';
 
 // ── Socket.IO lazy import for real-time updates ───────────────────────────────
 let _io = null;
@@ -1450,45 +1452,17 @@ export default function WhatsAppHub() {
     } catch { /* silently */ }
   }, []);
 
-  useEffect(() => { loadContacts(); const t=setInterval(loadContacts,5000); return ()=>clearInterval(t); }, [loadContacts]);
+  // Polling is the fallback while the live event stream is down.
+  useEffect(() => { loadContacts(); const t=setInterval(()=>{ if (!isLive()) loadContacts(); },5000); return ()=>clearInterval(t); }, [loadContacts]);
   useEffect(() => { if (filterMode==='archived') loadArchived(); }, [filterMode, loadArchived]);
 
 
-    // ── SSE: real-time updates ────────────────────────────────────────────────
-    const eventSourceRef = useRef(null);
-    const reconnectTimerRef = useRef(null);
-
-    const connectSSE = useCallback(() => {
-      try {
-        if (eventSourceRef.current) { try { eventSourceRef.current.close(); } catch(_){} }
-        const token = getToken()
-          || document.cookie.match(/token=([^;]+)/)?.[1]
-          || sessionStorage.getItem('token');
-        const sseBase = `${BASE_URL}/whatsapp/hub/events`;
-        const url = token
-          ? `${sseBase}?token=${encodeURIComponent(token)}`
-          : sseBase;
-        const es = new EventSource(url, { withCredentials: true });
-        es.addEventListener('message', () => { loadContacts(); });
-        es.addEventListener('sync',    () => { loadContacts(); });
-        es.addEventListener('connected', () => { clearTimeout(reconnectTimerRef.current); });
-        es.onerror = () => {
-          try { es.close(); } catch(_){}
-          eventSourceRef.current = null;
-          reconnectTimerRef.current = setTimeout(connectSSE, 8000);
-        };
-        eventSourceRef.current = es;
-      } catch(_) {}
-    }, [loadContacts]);
-
-    // Connect SSE on mount; auto-reload active thread on new message
-    useEffect(() => {
-      connectSSE();
-      return () => {
-        clearTimeout(reconnectTimerRef.current);
-        try { eventSourceRef.current?.close(); } catch(_){}
-      };
-    }, [connectSSE]);
+    // ── Live events: real-time updates ────────────────────────────────────────
+    // Hub activity arrives as wa_message / wa_sync on the shared live event
+    // stream (lib/liveEvents.js); a (re)connect resyncs the chat list.
+    useLiveEvent('wa_message', () => { loadContacts(); });
+    useLiveEvent('wa_sync',    () => { loadContacts(); });
+    useLiveEvent('hello',      () => { loadContacts(); });
 
   // ── Active conversation ────────────────────────────────────────────────────
   // (Moved above the SSE effect below because that effect's dependency array
@@ -1525,7 +1499,7 @@ export default function WhatsAppHub() {
     if (!activeJid) return;
     loadThread(activeJid);
     api.patch(`/whatsapp/hub/conversations/${encodeURIComponent(activeJid)}/read`).catch(()=>{});
-    const t = setInterval(()=>loadThread(activeJid), 5000);
+    const t = setInterval(()=>{ if (!isLive()) loadThread(activeJid); }, 5000);
     return () => clearInterval(t);
   }, [activeJid, loadThread]);
 
@@ -1540,20 +1514,10 @@ export default function WhatsAppHub() {
   // keep closeChatRef in sync so toggleArchive can call it
   useEffect(() => { closeChatRef.current = closeChat; });
 
-    // Reload active thread faster on SSE message event
-    const activeJidForSSE = activeJid;
-    useEffect(() => {
-      const es = eventSourceRef.current;
-      if (!es || !activeJidForSSE) return;
-      const handler = (e) => {
-        try {
-          const d = JSON.parse(e.data || '{}');
-          if (d.jid === activeJidForSSE) loadThread(activeJidForSSE);
-        } catch(_) {}
-      };
-      es.addEventListener('message', handler);
-      return () => { try { es.removeEventListener('message', handler); } catch(_){} };
-    }, [activeJidForSSE, loadThread]);
+    // Reload the active thread when a message for it arrives
+    useLiveEvent('wa_message', (d) => {
+      if (d?.jid && d.jid === activeJidRef.current) loadThread(d.jid);
+    });
 
   
     const [syncing, setSyncing] = useState(false);